@@ -14,8 +14,7 @@ from flask import Blueprint, request, jsonify
 from middleware.auth_middleware import require_auth, get_current_user
 from web_ui.database import db_manager
 from web_ui.tenant_context import get_current_tenant_id
-from web_ui.services.onboarding_bot import OnboardingBot
-import anthropic
+from tenant_knowledge_cache import invalidate_tenant_knowledge
 
 logger = logging.getLogger(__name__)
 
@@ -296,6 +295,9 @@ def complete_tenant_setup():
                 wallet.get('blockchain'), wallet.get('address', ''),
                 wallet.get('currency', 'ETH')
             ))
+        if crypto_wallets:
+            # Classification in this process matches the new wallet addresses
+            invalidate_tenant_knowledge(tenant_id)
 
         # 6. Create onboarding status record
         db_manager.execute_query("""
@@ -711,6 +713,7 @@ def process_document_with_ai(doc_id, tenant_id, file_path, mime_type):
             logger.error("ANTHROPIC_API_KEY not set")
             return []
 
+        import anthropic
         client = anthropic.Anthropic(api_key=api_key)
 
         # Read file content
@@ -1033,6 +1036,7 @@ def get_capabilities():
                 'message': 'No tenant context available'
             }), 400
 
+        from web_ui.services.onboarding_bot import OnboardingBot
         bot = OnboardingBot(db_manager, tenant_id)
         milestones_data = bot.get_completion_milestones()
 
@@ -1376,7 +1376,9 @@ def get_api_performance():
                 "avg_response_time_ms": N,
                 "p95_response_time_ms": N,
                 "requests_per_minute": N,
-                "error_rate": N
+                "error_rate": N,
+                "database": {...},   # flushed query statistics for the range
+                "live": {...}        # this instance's current query window
             }
         }
     """
@@ -1415,7 +1417,9 @@ def get_api_performance():
                 'p95_response_time_ms': p95_response_time,
                 'requests_per_minute': requests_per_minute,
                 'total_requests': total_requests,
-                'error_rate': error_rate
+                'error_rate': error_rate,
+                'database': _get_query_stats(start_date, end_date),
+                'live': db_manager.query_monitor.snapshot(limit=10)
             }
         }), 200
 
@@ -1443,7 +1447,8 @@ def get_slow_endpoints():
         {
             "success": true,
             "data": {
-                "slow_endpoints": [...]
+                "slow_endpoints": [...],
+                "query_heavy_endpoints": [...]   # avg queries, DB time, N+1 counts
             }
         }
     """
@@ -1482,7 +1487,8 @@ def get_slow_endpoints():
         return jsonify({
             'success': True,
             'data': {
-                'slow_endpoints': slow_endpoints
+                'slow_endpoints': slow_endpoints,
+                'query_heavy_endpoints': _get_query_heavy_endpoints(start_date, end_date, threshold_ms)
             }
         }), 200
 
@@ -1495,6 +1501,104 @@ def get_slow_endpoints():
         }), 500
 
 
+def _get_query_stats(start_date, end_date) -> dict:
+    """Aggregate flushed QueryMonitor windows for the date range."""
+    try:
+        totals = db_manager.execute_query("""
+            SELECT
+                COALESCE(SUM(request_count), 0) as requests,
+                COALESCE(SUM(query_count), 0) as queries,
+                COALESCE(SUM(db_time_ms), 0) as db_time_ms,
+                COALESCE(SUM(wall_time_ms), 0) as wall_time_ms,
+                COALESCE(SUM(n_plus_one_count), 0) as n_plus_one_requests
+            FROM db_endpoint_query_stats
+            WHERE scope_kind = 'request' AND window_end >= %s AND window_start <= %s
+        """, (start_date, end_date), fetch_one=True)
+
+        top_queries = db_manager.execute_query("""
+            SELECT
+                fingerprint_hash,
+                MAX(fingerprint) as fingerprint,
+                SUM(calls) as calls,
+                SUM(total_ms) as total_ms,
+                MAX(max_ms) as max_ms,
+                SUM(slow_calls) as slow_calls,
+                MAX(params_shape) as params_shape
+            FROM db_query_fingerprint_stats
+            WHERE window_end >= %s AND window_start <= %s
+            GROUP BY fingerprint_hash
+            ORDER BY total_ms DESC
+            LIMIT 10
+        """, (start_date, end_date), fetch_all=True)
+
+        requests = int(totals['requests'] or 0)
+        wall_time_ms = float(totals['wall_time_ms'] or 0)
+        return {
+            'avg_queries_per_request': round(int(totals['queries'] or 0) / max(requests, 1), 1),
+            'avg_db_time_ms': round(float(totals['db_time_ms'] or 0) / max(requests, 1), 1),
+            'db_time_share': round(float(totals['db_time_ms'] or 0) / wall_time_ms * 100, 1) if wall_time_ms else 0.0,
+            'n_plus_one_requests': int(totals['n_plus_one_requests'] or 0),
+            'top_queries': [
+                {
+                    'fingerprint_hash': row['fingerprint_hash'],
+                    'fingerprint': row['fingerprint'],
+                    'calls': int(row['calls']),
+                    'total_ms': round(float(row['total_ms']), 1),
+                    'avg_ms': round(float(row['total_ms']) / max(int(row['calls']), 1), 2),
+                    'max_ms': round(float(row['max_ms']), 1),
+                    'slow_calls': int(row['slow_calls']),
+                    'params_shape': row['params_shape']
+                }
+                for row in (top_queries or [])
+            ]
+        }
+    except Exception as e:
+        logger.warning(f"Query statistics unavailable: {e}")
+        return None
+
+
+def _get_query_heavy_endpoints(start_date, end_date, threshold_ms: int) -> list:
+    """Routes/jobs that are slow or showed N+1 patterns in the flushed QueryMonitor windows."""
+    try:
+        results = db_manager.execute_query("""
+            SELECT
+                scope_kind,
+                scope_name,
+                SUM(request_count) as request_count,
+                SUM(query_count)::float / GREATEST(SUM(request_count), 1) as avg_queries,
+                MAX(max_queries) as max_queries,
+                SUM(db_time_ms) / GREATEST(SUM(request_count), 1) as avg_db_time_ms,
+                SUM(wall_time_ms) / GREATEST(SUM(request_count), 1) as avg_wall_time_ms,
+                SUM(n_plus_one_count) as n_plus_one_count,
+                MAX(n_plus_one_fingerprint) as n_plus_one_fingerprint
+            FROM db_endpoint_query_stats
+            WHERE window_end >= %s AND window_start <= %s
+            GROUP BY scope_kind, scope_name
+            HAVING SUM(wall_time_ms) / GREATEST(SUM(request_count), 1) >= %s
+                OR SUM(n_plus_one_count) > 0
+            ORDER BY SUM(n_plus_one_count) DESC, avg_db_time_ms DESC
+            LIMIT 20
+        """, (start_date, end_date, threshold_ms), fetch_all=True)
+
+        return [
+            {
+                'kind': row['scope_kind'],
+                'endpoint': row['scope_name'],
+                'request_count': int(row['request_count']),
+                'avg_queries': round(float(row['avg_queries']), 1),
+                'max_queries': row['max_queries'],
+                'avg_db_time_ms': round(float(row['avg_db_time_ms']), 1),
+                'avg_duration_ms': round(float(row['avg_wall_time_ms']), 1),
+                'n_plus_one_count': int(row['n_plus_one_count']),
+                'n_plus_one_fingerprint': row['n_plus_one_fingerprint']
+            }
+            for row in (results or [])
+        ]
+    except Exception as e:
+        logger.warning(f"Query statistics unavailable: {e}")
+        return []
+
+
 # ==============================================================================
 # SYSTEM HEALTH ENDPOINTS
 # ==============================================================================
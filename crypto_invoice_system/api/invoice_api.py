@@ -44,7 +44,7 @@ invoice_dir = os.path.join(base_dir, "generated_invoices")
 
 # Initialize PostgreSQL database manager (no longer using SQLite)
 db_manager = CryptoInvoiceDatabaseManager()
-invoice_generator = InvoiceGenerator(invoice_dir)
+invoice_generator = InvoiceGenerator(invoice_dir, sequence_source=db_manager.next_invoice_sequence)
 
 # Initialize MEXC service (API keys from environment)
 mexc_api_key = os.getenv('MEXC_API_KEY') or 'mx0vglFBKknNUwIGuR'
@@ -69,6 +69,41 @@ else:
     logger.warning("MEXC API credentials not found - payment polling disabled")
 
 
+def resolve_deposit_address(currency: str, network: str):
+    """
+    Deposit address (and memo/tag) for a currency/network: the MEXC primary
+    address, or a mock address in demo mode
+
+    Raises:
+        MEXCAPIError: If MEXC can't return an address
+    """
+    if mexc_service:
+        address_info = mexc_service.get_primary_deposit_address(currency=currency, network=network)
+        logger.info(f"Using MEXC primary address for {currency}/{network}: {address_info['address']}")
+        return address_info['address'], address_info.get('memo')
+
+    # Demo mode - generate mock addresses for testing
+    logger.warning("Using DEMO mode - generating mock deposit address")
+    import hashlib
+    mock_seed = f"{currency}-{network}-{datetime.now().timestamp()}"
+
+    if currency == 'BTC':
+        deposit_address = 'bc1q' + hashlib.sha256(mock_seed.encode()).hexdigest()[:38]
+    elif currency == 'USDT' and network == 'TRC20':
+        deposit_address = 'T' + hashlib.sha256(mock_seed.encode()).hexdigest()[:33]
+    elif currency == 'USDT' and network == 'ERC20':
+        deposit_address = '0x' + hashlib.sha256(mock_seed.encode()).hexdigest()[:40]
+    elif currency == 'USDT' and network == 'BEP20':
+        deposit_address = '0x' + hashlib.sha256(mock_seed.encode()).hexdigest()[:40]
+    elif currency == 'TAO':
+        deposit_address = '5' + hashlib.sha256(mock_seed.encode()).hexdigest()[:47]
+    else:
+        deposit_address = hashlib.sha256(mock_seed.encode()).hexdigest()
+
+    logger.info(f"DEMO: Generated mock address: {deposit_address}")
+    return deposit_address, None
+
+
 # Routes
 
 @app.route('/')
@@ -124,39 +159,11 @@ def create_invoice():
         client = db_manager.get_all_clients()[int(data['client_id']) - 1]
 
         # Get primary deposit address from MEXC (shared address for all invoices)
-        if mexc_service:
-            try:
-                address_info = mexc_service.get_primary_deposit_address(
-                    currency=data['crypto_currency'],
-                    network=data['crypto_network']
-                )
-                deposit_address = address_info['address']
-                memo_tag = address_info.get('memo')
-                logger.info(f"Using MEXC primary address for {data['crypto_currency']}/{data['crypto_network']}: {deposit_address}")
-            except MEXCAPIError as e:
-                logger.error(f"MEXC API error: {e}")
-                return jsonify({"success": False, "error": f"MEXC API error: {str(e)}"}), 500
-        else:
-            # Demo mode - generate mock addresses for testing
-            logger.warning("Using DEMO mode - generating mock deposit address")
-            import hashlib
-            mock_seed = f"{data['crypto_currency']}-{data['crypto_network']}-{datetime.now().timestamp()}"
-
-            if data['crypto_currency'] == 'BTC':
-                deposit_address = 'bc1q' + hashlib.sha256(mock_seed.encode()).hexdigest()[:38]
-            elif data['crypto_currency'] == 'USDT' and data['crypto_network'] == 'TRC20':
-                deposit_address = 'T' + hashlib.sha256(mock_seed.encode()).hexdigest()[:33]
-            elif data['crypto_currency'] == 'USDT' and data['crypto_network'] == 'ERC20':
-                deposit_address = '0x' + hashlib.sha256(mock_seed.encode()).hexdigest()[:40]
-            elif data['crypto_currency'] == 'USDT' and data['crypto_network'] == 'BEP20':
-                deposit_address = '0x' + hashlib.sha256(mock_seed.encode()).hexdigest()[:40]
-            elif data['crypto_currency'] == 'TAO':
-                deposit_address = '5' + hashlib.sha256(mock_seed.encode()).hexdigest()[:47]
-            else:
-                deposit_address = hashlib.sha256(mock_seed.encode()).hexdigest()
-
-            memo_tag = None
-            logger.info(f"DEMO: Generated mock address: {deposit_address}")
+        try:
+            deposit_address, memo_tag = resolve_deposit_address(data['crypto_currency'], data['crypto_network'])
+        except MEXCAPIError as e:
+            logger.error(f"MEXC API error: {e}")
+            return jsonify({"success": False, "error": f"MEXC API error: {str(e)}"}), 500
 
         # Get crypto price and calculate amount
         crypto_price = invoice_generator.get_crypto_price(
@@ -241,6 +248,131 @@ def create_invoice():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route('/api/invoice/create-batch', methods=['POST'])
+def create_invoice_batch():
+    """
+    Create invoices for many clients in one run (monthly billing)
+
+    Body: {"invoices": [<create_invoice body>, ...]}. Deposit addresses and
+    prices are fetched once per currency/network for the whole run, and QR
+    codes and PDFs are rendered in parallel. Invalid entries are reported in
+    "errors" without stopping the run.
+    """
+    try:
+        requests_data = (request.json or {}).get('invoices', [])
+        if not requests_data:
+            return jsonify({"success": False, "error": "No invoices provided"}), 400
+
+        required_fields = ['client_id', 'amount_usd', 'crypto_currency',
+                          'crypto_network', 'billing_period', 'due_date']
+        clients = db_manager.get_all_clients()
+        addresses = {}
+        prices = {}
+        errors = []
+        pending = []
+
+        for index, data in enumerate(requests_data):
+            missing = [field for field in required_fields if field not in data]
+            if missing:
+                errors.append({"index": index, "error": f"Missing required field: {missing[0]}"})
+                continue
+            try:
+                client = clients[int(data['client_id']) - 1]
+                pair = (data['crypto_currency'], data['crypto_network'])
+
+                # One address and one price per currency/network for the whole run
+                if pair not in addresses:
+                    addresses[pair] = resolve_deposit_address(*pair)
+                    prices[pair] = invoice_generator.get_crypto_price(*pair)
+                base_crypto_amount = invoice_generator.calculate_crypto_amount(
+                    float(data['amount_usd']), prices[pair])
+            except (IndexError, ValueError, MEXCAPIError) as e:
+                errors.append({"index": index, "error": str(e)})
+                continue
+
+            pending.append((data, client, pair, base_crypto_amount))
+
+        # Cache MEXC addresses
+        for (currency, network), (address, memo_tag) in addresses.items():
+            db_manager.cache_mexc_address(currency=currency, network=network,
+                                          address=address, memo_tag=memo_tag)
+
+        from services.amount_based_matcher import AmountBasedPaymentMatcher
+        matcher = AmountBasedPaymentMatcher()
+        issue_date = date.today().isoformat()
+        batch = []
+        created = []
+
+        try:
+            # Numbers are allocated from the database and the whole run is written in
+            # one transaction: a failure leaves no partial run and no numbers taken
+            with db_manager.invoice_batch_transaction():
+                invoice_numbers = invoice_generator.generate_invoice_numbers(len(pending)) if pending else []
+
+                for (data, client, pair, base_crypto_amount), invoice_number in zip(pending, invoice_numbers):
+                    deposit_address, memo_tag = addresses[pair]
+                    crypto_amount = matcher.calculate_unique_amount(base_crypto_amount, invoice_number)
+
+                    batch.append({
+                        "invoice_number": invoice_number,
+                        "client_id": data['client_id'],
+                        "client_name": client['name'],
+                        "client_contact": client.get('contact_email', ''),
+                        "status": "sent",
+                        "amount_usd": float(data['amount_usd']),
+                        "crypto_currency": data['crypto_currency'],
+                        "crypto_amount": crypto_amount,
+                        "crypto_network": data['crypto_network'],
+                        "exchange_rate": prices[pair],
+                        "deposit_address": deposit_address,
+                        "memo_tag": memo_tag,
+                        "billing_period": data['billing_period'],
+                        "description": data.get('description', ''),
+                        "line_items": data.get('line_items', []),
+                        "due_date": data['due_date'],
+                        "issue_date": issue_date,
+                        "payment_tolerance": 0.005,
+                        "payment_uri": invoice_generator.create_payment_uri(
+                            currency=data['crypto_currency'],
+                            address=deposit_address,
+                            amount=crypto_amount,
+                            label=f"Delta Energy Invoice {invoice_number}"
+                        ),
+                        "notes": data.get('notes', '')
+                    })
+
+                # QR codes and PDFs for the whole run
+                invoice_generator.generate_invoice_batch(batch)
+
+                for invoice_data in batch:
+                    invoice_id = db_manager.create_invoice(invoice_data)
+                    db_manager.update_invoice_pdf_path(invoice_id, invoice_data['pdf_path'])
+                    db_manager.mark_address_used(invoice_data['deposit_address'], invoice_id)
+                    created.append({
+                        "invoice_id": invoice_id,
+                        "invoice_number": invoice_data['invoice_number'],
+                        "pdf_path": invoice_data['pdf_path'],
+                        "deposit_address": invoice_data['deposit_address']
+                    })
+        except Exception:
+            # Nothing was committed, so don't leave the run's files behind
+            invoice_generator.discard_invoice_batch(batch)
+            raise
+
+        logger.info(f"Invoice batch created: {len(created)} invoices, {len(errors)} errors")
+
+        return jsonify({
+            "success": not errors,
+            "created_count": len(created),
+            "invoices": created,
+            "errors": errors or None
+        })
+
+    except Exception as e:
+        logger.error(f"Error creating invoice batch: {e}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @app.route('/api/invoices', methods=['GET'])
 def get_invoices():
     """Get all invoices with filtering"""
@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from enum import Enum
 import json
+from contextlib import contextmanager
 from pathlib import Path
 
 # Add main project path for DatabaseManager import
@@ -385,6 +386,49 @@ class CryptoInvoiceDatabaseManager:
             print(f"❌ Error creating invoice: {e}")
             raise
 
+    def next_invoice_sequence(self, year_month: str) -> int:
+        """
+        Next free sequence number for DPY-YYYY-MM-#### invoice numbers
+
+        On PostgreSQL allocation is serialised with a transaction-level advisory
+        lock, so call it inside invoice_batch_transaction() and insert the
+        invoices before the transaction ends.
+        """
+        prefix = f"DPY-{year_month}-"
+        try:
+            if self.db.db_type == 'postgresql':
+                self.db.execute_query("SELECT pg_advisory_xact_lock(hashtext(%s))", (prefix,), fetch_one=True)
+                query = """
+                    SELECT MAX(CAST(SUBSTRING(invoice_number FROM %s) AS INTEGER)) as last_sequence
+                    FROM crypto_invoices
+                    WHERE invoice_number LIKE %s
+                """
+            else:
+                query = """
+                    SELECT MAX(CAST(SUBSTR(invoice_number, ?) AS INTEGER)) as last_sequence
+                    FROM crypto_invoices
+                    WHERE invoice_number LIKE ?
+                """
+
+            row = self.db.execute_query(query, (len(prefix) + 1, prefix + '%'), fetch_one=True)
+            return (row['last_sequence'] or 0) + 1 if row else 1
+
+        except Exception as e:
+            print(f"❌ Error allocating invoice number: {e}")
+            raise
+
+    @contextmanager
+    def invoice_batch_transaction(self):
+        """
+        Run a billing run in one transaction
+
+        Invoice numbers allocated and invoices written inside the block are
+        committed together when it completes, or all rolled back on error.
+        """
+        with self.db.unit_of_work('crypto_invoice_batch') as uow:
+            with uow.savepoint():
+                yield
+
     def get_invoice(self, invoice_id: int) -> Optional[Dict[str, Any]]:
         """Get invoice by ID"""
         try:
@@ -6,9 +6,11 @@ Generates professional crypto invoices with QR codes and payment instructions
 
 import os
 import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date
-from typing import Dict, List, Any, Optional
-import qrcode
+from functools import lru_cache
+from typing import Callable, Dict, List, Any, Optional
 from io import BytesIO
 import base64
 
@@ -26,18 +28,109 @@ except ImportError:
     REPORTLAB_AVAILABLE = False
     print("WARNING: ReportLab not installed. PDF generation will be limited.")
 
+# QR codes and PDFs are CPU bound; batch runs render them in worker processes
+MAX_RENDER_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def render_qr_png(data: str) -> bytes:
+    """Render a QR code to PNG bytes (module level so it can run in a worker process)"""
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=1)
+def _pdf_styles() -> Dict[str, Any]:
+    """Paragraph styles shared by every invoice PDF, built once per process"""
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=28,
+            textColor=colors.HexColor('#1a1a2e'),
+            spaceAfter=20,
+            spaceBefore=10,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold',
+            leading=34
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=12,
+            textColor=colors.HexColor('#2c3e50'),
+            spaceAfter=10,
+            spaceBefore=16,
+            fontName='Helvetica-Bold',
+            leading=16
+        ),
+        'normal': ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=10,
+            textColor=colors.HexColor('#2c3e50'),
+            leading=14,
+            fontName='Helvetica'
+        ),
+        'small': ParagraphStyle(
+            'Small',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.HexColor('#7f8c8d'),
+            leading=12,
+            fontName='Helvetica'
+        ),
+        'warning': ParagraphStyle(
+            'Warning',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.HexColor('#d63031'),
+            spaceBefore=6,
+            spaceAfter=6,
+            leading=13
+        ),
+    }
+
+
+_worker_generators: Dict[str, 'InvoiceGenerator'] = {}
+
+
+def _render_pdf_in_worker(output_dir: str, invoice_data: Dict[str, Any]) -> str:
+    """Worker-process entry point for batch PDF rendering"""
+    generator = _worker_generators.get(output_dir)
+    if generator is None:
+        generator = _worker_generators[output_dir] = InvoiceGenerator(output_dir)
+    return generator.generate_pdf_invoice(invoice_data)
+
 
 class InvoiceGenerator:
     """Generate professional crypto invoices with QR codes"""
 
-    def __init__(self, output_dir: str = "generated_invoices"):
+    def __init__(self, output_dir: str = "generated_invoices",
+                 sequence_source: Optional[Callable[[str], int]] = None):
         """
         Initialize invoice generator
 
         Args:
             output_dir: Directory to save generated invoices
+            sequence_source: Returns the next free invoice sequence number for a
+                "YYYY-MM" month, e.g. the database manager's next_invoice_sequence
         """
         self.output_dir = output_dir
+        self.sequence_source = sequence_source
         os.makedirs(output_dir, exist_ok=True)
         os.makedirs(os.path.join(output_dir, "qr_codes"), exist_ok=True)
 
@@ -60,10 +153,30 @@ class InvoiceGenerator:
 
         return f"DPY-{year_month}-{sequence:04d}"
 
+    def generate_invoice_numbers(self, count: int, date_obj: date = None) -> List[str]:
+        """
+        Generate consecutive invoice numbers for a batch run
+
+        Args:
+            count: Number of invoices in the batch
+            date_obj: Invoice date (defaults to today)
+
+        Returns:
+            List of invoice number strings
+        """
+        if not date_obj:
+            date_obj = date.today()
+
+        year_month = date_obj.strftime("%Y-%m")
+        first = self._get_next_sequence_number(year_month)
+
+        return [f"DPY-{year_month}-{first + offset:04d}" for offset in range(count)]
+
     def _get_next_sequence_number(self, year_month: str) -> int:
         """Get next sequence number for invoice numbering"""
-        # In production, this should query the database for the last invoice number
-        # For now, use a simple timestamp-based approach
+        if self.sequence_source:
+            return self.sequence_source(year_month)
+        # Without a database, use a simple timestamp-based approach
         return int(datetime.now().strftime("%H%M"))
 
     def generate_qr_code(self, data: str, filename: str = None) -> str:
@@ -77,22 +190,15 @@ class InvoiceGenerator:
         Returns:
             Path to generated QR code image
         """
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color="black", back_color="white")
+        return self._save_qr_code(render_qr_png(data), filename)
 
+    def _save_qr_code(self, png: bytes, filename: str = None) -> str:
         if not filename:
             filename = f"qr_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
 
         qr_path = os.path.join(self.output_dir, "qr_codes", filename)
-        img.save(qr_path)
+        with open(qr_path, 'wb') as f:
+            f.write(png)
 
         return qr_path
 
@@ -191,48 +297,12 @@ class InvoiceGenerator:
         # Container for PDF elements
         elements = []
 
-        # Enhanced styles with better typography
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=28,
-            textColor=colors.HexColor('#1a1a2e'),
-            spaceAfter=20,
-            spaceBefore=10,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold',
-            leading=34
-        )
-
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=12,
-            textColor=colors.HexColor('#2c3e50'),
-            spaceAfter=10,
-            spaceBefore=16,
-            fontName='Helvetica-Bold',
-            leading=16
-        )
-
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#2c3e50'),
-            leading=14,
-            fontName='Helvetica'
-        )
-
-        small_style = ParagraphStyle(
-            'Small',
-            parent=styles['Normal'],
-            fontSize=9,
-            textColor=colors.HexColor('#7f8c8d'),
-            leading=12,
-            fontName='Helvetica'
-        )
+        # Enhanced styles with better typography (shared across invoices)
+        styles = _pdf_styles()
+        title_style = styles['title']
+        heading_style = styles['heading']
+        normal_style = styles['normal']
+        small_style = styles['small']
 
         # Title
         title = Paragraph("CRYPTO INVOICE", title_style)
@@ -428,15 +498,7 @@ class InvoiceGenerator:
             elements.append(Spacer(1, 0.25*inch))
 
         # Important notes with better styling
-        warning_style = ParagraphStyle(
-            'Warning',
-            parent=styles['Normal'],
-            fontSize=9,
-            textColor=colors.HexColor('#d63031'),
-            spaceBefore=6,
-            spaceAfter=6,
-            leading=13
-        )
+        warning_style = styles['warning']
 
         warning_data = [[
             Paragraph(
@@ -489,6 +551,69 @@ class InvoiceGenerator:
 
         return pdf_path
 
+    def generate_invoice_batch(self, invoices: List[Dict[str, Any]],
+                               workers: int = MAX_RENDER_WORKERS) -> List[Dict[str, Any]]:
+        """
+        Generate QR codes and PDFs for a batch of invoices (monthly billing run)
+
+        QR codes are rendered first, once per distinct payment URI, then the
+        PDFs; both run in a pool of worker processes. workers=0 renders in
+        this process.
+
+        Args:
+            invoices: invoice_data dictionaries as for generate_pdf_invoice,
+                each with an optional "payment_uri" to encode as its QR code
+
+        Returns:
+            The same dictionaries with "qr_code_path" and "pdf_path" set
+        """
+        pool = None
+        if workers and len(invoices) > 1:
+            try:
+                # spawn: the API process runs the payment poller thread
+                pool = ProcessPoolExecutor(max_workers=workers,
+                                           mp_context=multiprocessing.get_context('spawn'))
+            except Exception as e:
+                print(f"WARNING: Invoice render pool unavailable, rendering serially: {e}")
+
+        def run(function, *iterables):
+            if pool is None:
+                return list(map(function, *iterables))
+            return list(pool.map(function, *iterables, chunksize=max(1, len(invoices) // (workers * 4))))
+
+        try:
+            uris = list(dict.fromkeys(inv['payment_uri'] for inv in invoices if inv.get('payment_uri')))
+            pngs = dict(zip(uris, run(render_qr_png, uris)))
+            for invoice in invoices:
+                if invoice.get('payment_uri'):
+                    invoice['qr_code_path'] = self._save_qr_code(
+                        pngs[invoice['payment_uri']], f"qr_{invoice['invoice_number']}.png")
+
+            pdf_paths = run(_render_pdf_in_worker, [self.output_dir] * len(invoices), invoices)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        for invoice, pdf_path in zip(invoices, pdf_paths):
+            invoice['pdf_path'] = pdf_path
+        return invoices
+
+    def discard_invoice_batch(self, invoices: List[Dict[str, Any]]):
+        """
+        Remove the QR codes and PDFs rendered for a batch that was not saved,
+        including files of a partly finished generate_invoice_batch() call
+        """
+        for invoice in invoices:
+            paths = {
+                invoice.get('pdf_path'),
+                invoice.get('qr_code_path'),
+                os.path.join(self.output_dir, f"{invoice['invoice_number']}.pdf"),
+                os.path.join(self.output_dir, "qr_codes", f"qr_{invoice['invoice_number']}.png"),
+            }
+            for path in paths:
+                if path and os.path.exists(path):
+                    os.remove(path)
+
     def _generate_simple_text_invoice(self, invoice_data: Dict[str, Any]) -> str:
         """
         Generate simple text-based invoice when ReportLab not available
@@ -141,7 +141,8 @@ class CryptoPricingDB:
 
             # Execute batch operation
             if insert_operations:
-                batch_result = self.db.execute_batch_operation(insert_operations, batch_size=100)
+                # One batch per symbol: sent as a single multi-row upsert on PostgreSQL
+                batch_result = self.db.execute_batch_operation(insert_operations, batch_size=1000)
                 if batch_result['failed_batches'] > 0:
                     print(f"[WARNING] Warning: {batch_result['failed_batches']} batches failed during insert")
                     for error in batch_result['errors']:
@@ -187,7 +188,7 @@ class CryptoPricingDB:
 
         # Execute batch operation
         if insert_operations:
-            batch_result = self.db.execute_batch_operation(insert_operations, batch_size=100)
+            batch_result = self.db.execute_batch_operation(insert_operations, batch_size=1000)
             inserted_count = batch_result['total_rows_affected']
 
             if batch_result['failed_batches'] > 0:
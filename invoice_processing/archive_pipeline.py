@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Archive Pipeline
+Streams invoice files out of ZIP/RAR/7z archives one member at a time instead
+of extracting the whole archive, skips members whose content was already seen
+in the same archive, and fans members out to bounded worker pools: PDF page
+rendering (CPU bound) runs in worker processes, extraction calls (network
+bound) run in threads. Each member's result is handed to a callback as soon
+as it finishes, so callers can record progress while the archive is still
+being read.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import re
+import shutil
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+SUPPORTED_INVOICE_EXTENSIONS = {'.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.csv', '.xls', '.xlsx'}
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Extraction calls are rate limited upstream; rendering is bounded by CPUs
+MAX_IO_WORKERS = 5
+MAX_RENDER_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+class ArchiveError(Exception):
+    """Archive can't be opened or its format isn't supported"""
+
+
+@dataclass
+class ArchiveMember:
+    """A supported file inside an archive, spooled to disk unless it duplicates an earlier member"""
+    index: int
+    name: str
+    size: int
+    sha256: str = ''
+    path: Optional[str] = None
+    duplicate_of: Optional[str] = None
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.name.replace('\\', '/'))
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.name)[1].lower()
+
+
+def _archive_type(archive_path: str) -> str:
+    return os.path.splitext(archive_path)[1].lower()
+
+
+def _open_archive(archive_path: str):
+    """ZipFile-compatible reader for .zip and .rar archives"""
+    archive_type = _archive_type(archive_path)
+    if archive_type == '.zip':
+        import zipfile
+        try:
+            return zipfile.ZipFile(archive_path, 'r')
+        except zipfile.BadZipFile:
+            raise ArchiveError('Invalid or corrupted ZIP file')
+    if archive_type == '.rar':
+        try:
+            import rarfile
+        except ImportError:
+            raise ArchiveError('RAR format requires additional setup. Please use ZIP or 7Z format.')
+        return rarfile.RarFile(archive_path, 'r')
+    raise ArchiveError(f'Unsupported archive format: {archive_type}')
+
+
+def _open_7z(archive_path: str):
+    try:
+        import py7zr
+    except ImportError:
+        raise ArchiveError('7z support not available - py7zr package required')
+    return py7zr.SevenZipFile(archive_path, mode='r')
+
+
+def list_archive_members(archive_path: str,
+                         extensions: Set[str] = SUPPORTED_INVOICE_EXTENSIONS) -> Tuple[List[str], List[str]]:
+    """
+    Names of supported and unsupported files in an archive, read from its
+    directory without decompressing anything.
+    """
+    if _archive_type(archive_path) == '.7z':
+        with _open_7z(archive_path) as archive:
+            names = [info.filename for info in archive.list() if not info.is_directory]
+    else:
+        with _open_archive(archive_path) as archive:
+            names = [info.filename for info in archive.infolist() if not info.is_dir()]
+
+    supported = [name for name in names if os.path.splitext(name)[1].lower() in extensions]
+    unsupported = [name for name in names if os.path.splitext(name)[1].lower() not in extensions]
+    return supported, unsupported
+
+
+def _spool_path(dest_dir: str, index: int, name: str) -> str:
+    # One directory per member keeps the original file name without letting
+    # archive paths (absolute, '..') escape dest_dir or collide with each other
+    filename = re.sub(r'[^\w.\- ]', '_', os.path.basename(name.replace('\\', '/'))) or f'member_{index}'
+    member_dir = os.path.join(dest_dir, f'{index:05d}')
+    os.makedirs(member_dir, exist_ok=True)
+    return os.path.join(member_dir, filename)
+
+
+def _spool(source, target_path: str) -> str:
+    """Copy a member stream to disk, returning its SHA-256"""
+    digest = hashlib.sha256()
+    with open(target_path, 'wb') as target:
+        while True:
+            chunk = source.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            target.write(chunk)
+    return digest.hexdigest()
+
+
+def iter_archive_members(archive_path: str, dest_dir: str,
+                         extensions: Set[str] = SUPPORTED_INVOICE_EXTENSIONS) -> Iterator[ArchiveMember]:
+    """
+    Yield the supported members of an archive one at a time, each written to
+    its own file under dest_dir as it is reached. Members whose content hash
+    matches an earlier member are yielded with duplicate_of set and no path.
+
+    ZIP and RAR members are streamed straight from the archive. 7z archives
+    are usually solid (members share one compressed stream), so their
+    supported members are extracted together first and then hashed.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    seen = {}
+
+    def dedup(member: ArchiveMember) -> ArchiveMember:
+        if member.sha256 in seen:
+            os.remove(member.path)
+            os.rmdir(os.path.dirname(member.path))
+            member.path = None
+            member.duplicate_of = seen[member.sha256]
+        else:
+            seen[member.sha256] = member.name
+        return member
+
+    if _archive_type(archive_path) == '.7z':
+        supported, _ = list_archive_members(archive_path, extensions)
+        staging_dir = os.path.join(dest_dir, '.7z')
+        with _open_7z(archive_path) as archive:
+            archive.extract(path=staging_dir, targets=supported)
+        try:
+            for index, name in enumerate(supported):
+                staged_path = os.path.join(staging_dir, name)
+                if not os.path.isfile(staged_path):
+                    continue
+                path = _spool_path(dest_dir, index, name)
+                with open(staged_path, 'rb') as source:
+                    sha256 = _spool(source, path)
+                os.remove(staged_path)
+                yield dedup(ArchiveMember(index, name, os.path.getsize(path), sha256, path))
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        return
+
+    with _open_archive(archive_path) as archive:
+        for index, info in enumerate(archive.infolist()):
+            if info.is_dir() or os.path.splitext(info.filename)[1].lower() not in extensions:
+                continue
+            path = _spool_path(dest_dir, index, info.filename)
+            with archive.open(info) as source:
+                sha256 = _spool(source, path)
+            yield dedup(ArchiveMember(index, info.filename, info.file_size, sha256, path))
+
+
+def render_pdf_page(file_path: str, page_number: int = 0) -> dict:
+    """
+    Render one PDF page to PNG at 2x zoom and extract the document text.
+    Module level so it can run in a worker process.
+    """
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(file_path)
+    try:
+        if doc.page_count == 0:
+            raise ValueError('PDF has no pages')
+        page = doc.load_page(page_number)
+        image_png = page.get_pixmap(matrix=fitz.Matrix(2, 2)).pil_tobytes(format='PNG')
+        text = ''.join(doc_page.get_text() for doc_page in doc)
+    finally:
+        doc.close()
+    return {'image_png': image_png, 'text': text}
+
+
+def run_archive_pipeline(members: Iterable[ArchiveMember],
+                         process: Callable[[ArchiveMember, Optional[Any]], Any],
+                         on_result: Optional[Callable[[ArchiveMember, Any, Optional[Exception]], None]] = None,
+                         render: Optional[Callable[[str], Any]] = render_pdf_page,
+                         io_workers: int = MAX_IO_WORKERS,
+                         render_workers: int = MAX_RENDER_WORKERS) -> List[Tuple[ArchiveMember, Any, Optional[Exception]]]:
+    """
+    Process archive members as they are read.
+
+    PDF members are first passed to render(path) in a process pool, then
+    process(member, rendered) runs in a thread pool; other members go to
+    process(member, None) directly. If rendering fails the member is still
+    processed with rendered=None so the processor reports its own error.
+    Duplicates are reported without being processed.
+
+    on_result(member, result, error) runs in the calling thread as each member
+    finishes. At most io_workers + render_workers members are in flight, so
+    the archive is read only as fast as members are processed.
+    """
+    results = []
+    pending = {}
+    render_pool = None
+    render_workers = render_workers if render is not None else 0
+    max_in_flight = max(1, io_workers + render_workers)
+
+    def finish(member, result, error):
+        results.append((member, result, error))
+        if on_result:
+            on_result(member, result, error)
+
+    def submit_render(member):
+        nonlocal render_pool, render_workers
+        try:
+            if render_pool is None:
+                # spawn: worker threads (DB pools, HTTP clients) must not be forked
+                render_pool = ProcessPoolExecutor(max_workers=render_workers,
+                                                  mp_context=multiprocessing.get_context('spawn'))
+            pending[render_pool.submit(render, member.path)] = ('render', member)
+            return True
+        except Exception as e:
+            print(f"WARNING: PDF render pool unavailable, rendering in threads: {e}")
+            render_workers = 0
+            return False
+
+    def drain():
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            stage, member = pending.pop(future)
+            try:
+                value = future.result()
+            except Exception as e:
+                if stage == 'process':
+                    finish(member, None, e)
+                    continue
+                value = None
+            if stage == 'render':
+                pending[io_pool.submit(process, member, value)] = ('process', member)
+            else:
+                finish(member, value, None)
+
+    with ThreadPoolExecutor(max_workers=max(1, io_workers), thread_name_prefix='ArchiveWorker') as io_pool:
+        try:
+            for member in members:
+                if member.duplicate_of:
+                    finish(member, None, None)
+                    continue
+                if not (render_workers and member.extension == '.pdf' and submit_render(member)):
+                    pending[io_pool.submit(process, member, None)] = ('process', member)
+                while len(pending) >= max_in_flight:
+                    drain()
+            while pending:
+                drain()
+        finally:
+            if render_pool is not None:
+                render_pool.shutdown(cancel_futures=True)
+
+    return results
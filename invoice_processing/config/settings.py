@@ -33,7 +33,12 @@ EMAIL_SETTINGS = {
     'EMAIL_PASSWORD': os.getenv('INVOICE_EMAIL_PASSWORD', ''),
     'INBOX_FOLDER': os.getenv('INBOX_FOLDER', 'INBOX'),
     'PROCESSED_FOLDER': os.getenv('PROCESSED_FOLDER', 'Processed'),
-    'CHECK_INTERVAL': int(os.getenv('EMAIL_CHECK_INTERVAL', 300))  # 5 minutes
+    'CHECK_INTERVAL': int(os.getenv('EMAIL_CHECK_INTERVAL', 300)),  # 5 minutes
+    'IMAP_SSL': os.getenv('IMAP_SSL', 'true').lower() != 'false',
+    # Per-mailbox UIDVALIDITY/last-UID checkpoint, so each scan only fetches new mail
+    'CHECKPOINT_FILE': os.getenv('EMAIL_CHECKPOINT_FILE', str(BASE_DIR / 'email_monitor_checkpoint.json')),
+    'INITIAL_LOOKBACK_DAYS': int(os.getenv('EMAIL_INITIAL_LOOKBACK_DAYS', 7)),  # First scan without a checkpoint
+    'FETCH_BATCH_SIZE': 200  # UIDs per FETCH command
 }
 
 # Claude API Configuration (Separate from main system)
@@ -7,9 +7,15 @@ Monitora emails automaticamente e detecta anexos de faturas
 import imaplib
 import email
 import os
+import re
 import time
+import json
+import base64
+import quopri
+import urllib.parse
 from pathlib import Path
 from typing import List, Dict, Any, Optional
+from email.header import decode_header, make_header
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import datetime
@@ -22,6 +28,147 @@ sys.path.append(str(Path(__file__).parent.parent))
 from config.settings import EMAIL_SETTINGS, PROCESSING_CONFIG
 from integration import MainSystemIntegrator
 
+# Headers fetched for every new message (the body is only fetched for invoice attachments)
+HEADER_FIELDS = 'SUBJECT FROM DATE MESSAGE-ID'
+
+_IMAP_TOKEN = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"\[]+(?:\[[^\]]*\][^\s()"]*)?))')
+
+
+def _tokenize_imap(text: bytes) -> List[tuple]:
+    tokens = []
+    for match in _IMAP_TOKEN.finditer(text):
+        opening, closing, quoted, atom = match.groups()
+        if opening:
+            tokens.append(('(', None))
+        elif closing:
+            tokens.append((')', None))
+        elif quoted is not None:
+            tokens.append(('value', re.sub(rb'\\(.)', rb'\1', quoted).decode('utf-8', 'replace')))
+        elif atom:
+            value = atom.decode('utf-8', 'replace')
+            tokens.append(('value', None if value.upper() == 'NIL' else value))
+    return tokens
+
+
+def parse_imap_response(data: list) -> list:
+    """
+    Parse imaplib response data (bytes lines and (prefix, literal) tuples)
+    into nested lists. NIL becomes None and literals stay bytes.
+    """
+    tokens = []
+    for item in data:
+        if isinstance(item, tuple):
+            tokens.extend(_tokenize_imap(re.sub(rb'\{\d+\}$', b'', item[0])))
+            tokens.append(('value', item[1]))
+        elif isinstance(item, bytes):
+            tokens.extend(_tokenize_imap(item))
+
+    stack = [[]]
+    for kind, value in tokens:
+        if kind == '(':
+            stack.append([])
+        elif kind == ')':
+            if len(stack) > 1:
+                closed = stack.pop()
+                stack[-1].append(closed)
+        else:
+            stack[-1].append(value)
+    return stack[0]
+
+
+def parse_fetch_response(data: list) -> Dict[int, Dict[str, Any]]:
+    """Map UID -> {item name: value} for a UID FETCH response"""
+    messages = {}
+    for entry in parse_imap_response(data):
+        if not isinstance(entry, list):
+            continue  # message sequence number
+        items = {str(entry[i]).upper(): entry[i + 1] for i in range(0, len(entry) - 1, 2)}
+        if 'UID' in items:
+            messages[int(items['UID'])] = items
+    return messages
+
+
+def _params(values) -> Dict[str, str]:
+    if not isinstance(values, list):
+        return {}
+    return {str(values[i]).lower(): values[i + 1] for i in range(0, len(values) - 1, 2)}
+
+
+def _part_filename(disposition_params: Dict[str, Any], type_params: Dict[str, Any]) -> Optional[str]:
+    name = disposition_params.get('filename') or type_params.get('name')
+    if name is None:
+        # RFC 2231: charset'language'percent-encoded-value
+        encoded = disposition_params.get('filename*') or type_params.get('name*')
+        if encoded:
+            charset, _, value = str(encoded).split("'", 2) if str(encoded).count("'") >= 2 else ('utf-8', '', encoded)
+            name = urllib.parse.unquote(value, encoding=charset or 'utf-8', errors='replace')
+    if isinstance(name, bytes):
+        name = name.decode('utf-8', 'replace')
+    if name and '=?' in name:
+        name = str(make_header(decode_header(name)))
+    return name
+
+
+def bodystructure_parts(body: list, prefix: str = '', message_root: bool = True) -> List[Dict[str, Any]]:
+    """
+    Flatten a parsed BODYSTRUCTURE into its leaf parts, each with the section
+    number to fetch it by (BODY[<section>]), MIME type, encoding, encoded size,
+    disposition and file name.
+    """
+    if not isinstance(body, list) or not body:
+        return []
+
+    if isinstance(body[0], list):
+        parts = []
+        for index, child in enumerate(b for b in body if isinstance(b, list)):
+            section = f"{prefix}.{index + 1}" if prefix else str(index + 1)
+            parts.extend(bodystructure_parts(child, section, message_root=False))
+        return parts
+
+    section = (f"{prefix}.1" if prefix else '1') if message_root else prefix
+    maintype, subtype = str(body[0]).lower(), str(body[1]).lower()
+
+    # Extension fields follow the type-specific ones: MD5, then disposition
+    if maintype == 'text':
+        disposition_index = 9
+    elif (maintype, subtype) == ('message', 'rfc822'):
+        disposition_index = 11
+    else:
+        disposition_index = 8
+    disposition = body[disposition_index] if len(body) > disposition_index else None
+    disposition_type, disposition_params = None, {}
+    if isinstance(disposition, list) and disposition:
+        disposition_type = str(disposition[0]).lower()
+        disposition_params = _params(disposition[1] if len(disposition) > 1 else None)
+
+    type_params = _params(body[2])
+    parts = [{
+        'section': section,
+        'content_type': f"{maintype}/{subtype}",
+        'encoding': str(body[5] or '7bit').lower(),
+        'encoded_size': int(body[6] or 0),
+        'disposition': disposition_type,
+        'filename': _part_filename(disposition_params, type_params),
+    }]
+
+    # Attached emails: walk their parts too, like Message.walk() does
+    if (maintype, subtype) == ('message', 'rfc822') and len(body) > 8:
+        parts.extend(bodystructure_parts(body[8], section, message_root=True))
+    return parts
+
+
+def decode_part(payload, encoding: str) -> bytes:
+    """Decode a fetched body part by its Content-Transfer-Encoding"""
+    if payload is None:
+        return b''
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    if encoding == 'base64':
+        return base64.b64decode(payload)
+    if encoding == 'quoted-printable':
+        return quopri.decodestring(payload)
+    return payload
+
 class InvoiceEmailMonitor:
     """Monitor emails for invoice attachments and process automatically"""
 
@@ -37,7 +184,8 @@ class InvoiceEmailMonitor:
         """Connect to email server"""
         try:
             # Connect to IMAP server
-            mail = imaplib.IMAP4_SSL(
+            imap_class = imaplib.IMAP4_SSL if self.email_config.get('IMAP_SSL', True) else imaplib.IMAP4
+            mail = imap_class(
                 self.email_config['IMAP_SERVER'],
                 self.email_config['IMAP_PORT']
             )
@@ -56,49 +204,64 @@ class InvoiceEmailMonitor:
             raise
 
     def scan_for_invoices(self) -> List[Dict[str, Any]]:
-        """Scan inbox for emails with invoice attachments"""
+        """
+        Scan inbox for new emails with invoice attachments.
+
+        Only messages above the saved UID checkpoint are looked at, using their
+        headers and BODYSTRUCTURE; attachment parts are downloaded only for
+        messages that look like invoices. Without a checkpoint (or after the
+        mailbox's UIDVALIDITY changes) unread mail from the last
+        INITIAL_LOOKBACK_DAYS days is scanned instead.
+        """
         invoice_emails = []
 
         try:
             mail = self.connect_to_email()
 
             # Select inbox
-            mail.select(self.email_config['INBOX_FOLDER'])
-
-            # Search for emails with attachments from last 7 days
-            since_date = (datetime.datetime.now() - datetime.timedelta(days=7)).strftime("%d-%b-%Y")
-            search_criteria = f'(SINCE "{since_date}" UNSEEN)'
-
-            print(f"🔍 Searching for emails since {since_date}")
-
-            # Search emails
-            status, messages = mail.search(None, search_criteria)
+            status, select_data = mail.select(self.email_config['INBOX_FOLDER'])
+            message_count = int(select_data[0] or 0) if status == 'OK' else 0
+            uid_validity = self._response_int(mail, 'UIDVALIDITY')
+            uid_next = self._response_int(mail, 'UIDNEXT')
+
+            checkpoint = self._load_checkpoints().get(self._checkpoint_key())
+            incremental = bool(checkpoint) and checkpoint.get('uidvalidity') == uid_validity
+
+            if incremental:
+                last_uid = checkpoint['last_uid']
+                print(f"🔍 Searching for emails after UID {last_uid}")
+                status, messages = mail.uid('SEARCH', f'UID {last_uid + 1}:*')
+            else:
+                last_uid = uid_next - 1 if uid_next else self._highest_uid(mail, message_count)
+                days = self.email_config.get('INITIAL_LOOKBACK_DAYS', 7)
+                since_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime("%d-%b-%Y")
+                print(f"🔍 No checkpoint for this mailbox, searching for unread emails since {since_date}")
+                status, messages = mail.uid('SEARCH', f'(SINCE "{since_date}" UNSEEN)')
 
             if status != 'OK':
                 print("❌ Email search failed")
                 return []
 
-            email_ids = messages[0].split()
-            print(f"📨 Found {len(email_ids)} unread emails")
-
-            for email_id in email_ids:
-                try:
-                    # Fetch email
-                    status, msg_data = mail.fetch(email_id, '(RFC822)')
-                    if status != 'OK':
-                        continue
-
-                    # Parse email
-                    email_message = email.message_from_bytes(msg_data[0][1])
-                    email_info = self._analyze_email(email_message, email_id.decode())
-
-                    if email_info and self._is_invoice_email(email_info):
+            uids = sorted(int(uid) for uid in messages[0].split())
+            if incremental:
+                # "N:*" always matches the newest message, even when its UID is below N
+                uids = [uid for uid in uids if uid > last_uid]
+            print(f"📨 Found {len(uids)} new emails")
+
+            batch_size = self.email_config.get('FETCH_BATCH_SIZE', 200)
+            for start in range(0, len(uids), batch_size):
+                candidates = [
+                    email_info for email_info in self._fetch_email_summaries(mail, uids[start:start + batch_size])
+                    if self._is_invoice_email(email_info)
+                ]
+                self._fetch_attachments(mail, candidates)
+
+                for email_info in candidates:
+                    if email_info['attachment_count']:
                         invoice_emails.append(email_info)
                         print(f"📧 Invoice email detected: {email_info['subject'][:50]}...")
 
-                except Exception as e:
-                    print(f"⚠️  Error processing email {email_id}: {e}")
-                    continue
+            self._save_checkpoint(uid_validity, max([last_uid] + uids))
 
             mail.close()
             mail.logout()
@@ -110,8 +273,73 @@ class InvoiceEmailMonitor:
             print(f"❌ Email scan failed: {e}")
             return []
 
-    def _analyze_email(self, email_message, email_id: str) -> Optional[Dict[str, Any]]:
-        """Analyze email and extract metadata"""
+    @staticmethod
+    def _response_int(mail, code: str) -> Optional[int]:
+        """Integer from an untagged response code of the last command, e.g. [UIDVALIDITY 3]"""
+        _, values = mail.response(code)
+        value = values[-1] if values else None
+        return int(value) if value else None
+
+    @staticmethod
+    def _highest_uid(mail, message_count: int) -> int:
+        if not message_count:
+            return 0
+        status, data = mail.fetch('*', '(UID)')
+        uids = list(parse_fetch_response(data)) if status == 'OK' else []
+        return max(uids, default=0)
+
+    def _checkpoint_key(self) -> str:
+        return f"{self.email_config['EMAIL_ADDRESS']}@{self.email_config['IMAP_SERVER']}/{self.email_config['INBOX_FOLDER']}"
+
+    def _load_checkpoints(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.email_config['CHECKPOINT_FILE'], 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            print(f"⚠️  Ignoring unreadable email checkpoint: {e}")
+            return {}
+
+    def _save_checkpoint(self, uid_validity: Optional[int], last_uid: int):
+        """Persist the mailbox's UIDVALIDITY and highest scanned UID"""
+        checkpoints = self._load_checkpoints()
+        checkpoints[self._checkpoint_key()] = {
+            'uidvalidity': uid_validity,
+            'last_uid': last_uid,
+            'updated_at': datetime.datetime.now().isoformat()
+        }
+
+        checkpoint_file = self.email_config['CHECKPOINT_FILE']
+        temp_file = f"{checkpoint_file}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(checkpoints, f, indent=2)
+        os.replace(temp_file, checkpoint_file)
+
+    def _fetch_email_summaries(self, mail, uids: List[int]) -> List[Dict[str, Any]]:
+        """Headers and attachment descriptions (no content) for a batch of UIDs, in one FETCH"""
+        if not uids:
+            return []
+
+        status, data = mail.uid('FETCH', ','.join(str(uid) for uid in uids),
+                                f'(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])')
+        if status != 'OK':
+            print(f"⚠️  Fetching {len(uids)} email summaries failed")
+            return []
+
+        summaries = []
+        for uid, items in sorted(parse_fetch_response(data).items()):
+            headers = next((value for key, value in items.items() if key.startswith('BODY[HEADER')), b'')
+            if isinstance(headers, str):
+                headers = headers.encode('utf-8')
+            email_info = self._analyze_email(email.message_from_bytes(headers or b''),
+                                             items.get('BODYSTRUCTURE'), str(uid))
+            if email_info:
+                summaries.append(email_info)
+        return summaries
+
+    def _analyze_email(self, email_message, bodystructure, email_id: str) -> Optional[Dict[str, Any]]:
+        """Analyze email headers and structure and extract metadata"""
         try:
             # Extract basic info
             subject = email_message.get('Subject', '')
@@ -126,8 +354,8 @@ class InvoiceEmailMonitor:
             if unique_id in self.processed_emails:
                 return None
 
-            # Extract attachments
-            attachments = self._extract_attachments(email_message)
+            # Describe attachments (content is fetched later, for invoice emails only)
+            attachments = self._extract_attachments(bodystructure)
 
             email_info = {
                 'email_id': unique_id,
@@ -146,51 +374,68 @@ class InvoiceEmailMonitor:
             print(f"❌ Email analysis failed: {e}")
             return None
 
-    def _extract_attachments(self, email_message) -> List[Dict[str, Any]]:
-        """Extract attachments from email"""
+    def _extract_attachments(self, bodystructure) -> List[Dict[str, Any]]:
+        """Find supported attachments in a message's BODYSTRUCTURE"""
         attachments = []
 
         try:
-            for part in email_message.walk():
-                # Skip non-attachment parts
-                if part.get_content_maintype() == 'multipart':
-                    continue
-
+            for part in bodystructure_parts(bodystructure):
                 # Check if it's an attachment
-                content_disposition = part.get('Content-Disposition', '')
-                if 'attachment' not in content_disposition:
-                    continue
-
-                # Extract attachment info
-                filename = part.get_filename()
-                if not filename:
+                if part['disposition'] != 'attachment' or not part['filename']:
                     continue
 
                 # Check if it's a supported file type
-                file_ext = Path(filename).suffix.lower()
+                file_ext = Path(part['filename']).suffix.lower()
                 if file_ext not in PROCESSING_CONFIG['ALLOWED_EXTENSIONS']:
                     continue
 
-                # Get file content
-                file_content = part.get_payload(decode=True)
-                if not file_content:
-                    continue
-
-                attachment_info = {
-                    'filename': filename,
-                    'size': len(file_content),
-                    'content_type': part.get_content_type(),
+                attachments.append({
+                    'filename': part['filename'],
+                    'size': part['encoded_size'],
+                    'content_type': part['content_type'],
                     'extension': file_ext,
-                    'content': file_content
-                }
-
-                attachments.append(attachment_info)
+                    'section': part['section'],
+                    'encoding': part['encoding']
+                })
 
         except Exception as e:
             print(f"❌ Attachment extraction failed: {e}")
 
         return attachments
 
+    def _fetch_attachments(self, mail, invoice_emails: List[Dict[str, Any]]):
+        """
+        Download attachment content for invoice emails. Emails whose attachments
+        sit in the same body sections share one FETCH command.
+        """
+        by_sections = {}
+        for email_info in invoice_emails:
+            sections = tuple(attachment['section'] for attachment in email_info['attachments'])
+            by_sections.setdefault(sections, []).append(email_info)
+
+        for sections, emails in by_sections.items():
+            status, data = mail.uid('FETCH', ','.join(e['raw_email_id'] for e in emails),
+                                    '(' + ' '.join(f'BODY.PEEK[{section}]' for section in sections) + ')')
+            fetched = parse_fetch_response(data) if status == 'OK' else {}
+
+            for email_info in emails:
+                items = fetched.get(int(email_info['raw_email_id']), {})
+                attachments = []
+                for attachment in email_info['attachments']:
+                    try:
+                        content = decode_part(items.get(f"BODY[{attachment['section']}]"), attachment['encoding'])
+                    except Exception as e:
+                        print(f"⚠️  Could not decode {attachment['filename']}: {e}")
+                        continue
+                    if not content:
+                        continue
+                    attachment['content'] = content
+                    attachment['size'] = len(content)
+                    attachments.append(attachment)
+
+                email_info['attachments'] = attachments
+                email_info['attachment_count'] = len(attachments)
+
     def _is_invoice_email(self, email_info: Dict[str, Any]) -> bool:
         """Determine if email contains invoices"""
         # Check if has relevant attachments
@@ -22,6 +22,7 @@ import concurrent.futures
 from threading import Lock
 from PIL import Image
 import io
+from archive_pipeline import ArchiveError, iter_archive_members, run_archive_pipeline
 # Using Claude Vision only for simplicity
 OPENAI_AVAILABLE = False
 print("Sistema simplificado: apenas Claude Vision ativado.")
@@ -144,35 +145,36 @@ class AdvancedFileProcessor:
             return {'status': 'error', 'error': str(e)}
 
     def _process_archive(self, archive_path):
-        """Process archive files (ZIP/RAR) and extract contents"""
+        """Stream files out of an archive (ZIP/RAR) and process them in parallel"""
         try:
             results = []
-            extracted_files = []
+            duplicates = []
 
-            # Create temporary directory for extraction
+            def process_member(member, rendered):
+                try:
+                    if rendered is not None:
+                        # PDF page already rendered in a worker process
+                        image_base64 = base64.b64encode(rendered['image_png']).decode('utf-8')
+                        return self._call_claude_vision(image_base64, member.path, rendered['text'])
+                    return self._process_single_file(member.path)
+                finally:
+                    os.remove(member.path)
+
+            # Members are spooled one at a time; the directory only holds files in flight
             with tempfile.TemporaryDirectory() as temp_dir:
-                temp_path = Path(temp_dir)
-
-                # Extract archive
-                if archive_path.lower().endswith('.zip'):
-                    extracted_files = self._extract_zip(archive_path, temp_path)
-                elif archive_path.lower().endswith('.rar'):
-                    extracted_files = self._extract_rar(archive_path, temp_path)
-
-                if not extracted_files:
-                    return {'status': 'error', 'error': 'No supported files found in archive'}
-
-                # Process each extracted file
-                for file_path in extracted_files:
-                    try:
-                        file_result = self._process_single_file(file_path)
-                        if file_result.get('status') == 'success':
-                            file_result['archive_source'] = os.path.basename(archive_path)
-                            file_result['original_filename'] = file_path.name
-                            results.append(file_result)
-                    except Exception as e:
-                        print(f"Error processing {file_path.name}: {e}")
-                        continue
+                members = iter_archive_members(archive_path, temp_dir, self.processable_types)
+                for member, file_result, error in run_archive_pipeline(members, process_member):
+                    if member.duplicate_of:
+                        duplicates.append(member.name)
+                    elif error is not None:
+                        print(f"Error processing {member.filename}: {error}")
+                    elif file_result.get('status') == 'success':
+                        file_result['archive_source'] = os.path.basename(archive_path)
+                        file_result['original_filename'] = member.filename
+                        results.append(file_result)
+
+            if duplicates:
+                print(f"Skipped {len(duplicates)} duplicate files in {os.path.basename(archive_path)}")
 
             if not results:
                 return {'status': 'error', 'error': 'No files could be processed from archive'}
@@ -182,53 +184,16 @@ class AdvancedFileProcessor:
                 'status': 'success',
                 'archive_processed': True,
                 'total_files': len(results),
+                'duplicates_skipped': len(duplicates),
                 'results': results,
                 'source_file': os.path.basename(archive_path)
             }
 
+        except ArchiveError as e:
+            return {'status': 'error', 'error': str(e)}
         except Exception as e:
             return {'status': 'error', 'error': f'Archive processing failed: {str(e)}'}
 
-    def _extract_zip(self, zip_path, extract_dir):
-        """Extract ZIP file and return list of processable files"""
-        extracted_files = []
-        try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-
-                for file_info in zip_ref.filelist:
-                    if not file_info.is_dir():
-                        file_path = extract_dir / file_info.filename
-                        if file_path.exists() and file_path.suffix.lower() in self.processable_types:
-                            extracted_files.append(file_path)
-
-        except Exception as e:
-            print(f"ZIP extraction error: {e}")
-
-        return extracted_files
-
-    def _extract_rar(self, rar_path, extract_dir):
-        """Extract RAR file and return list of processable files"""
-        extracted_files = []
-        try:
-            # Try to use rarfile if available
-            import rarfile
-            with rarfile.RarFile(rar_path, 'r') as rar_ref:
-                rar_ref.extractall(extract_dir)
-
-                for file_info in rar_ref.infolist():
-                    if not file_info.is_dir():
-                        file_path = extract_dir / file_info.filename
-                        if file_path.exists() and file_path.suffix.lower() in self.processable_types:
-                            extracted_files.append(file_path)
-
-        except ImportError:
-            return []  # RAR support not available
-        except Exception as e:
-            print(f"RAR extraction error: {e}")
-
-        return extracted_files
-
     def _process_single_file(self, file_path):
         """Process a single file (used internally for archive contents)"""
         file_ext = Path(file_path).suffix.lower()
@@ -18,8 +18,187 @@ import json
 import shutil
 import argparse
 import re
+import threading
 import anthropic
 
+from tenant_knowledge_cache import tenant_knowledge_cache, TenantKnowledge, WORD_PATTERN_ORDER
+
+# Working directories already checked for duplicate master files and temp scripts
+_prepared_workspaces = set()
+_prepared_workspaces_lock = threading.Lock()
+
+
+def _load_tenant_knowledge(tenant_id: str, version: int) -> TenantKnowledge:
+    """Read a tenant's classification knowledge from the database into a cache snapshot"""
+    # Initialize pattern dictionaries
+    patterns = {
+        'revenue': {},
+        'transfer': {},
+        'technology': {},
+        'paraguay': {},
+        'brazil': {},
+        'crypto': {},
+        'personal': {},
+        'fees': {},
+        'expense': {},  # General expenses
+        'regional': {},  # Regional patterns
+        'card_mapping': {}  # Card to entity mappings
+    }
+
+    account_mapping = {}
+    wallets = {}
+    business_entities = []  # List of tenant's business entity names
+    workforce_members = {}  # Employee/contractor names from workforce table
+
+    import psycopg2
+
+    # Get database credentials from environment
+    db_host = os.environ.get('DB_HOST', '34.39.143.82')
+    db_port = os.environ.get('DB_PORT', '5432')
+    db_name = os.environ.get('DB_NAME', 'delta_cfo')
+    db_user = os.environ.get('DB_USER', 'delta_user')
+    db_password = os.environ.get('DB_PASSWORD', 'nWr0Y8bU51ypLjMIfx8bTe+V/1iOV59r90T8wJEsSGo=')
+
+    # Connect to PostgreSQL
+    conn = psycopg2.connect(
+        host=db_host,
+        port=db_port,
+        database=db_name,
+        user=db_user,
+        password=db_password
+    )
+    cursor = conn.cursor()
+
+    # Load all patterns for Delta tenant
+    cursor.execute("""
+        SELECT pattern_type, description_pattern, entity, accounting_category,
+               accounting_subcategory, confidence_score, currency
+        FROM classification_patterns
+        WHERE tenant_id = %s AND is_active = TRUE
+        ORDER BY confidence_score DESC
+    """, (tenant_id,))
+
+    patterns_loaded = 0
+    for pattern_type, description_pattern, entity, accounting_category, accounting_subcategory, confidence_score, currency in cursor.fetchall():
+        pattern_key = pattern_type if pattern_type in patterns else 'expense'
+
+        # Handle account/card mappings specially
+        if pattern_type in ['card_mapping', 'account_number']:
+            account_mapping[description_pattern] = entity
+        else:
+            # Convert SQL LIKE pattern (%KEYWORD%) to Python string (KEYWORD)
+            # Remove leading and trailing % wildcards for Python "in" matching
+            python_pattern = description_pattern.strip('%').upper()
+
+            # For regional patterns with currency field, use currency code as the pattern key
+            # This allows currency-based matching (e.g., "BTC" → "Infinity Validator")
+            if pattern_type == 'regional' and currency:
+                python_pattern = currency.upper()
+
+            # Skip empty patterns (can cause false matches)
+            if not python_pattern:
+                continue
+
+            # Store pattern in appropriate category
+            # Use accounting_category as fallback when entity is NULL (for expense patterns)
+            patterns[pattern_key][python_pattern] = {
+                'entity': entity or accounting_category or 'Unclassified',
+                'confidence': float(confidence_score) if confidence_score else 0.5,
+                'category': accounting_category or 'General',
+                'subcategory': accounting_subcategory or ''
+            }
+        patterns_loaded += 1
+
+    # Load wallet addresses for the tenant (includes accounting classification fields)
+    cursor.execute("""
+        SELECT wallet_address, entity_name, purpose, wallet_type, confidence_score,
+               accounting_category, accounting_subcategory, justification
+        FROM wallet_addresses
+        WHERE tenant_id = %s AND is_active = TRUE
+        ORDER BY created_at DESC
+    """, (tenant_id,))
+
+    for row in cursor.fetchall():
+        wallet_address, entity_name, purpose, wallet_type, confidence_score, \
+            acct_category, acct_subcategory, justification = row
+        # Store wallet with lowercase address for case-insensitive matching
+        wallets[wallet_address.lower()] = {
+            'entity': entity_name,
+            'purpose': purpose or '',
+            'type': wallet_type or 'unknown',
+            'confidence': float(confidence_score) if confidence_score else 0.9,
+            'accounting_category': acct_category,
+            'accounting_subcategory': acct_subcategory,
+            'justification': justification
+        }
+
+    # Load business entities for the tenant
+    cursor.execute("""
+        SELECT name
+        FROM business_entities
+        WHERE tenant_id = %s
+        ORDER BY name
+    """, (tenant_id,))
+
+    for (entity_name,) in cursor.fetchall():
+        business_entities.append(entity_name)
+
+    # Load workforce members for automatic employee recognition
+    # Note: Entity assignment will be determined by transaction context (bank account, etc.)
+    cursor.execute("""
+        SELECT full_name, employment_type, department
+        FROM workforce_members
+        WHERE tenant_id = %s AND status = 'active'
+        ORDER BY full_name
+    """, (tenant_id,))
+
+    for full_name, employment_type, department in cursor.fetchall():
+        # Store both full name and individual name parts for flexible matching
+        name_upper = full_name.upper()
+
+        # Try to infer entity from department name or use first business entity as default
+        # Future: Add entity_id FK to workforce_members table for explicit association
+        inferred_entity = department if department and department in business_entities else (
+            business_entities[0] if business_entities else 'Unknown'
+        )
+
+        workforce_members[name_upper] = {
+            'full_name': full_name,
+            'type': employment_type,
+            'entity': inferred_entity
+        }
+
+        # Also store individual name parts (first name, last name) for partial matching
+        # e.g., "JOAO SILVA" → can match "JOAO" or "SILVA" in descriptions
+        name_parts = name_upper.split()
+        for part in name_parts:
+            if len(part) > 2:  # Only store name parts longer than 2 chars to avoid false matches
+                if part not in workforce_members:
+                    workforce_members[part] = {
+                        'full_name': full_name,
+                        'type': employment_type,
+                        'entity': inferred_entity
+                    }
+
+    cursor.close()
+    conn.close()
+
+    print(f" Loaded business knowledge: {len(account_mapping)} accounts, {patterns_loaded} patterns, {len(wallets)} wallets, {len(business_entities)} entities, {len(workforce_members)} workforce")
+    print(f"    Pattern breakdown: revenue={len(patterns['revenue'])}, expense={len(patterns['expense'])}, crypto={len(patterns['crypto'])}, regional={len(patterns['regional'])}")
+    print(f"    Business entities: {', '.join(business_entities)}")
+
+    return TenantKnowledge(
+        tenant_id=tenant_id,
+        version=version,
+        patterns=patterns,
+        account_mapping=account_mapping,
+        wallets=wallets,
+        business_entities=business_entities,
+        workforce_members=workforce_members,
+        patterns_loaded=patterns_loaded
+    )
+
+
 class DeltaCFOAgent:
     def __init__(self, tenant_id: str):
         """
@@ -42,188 +221,52 @@ class DeltaCFOAgent:
         self.master_file = 'MASTER_TRANSACTIONS.csv'  # SINGLE SOURCE OF TRUTH - NEVER CREATE DUPLICATES
         self.classified_dir = 'classified_transactions'
 
-        # Create output directory if it doesn't exist
-        os.makedirs(self.classified_dir, exist_ok=True)
-
-        # ENFORCE SINGLE MASTER FILE RULE - Remove any duplicate master files
-        self.enforce_single_master_file()
-
-        # AUTO-CLEANUP TEMPORARY PYTHON FILES
-        self.cleanup_temporary_files()
+        # Output directory, duplicate master files and temp scripts (once per working directory)
+        self.prepare_workspace()
 
-        # Load business knowledge into memory
+        # Load business knowledge into memory (shared snapshot, cached per tenant)
         self.load_business_knowledge()
 
-        # Load existing master file if it exists
-        self.master_df = self.load_master_transactions()
-
-    def load_business_knowledge(self):
-        """Load classification rules from classification_patterns database (SaaS architecture)"""
-        # Initialize pattern dictionaries
-        self.patterns = {
-            'revenue': {},
-            'transfer': {},
-            'technology': {},
-            'paraguay': {},
-            'brazil': {},
-            'crypto': {},
-            'personal': {},
-            'fees': {},
-            'expense': {},  # General expenses
-            'regional': {},  # Regional patterns
-            'card_mapping': {}  # Card to entity mappings
-        }
-
-        self.account_mapping = {}
-        self.employees = {}
-        self.wallets = {}
-        self.business_entities = []  # List of tenant's business entity names
-        self.workforce_members = {}  # Employee/contractor names from workforce table
-
-        # Try to load from database first (SaaS architecture)
-        try:
-            import psycopg2
-            import os as os_module
-
-            # Get database credentials from environment
-            db_host = os_module.environ.get('DB_HOST', '34.39.143.82')
-            db_port = os_module.environ.get('DB_PORT', '5432')
-            db_name = os_module.environ.get('DB_NAME', 'delta_cfo')
-            db_user = os_module.environ.get('DB_USER', 'delta_user')
-            db_password = os_module.environ.get('DB_PASSWORD', 'nWr0Y8bU51ypLjMIfx8bTe+V/1iOV59r90T8wJEsSGo=')
-
-            # Use tenant_id from constructor
-            tenant_id = self.tenant_id
-
-            # Connect to PostgreSQL
-            conn = psycopg2.connect(
-                host=db_host,
-                port=db_port,
-                database=db_name,
-                user=db_user,
-                password=db_password
-            )
-            cursor = conn.cursor()
-
-            # Load all patterns for Delta tenant
-            cursor.execute("""
-                SELECT pattern_type, description_pattern, entity, accounting_category,
-                       accounting_subcategory, confidence_score, currency
-                FROM classification_patterns
-                WHERE tenant_id = %s AND is_active = TRUE
-                ORDER BY confidence_score DESC
-            """, (tenant_id,))
-
-            patterns_loaded = 0
-            for pattern_type, description_pattern, entity, accounting_category, accounting_subcategory, confidence_score, currency in cursor.fetchall():
-                pattern_key = pattern_type if pattern_type in self.patterns else 'expense'
-
-                # Handle account/card mappings specially
-                if pattern_type in ['card_mapping', 'account_number']:
-                    self.account_mapping[description_pattern] = entity
-                else:
-                    # Convert SQL LIKE pattern (%KEYWORD%) to Python string (KEYWORD)
-                    # Remove leading and trailing % wildcards for Python "in" matching
-                    python_pattern = description_pattern.strip('%').upper()
-
-                    # For regional patterns with currency field, use currency code as the pattern key
-                    # This allows currency-based matching (e.g., "BTC" → "Infinity Validator")
-                    if pattern_type == 'regional' and currency:
-                        python_pattern = currency.upper()
+        # Existing master file is read on first use of self.master_df
+        self._master_df = None
 
-                    # Skip empty patterns (can cause false matches)
-                    if not python_pattern:
-                        continue
-
-                    # Store pattern in appropriate category
-                    # Use accounting_category as fallback when entity is NULL (for expense patterns)
-                    self.patterns[pattern_key][python_pattern] = {
-                        'entity': entity or accounting_category or 'Unclassified',
-                        'confidence': float(confidence_score) if confidence_score else 0.5,
-                        'category': accounting_category or 'General',
-                        'subcategory': accounting_subcategory or ''
-                    }
-                patterns_loaded += 1
+    @property
+    def master_df(self):
+        """Existing master transactions, loaded from disk on first access"""
+        if self._master_df is None:
+            self._master_df = self.load_master_transactions()
+        return self._master_df
 
-            # Load wallet addresses for the tenant (includes accounting classification fields)
-            cursor.execute("""
-                SELECT wallet_address, entity_name, purpose, wallet_type, confidence_score,
-                       accounting_category, accounting_subcategory, justification
-                FROM wallet_addresses
-                WHERE tenant_id = %s AND is_active = TRUE
-                ORDER BY created_at DESC
-            """, (tenant_id,))
-
-            for row in cursor.fetchall():
-                wallet_address, entity_name, purpose, wallet_type, confidence_score, \
-                    acct_category, acct_subcategory, justification = row
-                # Store wallet with lowercase address for case-insensitive matching
-                self.wallets[wallet_address.lower()] = {
-                    'entity': entity_name,
-                    'purpose': purpose or '',
-                    'type': wallet_type or 'unknown',
-                    'confidence': float(confidence_score) if confidence_score else 0.9,
-                    'accounting_category': acct_category,
-                    'accounting_subcategory': acct_subcategory,
-                    'justification': justification
-                }
+    @master_df.setter
+    def master_df(self, value):
+        self._master_df = value
 
-            # Load business entities for the tenant
-            cursor.execute("""
-                SELECT name
-                FROM business_entities
-                WHERE tenant_id = %s
-                ORDER BY name
-            """, (tenant_id,))
+    def prepare_workspace(self):
+        """Create the output directory and run the master/temp file cleanups once per process and directory"""
+        workspace = os.getcwd()
+        with _prepared_workspaces_lock:
+            if workspace in _prepared_workspaces:
+                return
+            _prepared_workspaces.add(workspace)
 
-            for (entity_name,) in cursor.fetchall():
-                self.business_entities.append(entity_name)
-
-            # Load workforce members for automatic employee recognition
-            # Note: Entity assignment will be determined by transaction context (bank account, etc.)
-            cursor.execute("""
-                SELECT full_name, employment_type, department
-                FROM workforce_members
-                WHERE tenant_id = %s AND status = 'active'
-                ORDER BY full_name
-            """, (tenant_id,))
-
-            for full_name, employment_type, department in cursor.fetchall():
-                # Store both full name and individual name parts for flexible matching
-                name_upper = full_name.upper()
-
-                # Try to infer entity from department name or use first business entity as default
-                # Future: Add entity_id FK to workforce_members table for explicit association
-                inferred_entity = department if department and department in self.business_entities else (
-                    self.business_entities[0] if self.business_entities else 'Unknown'
-                )
-
-                self.workforce_members[name_upper] = {
-                    'full_name': full_name,
-                    'type': employment_type,
-                    'entity': inferred_entity
-                }
+        # Create output directory if it doesn't exist
+        os.makedirs(self.classified_dir, exist_ok=True)
 
-                # Also store individual name parts (first name, last name) for partial matching
-                # e.g., "JOAO SILVA" → can match "JOAO" or "SILVA" in descriptions
-                name_parts = name_upper.split()
-                for part in name_parts:
-                    if len(part) > 2:  # Only store name parts longer than 2 chars to avoid false matches
-                        if part not in self.workforce_members:
-                            self.workforce_members[part] = {
-                                'full_name': full_name,
-                                'type': employment_type,
-                                'entity': inferred_entity
-                            }
+        # ENFORCE SINGLE MASTER FILE RULE - Remove any duplicate master files
+        self.enforce_single_master_file()
 
-            cursor.close()
-            conn.close()
+        # AUTO-CLEANUP TEMPORARY PYTHON FILES
+        self.cleanup_temporary_files()
 
-            print(f" Loaded business knowledge: {len(self.account_mapping)} accounts, {patterns_loaded} patterns, {len(self.wallets)} wallets, {len(self.business_entities)} entities, {len(self.workforce_members)} workforce")
-            print(f"    Pattern breakdown: revenue={len(self.patterns['revenue'])}, expense={len(self.patterns['expense'])}, crypto={len(self.patterns['crypto'])}, regional={len(self.patterns['regional'])}")
-            print(f"    Business entities: {', '.join(self.business_entities)}")
-            return
+    def load_business_knowledge(self, refresh=False):
+        """
+        Load classification rules from classification_patterns database (SaaS architecture).
 
+        The tenant's knowledge is a process-wide snapshot shared by every agent
+        (see tenant_knowledge_cache); refresh=True reloads it from the database.
+        """
+        try:
+            knowledge = tenant_knowledge_cache.get(self.tenant_id, _load_tenant_knowledge, refresh=refresh)
         except Exception as e:
             # NO FALLBACK - Multi-tenant SaaS requires database connectivity
             # Falling back to a shared file would leak Delta's business patterns to all tenants
@@ -239,6 +282,14 @@ class DeltaCFOAgent:
                 f"All classification patterns must be tenant-specific in the database."
             )
 
+        self.knowledge = knowledge
+        self.patterns = knowledge.patterns
+        self.account_mapping = knowledge.account_mapping
+        self.employees = {}
+        self.wallets = knowledge.wallets
+        self.business_entities = knowledge.business_entities  # List of tenant's business entity names
+        self.workforce_members = knowledge.workforce_members  # Employee/contractor names from workforce table
+
     def enforce_single_master_file(self):
         """Enforce single master file rule - remove any duplicates"""
 
@@ -1772,69 +1823,68 @@ CRITICAL RULES:
 
         # Check workforce members (employees/contractors) with word boundary matching
         # This automatically recognizes any employee added to the workforce system
-        for name_key, member_info in self.workforce_members.items():
-            if re.search(r'\b' + re.escape(name_key) + r'\b', description_upper):
-                entity = member_info['entity']
-                full_name = member_info['full_name']
-                emp_type = member_info['type']
-                reason = f"Workforce: {full_name} ({emp_type})"
-
-                # Determine category based on employment type
-                if amount_float < 0:  # Outgoing payment
-                    if emp_type == 'employee':
-                        acct_cat, subcat = 'OPERATING_EXPENSE', 'Payroll & Benefits'
-                    else:  # contractor
-                        acct_cat, subcat = 'OPERATING_EXPENSE', 'Professional Services'
-                else:
-                    acct_cat, subcat = self._determine_accounting_category(entity, description, amount)
+        workforce_match = self.knowledge.workforce_matcher.first_match(description_upper)
+        if workforce_match:
+            name_key, member_info = workforce_match
+            entity = member_info['entity']
+            full_name = member_info['full_name']
+            emp_type = member_info['type']
+            reason = f"Workforce: {full_name} ({emp_type})"
+
+            # Determine category based on employment type
+            if amount_float < 0:  # Outgoing payment
+                if emp_type == 'employee':
+                    acct_cat, subcat = 'OPERATING_EXPENSE', 'Payroll & Benefits'
+                else:  # contractor
+                    acct_cat, subcat = 'OPERATING_EXPENSE', 'Professional Services'
+            else:
+                acct_cat, subcat = self._determine_accounting_category(entity, description, amount)
 
-                return entity, 0.95, reason, acct_cat, subcat
+            return entity, 0.95, reason, acct_cat, subcat
 
         # Check all patterns in priority order (with word boundary matching)
-        pattern_order = ['revenue', 'transfer', 'technology', 'paraguay', 'brazil', 'fees', 'crypto', 'personal', 'expense', 'regional']
-
-        for pattern_type in pattern_order:
-            for pattern, rule in self.patterns.get(pattern_type, {}).items():
-                # Special handling for regional patterns - check currency field
-                if pattern_type == 'regional':
-                    # Check if pattern matches currency (e.g., BRL, USD, EUR)
-                    if currency and pattern.upper() in currency.upper():
-                        entity = rule['entity']
-                        confidence = rule['confidence']
-                        reason = f"Currency match: {currency} -> {entity}"
-                        # Use pattern's category if specified, otherwise fallback
-                        if rule.get('category') and rule['category'] != 'General':
-                            acct_cat = rule['category']
-                            subcat = rule.get('subcategory', '')
-                        else:
-                            acct_cat, subcat = self._determine_accounting_category(entity, description, amount, currency)
-                        return entity, confidence, reason, acct_cat, subcat
-                    # Also check description for country/region names
-                    if pattern.upper() in description_upper:
-                        entity = rule['entity']
-                        confidence = rule['confidence']
-                        reason = f"Regional match: {pattern}"
-                        # Use pattern's category if specified, otherwise fallback
-                        if rule.get('category') and rule['category'] != 'General':
-                            acct_cat = rule['category']
-                            subcat = rule.get('subcategory', '')
-                        else:
-                            acct_cat, subcat = self._determine_accounting_category(entity, description, amount, currency)
-                        return entity, confidence, reason, acct_cat, subcat
+        # e.g., "ALDO" won't match "ALAINE" or "VAL"; matchers are compiled once per knowledge snapshot
+        for pattern_type in WORD_PATTERN_ORDER:
+            pattern_match = self.knowledge.pattern_matchers[pattern_type].first_match(description_upper)
+            if pattern_match:
+                pattern, rule = pattern_match
+                entity = rule['entity']
+                confidence = rule['confidence']
+                reason = f"{pattern_type}: {pattern}"
+                # Use pattern's category if specified, otherwise fallback
+                if rule.get('category') and rule['category'] != 'General':
+                    acct_cat = rule['category']
+                    subcat = rule.get('subcategory', '')
                 else:
-                    # Use word boundary matching for other pattern types to avoid false positives
-                    # e.g., "ALDO" won't match "ALAINE" or "VAL"
-                    if re.search(r'\b' + re.escape(pattern) + r'\b', description_upper):
-                        entity = rule['entity']
-                        confidence = rule['confidence']
-                        reason = f"{pattern_type}: {pattern}"
-                        # Use pattern's category if specified, otherwise fallback
-                        if rule.get('category') and rule['category'] != 'General':
-                            acct_cat = rule['category']
-                            subcat = rule.get('subcategory', '')
-                        else:
-                            acct_cat, subcat = self._determine_accounting_category(entity, description, amount, currency)
-                        return entity, confidence, reason, acct_cat, subcat
+                    acct_cat, subcat = self._determine_accounting_category(entity, description, amount, currency)
+                return entity, confidence, reason, acct_cat, subcat
+
+        # Regional patterns last - check currency field, then description
+        for pattern, rule in self.patterns.get('regional', {}).items():
+            # Check if pattern matches currency (e.g., BRL, USD, EUR)
+            if currency and pattern.upper() in currency.upper():
+                entity = rule['entity']
+                confidence = rule['confidence']
+                reason = f"Currency match: {currency} -> {entity}"
+                # Use pattern's category if specified, otherwise fallback
+                if rule.get('category') and rule['category'] != 'General':
+                    acct_cat = rule['category']
+                    subcat = rule.get('subcategory', '')
+                else:
+                    acct_cat, subcat = self._determine_accounting_category(entity, description, amount, currency)
+                return entity, confidence, reason, acct_cat, subcat
+            # Also check description for country/region names
+            if pattern.upper() in description_upper:
+                entity = rule['entity']
+                confidence = rule['confidence']
+                reason = f"Regional match: {pattern}"
+                # Use pattern's category if specified, otherwise fallback
+                if rule.get('category') and rule['category'] != 'General':
+                    acct_cat = rule['category']
+                    subcat = rule.get('subcategory', '')
+                else:
+                    acct_cat, subcat = self._determine_accounting_category(entity, description, amount, currency)
+                return entity, confidence, reason, acct_cat, subcat
 
         # All pattern matching is now handled by database patterns above
         # No hardcoded patterns remain - system is fully SaaS-ready
@@ -2300,6 +2350,7 @@ CRITICAL RULES:
             print(" Enhanced processing completed")
 
         # Save classified file
+        os.makedirs(self.classified_dir, exist_ok=True)
         output_file = os.path.join(self.classified_dir, f"classified_{os.path.splitext(os.path.basename(file_path))[0]}.csv")
 
         # Clean up NaN values before saving to prevent "nan" strings in database
@@ -0,0 +1,48 @@
+-- Migration: Add background jobs tables
+-- Purpose: Create the background_jobs/job_items tables used for async file
+--          processing and widen currency columns, previously done on every
+--          job creation by ensure_background_jobs_tables() in app_db.py
+-- Date: 2026-10-18
+-- Database: PostgreSQL
+
+-- Currency codes for tokens and wrapped assets exceed VARCHAR(10)
+ALTER TABLE transactions ALTER COLUMN currency TYPE VARCHAR(50);
+ALTER TABLE invoices ALTER COLUMN currency TYPE VARCHAR(50);
+
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id TEXT PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    total_items INTEGER NOT NULL DEFAULT 0,
+    processed_items INTEGER NOT NULL DEFAULT 0,
+    successful_items INTEGER NOT NULL DEFAULT 0,
+    failed_items INTEGER NOT NULL DEFAULT 0,
+    progress_percentage REAL NOT NULL DEFAULT 0.0,
+    started_at TEXT,
+    completed_at TEXT,
+    created_at TEXT NOT NULL,
+    created_by TEXT DEFAULT 'system',
+    source_file TEXT,
+    error_message TEXT,
+    metadata TEXT,
+    tenant_id TEXT
+);
+
+-- Jobs and their job_items results are only visible to the owning tenant
+ALTER TABLE background_jobs ADD COLUMN IF NOT EXISTS tenant_id TEXT;
+CREATE INDEX IF NOT EXISTS idx_background_jobs_tenant_created
+    ON background_jobs(tenant_id, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS job_items (
+    id SERIAL PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    item_name TEXT NOT NULL,
+    item_path TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    processed_at TEXT,
+    error_message TEXT,
+    result_data TEXT,
+    processing_time_seconds REAL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (job_id) REFERENCES background_jobs(id)
+);
@@ -0,0 +1,17 @@
+-- Migration: Add close reconciliation stats
+-- Purpose: Persist the period stats computed by month-end auto-check runs so the
+--          reconciliation dashboard reads them instead of recomputing
+-- Date: 2026-10-18
+-- Database: PostgreSQL
+
+CREATE TABLE IF NOT EXISTS close_reconciliation_stats (
+    period_id UUID NOT NULL REFERENCES cfo_accounting_periods(id) ON DELETE CASCADE,
+    stat_name VARCHAR(50) NOT NULL,  -- invoices, payslips, transactions, statement_coverage
+    tenant_id VARCHAR(100) NOT NULL,
+    stats JSONB NOT NULL,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (period_id, stat_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_close_reconciliation_stats_tenant
+    ON close_reconciliation_stats (tenant_id, period_id);
@@ -0,0 +1,14 @@
+-- Migration: Add invoice amount indexes
+-- Purpose: Support amount-band candidate lookups in ReceiptInvoiceMatcher
+--          (native total and USD equivalent) for payment proof matching
+-- Date: 2026-10-18
+-- Database: PostgreSQL
+
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS usd_equivalent_amount DECIMAL(15, 2);
+
+CREATE INDEX IF NOT EXISTS idx_invoices_tenant_total_amount
+    ON invoices (tenant_id, total_amount);
+
+CREATE INDEX IF NOT EXISTS idx_invoices_tenant_usd_amount
+    ON invoices (tenant_id, usd_equivalent_amount)
+    WHERE usd_equivalent_amount IS NOT NULL;
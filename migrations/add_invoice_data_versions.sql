@@ -0,0 +1,50 @@
+-- Migration: Add invoice data versions
+-- Purpose: Database-side counter of writes to each tenant's invoices. The
+--          invoice candidate index used by payment-proof matching keys on it,
+--          so an invoice created, paid or edited by any worker, job or script
+--          retires every process's cached index
+--          (web_ui/services/receipt_invoice_matcher.py)
+-- Date: 2026-10-19
+-- Database: PostgreSQL
+
+CREATE TABLE IF NOT EXISTS invoice_data_versions (
+    tenant_id VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Statement-level: one bump per tenant per statement, however many rows it touched
+CREATE OR REPLACE FUNCTION bump_invoice_data_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO invoice_data_versions (tenant_id, version, updated_at)
+    SELECT DISTINCT tenant_id, 1, CURRENT_TIMESTAMP
+    FROM changed_rows
+    WHERE tenant_id IS NOT NULL
+    ON CONFLICT (tenant_id) DO UPDATE
+        SET version = invoice_data_versions.version + 1,
+            updated_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS invoices_data_version_insert ON invoices;
+CREATE TRIGGER invoices_data_version_insert
+    AFTER INSERT ON invoices
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_invoice_data_version();
+
+DROP TRIGGER IF EXISTS invoices_data_version_update ON invoices;
+CREATE TRIGGER invoices_data_version_update
+    AFTER UPDATE ON invoices
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_invoice_data_version();
+
+DROP TRIGGER IF EXISTS invoices_data_version_delete ON invoices;
+CREATE TRIGGER invoices_data_version_delete
+    AFTER DELETE ON invoices
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_invoice_data_version();
@@ -0,0 +1,44 @@
+-- Migration: Add query statistics tables
+-- Purpose: Store aggregated windows flushed by database.QueryMonitor so the
+--          super-admin performance routes can report per-endpoint query
+--          counts, database time, N+1 patterns and the heaviest statements
+-- Date: 2026-10-18
+-- Database: PostgreSQL
+
+-- One row per (flush window, normalized statement)
+CREATE TABLE IF NOT EXISTS db_query_fingerprint_stats (
+    id BIGSERIAL PRIMARY KEY,
+    window_start TIMESTAMP NOT NULL,
+    window_end TIMESTAMP NOT NULL,
+    fingerprint_hash VARCHAR(16) NOT NULL,
+    fingerprint TEXT NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    total_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+    max_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+    total_rows BIGINT NOT NULL DEFAULT 0,
+    slow_calls INTEGER NOT NULL DEFAULT 0,
+    params_shape TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_db_query_fingerprint_stats_window
+    ON db_query_fingerprint_stats (window_end, fingerprint_hash);
+
+-- One row per (flush window, request route or background job)
+CREATE TABLE IF NOT EXISTS db_endpoint_query_stats (
+    id BIGSERIAL PRIMARY KEY,
+    window_start TIMESTAMP NOT NULL,
+    window_end TIMESTAMP NOT NULL,
+    scope_kind VARCHAR(20) NOT NULL,            -- 'request' or 'job'
+    scope_name VARCHAR(255) NOT NULL,           -- e.g. 'GET /api/transactions' or job name
+    request_count INTEGER NOT NULL DEFAULT 0,
+    error_count INTEGER NOT NULL DEFAULT 0,
+    query_count INTEGER NOT NULL DEFAULT 0,
+    db_time_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+    wall_time_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+    max_queries INTEGER NOT NULL DEFAULT 0,
+    n_plus_one_count INTEGER NOT NULL DEFAULT 0,
+    n_plus_one_fingerprint TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_db_endpoint_query_stats_window
+    ON db_endpoint_query_stats (window_end, scope_name);
@@ -0,0 +1,50 @@
+-- Migration: Add tenant data versions
+-- Purpose: Database-side counter of writes to each tenant's transactions.
+--          Caches derived from transactions (KPIs, Sankey, ledger/forecast,
+--          rendered PDFs, chatbot context) key on it, so a write made by any
+--          worker, job or script retires every process's cached copies
+--          (web_ui/services/tenant_data_version.py)
+-- Date: 2026-10-19
+-- Database: PostgreSQL
+
+CREATE TABLE IF NOT EXISTS tenant_data_versions (
+    tenant_id VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Statement-level: one bump per tenant per statement, however many rows it touched
+CREATE OR REPLACE FUNCTION bump_tenant_data_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO tenant_data_versions (tenant_id, version, updated_at)
+    SELECT DISTINCT tenant_id, 1, CURRENT_TIMESTAMP
+    FROM changed_rows
+    WHERE tenant_id IS NOT NULL
+    ON CONFLICT (tenant_id) DO UPDATE
+        SET version = tenant_data_versions.version + 1,
+            updated_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS transactions_data_version_insert ON transactions;
+CREATE TRIGGER transactions_data_version_insert
+    AFTER INSERT ON transactions
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_tenant_data_version();
+
+DROP TRIGGER IF EXISTS transactions_data_version_update ON transactions;
+CREATE TRIGGER transactions_data_version_update
+    AFTER UPDATE ON transactions
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_tenant_data_version();
+
+DROP TRIGGER IF EXISTS transactions_data_version_delete ON transactions;
+CREATE TRIGGER transactions_data_version_delete
+    AFTER DELETE ON transactions
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_tenant_data_version();
@@ -0,0 +1,34 @@
+-- Migration: Add transaction_chains tables
+-- Purpose: Persist chains detected by ChainDetectionEngine so the chains API
+--          serves precomputed results instead of running detectors per request
+-- Date: 2026-10-18
+-- Database: PostgreSQL
+
+-- One row per (transaction, detected chain)
+CREATE TABLE IF NOT EXISTS transaction_chains (
+    id SERIAL PRIMARY KEY,
+    tenant_id VARCHAR(100) NOT NULL,
+    transaction_id TEXT NOT NULL,
+    chain_type VARCHAR(50) NOT NULL,
+    confidence DECIMAL(4, 3) NOT NULL,
+    related_count INTEGER DEFAULT 0,
+    chain_data JSONB NOT NULL,
+    detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_transaction_chains_tenant_tx
+    ON transaction_chains (tenant_id, transaction_id);
+
+CREATE INDEX IF NOT EXISTS idx_transaction_chains_tenant_confidence
+    ON transaction_chains (tenant_id, confidence DESC);
+
+-- Last refresh per tenant (full rebuild or incremental after upload)
+CREATE TABLE IF NOT EXISTS transaction_chain_runs (
+    tenant_id VARCHAR(100) PRIMARY KEY,
+    last_refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_full_refresh_at TIMESTAMP,
+    refreshed_since DATE,
+    transactions_analyzed INTEGER DEFAULT 0,
+    chains_detected INTEGER DEFAULT 0,
+    duration_ms INTEGER DEFAULT 0
+);
@@ -0,0 +1,17 @@
+-- Migration: Add transaction keyword index
+-- Purpose: Precomputed per-tenant keywords (vendors, people, counterparties) of each
+--          transaction, used by the Sankey node breakdown instead of scanning
+--          transactions per request. Rows are rebuilt when source_hash changes.
+-- Date: 2026-10-18
+-- Database: PostgreSQL
+
+CREATE TABLE IF NOT EXISTS transaction_keywords (
+    tenant_id VARCHAR(100) NOT NULL,
+    transaction_id TEXT NOT NULL,
+    keyword VARCHAR(50) NOT NULL,
+    source_hash CHAR(32) NOT NULL,  -- md5 of the text the keywords were extracted from
+    PRIMARY KEY (tenant_id, transaction_id, keyword)
+);
+
+CREATE INDEX IF NOT EXISTS idx_transaction_keywords_tenant_keyword
+    ON transaction_keywords (tenant_id, keyword);
@@ -20,6 +20,7 @@ sys.path.append(str(current_dir.parent.parent))
 
 # Import centralized database manager
 from web_ui.database import db_manager
+from web_ui.services.kpi_aggregator import get_transaction_kpis, tenant_where_clause
 
 app = Flask(__name__)
 app.config['JSON_SORT_KEYS'] = False
@@ -201,6 +202,33 @@ class AnalyticsEngine:
         except Exception as e:
             return {"error": f"Query failed: {str(e)}"}
 
+    def get_kpis(self, tenant_id):
+        """Get tenant KPIs from the shared single-scan aggregator (cached per tenant)"""
+        try:
+            where_clause, params = tenant_where_clause(tenant_id)
+            kpis = get_transaction_kpis(self.db, tenant_id, where_clause, params)
+
+            return {
+                'tenant_id': tenant_id,
+                'total_transactions': kpis['total_transactions'],
+                'total_revenue': kpis['total_revenue'],
+                'total_expenses': kpis['total_expenses'],
+                'net_profit': kpis['total_revenue'] - kpis['total_expenses'],
+                'needs_review': kpis['needs_review'],
+                'date_range': {
+                    'min': kpis['min_date'].isoformat() if kpis['min_date'] else None,
+                    'max': kpis['max_date'].isoformat() if kpis['max_date'] else None
+                },
+                'top_entities': kpis['entities'][:10],
+                'monthly_trends': [
+                    {**row, 'month': row['month'].isoformat()} for row in kpis['monthly_trends']
+                ],
+                'generated_at': datetime.now().isoformat()
+            }
+
+        except Exception as e:
+            return {"error": f"Query failed: {str(e)}"}
+
 # Initialize analytics engine
 analytics = AnalyticsEngine()
 
@@ -235,6 +263,16 @@ def category_analysis():
     result = analytics.get_category_analysis()
     return jsonify(result)
 
+@app.route('/api/analytics/kpis')
+def tenant_kpis():
+    """Get headline KPIs for one tenant"""
+    tenant_id = request.args.get('tenant_id')
+    if not tenant_id:
+        return jsonify({'error': 'tenant_id parameter required'}), 400
+
+    result = analytics.get_kpis(tenant_id)
+    return jsonify(result)
+
 @app.route('/api/analytics/dashboard')
 def dashboard_data():
     """Get comprehensive dashboard data"""
@@ -245,6 +283,7 @@ def dashboard_data():
         categories = analytics.get_category_analysis()
 
         dashboard = {
+            'kpis': analytics.get_kpis(request.args['tenant_id']) if request.args.get('tenant_id') else None,
             'monthly_summary': monthly,
             'entity_breakdown': entities,
             'category_analysis': categories,
@@ -303,6 +342,7 @@ def not_found(error):
             '/api/analytics/monthly-summary',
             '/api/analytics/entities',
             '/api/analytics/categories',
+            '/api/analytics/kpis',
             '/api/analytics/dashboard',
             '/api/analytics/status'
         ]
@@ -10,6 +10,8 @@ The generated patterns immediately work for future transaction classification.
 
 import sys
 import os
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from decimal import Decimal
 import json
@@ -17,7 +19,154 @@ import anthropic
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from database import db_manager
+from tenant_knowledge_cache import invalidate_tenant_knowledge
+
+# Accounts described per Claude call
+INSIGHT_BATCH_SIZE = 20
+# Vendor patterns created per run, most frequent vendors first
+MAX_VENDOR_PATTERNS = 10
+
+# Usage of every bank account in one pass: transactions are grouped by
+# account_name first, then matched to accounts (account_name LIKE %number%)
+ACCOUNT_USAGE_QUERY = """
+    WITH accounts AS (
+        SELECT DISTINCT account_number
+        FROM bank_accounts
+        WHERE tenant_id = %s AND account_number IS NOT NULL
+    ),
+    by_account_name AS (
+        SELECT
+            account_name,
+            classified_entity,
+            accounting_category,
+            subcategory,
+            COUNT(*) AS count,
+            SUM(amount) AS total_amount,
+            COUNT(amount) AS amount_count,
+            MIN(date) AS first_date,
+            MAX(date) AS last_date
+        FROM transactions
+        WHERE tenant_id = %s
+          AND account_name IS NOT NULL
+          AND classified_entity IS NOT NULL
+          AND classified_entity != ''
+        GROUP BY account_name, classified_entity, accounting_category, subcategory
+    )
+    SELECT
+        a.account_number,
+        g.classified_entity,
+        g.accounting_category,
+        g.subcategory,
+        SUM(g.count) AS count,
+        SUM(g.total_amount) AS total_amount,
+        SUM(g.amount_count) AS amount_count,
+        MIN(g.first_date) AS first_date,
+        MAX(g.last_date) AS last_date
+    FROM accounts a
+    JOIN by_account_name g ON g.account_name LIKE '%%' || a.account_number || '%%'
+    GROUP BY a.account_number, g.classified_entity, g.accounting_category, g.subcategory
+    ORDER BY a.account_number, count DESC, g.classified_entity, g.accounting_category, g.subcategory
+"""
+
+# First three words of the description, upper-cased (see _extract_vendor_keywords)
+VENDOR_KEYWORDS_SQL = r"""
+    ARRAY_TO_STRING(
+        (REGEXP_SPLIT_TO_ARRAY(UPPER(BTRIM(description, E' \t\r\n')), '\s+'))[1:3], ' '
+    )
+"""
+
+# Dominant classification per vendor keyword, with the keyword's total volume
+# and amount stats, in one scan
+VENDOR_KEYWORD_QUERY = f"""
+    WITH keyed AS (
+        SELECT
+            {VENDOR_KEYWORDS_SQL} AS vendor_keywords,
+            classified_entity,
+            accounting_category,
+            subcategory,
+            amount
+        FROM transactions
+        WHERE tenant_id = %s
+          AND description IS NOT NULL
+          AND BTRIM(description) != ''
+          AND classified_entity IS NOT NULL
+          AND classified_entity != ''
+    ),
+    ranked AS (
+        SELECT
+            vendor_keywords,
+            classified_entity,
+            accounting_category,
+            subcategory,
+            COUNT(*) AS count,
+            SUM(COUNT(*)) OVER (PARTITION BY vendor_keywords) AS keyword_total,
+            AVG(amount) AS avg_amount,
+            MIN(amount) AS min_amount,
+            MAX(amount) AS max_amount,
+            ROW_NUMBER() OVER (
+                PARTITION BY vendor_keywords
+                ORDER BY COUNT(*) DESC, classified_entity, accounting_category, subcategory
+            ) AS rank
+        FROM keyed
+        GROUP BY vendor_keywords, classified_entity, accounting_category, subcategory
+    )
+    SELECT vendor_keywords, classified_entity, accounting_category, subcategory,
+           count, keyword_total, avg_amount, min_amount, max_amount
+    FROM ranked
+    WHERE rank = 1 AND count >= %s
+    ORDER BY count DESC, vendor_keywords
+"""
+
+
+def fold_account_usage_rows(rows):
+    """
+    Turn ACCOUNT_USAGE_QUERY rows into per-account analyses.
+
+    Rows are (account_number, entity, category, subcategory, count,
+    total_amount, amount_count, first_date, last_date), ordered by account
+    then count descending.
+
+    Returns:
+        {account_number: analysis} in the shape of analyze_account_usage()
+    """
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row[0], []).append(row)
+
+    analyses = {}
+    for account_number, account_rows in grouped.items():
+        total_transactions = sum(int(row[4]) for row in account_rows)
+        most_common = account_rows[0]
+        pattern_count = int(most_common[4])
+        total_amount = float(most_common[5]) if most_common[5] else 0
+        amount_count = int(most_common[6] or 0)
+
+        analyses[account_number] = {
+            'account_number': account_number,
+            'transaction_count': total_transactions,
+            'most_common_entity': most_common[1],
+            'most_common_category': most_common[2],
+            'most_common_subcategory': most_common[3],
+            'frequency': (pattern_count / total_transactions) * 100 if total_transactions > 0 else 0,
+            'pattern_count': pattern_count,
+            'total_amount': total_amount,
+            'avg_amount': total_amount / amount_count if amount_count else 0,
+            'date_range_start': most_common[7],
+            'date_range_end': most_common[8],
+            'all_patterns': [
+                {
+                    'entity': row[1],
+                    'category': row[2],
+                    'subcategory': row[3],
+                    'count': int(row[4]),
+                    'percentage': (int(row[4]) / total_transactions) * 100
+                }
+                for row in account_rows
+            ]
+        }
+    return analyses
 
 
 class KnowledgeGenerator:
@@ -25,6 +174,7 @@ class KnowledgeGenerator:
 
     def __init__(self, tenant_id):
         self.tenant_id = tenant_id
+        self.stats = {'db_seconds': 0.0, 'llm_calls': 0}
         self.api_key = os.environ.get('ANTHROPIC_API_KEY')
         if self.api_key:
             self.claude = anthropic.Anthropic(api_key=self.api_key)
@@ -86,33 +236,48 @@ class KnowledgeGenerator:
         print(f"  Vendors analyzed:      {results['vendors_analyzed']}")
         print(f"  Patterns created:      {results['patterns_created']}")
         print(f"  Insights generated:    {results['insights_generated']}")
+        print(f"  Database time:         {self.stats['db_seconds']:.2f}s")
+        print(f"  AI calls:              {self.stats['llm_calls']}")
         print("="*80)
 
+        results['db_seconds'] = round(self.stats['db_seconds'], 3)
+        results['llm_calls'] = self.stats['llm_calls']
+
         return results
 
     def analyze_all_accounts(self, min_frequency=75.0, min_transactions=5):
-        """Analyze all bank accounts and generate patterns"""
-
-        conn = db_manager._get_postgresql_connection()
-        cursor = conn.cursor()
-
-        # Get all accounts for this tenant
-        cursor.execute("""
-            SELECT DISTINCT account_number, account_name, institution_name
-            FROM bank_accounts
-            WHERE tenant_id = %s AND account_number IS NOT NULL
-        """, (self.tenant_id,))
+        """
+        Analyze all bank accounts and generate patterns.
 
-        accounts = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        Usage for every account comes from one grouped query; only accounts
+        that pass the thresholds and have no pattern yet are sent (batched)
+        to the LLM.
+        """
+        with self._db_timer():
+            with db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("""
+                        SELECT DISTINCT account_number, account_name, institution_name
+                        FROM bank_accounts
+                        WHERE tenant_id = %s AND account_number IS NOT NULL
+                    """, (self.tenant_id,))
+                    accounts = cursor.fetchall()
+
+                    cursor.execute(ACCOUNT_USAGE_QUERY, (self.tenant_id, self.tenant_id))
+                    usage = fold_account_usage_rows(cursor.fetchall())
+
+                    existing = self._load_existing_patterns(cursor)
+                finally:
+                    cursor.close()
 
         results = {'analyzed': 0, 'patterns_created': 0, 'insights_generated': 0}
+        candidates = []
 
         for account_number, account_name, institution in accounts:
             print(f"\n  Analyzing account: {institution} {account_number} ({account_name})")
 
-            analysis = self.analyze_account_usage(account_number)
+            analysis = usage.get(account_number)
             results['analyzed'] += 1
 
             if not analysis:
@@ -127,16 +292,34 @@ class KnowledgeGenerator:
                 print(f"    ⊘ Skipped - frequency {analysis['frequency']:.1f}% < {min_frequency}%")
                 continue
 
-            # Generate AI summary
-            ai_summary = self.generate_account_insight(analysis)
+            existing_id = existing['account_number'].get(account_number)
+            if existing_id:
+                print(f"    ⊘ Pattern already exists (ID: {existing_id})")
+                continue
+
+            candidates.append(analysis)
+
+        if not candidates:
+            return results
 
-            # Create pattern and insight
-            pattern_id = self.create_pattern_from_account_analysis(analysis, ai_summary)
+        # Generate AI summaries for all candidate accounts at once
+        print(f"\n  Generating insights for {len(candidates)} accounts")
+        summaries = self.generate_account_insights(candidates)
 
-            if pattern_id:
-                results['patterns_created'] += 1
-                results['insights_generated'] += 1
-                print(f"    ✓ Pattern created (ID: {pattern_id})")
+        with db_manager.unit_of_work('knowledge_generation') as uow:
+            for analysis, ai_summary in zip(candidates, summaries):
+                print(f"\n  Account {analysis['account_number']}:")
+
+                # Only create if confidence is high enough
+                if ai_summary['confidence'] < 0.70:
+                    print(f"      ⊘ Confidence too low ({ai_summary['confidence']:.2f})")
+                    continue
+
+                pattern_id = self._save_account_pattern(uow, analysis, ai_summary)
+                if pattern_id:
+                    results['patterns_created'] += 1
+                    results['insights_generated'] += 1
+                    print(f"    ✓ Pattern created (ID: {pattern_id})")
 
         return results
 
@@ -205,19 +388,40 @@ class KnowledgeGenerator:
 
     def generate_account_insight(self, analysis):
         """Generate AI summary for account usage pattern"""
+        return self.generate_account_insights([analysis])[0]
 
-        if not self.claude:
-            # Fallback without AI
-            return {
-                'description': f"Account used primarily for {analysis['most_common_subcategory'] or analysis['most_common_category']}",
-                'justification': f"Based on {analysis['pattern_count']} of {analysis['transaction_count']} transactions ({analysis['frequency']:.1f}%)",
-                'confidence': min(analysis['frequency'] / 100, 0.95)
-            }
+    def generate_account_insights(self, analyses):
+        """
+        Generate AI summaries for several account usage patterns.
 
-        # Build prompt for Claude
-        prompt = f"""Analyze this bank account usage pattern and provide business insights:
+        Accounts are sent INSIGHT_BATCH_SIZE per API call; any account the
+        response doesn't cover gets the rule-based summary.
 
-Account Number: {analysis['account_number']}
+        Returns:
+            List of {'description', 'justification', 'confidence'} in input order
+        """
+        if not self.claude:
+            # Fallback without AI
+            return [self._fallback_account_insight(analysis) for analysis in analyses]
+
+        insights = {}
+        for start in range(0, len(analyses), INSIGHT_BATCH_SIZE):
+            batch = analyses[start:start + INSIGHT_BATCH_SIZE]
+            try:
+                insights.update(self._request_account_insights(batch))
+            except Exception as e:
+                print(f"      ⚠️  AI analysis failed: {e}")
+
+        return [
+            insights.get(str(analysis['account_number'])) or self._fallback_account_insight(analysis, ai_failed=True)
+            for analysis in analyses
+        ]
+
+    def _request_account_insights(self, batch):
+        """One Claude call covering a batch of accounts -> {account_number: summary}"""
+        blocks = []
+        for analysis in batch:
+            blocks.append(f"""Account Number: {analysis['account_number']}
 Total Transactions: {analysis['transaction_count']}
 Date Range: {analysis['date_range_start']} to {analysis['date_range_end']}
 
@@ -229,47 +433,71 @@ Most Common Pattern ({analysis['frequency']:.1f}% of transactions):
 - Average Amount: ${analysis['avg_amount']:,.2f}
 
 All Patterns:
-{self._format_patterns_for_ai(analysis['all_patterns'][:5])}
+{self._format_patterns_for_ai(analysis['all_patterns'][:5])}""")
 
-Provide:
+        # Build prompt for Claude
+        prompt = f"""Analyze these {len(batch)} bank account usage patterns and provide business insights for each:
+
+{chr(10).join(f"=== Account {i + 1} ==={chr(10)}{block}{chr(10)}" for i, block in enumerate(blocks))}
+For each account provide:
 1. A concise description of what this account is used for (1-2 sentences)
 2. A justification for creating an auto-classification pattern (why this pattern is reliable)
 3. Confidence level (0.0-1.0) for auto-classifying future transactions
 
-Respond in JSON format:
-{{
-    "description": "...",
-    "justification": "...",
-    "confidence": 0.85
-}}"""
-
-        try:
-            response = self.claude.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=500,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            # Extract JSON from response
-            text = response.content[0].text
-            # Try to find JSON in the response
-            start = text.find('{')
-            end = text.rfind('}') + 1
-            if start >= 0 and end > start:
-                json_text = text[start:end]
-                result = json.loads(json_text)
-                return result
-            else:
-                raise ValueError("No JSON found in response")
-
-        except Exception as e:
-            print(f"      ⚠️  AI analysis failed: {e}")
-            # Fallback
+Respond with a JSON array, one object per account:
+[
+    {{
+        "account_number": "...",
+        "description": "...",
+        "justification": "...",
+        "confidence": 0.85
+    }}
+]"""
+
+        self.stats['llm_calls'] += 1
+        response = self.claude.messages.create(
+            model="claude-sonnet-4-20250514",
+            max_tokens=200 + 300 * len(batch),
+            messages=[{"role": "user", "content": prompt}]
+        )
+
+        # Extract JSON array from response
+        text = response.content[0].text
+        start = text.find('[')
+        end = text.rfind(']') + 1
+        if start < 0 or end <= start:
+            raise ValueError("No JSON found in response")
+
+        wanted = {str(analysis['account_number']) for analysis in batch}
+        insights = {}
+        for item in json.loads(text[start:end]):
+            try:
+                account_number = str(item['account_number'])
+                summary = {
+                    'description': str(item['description']),
+                    'justification': str(item['justification']),
+                    'confidence': float(item['confidence']),
+                }
+            except (KeyError, TypeError, ValueError):
+                continue
+            if account_number in wanted:
+                insights[account_number] = summary
+        return insights
+
+    def _fallback_account_insight(self, analysis, ai_failed=False):
+        """Rule-based summary used without an API key or when the AI response is unusable"""
+        usage = analysis['most_common_subcategory'] or analysis['most_common_category']
+        if ai_failed:
             return {
-                'description': f"Account used for {analysis['most_common_subcategory'] or analysis['most_common_category']}",
+                'description': f"Account used for {usage}",
                 'justification': f"Pattern detected in {analysis['frequency']:.1f}% of transactions",
                 'confidence': min(analysis['frequency'] / 100, 0.85)
             }
+        return {
+            'description': f"Account used primarily for {usage}",
+            'justification': f"Based on {analysis['pattern_count']} of {analysis['transaction_count']} transactions ({analysis['frequency']:.1f}%)",
+            'confidence': min(analysis['frequency'] / 100, 0.95)
+        }
 
     def create_pattern_from_account_analysis(self, analysis, ai_summary):
         """Create actionable classification pattern from account analysis"""
@@ -279,155 +507,174 @@ Respond in JSON format:
             print(f"      ⊘ Confidence too low ({ai_summary['confidence']:.2f})")
             return None
 
-        conn = db_manager._get_postgresql_connection()
-        cursor = conn.cursor()
+        with db_manager.unit_of_work('knowledge_generation') as uow:
+            with db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    # Check if pattern already exists
+                    cursor.execute("""
+                        SELECT pattern_id FROM classification_patterns
+                        WHERE tenant_id = %s
+                          AND pattern_type = 'account_number'
+                          AND description_pattern = %s
+                    """, (self.tenant_id, analysis['account_number']))
+                    existing = cursor.fetchone()
+                finally:
+                    cursor.close()
 
-        try:
-            # Check if pattern already exists
-            cursor.execute("""
-                SELECT pattern_id FROM classification_patterns
-                WHERE tenant_id = %s
-                  AND pattern_type = 'account_number'
-                  AND description_pattern = %s
-            """, (self.tenant_id, analysis['account_number']))
-
-            existing = cursor.fetchone()
             if existing:
                 print(f"      ⊘ Pattern already exists (ID: {existing[0]})")
-                cursor.close()
-                conn.close()
                 return existing[0]
 
-            # Create the classification pattern
-            cursor.execute("""
-                INSERT INTO classification_patterns (
-                    tenant_id, pattern_type, description_pattern,
-                    entity, accounting_category, accounting_subcategory,
-                    confidence_score, justification, notes, created_by, status
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING pattern_id
-            """, (
-                self.tenant_id,
-                'account_number',
-                analysis['account_number'],
-                analysis['most_common_entity'],
-                analysis['most_common_category'],
-                analysis['most_common_subcategory'],
-                ai_summary['confidence'],
-                ai_summary['justification'],
-                f"AI-generated from {analysis['transaction_count']} historical transactions",
-                'ai',
-                'active'
-            ))
-
-            pattern_id = cursor.fetchone()[0]
-
-            # Create the business insight (evidence)
-            cursor.execute("""
-                INSERT INTO business_insights (
-                    tenant_id, insight_type, subject_id, subject_type,
-                    transaction_count, date_range_start, date_range_end,
-                    pattern_frequency, total_amount, avg_amount,
-                    detected_entity, detected_category, detected_subcategory,
-                    ai_summary, ai_justification, confidence_score,
-                    generated_pattern_id, supporting_data,
-                    status, created_by
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                self.tenant_id,
-                'account_usage',
-                analysis['account_number'],
-                'bank_account',
-                analysis['transaction_count'],
-                analysis['date_range_start'],
-                analysis['date_range_end'],
-                analysis['frequency'],
-                analysis['total_amount'],
-                analysis['avg_amount'],
-                analysis['most_common_entity'],
-                analysis['most_common_category'],
-                analysis['most_common_subcategory'],
-                ai_summary['description'],
-                ai_summary['justification'],
-                ai_summary['confidence'],
-                pattern_id,
-                json.dumps({'all_patterns': analysis['all_patterns']}),
-                'active',
-                'ai'
-            ))
-
-            conn.commit()
+            return self._save_account_pattern(uow, analysis, ai_summary)
 
+    def _save_account_pattern(self, uow, analysis, ai_summary):
+        """Insert the account pattern and its business insight atomically"""
+        try:
+            with self._db_timer(), uow.savepoint() as conn:
+                cursor = conn.cursor()
+                try:
+                    # Create the classification pattern
+                    cursor.execute("""
+                        INSERT INTO classification_patterns (
+                            tenant_id, pattern_type, description_pattern,
+                            entity, accounting_category, accounting_subcategory,
+                            confidence_score, justification, notes, created_by, status
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        RETURNING pattern_id
+                    """, (
+                        self.tenant_id,
+                        'account_number',
+                        analysis['account_number'],
+                        analysis['most_common_entity'],
+                        analysis['most_common_category'],
+                        analysis['most_common_subcategory'],
+                        ai_summary['confidence'],
+                        ai_summary['justification'],
+                        f"AI-generated from {analysis['transaction_count']} historical transactions",
+                        'ai',
+                        'active'
+                    ))
+
+                    pattern_id = cursor.fetchone()[0]
+
+                    # Create the business insight (evidence)
+                    cursor.execute("""
+                        INSERT INTO business_insights (
+                            tenant_id, insight_type, subject_id, subject_type,
+                            transaction_count, date_range_start, date_range_end,
+                            pattern_frequency, total_amount, avg_amount,
+                            detected_entity, detected_category, detected_subcategory,
+                            ai_summary, ai_justification, confidence_score,
+                            generated_pattern_id, supporting_data,
+                            status, created_by
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, (
+                        self.tenant_id,
+                        'account_usage',
+                        analysis['account_number'],
+                        'bank_account',
+                        analysis['transaction_count'],
+                        analysis['date_range_start'],
+                        analysis['date_range_end'],
+                        analysis['frequency'],
+                        analysis['total_amount'],
+                        analysis['avg_amount'],
+                        analysis['most_common_entity'],
+                        analysis['most_common_category'],
+                        analysis['most_common_subcategory'],
+                        ai_summary['description'],
+                        ai_summary['justification'],
+                        ai_summary['confidence'],
+                        pattern_id,
+                        json.dumps({'all_patterns': analysis['all_patterns']}),
+                        'active',
+                        'ai'
+                    ))
+                finally:
+                    cursor.close()
+
+            # DeltaCFOAgent instances in this process pick up the new pattern
+            invalidate_tenant_knowledge(self.tenant_id)
             print(f"      ✓ Insight: {ai_summary['description']}")
 
             return pattern_id
 
         except Exception as e:
-            conn.rollback()
             print(f"      ✗ Error creating pattern: {e}")
             return None
-        finally:
-            cursor.close()
-            conn.close()
 
     def analyze_recurring_vendors(self, min_frequency=75.0, min_transactions=5):
-        """Analyze recurring vendors and create patterns"""
-
-        conn = db_manager._get_postgresql_connection()
-        cursor = conn.cursor()
-
-        # Find recurring vendors (detected from description patterns)
-        cursor.execute("""
-            SELECT
-                description,
-                classified_entity,
-                accounting_category,
-                subcategory,
-                COUNT(*) as count,
-                AVG(amount) as avg_amount
-            FROM transactions
-            WHERE tenant_id = %s
-              AND description IS NOT NULL
-              AND classified_entity IS NOT NULL
-              AND classified_entity != ''
-            GROUP BY description, classified_entity, accounting_category, subcategory
-            HAVING COUNT(*) >= %s
-            ORDER BY count DESC
-            LIMIT 50
-        """, (self.tenant_id, min_transactions))
+        """
+        Analyze recurring vendors and create patterns.
 
-        vendors = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        Transactions are grouped by vendor keywords (first words of the
+        description) and classification in one query; a vendor qualifies when
+        its dominant classification covers min_frequency% of its transactions.
+        """
+        with self._db_timer():
+            with db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(VENDOR_KEYWORD_QUERY, (self.tenant_id, min_transactions))
+                    vendors = [
+                        {
+                            'vendor_keywords': row[0],
+                            'entity': row[1],
+                            'category': row[2],
+                            'subcategory': row[3],
+                            'count': int(row[4]),
+                            'frequency': (float(row[4]) / float(row[5])) * 100 if row[5] else 0,
+                            'avg_amount': float(row[6]) if row[6] is not None else 0.0,
+                            'min_amount': float(row[7]) if row[7] is not None else 0.0,
+                            'max_amount': float(row[8]) if row[8] is not None else 0.0,
+                        }
+                        for row in cursor.fetchall()
+                    ]
+                    existing = self._load_existing_patterns(cursor)
+                finally:
+                    cursor.close()
 
         results = {'analyzed': len(vendors), 'patterns_created': 0, 'insights_generated': 0}
 
         print(f"\n  Found {len(vendors)} recurring vendor patterns")
 
-        for description, entity, category, subcategory, count, avg_amount in vendors[:10]:  # Process top 10
-            # Extract vendor name (simplified - could use AI for better extraction)
-            vendor_keywords = self._extract_vendor_keywords(description)
+        selected = []
+        for vendor in vendors:
+            if len(selected) >= MAX_VENDOR_PATTERNS:
+                break
+            vendor_keywords = vendor['vendor_keywords']
             if not vendor_keywords:
                 continue
 
-            print(f"\n  Vendor pattern: {vendor_keywords} ({count} transactions)")
+            print(f"\n  Vendor pattern: {vendor_keywords} ({vendor['count']} transactions)")
+
+            if vendor['frequency'] < min_frequency:
+                print(f"    ⊘ Skipped - frequency {vendor['frequency']:.1f}% < {min_frequency}%")
+                continue
 
-            # Check if pattern exists
-            pattern_exists = self._check_pattern_exists(vendor_keywords, 'expense')
-            if pattern_exists:
+            # Same test as _check_pattern_exists (LIKE '%keywords%'), against patterns loaded up front
+            if any(vendor_keywords in pattern for pattern in existing['expense']):
                 print(f"    ⊘ Pattern already exists")
                 continue
 
-            # Create pattern
-            pattern_id = self._create_vendor_pattern(
-                vendor_keywords, entity, category, subcategory,
-                count, avg_amount
-            )
+            selected.append(vendor)
+            existing['expense'][f'%{vendor_keywords}%'] = None
 
-            if pattern_id:
-                results['patterns_created'] += 1
-                results['insights_generated'] += 1
-                print(f"    ✓ Pattern created (ID: {pattern_id})")
+        if not selected:
+            return results
+
+        with db_manager.unit_of_work('knowledge_generation') as uow:
+            for vendor in selected:
+                pattern_id = self._create_vendor_pattern(
+                    uow, vendor['vendor_keywords'], vendor['entity'], vendor['category'], vendor['subcategory'],
+                    vendor['count'], vendor['avg_amount']
+                )
+
+                if pattern_id:
+                    results['patterns_created'] += 1
+                    results['insights_generated'] += 1
+                    print(f"    ✓ Pattern created for {vendor['vendor_keywords']} (ID: {pattern_id})")
 
         return results
 
@@ -444,12 +691,27 @@ Respond in JSON format:
         return '\n'.join(lines)
 
     def _extract_vendor_keywords(self, description):
-        """Extract vendor name/keywords from description"""
+        """Extract vendor name/keywords from description (same rule as VENDOR_KEYWORDS_SQL)"""
         # Simple extraction - take first few words
         # In production, could use AI for better extraction
         words = description.upper().split()[:3]
         return ' '.join(words) if words else None
 
+    def _load_existing_patterns(self, cursor):
+        """All of the tenant's account/vendor patterns -> {pattern_type: {description_pattern: pattern_id}}"""
+        cursor.execute("""
+            SELECT pattern_type, description_pattern, pattern_id
+            FROM classification_patterns
+            WHERE tenant_id = %s
+              AND pattern_type IN ('account_number', 'expense')
+              AND description_pattern IS NOT NULL
+        """, (self.tenant_id,))
+
+        existing = {'account_number': {}, 'expense': {}}
+        for pattern_type, description_pattern, pattern_id in cursor.fetchall():
+            existing[pattern_type][description_pattern] = pattern_id
+        return existing
+
     def _check_pattern_exists(self, pattern_text, pattern_type):
         """Check if a pattern already exists"""
         conn = db_manager._get_postgresql_connection()
@@ -468,48 +730,56 @@ Respond in JSON format:
 
         return exists
 
-    def _create_vendor_pattern(self, vendor_keywords, entity, category, subcategory, count, avg_amount):
-        """Create a vendor pattern"""
-
-        conn = db_manager._get_postgresql_connection()
-        cursor = conn.cursor()
+    def _create_vendor_pattern(self, uow, vendor_keywords, entity, category, subcategory, count, avg_amount):
+        """Create a vendor pattern (committed by the unit of work's savepoint)"""
 
         try:
-            pattern_text = f'%{vendor_keywords}%'
-
-            cursor.execute("""
-                INSERT INTO classification_patterns (
-                    tenant_id, pattern_type, description_pattern,
-                    entity, accounting_category, accounting_subcategory,
-                    confidence_score, justification, notes, created_by, status
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING pattern_id
-            """, (
-                self.tenant_id,
-                'expense',
-                pattern_text,
-                entity,
-                category,
-                subcategory,
-                0.80,
-                f"Recurring vendor detected in {count} transactions",
-                f"AI-generated vendor pattern (avg: ${avg_amount:.2f})",
-                'ai',
-                'active'
-            ))
-
-            pattern_id = cursor.fetchone()[0]
-            conn.commit()
+            with self._db_timer(), uow.savepoint() as conn:
+                cursor = conn.cursor()
+                try:
+                    pattern_text = f'%{vendor_keywords}%'
+
+                    cursor.execute("""
+                        INSERT INTO classification_patterns (
+                            tenant_id, pattern_type, description_pattern,
+                            entity, accounting_category, accounting_subcategory,
+                            confidence_score, justification, notes, created_by, status
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        RETURNING pattern_id
+                    """, (
+                        self.tenant_id,
+                        'expense',
+                        pattern_text,
+                        entity,
+                        category,
+                        subcategory,
+                        0.80,
+                        f"Recurring vendor detected in {count} transactions",
+                        f"AI-generated vendor pattern (avg: ${avg_amount:.2f})",
+                        'ai',
+                        'active'
+                    ))
+
+                    pattern_id = cursor.fetchone()[0]
+                finally:
+                    cursor.close()
+
+            # DeltaCFOAgent instances in this process pick up the new pattern
+            invalidate_tenant_knowledge(self.tenant_id)
             return pattern_id
 
         except Exception as e:
-            conn.rollback()
             print(f"      ✗ Error: {e}")
             return None
-        finally:
-            cursor.close()
-            conn.close()
 
+    @contextmanager
+    def _db_timer(self):
+        """Accumulate wall time spent in database work into self.stats['db_seconds']"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stats['db_seconds'] += time.perf_counter() - started
 
     def generate_tenant_knowledge_summary(self, triggered_by='manual', source_file=None):
         """
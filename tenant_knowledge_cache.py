@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Tenant Knowledge Cache
+Process-wide, versioned snapshots of each tenant's classification knowledge
+(patterns, account mappings, wallets, entities, workforce) shared by every
+DeltaCFOAgent instance, with matchers compiled once per snapshot.
+
+Writers call invalidate_tenant_knowledge(tenant_id) after changing patterns,
+wallets, entities or workforce members; snapshots also expire after
+KNOWLEDGE_CACHE_TTL_SECONDS to pick up changes made by other processes.
+"""
+
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from module_singletons import shared_instance
+except ImportError:
+    # web_ui/ itself is not on sys.path (imported through the repo root)
+    from web_ui.module_singletons import shared_instance
+
+KNOWLEDGE_CACHE_TTL_SECONDS = 300
+
+# Pattern types classify_transaction checks with word-boundary matching, in priority order
+# ('regional' follows them and matches currencies/substrings instead)
+WORD_PATTERN_ORDER = ['revenue', 'transfer', 'technology', 'paraguay', 'brazil', 'fees', 'crypto', 'personal', 'expense']
+
+
+class KeywordMatcher:
+    """
+    Word-boundary keyword matching that returns the first keyword (in the
+    given order) found in a text, like looping re.search over the keywords.
+
+    One combined regex rejects texts that contain none of the keywords, which
+    is the common case, before the per-keyword regexes run.
+    """
+
+    def __init__(self, entries: List[Tuple[str, Any]]):
+        self.entries = [
+            (re.compile(r'\b' + re.escape(keyword) + r'\b'), keyword, payload)
+            for keyword, payload in entries
+        ]
+        self._any = None
+        if entries:
+            self._any = re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword, _ in entries) + r')\b')
+
+    def __len__(self):
+        return len(self.entries)
+
+    def first_match(self, text: str) -> Optional[Tuple[str, Any]]:
+        """(keyword, payload) of the first matching keyword, or None"""
+        if self._any is None or not self._any.search(text):
+            return None
+        for regex, keyword, payload in self.entries:
+            if regex.search(text):
+                return keyword, payload
+        return None
+
+
+@dataclass
+class TenantKnowledge:
+    """
+    Immutable-by-convention snapshot of one tenant's classification knowledge.
+    Agents share the dicts; never modify them in place.
+    """
+    tenant_id: str
+    version: int
+    patterns: Dict[str, Dict[str, Dict[str, Any]]]
+    account_mapping: Dict[str, str]
+    wallets: Dict[str, Dict[str, Any]]
+    business_entities: List[str]
+    workforce_members: Dict[str, Dict[str, Any]]
+    patterns_loaded: int = 0
+    loaded_at: float = field(default_factory=time.time)
+    pattern_matchers: Dict[str, KeywordMatcher] = field(init=False)
+    workforce_matcher: KeywordMatcher = field(init=False)
+
+    def __post_init__(self):
+        self.pattern_matchers = {
+            pattern_type: KeywordMatcher(list(self.patterns.get(pattern_type, {}).items()))
+            for pattern_type in WORD_PATTERN_ORDER
+        }
+        self.workforce_matcher = KeywordMatcher(list(self.workforce_members.items()))
+
+
+class TenantKnowledgeCache:
+    """Per-tenant knowledge snapshots, invalidated by a per-tenant version counter"""
+
+    def __init__(self, ttl_seconds: float = KNOWLEDGE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._snapshots: Dict[str, TenantKnowledge] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, tenant_id: str) -> int:
+        return self._versions.get(tenant_id, 0)
+
+    def invalidate(self, tenant_id: Optional[str] = None):
+        """Drop the snapshot of one tenant (or all tenants)"""
+        with self._lock:
+            tenants = list(self._versions.keys() | self._snapshots.keys()) if tenant_id is None else [tenant_id]
+            for tenant in tenants:
+                self._versions[tenant] = self._versions.get(tenant, 0) + 1
+                self._snapshots.pop(tenant, None)
+
+    def _fresh(self, snapshot: Optional[TenantKnowledge], tenant_id: str) -> bool:
+        return (snapshot is not None
+                and snapshot.version == self.version(tenant_id)
+                and time.time() - snapshot.loaded_at < self.ttl_seconds)
+
+    def get(self, tenant_id: str, loader: Callable[[str, int], TenantKnowledge],
+            refresh: bool = False) -> TenantKnowledge:
+        """
+        Current snapshot for a tenant, calling loader(tenant_id, version) on a miss.
+        Concurrent misses for the same tenant load once.
+        """
+        snapshot = self._snapshots.get(tenant_id)
+        if not refresh and self._fresh(snapshot, tenant_id):
+            self.hits += 1
+            return snapshot
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(tenant_id, threading.Lock())
+
+        with load_lock:
+            snapshot = self._snapshots.get(tenant_id)
+            if not refresh and self._fresh(snapshot, tenant_id):
+                self.hits += 1
+                return snapshot
+
+            self.misses += 1
+            version = self.version(tenant_id)
+            snapshot = loader(tenant_id, version)
+            with self._lock:
+                # Don't store a snapshot read before a concurrent invalidation
+                if self.version(tenant_id) == version:
+                    self._snapshots[tenant_id] = snapshot
+            return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'tenants': len(self._snapshots),
+            'hits': self.hits,
+            'misses': self.misses,
+            'ttl_seconds': self.ttl_seconds,
+        }
+
+
+tenant_knowledge_cache = shared_instance(__name__, 'tenant_knowledge_cache', TenantKnowledgeCache)
+
+
+def invalidate_tenant_knowledge(tenant_id: Optional[str] = None):
+    """Call after writes to a tenant's patterns, wallets, business entities or workforce members"""
+    tenant_knowledge_cache.invalidate(tenant_id)
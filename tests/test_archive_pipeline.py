@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the streaming archive pipeline
+Tests member streaming, content-hash dedup and bounded parallel processing
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'invoice_processing'))
+
+from archive_pipeline import (ArchiveError, ArchiveMember, iter_archive_members, list_archive_members,
+                              run_archive_pipeline)
+
+
+def failing_render(path):
+    raise ValueError('cannot render')
+
+
+class ArchiveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.dest_dir = os.path.join(self.workdir, 'extract')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def make_zip(self, members):
+        path = os.path.join(self.workdir, 'invoices.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            for name, data in members:
+                archive.writestr(name, data)
+        return path
+
+
+class TestArchiveMembers(ArchiveTestCase):
+    """Test that supported members are streamed out once per distinct content"""
+
+    def test_nested_duplicate_and_unsupported_members(self):
+        path = self.make_zip([
+            ('2025/jan/aws.pdf', b'%PDF aws'),
+            ('2025/feb/notes.txt', b'not an invoice'),
+            ('2025/feb/aws copy.pdf', b'%PDF aws'),
+            ('2025/feb/aws.pdf', b'%PDF aws february'),
+            ('receipts/', b''),
+        ])
+
+        supported, unsupported = list_archive_members(path)
+        self.assertEqual(supported, ['2025/jan/aws.pdf', '2025/feb/aws copy.pdf', '2025/feb/aws.pdf'])
+        self.assertEqual(unsupported, ['2025/feb/notes.txt'])
+
+        members = list(iter_archive_members(path, self.dest_dir))
+        self.assertEqual([m.name for m in members], supported)
+
+        first, duplicate, february = members
+        self.assertEqual(duplicate.duplicate_of, '2025/jan/aws.pdf')
+        self.assertIsNone(duplicate.path)
+
+        # Same file name from different folders doesn't collide
+        self.assertEqual(os.path.basename(first.path), 'aws.pdf')
+        self.assertNotEqual(first.path, february.path)
+        with open(february.path, 'rb') as f:
+            self.assertEqual(f.read(), b'%PDF aws february')
+        self.assertEqual(sorted(os.listdir(self.dest_dir)), ['00000', '00003'])
+
+    def test_member_paths_stay_inside_destination(self):
+        path = self.make_zip([('../../escape.pdf', b'%PDF'), ('/abs/root.png', b'png')])
+
+        for member in iter_archive_members(path, self.dest_dir):
+            self.assertTrue(os.path.realpath(member.path).startswith(os.path.realpath(self.dest_dir)))
+
+    def test_unsupported_and_corrupted_archives(self):
+        bad_zip = os.path.join(self.workdir, 'broken.zip')
+        with open(bad_zip, 'wb') as f:
+            f.write(b'not a zip')
+
+        with self.assertRaises(ArchiveError):
+            list_archive_members(bad_zip)
+        with self.assertRaises(ArchiveError):
+            list(iter_archive_members(os.path.join(self.workdir, 'invoices.tar'), self.dest_dir))
+
+
+class TestArchivePipeline(ArchiveTestCase):
+    """Test fan-out, result streaming and the bound on members in flight"""
+
+    def make_members(self, count, extension='.png'):
+        members = []
+        for index in range(count):
+            path = os.path.join(self.workdir, f'{index}{extension}')
+            with open(path, 'wb') as f:
+                f.write(b'x' * (index + 1))
+            members.append(ArchiveMember(index, f'{index}{extension}', index + 1, str(index), path))
+        return members
+
+    def test_results_streamed_and_reads_bounded(self):
+        members = self.make_members(12)
+        state = {'read': 0, 'finished': 0, 'max_ahead': 0}
+
+        def stream():
+            for member in members:
+                state['read'] += 1
+                state['max_ahead'] = max(state['max_ahead'], state['read'] - state['finished'])
+                yield member
+
+        def process(member, rendered):
+            return member.name.upper()
+
+        def on_result(member, result, error):
+            state['finished'] += 1
+            self.assertIsNone(error)
+            self.assertEqual(result, member.name.upper())
+
+        results = run_archive_pipeline(stream(), process, on_result=on_result,
+                                       render=None, io_workers=3)
+
+        self.assertEqual(state['finished'], 12)
+        self.assertEqual(sorted(m.index for m, _, _ in results), list(range(12)))
+        self.assertLessEqual(state['max_ahead'], 4)
+
+    def test_duplicates_reported_without_processing(self):
+        member, = self.make_members(1)
+        duplicate = ArchiveMember(1, 'copy.png', 1, member.sha256, duplicate_of=member.name)
+        processed = []
+
+        results = run_archive_pipeline([member, duplicate], lambda m, r: processed.append(m.name), render=None)
+
+        self.assertEqual(processed, [member.name])
+        self.assertEqual(len(results), 2)
+
+    def test_pdfs_rendered_in_worker_processes(self):
+        members = self.make_members(3, '.pdf') + self.make_members(1, '.png')
+
+        results = run_archive_pipeline(members, lambda member, rendered: rendered,
+                                       render=os.path.getsize, render_workers=2)
+
+        rendered = {member.name: result for member, result, _ in results}
+        self.assertEqual(rendered, {'0.pdf': 1, '1.pdf': 2, '2.pdf': 3, '0.png': None})
+
+    def test_render_failure_falls_back_to_processor(self):
+        members = self.make_members(2, '.pdf')
+
+        results = run_archive_pipeline(members, lambda member, rendered: ('processed', rendered),
+                                       render=failing_render, render_workers=1)
+
+        self.assertEqual([result for _, result, _ in results], [('processed', None)] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the Chain Detection Engine
+Tests in-memory detectors over a columnar ledger snapshot and the background first build
+"""
+
+import sys
+import os
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from datetime import date, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+
+import chain_detection_engine
+from chain_detection_engine import ChainDetectionEngine, LedgerSnapshot
+
+
+def _rows():
+    start = date(2024, 1, 1)
+    rows = []
+    # Monthly subscription from the same vendor
+    for month in range(4):
+        rows.append((f'aws{month}', start + timedelta(days=30 * month), 'AMAZON WEB SERVICES BILL', -120.0, 'Delta LLC'))
+    # USDT sequence within a month
+    for day in range(3):
+        rows.append((f'usdt{day}', start + timedelta(days=5 + day), 'Received 100 USDT from wallet', 100.0, 'Delta Prop Shop LLC'))
+    # Split payment: half amount two days later
+    rows.append(('big', start + timedelta(days=40), 'Wire transfer 9000', -9000.0, 'Delta LLC'))
+    rows.append(('half', start + timedelta(days=42), 'Wire transfer 4500', -4500.0, 'Delta LLC'))
+    rows.sort(key=lambda r: (r[1], r[0]))
+    return rows
+
+
+class TestChainDetectionEngine(unittest.TestCase):
+    """Test set-based chain detectors"""
+
+    def setUp(self):
+        self.engine = ChainDetectionEngine()
+        self.snapshot = LedgerSnapshot(_rows())
+        self.all_rows = list(range(len(self.snapshot)))
+
+    def _chains_for(self, chains_by_tx, tx_id, chain_type):
+        i = self.snapshot.index_by_id[tx_id]
+        return [c for c in chains_by_tx.get(i, []) if c['chain_type'] == chain_type]
+
+    def test_snapshot_is_date_sorted(self):
+        self.assertTrue(all(a <= b for a, b in zip(self.snapshot.ordinals, self.snapshot.ordinals[1:])))
+
+    def test_vendor_chain_requires_two_related_in_window(self):
+        chains = dict((i, []) for i in self.all_rows)
+        for i, chain in self.engine._detect_vendor(self.snapshot, self.all_rows):
+            chains[i].append(chain)
+
+        vendor = self._chains_for(chains, 'aws1', 'vendor_recurring')
+        self.assertEqual(len(vendor), 1)
+        self.assertEqual(vendor[0]['vendor_name'], 'AMAZON WEB SERVICES')
+        self.assertNotIn('aws1', [tx['transaction_id'] for tx in vendor[0]['related_transactions']])
+
+    def test_crypto_chain_within_30_days(self):
+        chains = {}
+        for i, chain in self.engine._detect_crypto(self.snapshot, self.all_rows):
+            chains.setdefault(i, []).append(chain)
+
+        crypto = self._chains_for(chains, 'usdt0', 'crypto_sequence')
+        self.assertEqual(len(crypto), 1)
+        self.assertEqual(crypto[0]['crypto_type'], 'USDT')
+        self.assertEqual({tx['transaction_id'] for tx in crypto[0]['related_transactions']}, {'usdt1', 'usdt2'})
+
+    def test_amount_bands(self):
+        chains = {}
+        for i, chain in self.engine._detect_amount(self.snapshot, self.all_rows):
+            chains.setdefault(i, []).append(chain)
+
+        big = self._chains_for(chains, 'big', 'amount_correlation')
+        self.assertIn('half_amount', [c['correlation_type'] for c in big])
+
+    @patch('chain_detection_engine.get_tenant_entity_families')
+    def test_entity_chain_uses_families(self, mock_families):
+        mock_families.return_value = {'Delta': ['Delta LLC', 'Delta Prop Shop LLC']}
+        chains = {}
+        for i, chain in self.engine._detect_entity('t1', self.snapshot, self.all_rows):
+            chains.setdefault(i, []).append(chain)
+
+        entity = self._chains_for(chains, 'usdt1', 'entity_related')
+        self.assertEqual(len(entity), 1)
+        self.assertTrue(all(tx['classified_entity'] == 'Delta LLC' for tx in entity[0]['related_transactions']))
+
+
+class TestFirstBuild(unittest.TestCase):
+    """Test that reads never run the full build inline"""
+
+    @patch('chain_detection_engine.db_manager')
+    def test_first_read_starts_one_background_build(self, mock_db):
+        mock_db.execute_query.return_value = None
+        engine = ChainDetectionEngine()
+        release, finished = threading.Event(), threading.Event()
+        builds = []
+
+        def refresh(tenant_id, since=None):
+            builds.append(tenant_id)
+            release.wait(5)
+            finished.set()
+
+        with patch.object(engine, 'refresh', side_effect=refresh):
+            self.assertIsNone(engine.get_transaction_chains('t-build', 'tx-1'))
+            self.assertEqual(engine.get_system_chains('t-build')['status'], 'building')
+            release.set()
+            self.assertTrue(finished.wait(5))
+
+        self.assertEqual(builds, ['t-build'])
+
+    @patch('chain_detection_engine.db_manager')
+    def test_total_uses_the_ledger_filter(self, mock_db):
+        mock_db.execute_query.side_effect = lambda query, params=None, **kwargs: (
+            [] if kwargs.get('fetch_all') else {'chained_transactions': 3, 'total_transactions': 10}
+        )
+
+        summary = ChainDetectionEngine().get_system_chains('t1')
+
+        self.assertEqual((summary['status'], summary['total_transactions_analyzed']), ('ready', 10))
+        counts_query = mock_db.execute_query.call_args_list[-1][0][0]
+        self.assertIn('archived = FALSE', counts_query)
+
+
+class TestIncrementalRefresh(unittest.TestCase):
+    """Test incremental persistence and per-tenant refresh locks"""
+
+    @patch('chain_detection_engine.db_manager')
+    def test_incremental_persist_drops_chains_of_deleted_transactions(self, mock_db):
+        conn = MagicMock()
+        mock_db.get_connection.return_value.__enter__.return_value = conn
+        snapshot = LedgerSnapshot(_rows())
+
+        ChainDetectionEngine()._persist('t1', snapshot, [0, 1], {}, False, date(2024, 1, 1), 5)
+
+        statements = [call.args[0] for call in conn.cursor.return_value.execute.call_args_list]
+        orphan_delete = [q for q in statements if 'NOT EXISTS' in q]
+        self.assertEqual(len(orphan_delete), 1)
+        self.assertIn('archived = FALSE', orphan_delete[0])
+
+    def test_one_lock_per_tenant_under_concurrent_first_use(self):
+        locks, barrier = [], threading.Barrier(8)
+
+        def grab():
+            barrier.wait()
+            locks.append(chain_detection_engine._tenant_lock('t-race'))
+
+        threads = [threading.Thread(target=grab) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(lock) for lock in locks}), 1)
+        self.assertIsNot(chain_detection_engine._tenant_lock('t-other'), locks[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
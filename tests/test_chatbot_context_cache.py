@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the chatbot system prompt cache
+Tests prompt-cache block layout and write-driven invalidation without a live database
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+
+import chatbot_context
+from chatbot_context import (
+    ChatbotContextBuilder,
+    get_cached_system_blocks,
+    get_data_version,
+    invalidate_chatbot_context,
+)
+
+
+def _db_manager(total_transactions=42):
+    db = MagicMock()
+
+    def execute_query(query, params=None, fetch_one=False, fetch_all=False):
+        if 'COUNT(*)' in query:
+            return {'transaction_count': total_transactions, 'total_revenue': 1000.0,
+                    'total_expenses': 400.0, 'entity_count': 2, 'needs_review_count': 0}
+        return None if fetch_one else []
+
+    db.execute_query.side_effect = execute_query
+    return db
+
+
+class TestSystemBlocks(unittest.TestCase):
+    """Test system prompt layout"""
+
+    def test_static_block_marked_for_prompt_cache(self):
+        blocks = ChatbotContextBuilder(_db_manager(), 'tenant-a').build_system_blocks()
+        self.assertEqual(blocks[0]['cache_control'], {'type': 'ephemeral'})
+        self.assertNotIn('Total Transactions', blocks[0]['text'])
+        self.assertEqual(len(blocks), 2)
+        self.assertNotIn('cache_control', blocks[1])
+        self.assertIn('Total Transactions: 42', blocks[1]['text'])
+
+    def test_stats_change_keeps_cached_prefix(self):
+        first = ChatbotContextBuilder(_db_manager(42), 'tenant-a').build_system_blocks()
+        second = ChatbotContextBuilder(_db_manager(43), 'tenant-a').build_system_blocks()
+        self.assertEqual(first[0], second[0])
+        self.assertNotEqual(first[1], second[1])
+
+
+class TestPromptCache(unittest.TestCase):
+    """Test per-tenant caching and invalidation"""
+
+    def setUp(self):
+        invalidate_chatbot_context()
+
+    def test_cached_until_tenant_write(self):
+        with patch.object(ChatbotContextBuilder, 'build_system_blocks', return_value=[{'type': 'text', 'text': 'x'}]) as build:
+            first = get_cached_system_blocks(_db_manager(), 'tenant-a')
+            self.assertIs(get_cached_system_blocks(_db_manager(), 'tenant-a'), first)
+            get_cached_system_blocks(_db_manager(), 'tenant-b')
+            self.assertEqual(build.call_count, 2)
+
+            version = get_data_version('tenant-a')
+            invalidate_chatbot_context('tenant-a')
+            self.assertEqual(get_data_version('tenant-a'), version + 1)
+            get_cached_system_blocks(_db_manager(), 'tenant-a')
+            get_cached_system_blocks(_db_manager(), 'tenant-b')
+            self.assertEqual(build.call_count, 3)
+
+    def test_ttl_expiry_rebuilds(self):
+        with patch.object(ChatbotContextBuilder, 'build_system_blocks', return_value=[]) as build, \
+                patch.object(chatbot_context, 'SYSTEM_PROMPT_TTL_SECONDS', 0):
+            get_cached_system_blocks(_db_manager(), 'tenant-a')
+            get_cached_system_blocks(_db_manager(), 'tenant-a')
+            self.assertEqual(build.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the background classification tracking writer
+Tests batching, pattern signatures, failure isolation and row-by-row retries
+"""
+
+import sys
+import os
+import hashlib
+import threading
+import unittest
+from contextlib import contextmanager
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui', 'services'))
+
+from classification_tracking import ClassificationTrackingWriter, pattern_signature
+
+
+class FakeDBManager:
+    """Records the rows of each INSERT; can hold the first write until released"""
+
+    def __init__(self, fail=False, bad_transactions=()):
+        self.fail = fail
+        self.bad_transactions = set(bad_transactions)
+        self.batches = []
+        self.rows = []
+        self.release = threading.Event()
+        self.release.set()
+
+    @contextmanager
+    def get_connection(self):
+        yield self
+
+    def cursor(self):
+        return self
+
+    def mogrify(self, template, values):
+        self.rows.append(values)
+        return template.encode()
+
+    def execute(self, query):
+        rows, self.rows = self.rows, []
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError('database unavailable')
+        if any(row[2] in self.bad_transactions for row in rows):
+            raise RuntimeError('foreign key violation')
+        self.batches.append(rows)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestClassificationTrackingWriter(unittest.TestCase):
+
+    def submit(self, writer, transaction_id, field='classified_entity', value='Delta LLC'):
+        return writer.submit('delta', 'web_user', transaction_id, field, None, value,
+                             description=' AWS EMEA ', origin='Bank', destination=None)
+
+    def test_queued_edits_written_in_batches(self):
+        db = FakeDBManager()
+        writer = ClassificationTrackingWriter(db, max_batch=10)
+
+        # Hold the first write so the rest queue up behind it
+        db.release.clear()
+        self.submit(writer, 'txn-0')
+        for index in range(1, 6):
+            self.submit(writer, f'txn-{index}')
+        db.release.set()
+        writer.flush()
+
+        rows = [row for batch in db.batches for row in batch]
+        self.assertEqual([row[2] for row in rows], [f'txn-{i}' for i in range(6)])
+        self.assertLess(len(db.batches), 6)
+        self.assertEqual(writer.written, 6)
+        self.assertEqual(rows[0][3], 'entity')
+        self.assertEqual(rows[0][7], hashlib.md5('aws emea::entity::delta llc'.encode()).hexdigest())
+
+    def test_untracked_fields_ignored(self):
+        db = FakeDBManager()
+        writer = ClassificationTrackingWriter(db)
+
+        self.assertFalse(self.submit(writer, 'txn-1', field='amount', value='10'))
+        self.assertTrue(self.submit(writer, 'txn-2', field='subcategory', value='Hosting'))
+        writer.flush()
+
+        self.assertEqual([[row[3] for row in batch] for batch in db.batches], [['subcategory']])
+
+    def test_failed_write_does_not_stop_writer(self):
+        db = FakeDBManager(fail=True)
+        writer = ClassificationTrackingWriter(db)
+
+        self.submit(writer, 'txn-1')
+        writer.flush()
+        self.assertEqual(writer.failed, 1)
+
+        db.fail = False
+        self.submit(writer, 'txn-2')
+        writer.flush()
+        self.assertEqual(writer.written, 1)
+
+    def test_failed_batch_retried_row_by_row(self):
+        db = FakeDBManager(bad_transactions={'txn-2'})
+        writer = ClassificationTrackingWriter(db, max_batch=10)
+
+        db.release.clear()
+        for index in range(4):
+            self.submit(writer, f'txn-{index}')
+        db.release.set()
+        self.assertTrue(writer.flush(timeout=5))
+
+        written = sorted(row[2] for batch in db.batches for row in batch)
+        self.assertEqual(written, ['txn-0', 'txn-1', 'txn-3'])
+        self.assertEqual((writer.written, writer.failed), (3, 1))
+
+    def test_flush_times_out_while_write_is_held(self):
+        db = FakeDBManager()
+        writer = ClassificationTrackingWriter(db)
+
+        db.release.clear()
+        self.submit(writer, 'txn-1')
+        self.assertFalse(writer.flush(timeout=0.05))
+        db.release.set()
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(writer.written, 1)
+
+    def test_pattern_signature_handles_missing_text(self):
+        self.assertEqual(pattern_signature(None, 'entity', None), hashlib.md5(b'::entity::').hexdigest())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the month-end close check engine
+Tests the shared period snapshot, check evaluation and batched persistence
+of auto-check results and reconciliation stats
+"""
+
+import sys
+import os
+import unittest
+from contextlib import contextmanager
+from datetime import date, datetime
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui', 'services'))
+
+import close_checks
+from close_checks import compute_period_stats, evaluate_check, get_reconciliation_stats, run_checks
+
+PERIOD = {'id': 'period-1', 'start_date': '2024-03-01', 'end_date': '2024-03-31'}
+
+# date, total, classified, high, medium, low, user_reviewed, active (non-archived)
+TRANSACTION_DAYS = [
+    (date(2024, 3, 1), 4, 4, 3, 1, 0, 0, 4),
+    (date(2024, 3, 5), 3, 2, 1, 0, 2, 1, 2),
+    (date(2024, 3, 20), 3, 3, 2, 0, 1, 1, 3),
+    (date(2024, 3, 31), 1, 0, 0, 0, 1, 0, 0),
+]
+
+
+class FakeCursor:
+
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.db.queries.append(query)
+        for marker, rows in self.db.tables.items():
+            if marker in query:
+                if isinstance(rows, Exception):
+                    raise rows
+                self.rows = rows
+                return
+        self.rows = []
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeDBManager:
+    """Serves rows by query marker and records queries and commits"""
+
+    def __init__(self, **overrides):
+        self.tables = {
+            'FROM invoices': [(10, 9, 1, 1000, 900, 100)],
+            'FROM payslips': [(0, 0, 0, 0, 0, 0)],
+            'GROUP BY date': TRANSACTION_DAYS,
+            'FROM bank_accounts': [('acc-1', 'Operating', 'Bank A'), ('acc-2', 'Reserve', 'Bank B')],
+            'FROM close_reconciliation_stats': [],
+        }
+        self.tables.update(overrides)
+        self.queries = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    @contextmanager
+    def get_connection(self):
+        yield self
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class TestPeriodSnapshot(unittest.TestCase):
+
+    def test_each_source_queried_once(self):
+        db = FakeDBManager()
+        stats = compute_period_stats(db, 'delta', PERIOD['start_date'], PERIOD['end_date'])
+
+        self.assertEqual(len(db.queries), 4)
+        self.assertEqual(stats['invoices']['match_rate'], 90.0)
+        self.assertEqual(stats['payslips']['match_rate'], 100.0)
+
+        transactions = stats['transactions']
+        self.assertEqual((transactions['total'], transactions['classified'], transactions['unclassified']), (11, 9, 2))
+        self.assertEqual(transactions['classified_rate'], 81.8)
+        self.assertEqual((transactions['low_confidence'], transactions['needs_review']), (4, 2))
+
+    def test_statement_coverage_from_active_days(self):
+        coverage = compute_period_stats(db_manager=FakeDBManager(), tenant_id='delta',
+                                        start_date=PERIOD['start_date'], end_date=PERIOD['end_date'],
+                                        stat_names=('statement_coverage',))['statement_coverage']
+
+        # 2024-03-31 has only archived transactions
+        self.assertEqual(coverage['overall_coverage_pct'], round(20 / 31 * 100, 1))
+        self.assertEqual(coverage['accounts_with_coverage'], 2)
+        self.assertEqual(coverage['accounts'][0]['gaps'], [{'from': '2024-03-05', 'to': '2024-03-20', 'days': 15}])
+        self.assertTrue(coverage['has_gaps'])
+        self.assertEqual(coverage['accounts'][1]['transactions'], 9)
+
+    def test_no_statement_transactions(self):
+        coverage = compute_period_stats(FakeDBManager(**{'GROUP BY date': []}), 'delta', PERIOD['start_date'],
+                                        PERIOD['end_date'], ('statement_coverage',))['statement_coverage']
+        self.assertEqual(coverage['accounts_without_coverage'], 2)
+        self.assertEqual(coverage['accounts'][0]['gaps'], [{'from': '2024-03-01', 'to': '2024-03-31', 'days': 31}])
+
+    def test_failed_source_only_affects_its_stats(self):
+        db = FakeDBManager(**{'FROM bank_accounts': RuntimeError('no bank_accounts')})
+        stats = compute_period_stats(db, 'delta', PERIOD['start_date'], PERIOD['end_date'])
+
+        self.assertEqual(stats['statement_coverage']['error'], 'no bank_accounts')
+        self.assertNotIn('error', stats['transactions'])
+
+
+class TestCheckEvaluation(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = compute_period_stats(FakeDBManager(), 'delta', PERIOD['start_date'], PERIOD['end_date'])
+
+    def test_threshold(self):
+        self.assertTrue(evaluate_check('invoices_matched', self.stats, 90.0)['passed'])
+        self.assertFalse(evaluate_check('invoices_matched', self.stats)['passed'])
+
+    def test_low_confidence_reviewed(self):
+        result = evaluate_check('low_confidence_reviewed', self.stats, 50.0)
+        self.assertEqual((result['matched'], result['total'], result['percentage']), (2, 4, 50.0))
+        self.assertTrue(result['passed'])
+
+    def test_coverage_with_gaps_fails(self):
+        self.assertFalse(evaluate_check('statement_coverage', self.stats, 0)['passed'])
+
+    def test_unknown_type(self):
+        self.assertIn('error', evaluate_check('inventory_counted', self.stats))
+
+
+class TestRunChecks(unittest.TestCase):
+
+    def test_results_and_stats_saved_in_batches(self):
+        db = FakeDBManager()
+        items = [
+            {'id': 'item-1', 'auto_check_type': 'invoices_matched', 'threshold': 90.0},
+            {'id': 'item-2', 'auto_check_type': 'unclassified_resolved', 'threshold': None},
+            {'id': 'item-3', 'auto_check_type': 'low_confidence_reviewed', 'threshold': 40.0},
+        ]
+
+        with patch.object(close_checks.psycopg2.extras, 'execute_values') as execute_values:
+            results = run_checks(db, 'delta', PERIOD, items, user_id='user-1')
+
+        self.assertEqual([r['passed'] for r in results], [True, False, True])
+        self.assertEqual(results[1]['threshold'], 95.0)
+        # Payslips and bank accounts aren't needed by these checks
+        self.assertEqual(len([q for q in db.queries if 'SAVEPOINT' not in q]), 2)
+
+        update, upsert = execute_values.call_args_list
+        self.assertEqual([(row[0], row[2]) for row in update.args[2]],
+                         [('item-1', 'completed'), ('item-2', None), ('item-3', 'completed')])
+        self.assertEqual(sorted(row[1] for row in upsert.args[2]), ['invoices', 'transactions'])
+
+    def test_stats_failure_keeps_item_updates(self):
+        db = FakeDBManager()
+        items = [{'id': 'item-1', 'auto_check_type': 'invoices_matched', 'threshold': 90.0}]
+
+        def execute_values(cursor, query, rows, **kwargs):
+            if 'close_reconciliation_stats' in query:
+                raise RuntimeError('relation "close_reconciliation_stats" does not exist')
+
+        with patch.object(close_checks.psycopg2.extras, 'execute_values', side_effect=execute_values):
+            results = run_checks(db, 'delta', PERIOD, items)
+
+        self.assertNotIn('update_error', results[0])
+        self.assertIn('ROLLBACK TO SAVEPOINT close_reconciliation_stats', db.queries)
+        self.assertEqual((db.rollbacks, db.commits), (0, 1))
+
+    def test_update_failure_reported_on_results(self):
+        items = [{'id': 'item-1', 'auto_check_type': 'invoices_matched', 'threshold': 90.0}]
+        with patch.object(close_checks.psycopg2.extras, 'execute_values', side_effect=RuntimeError('db down')):
+            results = run_checks(FakeDBManager(), 'delta', PERIOD, items)
+        self.assertEqual(results[0]['update_error'], 'db down')
+
+
+class TestReconciliationStats(unittest.TestCase):
+
+    def test_saved_stats_reused(self):
+        saved = [('invoices', {'total': 3, 'match_rate': 100.0}, datetime(2024, 4, 1, 9, 0)),
+                 ('payslips', '{"total": 0, "match_rate": 100.0}', datetime(2024, 4, 1, 9, 0))]
+        db = FakeDBManager(**{'FROM close_reconciliation_stats': saved})
+
+        with patch.object(close_checks.psycopg2.extras, 'execute_values') as execute_values:
+            stats = get_reconciliation_stats(db, 'delta', PERIOD)
+
+        self.assertEqual(stats['invoices']['computed_at'], '2024-04-01T09:00:00')
+        self.assertEqual(stats['payslips']['total'], 0)
+        # Only the transaction stats were computed and saved
+        self.assertEqual(len(db.queries), 2)
+        self.assertEqual([row[1] for row in execute_values.call_args.args[2]], ['transactions'])
+
+    def test_refresh_recomputes(self):
+        saved = [('invoices', {'total': 3, 'match_rate': 100.0}, datetime(2024, 4, 1, 9, 0))]
+        db = FakeDBManager(**{'FROM close_reconciliation_stats': saved})
+
+        with patch.object(close_checks.psycopg2.extras, 'execute_values'):
+            stats = get_reconciliation_stats(db, 'delta', PERIOD, refresh=True)
+
+        self.assertEqual(stats['invoices']['total'], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for DatabaseManager batch operations
+Tests template grouping and multi-row INSERT rewriting without a live database
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+
+import database
+from database import (
+    DatabaseManager, _bulk_insert_template, _bulk_update_template, _group_operations,
+    _positional_placeholders,
+)
+
+
+UPSERT_PRICE = """
+    INSERT INTO crypto_historic_prices (date, symbol, price_usd, updated_at)
+    VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (date, symbol)
+    DO UPDATE SET price_usd = EXCLUDED.price_usd, updated_at = CURRENT_TIMESTAMP
+"""
+
+ACCUMULATE_USAGE = """
+    INSERT INTO api_usage (tenant_id, day, calls)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (tenant_id, day)
+    DO UPDATE SET calls = api_usage.calls + EXCLUDED.calls
+"""
+
+UPDATE_INVOICE = "UPDATE invoices SET linked_transaction_id = %s WHERE id = %s"
+DELETE_CHAIN = "DELETE FROM transaction_chains WHERE tenant_id = %s AND transaction_id = %s"
+
+
+class TestStatementTemplates(unittest.TestCase):
+    """Test statement rewriting helpers"""
+
+    def test_upsert_split_for_execute_values(self):
+        sql, row_template, key_indexes, idempotent = _bulk_insert_template(UPSERT_PRICE)
+        self.assertIn('VALUES %s', sql)
+        self.assertEqual(row_template, '(%s, %s, %s, CURRENT_TIMESTAMP)')
+        self.assertEqual(key_indexes, (0, 1))
+        self.assertTrue(idempotent)
+        self.assertFalse(_bulk_insert_template(ACCUMULATE_USAGE)[3])
+
+    def test_update_and_delete_join_a_values_list(self):
+        sql, table, columns, round_keys = _bulk_update_template(UPDATE_INVOICE)
+        self.assertEqual(sql, "UPDATE invoices SET linked_transaction_id = _batch_rows.p0 "
+                              "FROM (VALUES %s) AS _batch_rows (p0, p1) WHERE id = _batch_rows.p1")
+        self.assertEqual((table, columns, round_keys), ('invoices', ('linked_transaction_id', 'id'), (1,)))
+
+        sql, table, columns, round_keys = _bulk_update_template(DELETE_CHAIN)
+        self.assertIn('USING (VALUES %s) AS _batch_rows (p0, p1) WHERE tenant_id = _batch_rows.p0', sql)
+        self.assertIsNone(round_keys)
+
+    def test_updates_that_depend_on_row_order_fall_back(self):
+        self.assertIsNone(_bulk_update_template("UPDATE t SET n = n + %s WHERE id = %s"))
+        self.assertIsNone(_bulk_update_template("UPDATE t SET status = %s WHERE status = %s"))
+        self.assertIsNone(_bulk_update_template("UPDATE t SET a = %s WHERE id = %s OR ref = %s"))
+        self.assertIsNone(_bulk_update_template("UPDATE t SET a = %s WHERE id IN (SELECT id FROM u WHERE b = %s)"))
+        self.assertIsNone(_bulk_update_template("UPDATE t SET a = %s"))
+
+    def test_unsupported_inserts_fall_back(self):
+        self.assertIsNone(_bulk_insert_template("INSERT INTO t (a) VALUES (%s) RETURNING id"))
+        self.assertIsNone(_bulk_insert_template("INSERT INTO t (a) SELECT %s"))
+        self.assertIsNone(_bulk_insert_template(UPDATE_INVOICE))
+
+    def test_positional_placeholders(self):
+        self.assertEqual(
+            _positional_placeholders("UPDATE t SET a = %s WHERE b LIKE 'x%%' AND id = %s"),
+            ("UPDATE t SET a = $1 WHERE b LIKE 'x%' AND id = $2", 2),
+        )
+        self.assertIsNone(_positional_placeholders("SELECT %(name)s"))
+
+    def test_grouping_preserves_order_by_default(self):
+        operations = [{'query': 'a', 'params': (1,)}, {'query': 'b', 'params': (2,)}, {'query': 'a', 'params': (3,)}]
+        self.assertEqual(_group_operations(operations), [('a', [(1,)]), ('b', [(2,)]), ('a', [(3,)])])
+        self.assertEqual(_group_operations(operations, preserve_order=False), [('a', [(1,), (3,)]), ('b', [(2,)])])
+
+
+class TestExecuteBatchOperation(unittest.TestCase):
+    """Test that batches go out as grouped statements"""
+
+    def setUp(self):
+        with patch.object(DatabaseManager, '_init_connection_pool'):
+            self.manager = DatabaseManager()
+        self.manager.db_type = 'postgresql'
+        self.manager.connection_pool = None
+        self.conn = MagicMock()
+        self.cursor = self.conn.cursor.return_value
+        self.cursor.rowcount = 1
+        self.manager._checkout = MagicMock(return_value=self.conn)
+        self.manager._release = MagicMock()
+
+    def test_upserts_sent_as_one_statement_per_batch(self):
+        operations = [
+            {'query': UPSERT_PRICE, 'params': (f'2024-01-{day:02d}', 'BTC', 40000.0 + day)}
+            for day in range(1, 31)
+        ]
+        # A repeated conflict key keeps the last value, as sequential upserts would
+        operations.append({'query': UPSERT_PRICE, 'params': ('2024-01-01', 'BTC', 1.0)})
+
+        with patch.object(database.psycopg2.extras, 'execute_values') as execute_values:
+            self.cursor.rowcount = 30
+            result = self.manager.execute_batch_operation(operations, batch_size=1000)
+
+        execute_values.assert_called_once()
+        rows = execute_values.call_args.args[2]
+        self.assertEqual(len(rows), 30)
+        self.assertIn(('2024-01-01', 'BTC', 1.0), rows)
+        self.assertEqual(result['successful_batches'], 1)
+        self.assertEqual(result['total_rows_affected'], 30)
+
+    def test_accumulating_upserts_sharing_a_key_all_apply(self):
+        rows = [('delta', '2024-01-01', 5), ('delta', '2024-01-02', 1), ('delta', '2024-01-01', 7)]
+
+        with patch.object(database.psycopg2.extras, 'execute_values') as execute_values:
+            self.manager.execute_many(ACCUMULATE_USAGE, rows)
+
+        sent = [call.args[2] for call in execute_values.call_args_list]
+        self.assertEqual(sent, [rows[:2], rows[2:]])
+
+        # The caller can still ask for last-row-wins
+        with patch.object(database.psycopg2.extras, 'execute_values') as execute_values:
+            self.manager.execute_many(ACCUMULATE_USAGE, rows, collapse_upserts=True)
+        self.assertEqual(len(execute_values.call_args.args[2]), 2)
+
+    def test_updates_and_deletes_sent_as_one_statement(self):
+        self.cursor.fetchall.return_value = [
+            ('id', 'integer'), ('linked_transaction_id', 'text'), ('tenant_id', 'character varying(100)'),
+            ('transaction_id', 'text'),
+        ]
+        self.cursor.rowcount = 3
+        operations = [{'query': UPDATE_INVOICE, 'params': (f'tx{i}', i)} for i in range(3)]
+        operations += [{'query': DELETE_CHAIN, 'params': ('delta', f'tx{i}')} for i in range(3)]
+
+        with patch.object(database.psycopg2.extras, 'execute_values') as execute_values:
+            result = self.manager.execute_batch_operation(operations, batch_size=10)
+
+        self.assertEqual(execute_values.call_count, 2)
+        update, delete = execute_values.call_args_list
+        self.assertEqual(update.kwargs['template'], '(%s::text, %s::integer)')
+        self.assertEqual(delete.kwargs['template'], '(%s::character varying(100), %s::text)')
+        self.assertEqual(result['total_rows_affected'], 6)
+
+    def test_repeated_update_keys_keep_their_order(self):
+        self.cursor.fetchall.return_value = [('id', 'integer'), ('linked_transaction_id', 'text')]
+        rows = [('tx1', 1), ('tx2', 2), ('tx3', 1)]
+
+        with patch.object(database.psycopg2.extras, 'execute_values') as execute_values:
+            self.manager.execute_many(UPDATE_INVOICE, rows)
+
+        self.assertEqual([call.args[2] for call in execute_values.call_args_list], [rows[:2], rows[2:]])
+
+    def test_other_templates_keep_per_row_rowcounts(self):
+        # No column types (unknown table): the UPDATE runs once per row
+        operations = [{'query': UPDATE_INVOICE, 'params': (f'tx{i}', f'inv{i}')} for i in range(3)]
+        result = self.manager.execute_batch_operation(operations, batch_size=10)
+
+        statements = [call.args[0] for call in self.cursor.execute.call_args_list]
+        self.assertEqual(statements.count(UPDATE_INVOICE), 3)
+        self.assertEqual(result['total_rows_affected'], 3)
+
+    def test_failed_batch_is_counted(self):
+        operations = [{'query': UPDATE_INVOICE, 'params': ('tx', 'inv')}] * 4
+
+        def execute(query, params=None):
+            if query == UPDATE_INVOICE and params == ('tx', 'inv'):
+                raise database.psycopg2.Error('boom')
+
+        self.cursor.execute.side_effect = execute
+        result = self.manager.execute_batch_operation(operations, batch_size=2)
+        self.assertEqual(result['failed_batches'], 2)
+        self.assertEqual(len(result['errors']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for DatabaseManager units of work
+Tests connection sharing, savepoints and pool leak reclamation without a live database
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+import psycopg2.extensions
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+
+from database import DatabaseManager, ScopedConnection
+
+
+class FakePool:
+    """Minimal stand-in for psycopg2.pool.ThreadedConnectionPool"""
+
+    def __init__(self):
+        self._pool = []
+        self._used = {}
+        self.returned = []
+
+    def getconn(self):
+        conn = Mock(closed=False)
+        conn.get_transaction_status.return_value = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self._used[id(conn)] = conn
+        return conn
+
+    def putconn(self, conn, close=False):
+        self._used.pop(id(conn), None)
+        self.returned.append((conn, close))
+
+
+class TestUnitOfWork(unittest.TestCase):
+    """Test request/job scoped connections"""
+
+    def setUp(self):
+        with patch.object(DatabaseManager, '_init_connection_pool'):
+            self.manager = DatabaseManager()
+        self.manager.db_type = 'postgresql'
+        self.manager.connection_pool = FakePool()
+
+    def test_connection_shared_within_unit_of_work(self):
+        with self.manager.unit_of_work('test') as uow:
+            with self.manager.get_connection() as first:
+                first.close()  # no-op inside a unit of work
+            with self.manager.get_connection() as second:
+                pass
+            with self.manager.unit_of_work('nested') as nested:
+                self.assertIs(nested, uow)
+
+            self.assertIsInstance(first, ScopedConnection)
+            self.assertIs(first.raw_connection, second.raw_connection)
+            self.assertEqual(self.manager.get_pool_stats()['checkouts'], 1)
+
+        self.assertEqual(len(self.manager.connection_pool.returned), 1)
+        self.assertEqual(self.manager.get_pool_stats()['checked_out'], 0)
+
+    def test_unused_unit_of_work_never_checks_out(self):
+        token = self.manager.begin_request_scope()
+        self.manager.end_request_scope(token)
+        self.assertEqual(self.manager.get_pool_stats()['checkouts'], 0)
+
+    def test_nested_savepoint_rolls_back_independently(self):
+        with self.manager.unit_of_work('test') as uow:
+            with uow.savepoint() as conn:
+                with self.assertRaises(ValueError):
+                    with uow.savepoint():
+                        raise ValueError('boom')
+                conn.commit()  # kept; the outermost savepoint commits
+                raw = conn.raw_connection
+                raw.commit.assert_not_called()
+
+            statements = [c.args[0] for c in raw.cursor.return_value.execute.call_args_list]
+            self.assertEqual(statements, [
+                'SAVEPOINT uow_sp_1',
+                'SAVEPOINT uow_sp_2',
+                'ROLLBACK TO SAVEPOINT uow_sp_2',
+                'RELEASE SAVEPOINT uow_sp_2',
+                'RELEASE SAVEPOINT uow_sp_1; SAVEPOINT uow_sp_1',
+                'RELEASE SAVEPOINT uow_sp_1',
+            ])
+            raw.commit.assert_called_once()
+
+    def test_get_connection_blocks_share_transaction(self):
+        with self.manager.unit_of_work('test'):
+            with self.manager.get_connection() as conn:
+                raw = conn.raw_connection
+                conn.commit()
+            with self.assertRaises(ValueError):
+                with self.manager.get_connection():
+                    raise ValueError('boom')
+
+            # No savepoint round trips outside uow.savepoint()
+            raw.cursor.return_value.execute.assert_not_called()
+            raw.commit.assert_called_once()
+            raw.rollback.assert_called_once()
+
+    def test_caught_savepoint_failure_keeps_outer_writes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.manager.db_type = 'sqlite'
+            self.manager.connection_config = {'database': os.path.join(tmp, 'uow.db')}
+            self.manager.execute_query("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+
+            with self.manager.unit_of_work('test') as uow:
+                self.manager.execute_query("INSERT INTO items (id) VALUES (1)")
+                with uow.savepoint() as conn:
+                    conn.execute("INSERT INTO items (id) VALUES (2)")
+                    with self.assertRaises(Exception):
+                        with uow.savepoint():
+                            self.manager.execute_query("INSERT INTO items (id) VALUES (1)")
+                # The transaction is still usable after the caught error
+                self.manager.execute_query("INSERT INTO items (id) VALUES (3)")
+
+            rows = self.manager.execute_query("SELECT id FROM items ORDER BY id", fetch_all=True)
+            self.assertEqual([row[0] for row in rows], [1, 2, 3])
+
+    def test_rollback_after_commit_keeps_committed_work(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.manager.db_type = 'sqlite'
+            self.manager.connection_config = {'database': os.path.join(tmp, 'uow.db')}
+            self.manager.execute_query("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+
+            with self.manager.unit_of_work('test') as uow:
+                with uow.savepoint() as conn:
+                    conn.execute("INSERT INTO items (id) VALUES (1)")
+                    conn.commit()
+                    conn.execute("INSERT INTO items (id) VALUES (2)")
+                    conn.rollback()
+
+            rows = self.manager.execute_query("SELECT id FROM items ORDER BY id", fetch_all=True)
+            self.assertEqual([row[0] for row in rows], [1])
+
+    def test_open_transaction_rolled_back_on_close(self):
+        with self.manager.unit_of_work('test') as uow:
+            raw = uow.connection().raw_connection
+            raw.get_transaction_status.return_value = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        raw.rollback.assert_called_once()
+
+    def test_closed_pooled_connection_is_reclaimed(self):
+        conn = self.manager._get_postgresql_connection()
+        conn.closed = True  # conn.close() instead of returning it to the pool
+
+        self.assertEqual(self.manager.reclaim_leaked_connections(), 1)
+        self.assertEqual(self.manager.connection_pool.returned, [(conn, True)])
+
+        stats = self.manager.get_pool_stats()
+        self.assertEqual(stats['leaks_reclaimed'], 1)
+        self.assertEqual(sum(stats['leaks_by_caller'].values()), 1)
+        self.assertEqual(stats['checked_out'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for incremental IMAP scanning in InvoiceEmailMonitor
+Tests BODYSTRUCTURE parsing, UID checkpoints and selective attachment fetches
+against a local IMAP stand-in server
+"""
+
+import sys
+import os
+import re
+import shutil
+import socketserver
+import tempfile
+import threading
+import unittest
+from email.message import EmailMessage
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'invoice_processing'))
+
+from core.email_monitor import InvoiceEmailMonitor, bodystructure_parts, parse_fetch_response, parse_imap_response
+
+
+def make_email(subject, sender, attachment_name=None, attachment=b''):
+    message = EmailMessage()
+    message['Subject'] = subject
+    message['From'] = sender
+    message['Date'] = 'Mon, 13 Oct 2025 10:00:00 +0000'
+    message['Message-ID'] = f'<{abs(hash((subject, sender)))}@example.com>'
+    message.set_content('See attached.')
+    if attachment_name:
+        message.add_attachment(attachment, maintype='application', subtype='pdf', filename=attachment_name)
+    return message
+
+
+def quote(value):
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"' if value is not None else 'NIL'
+
+
+def bodystructure(part):
+    """Serialize a message's structure the way an IMAP server reports BODYSTRUCTURE"""
+    if part.get_content_type() == 'message/rfc822':
+        inner = part.get_payload()[0]
+        size = len(inner.as_bytes())
+        return f'("MESSAGE" "RFC822" NIL NIL NIL "7BIT" {size} NIL {bodystructure(inner)} 0)'
+    if part.is_multipart():
+        children = ''.join(bodystructure(child) for child in part.get_payload())
+        return f'({children} {quote(part.get_content_subtype().upper())})'
+
+    payload = part.get_payload().encode()
+    params = part.get_params()[1:] if part.get_params() else []
+    type_params = '(' + ' '.join(f'{quote(k.upper())} {quote(v)}' for k, v in params) + ')' if params else 'NIL'
+    fields = [quote(part.get_content_maintype().upper()), quote(part.get_content_subtype().upper()), type_params,
+              'NIL', 'NIL', quote(part.get('Content-Transfer-Encoding', '7BIT').upper()), str(len(payload))]
+    if part.get_content_maintype() == 'text':
+        fields.append(str(payload.count(b'\n')))
+    disposition = part.get_content_disposition()
+    if disposition:
+        filename = part.get_filename()
+        fields += ['NIL', f'({quote(disposition.upper())} ({quote("FILENAME")} {quote(filename)}))']
+    return '(' + ' '.join(fields) + ')'
+
+
+def body_section(message, section):
+    part = message
+    for index in section.split('.'):
+        if part.get_content_type() == 'message/rfc822':
+            part = part.get_payload()[0]
+        part = part.get_payload()[int(index) - 1] if part.is_multipart() else part
+    return part.get_payload().encode()
+
+
+class StandInImapServer(socketserver.ThreadingTCPServer):
+    """Just enough IMAP4rev1 for the monitor: LOGIN, SELECT, UID SEARCH, (UID) FETCH, CLOSE, LOGOUT"""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInImapHandler)
+        self.uid_validity = 1
+        self.messages = []  # (uid, message, seen)
+        self.commands = []
+        self.bytes_sent = 0
+
+    def add(self, message, seen=False):
+        uid = (self.messages[-1][0] if self.messages else 0) + 1
+        self.messages.append((uid, message, seen))
+        return uid
+
+
+class StandInImapHandler(socketserver.StreamRequestHandler):
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.server.bytes_sent += len(data)
+        self.wfile.write(data)
+
+    def handle(self):
+        self.send('* OK IMAP4rev1 stand-in ready\r\n')
+        for line in self.rfile:
+            tag, command, *rest = line.decode().rstrip('\r\n').split(' ', 2)
+            args = rest[0] if rest else ''
+            command = command.upper()
+            self.server.commands.append(f'{command} {args}'.strip())
+
+            if command == 'CAPABILITY':
+                self.send('* CAPABILITY IMAP4rev1\r\n')
+            elif command == 'SELECT':
+                next_uid = (self.server.messages[-1][0] if self.server.messages else 0) + 1
+                self.send(f'* {len(self.server.messages)} EXISTS\r\n'
+                          f'* OK [UIDVALIDITY {self.server.uid_validity}] UIDs valid\r\n'
+                          f'* OK [UIDNEXT {next_uid}] Predicted next UID\r\n')
+            elif command == 'UID':
+                subcommand, _, uid_args = args.partition(' ')
+                if subcommand.upper() == 'SEARCH':
+                    self.search(uid_args)
+                else:
+                    uid_set, _, items = uid_args.partition(' ')
+                    self.fetch(self.uids_in(uid_set), items)
+            elif command == 'FETCH' and args.startswith('*'):
+                uid = self.server.messages[-1][0]
+                self.send(f'* {len(self.server.messages)} FETCH (UID {uid})\r\n')
+            elif command == 'LOGOUT':
+                self.send('* BYE\r\n')
+                self.send(f'{tag} OK LOGOUT completed\r\n')
+                return
+            self.send(f'{tag} OK {command} completed\r\n')
+
+    def uids_in(self, uid_set):
+        highest = self.server.messages[-1][0] if self.server.messages else 0
+        uids = set()
+        for item in uid_set.split(','):
+            start, _, end = item.partition(':')
+            end = end or start
+            low, high = int(start), (highest if end == '*' else int(end))
+            uids.update(range(min(low, high), max(low, high) + 1))
+        return uids
+
+    def search(self, criteria):
+        match = re.match(r'UID (\S+)', criteria)
+        if match:
+            uids = self.uids_in(match.group(1))
+            found = [uid for uid, _, _ in self.server.messages if uid in uids]
+            if not found and self.server.messages:
+                found = [self.server.messages[-1][0]]  # "N:*" always includes the newest message
+        else:
+            found = [uid for uid, _, seen in self.server.messages if not seen]
+        self.send('* SEARCH ' + ' '.join(map(str, found)) + '\r\n')
+
+    def fetch(self, uids, items):
+        for number, (uid, message, _) in enumerate(self.server.messages, 1):
+            if uid not in uids:
+                continue
+            response = [f'UID {uid}'.encode()]
+            if 'BODYSTRUCTURE' in items:
+                response.append(b'BODYSTRUCTURE ' + bodystructure(message).encode())
+            header_match = re.search(r'BODY\.PEEK\[HEADER\.FIELDS \(([^)]*)\)\]', items)
+            if header_match:
+                names = header_match.group(1).split()
+                headers = ''.join(f'{name}: {message[name]}\r\n' for name in names if message[name]) + '\r\n'
+                response.append(f'BODY[HEADER.FIELDS ({header_match.group(1)})] {{{len(headers)}}}\r\n{headers}'.encode())
+            for section in re.findall(r'BODY\.PEEK\[([\d.]+)\]', items):
+                content = body_section(message, section)
+                response.append(f'BODY[{section}] {{{len(content)}}}\r\n'.encode() + content)
+            self.send(f'* {number} FETCH ('.encode() + b' '.join(response) + b')\r\n')
+
+
+class TestImapParsing(unittest.TestCase):
+    """Test response and BODYSTRUCTURE parsing"""
+
+    def test_literals_and_nested_lists(self):
+        data = [(b'1 (UID 7 BODY[HEADER.FIELDS (SUBJECT)] {20}', b'Subject: Invoice\r\n\r\n'),
+                b' FLAGS (\\Seen "a \\"b\\"" NIL))']
+        self.assertEqual(parse_imap_response(data), [
+            '1', ['UID', '7', 'BODY[HEADER.FIELDS (SUBJECT)]', b'Subject: Invoice\r\n\r\n',
+                  'FLAGS', ['\\Seen', 'a "b"', None]]
+        ])
+        self.assertEqual(parse_fetch_response(data)[7]['BODY[HEADER.FIELDS (SUBJECT)]'], b'Subject: Invoice\r\n\r\n')
+
+    def test_sections_of_nested_message(self):
+        outer = make_email('Fwd: invoice', 'me@example.com')
+        outer.add_attachment(make_email('AWS invoice', 'billing@aws.com', 'aws.pdf', b'%PDF-1.4'))
+        response = [b'1 (UID 1 BODYSTRUCTURE ' + bodystructure(outer).encode() + b')']
+
+        parts = bodystructure_parts(parse_fetch_response(response)[1]['BODYSTRUCTURE'])
+        self.assertEqual([(p['section'], p['content_type']) for p in parts], [
+            ('1', 'text/plain'), ('2', 'message/rfc822'), ('2.1', 'text/plain'), ('2.2', 'application/pdf')
+        ])
+        self.assertEqual(parts[3]['filename'], 'aws.pdf')
+        self.assertEqual(parts[3]['disposition'], 'attachment')
+        self.assertEqual(parts[3]['encoding'], 'base64')
+
+
+class TestIncrementalScan(unittest.TestCase):
+    """Test that each scan only transfers new mail and invoice attachments"""
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.server = StandInImapServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.monitor = InvoiceEmailMonitor.__new__(InvoiceEmailMonitor)
+        self.monitor.processed_emails = set()
+        self.monitor.running = False
+        self.monitor.email_config = {
+            'IMAP_SERVER': '127.0.0.1', 'IMAP_PORT': self.server.server_address[1], 'IMAP_SSL': False,
+            'EMAIL_ADDRESS': 'ap@delta.test', 'EMAIL_PASSWORD': 'secret', 'INBOX_FOLDER': 'INBOX',
+            'CHECKPOINT_FILE': os.path.join(self.workdir, 'checkpoint.json'),
+            'INITIAL_LOOKBACK_DAYS': 7, 'FETCH_BATCH_SIZE': 2,
+        }
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.workdir)
+
+    def scan(self):
+        self.server.commands.clear()
+        self.server.bytes_sent = 0
+        return self.monitor.scan_for_invoices()
+
+    def test_only_new_uids_and_invoice_attachments_fetched(self):
+        big = b'%PDF-1.4 ' + os.urandom(200_000)
+        self.server.add(make_email('Old invoice', 'billing@aws.com', 'old.pdf', big), seen=True)
+        invoice_uid = self.server.add(make_email('Invoice 1001', 'billing@aws.com', 'inv-1001.pdf', b'%PDF aws'))
+        photo_uid = self.server.add(make_email('Holiday photos', 'friend@example.com', 'beach.pdf', big))
+        self.server.add(make_email('Lunch?', 'friend@example.com'))
+
+        first = self.scan()
+        self.assertEqual([e['raw_email_id'] for e in first], [str(invoice_uid)])
+        self.assertEqual(first[0]['attachments'][0]['content'], b'%PDF aws')
+        self.assertEqual(first[0]['attachments'][0]['filename'], 'inv-1001.pdf')
+
+        # Only the invoice's attachment part was downloaded; the big attachments never were
+        part_fetches = [c for c in self.server.commands if re.search(r'BODY\.PEEK\[[\d.]+\]', c)]
+        self.assertEqual(part_fetches, [f'UID FETCH {invoice_uid} (BODY.PEEK[2])'])
+        self.assertLess(self.server.bytes_sent, 20_000)
+        self.assertNotIn(str(photo_uid), [e['raw_email_id'] for e in first])
+
+        # Nothing new: one search, no fetches
+        self.assertEqual(self.scan(), [])
+        self.assertFalse([c for c in self.server.commands if 'FETCH' in c])
+        self.assertIn('UID SEARCH UID 5:*', self.server.commands)
+
+        # New mail: only its UID is fetched
+        new_uid = self.server.add(make_email('Statement', 'accounts@bank.com', 'oct.pdf', b'%PDF bank'))
+        self.assertEqual([e['raw_email_id'] for e in self.scan()], [str(new_uid)])
+        fetched_uid_sets = {c.split(' ')[2] for c in self.server.commands if c.startswith('UID FETCH')}
+        self.assertEqual(fetched_uid_sets, {str(new_uid)})
+
+    def test_uidvalidity_change_rescans_lookback_window(self):
+        self.server.add(make_email('Invoice A', 'billing@aws.com', 'a.pdf', b'%PDF a'))
+        self.assertEqual(len(self.scan()), 1)
+        self.assertEqual(self.scan(), [])
+
+        self.server.uid_validity = 2
+        self.assertEqual(len(self.scan()), 1)
+        self.assertTrue(any('SINCE' in c for c in self.server.commands))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the financial forecast engine
+Tests the batch seasonal-naive, Holt-Winters and linear-trend models,
+confidence bands, scenario overlays on cached fits and fitting speed
+"""
+
+import sys
+import os
+import time
+import unittest
+from datetime import date
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui', 'services'))
+
+import forecast_engine
+from forecast_engine import (build_forecast, fit_entity_forecasts, fit_series, get_forecast_model,
+                             history_window, scenario_adjustments)
+from ledger_snapshot import TenantLedger
+from kpi_aggregator import invalidate_transaction_kpis
+
+SEASON = np.array([0, 10, 20, 30, 20, 10, 0, -10, -20, -30, -20, -10], dtype=np.float64)
+
+
+def seasonal_series(months=36, level=1000.0, slope=5.0):
+    t = np.arange(months)
+    return level + slope * t + SEASON[t % 12]
+
+
+def random_pl(entities, months, seed=7):
+    rng = np.random.default_rng(seed)
+    t = np.arange(months)
+    base = rng.uniform(1000, 50000, size=(entities, 1))
+    seasonality = 1 + 0.2 * np.sin(2 * np.pi * t / 12)
+    revenue = base * seasonality * (1 + 0.01 * t) + rng.normal(0, 500, size=(entities, months))
+    return {
+        'entities': [f'Entity {i}' for i in range(entities)],
+        'months': [date(2022 + m // 12, m % 12 + 1, 1) for m in range(months)],
+        'revenue': np.clip(revenue, 0, None),
+        'cogs': np.clip(revenue * 0.4, 0, None),
+        'sga': np.clip(revenue * 0.2 + 300, 0, None),
+        'transaction_count': np.full((entities, months), 20),
+    }
+
+
+class TestModels(unittest.TestCase):
+
+    def test_seasonal_naive_repeats_last_season(self):
+        history = np.vstack([seasonal_series(), seasonal_series(level=50)])
+        fit = fit_series(history, 'seasonal_naive', 14, season_length=12)
+
+        np.testing.assert_allclose(fit.point[:, :12], history[:, -12:])
+        np.testing.assert_allclose(fit.point[:, 12:], history[:, -12:-10])
+        # Errors of a whole extra season are wider
+        self.assertGreater(fit.stderr[0, 12], fit.stderr[0, 11])
+
+    def test_linear_trend_exact_on_a_line(self):
+        history = np.array([[100.0, 110.0, 120.0, 130.0], [5.0, 5.0, 5.0, 5.0]])
+        fit = fit_series(history, 'linear', 2)
+
+        np.testing.assert_allclose(fit.point, [[140.0, 150.0], [5.0, 5.0]])
+        np.testing.assert_allclose(fit.stderr, 0, atol=1e-9)
+
+    def test_holt_winters_follows_trend_and_season(self):
+        history = seasonal_series(months=48)[None, :]
+        fit = fit_series(history, 'holt_winters', 12, season_length=12)
+
+        expected = 1000 + 5.0 * np.arange(48, 60) + SEASON
+        np.testing.assert_allclose(fit.point[0], expected, rtol=0.02)
+        self.assertTrue(np.all(np.diff(fit.stderr[0]) >= 0))
+
+    def test_holt_without_a_full_season_pair(self):
+        fit = fit_series(np.array([[10.0, 20.0, 30.0, 40.0, 50.0]]), 'holt_winters', 3, season_length=12)
+        np.testing.assert_allclose(fit.point[0], [60.0, 70.0, 80.0], rtol=0.05)
+
+    def test_legacy_methods(self):
+        history = np.array([[30.0, 60.0, 90.0, 120.0]])
+        np.testing.assert_allclose(fit_series(history, 'moving_average', 2).point, [[90.0, 90.0]])
+        np.testing.assert_allclose(fit_series(history, 'weighted', 1).point, [[100.0 * 1.02]])
+
+    def test_short_history_and_unknown_method(self):
+        self.assertIsNone(fit_series(np.ones((2, 2)), 'linear', 3))
+        with self.assertRaises(ValueError):
+            fit_series(np.ones((2, 12)), 'arima', 3)
+
+
+class TestForecastAssembly(unittest.TestCase):
+
+    def setUp(self):
+        pl = random_pl(3, 24)
+        self.model = fit_entity_forecasts(pl, 'holt_winters', 6)
+
+    def test_entity_fits_split_by_metric(self):
+        self.assertEqual(self.model['fits']['sga'].point.shape, (3, 6))
+        self.assertEqual(len(self.model['periods']), 24)
+
+    def test_scenario_overlay_and_bands(self):
+        base = build_forecast(self.model, scenario_adjustments('base'), confidence_level=80)
+        pessimistic = build_forecast(self.model, scenario_adjustments('pessimistic', {'revenue': -20}), 95,
+                                     include_entities=True)
+
+        first_base, first = base['totals'][0], pessimistic['totals'][0]
+        self.assertAlmostEqual(first['revenue'], first_base['revenue'] * 0.8, delta=0.05)
+        self.assertLess(first['net_profit'], first_base['net_profit'])
+        band = first['bands']['revenue']
+        self.assertLess(band['lower'], first['revenue'])
+        self.assertGreater(band['upper'], first['revenue'])
+        self.assertEqual(len(pessimistic['entities']), 3)
+
+    def test_quarterly_periods(self):
+        model = fit_entity_forecasts(random_pl(2, 24), 'seasonal_naive', 4, granularity='quarterly')
+        self.assertEqual(model['history']['revenue'].shape, (2, 8))
+        self.assertEqual(model['periods'][1], date(2022, 4, 1))
+
+    def test_history_window_excludes_open_period(self):
+        self.assertEqual(history_window(date(2024, 5, 15), 'monthly', 12), (date(2023, 5, 1), date(2024, 4, 1)))
+        self.assertEqual(history_window(date(2024, 5, 15), 'quarterly', 4), (date(2023, 4, 1), date(2024, 3, 1)))
+
+    def test_unknown_scenario(self):
+        with self.assertRaises(ValueError):
+            scenario_adjustments('euphoric')
+
+
+class TestForecastCache(unittest.TestCase):
+
+    def setUp(self):
+        forecast_engine.forecast_cache.clear()
+        self.loads = 0
+        ledger = TenantLedger('forecast-tenant')
+        first, _ = history_window(date.today(), 'monthly', 12)
+        ledger.upsert_rows([
+            (f'tx-{i}', date(first.year + (first.month - 1 + i) // 12, (first.month - 1 + i) % 12 + 1, 10),
+             1000.0 + 100 * i, 1000.0 + 100 * i, 'Delta LLC', 'Revenue', None, False, None)
+            for i in range(12)
+        ])
+
+        def get_ledger(db_manager, tenant_id):
+            self.loads += 1
+            return ledger
+
+        self.original_get_ledger = forecast_engine.get_tenant_ledger
+        forecast_engine.get_tenant_ledger = get_ledger
+
+    def tearDown(self):
+        forecast_engine.get_tenant_ledger = self.original_get_ledger
+        forecast_engine.forecast_cache.clear()
+
+    def test_fits_reused_across_scenarios_until_data_changes(self):
+        args = dict(method='linear', horizon=3, historical_periods=12)
+        model, cached = get_forecast_model(None, 'forecast-tenant', **args)
+        self.assertFalse(cached)
+        np.testing.assert_allclose(model['fits']['revenue'].point, [[2200.0, 2300.0, 2400.0]])
+
+        for scenario in ('optimistic', 'pessimistic'):
+            model, cached = get_forecast_model(None, 'forecast-tenant', **args)
+            self.assertTrue(cached)
+            build_forecast(model, scenario_adjustments(scenario))
+        self.assertEqual(self.loads, 1)
+
+        invalidate_transaction_kpis('forecast-tenant')
+        _, cached = get_forecast_model(None, 'forecast-tenant', **args)
+        self.assertFalse(cached)
+
+
+class TestForecastBenchmark(unittest.TestCase):
+
+    def test_200_entity_series_by_36_months(self):
+        pl = random_pl(200, 36)
+        timings = {}
+        for method in ('seasonal_naive', 'holt_winters', 'linear'):
+            started = time.perf_counter()
+            model = fit_entity_forecasts(pl, method, 12)
+            build_forecast(model, scenario_adjustments('optimistic'), include_entities=True)
+            timings[method] = time.perf_counter() - started
+            self.assertEqual(model['fits']['revenue'].point.shape, (200, 12))
+
+        # 600 series per model; generous bound for slow CI machines, typically tens of milliseconds
+        self.assertLess(sum(timings.values()), 5, timings)
+
+
+if __name__ == '__main__':
+    unittest.main()
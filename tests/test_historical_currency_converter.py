@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for batched historical FX resolution
+Tests cache lookups, per-date fetching and bulk write-back with a stub rate provider
+"""
+
+import sys
+import os
+import unittest
+from contextlib import contextmanager
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+
+import historical_currency_converter
+from historical_currency_converter import CACHE_RATE_SQL, HistoricalCurrencyConverter, StubRateProvider, fx_key
+from database import _bulk_insert_template
+
+
+def _db_manager(cached_rows=None, invoices=None):
+    db = MagicMock()
+    conn = MagicMock()
+
+    def execute_query(query, params=None, fetch_one=False, fetch_all=False):
+        if 'FROM historical_exchange_rates' in query:
+            return cached_rows or []
+        if 'FROM invoices' in query:
+            return invoices or []
+        return None
+
+    @contextmanager
+    def get_connection():
+        yield conn
+
+    db.execute_query.side_effect = execute_query
+    db.execute_batch_operation.return_value = {'failed_batches': 0, 'errors': []}
+    db.get_connection = get_connection
+    db.conn = conn
+    return db
+
+
+def _rate_queries(db):
+    return [c for c in db.execute_query.call_args_list if 'FROM historical_exchange_rates' in c.args[0]]
+
+
+class TestResolveRates(unittest.TestCase):
+    """Test batch rate resolution"""
+
+    def test_batch_uses_one_lookup_and_one_fetch_per_date(self):
+        db = _db_manager(cached_rows=[
+            {'from_currency': 'EUR', 'rate_date': date(2024, 1, 1), 'exchange_rate': '1.10', 'api_source': 'fixer.io'},
+        ])
+        provider = StubRateProvider({'BRL': 0.2, 'PYG': 0.000137, ('EUR', '2024-01-02'): 1.09})
+        converter = HistoricalCurrencyConverter(db, rate_provider=provider)
+
+        pairs = [
+            ('EUR', '2024-01-01'), ('EUR', '2024-01-02 09:30:00'), ('BRL', '2024-01-02'),
+            ('GUARANI', date(2024, 1, 2)), ('BRL', '2024-01-03'), ('USD', '2024-01-01'),
+            ('EUR', 'not a date'),
+        ]
+        rates = converter.resolve_rates(pairs * 3)
+
+        self.assertEqual(len(_rate_queries(db)), 1)
+        self.assertEqual(provider.calls, [('2024-01-02', ('BRL', 'EUR', 'PYG')), ('2024-01-03', ('BRL',))])
+        self.assertEqual(rates[('EUR', '2024-01-01')], {'rate': 1.1, 'source': 'fixer.io', 'cached': True})
+        self.assertEqual(rates[('PYG', '2024-01-02')]['rate'], 0.000137)
+        self.assertEqual(rates[('USD', '2024-01-01')]['rate'], 1.0)
+        self.assertEqual(len(rates), 6)
+
+        db.execute_batch_operation.assert_called_once()
+        operations = db.execute_batch_operation.call_args.args[0]
+        self.assertEqual(len(operations), 4)
+        self.assertTrue(all(op['query'] is CACHE_RATE_SQL for op in operations))
+
+    def test_resolved_rates_memoized(self):
+        db = _db_manager()
+        provider = StubRateProvider({'EUR': 1.1})
+        converter = HistoricalCurrencyConverter(db, rate_provider=provider)
+
+        converter.resolve_rates([('EUR', '2024-01-01')])
+        conversion = converter.convert_invoice_amount(100.0, 'EUR', '2024-01-01')
+
+        self.assertEqual(len(_rate_queries(db)), 1)
+        self.assertEqual(len(provider.calls), 1)
+        self.assertEqual(conversion['converted_amount'], 110.0)
+        self.assertEqual(conversion['source'], 'cached_stub')
+
+    def test_missing_rate_falls_back_to_original_amount(self):
+        converter = HistoricalCurrencyConverter(_db_manager(), rate_provider=StubRateProvider({}))
+        conversion = converter.convert_invoice_amount(50.0, 'XYZ', '2024-01-01')
+        self.assertFalse(conversion['conversion_successful'])
+        self.assertEqual(conversion['converted_amount'], 50.0)
+
+    def test_write_back_is_a_single_statement(self):
+        self.assertIsNotNone(_bulk_insert_template(CACHE_RATE_SQL))
+        self.assertEqual(fx_key('gua', '2024-03-05 10:00:00'), ('PYG', '2024-03-05'))
+
+
+class TestBulkConvertInvoices(unittest.TestCase):
+    """Test vectorized invoice conversion"""
+
+    def test_invoices_updated_in_one_statement(self):
+        invoices = [
+            {'id': f'inv{i}', 'total_amount': '100.00', 'currency': currency, 'date': '2024-01-01', 'vendor_name': 'V'}
+            for i, currency in enumerate(['EUR', 'BRL', 'EUR', 'XYZ'])
+        ]
+        db = _db_manager(invoices=invoices)
+        converter = HistoricalCurrencyConverter(db, rate_provider=StubRateProvider({'EUR': 1.1, 'BRL': 0.2}))
+
+        with patch.object(historical_currency_converter.psycopg2.extras, 'execute_values') as execute_values:
+            results = converter.bulk_convert_invoices()
+
+        self.assertEqual(results['successful_conversions'], 3)
+        self.assertEqual(results['failed_conversions'], 1)
+        execute_values.assert_called_once()
+        rows = execute_values.call_args.args[2]
+        self.assertEqual(rows[0], ('inv0', 110.0, 1.1, '2024-01-01', 'stub'))
+        self.assertEqual([row[0] for row in rows], ['inv0', 'inv1', 'inv2'])
+        db.conn.commit.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
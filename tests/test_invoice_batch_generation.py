@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for batch crypto invoice generation
+Tests batch invoice numbering, parallel PDF rendering and discarding unsaved runs
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'crypto_invoice_system', 'services'))
+
+from invoice_generator import InvoiceGenerator
+
+
+def make_invoice(invoice_number, client_name, amount_usd):
+    return {
+        "invoice_number": invoice_number,
+        "client_name": client_name,
+        "client_contact": "ops@example.com",
+        "issue_date": "2025-10-01",
+        "due_date": "2025-10-08",
+        "amount_usd": amount_usd,
+        "crypto_currency": "USDT",
+        "crypto_network": "TRC20",
+        "crypto_amount": round(amount_usd / 0.9995, 6),
+        "exchange_rate": 0.9995,
+        "deposit_address": "TXyz123",
+        "billing_period": "October 2025",
+        "line_items": [{"description": "Hosting fees", "amount": amount_usd}],
+    }
+
+
+class TestInvoiceBatchGeneration(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.generator = InvoiceGenerator(self.output_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_batch_invoice_numbers_are_consecutive(self):
+        self.generator._get_next_sequence_number = lambda year_month: 41
+        numbers = self.generator.generate_invoice_numbers(3, date(2025, 10, 1))
+        self.assertEqual(numbers, ['DPY-2025-10-0041', 'DPY-2025-10-0042', 'DPY-2025-10-0043'])
+
+    def test_sequence_numbers_come_from_the_source(self):
+        months = []
+        generator = InvoiceGenerator(self.output_dir,
+                                     sequence_source=lambda year_month: months.append(year_month) or 7)
+        self.assertEqual(generator.generate_invoice_numbers(2, date(2025, 11, 3)),
+                         ['DPY-2025-11-0007', 'DPY-2025-11-0008'])
+        self.assertEqual(generator.generate_invoice_number(date(2025, 11, 3)), 'DPY-2025-11-0007')
+        self.assertEqual(months, ['2025-11', '2025-11'])
+
+    def test_discard_removes_rendered_files(self):
+        invoices = [make_invoice(f'DPY-2025-10-{i:04d}', f'Client {i}', 100.0) for i in range(2)]
+        self.generator.generate_invoice_batch(invoices, workers=0)
+        for invoice in invoices:
+            invoice['qr_code_path'] = self.generator._save_qr_code(b'png', f"qr_{invoice['invoice_number']}.png")
+        # A run that failed before its paths were recorded
+        del invoices[1]['pdf_path'], invoices[1]['qr_code_path']
+
+        self.generator.discard_invoice_batch(invoices)
+
+        self.assertEqual(os.listdir(self.output_dir), ['qr_codes'])
+        self.assertEqual(os.listdir(os.path.join(self.output_dir, 'qr_codes')), [])
+
+    def test_parallel_batch_matches_serial_rendering(self):
+        invoices = [make_invoice(f'DPY-2025-10-{i:04d}', f'Client {i}', 1000.0 + i) for i in range(6)]
+
+        results = self.generator.generate_invoice_batch(invoices, workers=2)
+
+        self.assertEqual([os.path.basename(r['pdf_path']) for r in results],
+                         [f'DPY-2025-10-{i:04d}.pdf' for i in range(6)])
+        for result in results:
+            with open(result['pdf_path'], 'rb') as f:
+                self.assertEqual(f.read(5), b'%PDF-')
+            self.assertNotIn('qr_code_path', result)
+
+        parallel_size = os.path.getsize(results[0]['pdf_path'])
+        serial = self.generator.generate_invoice_batch([make_invoice('DPY-2025-10-0000', 'Client 0', 1000.0)],
+                                                       workers=0)
+        self.assertAlmostEqual(os.path.getsize(serial[0]['pdf_path']), parallel_size, delta=64)
+
+
+if __name__ == '__main__':
+    unittest.main()
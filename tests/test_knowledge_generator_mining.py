@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for KnowledgeGenerator set-based mining
+Tests account usage folding, bulk existing-pattern checks and batched AI insights
+"""
+
+import sys
+import os
+import json
+import unittest
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'services'))
+
+import knowledge_generator
+from knowledge_generator import KnowledgeGenerator, fold_account_usage_rows
+
+USAGE_ROWS = [
+    # account_number, entity, category, subcategory, count, total, amount_count, first, last
+    ('1111', 'Delta LLC', 'OPERATING_EXPENSE', 'Payroll', 18, -36000, 18, '2025-01-02', '2025-12-30'),
+    ('1111', 'Delta Mining', 'OPERATING_EXPENSE', 'Power', 2, -900, 2, '2025-03-01', '2025-04-01'),
+    ('2222', 'Delta LLC', 'REVENUE', 'Sales', 6, 6000, 4, '2025-02-01', '2025-11-01'),
+    ('3333', 'Delta LLC', 'REVENUE', 'Sales', 3, 300, 3, '2025-02-01', '2025-03-01'),
+    ('4444', 'Delta LLC', 'REVENUE', 'Interest', 12, 120, 12, '2025-01-01', '2025-12-01'),
+]
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.db.queries.append(query)
+        if 'FROM bank_accounts' in query and 'WITH accounts' not in query:
+            self.rows = [(a, f'Account {a}', 'Bank') for a in ('1111', '2222', '3333', '4444', '5555')]
+        elif 'WITH accounts' in query:
+            self.rows = USAGE_ROWS
+        elif 'pattern_type IN' in query:
+            self.rows = [('account_number', '4444', 77), ('expense', '%NETFLIX.COM%', 78)]
+        elif 'RETURNING pattern_id' in query:
+            self.db.next_id += 1
+            self.rows = [(self.db.next_id,)]
+        else:
+            self.rows = []
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.queries = []
+        self.next_id = 100
+
+    @contextmanager
+    def get_connection(self):
+        yield SimpleNamespace(cursor=lambda: FakeCursor(self), commit=lambda: None)
+
+    @contextmanager
+    def unit_of_work(self, name='job'):
+        db = self
+
+        class Unit:
+            @contextmanager
+            def savepoint(self):
+                yield SimpleNamespace(cursor=lambda: FakeCursor(db))
+
+        yield Unit()
+
+
+class FakeClaude:
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = []
+        self.messages = SimpleNamespace(create=self.create)
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(content=[SimpleNamespace(text='Here you go:\n' + json.dumps(self.payload))])
+
+
+def make_generator(claude=None):
+    with patch.dict(os.environ, {'ANTHROPIC_API_KEY': ''}):
+        generator = KnowledgeGenerator('delta')
+    generator.claude = claude
+    return generator
+
+
+class TestAccountUsageFolding(unittest.TestCase):
+    """Test that grouped rows produce the per-account analysis shape"""
+
+    def test_most_common_pattern_and_frequency(self):
+        usage = fold_account_usage_rows(USAGE_ROWS)
+
+        self.assertEqual(sorted(usage), ['1111', '2222', '3333', '4444'])
+        payroll = usage['1111']
+        self.assertEqual(payroll['transaction_count'], 20)
+        self.assertEqual(payroll['most_common_entity'], 'Delta LLC')
+        self.assertAlmostEqual(payroll['frequency'], 90.0)
+        self.assertAlmostEqual(payroll['avg_amount'], -2000.0)
+        self.assertEqual([p['count'] for p in payroll['all_patterns']], [18, 2])
+
+        # NULL amounts don't count towards the average
+        self.assertAlmostEqual(usage['2222']['avg_amount'], 1500.0)
+
+
+class TestSetBasedAccountAnalysis(unittest.TestCase):
+    """Test that mining runs a fixed number of queries and only qualifying accounts reach the LLM"""
+
+    def test_thresholds_existing_patterns_and_one_llm_call(self):
+        db = FakeDatabase()
+        claude = FakeClaude([
+            {'account_number': '1111', 'description': 'Payroll account',
+             'justification': '90% payroll', 'confidence': 0.9},
+            {'account_number': '9999', 'description': 'Not asked for',
+             'justification': '-', 'confidence': 0.99},
+        ])
+        generator = make_generator(claude)
+
+        with patch.object(knowledge_generator, 'db_manager', db), \
+                patch.object(knowledge_generator, 'invalidate_tenant_knowledge') as invalidate:
+            results = generator.analyze_all_accounts(min_frequency=75.0, min_transactions=5)
+
+        # 5555 has no usage, 3333 too few transactions, 4444 already has a pattern
+        self.assertEqual(results, {'analyzed': 5, 'patterns_created': 2, 'insights_generated': 2})
+        self.assertEqual(len(claude.calls), 1)
+        prompt = claude.calls[0]['messages'][0]['content']
+        self.assertIn('Account Number: 1111', prompt)
+        self.assertIn('Account Number: 2222', prompt)
+        self.assertNotIn('Account Number: 4444', prompt)
+
+        mining_queries = [q for q in db.queries if 'INSERT' not in q]
+        self.assertEqual(len(mining_queries), 3)
+        self.assertEqual(generator.stats['llm_calls'], 1)
+        # Each new pattern retires the tenant's cached classification knowledge
+        self.assertEqual(invalidate.call_count, 2)
+        invalidate.assert_called_with('delta')
+
+    def test_insights_fall_back_for_accounts_missing_from_response(self):
+        claude = FakeClaude([{'account_number': 1111, 'description': 'Payroll',
+                              'justification': 'steady', 'confidence': '0.8'}])
+        generator = make_generator(claude)
+        usage = fold_account_usage_rows(USAGE_ROWS)
+
+        with patch.object(knowledge_generator, 'INSIGHT_BATCH_SIZE', 1):
+            summaries = generator.generate_account_insights([usage['1111'], usage['2222']])
+
+        self.assertEqual(len(claude.calls), 2)
+        self.assertEqual(summaries[0]['confidence'], 0.8)
+        self.assertEqual(summaries[1]['description'], 'Account used for Sales')
+        self.assertEqual(summaries[1]['confidence'], 0.85)
+
+
+class TestVendorAnalysis(unittest.TestCase):
+    """Test vendor candidates are filtered by frequency and existing patterns in memory"""
+
+    def test_existing_and_low_frequency_vendors_skipped(self):
+        db = FakeDatabase()
+        vendor_rows = [
+            ('NETFLIX.COM', 'Delta LLC', 'OPERATING_EXPENSE', 'Software', 12, 12, 15.99, 15.99, 15.99),
+            ('AWS EMEA', 'Delta LLC', 'OPERATING_EXPENSE', 'Hosting', 30, 32, 410.0, 200.0, 650.0),
+            ('UBER TRIP', 'Delta LLC', 'OPERATING_EXPENSE', 'Travel', 8, 20, 22.0, 9.0, 60.0),
+        ]
+        original_execute = FakeCursor.execute
+
+        def execute(cursor, query, params=None):
+            original_execute(cursor, query, params)
+            if 'vendor_keywords' in query:
+                cursor.rows = vendor_rows
+
+        with patch.object(knowledge_generator, 'db_manager', db), \
+                patch.object(FakeCursor, 'execute', execute), \
+                patch.object(knowledge_generator, 'invalidate_tenant_knowledge') as invalidate:
+            results = make_generator().analyze_recurring_vendors(min_frequency=75.0, min_transactions=5)
+
+        self.assertEqual(results['analyzed'], 3)
+        self.assertEqual(results['patterns_created'], 1)
+        inserts = [q for q in db.queries if 'INSERT' in q]
+        self.assertEqual(len(inserts), 1)
+        invalidate.assert_called_once_with('delta')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the single-scan KPI aggregator
+Tests grouping-set folding, per-tenant caching and the DataQueryService KPI path
+"""
+
+import sys
+import os
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui', 'services'))
+
+import kpi_aggregator
+from kpi_aggregator import KPICache, get_transaction_kpis, invalidate_transaction_kpis, tenant_where_clause
+from data_queries import DataQueryService
+
+
+def _row(entity=None, source=None, month=None, rollup=(1, 1, 1), **values):
+    row = {
+        'by_entity_rollup': rollup[0], 'by_source_rollup': rollup[1], 'by_month_rollup': rollup[2],
+        'classified_entity': entity, 'source_file': source, 'month': month,
+        'transaction_count': 0, 'revenue': 0, 'expenses': 0, 'needs_review': 0,
+        'min_date': None, 'max_date': None,
+    }
+    row.update(values)
+    return row
+
+
+GROUPING_ROWS = [
+    _row(rollup=(1, 1, 1), transaction_count=6, revenue=500, expenses=float('nan'), needs_review=2,
+         min_date=date(2023, 1, 5), max_date=date(2024, 7, 1)),
+    _row('Delta LLC', rollup=(0, 1, 1), transaction_count=2, revenue=300, expenses=20),
+    _row('Delta Mining', rollup=(0, 1, 1), transaction_count=3, revenue=200, expenses=40),
+    _row(None, rollup=(0, 1, 1), transaction_count=1),
+    _row(source='bank.csv', rollup=(1, 0, 1), transaction_count=4),
+    _row(source='chase.csv', rollup=(1, 0, 1), transaction_count=2),
+    _row(month=date(2024, 6, 1), rollup=(1, 1, 0), transaction_count=2, revenue=100),
+    _row(month=date(2024, 7, 1), rollup=(1, 1, 0), transaction_count=1, expenses=5),
+    _row(month=None, rollup=(1, 1, 0), transaction_count=3),
+]
+
+
+def _db_manager():
+    db = MagicMock()
+
+    def execute_query(query, params=None, fetch_one=False, fetch_all=False):
+        if 'GROUPING SETS' in query:
+            return GROUPING_ROWS
+        if 'FROM invoices' in query:
+            return {'total_invoices': 1, 'total_invoice_value': 10, 'paid_invoices': 1, 'overdue_invoices': 0}
+        raise AssertionError(f'unexpected query: {query}')
+
+    db.execute_query.side_effect = execute_query
+    return db
+
+
+class TestAggregation(unittest.TestCase):
+    """Test folding grouping-set rows into KPIs"""
+
+    def test_rows_folded_by_grouping_set(self):
+        db = _db_manager()
+        kpis = kpi_aggregator.aggregate_transaction_kpis(db, *tenant_where_clause('t1'))
+
+        db.execute_query.assert_called_once()
+        self.assertEqual(kpis['total_transactions'], 6)
+        self.assertEqual(kpis['total_expenses'], 0.0)  # NaN sum
+        self.assertEqual(kpis['needs_review'], 2)
+        self.assertEqual([e['name'] for e in kpis['entities']], ['Delta Mining', 'Delta LLC'])
+        self.assertEqual(kpis['source_files'], [('bank.csv', 4), ('chase.csv', 2)])
+        self.assertEqual([m['month'] for m in kpis['monthly_trends']], [date(2024, 7, 1), date(2024, 6, 1)])
+
+    def test_company_kpis_use_one_transaction_scan(self):
+        invalidate_transaction_kpis()
+        db = _db_manager()
+        kpis = DataQueryService(db, 't1').get_company_kpis()
+
+        self.assertEqual(db.execute_query.call_count, 2)  # aggregate + invoices
+        self.assertEqual(kpis['net_profit'], 500.0)
+        self.assertEqual(kpis['date_range'], {'min': '2023-01-05', 'max': '2024-07-01'})
+        self.assertEqual(kpis['years_of_data'], 1.5)
+        self.assertEqual(kpis['top_entities'][0],
+                         {'name': 'Delta Mining', 'transaction_count': 3, 'revenue': 200.0, 'expenses': 40.0})
+        self.assertEqual(kpis['monthly_trends'][0]['month'], '2024-07-01')
+        self.assertEqual(kpis['total_invoices'], 1)
+
+
+class TestKPICache(unittest.TestCase):
+    """Test per-(tenant, filter) caching"""
+
+    def setUp(self):
+        invalidate_transaction_kpis()
+
+    def test_cached_until_tenant_write(self):
+        db = _db_manager()
+        where_clause, params = tenant_where_clause('t1')
+        first = get_transaction_kpis(db, 't1', where_clause, params)
+        self.assertIs(get_transaction_kpis(db, 't1', where_clause, params), first)
+        get_transaction_kpis(db, 't1', where_clause + ' AND amount > 0', params)
+        get_transaction_kpis(db, 't2', *tenant_where_clause('t2'))
+        self.assertEqual(db.execute_query.call_count, 3)
+
+        invalidate_transaction_kpis('t1')
+        get_transaction_kpis(db, 't1', where_clause, params)
+        get_transaction_kpis(db, 't2', *tenant_where_clause('t2'))
+        self.assertEqual(db.execute_query.call_count, 4)
+
+    def test_lru_bound(self):
+        cache = KPICache(max_entries=2)
+        db = _db_manager()
+        for tenant in ('a', 'b', 'c'):
+            cache.get_or_compute(db, tenant, *tenant_where_clause(tenant))
+        cache.get_or_compute(db, 'a', *tenant_where_clause('a'))
+        self.assertEqual(db.execute_query.call_count, 4)
+        self.assertEqual(cache.misses, 4)
+
+    def test_cache_shared_between_module_aliases(self):
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+        import web_ui.services.kpi_aggregator
+        self.assertIs(web_ui.services.kpi_aggregator.kpi_cache, kpi_aggregator.kpi_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the tenant ledger snapshot
+Tests the vectorized period/category/total aggregates, incremental sync
+after writes and LRU eviction under the memory budget
+"""
+
+import sys
+import os
+import unittest
+from contextlib import contextmanager
+from datetime import date, datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui', 'services'))
+
+from ledger_snapshot import LedgerSnapshotCache, TenantLedger, _id_hash, months_ago
+from kpi_aggregator import invalidate_transaction_kpis
+
+T0 = datetime(2024, 4, 1, 9, 0)
+T1 = datetime(2024, 4, 2, 9, 0)
+
+
+def ledger_row(tx_id, day, amount, entity='Delta LLC', category='Revenue', archived=False, updated_at=T0):
+    return (tx_id, day, amount, amount, entity, category, None, archived, updated_at)
+
+
+ROWS = [
+    ledger_row('tx-1', date(2024, 1, 5), 1000.0),
+    ledger_row('tx-2', date(2024, 1, 5), -400.0, category='Utilities'),
+    ledger_row('tx-3', date(2024, 1, 20), 500.0),
+    ledger_row('tx-4', date(2024, 2, 10), -100.0, entity='Delta Paraguay', category=None),
+    ledger_row('tx-5', date(2024, 4, 2), 300.0, entity='Delta Paraguay'),
+    ledger_row('tx-6', None, 50.0),
+    ledger_row('tx-7', date(2024, 2, 11), None),
+]
+
+
+class FakeCursor:
+
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.db.queries.append(query)
+        if 'COUNT(*)' in query:
+            self.rows = [(len(self.db.table), sum(_id_hash(row[0]) for row in self.db.table))]
+        elif 'SELECT transaction_id FROM' in query:
+            self.rows = [(row[0],) for row in self.db.table]
+        elif 'updated_at >=' in query:
+            self.rows = [row for row in self.db.table if row[8] >= self.db.changed_since]
+        else:
+            self.rows = list(self.db.table)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def close(self):
+        pass
+
+
+class FakeDBManager:
+    """Serves the transactions table as ledger column tuples"""
+
+    def __init__(self, rows):
+        self.table = list(rows)
+        self.changed_since = T1
+        self.queries = []
+
+    @contextmanager
+    def get_connection(self):
+        yield self
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+def build_ledger(rows=ROWS):
+    ledger = TenantLedger('delta')
+    ledger.upsert_rows(rows)
+    return ledger
+
+
+class TestLedgerAggregates(unittest.TestCase):
+
+    def setUp(self):
+        self.ledger = build_ledger()
+
+    def test_mask_skips_missing_amounts_and_filters_entity(self):
+        self.assertEqual(int(self.ledger.mask().sum()), 6)
+        selected = self.ledger.mask(date(2024, 1, 1), date(2024, 3, 31), 'Delta LLC')
+        self.assertEqual(int(selected.sum()), 3)
+        self.assertFalse(self.ledger.mask(entity='Unknown Entity').any())
+
+    def test_monthly_summary(self):
+        months = self.ledger.period_summary(self.ledger.mask(), 'monthly')
+
+        self.assertEqual([m['period'] for m in months],
+                         [datetime(2024, 1, 1), datetime(2024, 2, 1), datetime(2024, 4, 1)])
+        january = months[0]
+        self.assertEqual((january['revenue'], january['expenses'], january['net_profit']), (1500.0, 400.0, 1100.0))
+        self.assertEqual((january['transaction_count'], january['avg_revenue_transaction']), (3, 750.0))
+        self.assertIsNone(months[2]['avg_expense_transaction'])
+
+    def test_quarterly_and_yearly_periods(self):
+        quarters = self.ledger.period_summary(self.ledger.mask(), 'quarterly')
+        self.assertEqual([(q['period'].month, q['transaction_count']) for q in quarters], [(1, 4), (4, 1)])
+        self.assertEqual(len(self.ledger.period_summary(self.ledger.mask(), 'yearly')), 1)
+
+    def test_category_summary(self):
+        categories = self.ledger.category_summary(self.ledger.mask(end_date=date(2024, 3, 31)))
+
+        self.assertEqual([c['category'] for c in categories], ['Revenue', 'Utilities', 'Uncategorized'])
+        self.assertEqual((categories[0]['revenue'], categories[0]['transaction_count'],
+                          categories[0]['active_days']), (1500.0, 2, 2))
+
+    def test_totals(self):
+        totals = self.ledger.totals(self.ledger.mask(date(2024, 1, 1), date(2024, 12, 31)))
+
+        self.assertEqual((totals['total_revenue'], totals['total_expenses'], totals['net_position']),
+                         (1800.0, 500.0, 1300.0))
+        self.assertEqual((totals['active_months'], totals['largest_outflow'], totals['largest_inflow']),
+                         (3, -400.0, 1000.0))
+        self.assertEqual(self.ledger.totals(self.ledger.mask(entity='Nobody'))['transaction_count'], 0)
+
+    def test_monthly_pl_by_entity(self):
+        ledger = build_ledger(ROWS + [
+            ledger_row('tx-8', date(2024, 2, 3), -250.0, entity=None, category='Cost of Goods Sold'),
+        ])
+        pl = ledger.monthly_pl_by_entity(ledger.mask(), date(2024, 1, 1), date(2024, 3, 1))
+
+        self.assertEqual(pl['entities'], ['Unassigned', 'Delta LLC', 'Delta Paraguay'])
+        self.assertEqual(pl['months'], [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1)])
+        self.assertEqual(pl['revenue'][1].tolist(), [1500.0, 0.0, 0.0])
+        self.assertEqual(pl['sga'][:, :2].tolist(), [[0.0, 0.0], [400.0, 0.0], [0.0, 100.0]])
+        self.assertEqual(pl['cogs'][0].tolist(), [0.0, 250.0, 0.0])
+
+    def test_months_ago_clamps_day(self):
+        self.assertEqual(months_ago(date(2024, 3, 31), 1), date(2024, 2, 29))
+        self.assertEqual(months_ago(date(2024, 1, 15), 12), date(2023, 1, 15))
+
+
+class TestLedgerSnapshotCache(unittest.TestCase):
+
+    def test_built_once_and_synced_after_writes(self):
+        db = FakeDBManager(ROWS)
+        cache = LedgerSnapshotCache()
+
+        ledger = cache.get(db, 'ledger-sync')
+        self.assertIs(cache.get(db, 'ledger-sync'), ledger)
+        self.assertEqual((cache.builds, len(db.queries)), (1, 1))
+
+        # One row edited, one appended
+        db.table[0] = ledger_row('tx-1', date(2024, 1, 5), 2000.0, updated_at=T1)
+        db.table.append(ledger_row('tx-8', date(2024, 4, 3), -75.0, updated_at=T1))
+        invalidate_transaction_kpis('ledger-sync')
+
+        ledger = cache.get(db, 'ledger-sync')
+        self.assertEqual((cache.builds, cache.syncs), (1, 1))
+        self.assertEqual(len(ledger), 8)
+        self.assertEqual(ledger.totals(ledger.mask(end_date=date(2024, 1, 31)))['total_revenue'], 2500.0)
+        self.assertEqual(ledger.watermark, T1)
+
+    def test_published_snapshot_is_never_modified(self):
+        db = FakeDBManager(ROWS)
+        cache = LedgerSnapshotCache()
+        published = cache.get(db, 'ledger-cow')
+        amounts = published.amounts
+
+        db.table[0] = ledger_row('tx-1', date(2024, 1, 5), 2000.0, updated_at=T1)
+        db.table.append(ledger_row('tx-8', date(2024, 4, 3), -75.0, updated_at=T1))
+        cache.append_ingested(db, 'ledger-cow')
+
+        self.assertIs(published.amounts, amounts)
+        self.assertEqual((len(published), published.amounts[0]), (7, 1000.0))
+        synced = cache.get(db, 'ledger-cow')
+        self.assertIsNot(synced, published)
+        self.assertEqual((len(synced), synced.amounts[0]), (8, 2000.0))
+
+    def test_deleted_rows_dropped(self):
+        db = FakeDBManager(ROWS)
+        cache = LedgerSnapshotCache()
+        cache.get(db, 'ledger-delete')
+
+        del db.table[1]
+        cache.append_ingested(db, 'ledger-delete')
+
+        ledger = cache.get(db, 'ledger-delete')
+        self.assertEqual(cache.builds, 1)
+        self.assertEqual(len(ledger), 6)
+        self.assertNotIn('tx-2', list(ledger.transaction_ids))
+        self.assertEqual(ledger.totals(ledger.mask(end_date=date(2024, 1, 31)))['total_expenses'], 0.0)
+
+    def test_delete_plus_insert_with_same_count(self):
+        db = FakeDBManager(ROWS)
+        cache = LedgerSnapshotCache()
+        cache.get(db, 'ledger-swap')
+
+        del db.table[1]
+        db.table.append(ledger_row('tx-9', date(2024, 4, 5), 10.0, updated_at=T1))
+        cache.append_ingested(db, 'ledger-swap')
+
+        ids = list(cache.get(db, 'ledger-swap').transaction_ids)
+        self.assertEqual(len(ids), 7)
+        self.assertNotIn('tx-2', ids)
+        self.assertIn('tx-9', ids)
+
+    def test_append_ingested_ignores_unloaded_tenants(self):
+        db = FakeDBManager(ROWS)
+        LedgerSnapshotCache().append_ingested(db, 'ledger-unloaded')
+        self.assertEqual(db.queries, [])
+
+    def test_lru_eviction_under_memory_budget(self):
+        db = FakeDBManager(ROWS)
+        cache = LedgerSnapshotCache(memory_budget_bytes=build_ledger().nbytes * 2)
+
+        cache.get(db, 'tenant-a')
+        cache.get(db, 'tenant-b')
+        cache.get(db, 'tenant-a')
+        cache.get(db, 'tenant-c')
+
+        self.assertEqual(list(cache._ledgers), ['tenant-a', 'tenant-c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
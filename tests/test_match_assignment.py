@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for global invoice/transaction match assignment
+Tests one-to-one conflict resolution, split payments and the greedy fallback
+"""
+
+import sys
+import os
+import unittest
+from dataclasses import dataclass
+from unittest.mock import Mock, patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+
+import match_assignment
+from match_assignment import select_consistent_matches, solve_global_assignment
+
+
+@dataclass
+class FakeMatch:
+    invoice_id: str
+    transaction_id: str
+    score: float
+    match_type: str = 'AMOUNT_DATE'
+    confidence_level: str = 'MEDIUM'
+    explanation: str = 'Amount close'
+    auto_match: bool = True
+
+
+class TestOneToOneAssignment(unittest.TestCase):
+    """Test that every transaction and invoice is proposed at most once"""
+
+    CANDIDATES = [
+        # Greedy would give T1 to I1 (0.95) and leave I2 with nothing
+        ('I1', 'T1', 0.95), ('I1', 'T2', 0.90),
+        ('I2', 'T1', 0.92),
+        # Independent component
+        ('I3', 'T3', 0.80), ('I3', 'T3', 0.60),
+    ]
+
+    def test_maximum_weight_assignment(self):
+        result = solve_global_assignment(self.CANDIDATES)
+        self.assertEqual(
+            sorted(result.pairs),
+            [('I1', 'T2', 0.90), ('I2', 'T1', 0.92), ('I3', 'T3', 0.80)]
+        )
+        self.assertEqual(result.components, 2)
+        self.assertEqual(result.candidates, 4)
+        self.assertEqual(result.dropped, 1)
+
+    def test_greedy_fallback_without_scipy(self):
+        with patch.object(match_assignment, 'SCIPY_AVAILABLE', False):
+            result = solve_global_assignment(self.CANDIDATES)
+        invoices = [p[0] for p in result.pairs]
+        transactions = [p[1] for p in result.pairs]
+        self.assertEqual(len(invoices), len(set(invoices)))
+        self.assertEqual(len(transactions), len(set(transactions)))
+        self.assertIn(('I1', 'T1', 0.95), result.pairs)
+
+
+class TestSplitPayments(unittest.TestCase):
+    """Test subset-sum grouping on small components"""
+
+    def test_installments_grouped_for_review(self):
+        matches = [
+            FakeMatch('INV-1', 'TX-A', 0.55),
+            FakeMatch('INV-1', 'TX-B', 0.50),
+            FakeMatch('INV-1', 'TX-C', 0.45),
+            FakeMatch('INV-2', 'TX-D', 0.97, auto_match=True),
+        ]
+        invoices = [{'id': 'INV-1', 'total_amount': 1000}, {'id': 'INV-2', 'total_amount': 250}]
+        transactions = [
+            {'transaction_id': 'TX-A', 'amount': 600},
+            {'transaction_id': 'TX-B', 'amount': 400},
+            {'transaction_id': 'TX-C', 'amount': 75},
+            {'transaction_id': 'TX-D', 'amount': -250},
+        ]
+
+        kept, result = select_consistent_matches(matches, invoices, transactions)
+
+        self.assertEqual(len(result.groups), 1)
+        self.assertEqual(result.groups[0].kind, 'PARTIAL_PAYMENT')
+        grouped = [m for m in kept if m.match_type == 'PARTIAL_PAYMENT']
+        self.assertEqual(sorted(m.transaction_id for m in grouped), ['TX-A', 'TX-B'])
+        self.assertTrue(all(not m.auto_match and 'Split payment' in m.explanation for m in grouped))
+        self.assertIn(matches[3], kept)
+        self.assertNotIn('TX-C', [m.transaction_id for m in kept])
+
+    def test_batch_payment_covers_several_invoices(self):
+        result = solve_global_assignment(
+            [('I1', 'T1', 0.5), ('I2', 'T1', 0.4), ('I3', 'T1', 0.3)],
+            invoice_amounts={'I1': 300.0, 'I2': 200.0, 'I3': 999.0},
+            transaction_amounts={'T1': 500.0},
+        )
+        self.assertEqual(result.pairs, [])
+        self.assertEqual(len(result.groups), 1)
+        self.assertEqual(sorted(result.groups[0].invoice_ids), ['I1', 'I2'])
+        self.assertEqual(result.groups[0].kind, 'BATCH_PAYMENT')
+
+
+class TestAIStepKeepsGroups(unittest.TestCase):
+    """Test that the AI re-scoring step never turns split-payment members into auto matches"""
+
+    def test_group_members_stay_in_review(self):
+        import json
+        from revenue_matcher import MatchResult, RevenueInvoiceMatcher
+
+        client = Mock()
+        client.messages.create.return_value.content = [Mock(text=json.dumps({'evaluations': [
+            {'match_id': i, 'is_match': True, 'confidence': 0.95, 'adjusted_score': 0.95, 'reasoning': 'ok'}
+            for i in range(2)
+        ]}))]
+        with patch.object(RevenueInvoiceMatcher, '_init_claude_client', return_value=client):
+            matcher = RevenueInvoiceMatcher()
+
+        batch = [
+            MatchResult('INV-1', tx, 0.6, 'PARTIAL_PAYMENT', {}, 'MEDIUM', 'Split payment', False)
+            for tx in ('TX-A', 'TX-B')
+        ]
+        invoices = [{'id': 'INV-1', 'total_amount': 1000}]
+        transactions = [{'transaction_id': 'TX-A', 'amount': 600}, {'transaction_id': 'TX-B', 'amount': 400}]
+
+        enhanced = matcher._process_batch_with_ai(batch, invoices, transactions)
+        self.assertEqual([m.match_type for m in enhanced], ['PARTIAL_PAYMENT', 'PARTIAL_PAYMENT'])
+        self.assertTrue(all(not m.auto_match for m in enhanced))
+
+        with patch.object(matcher, '_apply_match') as apply_match, \
+                patch.object(matcher, '_save_pending_match') as save_pending:
+            stats = matcher.save_match_results(enhanced, auto_apply=True)
+        apply_match.assert_not_called()
+        self.assertEqual(save_pending.call_count, 2)
+        self.assertEqual(stats['pending_review'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for module singletons
+Tests that every alias of a module imported under several names shares one instance
+"""
+
+import sys
+import os
+import importlib.util
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+
+MODULE_SOURCE = '''
+from module_singletons import shared_instance
+
+
+class Cache:
+    pass
+
+
+cache = shared_instance(__name__, 'cache', Cache)
+'''
+
+
+def _load(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestSharedInstance(unittest.TestCase):
+    """Test instance sharing across module aliases"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cached_module.py')
+        with open(self.path, 'w') as f:
+            f.write(MODULE_SOURCE)
+        self.names = []
+
+    def tearDown(self):
+        for name in self.names:
+            sys.modules.pop(name, None)
+        self.tmp.cleanup()
+
+    def load(self, name, path=None):
+        self.names.append(name)
+        return _load(name, path or self.path)
+
+    def test_aliases_share_instance(self):
+        first = self.load('cached_module')
+        second = self.load('pkg_alias.cached_module')
+        self.assertIsNot(first, second)
+        self.assertIs(first.cache, second.cache)
+
+    def test_other_file_with_same_name_gets_its_own(self):
+        first = self.load('cached_module')
+        other_dir = os.path.join(self.tmp.name, 'other')
+        os.mkdir(other_dir)
+        other_path = os.path.join(other_dir, 'cached_module.py')
+        with open(other_path, 'w') as f:
+            f.write(MODULE_SOURCE)
+        other = self.load('other.cached_module', other_path)
+        self.assertIsNot(first.cache, other.cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the Pattern Validation Pipeline
+Tests batched prompts, response parsing, verdict caching, two-pass batching,
+retrying failed batch calls and the single-suggestion fallback
+"""
+
+import sys
+import os
+import json
+import asyncio
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+
+from pattern_validation_pipeline import (
+    PatternValidationPipeline,
+    PipelineStats,
+    normalize_pattern,
+    verdict_cache_key,
+    parse_batch_validation_response,
+    build_batch_validation_prompt,
+    clear_verdict_cache,
+)
+
+
+def _make_item(suggestion_id, pattern, entity='Acme', category='OPEX', occurrences=3):
+    return {
+        'suggestion_id': suggestion_id,
+        'pattern_data': {
+            'description_pattern': pattern,
+            'entity': entity,
+            'accounting_category': category,
+            'occurrence_count': occurrences,
+            'confidence_score': 0.8,
+        },
+        'supporting_transactions': [
+            {'date': '2024-01-01', 'description': pattern, 'amount': 100.0},
+            {'date': '2024-01-02', 'description': pattern, 'amount': 100.0},
+            {'date': '2024-01-03', 'description': pattern, 'amount': 100.0},
+        ],
+    }
+
+
+def _fake_client(verdict_for_prompt):
+    """Claude client stub answering every SUGGESTION in the prompt"""
+    client = Mock()
+
+    def create(**kwargs):
+        prompt = kwargs['messages'][0]['content']
+        count = prompt.count('SUGGESTION ')
+        results = [dict(index=i, **verdict_for_prompt(prompt)) for i in range(1, count + 1)]
+        response = Mock()
+        response.content = [Mock(text=json.dumps({'results': results}))]
+        return response
+
+    client.messages.create.side_effect = create
+    return client
+
+
+class RateLimited(Exception):
+    """Stand-in for the API's 429 error"""
+    status_code = 429
+
+
+def _rate_limit_calls(client, is_limited):
+    """Make the client's calls fail with a rate limit error where is_limited(call_number)"""
+    answer = client.messages.create.side_effect
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        if is_limited(len(calls)):
+            raise RateLimited()
+        return answer(**kwargs)
+
+    client.messages.create.side_effect = create
+    return client
+
+
+TENANT_CONTEXT = {'company_name': 'Test Co', 'entities': ['Acme'], 'existing_patterns': []}
+
+
+class TestCacheKeys(unittest.TestCase):
+    """Test pattern normalization for verdict cache keys"""
+
+    def test_normalize_pattern_ignores_case_wildcards_whitespace(self):
+        self.assertEqual(normalize_pattern('%AWS   Billing%'), 'aws billing')
+        self.assertEqual(normalize_pattern(None), '')
+
+    def test_cache_key_includes_tenant_entity_category(self):
+        key = verdict_cache_key('t1', {'description_pattern': '%Stripe%', 'entity': ' Acme ', 'accounting_category': 'Revenue'})
+        self.assertEqual(key, ('t1', 'stripe', 'acme', 'revenue'))
+
+
+class TestBatchResponseParsing(unittest.TestCase):
+    """Test parsing of batched validation responses"""
+
+    def test_parse_code_block_with_indexes(self):
+        text = '```json\n{"results": [{"index": 2, "is_valid": true}, {"index": 1, "is_valid": false}]}\n```'
+        verdicts = parse_batch_validation_response(text, 2)
+        self.assertTrue(verdicts[2]['is_valid'])
+        self.assertFalse(verdicts[1]['is_valid'])
+
+    def test_out_of_range_and_malformed_entries_are_dropped(self):
+        text = json.dumps({'results': [{'index': 5, 'is_valid': True}, {'index': 1}]})
+        self.assertEqual(parse_batch_validation_response(text, 2), {})
+
+    def test_invalid_json_returns_empty(self):
+        self.assertEqual(parse_batch_validation_response('not json', 3), {})
+
+    def test_prompt_lists_every_suggestion(self):
+        items = [_make_item(1, '%aws%'), _make_item(2, '%gcp%')]
+        prompt = build_batch_validation_prompt(TENANT_CONTEXT, items)
+        self.assertIn('SUGGESTION 1', prompt)
+        self.assertIn('SUGGESTION 2', prompt)
+
+
+class TestValidateItems(unittest.TestCase):
+    """Test batching, deduplication and caching in validate_items"""
+
+    def setUp(self):
+        clear_verdict_cache()
+
+    def test_batches_items_and_caches_verdicts(self):
+        client = _fake_client(lambda prompt: {'is_valid': True, 'reasoning': 'ok'})
+        pipeline = PatternValidationPipeline(client, batch_size=4, max_concurrency=2)
+        items = [_make_item(i, f'%vendor {i}%') for i in range(10)]
+
+        stats = PipelineStats(tenant_id='t1')
+        verdicts = asyncio.run(pipeline.validate_items('t1', TENANT_CONTEXT, items, stats))
+
+        self.assertEqual(len(verdicts), 10)
+        self.assertTrue(all(v['is_valid'] for v in verdicts.values()))
+        self.assertEqual(stats.llm_calls, 3)  # ceil(10 / 4)
+
+        # Second run is served entirely from the verdict cache
+        stats = PipelineStats(tenant_id='t1')
+        asyncio.run(pipeline.validate_items('t1', TENANT_CONTEXT, items, stats))
+        self.assertEqual(stats.llm_calls, 0)
+        self.assertEqual(stats.cache_hits, 10)
+
+    def test_duplicate_keys_are_validated_once(self):
+        client = _fake_client(lambda prompt: {'is_valid': True})
+        pipeline = PatternValidationPipeline(client)
+        items = [_make_item(1, '%Netflix%'), _make_item(2, 'netflix'), _make_item(3, '%NETFLIX  %')]
+
+        stats = PipelineStats(tenant_id='t1')
+        verdicts = asyncio.run(pipeline.validate_items('t1', TENANT_CONTEXT, items, stats))
+
+        self.assertEqual(set(verdicts), {1, 2, 3})
+        prompt = client.messages.create.call_args.kwargs['messages'][0]['content']
+        self.assertEqual(prompt.count('SUGGESTION '), 1)
+
+    def test_recurring_rejections_get_second_pass(self):
+        client = _fake_client(lambda prompt: {'is_valid': 'SECOND-PASS' in prompt, 'reasoning': 'r'})
+        pipeline = PatternValidationPipeline(client)
+        items = [_make_item(1, '%mining pool%', occurrences=20)]
+
+        stats = PipelineStats(tenant_id='t1')
+        verdicts = asyncio.run(pipeline.validate_items('t1', TENANT_CONTEXT, items, stats))
+
+        self.assertTrue(verdicts[1]['is_valid'])
+        self.assertEqual(verdicts[1]['pass_number'], 2)
+        self.assertEqual(stats.llm_calls, 2)
+
+    def test_rate_limited_batch_retried_with_backoff(self):
+        client = _rate_limit_calls(_fake_client(lambda prompt: {'is_valid': True}), lambda call: call == 1)
+        pipeline = PatternValidationPipeline(client, retry_base_delay=0)
+        items = [_make_item(1, '%aws%'), _make_item(2, '%gcp%')]
+
+        stats = PipelineStats(tenant_id='t1')
+        verdicts = asyncio.run(pipeline.validate_items('t1', TENANT_CONTEXT, items, stats))
+
+        self.assertEqual(set(verdicts), {1, 2})
+        self.assertEqual((stats.llm_calls, stats.llm_errors, stats.fallback_validations), (2, 1, 0))
+
+    def test_failing_batch_left_pending_instead_of_fanned_out(self):
+        client = _rate_limit_calls(_fake_client(lambda prompt: {'is_valid': True}), lambda call: True)
+        pipeline = PatternValidationPipeline(client, batch_size=4, retry_base_delay=0)
+        items = [_make_item(i, f'%vendor {i}%') for i in range(4)]
+
+        stats = PipelineStats(tenant_id='t1')
+        verdicts = asyncio.run(pipeline.validate_items('t1', TENANT_CONTEXT, items, stats))
+
+        self.assertEqual(verdicts, {})
+        self.assertEqual(client.messages.create.call_count, 3)
+        self.assertEqual((stats.deferred, stats.fallback_validations), (4, 0))
+
+    def test_deferred_second_pass_keeps_suggestion_pending(self):
+        # Pass 1 rejects, then every pass 2 attempt is rate limited
+        client = _rate_limit_calls(_fake_client(lambda prompt: {'is_valid': False, 'reasoning': 'r'}),
+                                   lambda call: call > 1)
+        pipeline = PatternValidationPipeline(client, retry_base_delay=0)
+
+        stats = PipelineStats(tenant_id='t1')
+        verdicts = asyncio.run(pipeline.validate_items(
+            't1', TENANT_CONTEXT, [_make_item(1, '%mining pool%', occurrences=20)], stats))
+
+        self.assertEqual(verdicts, {})
+        self.assertEqual(stats.deferred, 1)
+
+    def _malformed_client(self):
+        client = Mock()
+        client.messages.create.return_value.content = [Mock(text='not json')]
+        return client
+
+    def test_fallback_runs_off_the_event_loop(self):
+        threads = []
+
+        async def fallback(**kwargs):
+            threads.append(threading.get_ident())
+            return {'is_valid': True, 'model_used': 'single', 'pass_number': 1}
+
+        pipeline = PatternValidationPipeline(self._malformed_client())
+        stats = PipelineStats(tenant_id='t1')
+        with patch('pattern_validation_pipeline.validate_pattern_with_llm', fallback):
+            verdicts = asyncio.run(pipeline.validate_items(
+                't1', TENANT_CONTEXT, [_make_item(1, '%aws%')], stats))
+
+        self.assertTrue(verdicts[1]['is_valid'])
+        self.assertEqual(stats.fallback_validations, 1)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_failed_fallback_keeps_suggestion_pending(self):
+        async def fallback(**kwargs):
+            return {'is_valid': False, 'reasoning': 'LLM validation failed: timeout',
+                    'model_used': 'error', 'pass_number': 0}
+
+        pipeline = PatternValidationPipeline(self._malformed_client())
+        stats = PipelineStats(tenant_id='t1')
+        with patch('pattern_validation_pipeline.validate_pattern_with_llm', fallback):
+            verdicts = asyncio.run(pipeline.validate_items(
+                't1', TENANT_CONTEXT, [_make_item(1, '%aws%')], stats))
+
+        self.assertEqual(verdicts, {})
+        self.assertEqual(stats.deferred, 1)
+
+    def test_stats_report_throughput_and_latency(self):
+        stats = PipelineStats(tenant_id='t1')
+        stats.record_llm_call(100.0)
+        stats.record_llm_call(300.0, error=True)
+        summary = stats.to_dict()
+        self.assertEqual(summary['llm_calls'], 2)
+        self.assertEqual(summary['llm_errors'], 1)
+        self.assertEqual(summary['llm_latency_ms']['max'], 300.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the vectorized PayslipMatcher scoring kernel
+Tests that the array kernel returns exactly the matches of per-pair evaluation
+"""
+
+import sys
+import os
+import random
+import time
+import unittest
+from datetime import date, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+
+from payslip_matcher import PayslipMatcher, TransactionScoringIndex
+
+FIRST_NAMES = ['ana', 'joao', 'maria', 'li', 'carlos', 'sofia', 'pedro', 'alex']
+LAST_NAMES = ['silva', 'santos', 'oliveira', 'wei', 'costa', 'smithson', 'souza']
+DESCRIPTIONS = [
+    'ACH PAYMENT {name}', 'Salary {first}', 'wire transfer salary', 'AMAZON MKTPLACE',
+    'payroll run PS-{number}', '{last}', 'transfer to {first}{last}', 'bonus {name} monthly salary',
+    '', 'Office rent', 'Direct deposit {first} {last} ref {number}',
+]
+
+
+def build_dataset(payslip_count, transaction_count, seed=7):
+    rng = random.Random(seed)
+    base = date(2026, 1, 1)
+    payslips, transactions = [], []
+    for i in range(payslip_count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        payslips.append({
+            'id': f'ps-{i}',
+            'payslip_number': f'PS-{1000 + i}',
+            'payment_date': (base + timedelta(days=rng.randint(0, 365))).isoformat(),
+            'net_amount': round(rng.uniform(1500, 9000), 2),
+            'employee_name': f'{first.title()} {last.title()}',
+        })
+    for i in range(transaction_count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        template = rng.choice(DESCRIPTIONS)
+        amount = rng.choice([p['net_amount'] for p in payslips]) * rng.choice([1, 1, 1.02, 0.93, 0.85, 2])
+        transactions.append({
+            'transaction_id': f'tx-{i}',
+            'date': (base + timedelta(days=rng.randint(0, 365))).isoformat() if i % 50 else '03/15/2026',
+            'description': template.format(name=f'{first} {last}', first=first, last=last,
+                                           number=1000 + rng.randint(0, payslip_count)),
+            'amount': -round(amount, 2),
+            'accounting_category': rng.choice(['Payroll', 'Rent', None]),
+            'subcategory': rng.choice(['Employee', None]),
+        })
+    return payslips, transactions
+
+
+def build_payroll_year(workforce_size, seed=3):
+    """One month of payslips against a year of payroll runs plus other spend"""
+    rng = random.Random(seed)
+    salaries = {i: round(rng.uniform(2000, 12000), 2) for i in range(workforce_size)}
+    syllables = ['ka', 'ri', 'mo', 'lu', 'zen', 'ta', 'vi', 'no', 'bel', 'sa', 'do', 'ran']
+
+    def random_name():
+        return ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).title()
+
+    names = {i: f'{random_name()} {random_name()}' for i in salaries}
+    payslips = [
+        {'id': f'ps-{i}', 'payslip_number': f'PS-2026-12-{i}', 'payment_date': '2026-12-28',
+         'net_amount': salaries[i], 'employee_name': names[i]}
+        for i in salaries
+    ]
+    transactions = []
+    for month in range(1, 13):
+        for i in salaries:
+            transactions.append({
+                'transaction_id': f'pay-{month}-{i}', 'date': f'2026-{month:02d}-28',
+                'description': f'PAYROLL {names[i].upper()} {month:02d}/2026',
+                'amount': -salaries[i], 'accounting_category': 'Payroll', 'subcategory': 'Employee',
+            })
+        for j in range(workforce_size):
+            transactions.append({
+                'transaction_id': f'exp-{month}-{j}', 'date': f'2026-{month:02d}-{rng.randint(1, 28):02d}',
+                'description': f'VENDOR {rng.randint(1, 5000)} INVOICE {rng.randint(10000, 99999)}',
+                'amount': -round(rng.lognormvariate(6, 1.5), 2), 'accounting_category': 'Operations',
+            })
+    return payslips, transactions
+
+
+class TestScoringKernel(unittest.TestCase):
+    """Test kernel equivalence with the per-pair scorer"""
+
+    def setUp(self):
+        self.matcher = PayslipMatcher()
+
+    def brute_force(self, payslip, transactions):
+        results = [self.matcher._evaluate_match(payslip, t) for t in transactions]
+        return [r for r in results if r and r.score >= self.matcher.match_threshold_medium]
+
+    def test_same_matches_as_pairwise_evaluation(self):
+        payslips, transactions = build_dataset(40, 600)
+        index = TransactionScoringIndex(transactions, self.matcher._calculate_keyword_match_score)
+
+        total = 0
+        for payslip in payslips:
+            expected = self.brute_force(payslip, transactions)
+            actual = self.matcher._find_matches_for_single_payslip(payslip, transactions, index)
+            self.assertEqual(actual, expected, payslip['id'])
+            total += len(actual)
+        self.assertGreater(total, 0)
+
+    def test_name_index_finds_substrings_inside_tokens(self):
+        index = TransactionScoringIndex(
+            [{'transaction_id': 't1', 'description': 'Transfer JOAOSILVA', 'amount': -1},
+             {'transaction_id': 't2', 'description': 'Rent payment for the main office building', 'amount': -1}],
+            self.matcher._calculate_keyword_match_score
+        )
+        self.assertEqual(list(index.descriptions_containing('silva')), [0])
+        self.assertEqual(list(index.employee_candidates('Joao Silva')), [True, False])
+
+    def test_invalid_payslip_values_score_zero(self):
+        _, transactions = build_dataset(1, 20)
+        payslip = {'id': 'x', 'net_amount': None, 'payment_date': 'not a date', 'employee_name': ''}
+        self.assertEqual(self.matcher._find_matches_for_single_payslip(payslip, transactions), [])
+
+    def test_monthly_payroll_scale(self):
+        payslips, transactions = build_payroll_year(500)
+        started = time.perf_counter()
+        index = TransactionScoringIndex(transactions, self.matcher._calculate_keyword_match_score)
+        for payslip in payslips:
+            self.matcher._find_matches_for_single_payslip(payslip, transactions, index)
+        # Generous bound for slow CI machines; typically well under a second
+        self.assertLess(time.perf_counter() - started, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the PDF report rendering engine
+Tests the shared report data provider, cached styles, rendered-PDF caching
+and the merged board pack
+"""
+
+import sys
+import os
+import io
+import unittest
+from datetime import date
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui', 'services'))
+
+from PyPDF2 import PdfReader
+
+import pdf_report_engine
+from financial_report_data import fetch_report_data, report_windows
+from kpi_aggregator import invalidate_transaction_kpis
+from pdf_reports import DREReport, BalanceSheetReport, table_style
+from dmpl_report_new import DMPLReport
+
+
+def _row(rollup=3, category=None, entity=None, **values):
+    row = {
+        'totals_rollup': rollup, 'accounting_category': category, 'classified_entity': entity, 'period_count': 0,
+        'revenue': 0, 'expenses': 0, 'prev_revenue': 0, 'prev_expenses': 0, 'total_assets': 0,
+        'total_liabilities': 0, 'prev_total_assets': 0, 'prev_total_liabilities': 0,
+        'opening_equity': 0, 'beginning_cash': 0,
+    }
+    row.update(values)
+    return row
+
+
+REPORT_ROWS = [
+    _row(period_count=5, revenue=1000, expenses=400, prev_revenue=800, prev_expenses=300, total_assets=5000,
+         total_liabilities=2000, prev_total_assets=4000, prev_total_liabilities=1500, opening_equity=2500,
+         beginning_cash=700),
+    _row(0, 'Hosting', 'Delta LLC', period_count=2, revenue=0, expenses=400),
+    _row(0, 'Revenue', 'Delta LLC', period_count=3, revenue=1000),
+    # Category with only older transactions
+    _row(0, 'Legacy', 'Delta LLC', period_count=0, total_assets=50),
+]
+
+
+class FakeDBManager:
+    """Serves report data rows and records each query"""
+
+    def __init__(self, rows=None):
+        self.rows = REPORT_ROWS if rows is None else rows
+        self.queries = []
+
+    def execute_query(self, query, params=None, fetch_one=False, fetch_all=False):
+        self.queries.append((query, params))
+        return self.rows
+
+
+def pdf_text(pdf):
+    return '\n'.join(page.extract_text() for page in PdfReader(io.BytesIO(pdf)).pages)
+
+
+class TestFinancialReportData(unittest.TestCase):
+
+    def test_one_query_folds_totals_and_categories(self):
+        db = FakeDBManager()
+        data = fetch_report_data(db, 'delta', date(2024, 1, 1), date(2024, 6, 30), entity='Delta LLC')
+
+        self.assertEqual(len(db.queries), 1)
+        query, params = db.queries[0]
+        self.assertIn('classified_entity = %(entity)s', query)
+        self.assertIn('tenant_id = %(tenant_id)s', query)
+        self.assertEqual(params['prev_start'], date(2023, 1, 1))
+        self.assertEqual(params['opening_date'], date(2023, 12, 31))
+        self.assertEqual((params['tenant_id'], params['entity']), ('delta', 'Delta LLC'))
+
+        self.assertEqual(data['net_result'], 600)
+        self.assertEqual(data['prev_net_result'], 500)
+        self.assertEqual(data['total_equity'], 3000)
+        self.assertEqual(data['prev_total_equity'], 2500)
+        self.assertEqual([c['accounting_category'] for c in data['categories']], ['Revenue', 'Hosting'])
+
+    def test_report_windows_handle_leap_day(self):
+        windows = report_windows(date(2024, 2, 29), date(2024, 2, 29))
+        self.assertEqual(windows['prev_start'], date(2023, 2, 28))
+
+    def test_no_transactions(self):
+        data = fetch_report_data(FakeDBManager([]), 'delta', date(2024, 1, 1), date(2024, 6, 30))
+        self.assertEqual((data['net_result'], data['total_equity'], data['categories']), (0, 0, []))
+
+
+class TestReportTemplates(unittest.TestCase):
+
+    def test_styles_shared_between_reports(self):
+        first = DREReport(start_date=date(2024, 1, 1), end_date=date(2024, 6, 30))
+        second = BalanceSheetReport(end_date=date(2024, 6, 30))
+        self.assertIs(first.styles, second.styles)
+        self.assertIs(first._get_financial_table_style(), table_style('financial', True))
+
+    def test_reports_render_from_provided_data(self):
+        data = fetch_report_data(FakeDBManager(), 'delta', date(2024, 1, 1), date(2024, 6, 30))
+        report = DMPLReport(start_date=date(2024, 1, 1), end_date=date(2024, 6, 30), report_data=data)
+
+        pdf = report.generate_dmpl_report()
+
+        self.assertEqual(pdf[:5], b'%PDF-')
+        self.assertEqual(report.dmpl_data['beginning_equity'], 2500)
+        self.assertEqual(report.dmpl_data['ending_equity'], 3100)
+
+
+class TestRenderedReportCache(unittest.TestCase):
+
+    def setUp(self):
+        pdf_report_engine.report_cache.clear()
+        self.rendered = []
+        self.original_render = pdf_report_engine.render_report
+
+        def fake_render(report_type, *args, **kwargs):
+            self.rendered.append(report_type)
+            return f'{report_type}-{len(self.rendered)}'.encode()
+
+        pdf_report_engine.render_report = fake_render
+
+    def tearDown(self):
+        pdf_report_engine.render_report = self.original_render
+        pdf_report_engine.report_cache.clear()
+
+    def test_rendered_pdf_reused_until_tenant_data_changes(self):
+        args = ('dre', 'cache-tenant', 'Delta', date(2024, 1, 1), date(2024, 6, 30))
+
+        first = pdf_report_engine.get_report_pdf(*args)
+        self.assertEqual(pdf_report_engine.get_report_pdf(*args), first)
+        pdf_report_engine.get_report_pdf(*args, entity='Delta LLC')
+        self.assertEqual(self.rendered, ['dre', 'dre'])
+
+        invalidate_transaction_kpis('other-tenant')
+        self.assertEqual(pdf_report_engine.get_report_pdf(*args), first)
+        invalidate_transaction_kpis('cache-tenant')
+        self.assertNotEqual(pdf_report_engine.get_report_pdf(*args), first)
+
+    def test_unknown_report_type(self):
+        with self.assertRaises(ValueError):
+            pdf_report_engine.get_report_pdf('ledger', 'delta', 'Delta')
+
+
+class TestBoardPack(unittest.TestCase):
+
+    def setUp(self):
+        pdf_report_engine.report_cache.clear()
+
+    def tearDown(self):
+        pdf_report_engine.report_cache.clear()
+
+    def test_board_pack_merges_statements_from_one_query(self):
+        db = FakeDBManager()
+        args = ('delta', 'Delta Mining', date(2024, 1, 1), date(2024, 6, 30))
+
+        pack = pdf_report_engine.render_board_pack(*args, workers=0, db_manager=db)
+        self.assertIs(pdf_report_engine.render_board_pack(*args, workers=0, db_manager=db), pack)
+        self.assertEqual(len(db.queries), 1)
+
+        reader = PdfReader(io.BytesIO(pack))
+        self.assertEqual([item.title for item in reader.outline],
+                         [pdf_report_engine.REPORT_TYPES[t][3] for t in pdf_report_engine.BOARD_PACK_REPORTS])
+        text = pdf_text(pack)
+        self.assertIn('Balanço Patrimonial', text)
+        self.assertIn('Mutações do Patrimônio Líquido', text)
+
+    def test_parallel_board_pack_matches_serial(self):
+        args = ('delta', 'Delta Mining', date(2024, 1, 1), date(2024, 6, 30))
+        serial = pdf_report_engine.render_board_pack(*args, workers=0, db_manager=FakeDBManager())
+        pdf_report_engine.report_cache.clear()
+
+        parallel = pdf_report_engine.render_board_pack(*args, workers=2, db_manager=FakeDBManager())
+
+        self.assertEqual(len(PdfReader(io.BytesIO(parallel)).pages), len(PdfReader(io.BytesIO(serial)).pages))
+        self.assertAlmostEqual(len(parallel), len(serial), delta=256)
+
+
+if __name__ == '__main__':
+    unittest.main()
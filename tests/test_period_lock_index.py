@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the locked-period interval index
+Tests single-date lookups, vectorized batch checks, versioned invalidation
+and database reads for write paths
+"""
+
+import sys
+import os
+import random
+import unittest
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui', 'services'))
+
+from period_lock_index import LockedPeriods, PeriodLockIndex, date_ordinal
+
+
+def period(period_id, start, end, status='locked'):
+    return {'id': period_id, 'period_name': period_id, 'status': status, 'start_date': start, 'end_date': end}
+
+
+class FakeDBManager:
+    """Serves cfo_accounting_periods rows and counts queries"""
+
+    def __init__(self, rows=None, error=None):
+        self.rows = rows or []
+        self.error = error
+        self.queries = 0
+
+    @contextmanager
+    def get_connection(self):
+        yield self
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params):
+        self.queries += 1
+        if self.error:
+            raise self.error
+
+    def fetchall(self):
+        return [(p['id'], p['period_name'], p['status'], p['start_date'], p['end_date']) for p in self.rows]
+
+    def close(self):
+        pass
+
+
+class TestLockedPeriods(unittest.TestCase):
+    """Test that lookups agree with a linear scan of the periods"""
+
+    PERIODS = [
+        period('2024-03', date(2024, 3, 1), date(2024, 3, 31), 'closed'),
+        period('2024-01', date(2024, 1, 1), date(2024, 1, 31)),
+        period('2024-Q2', date(2024, 4, 1), date(2024, 6, 30)),
+        # Legacy period overlapping 2024-Q2
+        period('2024-05', date(2024, 5, 1), date(2024, 5, 31)),
+    ]
+
+    def linear_lookup(self, value):
+        ordinal = date_ordinal(value)
+        return any(ordinal and date_ordinal(p['start_date']) <= ordinal <= date_ordinal(p['end_date'])
+                   for p in self.PERIODS)
+
+    def test_date_formats(self):
+        index = LockedPeriods('delta', 0, self.PERIODS)
+
+        self.assertEqual(index.period_for('2024-03-15')['status'], 'closed')
+        self.assertEqual(index.period_for('03/15/2024')['period_name'], '2024-03')
+        self.assertEqual(index.period_for('2024-01-31 23:59:00')['period_name'], '2024-01')
+        self.assertEqual(index.period_for(date(2024, 6, 15))['period_name'], '2024-Q2')
+        self.assertIsNone(index.period_for('2024-02-15'))
+        self.assertIsNone(index.period_for('not a date'))
+        self.assertIsNone(index.period_for(None))
+
+    def test_single_and_batch_lookups_match_linear_scan(self):
+        index = LockedPeriods('delta', 0, self.PERIODS)
+        rng = random.Random(43)
+        dates = [date(2023, 12, 1) + timedelta(days=rng.randrange(250)) for _ in range(500)]
+        values = [d.strftime('%m/%d/%Y') if i % 2 else d for i, d in enumerate(dates)] + ['', None, '13/45/2024']
+
+        expected = [self.linear_lookup(value) for value in values]
+        self.assertEqual([index.period_for(value) is not None for value in values], expected)
+        self.assertEqual(index.locked_mask(values).tolist(), expected)
+
+    def test_no_periods(self):
+        index = LockedPeriods('delta', 0, [])
+        self.assertIsNone(index.period_for('2024-03-15'))
+        self.assertEqual(index.locked_mask(['2024-03-15', None]).tolist(), [False, False])
+
+
+class TestPeriodLockIndex(unittest.TestCase):
+    """Test index reuse, invalidation on lock changes and missing tables"""
+
+    def test_index_reused_until_invalidated(self):
+        db = FakeDBManager([period('2024-01', '2024-01-01', '2024-01-31')])
+        cache = PeriodLockIndex()
+
+        self.assertIsNotNone(cache.get(db, 'delta').period_for('2024-01-10'))
+        self.assertIsNotNone(cache.get(db, 'delta').period_for('2024-01-20'))
+        self.assertEqual(db.queries, 1)
+
+        # Period unlocked
+        db.rows = []
+        cache.invalidate('acme')
+        self.assertIsNotNone(cache.get(db, 'delta').period_for('2024-01-10'))
+        cache.invalidate('delta')
+        self.assertIsNone(cache.get(db, 'delta').period_for('2024-01-10'))
+        self.assertEqual(db.queries, 2)
+
+    def test_fresh_read_sees_lock_taken_elsewhere(self):
+        db = FakeDBManager()
+        cache = PeriodLockIndex()
+        self.assertIsNone(cache.get(db, 'delta').period_for('2024-01-10'))
+
+        # Another worker locks the period; this process was never invalidated
+        db.rows = [period('2024-01', '2024-01-01', '2024-01-31')]
+        self.assertIsNone(cache.get(db, 'delta').period_for('2024-01-10'))
+        self.assertIsNotNone(cache.get(db, 'delta', fresh=True).period_for('2024-01-10'))
+        self.assertEqual(db.queries, 2)
+
+        # The fresh read also refreshed the cached index
+        self.assertIsNotNone(cache.get(db, 'delta').period_for('2024-01-10'))
+        self.assertEqual(db.queries, 2)
+
+    def test_ttl_expiry(self):
+        db = FakeDBManager()
+        cache = PeriodLockIndex(ttl_seconds=0)
+        cache.get(db, 'delta')
+        cache.get(db, 'delta')
+        self.assertEqual(db.queries, 2)
+
+    def test_missing_table_means_nothing_locked(self):
+        db = FakeDBManager(error=Exception('relation "cfo_accounting_periods" does not exist'))
+        self.assertEqual(len(PeriodLockIndex().get(db, 'delta')), 0)
+
+        with self.assertRaises(ConnectionError):
+            PeriodLockIndex().get(FakeDBManager(error=ConnectionError('server closed')), 'delta')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the DatabaseManager query monitor
+Tests statement fingerprinting, per-scope accounting, N+1 detection and window flushes
+"""
+
+import sys
+import os
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+
+import database
+from database import QueryMonitor, fingerprint_query, param_shape
+
+
+class TestFingerprints(unittest.TestCase):
+    """Test statement normalization"""
+
+    def test_literals_and_placeholders_collapse(self):
+        self.assertEqual(
+            fingerprint_query("SELECT * FROM t WHERE id = %s AND name = 'O''Brien'  -- note\n LIMIT 10"),
+            "select * from t where id = ? and name = ? limit ?",
+        )
+
+    def test_in_lists_and_values_rows_collapse(self):
+        self.assertEqual(
+            fingerprint_query("SELECT 1 FROM t WHERE id IN (%s, %s, %s)"),
+            fingerprint_query("SELECT 1 FROM t WHERE id IN (%s)"),
+        )
+        self.assertEqual(
+            fingerprint_query(b"INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y')"),
+            fingerprint_query(b"INSERT INTO t (a, b) VALUES (3, 'z'), (4, 'w'), (5, 'v')"),
+        )
+
+    def test_param_shape_never_includes_values(self):
+        self.assertEqual(param_shape(('secret', 5, [1, 2, 3], None)), '(str, int, list[3], None)')
+        self.assertEqual(param_shape({'tenant_id': 'delta'}), '{tenant_id: str}')
+        self.assertIsNone(param_shape(None))
+
+
+class TestQueryMonitor(unittest.TestCase):
+    """Test per-request accounting and flushing"""
+
+    def setUp(self):
+        self.monitor = QueryMonitor()
+
+    def test_scope_counts_and_n_plus_one_warning(self):
+        token = self.monitor.begin_scope('GET /api/things', kind='request')
+        self.monitor.record("SELECT * FROM things WHERE tenant_id = %s", ('t1',), 2.0, 10)
+        with patch.object(database, 'N_PLUS_ONE_THRESHOLD', 3), self.assertLogs('database', 'WARNING') as logs:
+            for thing_id in range(5):
+                self.monitor.record("SELECT * FROM details WHERE id = %s", (thing_id,), 1.0, 1)
+        scope = self.monitor.current_scope()
+        self.monitor.end_scope(token)
+
+        self.assertEqual(scope.query_count, 6)
+        self.assertEqual(len(scope.n_plus_one), 1)
+        self.assertEqual(sum('Possible N+1' in line for line in logs.output), 1)
+
+        snapshot = self.monitor.snapshot()
+        self.assertEqual(snapshot['statements'], 6)
+        self.assertEqual(snapshot['scopes'][0]['name'], 'GET /api/things')
+        self.assertEqual(snapshot['scopes'][0]['n_plus_one'], 1)
+        self.assertEqual(len(snapshot['n_plus_one_warnings']), 1)
+        self.assertIsNone(self.monitor.current_scope())
+
+    def test_slow_query_sample_keeps_param_shape(self):
+        with patch.object(database, 'SLOW_QUERY_MS', 100), self.assertLogs('database', 'WARNING'):
+            self.monitor.record("SELECT * FROM t WHERE id = ANY(%s)", (['a', 'b'],), 250.0, 2)
+        sample = self.monitor.snapshot()['slow_queries'][0]
+        self.assertEqual(sample['params_shape'], '(list[2])')
+        self.assertNotIn("'a'", str(sample))
+
+    def test_flush_writes_window_and_resets(self):
+        token = self.monitor.begin_scope('nightly_job', kind='job')
+        self.monitor.record("UPDATE t SET x = %s", (1,), 5.0, 3)
+        self.monitor.end_scope(token)
+
+        conn = MagicMock()
+        manager = MagicMock()
+
+        @contextmanager
+        def get_connection():
+            yield conn
+
+        manager.get_connection = get_connection
+        with patch.object(database.psycopg2.extras, 'execute_values') as execute_values:
+            self.assertTrue(self.monitor.flush(manager))
+
+        tables = [call.args[1].split('INTO')[1].split('(')[0].strip() for call in execute_values.call_args_list]
+        self.assertEqual(tables, ['db_query_fingerprint_stats', 'db_endpoint_query_stats'])
+        scope_row = execute_values.call_args_list[1].args[2][0]
+        self.assertEqual(scope_row[2:5], ('job', 'nightly_job', 1))
+        conn.commit.assert_called_once()
+        self.assertEqual(self.monitor.snapshot()['statements'], 0)
+
+    def test_monitor_shared_between_module_aliases(self):
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+        import web_ui.database
+        self.assertIs(web_ui.database.query_monitor, database.query_monitor)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the Receipt Invoice Matcher
+Tests amount-band shortlisting through the invoice candidate index
+"""
+
+import sys
+import os
+import unittest
+from datetime import date
+from unittest.mock import Mock, patch
+
+# Add services directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui', 'services'))
+
+import receipt_invoice_matcher
+from receipt_invoice_matcher import (
+    ReceiptInvoiceMatcher,
+    InvoiceCandidateIndex,
+    amount_band,
+    get_invoice_candidate_index,
+)
+from tenant_data_version import TenantDataVersions
+
+
+def _invoice(invoice_id, amount, currency='USD', usd_amount=None, invoice_date=date(2024, 3, 1),
+             status='pending', customer='Acme'):
+    return {
+        'id': invoice_id,
+        'invoice_number': invoice_id.upper(),
+        'customer_name': customer,
+        'vendor_name': None,
+        'total_amount': amount,
+        'usd_equivalent_amount': usd_amount,
+        'currency': currency,
+        'date': invoice_date,
+        'payment_status': status,
+        'existing_payment_date': None,
+    }
+
+
+INVOICES = [
+    _invoice('inv1', 1000.0),
+    _invoice('inv2', 1040.0),
+    _invoice('inv3', 5000.0),
+    _invoice('inv4', 1000.0, invoice_date=date(2022, 1, 1)),
+    _invoice('inv5', 900.0, currency='EUR', usd_amount=1000.0),
+    _invoice('inv6', 1000.0, customer='Globex'),
+]
+
+
+class TestInvoiceCandidateIndex(unittest.TestCase):
+    """Test candidate shortlisting by amount band and date window"""
+
+    def setUp(self):
+        self.index = InvoiceCandidateIndex(INVOICES)
+
+    def test_amount_band_covers_every_nonzero_amount_score(self):
+        low, high = amount_band(1000.0)
+        self.assertAlmostEqual(abs(1000.0 - low) / low * 100, 10.0)
+        self.assertAlmostEqual(abs(1000.0 - high) / high * 100, 10.0)
+
+    def test_candidates_within_band_and_window(self):
+        ids = [inv['id'] for inv in self.index.candidates(1000.0, date(2024, 3, 5))]
+        self.assertEqual(ids, ['inv1', 'inv2', 'inv5', 'inv6'])
+
+    def test_customer_filter(self):
+        ids = [inv['id'] for inv in self.index.candidates(1000.0, None, customer_filter='Globex')]
+        self.assertEqual(ids, ['inv6'])
+
+    def test_matcher_scores_only_shortlist(self):
+        db_manager = Mock()
+        matcher = ReceiptInvoiceMatcher(db_manager)
+        payment = {'payment_amount': 1000.0, 'payment_date': '2024-03-01', 'payment_currency': 'USD'}
+
+        matches = matcher.find_matching_invoices(payment, 't1', index=self.index)
+
+        db_manager.execute_query.assert_not_called()
+        self.assertNotIn('inv3', [m['invoice']['id'] for m in matches])
+        self.assertEqual(matches[0]['score'], 100)
+        # EUR invoice is compared on its USD equivalent for a USD payment
+        eur = [m for m in matches if m['invoice']['id'] == 'inv5'][0]
+        self.assertEqual(eur['score_breakdown']['amount_score'], 50)
+
+    def test_select_best_match_threshold(self):
+        matcher = ReceiptInvoiceMatcher(Mock())
+        self.assertIsNone(matcher.select_best_match([]))
+        self.assertIsNone(matcher.select_best_match([{'score': 10}]))
+        self.assertEqual(matcher.select_best_match([{'score': 60}]), {'score': 60})
+
+
+class FakeInvoiceDB:
+    """Serves open invoices and the tenant's invoice data version"""
+
+    db_type = 'postgresql'
+
+    def __init__(self, invoices, version=1):
+        self.invoices = list(invoices)
+        self.version = version
+        self.loads = 0
+
+    def execute_query(self, query, params=None, fetch_one=False, fetch_all=False):
+        if 'to_regclass' in query:
+            return {'present': True}
+        if 'invoice_data_versions' in query:
+            return {'version': self.version}
+        self.loads += 1
+        return list(self.invoices)
+
+
+class TestCandidateIndexCache(unittest.TestCase):
+    """Test that cached indexes follow invoice writes made by any process"""
+
+    def test_index_reloaded_when_invoice_version_moves(self):
+        db = FakeInvoiceDB(INVOICES[:2])
+        versions = TenantDataVersions(poll_seconds=0, table='invoice_data_versions')
+        with patch.object(receipt_invoice_matcher, '_index_cache', {}), \
+                patch('tenant_data_version.invoice_data_versions', versions):
+            self.assertEqual(len(get_invoice_candidate_index(db, 't1')), 2)
+            get_invoice_candidate_index(db, 't1')
+            self.assertEqual(db.loads, 1)
+
+            # Invoice created by another worker: its trigger bumped the version
+            db.invoices.append(_invoice('inv9', 1000.0))
+            db.version = 2
+            self.assertEqual(len(get_invoice_candidate_index(db, 't1')), 3)
+            self.assertEqual(db.loads, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
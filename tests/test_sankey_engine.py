@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the Sankey flow engine
+Tests graph building from grouped aggregates, filter-hash response caching
+and the incremental per-tenant keyword index
+"""
+
+import sys
+import os
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui', 'services'))
+
+import sankey_engine
+from sankey_engine import KeywordIndex, build_sankey_graph, get_sankey_breakdown, get_sankey_flow, transaction_keywords
+from kpi_aggregator import invalidate_transaction_kpis
+
+
+def flow_row(direction, category, entity, amount, count=1):
+    return {'direction': direction, 'category': category, 'entity': entity,
+            'total_amount': amount, 'transaction_count': count}
+
+
+FLOW_ROWS = [
+    flow_row('revenue', 'Mining Revenue', 'Delta LLC', 6000, 3),
+    flow_row('revenue', 'Mining Revenue', 'Delta Paraguay', 2000, 1),
+    flow_row('revenue', 'Hosting Revenue', 'Delta Paraguay', 3000, 2),
+    flow_row('revenue', 'Investor Equity', 'Delta LLC', 50000, 1),
+    flow_row('revenue', 'Interest', 'Delta LLC', 100, 1),
+    flow_row('expense', 'Utilities', 'Delta Paraguay', 4000, 4),
+    flow_row('expense', 'Salary Payment', 'Delta LLC', 2000, 2),
+    flow_row('expense', 'Salary Payment', 'Delta Paraguay', 1000, 1),
+]
+
+
+class FakeDBManager:
+    """Answers execute_query by query marker and records each call"""
+
+    def __init__(self, results=None):
+        self.results = results or {}
+        self.queries = []
+
+    def execute_query(self, query, params=None, fetch_one=False, fetch_all=False):
+        self.queries.append((query, params))
+        for marker, result in self.results.items():
+            if marker in query:
+                return result
+        return None
+
+
+class TestSankeyGraph(unittest.TestCase):
+
+    def test_hub_graph(self):
+        data = build_sankey_graph(FLOW_ROWS, min_amount=1000, max_categories=3)
+        nodes = data['sankey']['nodes']
+
+        # Investor Equity takes a ranking slot but isn't drawn; Interest is below min_amount
+        self.assertEqual([(n['name'], n['type']) for n in nodes], [
+            ('Mining Revenue', 'revenue'), ('Hosting Revenue', 'revenue'), ('Cash Flow Hub', 'hub'),
+            ('Utilities', 'expense'), ('Salary Payment', 'expense'),
+        ])
+        self.assertEqual(nodes[2]['value'], 7000)
+        self.assertEqual([link['value'] for link in data['sankey']['links']], [8000, 3000, 4000, 3000])
+        self.assertEqual(data['summary']['net_flow'], 4000)
+        self.assertEqual(data['summary']['flow_efficiency_percent'], 36.36)
+
+    def test_entity_graph(self):
+        data = build_sankey_graph(FLOW_ROWS, min_amount=1000, max_categories=8, flow='entity')
+        nodes = data['sankey']['nodes']
+        names = {n['id']: n['name'] for n in nodes}
+
+        entities = [(n['name'], n['value']) for n in nodes if n['type'] == 'entity']
+        self.assertEqual(entities, [('Delta LLC', 6000), ('Delta Paraguay', 5000)])
+        flows = {(names[l['source']], names[l['target']]): l['value'] for l in data['sankey']['links']}
+        self.assertEqual(flows[('Hosting Revenue', 'Delta Paraguay')], 3000)
+        self.assertEqual(flows[('Delta Paraguay', 'Salary Payment')], 1000)
+        self.assertNotIn(('Investor Equity', 'Delta LLC'), flows)
+
+
+class TestSankeyFlowCache(unittest.TestCase):
+
+    def setUp(self):
+        sankey_engine.sankey_cache.clear()
+
+    def tearDown(self):
+        sankey_engine.sankey_cache.clear()
+
+    def test_one_query_cached_until_tenant_data_changes(self):
+        db = FakeDBManager({'GROUP BY 1, 2, 3': FLOW_ROWS})
+        args = (db, 'sankey-tenant')
+
+        first, cached = get_sankey_flow(*args, start_date='2024-01-01', end_date='2024-12-31', entity='Delta LLC')
+        self.assertFalse(cached)
+        query, params = db.queries[0]
+        self.assertIn('classified_entity = %s', query)
+        self.assertEqual(params[-3:], ('2024-01-01', '2024-12-31', 'Delta LLC'))
+        self.assertEqual(first['summary']['date_range']['end_date'], '2024-12-31')
+
+        second, cached = get_sankey_flow(*args, start_date='2024-01-01', end_date='2024-12-31', entity='Delta LLC')
+        self.assertTrue(cached)
+        self.assertIs(second, first)
+        get_sankey_flow(*args, start_date='2024-01-01', end_date='2024-12-31')
+        self.assertEqual(len(db.queries), 2)
+
+        invalidate_transaction_kpis('sankey-tenant')
+        _, cached = get_sankey_flow(*args, start_date='2024-01-01', end_date='2024-12-31', entity='Delta LLC')
+        self.assertFalse(cached)
+
+
+class TestTransactionKeywords(unittest.TestCase):
+
+    def test_justification_and_counterparty(self):
+        txn = {'justification': 'Monthly payment to ANDE for power', 'destination': 'ANDE Paraguay',
+               'origin': 'Delta LLC', 'description': 'Wire'}
+        self.assertEqual(transaction_keywords(txn, 'expense'), ['ANDE', 'ANDE Paraguay', 'ANDE for power'])
+        self.assertIn('Delta LLC', transaction_keywords(txn, 'revenue'))
+
+    def test_fallbacks(self):
+        self.assertEqual(transaction_keywords({'description': 'Coinbase Deposit'}), ['Coinbase Deposit'])
+        self.assertEqual(transaction_keywords({'description': 'wire'}), ['Uncategorized'])
+
+
+class FakeConnection:
+
+    def __init__(self, stale_rows):
+        self.stale_rows = stale_rows
+        self.executed = []
+        self.commits = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+    def fetchall(self):
+        return self.stale_rows
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        pass
+
+
+class FakeIndexDB:
+
+    def __init__(self, stale_rows):
+        self.conn = FakeConnection(stale_rows)
+        self.refreshes = 0
+
+    @contextmanager
+    def get_connection(self):
+        self.refreshes += 1
+        yield self.conn
+
+
+class TestKeywordIndex(unittest.TestCase):
+
+    def test_refresh_reindexes_stale_transactions(self):
+        db = FakeIndexDB([
+            ('tx-1', 'Wire', -500, 'Salary payment to John Smith', None, None, 'hash-1'),
+            ('tx-2', 'Coinbase Deposit', 900, None, None, None, 'hash-2'),
+        ])
+        index = KeywordIndex()
+
+        with patch.object(sankey_engine.psycopg2.extras, 'execute_values') as execute_values:
+            self.assertEqual(index.refresh(db, 'kw-tenant'), 2)
+
+        delete_query, delete_params = db.conn.executed[1]
+        self.assertIn('DELETE FROM transaction_keywords', delete_query)
+        self.assertEqual(delete_params, ('kw-tenant', ['tx-1', 'tx-2']))
+        self.assertEqual(execute_values.call_args.args[2], [
+            ('kw-tenant', 'tx-1', 'John Smith', 'hash-1'),
+            ('kw-tenant', 'tx-2', 'Coinbase Deposit', 'hash-2'),
+        ])
+        self.assertEqual(db.conn.commits, 1)
+
+    def test_ensure_fresh_refreshes_in_background_after_writes(self):
+        db = FakeIndexDB([])
+        index = KeywordIndex()
+        started = []
+        refresh_async = index.refresh_async
+        index.refresh_async = lambda db_manager, tenant_id: started.append(refresh_async(db_manager, tenant_id))
+
+        self.assertFalse(index.ensure_fresh(db, 'kw-fresh'))
+        started[0].join(5)
+        self.assertTrue(index.ensure_fresh(db, 'kw-fresh'))
+        self.assertEqual(db.refreshes, 1)
+
+        invalidate_transaction_kpis('kw-fresh')
+        self.assertFalse(index.ensure_fresh(db, 'kw-fresh'))
+        started[1].join(5)
+        self.assertEqual(db.refreshes, 2)
+
+    def test_one_background_refresh_per_tenant(self):
+        release = threading.Event()
+        index = KeywordIndex()
+        index.refresh = lambda db_manager, tenant_id: release.wait(5)
+
+        thread = index.refresh_async(None, 'kw-running')
+        self.assertIsNone(index.refresh_async(None, 'kw-running'))
+        release.set()
+        thread.join(5)
+        self.assertIsNotNone(index.refresh_async(None, 'kw-running'))
+
+
+class TestSankeyBreakdown(unittest.TestCase):
+
+    def setUp(self):
+        sankey_engine.sankey_cache.clear()
+        self.original_index = sankey_engine.keyword_index
+        sankey_engine.keyword_index = KeywordIndex()
+        sankey_engine.keyword_index.ensure_fresh = lambda db_manager, tenant_id: True
+
+    def tearDown(self):
+        sankey_engine.keyword_index = self.original_index
+        sankey_engine.sankey_cache.clear()
+
+    def test_breakdown_from_index(self):
+        db = FakeDBManager({
+            'transaction_keywords': [
+                {'keyword': 'ANDE', 'amount': -3000, 'count': 2,
+                 'sample_transactions': [{'date': '2024-01-05', 'amount': -2000, 'description': 'Power'}]},
+                {'keyword': 'Other', 'amount': -1000, 'count': 1, 'sample_transactions': None},
+            ],
+            'LIMIT 5': [{'date': '2024-01-05', 'description': 'Power', 'amount': -2000, 'justification': 'January power bill'}],
+            'COUNT(*) AS count': {'count': 3, 'total': 4000},
+        })
+
+        data, cached = get_sankey_breakdown(db, 'delta', 'Utilities', 'expense', '2024-01-01', '2024-12-31')
+
+        self.assertFalse(cached)
+        self.assertEqual((data['total_amount'], data['transaction_count']), (4000, 3))
+        self.assertEqual([(b['keyword'], b['amount'], b['percentage']) for b in data['breakdown']],
+                         [('ANDE', 3000, 75.0), ('Other', 1000, 25.0)])
+        self.assertEqual(data['top_transactions'][0]['justification'], 'January power bill')
+        keyword_query, params = db.queries[1]
+        self.assertIn('amount < 0', keyword_query)
+        self.assertEqual(params, ('delta', 'Utilities', '2024-01-01', '2024-12-31', 'delta', 15))
+
+    def test_recomputed_once_the_index_is_refreshed(self):
+        db = FakeDBManager({'COUNT(*) AS count': {'count': 0, 'total': None}})
+        index = sankey_engine.keyword_index
+
+        get_sankey_breakdown(db, 'delta', 'Utilities')
+        self.assertTrue(get_sankey_breakdown(db, 'delta', 'Utilities')[1])
+
+        index._refreshed['delta'] = (sankey_engine.data_version('delta'), 12345.0)
+        self.assertFalse(get_sankey_breakdown(db, 'delta', 'Utilities')[1])
+
+    def test_empty_node(self):
+        db = FakeDBManager({'COUNT(*) AS count': {'count': 0, 'total': None}})
+        data, _ = get_sankey_breakdown(db, 'delta', 'Utilities')
+        self.assertEqual(data, {'total_amount': 0, 'transaction_count': 0, 'breakdown': [], 'top_transactions': []})
+        self.assertEqual(len(db.queries), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
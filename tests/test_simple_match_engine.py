@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the Simple Match Engine candidate pool
+Tests that pooled lookups return the same matches as the list-based path
+"""
+
+import sys
+import os
+import random
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+
+from simple_match_engine import (
+    CandidatePool,
+    find_similar_simple,
+    get_candidate_pool,
+    invalidate_candidate_pool,
+)
+
+
+COUNTERPARTIES = [
+    'Chase Bank', 'Chase Bank LLC', 'MEXC Global Exchange', 'Anthropic', 'Stripe Inc',
+    'Delta Mining Paraguay S.A.', 'None', '', '0x742d35...438f44e', '0x742d35...999999',
+]
+WORDS = ['TETHER', 'USDT', 'API', 'USAGE', 'COPETROL', 'AYOLAS', 'AWS', 'BILL', 'WIRE', 'FEE', 'GAS']
+
+
+def _transactions(count, seed):
+    rng = random.Random(seed)
+    transactions = []
+    for i in range(count):
+        transactions.append({
+            'transaction_id': f'tx{seed}-{i}',
+            'origin': rng.choice(COUNTERPARTIES),
+            'destination': rng.choice(COUNTERPARTIES),
+            'description': ' '.join(rng.sample(WORDS, rng.randint(1, 3))) + f' {rng.randint(1, 999)}',
+            'amount': rng.choice([None, 0, round(rng.uniform(-500, 500), 2)]),
+            'classified_entity': rng.choice(['Delta LLC', None]),
+        })
+    return transactions
+
+
+class TestCandidatePool(unittest.TestCase):
+    """Test pooled similarity lookups"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.candidates = _transactions(400, seed=1)
+        cls.pool = CandidatePool(cls.candidates)
+        cls.targets = cls.candidates[:10] + _transactions(10, seed=2)
+
+    def test_pool_matches_list_path(self):
+        for target in self.targets:
+            for min_confidence in (0.0, 0.3, 0.6):
+                self.assertEqual(
+                    find_similar_simple(target, self.pool, min_confidence),
+                    find_similar_simple(target, self.candidates, min_confidence),
+                )
+
+    def test_top_results_match_list_path(self):
+        for target in self.targets:
+            for max_results in (1, 5, 25):
+                self.assertEqual(
+                    find_similar_simple(target, self.pool, 0.3, max_results=max_results),
+                    find_similar_simple(target, self.candidates, 0.3, max_results=max_results),
+                )
+
+    def test_amount_ratio_mask(self):
+        target = {'transaction_id': 't', 'origin': 'Anthropic', 'destination': '', 'description': 'API', 'amount': 100}
+        pool = CandidatePool([
+            {'transaction_id': 'near', 'origin': 'Anthropic', 'destination': '', 'description': 'API', 'amount': 150},
+            {'transaction_id': 'far', 'origin': 'Anthropic', 'destination': '', 'description': 'API', 'amount': 250},
+        ])
+        self.assertEqual([m['transaction_id'] for m in find_similar_simple(target, pool)], ['near'])
+
+    def test_pool_cache_and_invalidation(self):
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return self.candidates[:5]
+
+        invalidate_candidate_pool('tenant-a')
+        first = get_candidate_pool('tenant-a', loader)
+        self.assertIs(get_candidate_pool('tenant-a', loader), first)
+        invalidate_candidate_pool('tenant-a')
+        get_candidate_pool('tenant-a', loader)
+        self.assertEqual(len(loads), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
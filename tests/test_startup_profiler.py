@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the startup profiler
+Tests phase timing, deferred module imports and lazily built clients
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui'))
+
+from startup_profiler import LazyModule, LazyObject, StartupProfiler
+
+
+class TestStartupProfiler(unittest.TestCase):
+    """Test phase recording and the startup report"""
+
+    def test_phases_recorded_in_order(self):
+        profiler = StartupProfiler()
+        with profiler.phase('import main', 'import'):
+            pass
+        with self.assertRaises(RuntimeError):
+            with profiler.phase('init storage'):
+                raise RuntimeError('no credentials')
+
+        report = profiler.report()
+        self.assertEqual([p['name'] for p in report['phases']], ['import main', 'init storage'])
+        self.assertEqual(report['phases'][0]['kind'], 'import')
+        self.assertEqual(report['phases'][1]['error'], 'no credentials')
+        self.assertFalse(report['ready'])
+
+    def test_first_request_recorded_once(self):
+        profiler = StartupProfiler()
+        profiler.mark_ready()
+        profiler.mark_first_request('/health')
+        profiler.mark_first_request('/dashboard')
+
+        report = profiler.report()
+        self.assertTrue(report['ready'])
+        self.assertEqual(report['first_request_path'], '/health')
+        self.assertGreaterEqual(report['first_request_ms'], report['total_ms'])
+
+
+class TestLazyLoading(unittest.TestCase):
+    """Test that heavy modules and clients are only loaded on first use"""
+
+    def setUp(self):
+        self.module_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.module_dir, 'lazy_probe_module.py'), 'w') as f:
+            f.write("VALUE = 42\n")
+        sys.path.insert(0, self.module_dir)
+
+    def tearDown(self):
+        sys.path.remove(self.module_dir)
+        sys.modules.pop('lazy_probe_module', None)
+        shutil.rmtree(self.module_dir)
+
+    def test_module_imported_on_first_attribute(self):
+        profiler = StartupProfiler()
+        module = LazyModule('lazy_probe_module', profiler)
+        self.assertNotIn('lazy_probe_module', sys.modules)
+
+        self.assertEqual(module.VALUE, 42)
+        self.assertIn('lazy_probe_module', sys.modules)
+        self.assertEqual([p['kind'] for p in profiler.report()['phases']], ['lazy_import'])
+
+    def test_object_built_once(self):
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return {'ready': True}
+
+        client = LazyObject(factory, 'test client')
+        self.assertTrue(client)
+        self.assertEqual(calls, [])
+
+        self.assertEqual(client.get('ready'), True)
+        self.assertEqual(client.keys(), {'ready': True}.keys())
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the database-side tenant data version
+Tests polling, writes seen from other processes and KPI cache keys
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_ui', 'services'))
+
+import tenant_data_version
+from tenant_data_version import TenantDataVersions
+from kpi_aggregator import KPICache
+
+
+class FakeDBManager:
+    """Serves tenant_data_versions rows and counts queries"""
+
+    db_type = 'postgresql'
+
+    def __init__(self, versions=None, table_present=True):
+        self.versions = dict(versions or {})
+        self.table_present = table_present
+        self.queries = []
+        self.error = None
+
+    def execute_query(self, query, params=None, fetch_one=False, fetch_all=False):
+        self.queries.append(query)
+        if self.error:
+            raise self.error
+        if 'to_regclass' in query:
+            return {'present': self.table_present}
+        if 'tenant_data_versions' in query:
+            version = self.versions.get(params[0])
+            return None if version is None else {'version': version}
+        # KPI aggregation
+        return [{'by_entity_rollup': 1, 'by_source_rollup': 1, 'by_month_rollup': 1,
+                 'classified_entity': None, 'source_file': None, 'month': None,
+                 'transaction_count': 1, 'revenue': 10, 'expenses': 0, 'needs_review': 0,
+                 'min_date': None, 'max_date': None}]
+
+
+class TestTenantDataVersions(unittest.TestCase):
+    """Test reading the counter and its poll window"""
+
+    def test_write_by_another_process_seen_after_poll(self):
+        db = FakeDBManager({'delta': 3})
+        versions = TenantDataVersions(poll_seconds=60)
+        self.assertEqual(versions.get(db, 'delta'), 3)
+
+        db.versions['delta'] = 4
+        self.assertEqual(versions.get(db, 'delta'), 3)  # within the poll window
+        versions.forget('delta')
+        self.assertEqual(versions.get(db, 'delta'), 4)
+        self.assertEqual(versions.get(db, 'acme'), 0)
+
+    def test_missing_table_or_sqlite_is_version_zero(self):
+        versions = TenantDataVersions(poll_seconds=0)
+        db = FakeDBManager(table_present=False)
+        self.assertEqual(versions.get(db, 'delta'), 0)
+        self.assertEqual(versions.get(db, 'delta'), 0)
+        self.assertEqual(len(db.queries), 1)  # table looked up once
+
+        sqlite_db = FakeDBManager({'delta': 5})
+        sqlite_db.db_type = 'sqlite'
+        self.assertEqual(TenantDataVersions().get(sqlite_db, 'delta'), 0)
+        self.assertEqual(sqlite_db.queries, [])
+
+    def test_read_error_keeps_last_version(self):
+        db = FakeDBManager({'delta': 7})
+        versions = TenantDataVersions(poll_seconds=0)
+        self.assertEqual(versions.get(db, 'delta'), 7)
+        db.error = ConnectionError('server closed')
+        self.assertEqual(versions.get(db, 'delta'), 7)
+
+
+class TestKPICacheVersion(unittest.TestCase):
+    """Test that cached KPIs are retired by writes from other processes"""
+
+    def test_db_counter_retires_cached_kpis(self):
+        db = FakeDBManager({'delta': 1})
+        cache = KPICache()
+        with patch.object(tenant_data_version, 'tenant_data_versions', TenantDataVersions(poll_seconds=0)):
+            cache.get_or_compute(db, 'delta', 'tenant_id = %s', ('delta',))
+            cache.get_or_compute(db, 'delta', 'tenant_id = %s', ('delta',))
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+            db.versions['delta'] = 2  # trigger bumped by another worker's write
+            cache.get_or_compute(db, 'delta', 'tenant_id = %s', ('delta',))
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the per-tenant knowledge snapshot cache
+Tests keyword matcher equivalence, versioned invalidation and agent reuse
+"""
+
+import sys
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import tenant_knowledge_cache as cache_module
+from tenant_knowledge_cache import KeywordMatcher, TenantKnowledge, TenantKnowledgeCache
+
+
+def make_knowledge(tenant_id, version, expense=None, workforce=None):
+    patterns = {name: {} for name in cache_module.WORD_PATTERN_ORDER + ['regional']}
+    patterns['expense'] = expense or {
+        'AWS': {'entity': 'Delta LLC', 'confidence': 0.9, 'category': 'OPERATING_EXPENSE', 'subcategory': 'Hosting'},
+    }
+    return TenantKnowledge(
+        tenant_id=tenant_id, version=version, patterns=patterns, account_mapping={},
+        wallets={}, business_entities=['Delta LLC'], workforce_members=workforce or {},
+    )
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    """Test that the combined prefilter returns what a per-keyword loop returns"""
+
+    KEYWORDS = ['ALDO', 'AWS', 'AMAZON WEB SERVICES', 'C++ LTD', 'PAY-PAL', 'VAL', 'SILVA']
+    TEXTS = [
+        'PAYMENT TO ALAINE VAL', 'AWS EMEA INVOICE', 'AMAZON WEB SERVICES AWS', 'ALDOUS HUXLEY',
+        'C++ LTD LICENSE', 'PAY-PAL *TRANSFER', 'JOAO SILVA SALARY', 'NOTHING HERE', '',
+    ]
+
+    def test_matches_loop_of_word_boundary_searches(self):
+        matcher = KeywordMatcher([(keyword, i) for i, keyword in enumerate(self.KEYWORDS)])
+        for text in self.TEXTS:
+            expected = next(
+                ((keyword, i) for i, keyword in enumerate(self.KEYWORDS)
+                 if re.search(r'\b' + re.escape(keyword) + r'\b', text)),
+                None
+            )
+            self.assertEqual(matcher.first_match(text), expected, text)
+
+    def test_empty_matcher(self):
+        self.assertIsNone(KeywordMatcher([]).first_match('ANYTHING'))
+
+
+class TestVersionedCache(unittest.TestCase):
+    """Test snapshot reuse and invalidation"""
+
+    def setUp(self):
+        self.cache = TenantKnowledgeCache()
+        self.loads = []
+
+    def loader(self, tenant_id, version):
+        self.loads.append((tenant_id, version))
+        return make_knowledge(tenant_id, version)
+
+    def test_snapshot_shared_until_invalidated(self):
+        first = self.cache.get('delta', self.loader)
+        self.assertIs(self.cache.get('delta', self.loader), first)
+        self.assertEqual(self.loads, [('delta', 0)])
+
+        self.cache.invalidate('delta')
+        second = self.cache.get('delta', self.loader)
+        self.assertIsNot(second, first)
+        self.assertEqual(self.loads, [('delta', 0), ('delta', 1)])
+
+        # Other tenants are unaffected
+        self.cache.get('acme', self.loader)
+        self.cache.invalidate('acme')
+        self.assertIs(self.cache.get('delta', self.loader), second)
+
+    def test_snapshot_loaded_before_concurrent_invalidation_not_stored(self):
+        def racing_loader(tenant_id, version):
+            self.cache.invalidate(tenant_id)
+            return self.loader(tenant_id, version)
+
+        self.cache.get('delta', racing_loader)
+        self.cache.get('delta', self.loader)
+        self.assertEqual(len(self.loads), 2)
+
+    def test_ttl_expiry(self):
+        self.cache.ttl_seconds = 0
+        self.cache.get('delta', self.loader)
+        self.cache.get('delta', self.loader)
+        self.assertEqual(len(self.loads), 2)
+
+
+class TestAgentUsesSharedSnapshot(unittest.TestCase):
+    """Test that DeltaCFOAgent instances reuse the tenant snapshot"""
+
+    def setUp(self):
+        # The agent cleans up temp scripts in its working directory
+        self.workdir = tempfile.mkdtemp()
+        self.previous_cwd = os.getcwd()
+        os.chdir(self.workdir)
+        import main
+        self.main = main
+        self.loads = []
+        cache_module.tenant_knowledge_cache.invalidate()
+
+    def tearDown(self):
+        os.chdir(self.previous_cwd)
+        shutil.rmtree(self.workdir)
+        cache_module.tenant_knowledge_cache.invalidate()
+
+    def loader(self, tenant_id, version):
+        self.loads.append(tenant_id)
+        return make_knowledge(tenant_id, version, workforce={
+            'JOAO SILVA': {'full_name': 'Joao Silva', 'type': 'employee', 'entity': 'Delta LLC'},
+        })
+
+    def test_agents_share_knowledge_and_classify_with_it(self):
+        with patch.object(self.main, '_load_tenant_knowledge', self.loader):
+            first = self.main.DeltaCFOAgent('delta-test')
+            second = self.main.DeltaCFOAgent('delta-test')
+
+            self.assertEqual(self.loads, ['delta-test'])
+            self.assertIs(first.patterns, second.patterns)
+
+            entity, confidence, reason, category, subcategory = second.classify_transaction('AWS EMEA', -120)
+            self.assertEqual((entity, reason, subcategory), ('Delta LLC', 'expense: AWS', 'Hosting'))
+
+            entity, _, reason, category, subcategory = second.classify_transaction('ACH JOAO SILVA', -3000)
+            self.assertEqual(reason, 'Workforce: Joao Silva (employee)')
+            self.assertEqual(subcategory, 'Payroll & Benefits')
+
+            cache_module.invalidate_tenant_knowledge('delta-test')
+            self.main.DeltaCFOAgent('delta-test')
+            self.assertEqual(self.loads, ['delta-test', 'delta-test'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,13 +5,24 @@ Provides tool definitions and execution handlers for Claude AI chatbot.
 Enables the AI to query actual transaction data instead of returning generic responses.
 """
 
+import json
+import time
 import logging
-from datetime import datetime, timedelta
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Any, Optional
 from decimal import Decimal
 
 logger = logging.getLogger(__name__)
 
+# Memoized tool results (see AIToolExecutor.execute)
+TOOL_RESULT_CACHE_TTL_SECONDS = 600
+TOOL_RESULT_CACHE_MAX_ENTRIES = 1000
+
+_tool_result_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_tool_result_lock = threading.Lock()
+
 
 # =============================================================================
 # Tool Definitions for Claude API
@@ -307,24 +318,45 @@ class AIToolExecutor:
     All queries are filtered by tenant_id for security.
     """
 
-    def __init__(self, db_manager, tenant_id: str):
+    def __init__(self, db_manager, tenant_id: str, data_version: Optional[int] = None,
+                 conversation_id: Optional[str] = None):
         """
         Initialize the tool executor.
 
         Args:
             db_manager: Database manager instance
             tenant_id: Current tenant identifier (REQUIRED - no fallbacks)
+            data_version: Tenant data version (chatbot_context.get_data_version);
+                results are memoized only when given
+            conversation_id: Optional chat conversation the memoized results belong to
         """
         if not tenant_id:
             raise ValueError("tenant_id is required for AIToolExecutor")
 
         self.db_manager = db_manager
         self.tenant_id = tenant_id
+        self.data_version = data_version
+        self.conversation_id = conversation_id
+        self.last_result_cached = False
+
+    def _memo_key(self, tool_name: str, tool_input: Dict[str, Any]) -> tuple:
+        # Relative periods ("this_month") resolve against today, so the date is part of the key
+        normalized = json.dumps(
+            {k: v for k, v in (tool_input or {}).items() if v not in (None, '', [])},
+            sort_keys=True, default=str
+        )
+        return (self.tenant_id, self.conversation_id, tool_name, normalized,
+                self.data_version, date.today().isoformat())
 
     def execute(self, tool_name: str, tool_input: Dict[str, Any]) -> str:
         """
         Execute a tool and return the result as a string.
 
+        With a data_version, successful results are memoized per
+        (tenant, conversation, tool, normalized input, data version) for
+        TOOL_RESULT_CACHE_TTL_SECONDS; last_result_cached tells whether the
+        previous call was served from the cache.
+
         Args:
             tool_name: Name of the tool to execute
             tool_input: Input parameters for the tool
@@ -332,6 +364,30 @@ class AIToolExecutor:
         Returns:
             str: Tool result formatted for Claude
         """
+        self.last_result_cached = False
+        if self.data_version is None:
+            return self._execute(tool_name, tool_input)
+
+        key = self._memo_key(tool_name, tool_input)
+        now = time.time()
+        with _tool_result_lock:
+            cached = _tool_result_cache.get(key)
+            if cached and now - cached[0] < TOOL_RESULT_CACHE_TTL_SECONDS:
+                _tool_result_cache.move_to_end(key)
+                self.last_result_cached = True
+                logger.info(f"Tool result cache hit: {tool_name}")
+                return cached[1]
+
+        result = self._execute(tool_name, tool_input)
+        if not result.startswith(("Error executing", "Unknown tool")):
+            with _tool_result_lock:
+                _tool_result_cache[key] = (now, result)
+                _tool_result_cache.move_to_end(key)
+                while len(_tool_result_cache) > TOOL_RESULT_CACHE_MAX_ENTRIES:
+                    _tool_result_cache.popitem(last=False)
+        return result
+
+    def _execute(self, tool_name: str, tool_input: Dict[str, Any]) -> str:
         logger.info(f"Executing tool: {tool_name} with input: {tool_input}")
 
         try:
@@ -829,15 +885,19 @@ TOTALS:
         return response
 
 
-def get_tool_executor(db_manager, tenant_id: str) -> AIToolExecutor:
+def get_tool_executor(db_manager, tenant_id: str, data_version: Optional[int] = None,
+                      conversation_id: Optional[str] = None) -> AIToolExecutor:
     """
     Factory function to create an AI tool executor.
 
     Args:
         db_manager: Database manager instance
         tenant_id: Current tenant identifier
+        data_version: Optional tenant data version; enables result memoization
+        conversation_id: Optional chat conversation identifier
 
     Returns:
         AIToolExecutor: Initialized tool executor
     """
-    return AIToolExecutor(db_manager, tenant_id)
+    return AIToolExecutor(db_manager, tenant_id, data_version=data_version,
+                          conversation_id=conversation_id)
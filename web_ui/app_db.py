@@ -8,7 +8,6 @@ import os
 import sys
 import json
 import sqlite3  # Kept for backward compatibility - main DB uses database.py manager
-import pandas as pd
 import time
 import threading
 import traceback
@@ -16,7 +15,6 @@ from datetime import datetime, timedelta
 from flask import Flask, render_template, request, jsonify, send_file, session, Response
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import random
-import anthropic
 from typing import List, Dict, Any, Optional
 from werkzeug.utils import secure_filename
 import subprocess
@@ -50,6 +48,11 @@ if invoice_dir not in sys.path:
 # if api_dir not in sys.path:
 #     sys.path.append(api_dir)
 
+# Startup timing and deferred heavy imports (pandas and anthropic load on first use)
+from startup_profiler import startup_profiler, lazy_module, LazyObject
+pd = lazy_module('pandas')
+anthropic = lazy_module('anthropic')
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -57,12 +60,12 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Archive handling imports - optional
-try:
-    import py7zr
-    PY7ZR_AVAILABLE = True
-except ImportError:
-    PY7ZR_AVAILABLE = False
+# Archive handling imports - optional, loaded when the first 7z archive is opened
+import importlib.util
+PY7ZR_AVAILABLE = importlib.util.find_spec('py7zr') is not None
+if PY7ZR_AVAILABLE:
+    py7zr = lazy_module('py7zr')
+else:
     print("WARNING: py7zr not available - 7z archive support disabled")
 
 # Database imports - support both SQLite and PostgreSQL
@@ -80,11 +83,19 @@ from historical_currency_converter import HistoricalCurrencyConverter
 # Import tenant context manager
 from tenant_context import init_tenant_context, get_current_tenant_id, set_tenant_id
 
+# Shared per-tenant knowledge snapshots used by DeltaCFOAgent (invalidated by pattern/wallet/workforce writes)
+from tenant_knowledge_cache import invalidate_tenant_knowledge
+
+# Streaming archive ingestion (dedup by content hash, PDF rendering in worker processes)
+from archive_pipeline import (ArchiveError, iter_archive_members, list_archive_members,
+                              render_pdf_page, run_archive_pipeline)
+
 # Import file storage service for GCS uploads (optional - graceful degradation)
 try:
-    from services.file_storage_service import file_storage
+    with startup_profiler.phase('file storage service', 'import'):
+        from services.file_storage_service import file_storage
     GCS_AVAILABLE = True
-    logger.info("Google Cloud Storage service initialized successfully")
+    logger.info("Google Cloud Storage service configured (client connects on first use)")
 except Exception as e:
     logger.warning(f"Google Cloud Storage not available - file uploads will use local storage: {e}")
     file_storage = None
@@ -93,11 +104,11 @@ except Exception as e:
 # Import authentication middleware
 from middleware.auth_middleware import require_auth, optional_auth, get_current_user, get_current_tenant
 
-# Import DeltaCFOAgent for transaction classification
-from main import DeltaCFOAgent
+# DeltaCFOAgent (main.py) pulls in pandas and anthropic; routes import it when they need it
 
 # Import reporting API
-from reporting_api import register_reporting_routes
+with startup_profiler.phase('reporting_api', 'import'):
+    from reporting_api import register_reporting_routes
 
 # Import entity and business line API
 from entity_api import register_entity_routes
@@ -211,18 +222,32 @@ def register_auth_blueprints():
 # Register blueprints immediately after app creation
 # This ensures they are available in both dev and production
 auth_blueprints_registered = False
-if register_auth_blueprints():
-    auth_blueprints_registered = True
-    print("[STARTUP] Authentication blueprints registered at module level")
+with startup_profiler.phase('auth blueprints'):
+    if register_auth_blueprints():
+        auth_blueprints_registered = True
+        print("[STARTUP] Authentication blueprints registered at module level")
 
 # Initialize multi-tenant context
 init_tenant_context(app)
 
+# One pooled database connection per request (see database.UnitOfWork)
+from database import init_db_request_scope
+init_db_request_scope(app)
+
 # Register CFO reporting routes
-register_reporting_routes(app)
+with startup_profiler.phase('reporting routes'):
+    register_reporting_routes(app)
 
 # Register entity and business line routes
-register_entity_routes(app)
+with startup_profiler.phase('entity routes'):
+    register_entity_routes(app)
+
+
+@app.before_request
+def record_first_request():
+    """Startup report: time from process start to the first served request"""
+    if startup_profiler.first_request_at is None:
+        startup_profiler.mark_first_request(request.path)
 
 # NOTE: Global cfo_agent removed - DeltaCFOAgent instances are created
 # per-request with proper tenant_id context in route handlers
@@ -310,6 +335,12 @@ def debug_routes():
         'sample_routes': routes[:10]
     })
 
+@app.route('/api/debug/startup-report')
+def debug_startup_report():
+    """Cold-start breakdown: init phases, lazy imports and (with STARTUP_PROFILE=1) per-module import cost"""
+    top = request.args.get('top', 25, type=int)
+    return jsonify(startup_profiler.report(top))
+
 # ====================================================================
 # Authentication Page Routes
 # ====================================================================
@@ -717,8 +748,9 @@ def init_claude_client():
                 print(f"WARNING: API key format looks invalid. Expected 'sk-ant-', got: '{api_key[:10]}...'")
                 return False
 
-            claude_client = anthropic.Anthropic(api_key=api_key)
-            print(f"[OK] Claude API client initialized successfully (key: {api_key[:10]}...{api_key[-4:]})")
+            # The SDK is imported and the client built on first use, off the startup path
+            claude_client = LazyObject(lambda: anthropic.Anthropic(api_key=api_key), 'Claude API client', startup_profiler)
+            print(f"[OK] Claude API client configured (key: {api_key[:10]}...{api_key[-4:]})")
             return True
         else:
             print("WARNING: Claude API key not found - AI features disabled")
@@ -873,7 +905,8 @@ def init_invoice_tables():
                     created_by TEXT DEFAULT 'system',
                     source_file TEXT,
                     error_message TEXT,
-                    metadata TEXT
+                    metadata TEXT,
+                    tenant_id TEXT
                 )
             ''')
 
@@ -1059,8 +1092,19 @@ def init_database():
 # BACKGROUND JOBS MANAGEMENT
 # ============================================================================
 
+# Set once the tables are confirmed, so job creation doesn't re-run DDL
+_background_jobs_tables_ready = False
+
 def ensure_background_jobs_tables():
-    """Ensure background jobs tables exist with correct schema"""
+    """
+    Ensure background jobs tables exist (once per process).
+    Schema changes (currency column widening) live in
+    migrations/add_background_jobs_tables.sql.
+    """
+    global _background_jobs_tables_ready
+    if _background_jobs_tables_ready:
+        return True
+
     try:
         from database import db_manager
 
@@ -1073,24 +1117,6 @@ def ensure_background_jobs_tables():
             cursor = conn.cursor()
             is_postgresql = hasattr(cursor, 'mogrify')
 
-            # MIGRATION: Expand VARCHAR(10) fields to avoid overflow errors
-            if is_postgresql:
-                try:
-                    # Expand currency field in transactions table
-                    cursor.execute("ALTER TABLE transactions ALTER COLUMN currency TYPE VARCHAR(50)")
-                    print("[OK] Migrated transactions.currency VARCHAR(10) -> VARCHAR(50)")
-                except Exception as e:
-                    if "does not exist" not in str(e) and "already exists" not in str(e):
-                        print(f"Currency migration info: {e}")
-
-                try:
-                    # Expand currency field in invoices table
-                    cursor.execute("ALTER TABLE invoices ALTER COLUMN currency TYPE VARCHAR(50)")
-                    print("[OK] Migrated invoices.currency VARCHAR(10) -> VARCHAR(50)")
-                except Exception as e:
-                    if "does not exist" not in str(e) and "already exists" not in str(e):
-                        print(f"Currency migration info: {e}")
-
             # Background jobs table for async processing
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS background_jobs (
@@ -1108,7 +1134,8 @@ def ensure_background_jobs_tables():
                     created_by TEXT DEFAULT 'system',
                     source_file TEXT,
                     error_message TEXT,
-                    metadata TEXT
+                    metadata TEXT,
+                    tenant_id TEXT
                 )
             ''')
 
@@ -1146,10 +1173,19 @@ def ensure_background_jobs_tables():
                     )
                 ''')
 
+            # Jobs (and the results in job_items) belong to the tenant that started them
+            if is_postgresql:
+                cursor.execute('ALTER TABLE background_jobs ADD COLUMN IF NOT EXISTS tenant_id TEXT')
+            else:
+                cursor.execute('PRAGMA table_info(background_jobs)')
+                if 'tenant_id' not in [row[1] for row in cursor.fetchall()]:
+                    cursor.execute('ALTER TABLE background_jobs ADD COLUMN tenant_id TEXT')
+
             # Close cursor before commit (required for PostgreSQL)
             cursor.close()
             conn.commit()
             print("[OK] Background jobs tables ensured")
+            _background_jobs_tables_ready = True
             return True
 
     except Exception as e:
@@ -1157,8 +1193,12 @@ def ensure_background_jobs_tables():
         return False
 
 def create_background_job(job_type: str, total_items: int, created_by: str = 'system',
-                         source_file: str = None, metadata: str = None) -> str:
-    """Create a new background job and return job ID"""
+                         source_file: str = None, metadata: str = None,
+                         tenant_id: str = None) -> str:
+    """Create a new background job for the current tenant and return job ID"""
+    if tenant_id is None:
+        tenant_id = get_current_tenant_id()
+
     # First ensure tables exist
     if not ensure_background_jobs_tables():
         print("ERROR: Cannot create background job - tables not available")
@@ -1178,11 +1218,12 @@ def create_background_job(job_type: str, total_items: int, created_by: str = 'sy
             cursor.execute(f"""
                 INSERT INTO background_jobs (
                     id, job_type, status, total_items, created_at, created_by,
-                    source_file, metadata
+                    source_file, metadata, tenant_id
                 ) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder},
-                         {placeholder}, {placeholder}, {placeholder}, {placeholder})
+                         {placeholder}, {placeholder}, {placeholder}, {placeholder},
+                         {placeholder})
             """, (job_id, job_type, 'pending', total_items, created_at, created_by,
-                  source_file, metadata))
+                  source_file, metadata, tenant_id))
 
             conn.commit()
             print(f"[OK] Created background job {job_id} with {total_items} items")
@@ -1316,8 +1357,11 @@ def update_job_item_status(job_id: str, item_name: str, status: str,
     except Exception as e:
         print(f"ERROR: Failed to update job item status: {e}")
 
-def get_job_status(job_id: str) -> dict:
-    """Get complete job status with items"""
+def get_job_status(job_id: str, tenant_id: str = None) -> dict:
+    """Get complete job status with items
+
+    When tenant_id is given, a job owned by another tenant is reported as not found.
+    """
     try:
         from database import db_manager
         conn = db_manager._get_postgresql_connection()
@@ -1327,7 +1371,12 @@ def get_job_status(job_id: str) -> dict:
             placeholder = '%s' if is_postgresql else '?'
 
             # Get job info
-            cursor.execute(f"SELECT * FROM background_jobs WHERE id = {placeholder}", (job_id,))
+            if tenant_id is not None:
+                cursor.execute(
+                    f"SELECT * FROM background_jobs WHERE id = {placeholder} AND tenant_id = {placeholder}",
+                    (job_id, tenant_id))
+            else:
+                cursor.execute(f"SELECT * FROM background_jobs WHERE id = {placeholder}", (job_id,))
             job_row = cursor.fetchone()
 
             if not job_row:
@@ -1348,7 +1397,7 @@ def get_job_status(job_id: str) -> dict:
         print(f"ERROR: Failed to get job status: {e}")
         return {'error': str(e)}
 
-def process_single_invoice_item(job_id: str, item: dict):
+def process_single_invoice_item(job_id: str, item: dict, page_image: bytes = None):
     """Process a single invoice item (for parallel execution)"""
 
     item_name = item['item_name']
@@ -1365,7 +1414,7 @@ def process_single_invoice_item(job_id: str, item: dict):
 
     try:
         # Process the invoice using existing function
-        invoice_data = process_invoice_with_claude(item_path, item_name)
+        invoice_data = process_invoice_with_claude(item_path, item_name, page_image=page_image)
         processing_time = time.time() - start_time
 
         if 'error' in invoice_data:
@@ -1475,11 +1524,133 @@ def process_invoice_batch_job(job_id: str):
 
         update_job_progress(job_id, status='failed', error_message=error_msg)
 
+def process_invoice_archive_job(job_id: str):
+    """
+    Background worker for an uploaded archive: members are streamed out of the
+    archive, added as job items and processed as they are read, with progress
+    recorded as each one finishes. Duplicate members are marked 'skipped'.
+    """
+    print(f" Starting archive job {job_id}")
+    options = {}
+
+    try:
+        update_job_progress(job_id, status='processing')
+
+        job_info = get_job_status(job_id)
+        if 'error' in job_info:
+            update_job_progress(job_id, status='failed', error_message='Job not found')
+            return
+
+        options = json.loads(job_info.get('metadata') or '{}')
+        counts = {'processed': 0, 'successful': 0, 'failed': 0}
+
+        def stream_members():
+            for member in iter_archive_members(options['archive_path'], options['extract_dir']):
+                add_job_item(job_id, member.name, member.path)
+                yield member
+
+        def process_member(member, rendered):
+            page_image = rendered['image_png'] if rendered else None
+            return process_single_invoice_item(job_id, {'item_name': member.name, 'item_path': member.path},
+                                               page_image=page_image)
+
+        def record_result(member, result, error):
+            if member.duplicate_of:
+                update_job_item_status(job_id, member.name, 'skipped',
+                                     error_message=f'Duplicate of {member.duplicate_of}')
+            elif error is None and result['status'] == 'completed':
+                counts['successful'] += 1
+            else:
+                counts['failed'] += 1
+                if error is not None:
+                    update_job_item_status(job_id, member.name, 'failed',
+                                         error_message=f"Processing error: {str(error)}")
+
+            counts['processed'] += 1
+            update_job_progress(job_id,
+                              processed_items=counts['processed'],
+                              successful_items=counts['successful'],
+                              failed_items=counts['failed'])
+
+        run_archive_pipeline(stream_members(), process_member, on_result=record_result,
+                             render=render_pdf_page)
+
+        final_status = 'completed' if counts['failed'] == 0 else 'completed_with_errors'
+        update_job_progress(job_id, status=final_status,
+                          processed_items=counts['processed'],
+                          successful_items=counts['successful'],
+                          failed_items=counts['failed'])
+
+        print(f"[COMPLETE] Archive job {job_id} finished: {counts['successful']} successful, "
+              f"{counts['failed']} failed, {counts['processed'] - counts['successful'] - counts['failed']} duplicates")
+
+    except Exception as e:
+        error_msg = f"Job processing error: {str(e)}"
+        print(f"[ERROR] Job {job_id} failed: {error_msg}")
+        print(f"Traceback: {traceback.format_exc()}")
+
+        update_job_progress(job_id, status='failed', error_message=error_msg)
+
+    finally:
+        if options.get('extract_dir'):
+            shutil.rmtree(options['extract_dir'], ignore_errors=True)
+        if options.get('archive_path') and os.path.exists(options['archive_path']):
+            os.remove(options['archive_path'])
+
+def process_knowledge_generation_job(job_id: str):
+    """Background worker that mines a tenant's history into patterns and insights"""
+    item_name = 'knowledge_generation'
+    print(f" Starting knowledge generation job {job_id}")
+
+    try:
+        update_job_progress(job_id, status='processing')
+
+        job_info = get_job_status(job_id)
+        if 'error' in job_info:
+            update_job_progress(job_id, status='failed', error_message='Job not found')
+            return
+
+        options = json.loads(job_info.get('metadata') or '{}')
+        started = time.time()
+
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'services'))
+        from knowledge_generator import KnowledgeGenerator
+
+        generator = KnowledgeGenerator(options['tenant_id'])
+        results = generator.analyze_all(
+            min_frequency=options.get('min_frequency', 75.0),
+            min_transactions=options.get('min_transactions', 5)
+        )
+
+        update_job_item_status(job_id, item_name, 'completed',
+                               result_data=json.dumps(results, default=str),
+                               processing_time=time.time() - started)
+        update_job_progress(job_id, status='completed', processed_items=1,
+                          successful_items=1, failed_items=0)
+
+        print(f"[COMPLETE] Knowledge generation job {job_id} finished: {results}")
+
+    except Exception as e:
+        error_msg = f"Knowledge generation error: {str(e)}"
+        print(f"[ERROR] Job {job_id} failed: {error_msg}")
+        print(f"Traceback: {traceback.format_exc()}")
+
+        update_job_item_status(job_id, item_name, 'failed', error_message=error_msg)
+        update_job_progress(job_id, status='failed', processed_items=1,
+                          successful_items=0, failed_items=1, error_message=error_msg)
+
+BACKGROUND_JOB_WORKERS = {
+    'invoice_batch': process_invoice_batch_job,
+    'invoice_archive': process_invoice_archive_job,
+    'knowledge_generation': process_knowledge_generation_job,
+}
+
 def start_background_job(job_id: str, job_type: str = 'invoice_batch'):
     """Start a background job in a separate thread"""
-    if job_type == 'invoice_batch':
+    worker = BACKGROUND_JOB_WORKERS.get(job_type)
+    if worker:
         worker_thread = threading.Thread(
-            target=process_invoice_batch_job,
+            target=worker,
             args=(job_id,),
             name=f"JobWorker-{job_id[:8]}",
             daemon=True  # Thread will not prevent program exit
@@ -1890,111 +2061,95 @@ def build_filter_where_clause(filters, tenant_id, is_postgresql):
     return " AND ".join(where_conditions), params
 
 
+def _web_ui_service(module_name):
+    """Import a web_ui/services module (the root services/ package shadows web_ui's)"""
+    services_path = os.path.join(os.path.dirname(__file__), 'services')
+    if services_path not in sys.path:
+        sys.path.insert(0, services_path)
+    return importlib.import_module(module_name)
+
+
+def _kpi_aggregator():
+    return _web_ui_service('kpi_aggregator')
+
+
+def _period_lock_index():
+    return _web_ui_service('period_lock_index')
+
+
+def _format_stats_date(d):
+    """Format a dashboard date as MM/DD/YYYY"""
+    from datetime import date, datetime
+    if d is None:
+        return 'N/A'
+    if isinstance(d, str):
+        # Parse string date and reformat
+        try:
+            if 'T' in d:
+                dt = datetime.fromisoformat(d.replace('Z', '+00:00'))
+                return dt.strftime('%m/%d/%Y')
+            else:
+                dt = datetime.strptime(d, '%Y-%m-%d')
+                return dt.strftime('%m/%d/%Y')
+        except:
+            return d
+    elif isinstance(d, (date, datetime)):
+        return d.strftime('%m/%d/%Y')
+    return str(d)
+
+
 def get_dashboard_stats(filters=None):
     """Calculate dashboard statistics from database with optional filters"""
     try:
         from database import db_manager
         tenant_id = get_current_tenant_id()
 
-        # Use the robust database manager instead of old get_db_connection
-        with db_manager.get_connection() as conn:
-            if db_manager.db_type == 'postgresql':
-                cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            else:
-                cursor = conn.cursor()
+        if db_manager.db_type == 'postgresql':
+            # Single-scan aggregate, cached per (tenant, filters) until the tenant's transactions change
+            where_clause, params = build_filter_where_clause(filters, tenant_id, True)
+            kpis = _kpi_aggregator().get_transaction_kpis(db_manager, tenant_id, where_clause, params)
+            return {
+                'total_transactions': kpis['total_transactions'],
+                'total_revenue': kpis['total_revenue'],
+                'total_expenses': kpis['total_expenses'],
+                'needs_review': kpis['needs_review'],
+                'date_range': {
+                    'min': _format_stats_date(kpis['min_date']),
+                    'max': _format_stats_date(kpis['max_date'])
+                },
+                'entities': [(entity['name'], entity['transaction_count']) for entity in kpis['entities'][:10]],
+                'source_files': list(kpis['source_files'])
+            }
 
-            # Detect database type for compatible syntax
-            is_postgresql = db_manager.db_type == 'postgresql'
-            placeholder = "%s" if is_postgresql else "?"
+        # SQLite fallback
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
 
             # Build WHERE clause from filters
-            where_clause, params = build_filter_where_clause(filters, tenant_id, is_postgresql)
+            where_clause, params = build_filter_where_clause(filters, tenant_id, False)
 
             # Total transactions with filters
             cursor.execute(f"SELECT COUNT(*) as total FROM transactions WHERE {where_clause}", params)
-            result = cursor.fetchone()
-            total_transactions = result['total'] if is_postgresql else result[0]
+            total_transactions = cursor.fetchone()[0]
 
             # Revenue and expenses with filters
-            if is_postgresql:
-                cursor.execute(f"SELECT COALESCE(SUM(amount), 0) as revenue FROM transactions WHERE {where_clause} AND amount > 0 AND amount::text != 'NaN'", params)
-            else:
-                cursor.execute(f"SELECT COALESCE(SUM(amount), 0) as revenue FROM transactions WHERE {where_clause} AND amount > 0", params)
-            result = cursor.fetchone()
-            revenue = result['revenue'] if is_postgresql else result[0]
+            cursor.execute(f"SELECT COALESCE(SUM(amount), 0) as revenue FROM transactions WHERE {where_clause} AND amount > 0", params)
+            revenue = cursor.fetchone()[0]
 
-            if is_postgresql:
-                cursor.execute(f"SELECT COALESCE(SUM(ABS(amount)), 0) as expenses FROM transactions WHERE {where_clause} AND amount < 0 AND amount::text != 'NaN'", params)
-            else:
-                cursor.execute(f"SELECT COALESCE(SUM(ABS(amount)), 0) as expenses FROM transactions WHERE {where_clause} AND amount < 0", params)
-            result = cursor.fetchone()
-            expenses = result['expenses'] if is_postgresql else result[0]
+            cursor.execute(f"SELECT COALESCE(SUM(ABS(amount)), 0) as expenses FROM transactions WHERE {where_clause} AND amount < 0", params)
+            expenses = cursor.fetchone()[0]
 
             # Needs review with filters
             cursor.execute(f"SELECT COUNT(*) as needs_review FROM transactions WHERE {where_clause} AND (confidence < 0.8 OR confidence IS NULL)", params)
-            result = cursor.fetchone()
-            needs_review = result['needs_review'] if is_postgresql else result[0]
-
-            # Date range with filters
-            # Handle mixed date formats: YYYY-MM-DD and MM/DD/YYYY
-            # Since date is stored as VARCHAR, we need to convert to proper date type for MIN/MAX
-            if is_postgresql:
-                cursor.execute(f"""
-                    SELECT
-                        MIN(
-                            CASE
-                                WHEN date ~ '^[0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}}' THEN TO_DATE(date, 'YYYY-MM-DD')
-                                WHEN date ~ '^[0-9]{{2}}/[0-9]{{2}}/[0-9]{{4}}' THEN TO_DATE(date, 'MM/DD/YYYY')
-                                ELSE NULL
-                            END
-                        ) as min_date,
-                        MAX(
-                            CASE
-                                WHEN date ~ '^[0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}}' THEN TO_DATE(date, 'YYYY-MM-DD')
-                                WHEN date ~ '^[0-9]{{2}}/[0-9]{{2}}/[0-9]{{4}}' THEN TO_DATE(date, 'MM/DD/YYYY')
-                                ELSE NULL
-                            END
-                        ) as max_date
-                    FROM transactions
-                    WHERE {where_clause}
-                """, params)
-            else:
-                # SQLite fallback - simpler text-based MIN/MAX
-                cursor.execute(f"SELECT MIN(date) as min_date, MAX(date) as max_date FROM transactions WHERE {where_clause}", params)
+            needs_review = cursor.fetchone()[0]
 
-            date_range_result = cursor.fetchone()
-
-            # Format dates properly
-            from datetime import date, datetime
-            if is_postgresql:
-                min_date = date_range_result['min_date']
-                max_date = date_range_result['max_date']
-            else:
-                min_date = date_range_result[0]
-                max_date = date_range_result[1]
-
-            # Convert to string format MM/DD/YYYY
-            def format_date(d):
-                if d is None:
-                    return 'N/A'
-                if isinstance(d, str):
-                    # Parse string date and reformat
-                    try:
-                        if 'T' in d:
-                            dt = datetime.fromisoformat(d.replace('Z', '+00:00'))
-                            return dt.strftime('%m/%d/%Y')
-                        else:
-                            dt = datetime.strptime(d, '%Y-%m-%d')
-                            return dt.strftime('%m/%d/%Y')
-                    except:
-                        return d
-                elif isinstance(d, (date, datetime)):
-                    return d.strftime('%m/%d/%Y')
-                return str(d)
+            # Date range with filters - simpler text-based MIN/MAX
+            cursor.execute(f"SELECT MIN(date) as min_date, MAX(date) as max_date FROM transactions WHERE {where_clause}", params)
+            min_date, max_date = cursor.fetchone()
 
             date_range = {
-                'min': format_date(min_date),
-                'max': format_date(max_date)
+                'min': _format_stats_date(min_date),
+                'max': _format_stats_date(max_date)
             }
 
             # Top entities with filters
@@ -2039,8 +2194,8 @@ def get_dashboard_stats(filters=None):
             'total_expenses': expenses_float,
             'needs_review': needs_review,
             'date_range': date_range,
-            'entities': [(row['classified_entity'], row['count']) if is_postgresql else (row[0], row[1]) for row in entities],
-            'source_files': [(row['source_file'], row['count']) if is_postgresql else (row[0], row[1]) for row in source_files]
+            'entities': [(row[0], row[1]) for row in entities],
+            'source_files': [(row[0], row[1]) for row in source_files]
         }
 
     except Exception as e:
@@ -2055,10 +2210,13 @@ def get_dashboard_stats(filters=None):
             'source_files': []
         }
 
-def validate_entity_value(value: str, tenant_id: str, cursor, placeholder: str) -> str:
+def validate_entity_value(value: str, tenant_id: str, cursor=None, placeholder: str = '%s') -> str:
     """
     Validate entity field value to prevent corrupted data
     Returns validated value or None if invalid
+
+    New entities are allowed; with a cursor, they are looked up so their
+    creation can be logged.
     """
     if not value or value.strip() == '':
         return None
@@ -2091,6 +2249,9 @@ def validate_entity_value(value: str, tenant_id: str, cursor, placeholder: str)
     if value in allowed_special:
         return value
 
+    if cursor is None:
+        return value
+
     # Query database to get valid entities for this tenant
     try:
         cursor.execute(f"""
@@ -2213,43 +2374,55 @@ def check_period_lock_for_transaction(tenant_id: str, transaction_date) -> tuple
     try:
         from database import db_manager
 
-        # Convert date to string if needed
-        if hasattr(transaction_date, 'isoformat'):
-            date_str = transaction_date.isoformat()
-        else:
-            date_str = str(transaction_date)[:10]  # Get just the date part
-
-        conn = db_manager._get_postgresql_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT id, period_name, status
-            FROM cfo_accounting_periods
-            WHERE tenant_id = %s
-            AND %s BETWEEN start_date AND end_date
-            AND status IN ('locked', 'closed')
-            LIMIT 1
-        """, (tenant_id, date_str))
-
-        row = cursor.fetchone()
-        cursor.close()
-        conn.close()
-
-        if row:
-            period_name = row[1]
-            status = row[2]
-            return (True, f"Cannot modify transaction: Period '{period_name}' is {status}")
+        # Write path: checked against the database, not the cached index
+        locked_periods = _period_lock_index().get_locked_periods(db_manager, tenant_id, for_write=True)
+        period = locked_periods.period_for(transaction_date)
+        if period:
+            return (True, f"Cannot modify transaction: Period '{period['period_name']}' is {period['status']}")
 
         return (False, None)
 
     except Exception as e:
-        # If tables don't exist yet (migration not applied), allow the operation
-        if 'cfo_accounting_periods' in str(e) or 'does not exist' in str(e):
-            return (False, None)
         logger.warning(f"Error checking period lock: {e}")
         return (False, None)
 
 
+def partition_locked_transactions(cursor, tenant_id: str, transaction_ids: list) -> tuple:
+    """
+    Split transactions into those that may be modified and those dated in a
+    locked/closed accounting period.
+
+    The tenant's locked periods are read from the database (never the cached
+    index, which may not yet see a lock taken by another worker); transaction
+    dates are read in one more query only when there are locked periods, and
+    all dates are then checked at once.
+
+    Returns:
+        tuple: (unlocked_ids: list, locked_ids: list of str)
+    """
+    from database import db_manager
+
+    if not transaction_ids:
+        return list(transaction_ids), []
+
+    locked_periods = _period_lock_index().get_locked_periods(db_manager, tenant_id, for_write=True)
+    if not len(locked_periods):
+        return list(transaction_ids), []
+
+    placeholders = ','.join(['%s'] * len(transaction_ids))
+    cursor.execute(
+        f"""SELECT transaction_id, date FROM transactions
+            WHERE tenant_id = %s AND transaction_id IN ({placeholders})""",
+        [tenant_id] + list(transaction_ids)
+    )
+    txn_dates = {str(row[0]): row[1] for row in cursor.fetchall()}
+
+    locked = locked_periods.locked_mask([txn_dates.get(str(txn_id)) for txn_id in transaction_ids])
+    unlocked_ids = [txn_id for txn_id, is_locked in zip(transaction_ids, locked) if not is_locked]
+    locked_ids = [str(txn_id) for txn_id, is_locked in zip(transaction_ids, locked) if is_locked]
+    return unlocked_ids, locked_ids
+
+
 def track_bulk_classification(tenant_id: str, transaction_ids: list, field: str, value: str, user: str = 'web_user'):
     """
     Track bulk classification changes for pattern learning - SINGLE batch operation.
@@ -2334,82 +2507,126 @@ def track_bulk_classification(tenant_id: str, transaction_ids: list, field: str,
             pass
 
 
+# Fields set by a manual edit that also refresh the transaction's confidence
+CLASSIFICATION_FIELDS = ('classified_entity', 'accounting_category', 'subcategory', 'justification', 'description')
+
+# Foreign keys an edit may set, checked inside the update statement
+TRANSACTION_FK_CHECKS = {
+    'entity_id': "SELECT 1 FROM entities WHERE id = %(value)s AND tenant_id = %(tenant_id)s",
+    'business_line_id': """SELECT 1 FROM business_lines bl JOIN entities e ON bl.entity_id = e.id
+                           WHERE bl.id = %(value)s AND e.tenant_id = %(tenant_id)s""",
+}
+
+TRANSACTION_COLUMN_RE = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+# Cleared if the transaction_history table is missing, so edits still go through
+_transaction_history_available = True
+
+
+def build_transaction_field_update(field: str, check_fk: bool = False, apply_entity_rules: bool = False,
+                                   record_history: bool = True) -> str:
+    """
+    One statement for an inline edit: lock the row and read its old value,
+    apply the edit (plus the tenant's entity rule and the confidence refresh),
+    and insert the history row. Returns the transaction id, old value, date,
+    description, origin, destination and new confidence; no row if the
+    transaction or the referenced entity/business line doesn't exist.
+    """
+    new_values = {field: '%(value)s'}
+    rule_cte = ''
+    rule_join = ''
+    if apply_entity_rules:
+        # First rule in tenant settings for the new entity, as the settings page orders them
+        rule_cte = """
+        entity_rule AS (
+            SELECT r.entry ->> 'category' AS category, r.entry ->> 'subcategory' AS subcategory
+            FROM tenant_configuration tc,
+                 jsonb_array_elements(CASE WHEN jsonb_typeof(tc.settings::jsonb -> 'entity_rules') = 'array'
+                                           THEN tc.settings::jsonb -> 'entity_rules' ELSE '[]'::jsonb END)
+                     WITH ORDINALITY AS r(entry, rule_order)
+            WHERE tc.tenant_id = %(tenant_id)s AND r.entry ->> 'entity' = %(value)s
+            ORDER BY r.rule_order
+            LIMIT 1
+        ),"""
+        rule_join = 'LEFT JOIN entity_rule ON TRUE'
+        new_values['accounting_category'] = "COALESCE(NULLIF(entity_rule.category, ''), t.accounting_category)"
+        new_values['subcategory'] = "COALESCE(NULLIF(entity_rule.subcategory, ''), t.subcategory)"
+
+    assignments = [f"{column} = {expression}" for column, expression in new_values.items()]
+    confidence = 'NULL::float'
+    if field in CLASSIFICATION_FIELDS:
+        # 0.95 once every critical field is filled by the edit, 0.75 for partial completion
+        def filled(column, *blank):
+            value = new_values.get(column, f't.{column}')
+            placeholders = ', '.join(f"'{b}'" for b in ('', 'N/A', 'Unknown') + blank)
+            return f"COALESCE({value}, '') NOT IN ({placeholders})"
+
+        all_filled = ' AND '.join([filled('classified_entity'), filled('accounting_category'),
+                                   filled('subcategory'), filled('justification', 'Unknown expense')])
+        assignments.append(f"confidence = CASE WHEN {all_filled} THEN 0.95 ELSE 0.75 END")
+        confidence = 't.confidence::float'
+
+    fk_check = f"AND EXISTS ({TRANSACTION_FK_CHECKS[field]})" if check_fk else ''
+    history_cte = ''
+    if record_history:
+        history_cte = """,
+        history AS (
+            INSERT INTO transaction_history (transaction_id, tenant_id, old_values, new_values, changed_by)
+            SELECT transaction_id, %(tenant_id)s,
+                   CASE WHEN old_value IS NULL THEN '{}'::jsonb
+                        ELSE jsonb_build_object(%(field)s::text, old_value) END,
+                   %(new_values)s::jsonb, %(user)s
+            FROM updated
+        )"""
+
+    return f"""
+        WITH previous AS (
+            SELECT transaction_id, date, {field} AS old_value
+            FROM transactions
+            WHERE tenant_id = %(tenant_id)s AND transaction_id = %(transaction_id)s {fk_check}
+            FOR UPDATE
+        ),{rule_cte}
+        updated AS (
+            UPDATE transactions t
+            SET {', '.join(assignments)}
+            FROM previous {rule_join}
+            WHERE t.tenant_id = %(tenant_id)s AND t.transaction_id = previous.transaction_id
+            RETURNING t.transaction_id, previous.old_value, previous.date, t.description, t.origin, t.destination,
+                      {confidence} AS confidence
+        ){history_cte}
+        SELECT transaction_id, old_value, date, description, origin, destination, confidence FROM updated
+    """
+
+
 def update_transaction_field(transaction_id: str, field: str, value: str, user: str = 'web_user', skip_tracking: bool = False) -> bool:
     """Update a single field in a transaction with history tracking
 
+    The edit, entity auto-categorization, confidence refresh and history row
+    are written by one statement; classification tracking is queued to the
+    background tracking writer.
+
     Args:
         skip_tracking: If True, skip inserting to user_classification_tracking table.
                       Used for bulk updates to avoid triggering pattern suggestion trigger 10x.
     """
+    global _transaction_history_available
     try:
         # Get current tenant_id for multi-tenant isolation
         tenant_id = get_current_tenant_id()
 
-        from database import db_manager
-        conn = db_manager._get_postgresql_connection()
-        cursor = conn.cursor()
-
-        # Detect database type for compatible syntax
-        is_postgresql = hasattr(cursor, 'mogrify')
-        placeholder = '%s' if is_postgresql else '?'
-
-        # Get current value for history
-        cursor.execute(
-            f"SELECT * FROM transactions WHERE tenant_id = {placeholder} AND transaction_id = {placeholder}",
-            (tenant_id, transaction_id)
-        )
-        current_row = cursor.fetchone()
-
-        if not current_row:
-            conn.close()
+        if not TRANSACTION_COLUMN_RE.match(field or ''):
+            logger.error(f"VALIDATION FAILED: Invalid field '{field}' for transaction {transaction_id}")
             return (False, None)
 
-        # Convert tuple to dict for PostgreSQL - must match column order from cursor.description
-        current_dict = {
-            'transaction_id': current_row[0],
-            'date': current_row[1],
-            'description': current_row[2],
-            'amount': current_row[3],
-            'currency': current_row[4],
-            'usd_equivalent': current_row[5],
-            'classified_entity': current_row[6],
-            'justification': current_row[7],
-            'confidence': current_row[8],
-            'classification_reason': current_row[9],
-            'origin': current_row[10],
-            'destination': current_row[11],
-            'identifier': current_row[12],
-            'source_file': current_row[13],
-            'crypto_amount': current_row[14],
-            'conversion_note': current_row[15],
-            'accounting_category': current_row[16],
-            'archived': current_row[17],
-            'confidence_history': current_row[18],
-            'ai_reassessment_count': current_row[19],
-            'last_ai_review': current_row[20],
-            'user_feedback_count': current_row[21],
-            'ai_suggestions': current_row[22],
-            'subcategory': current_row[23]
-        }
-
-        # Check if transaction is in a locked period
-        is_locked, lock_error = check_period_lock_for_transaction(tenant_id, current_dict.get('date'))
-        if is_locked:
-            logger.warning(f"PERIOD LOCK: {lock_error} - transaction_id={transaction_id}")
-            conn.close()
-            return (False, lock_error)
-
-        current_value = current_dict.get(field) if field in current_dict else None
-
         # CRITICAL: Validate value before saving to prevent corrupted data
         validated_value = value
+        check_fk = False
 
         if field == 'classified_entity':
             # Entity field validation
-            validated_value = validate_entity_value(value, tenant_id, cursor, placeholder)
+            validated_value = validate_entity_value(value, tenant_id)
             if validated_value is None:
                 logger.error(f"VALIDATION FAILED: Invalid entity value '{value}' for transaction {transaction_id}")
-                conn.close()
                 return (False, None)
 
         elif field == 'accounting_category':
@@ -2417,7 +2634,6 @@ def update_transaction_field(transaction_id: str, field: str, value: str, user:
             validated_value = validate_category_value(value)
             if validated_value is None:
                 logger.error(f"VALIDATION FAILED: Invalid category value '{value}' for transaction {transaction_id}")
-                conn.close()
                 return (False, None)
 
         elif field in ['subcategory', 'justification', 'description', 'origin', 'destination']:
@@ -2425,226 +2641,76 @@ def update_transaction_field(transaction_id: str, field: str, value: str, user:
             validated_value = sanitize_text_field(value, field)
             if validated_value is None:
                 logger.error(f"VALIDATION FAILED: Invalid {field} value for transaction {transaction_id}")
-                conn.close()
                 return (False, None)
 
-        elif field == 'entity_id':
-            # NEW: Validate entity_id FK - must exist and belong to tenant
-            if value and value != 'null' and value != '':
-                cursor.execute(
-                    f"SELECT id FROM entities WHERE id = {placeholder} AND tenant_id = {placeholder}",
-                    (value, tenant_id)
-                )
-                entity_check = cursor.fetchone()
-                if not entity_check:
-                    logger.error(f"VALIDATION FAILED: Entity ID '{value}' not found or access denied for tenant {tenant_id}")
-                    conn.close()
-                    return (False, None)
-                validated_value = value
-            else:
-                # Allow NULL for entity_id
-                validated_value = None
-
-        elif field == 'business_line_id':
-            # NEW: Validate business_line_id FK - must exist and belong to an entity owned by tenant
+        elif field in TRANSACTION_FK_CHECKS:
+            # entity_id / business_line_id must exist and belong to the tenant (checked in the statement)
             if value and value != 'null' and value != '':
-                cursor.execute(
-                    f"""
-                    SELECT bl.id FROM business_lines bl
-                    JOIN entities e ON bl.entity_id = e.id
-                    WHERE bl.id = {placeholder} AND e.tenant_id = {placeholder}
-                    """,
-                    (value, tenant_id)
-                )
-                bl_check = cursor.fetchone()
-                if not bl_check:
-                    logger.error(f"VALIDATION FAILED: Business line ID '{value}' not found or access denied for tenant {tenant_id}")
-                    conn.close()
-                    return (False, None)
-                validated_value = value
+                check_fk = True
             else:
-                # Allow NULL for business_line_id
+                # Allow NULL
                 validated_value = None
 
-        # Update the field with validated value
-        update_query = f"UPDATE transactions SET {field} = {placeholder} WHERE tenant_id = {placeholder} AND transaction_id = {placeholder}"
-        cursor.execute(update_query, (validated_value, tenant_id, transaction_id))
-        logger.info(f" Updated field '{field}' to '{validated_value}' for transaction {transaction_id}")
-
-        # DYNAMIC ENTITY-BASED AUTO-CATEGORIZATION: Apply tenant-specific entity rules from settings
-        if field == 'classified_entity' and validated_value:
-            # Fetch entity rules from tenant settings
-            cursor.execute("""
-                SELECT settings FROM tenant_configuration WHERE tenant_id = %s
-            """, (tenant_id,))
-
-            settings_row = cursor.fetchone()
-            entity_rules = []
-
-            if settings_row and settings_row[0]:
-                entity_rules = settings_row[0].get('entity_rules', [])
-
-            # Find matching rule for this entity
-            matching_rule = None
-            for rule in entity_rules:
-                if rule.get('entity') == validated_value:
-                    matching_rule = rule
-                    break
-
-            # Apply the rule if found
-            if matching_rule:
-                category = matching_rule.get('category')
-                subcategory = matching_rule.get('subcategory', '')
-
-                logger.info(f" AUTO-CATEGORIZATION: Entity '{validated_value}' matched rule - applying category '{category}' and subcategory '{subcategory}'")
-
-                if category:
-                    category_update_query = f"UPDATE transactions SET accounting_category = {placeholder} WHERE tenant_id = {placeholder} AND transaction_id = {placeholder}"
-                    cursor.execute(category_update_query, (category, tenant_id, transaction_id))
-                    logger.info(f" AUTO-CATEGORIZATION: Set accounting_category to '{category}'")
-
-                if subcategory:
-                    subcategory_update_query = f"UPDATE transactions SET subcategory = {placeholder} WHERE tenant_id = {placeholder} AND transaction_id = {placeholder}"
-                    cursor.execute(subcategory_update_query, (subcategory, tenant_id, transaction_id))
-                    logger.info(f" AUTO-CATEGORIZATION: Set subcategory to '{subcategory}'")
-
-        # If user is manually updating a classification field, boost confidence to indicate manual verification
-        classification_fields = ['classified_entity', 'accounting_category', 'subcategory', 'justification', 'description']
-        updated_confidence = None
-        if field in classification_fields:
-            logger.info(f" Field '{field}' is a classification field - checking for confidence update")
-            # Check if ALL critical fields are now filled to determine confidence level
-            # Critical fields: classified_entity, accounting_category, subcategory, justification
-            cursor.execute(
-                f"SELECT classified_entity, accounting_category, subcategory, justification FROM transactions WHERE tenant_id = {placeholder} AND transaction_id = {placeholder}",
-                (tenant_id, transaction_id)
-            )
-            check_row = cursor.fetchone()
-
-            if check_row:
-                # Convert to dict for easier access (PostgreSQL returns dict-like objects)
-                if is_postgresql:
-                    entity = check_row[0]
-                    acc_cat = check_row[1]
-                    subcat = check_row[2]
-                    justif = check_row[3]
-                else:
-                    entity = check_row[0]
-                    acc_cat = check_row[1]
-                    subcat = check_row[2]
-                    justif = check_row[3]
-
-                logger.info(f" Current field values - Entity: '{entity}', Category: '{acc_cat}', Subcategory: '{subcat}', Justification: '{justif}'")
-
-                # Check if all critical fields are properly filled (not NULL, empty, or 'N/A')
-                all_filled = all([
-                    entity and entity not in ['', 'N/A', 'Unknown'],
-                    acc_cat and acc_cat not in ['', 'N/A', 'Unknown'],
-                    subcat and subcat not in ['', 'N/A', 'Unknown'],
-                    justif and justif not in ['', 'N/A', 'Unknown', 'Unknown expense']
-                ])
-
-                # Set confidence to 0.95 if all fields filled, otherwise 0.75 for partial completion
-                updated_confidence = 0.95 if all_filled else 0.75
-                confidence_update_query = f"UPDATE transactions SET confidence = {placeholder} WHERE tenant_id = {placeholder} AND transaction_id = {placeholder}"
-                cursor.execute(confidence_update_query, (updated_confidence, tenant_id, transaction_id))
+        params = {
+            'tenant_id': tenant_id, 'transaction_id': transaction_id, 'value': validated_value,
+            'field': field, 'new_values': json.dumps({field: value}), 'user': user,
+        }
 
-                if all_filled:
-                    logger.info(f" CONFIDENCE: Boosted confidence to 0.95 for transaction {transaction_id} - ALL critical fields filled by manual {field} edit")
-                else:
-                    logger.info(f"  CONFIDENCE: Set confidence to 0.75 for transaction {transaction_id} - partial completion by manual {field} edit")
+        from database import db_manager
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            record_history = _transaction_history_available
+            try:
+                cursor.execute(build_transaction_field_update(
+                    field, check_fk, field == 'classified_entity', record_history), params)
+            except Exception as history_error:
+                if not record_history or 'transaction_history' not in str(history_error):
+                    raise
+                print(f"INFO: Could not record history: {history_error}")
+                _transaction_history_available = False
+                conn.rollback()
+                cursor.execute(build_transaction_field_update(
+                    field, check_fk, field == 'classified_entity', False), params)
+            row = cursor.fetchone()
 
-        # CRITICAL: Commit the UPDATE immediately to ensure it persists
-        # In PostgreSQL, if a later query fails, it can rollback the entire transaction
-        conn.commit()
+            if not row:
+                conn.rollback()
+                cursor.close()
+                if check_fk:
+                    logger.error(f"VALIDATION FAILED: Transaction {transaction_id} or {field} '{value}' not found or access denied for tenant {tenant_id}")
+                return (False, None)
 
-        logger.info(f" Transaction {transaction_id} committed: field={field}, value={value}, updated_confidence={updated_confidence}")
+            _, current_value, txn_date, description, origin, destination, updated_confidence = row
 
-        # Record change in history (only if table exists)
-        # This is done in a separate transaction so failures don't affect the main update
-        try:
-            # The transaction_history table uses old_values/new_values as JSONB
-            old_values_json = {field: current_value} if current_value is not None else {}
-            new_values_json = {field: value}
+            # Check if transaction is in a locked period
+            is_locked, lock_error = check_period_lock_for_transaction(tenant_id, txn_date)
+            if is_locked:
+                conn.rollback()
+                cursor.close()
+                logger.warning(f"PERIOD LOCK: {lock_error} - transaction_id={transaction_id}")
+                return (False, lock_error)
 
-            cursor.execute(f"""
-                INSERT INTO transaction_history (transaction_id, tenant_id, old_values, new_values, changed_by)
-                VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
-            """, (transaction_id, tenant_id, json.dumps(old_values_json), json.dumps(new_values_json), user))
             conn.commit()
-        except Exception as history_error:
-            print(f"INFO: Could not record history: {history_error}")
-            # Rollback only affects the history insert, main update already committed
-            try:
-                conn.rollback()
-            except:
-                pass
+            cursor.close()
+
+        logger.info(f" Transaction {transaction_id} committed: field={field}, value={validated_value}, updated_confidence={updated_confidence}")
 
         # Track manual classification changes for auto-learning (50 classification threshold)
-        # Only track changes to: entity, category, subcategory, justification
         # Skip tracking for bulk updates to avoid triggering pattern suggestion trigger 10x
-        tracking_fields = {
-            'classified_entity': 'entity',
-            'accounting_category': 'category',
-            'subcategory': 'subcategory',
-            'justification': 'justification'
-        }
-
-        if field in tracking_fields and not skip_tracking:
-            try:
-                # Get transaction description, origin, and destination for pattern detection
-                cursor.execute(
-                    f"SELECT description, origin, destination FROM transactions WHERE tenant_id = {placeholder} AND transaction_id = {placeholder}",
-                    (tenant_id, transaction_id)
-                )
-                txn_row = cursor.fetchone()
-                description = txn_row[0] if txn_row else ''
-                origin = txn_row[1] if txn_row and len(txn_row) > 1 else None
-                destination = txn_row[2] if txn_row and len(txn_row) > 2 else None
-
-                # Generate pattern signature for grouping identical patterns
-                # MD5(description + field + value) - matches the SQL function
-                import hashlib
-                pattern_signature = hashlib.md5(
-                    f"{description.lower().strip()}::{tracking_fields[field]}::{value.lower().strip()}".encode()
-                ).hexdigest()
-
-                # Insert tracking record with origin/destination for similarity matching
-                cursor.execute(f"""
-                    INSERT INTO user_classification_tracking
-                    (tenant_id, user_id, transaction_id, field_changed, old_value, new_value,
-                     description_pattern, pattern_signature, origin, destination)
-                    VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder},
-                            {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
-                """, (tenant_id, user, transaction_id, tracking_fields[field], current_value,
-                      value, description, pattern_signature, origin, destination))
-
-                conn.commit()
-                logger.info(f"📊 TRACKING: Recorded {tracking_fields[field]} change for auto-learning system (origin: {origin}, dest: {destination})")
-
-                # Trigger async pattern processing if configured
-                # Note: PostgreSQL trigger will handle 3-occurrence detection
-                # Pattern suggestions will be processed by background task or on-demand
+        if not skip_tracking:
+            _web_ui_service('classification_tracking').classification_tracking_writer.submit(
+                tenant_id, user, transaction_id, field, current_value, value,
+                description=description, origin=origin, destination=destination
+            )
 
-            except Exception as track_error:
-                logger.warning(f"Could not record classification tracking: {track_error}")
-                # Don't fail the main update if tracking fails
-                try:
-                    conn.rollback()
-                except:
-                    pass
+        # KPIs and chatbot context for this tenant are now stale
+        _notify_transactions_changed(tenant_id)
 
-        # Close connection and return success with updated confidence
-        conn.close()
         return (True, updated_confidence)
 
     except Exception as e:
         print(f"ERROR: Error updating transaction field: {e}")
         print(f"ERROR TRACEBACK: {traceback.format_exc()}")
-        try:
-            conn.close()
-        except:
-            pass
         return (False, None)
 
 def extract_entity_patterns_with_llm(transaction_id: str, entity_name: str, description: str, claude_client) -> Dict:
@@ -2785,43 +2851,42 @@ def get_similar_transactions_tfidf(transaction_id: str, entity_name: str, tenant
         from database import db_manager
 
         # Step 1: Get reference transaction details
-        conn = db_manager._get_postgresql_connection()
-        cursor = conn.cursor()
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT transaction_id, description, amount, date, classified_entity
-            FROM transactions
-            WHERE tenant_id = %s AND transaction_id = %s
-        """, (tenant_id, transaction_id))
+            cursor.execute("""
+                SELECT transaction_id, description, amount, date, classified_entity
+                FROM transactions
+                WHERE tenant_id = %s AND transaction_id = %s
+            """, (tenant_id, transaction_id))
 
-        ref_tx = cursor.fetchone()
-        if not ref_tx:
-            logging.warning(f"[TFIDF_SIMILAR] Reference transaction {transaction_id} not found")
-            return []
+            ref_tx = cursor.fetchone()
+            if not ref_tx:
+                logging.warning(f"[TFIDF_SIMILAR] Reference transaction {transaction_id} not found")
+                return []
 
-        # Extract reference transaction details
-        if isinstance(ref_tx, dict):
-            ref_desc = ref_tx.get('description', '')
-            ref_amount = ref_tx.get('amount', 0)
-        else:
-            ref_desc = ref_tx[1] if len(ref_tx) > 1 else ''
-            ref_amount = ref_tx[2] if len(ref_tx) > 2 else 0
+            # Extract reference transaction details
+            if isinstance(ref_tx, dict):
+                ref_desc = ref_tx.get('description', '')
+                ref_amount = ref_tx.get('amount', 0)
+            else:
+                ref_desc = ref_tx[1] if len(ref_tx) > 1 else ''
+                ref_amount = ref_tx[2] if len(ref_tx) > 2 else 0
 
-        logging.info(f"[TFIDF_SIMILAR] Finding similar transactions for entity='{entity_name}', desc='{ref_desc[:50]}...', amount=${ref_amount}")
+            logging.info(f"[TFIDF_SIMILAR] Finding similar transactions for entity='{entity_name}', desc='{ref_desc[:50]}...', amount=${ref_amount}")
 
-        # Step 2: Use TF-IDF system to score ALL unclassified/different entity transactions
-        cursor.execute("""
-            SELECT transaction_id, description, amount, date, classified_entity, suggested_entity
-            FROM transactions
-            WHERE tenant_id = %s
-            AND transaction_id != %s
-            AND (classified_entity IS NULL OR classified_entity = '' OR classified_entity != %s)
-            ORDER BY date DESC
-            LIMIT 500
-        """, (tenant_id, transaction_id, entity_name))
+            # Step 2: Use TF-IDF system to score ALL unclassified/different entity transactions
+            cursor.execute("""
+                SELECT transaction_id, description, amount, date, classified_entity, suggested_entity
+                FROM transactions
+                WHERE tenant_id = %s
+                AND transaction_id != %s
+                AND (classified_entity IS NULL OR classified_entity = '' OR classified_entity != %s)
+                ORDER BY date DESC
+                LIMIT 500
+            """, (tenant_id, transaction_id, entity_name))
 
-        candidate_txs = cursor.fetchall()
-        conn.close()
+            candidate_txs = cursor.fetchall()
 
         if not candidate_txs:
             logging.info(f"[TFIDF_SIMILAR] No candidate transactions found")
@@ -2894,6 +2959,51 @@ def get_similar_transactions_tfidf(transaction_id: str, entity_name: str, tenant
         return []
 
 
+# Uncategorized or low-confidence transactions are candidates for "Apply AI Suggestions"
+SIMILARITY_CANDIDATE_CONDITION = """
+    (
+        confidence IS NULL
+        OR confidence < 0.8
+        OR classified_entity IS NULL
+        OR classified_entity = ''
+        OR classified_entity = 'N/A'
+    )
+"""
+
+# Upper bound on the transactions held in a tenant's similarity candidate pool
+SIMILARITY_POOL_MAX_ROWS = 100000
+
+
+def _load_similarity_candidates(tenant_id: str) -> List[Dict]:
+    """Load the tenant's similarity candidates for a simple_match_engine.CandidatePool"""
+    from database import db_manager
+    rows = db_manager.execute_query(f"""
+        SELECT transaction_id, description, amount, date, classified_entity,
+               origin, destination, confidence, accounting_category, subcategory, justification
+        FROM transactions
+        WHERE tenant_id = %s
+        AND {SIMILARITY_CANDIDATE_CONDITION}
+        ORDER BY date DESC
+        LIMIT %s
+    """, (tenant_id, SIMILARITY_POOL_MAX_ROWS), fetch_all=True)
+    return [dict(row) for row in rows or []]
+
+
+def _filter_still_uncategorized(tenant_id: str, matches: List[Dict]) -> List[Dict]:
+    """Keep matches whose transactions are still similarity candidates"""
+    if not matches:
+        return matches
+    from database import db_manager
+    rows = db_manager.execute_query(f"""
+        SELECT transaction_id FROM transactions
+        WHERE tenant_id = %s
+        AND transaction_id = ANY(%s)
+        AND {SIMILARITY_CANDIDATE_CONDITION}
+    """, (tenant_id, [m['transaction_id'] for m in matches]), fetch_all=True)
+    still_open = {row['transaction_id'] for row in rows or []}
+    return [m for m in matches if m['transaction_id'] in still_open]
+
+
 def find_similar_with_tfidf_after_suggestion(transaction_id: str, entity_name: str, tenant_id: str,
                                              wallet_address: str = None, max_results: int = 50) -> List[Dict]:
     """
@@ -2921,23 +3031,21 @@ def find_similar_with_tfidf_after_suggestion(transaction_id: str, entity_name: s
     """
     try:
         from database import db_manager
-        from simple_match_engine import find_similar_simple
+        from simple_match_engine import find_similar_simple, get_candidate_pool
 
         # Step 1: Get reference transaction details
-        conn = db_manager._get_postgresql_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT transaction_id, description, amount, date, classified_entity,
-                   origin, destination, accounting_category, subcategory, justification
-            FROM transactions
-            WHERE tenant_id = %s AND transaction_id = %s
-        """, (tenant_id, transaction_id))
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT transaction_id, description, amount, date, classified_entity,
+                       origin, destination, accounting_category, subcategory, justification
+                FROM transactions
+                WHERE tenant_id = %s AND transaction_id = %s
+            """, (tenant_id, transaction_id))
+            ref_tx = cursor.fetchone()
 
-        ref_tx = cursor.fetchone()
         if not ref_tx:
             logging.warning(f"[SIMPLE_MATCH_AFTER_SUGGESTION] Reference transaction {transaction_id} not found")
-            conn.close()
             return []
 
         # Extract reference transaction details
@@ -2964,94 +3072,27 @@ def find_similar_with_tfidf_after_suggestion(transaction_id: str, entity_name: s
 
         logging.info(f"[SIMPLE_MATCH_AFTER_SUGGESTION] Finding similar transactions for entity='{entity_name}', desc='{ref_desc[:50]}...'")
 
-        # Step 2: Query uncategorized or low-confidence transactions
-        #  NEW: Add detailed logging of query criteria
-        logging.info(f"[SIMPLE_MATCH_AFTER_SUGGESTION]  Querying candidates with:")
-        logging.info(f"[SIMPLE_MATCH_AFTER_SUGGESTION]   - tenant_id: {tenant_id}")
-        logging.info(f"[SIMPLE_MATCH_AFTER_SUGGESTION]   - exclude: {transaction_id}")
-        logging.info(f"[SIMPLE_MATCH_AFTER_SUGGESTION]   - criteria: confidence < 0.8 OR entity NULL/empty/N/A")
-
-        #  NEW: Extract first significant word from description for filtering
-        # This ensures we prioritize similar transaction types (e.g., all "Ethereum" transactions together)
-        ref_desc_words = ref_desc.upper().split()
-        ref_first_word = ref_desc_words[0] if ref_desc_words else ''
-
-        cursor.execute("""
-            SELECT transaction_id, description, amount, date, classified_entity,
-                   origin, destination, confidence, accounting_category, subcategory, justification
-            FROM transactions
-            WHERE tenant_id = %s
-            AND transaction_id != %s
-            AND (
-                confidence IS NULL
-                OR confidence < 0.8
-                OR classified_entity IS NULL
-                OR classified_entity = ''
-                OR classified_entity = 'N/A'
-            )
-            ORDER BY
-                -- Prioritize transactions with same first word (e.g., "Ethereum", "USDT", "Tether")
-                CASE WHEN UPPER(description) LIKE %s THEN 0 ELSE 1 END ASC,
-                -- Then by confidence (lowest first)
-                CASE
-                    WHEN confidence IS NULL THEN 0
-                    WHEN confidence < 0.5 THEN 1
-                    WHEN confidence < 0.8 THEN 2
-                    ELSE 3
-                END ASC,
-                -- Then by date (newest first)
-                date DESC
-            LIMIT 500
-        """, (tenant_id, transaction_id, f'{ref_first_word}%'))
-
-        candidate_txs = cursor.fetchall()
-        conn.close()
-
-        if not candidate_txs:
-            logging.warning(f"[SIMPLE_MATCH_AFTER_SUGGESTION]  No candidate transactions found in database")
-            return []
-
-        logging.info(f"[SIMPLE_MATCH_AFTER_SUGGESTION]  Found {len(candidate_txs)} candidate transactions to score")
-
-        #  NEW: Log sample of candidate descriptions to understand what we're matching against
-        logging.info(f"[SIMPLE_MATCH_AFTER_SUGGESTION]  Sample of first 10 candidates:")
-        for i, tx in enumerate(candidate_txs[:10], 1):
-            sample_desc = tx[1] if len(tx) > 1 else '' if isinstance(tx, tuple) else tx.get('description', '')
-            sample_entity = tx[4] if len(tx) > 4 else '' if isinstance(tx, tuple) else tx.get('classified_entity', '')
-            logging.info(f"[SIMPLE_MATCH_AFTER_SUGGESTION]   {i}. '{sample_desc[:60]}...' (entity: {sample_entity})")
-
-        # Convert candidates to dicts for Simple Match engine
-        candidate_dicts = []
-        for tx in candidate_txs:
-            if isinstance(tx, dict):
-                candidate_dicts.append(tx)
-            else:
-                # Column order: transaction_id, description, amount, date, classified_entity, origin, destination, confidence, accounting_category, subcategory, justification
-                candidate_dicts.append({
-                    'transaction_id': tx[0],
-                    'description': tx[1] if len(tx) > 1 else '',
-                    'amount': tx[2] if len(tx) > 2 else 0,
-                    'date': tx[3] if len(tx) > 3 else None,
-                    'classified_entity': tx[4] if len(tx) > 4 else '',
-                    'origin': tx[5] if len(tx) > 5 else '',
-                    'destination': tx[6] if len(tx) > 6 else '',
-                    'confidence': tx[7] if len(tx) > 7 else 0,
-                    'accounting_category': tx[8] if len(tx) > 8 else '',
-                    'subcategory': tx[9] if len(tx) > 9 else '',
-                    'justification': tx[10] if len(tx) > 10 else '',
-                })
+        # Step 2: Score against the tenant's pre-tokenized pool of uncategorized or
+        # low-confidence transactions (built once, reused across suggestion calls)
+        candidate_pool = get_candidate_pool(
+            tenant_id, lambda: _load_similarity_candidates(tenant_id)
+        )
+        logging.info(f"[SIMPLE_MATCH_AFTER_SUGGESTION]  Candidate pool has {len(candidate_pool)} transactions")
 
         # Step 3: Use Simple Match engine to find similar transactions
-        # Use min_confidence=0.3 to match Simple Match engine defaults
-        logging.info(f"[SIMPLE_MATCH_AFTER_SUGGESTION]  Running Simple Match engine with min_confidence=0.3...")
-        logging.info(f"[SIMPLE_MATCH_AFTER_SUGGESTION]  DEBUG MODE ENABLED - Detailed matching logs will follow")
+        # Use min_confidence=0.3 to match Simple Match engine defaults. The wallet
+        # boost below re-ranks matches, so only limit the lookup without it.
         matches = find_similar_simple(
             target_transaction=ref_tx_dict,
-            candidate_transactions=candidate_dicts,
+            candidate_transactions=candidate_pool,
             min_confidence=0.3,
-            debug=True  #  Enable detailed logging
+            debug=True,
+            max_results=None if wallet_address else max_results
         )
 
+        # The pool may be a few minutes old: drop matches categorized since
+        matches = _filter_still_uncategorized(tenant_id, matches)
+
         logging.info(f"[SIMPLE_MATCH_AFTER_SUGGESTION]  Simple Match found {len(matches)} similar transactions")
 
         # Step 4: Apply wallet address boost if applicable
@@ -4550,6 +4591,90 @@ Respond ONLY in valid JSON format:
             'error': str(e)
         }), 500
 
+def _notify_transactions_changed(tenant_id):
+    """Retire caches derived from the tenant's transactions after a write"""
+    try:
+        _kpi_aggregator().invalidate_transaction_kpis(tenant_id)
+    except Exception as e:
+        logger.warning(f"Could not invalidate KPI cache for tenant {tenant_id}: {e}")
+
+    # Chatbot system prompt stats and memoized tool results
+    try:
+        from chatbot_context import invalidate_chatbot_context
+        invalidate_chatbot_context(tenant_id)
+    except Exception as e:
+        logger.warning(f"Could not invalidate chatbot context for tenant {tenant_id}: {e}")
+
+
+# Mutating endpoints under these paths write the tenant's transactions
+TRANSACTION_WRITE_PATH_PREFIXES = (
+    '/api/transactions/', '/api/update_transaction', '/api/bulk_update_transactions',
+    '/api/archive_transactions', '/api/unarchive_transactions', '/api/upload',
+)
+
+
+@app.after_request
+def invalidate_caches_after_transaction_writes(response):
+    """Invalidate per-tenant transaction caches after a successful write request"""
+    if (request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and response.status_code < 400
+            and request.path.startswith(TRANSACTION_WRITE_PATH_PREFIXES)):
+        try:
+            tenant_id = get_current_tenant_id()
+        except Exception:
+            tenant_id = None
+        if tenant_id:
+            _notify_transactions_changed(tenant_id)
+    return response
+
+
+def after_transactions_ingested(tenant_id, ingested_dates):
+    """
+    Post-ingest hook run after an upload is synced to the database.
+    Refreshes derived data incrementally; failures never fail the upload.
+    """
+    parsed_dates = []
+    for value in ingested_dates:
+        for fmt in ('%Y-%m-%d', '%m/%d/%Y'):
+            try:
+                parsed_dates.append(datetime.strptime(value, fmt).date())
+                break
+            except (TypeError, ValueError):
+                continue
+    earliest_date = min(parsed_dates) if parsed_dates else None
+
+    # Similarity candidate pool: new uploads are uncategorized candidates
+    try:
+        from simple_match_engine import invalidate_candidate_pool
+        invalidate_candidate_pool(tenant_id)
+    except Exception as e:
+        logger.warning(f"Could not invalidate similarity candidate pool for tenant {tenant_id}: {e}")
+
+    # Dashboard KPIs, chatbot system prompt stats and memoized tool results
+    _notify_transactions_changed(tenant_id)
+
+    # Sankey breakdown keywords for the new transactions
+    try:
+        from database import db_manager
+        _web_ui_service('sankey_engine').keyword_index.refresh_async(db_manager, tenant_id)
+    except Exception as e:
+        logger.warning(f"Could not schedule keyword index refresh for tenant {tenant_id}: {e}")
+
+    # Analytical report ledger snapshot: append the new rows if it's loaded
+    try:
+        from database import db_manager
+        _web_ui_service('ledger_snapshot').ledger_snapshots.append_ingested(db_manager, tenant_id)
+    except Exception as e:
+        logger.warning(f"Could not append ingested transactions to the ledger snapshot for tenant {tenant_id}: {e}")
+
+    # Transaction chains: re-analyze only the window around the new dates
+    if CHAIN_ANALYZER_AVAILABLE and earliest_date:
+        try:
+            from chain_detection_engine import get_chain_engine
+            get_chain_engine().refresh_async(tenant_id, since=earliest_date)
+        except Exception as e:
+            logger.warning(f"Could not schedule transaction chain refresh for tenant {tenant_id}: {e}")
+
+
 def sync_csv_to_database(csv_filename_or_path=None, tenant_id=None):
     """Sync classified CSV files to SQLite database"""
     # Get current tenant_id for multi-tenant isolation
@@ -4678,6 +4803,9 @@ def sync_csv_to_database(csv_filename_or_path=None, tenant_id=None):
         except Exception as e:
             print(f" WARNING: Could not pre-load wallets: {e}")
 
+        # Dates touched by this upload (drives incremental post-ingest refreshes)
+        ingested_dates = set()
+
         # Insert all transactions
         for _, row in df.iterrows():
             # Create transaction_id if not exists
@@ -4702,6 +4830,8 @@ def sync_csv_to_database(csv_filename_or_path=None, tenant_id=None):
             if _ == 0:
                 print(f" DEBUG DATE NORMALIZATION: Original='{original_date}' -> Normalized='{date_value}'")
 
+            ingested_dates.add(date_value)
+
             data = {
                 'transaction_id': transaction_id,
                 'date': date_value,
@@ -5033,6 +5163,8 @@ def sync_csv_to_database(csv_filename_or_path=None, tenant_id=None):
         print(f"   • Skipped (unchanged): {skipped_count}")
         print(f"")
 
+        after_transactions_ingested(tenant_id, ingested_dates)
+
         return True
 
     except Exception as e:
@@ -5991,7 +6123,9 @@ def api_update_entity_bulk():
         placeholder = '%s' if is_postgresql else '?'
         updated_count = 0
 
-        for transaction_id in transaction_ids:
+        unlocked_ids, locked_transactions = partition_locked_transactions(cursor, tenant_id, transaction_ids)
+
+        for transaction_id in unlocked_ids:
             cursor.execute(
                 f"UPDATE transactions SET classified_entity = {placeholder} WHERE tenant_id = {placeholder} AND transaction_id = {placeholder}",
                 (new_entity, tenant_id, transaction_id)
@@ -6002,11 +6136,17 @@ def api_update_entity_bulk():
         conn.commit()
         conn.close()
 
-        return jsonify({
+        result = {
             'success': True,
             'message': f'Updated {updated_count} transactions',
             'updated_count': updated_count
-        })
+        }
+
+        if locked_transactions:
+            result['warning'] = f'{len(locked_transactions)} transaction(s) skipped due to period lock'
+            result['locked_transaction_ids'] = locked_transactions
+
+        return jsonify(result)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -6033,7 +6173,9 @@ def api_update_category_bulk():
         placeholder = '%s' if is_postgresql else '?'
         updated_count = 0
 
-        for transaction_id in transaction_ids:
+        unlocked_ids, locked_transactions = partition_locked_transactions(cursor, tenant_id, transaction_ids)
+
+        for transaction_id in unlocked_ids:
             cursor.execute(
                 f"UPDATE transactions SET accounting_category = {placeholder} WHERE tenant_id = {placeholder} AND transaction_id = {placeholder}",
                 (new_category, tenant_id, transaction_id)
@@ -6044,11 +6186,17 @@ def api_update_category_bulk():
         conn.commit()
         conn.close()
 
-        return jsonify({
+        result = {
             'success': True,
             'message': f'Updated {updated_count} transactions',
             'updated_count': updated_count
-        })
+        }
+
+        if locked_transactions:
+            result['warning'] = f'{len(locked_transactions)} transaction(s) skipped due to period lock'
+            result['locked_transaction_ids'] = locked_transactions
+
+        return jsonify(result)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -6075,7 +6223,9 @@ def api_update_subcategory_bulk():
         placeholder = '%s' if is_postgresql else '?'
         updated_count = 0
 
-        for transaction_id in transaction_ids:
+        unlocked_ids, locked_transactions = partition_locked_transactions(cursor, tenant_id, transaction_ids)
+
+        for transaction_id in unlocked_ids:
             cursor.execute(
                 f"UPDATE transactions SET subcategory = {placeholder} WHERE tenant_id = {placeholder} AND transaction_id = {placeholder}",
                 (new_subcategory, tenant_id, transaction_id)
@@ -6086,18 +6236,24 @@ def api_update_subcategory_bulk():
         conn.commit()
         conn.close()
 
-        return jsonify({
+        result = {
             'success': True,
             'message': f'Updated {updated_count} transactions',
             'updated_count': updated_count
-        })
+        }
+
+        if locked_transactions:
+            result['warning'] = f'{len(locked_transactions)} transaction(s) skipped due to period lock'
+            result['locked_transaction_ids'] = locked_transactions
+
+        return jsonify(result)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/archive_transactions', methods=['POST'])
 def api_archive_transactions():
-    """API endpoint to archive multiple transactions - FULLY OPTIMIZED (3 queries total)"""
+    """API endpoint to archive multiple transactions - FULLY OPTIMIZED (at most 2 queries)"""
     try:
         data = request.get_json()
         transaction_ids = data.get('transaction_ids', [])
@@ -6111,42 +6267,10 @@ def api_archive_transactions():
         conn = db_manager._get_postgresql_connection()
         cursor = conn.cursor()
 
-        # Query 1: Get all locked periods for this tenant
-        cursor.execute("""
-            SELECT start_date, end_date FROM cfo_accounting_periods
-            WHERE tenant_id = %s AND status IN ('locked', 'closed')
-        """, (tenant_id,))
-        locked_periods = [(str(row[0])[:10], str(row[1])[:10]) for row in cursor.fetchall()]
-
-        # Query 2: Get all transaction dates
-        placeholders = ','.join(['%s'] * len(transaction_ids))
-        cursor.execute(
-            f"""SELECT transaction_id, date FROM transactions
-                WHERE tenant_id = %s AND transaction_id IN ({placeholders})""",
-            [tenant_id] + list(transaction_ids)
-        )
-        txn_dates = {row[0]: row[1] for row in cursor.fetchall()}
-
-        # Check period locks in memory (NO additional DB calls!)
-        locked_transactions = []
-        unlocked_ids = []
-
-        for txn_id in transaction_ids:
-            if txn_id in txn_dates:
-                txn_date = txn_dates[txn_id]
-                date_str = str(txn_date)[:10] if txn_date else ''
-
-                # Check if date falls within any locked period
-                is_locked = any(start <= date_str <= end for start, end in locked_periods)
-
-                if is_locked:
-                    locked_transactions.append(str(txn_id))
-                else:
-                    unlocked_ids.append(txn_id)
-            else:
-                unlocked_ids.append(txn_id)
+        # Period locks are checked against the tenant's in-memory index
+        unlocked_ids, locked_transactions = partition_locked_transactions(cursor, tenant_id, transaction_ids)
 
-        # Query 3: Archive all unlocked transactions
+        # Archive all unlocked transactions
         archived_count = 0
         if unlocked_ids:
             placeholders = ','.join(['%s'] * len(unlocked_ids))
@@ -6177,7 +6301,7 @@ def api_archive_transactions():
 
 @app.route('/api/unarchive_transactions', methods=['POST'])
 def api_unarchive_transactions():
-    """API endpoint to unarchive multiple transactions - FULLY OPTIMIZED (3 queries total)"""
+    """API endpoint to unarchive multiple transactions - FULLY OPTIMIZED (at most 2 queries)"""
     try:
         data = request.get_json()
         transaction_ids = data.get('transaction_ids', [])
@@ -6191,42 +6315,10 @@ def api_unarchive_transactions():
         conn = db_manager._get_postgresql_connection()
         cursor = conn.cursor()
 
-        # Query 1: Get all locked periods for this tenant
-        cursor.execute("""
-            SELECT start_date, end_date FROM cfo_accounting_periods
-            WHERE tenant_id = %s AND status IN ('locked', 'closed')
-        """, (tenant_id,))
-        locked_periods = [(str(row[0])[:10], str(row[1])[:10]) for row in cursor.fetchall()]
-
-        # Query 2: Get all transaction dates
-        placeholders = ','.join(['%s'] * len(transaction_ids))
-        cursor.execute(
-            f"""SELECT transaction_id, date FROM transactions
-                WHERE tenant_id = %s AND transaction_id IN ({placeholders})""",
-            [tenant_id] + list(transaction_ids)
-        )
-        txn_dates = {row[0]: row[1] for row in cursor.fetchall()}
-
-        # Check period locks in memory (NO additional DB calls!)
-        locked_transactions = []
-        unlocked_ids = []
-
-        for txn_id in transaction_ids:
-            if txn_id in txn_dates:
-                txn_date = txn_dates[txn_id]
-                date_str = str(txn_date)[:10] if txn_date else ''
-
-                # Check if date falls within any locked period
-                is_locked = any(start <= date_str <= end for start, end in locked_periods)
+        # Period locks are checked against the tenant's in-memory index
+        unlocked_ids, locked_transactions = partition_locked_transactions(cursor, tenant_id, transaction_ids)
 
-                if is_locked:
-                    locked_transactions.append(str(txn_id))
-                else:
-                    unlocked_ids.append(txn_id)
-            else:
-                unlocked_ids.append(txn_id)
-
-        # Query 3: Unarchive all unlocked transactions
+        # Unarchive all unlocked transactions
         unarchived_count = 0
         if unlocked_ids:
             placeholders = ','.join(['%s'] * len(unlocked_ids))
@@ -6372,6 +6464,7 @@ def api_add_wallet():
             created_at = result[1].isoformat() if result[1] else None
 
             conn.commit()
+            invalidate_tenant_knowledge(tenant_id)
             cursor.close()
 
         return jsonify({
@@ -6454,6 +6547,7 @@ def api_update_wallet(wallet_id):
                 return jsonify({'error': 'Wallet not found'}), 404
 
             conn.commit()
+            invalidate_tenant_knowledge(get_current_tenant_id())
 
             wallet = {
                 'id': wallet_id,
@@ -6504,6 +6598,7 @@ def api_delete_wallet(wallet_id):
                 return jsonify({'error': 'Wallet not found'}), 404
 
             conn.commit()
+            invalidate_tenant_knowledge(get_current_tenant_id())
             cursor.close()
 
         return jsonify({
@@ -7349,6 +7444,7 @@ def api_create_classification_pattern():
 
         pattern_id = cursor.fetchone()[0]
         conn.commit()
+        invalidate_tenant_knowledge(tenant_id)
         cursor.close()
         conn.close()
 
@@ -7408,6 +7504,7 @@ def api_update_classification_pattern(pattern_id):
             return jsonify({'success': False, 'message': 'Pattern not found'}), 404
 
         conn.commit()
+        invalidate_tenant_knowledge(tenant_id)
         cursor.close()
         conn.close()
 
@@ -7442,6 +7539,7 @@ def api_delete_classification_pattern(pattern_id):
             return jsonify({'success': False, 'message': 'Pattern not found'}), 404
 
         conn.commit()
+        invalidate_tenant_knowledge(tenant_id)
         cursor.close()
         conn.close()
 
@@ -7609,6 +7707,7 @@ def api_approve_pattern_suggestion(suggestion_id):
         """, (user_id, suggestion_id))
 
         conn.commit()
+        invalidate_tenant_knowledge(tenant_id)
         cursor.close()
         conn.close()
 
@@ -7819,9 +7918,9 @@ def api_process_pattern_learning():
         from database import db_manager
         import asyncio
 
-        # Import the pattern learning module
+        # Import the pattern validation pipeline
         try:
-            from pattern_learning import process_pending_pattern_suggestions
+            from pattern_validation_pipeline import drain_pending_pattern_suggestions
         except ImportError:
             logger.error("pattern_learning module not found")
             return jsonify({'success': False, 'message': 'Pattern learning module not available'}), 500
@@ -7842,7 +7941,7 @@ def api_process_pattern_learning():
 
         try:
             results = loop.run_until_complete(
-                process_pending_pattern_suggestions(tenant_id, claude_client)
+                drain_pending_pattern_suggestions(tenant_id, claude_client)
             )
         finally:
             loop.close()
@@ -7862,6 +7961,19 @@ def api_process_pattern_learning():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@app.route('/api/pattern-learning/metrics', methods=['GET'])
+def api_pattern_learning_metrics():
+    """Throughput, latency and cache counters of the pattern validation pipeline"""
+    try:
+        from pattern_validation_pipeline import get_pipeline_metrics
+
+        return jsonify({'success': True, 'metrics': get_pipeline_metrics()})
+
+    except Exception as e:
+        logger.error(f"Error getting pattern learning metrics: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
 @app.route('/api/business-entities', methods=['GET'])
 def api_get_business_entities():
     """Get all business entities for the current tenant"""
@@ -8004,6 +8116,7 @@ def api_update_business_entity(entity_name):
             patterns_updated = cursor.rowcount
 
             conn.commit()
+            invalidate_tenant_knowledge(tenant_id)
             cursor.close()
             conn.close()
 
@@ -8139,6 +8252,7 @@ def api_merge_business_entities(source_entity):
         entities_deleted = cursor.rowcount
 
         conn.commit()
+        invalidate_tenant_knowledge(tenant_id)
         cursor.close()
         conn.close()
 
@@ -9489,6 +9603,11 @@ def api_bulk_update_transactions():
                 'justification', 'entity_id', 'business_line_id'
             }
 
+            # Period locks: one date lookup for all rows, checked against the in-memory index
+            requested_ids = list(dict.fromkeys(u.get('transaction_id') for u in updates if u.get('transaction_id')))
+            _, locked_ids = partition_locked_transactions(cursor, tenant_id, requested_ids)
+            locked_ids = set(locked_ids)
+
             # Group updates by field and value for single SQL statement
             # Typical drag-fill: same field, same value for all rows = 1 SQL statement
             updates_by_field_value = {}
@@ -9507,6 +9626,11 @@ def api_bulk_update_transactions():
                     failed_count += 1
                     continue
 
+                if str(transaction_id) in locked_ids:
+                    errors.append({'index': idx, 'transaction_id': transaction_id, 'error': 'Transaction is in a locked accounting period'})
+                    failed_count += 1
+                    continue
+
                 key = (field, value)
                 if key not in updates_by_field_value:
                     updates_by_field_value[key] = []
@@ -10453,7 +10577,35 @@ def check_file_duplicates(filepath):
 # Module-level cache for CryptoPricingDB to avoid re-initialization on each call
 _crypto_pricing_db_cache = None
 
-def convert_currency_to_usd(amount: float, from_currency: str, transaction_date: str = None) -> tuple:
+# Cryptocurrency symbols (priced from CryptoPricingDB, not FX rates)
+CRYPTO_SYMBOLS = ['BTC', 'ETH', 'BNB', 'TAO', 'USDC', 'USDT']
+
+
+def prefetch_fx_rates(transactions: list, default_currency: str = 'USD') -> Optional[dict]:
+    """
+    Resolve historical FX rates for every fiat (currency, date) pair in a batch at once.
+
+    Returns the resolve_rates mapping to pass to convert_currency_to_usd as
+    fx_rates, or None if the currency converter is unavailable.
+    """
+    if not currency_converter:
+        return None
+
+    pairs = set()
+    for txn in transactions:
+        currency = (txn.get('currency') or default_currency or 'USD').upper()
+        if currency != 'USD' and currency not in CRYPTO_SYMBOLS and txn.get('date'):
+            pairs.add((currency, txn['date']))
+
+    try:
+        return currency_converter.resolve_rates(pairs)
+    except Exception as e:
+        logger.warning(f"Could not prefetch FX rates: {e}")
+        return None
+
+
+def convert_currency_to_usd(amount: float, from_currency: str, transaction_date: str = None,
+                            fx_rates: Optional[dict] = None) -> tuple:
     """
     Convert amount from given currency to USD
     Supports both fiat currencies and cryptocurrencies
@@ -10462,6 +10614,7 @@ def convert_currency_to_usd(amount: float, from_currency: str, transaction_date:
         amount: Amount to convert
         from_currency: Currency code (e.g., 'USD', 'BTC', 'ETH')
         transaction_date: Date of transaction for historic crypto pricing (format: YYYY-MM-DD)
+        fx_rates: Historical fiat rates from prefetch_fx_rates; looked up per call when omitted
 
     Returns:
         tuple: (usd_amount, original_currency, conversion_note)
@@ -10472,9 +10625,6 @@ def convert_currency_to_usd(amount: float, from_currency: str, transaction_date:
     if from_currency == 'USD':
         return (amount, 'USD', None)
 
-    # Cryptocurrency symbols
-    CRYPTO_SYMBOLS = ['BTC', 'ETH', 'BNB', 'TAO', 'USDC', 'USDT']
-
     # Check if this is a cryptocurrency
     if from_currency.upper() in CRYPTO_SYMBOLS:
         try:
@@ -10511,9 +10661,20 @@ def convert_currency_to_usd(amount: float, from_currency: str, transaction_date:
             print(f" ERROR: Crypto conversion failed for {from_currency}: {e}")
             return (amount, from_currency, f"Crypto conversion error: {str(e)}")
 
-    # Fiat currency conversion
-    # Simple conversion rates (you can replace with live API later)
-    # These are approximate rates as of 2025
+    # Fiat currency conversion at the historical rate of the transaction date
+    if transaction_date and (fx_rates is not None or currency_converter):
+        from historical_currency_converter import fx_key
+        key = fx_key(from_currency, transaction_date)
+        if key:
+            if fx_rates is None:
+                fx_rates = currency_converter.resolve_rates([key])
+            rate_info = fx_rates.get(key)
+            if rate_info:
+                usd_amount = amount * rate_info['rate']
+                conversion_note = f"Converted {amount} {key[0]} at historical rate {rate_info['rate']} ({rate_info['source']}, {key[1]})"
+                return (usd_amount, from_currency, conversion_note)
+
+    # Fallback: approximate rates as of 2025
     EXCHANGE_RATES = {
         'BRL': 0.20,   # Brazilian Real to USD
         'EUR': 1.10,   # Euro to USD
@@ -10533,7 +10694,7 @@ def convert_currency_to_usd(amount: float, from_currency: str, transaction_date:
         return (amount, from_currency, f"Unknown currency - no conversion applied")
 
     usd_amount = amount * rate
-    conversion_note = f"Converted from {from_currency} at rate {rate}"
+    conversion_note = f"Converted from {from_currency} at approximate rate {rate}"
     print(f" Currency conversion: {amount} {from_currency} = ${usd_amount:.2f} USD (rate: {rate})")
 
     return (usd_amount, from_currency, conversion_note)
@@ -10914,6 +11075,7 @@ def upload_file_with_progress():
                 # Create tenant agent
                 tenant_agent = None
                 try:
+                    from main import DeltaCFOAgent
                     tenant_agent = DeltaCFOAgent(tenant_id=tenant_id)
                 except Exception as e:
                     logger.warning(f"Failed to create DeltaCFOAgent: {e}")
@@ -10929,6 +11091,7 @@ def upload_file_with_progress():
                 logger.info(f"[PDF DEBUG] Starting classification loop for {total_txns} transactions")
 
                 skipped_invalid = 0
+                fx_rates = prefetch_fx_rates(transactions, document_currency)
                 for idx, txn in enumerate(transactions):
                     txn_currency = txn.get('currency', document_currency)
                     original_amount = txn.get('amount')
@@ -10945,7 +11108,7 @@ def upload_file_with_progress():
 
                     # Convert currency
                     usd_amount, original_currency, conversion_note = convert_currency_to_usd(
-                        original_amount, txn_currency, txn_date
+                        original_amount, txn_currency, txn_date, fx_rates=fx_rates
                     )
 
                     # Validate converted amount
@@ -11584,6 +11747,7 @@ def upload_file():
                 # This avoids exhausting the database connection pool with 90+ connections
                 tenant_agent = None
                 try:
+                    from main import DeltaCFOAgent
                     tenant_agent = DeltaCFOAgent(tenant_id=tenant_id)
                     print(f" Created DeltaCFOAgent for tenant: {tenant_id}")
                 except Exception as e:
@@ -11594,6 +11758,7 @@ def upload_file():
                 # ================================================
                 skipped_duplicates = 0
                 classified_transactions = []
+                fx_rates = prefetch_fx_rates(transactions, document_currency)
 
                 for txn in transactions:
                     # Get transaction data
@@ -11610,7 +11775,8 @@ def upload_file():
                     usd_amount, original_currency, conversion_note = convert_currency_to_usd(
                         original_amount,
                         txn_currency,
-                        txn_date
+                        txn_date,
+                        fx_rates=fx_rates
                     )
 
                     # Check for duplicates (only among non-archived transactions)
@@ -13544,8 +13710,10 @@ def api_get_invoice_details(invoice_id):
 
 def extract_compressed_file(file_path: str, extract_dir: str) -> List[str]:
     """
-    Extract files from compressed archives (ZIP, RAR, 7z) with support for nested directories.
-    Recursively walks through all subdirectories to find supported invoice files.
+    Extract supported invoice files from compressed archives (ZIP, RAR, 7z), including
+    files in nested directories. Members are streamed out one at a time (nothing else in
+    the archive is written to disk) and files whose content repeats an earlier member
+    are skipped.
 
     Args:
         file_path: Path to the compressed archive file
@@ -13556,46 +13724,22 @@ def extract_compressed_file(file_path: str, extract_dir: str) -> List[str]:
         or dict with 'error' key if extraction fails
     """
     try:
-
-        file_ext = os.path.splitext(file_path)[1].lower()
-
-        os.makedirs(extract_dir, exist_ok=True)
-
-        # Extract archive based on file type
-        if file_ext == '.zip':
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-
-        elif file_ext == '.7z':
-            if not PY7ZR_AVAILABLE:
-                return {'error': '7z support not available - py7zr package required'}
-            with py7zr.SevenZipFile(file_path, mode='r') as archive:
-                archive.extractall(path=extract_dir)
-
-        elif file_ext == '.rar':
-            return {'error': 'RAR format requires additional setup. Please use ZIP or 7Z format.'}
-
-        else:
-            return {'error': f'Unsupported archive format: {file_ext}'}
-
-        # Recursively walk through all directories to find supported files
-        # This handles nested folder structures of any depth
-        allowed_extensions = {'.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.csv', '.xls', '.xlsx'}
         filtered_files = []
+        duplicates = 0
 
-        for root, dirs, files in os.walk(extract_dir):
-            for filename in files:
-                file_path_in_archive = os.path.join(root, filename)
-                file_extension = os.path.splitext(filename)[1].lower()
+        for member in iter_archive_members(file_path, extract_dir):
+            if member.duplicate_of:
+                duplicates += 1
+            else:
+                filtered_files.append(member.path)
 
-                # Only include files with supported extensions
-                if file_extension in allowed_extensions and os.path.isfile(file_path_in_archive):
-                    filtered_files.append(file_path_in_archive)
+        if duplicates:
+            print(f"Skipped {duplicates} duplicate files in {os.path.basename(file_path)}")
 
         return filtered_files
 
-    except zipfile.BadZipFile:
-        return {'error': 'Invalid or corrupted ZIP file'}
+    except ArchiveError as e:
+        return {'error': str(e)}
     except Exception as e:
         return {'error': f'Failed to extract archive: {str(e)}'}
 
@@ -13673,7 +13817,8 @@ def api_upload_batch_invoices():
             return jsonify({'error': 'No files provided'}), 400
 
         upload_dir = os.path.join(os.path.dirname(__file__), 'uploads', 'invoices')
-        temp_extract_dir = os.path.join(os.path.dirname(__file__), 'uploads', 'temp_extract')
+        # One extraction directory per upload so concurrent uploads don't see each other's files
+        temp_extract_dir = os.path.join(os.path.dirname(__file__), 'uploads', 'temp_extract', str(uuid.uuid4()))
         os.makedirs(upload_dir, exist_ok=True)
 
         results = {
@@ -13865,7 +14010,6 @@ def api_upload_batch_invoices_async():
         os.makedirs(upload_dir, exist_ok=True)
 
         files_to_process = []
-        cleanup_paths = []
         source_file_name = None
 
         # Handle file upload (same logic as sync version)
@@ -13875,19 +14019,44 @@ def api_upload_batch_invoices_async():
             source_file_name = file.filename
 
             if file_ext in ['.zip', '.7z', '.rar']:
-                # Save compressed file
+                # Save compressed file; the background worker streams members out of it
                 compressed_path = os.path.join(upload_dir, f"{uuid.uuid4()}{file_ext}")
                 file.save(compressed_path)
-                cleanup_paths.append(compressed_path)
 
-                # Extract files
-                extract_result = extract_compressed_file(compressed_path, temp_extract_dir)
+                try:
+                    supported_members, _ = list_archive_members(compressed_path)
+                except ArchiveError as e:
+                    os.remove(compressed_path)
+                    return jsonify({'error': str(e)}), 400
+
+                if not supported_members:
+                    os.remove(compressed_path)
+                    return jsonify({'error': 'No supported file types found'}), 400
+
+                job_id = create_background_job(
+                    job_type='invoice_archive',
+                    total_items=len(supported_members),
+                    created_by='web_user',
+                    source_file=source_file_name,
+                    metadata=json.dumps({
+                        'archive_path': compressed_path,
+                        'extract_dir': os.path.join(temp_extract_dir, str(uuid.uuid4()))
+                    })
+                )
 
-                if isinstance(extract_result, dict) and 'error' in extract_result:
-                    return jsonify(extract_result), 400
+                if not job_id:
+                    return jsonify({'error': 'Failed to create background job'}), 500
 
-                files_to_process = [(f, os.path.basename(f)) for f in extract_result]
-                cleanup_paths.append(temp_extract_dir)
+                if not start_background_job(job_id, 'invoice_archive'):
+                    return jsonify({'error': 'Failed to start background processing'}), 500
+
+                return jsonify({
+                    'success': True,
+                    'job_id': job_id,
+                    'message': f'Background job created successfully. Processing {len(supported_members)} files.',
+                    'total_files': len(supported_members),
+                    'status_url': f'/api/jobs/{job_id}'
+                })
             else:
                 # Single file upload
                 unique_filename = f"{uuid.uuid4()}{file_ext}"
@@ -14269,7 +14438,9 @@ def api_upload_payment_proof_auto_match():
             sys.path.insert(0, services_path)
         from payment_proof_processor import PaymentProofProcessor, store_payment_proof
         from payment_validator import PaymentValidator
-        from receipt_invoice_matcher import ReceiptInvoiceMatcher
+        from receipt_invoice_matcher import (
+            ReceiptInvoiceMatcher, get_invoice_candidate_index, invalidate_invoice_candidate_index
+        )
 
         # Get current tenant
         tenant_id = get_current_tenant_id()
@@ -14322,9 +14493,12 @@ def api_upload_payment_proof_auto_match():
                 'payment_data': payment_data
             }), 400
 
-        # Step 2: Find matching invoice
+        # Step 2: Find matching invoice (scored once, reused for the manual flow)
         matcher = ReceiptInvoiceMatcher(db_manager)
-        best_match = matcher.get_best_match(payment_data, tenant_id)
+        all_matches = matcher.find_matching_invoices(
+            payment_data, tenant_id, index=get_invoice_candidate_index(db_manager, tenant_id)
+        )
+        best_match = matcher.select_best_match(all_matches)
 
         if not best_match:
             # No match found - return extracted data for manual selection with debug info
@@ -14334,7 +14508,6 @@ def api_upload_payment_proof_auto_match():
             print(f"  Tenant: {tenant_id}")
 
             # Show all candidate invoices for debugging
-            all_matches = matcher.find_matching_invoices(payment_data, tenant_id)
             print(f"[MATCHER DEBUG] Found {len(all_matches)} candidate invoices")
             for idx, match in enumerate(all_matches[:5]):  # Show top 5
                 inv = match['invoice']
@@ -14376,8 +14549,7 @@ def api_upload_payment_proof_auto_match():
         if match_score < 80:
             print(f"[MATCHER DEBUG] Match score {match_score} < 80, requiring manual confirmation")
 
-            # Get all candidates for manual selection
-            all_matches = matcher.find_matching_invoices(payment_data, tenant_id)
+            # All candidates for manual selection were scored above
             print(f"[MATCHER DEBUG] Found {len(all_matches)} candidate invoices for manual selection")
             for idx, match in enumerate(all_matches[:5]):
                 inv = match['invoice']
@@ -14456,6 +14628,7 @@ def api_upload_payment_proof_auto_match():
                 tenant_id
             )
         )
+        invalidate_invoice_candidate_index(tenant_id)
 
         # Format validation report
         validation_report = validator.format_validation_report(is_valid, errors, warnings)
@@ -14977,7 +15150,9 @@ def api_upload_and_confirm_payment_proof():
         if services_path not in sys.path:
             sys.path.insert(0, services_path)
         from payment_proof_processor import PaymentProofProcessor
-        from receipt_invoice_matcher import ReceiptInvoiceMatcher
+        from receipt_invoice_matcher import (
+            ReceiptInvoiceMatcher, get_invoice_candidate_index, invalidate_invoice_candidate_index
+        )
 
         # Get current tenant
         tenant_id = get_current_tenant_id()
@@ -15035,9 +15210,13 @@ def api_upload_and_confirm_payment_proof():
                     'error': 'Could not extract payment data from receipt'
                 }), 400
 
-            # Find ALL matching invoices (not just the best one)
+            # Find ALL matching invoices (not just the best one), using the
+            # tenant's candidate index shared by every file of the batch
             matcher = ReceiptInvoiceMatcher(db_manager)
-            all_matches = matcher.find_matching_invoices(payment_data, tenant_id, customer_filter)
+            all_matches = matcher.find_matching_invoices(
+                payment_data, tenant_id, customer_filter,
+                index=get_invoice_candidate_index(db_manager, tenant_id)
+            )
 
             print(f"[Payment Proof] Found {len(all_matches) if all_matches else 0} matching invoices")
             if all_matches:
@@ -15136,6 +15315,8 @@ def api_upload_and_confirm_payment_proof():
                 fetch_one=False
             )
 
+            invalidate_invoice_candidate_index(tenant_id)
+
             # Try to find and link matching transaction
             transaction_linked = False
             transaction_id = None
@@ -15337,6 +15518,30 @@ def api_convert_currencies():
         logger.error(f"Error converting currencies: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/transactions/convert-currencies', methods=['POST'])
+def api_convert_transaction_currencies():
+    """Re-convert fiat transactions stored with approximate rates using historical rates"""
+    try:
+        global currency_converter
+        if not currency_converter:
+            return jsonify({'error': 'Currency converter not available'}), 503
+
+        tenant_id = get_current_tenant_id()
+        data = request.get_json() or {}
+
+        results = currency_converter.bulk_convert_transactions(tenant_id, data.get('limit', 500))
+        if results['successful_conversions']:
+            _notify_transactions_changed(tenant_id)
+
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+
+    except Exception as e:
+        logger.error(f"Error converting transaction currencies: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/invoices/conversion-stats')
 def api_conversion_stats():
     """Get currency conversion statistics"""
@@ -16834,7 +17039,10 @@ def api_mark_invoice_paid(invoice_id):
 def api_get_job_status(job_id):
     """Get status and progress of a background job"""
     try:
-        job_status = get_job_status(job_id)
+        tenant_id = get_current_tenant_id()
+        if not tenant_id:
+            return jsonify({'error': 'Job not found'}), 404
+        job_status = get_job_status(job_id, tenant_id=tenant_id)
 
         if 'error' in job_status:
             return jsonify(job_status), 404
@@ -16866,9 +17074,9 @@ def api_list_jobs():
         is_postgresql = hasattr(cursor, 'mogrify')
         placeholder = '%s' if is_postgresql else '?'
 
-        # Build query with filters
-        where_clauses = []
-        params = []
+        # Build query with filters; only the current tenant's jobs are listed
+        where_clauses = [f"tenant_id = {placeholder}"]
+        params = [get_current_tenant_id()]
 
         if status_filter:
             where_clauses.append(f"status = {placeholder}")
@@ -16878,7 +17086,7 @@ def api_list_jobs():
             where_clauses.append(f"job_type = {placeholder}")
             params.append(job_type_filter)
 
-        where_clause = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+        where_clause = "WHERE " + " AND ".join(where_clauses)
 
         # Get total count
         count_query = f"SELECT COUNT(*) FROM background_jobs {where_clause}"
@@ -16921,7 +17129,10 @@ def api_cancel_job(job_id):
     """Cancel a running background job"""
     try:
         # Get current job status
-        job_status = get_job_status(job_id)
+        tenant_id = get_current_tenant_id()
+        if not tenant_id:
+            return jsonify({'error': 'Job not found'}), 404
+        job_status = get_job_status(job_id, tenant_id=tenant_id)
 
         if 'error' in job_status:
             return jsonify({'error': 'Job not found'}), 404
@@ -17181,8 +17392,11 @@ def fallback_extract_invoice_data(text: str) -> dict:
 
     return data
 
-def process_invoice_with_claude(file_path: str, original_filename: str) -> Dict[str, Any]:
-    """Process invoice file with Claude Vision API"""
+def process_invoice_with_claude(file_path: str, original_filename: str, page_image: bytes = None) -> Dict[str, Any]:
+    """
+    Process invoice file with Claude Vision API.
+    page_image: first page of a PDF already rendered to PNG (e.g. by the archive pipeline)
+    """
     try:
         # Get current tenant_id for multi-tenant isolation
         tenant_id = get_current_tenant_id()
@@ -17198,7 +17412,10 @@ def process_invoice_with_claude(file_path: str, original_filename: str) -> Dict[
         # Read and encode image
         file_ext = os.path.splitext(file_path)[1].lower()
 
-        if file_ext == '.pdf':
+        if file_ext == '.pdf' and page_image is not None:
+            image_data = base64.b64encode(page_image).decode('utf-8')
+            media_type = 'image/png'
+        elif file_ext == '.pdf':
             # Convert PDF to image using PyMuPDF
             try:
                 import fitz  # PyMuPDF
@@ -17952,90 +18169,89 @@ def update_pattern_statistics(entity_name: str, pattern_term: str, pattern_type:
     from database import db_manager
 
     try:
-        conn = db_manager._get_postgresql_connection()
-        cursor = conn.cursor()
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
 
-        # Step 1: Get total transaction count for this entity
-        cursor.execute("""
-            SELECT COUNT(DISTINCT transaction_id)
-            FROM entity_patterns
-            WHERE tenant_id = %s AND entity_name = %s
-        """, (tenant_id, entity_name))
+            # Step 1: Get total transaction count for this entity
+            cursor.execute("""
+                SELECT COUNT(DISTINCT transaction_id)
+                FROM entity_patterns
+                WHERE tenant_id = %s AND entity_name = %s
+            """, (tenant_id, entity_name))
 
-        total_entity_tx = cursor.fetchone()[0] or 1
+            total_entity_tx = cursor.fetchone()[0] or 1
 
-        # Step 2: Get occurrence count for this specific pattern term
-        cursor.execute("""
-            SELECT COUNT(*)
-            FROM entity_patterns
-            WHERE tenant_id = %s
-            AND entity_name = %s
-            AND pattern_data::text ILIKE %s
-        """, (tenant_id, entity_name, f'%"{pattern_term}"%'))
+            # Step 2: Get occurrence count for this specific pattern term
+            cursor.execute("""
+                SELECT COUNT(*)
+                FROM entity_patterns
+                WHERE tenant_id = %s
+                AND entity_name = %s
+                AND pattern_data::text ILIKE %s
+            """, (tenant_id, entity_name, f'%"{pattern_term}"%'))
 
-        occurrence_count = cursor.fetchone()[0] or 1
+            occurrence_count = cursor.fetchone()[0] or 1
 
-        # Step 3: Calculate Term Frequency
-        term_frequency = occurrence_count / max(total_entity_tx, 1)
+            # Step 3: Calculate Term Frequency
+            term_frequency = occurrence_count / max(total_entity_tx, 1)
 
-        # Step 4: Calculate Inverse Document Frequency
-        # Count how many DISTINCT entities use this term
-        cursor.execute("""
-            SELECT COUNT(DISTINCT entity_name)
-            FROM entity_patterns
-            WHERE tenant_id = %s
-            AND pattern_data::text ILIKE %s
-        """, (tenant_id, f'%"{pattern_term}"%'))
+            # Step 4: Calculate Inverse Document Frequency
+            # Count how many DISTINCT entities use this term
+            cursor.execute("""
+                SELECT COUNT(DISTINCT entity_name)
+                FROM entity_patterns
+                WHERE tenant_id = %s
+                AND pattern_data::text ILIKE %s
+            """, (tenant_id, f'%"{pattern_term}"%'))
 
-        entities_with_term = cursor.fetchone()[0] or 1
+            entities_with_term = cursor.fetchone()[0] or 1
 
-        # Get total number of entities with patterns
-        cursor.execute("""
-            SELECT COUNT(DISTINCT entity_name)
-            FROM entity_patterns
-            WHERE tenant_id = %s
-        """, (tenant_id,))
+            # Get total number of entities with patterns
+            cursor.execute("""
+                SELECT COUNT(DISTINCT entity_name)
+                FROM entity_patterns
+                WHERE tenant_id = %s
+            """, (tenant_id,))
 
-        total_entities = cursor.fetchone()[0] or 1
+            total_entities = cursor.fetchone()[0] or 1
 
-        # IDF = log(total_entities / entities_with_term)
-        idf = math.log(total_entities / max(entities_with_term, 1))
+            # IDF = log(total_entities / entities_with_term)
+            idf = math.log(total_entities / max(entities_with_term, 1))
 
-        # Step 5: Calculate TF-IDF score
-        tf_idf_score = term_frequency * idf
+            # Step 5: Calculate TF-IDF score
+            tf_idf_score = term_frequency * idf
 
-        # Step 6: Calculate weighted confidence (simple formula for now)
-        weighted_confidence = min(1.0, term_frequency * 2.0)
+            # Step 6: Calculate weighted confidence (simple formula for now)
+            weighted_confidence = min(1.0, term_frequency * 2.0)
 
-        # Step 7: UPSERT into entity_pattern_statistics
-        cursor.execute("""
-            INSERT INTO entity_pattern_statistics (
+            # Step 7: UPSERT into entity_pattern_statistics
+            cursor.execute("""
+                INSERT INTO entity_pattern_statistics (
+                    tenant_id, entity_name, pattern_term, pattern_type,
+                    occurrence_count, total_entity_transactions,
+                    term_frequency, inverse_document_frequency, tf_idf_score,
+                    base_confidence_score, weighted_confidence,
+                    first_seen, last_seen, last_updated
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW(), NOW())
+                ON CONFLICT (tenant_id, entity_name, pattern_term, pattern_type)
+                DO UPDATE SET
+                    occurrence_count = EXCLUDED.occurrence_count,
+                    total_entity_transactions = EXCLUDED.total_entity_transactions,
+                    term_frequency = EXCLUDED.term_frequency,
+                    inverse_document_frequency = EXCLUDED.inverse_document_frequency,
+                    tf_idf_score = EXCLUDED.tf_idf_score,
+                    weighted_confidence = EXCLUDED.weighted_confidence,
+                    last_seen = NOW(),
+                    last_updated = NOW()
+            """, (
                 tenant_id, entity_name, pattern_term, pattern_type,
-                occurrence_count, total_entity_transactions,
-                term_frequency, inverse_document_frequency, tf_idf_score,
-                base_confidence_score, weighted_confidence,
-                first_seen, last_seen, last_updated
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW(), NOW())
-            ON CONFLICT (tenant_id, entity_name, pattern_term, pattern_type)
-            DO UPDATE SET
-                occurrence_count = EXCLUDED.occurrence_count,
-                total_entity_transactions = EXCLUDED.total_entity_transactions,
-                term_frequency = EXCLUDED.term_frequency,
-                inverse_document_frequency = EXCLUDED.inverse_document_frequency,
-                tf_idf_score = EXCLUDED.tf_idf_score,
-                weighted_confidence = EXCLUDED.weighted_confidence,
-                last_seen = NOW(),
-                last_updated = NOW()
-        """, (
-            tenant_id, entity_name, pattern_term, pattern_type,
-            occurrence_count, total_entity_tx,
-            term_frequency, idf, tf_idf_score,
-            1.0, weighted_confidence
-        ))
+                occurrence_count, total_entity_tx,
+                term_frequency, idf, tf_idf_score,
+                1.0, weighted_confidence
+            ))
 
-        conn.commit()
-        conn.close()
+            conn.commit()
 
         print(f" Updated pattern statistics: {entity_name} / {pattern_term} ({pattern_type}) - TF-IDF: {tf_idf_score:.3f}")
 
@@ -18063,58 +18279,57 @@ def handle_classification_feedback(transaction_id: str, suggested_entity: str, a
     from database import db_manager
 
     try:
-        conn = db_manager._get_postgresql_connection()
-        cursor = conn.cursor()
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
 
-        if feedback_type == 'rejected':
-            # Negative feedback: Reduce TF-IDF scores for the wrongly suggested entity
-            # This prevents the same bad suggestion from happening again
+            if feedback_type == 'rejected':
+                # Negative feedback: Reduce TF-IDF scores for the wrongly suggested entity
+                # This prevents the same bad suggestion from happening again
 
-            print(f" Negative feedback: '{suggested_entity}' was suggested but user chose '{actual_entity}'")
+                print(f" Negative feedback: '{suggested_entity}' was suggested but user chose '{actual_entity}'")
 
-            # Apply a 10% penalty to all patterns for the wrongly suggested entity
-            cursor.execute("""
-                UPDATE entity_pattern_statistics
-                SET tf_idf_score = tf_idf_score * 0.9,
-                    weighted_confidence = weighted_confidence * 0.9,
-                    last_updated = NOW()
-                WHERE tenant_id = %s
-                AND entity_name = %s
-            """, (tenant_id, suggested_entity))
+                # Apply a 10% penalty to all patterns for the wrongly suggested entity
+                cursor.execute("""
+                    UPDATE entity_pattern_statistics
+                    SET tf_idf_score = tf_idf_score * 0.9,
+                        weighted_confidence = weighted_confidence * 0.9,
+                        last_updated = NOW()
+                    WHERE tenant_id = %s
+                    AND entity_name = %s
+                """, (tenant_id, suggested_entity))
 
-            penalty_count = cursor.rowcount
-            print(f"   Applied penalty to {penalty_count} patterns for '{suggested_entity}'")
+                penalty_count = cursor.rowcount
+                print(f"   Applied penalty to {penalty_count} patterns for '{suggested_entity}'")
 
-        elif feedback_type == 'accepted':
-            # Positive feedback: Boost TF-IDF scores for the correctly suggested entity
+            elif feedback_type == 'accepted':
+                # Positive feedback: Boost TF-IDF scores for the correctly suggested entity
 
-            print(f" Positive feedback: '{suggested_entity}' was suggested and accepted")
+                print(f" Positive feedback: '{suggested_entity}' was suggested and accepted")
 
-            # Apply a 5% boost to all patterns for the correctly suggested entity
-            cursor.execute("""
-                UPDATE entity_pattern_statistics
-                SET tf_idf_score = tf_idf_score * 1.05,
-                    weighted_confidence = LEAST(weighted_confidence * 1.05, 1.0),
-                    last_updated = NOW()
-                WHERE tenant_id = %s
-                AND entity_name = %s
-            """, (tenant_id, suggested_entity))
+                # Apply a 5% boost to all patterns for the correctly suggested entity
+                cursor.execute("""
+                    UPDATE entity_pattern_statistics
+                    SET tf_idf_score = tf_idf_score * 1.05,
+                        weighted_confidence = LEAST(weighted_confidence * 1.05, 1.0),
+                        last_updated = NOW()
+                    WHERE tenant_id = %s
+                    AND entity_name = %s
+                """, (tenant_id, suggested_entity))
 
-            boost_count = cursor.rowcount
-            print(f"   Applied boost to {boost_count} patterns for '{suggested_entity}'")
+                boost_count = cursor.rowcount
+                print(f"   Applied boost to {boost_count} patterns for '{suggested_entity}'")
 
-        # Log the feedback for analytics
-        cursor.execute("""
-            INSERT INTO user_interactions (
-                tenant_id, transaction_id, interaction_type,
-                field_name, old_value, new_value, timestamp
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, NOW())
-        """, (tenant_id, transaction_id, 'ai_feedback',
-              'classified_entity', suggested_entity, actual_entity))
+            # Log the feedback for analytics
+            cursor.execute("""
+                INSERT INTO user_interactions (
+                    tenant_id, transaction_id, interaction_type,
+                    field_name, old_value, new_value, timestamp
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, NOW())
+            """, (tenant_id, transaction_id, 'ai_feedback',
+                  'classified_entity', suggested_entity, actual_entity))
 
-        conn.commit()
-        conn.close()
+            conn.commit()
 
         print(f" Feedback processed successfully for transaction {transaction_id}")
 
@@ -18153,11 +18368,15 @@ def calculate_entity_match_score(description: str, entity_name: str, tenant_id:
     from database import db_manager
     import math
 
-    # Reuse provided cursor or create new connection
-    own_connection = cursor is None
-    if own_connection:
-        conn = db_manager._get_postgresql_connection()
-        cursor = conn.cursor()
+    # Reuse provided cursor, otherwise score on the request's pooled connection
+    if cursor is None:
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                return calculate_entity_match_score(description, entity_name, tenant_id,
+                                                    amount=amount, account=account, cursor=cursor)
+            finally:
+                cursor.close()
 
     # Convert amount to float early to avoid Decimal/float type mismatches throughout
     amount_float = float(amount) if amount is not None else None
@@ -18204,11 +18423,6 @@ def calculate_entity_match_score(description: str, entity_name: str, tenant_id:
                     # No variation - exact match check
                     amount_match_score = 1.0 if abs(amount_float - avg_amount) < 0.01 else 0.5
 
-    # Only close connection if we created it ourselves
-    if own_connection:
-        cursor.close()
-        conn.close()
-
     if not patterns:
         return {
             'entity': entity_name,
@@ -18332,69 +18546,66 @@ def get_candidate_entities_optimized(description: str, tenant_id: str, max_candi
 
         if not meaningful_terms:
             # Fallback: just get top entities by overall TF-IDF
-            conn = db_manager._get_postgresql_connection()
-            cursor = conn.cursor()
+            with db_manager.get_connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                SELECT entity_name, MAX(tf_idf_score) as max_score
-                FROM entity_pattern_statistics
-                WHERE tenant_id = %s
-                GROUP BY entity_name
-                ORDER BY max_score DESC
-                LIMIT %s
-            """, (tenant_id, max_candidates))
+                cursor.execute("""
+                    SELECT entity_name, MAX(tf_idf_score) as max_score
+                    FROM entity_pattern_statistics
+                    WHERE tenant_id = %s
+                    GROUP BY entity_name
+                    ORDER BY max_score DESC
+                    LIMIT %s
+                """, (tenant_id, max_candidates))
 
-            results = cursor.fetchall()
-            conn.close()
+                results = cursor.fetchall()
 
             return [row[0] for row in results]
 
         # Step 2: Query database for entities with matching patterns
         # Use ILIKE with indexes for fast filtering
-        conn = db_manager._get_postgresql_connection()
-        cursor = conn.cursor()
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
 
-        # Build query to find entities whose patterns match any of the terms
-        # Aggregate scores for each entity
-        placeholders = ', '.join(['%s'] * len(meaningful_terms))
+            # Build query to find entities whose patterns match any of the terms
+            # Aggregate scores for each entity
+            placeholders = ', '.join(['%s'] * len(meaningful_terms))
 
-        cursor.execute(f"""
-            SELECT
-                entity_name,
-                SUM(tf_idf_score) as total_score,
-                COUNT(*) as match_count,
-                MAX(tf_idf_score) as best_score
-            FROM entity_pattern_statistics
-            WHERE tenant_id = %s
-            AND (
-                {' OR '.join([f"pattern_term ILIKE %s" for _ in meaningful_terms])}
-            )
-            GROUP BY entity_name
-            ORDER BY total_score DESC, match_count DESC
-            LIMIT %s
-        """, (tenant_id, *[f'%{term}%' for term in meaningful_terms], max_candidates))
+            cursor.execute(f"""
+                SELECT
+                    entity_name,
+                    SUM(tf_idf_score) as total_score,
+                    COUNT(*) as match_count,
+                    MAX(tf_idf_score) as best_score
+                FROM entity_pattern_statistics
+                WHERE tenant_id = %s
+                AND (
+                    {' OR '.join([f"pattern_term ILIKE %s" for _ in meaningful_terms])}
+                )
+                GROUP BY entity_name
+                ORDER BY total_score DESC, match_count DESC
+                LIMIT %s
+            """, (tenant_id, *[f'%{term}%' for term in meaningful_terms], max_candidates))
 
-        results = cursor.fetchall()
+            results = cursor.fetchall()
 
-        # If we got results, return them
-        if results:
-            candidate_entities = [row[0] for row in results]
-            conn.close()
-            logger.info(f"Pre-filtered to {len(candidate_entities)} candidates from terms: {meaningful_terms}")
-            return candidate_entities
+            # If we got results, return them
+            if results:
+                candidate_entities = [row[0] for row in results]
+                logger.info(f"Pre-filtered to {len(candidate_entities)} candidates from terms: {meaningful_terms}")
+                return candidate_entities
 
-        # Step 3: Fallback - no exact matches, get top entities by TF-IDF
-        cursor.execute("""
-            SELECT entity_name, MAX(tf_idf_score) as max_score
-            FROM entity_pattern_statistics
-            WHERE tenant_id = %s
-            GROUP BY entity_name
-            ORDER BY max_score DESC
-            LIMIT %s
-        """, (tenant_id, max_candidates))
+            # Step 3: Fallback - no exact matches, get top entities by TF-IDF
+            cursor.execute("""
+                SELECT entity_name, MAX(tf_idf_score) as max_score
+                FROM entity_pattern_statistics
+                WHERE tenant_id = %s
+                GROUP BY entity_name
+                ORDER BY max_score DESC
+                LIMIT %s
+            """, (tenant_id, max_candidates))
 
-        fallback_results = cursor.fetchall()
-        conn.close()
+            fallback_results = cursor.fetchall()
 
         logger.info(f"Pre-filtering fallback: returning top {len(fallback_results)} entities by TF-IDF")
         return [row[0] for row in fallback_results]
@@ -20020,7 +20231,8 @@ def api_revenue_batch_operations():
 
         # Execute batch operations
         if db_operations:
-            batch_results = db_manager.execute_batch_operation(db_operations, batch_size=50)
+            # Invoice updates/deletes and their log rows are independent: group by template
+            batch_results = db_manager.execute_batch_operation(db_operations, batch_size=50, preserve_order=False)
             results['successful_operations'] = batch_results['successful_batches'] * 2  # Each operation has 2 queries
             results['database_stats'] = batch_results
 
@@ -20503,6 +20715,26 @@ def api_get_system_transaction_chains():
             "system_analysis": True
         }), 500
 
+@app.route('/api/transactions/chains/refresh', methods=['POST'])
+def api_refresh_transaction_chains():
+    """Rebuild the precomputed transaction chains for the current tenant"""
+    if not CHAIN_ANALYZER_AVAILABLE:
+        return jsonify({
+            "error": "Transaction Chain Analyzer not available"
+        }), 503
+
+    try:
+        from chain_detection_engine import get_chain_engine
+        result = get_chain_engine().refresh(get_current_tenant_id())
+        return jsonify({'success': True, **result})
+
+    except Exception as e:
+        logger.error(f"Error refreshing transaction chains: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @app.route('/api/transactions/chains/stats', methods=['GET'])
 def api_get_chain_stats():
     """Get transaction chain statistics and insights"""
@@ -20729,8 +20961,7 @@ def api_find_duplicates():
         logger.info(f" Finding duplicate transactions for tenant: {tenant_id}")
 
         # Use a single PostgreSQL connection for all queries
-        conn = db_manager._get_postgresql_connection()
-        try:
+        with db_manager.get_connection() as conn:
             cursor = conn.cursor()
 
             # Find groups of duplicates based on date + absolute amount
@@ -20766,15 +20997,11 @@ def api_find_duplicates():
 
             logger.info(f"Found {len(duplicate_groups_raw)} duplicate groups")
 
-            # Now fetch full transaction details for each group
-            duplicate_groups = []
-
-            for group in duplicate_groups_raw:
-                date, description, amount, count, transaction_ids = group
-
-                # Fetch full transaction details
-                placeholders = ','.join(['%s'] * len(transaction_ids))
-                cursor.execute(f"""
+            # Fetch full transaction details for every group in one query
+            all_ids = [tx_id for group in duplicate_groups_raw for tx_id in group[4]]
+            details_by_id = {}
+            if all_ids:
+                cursor.execute("""
                     SELECT
                         transaction_id,
                         date,
@@ -20786,11 +21013,9 @@ def api_find_duplicates():
                         confidence,
                         source_file
                     FROM transactions
-                    WHERE transaction_id IN ({placeholders})
-                    ORDER BY transaction_id
-                """, transaction_ids)
+                    WHERE tenant_id = %s AND transaction_id = ANY(%s)
+                """, (tenant_id, all_ids))
 
-                transactions = []
                 for row in cursor.fetchall():
                     txn_date = row[1]
                     # Handle both date objects and strings
@@ -20799,7 +21024,7 @@ def api_find_duplicates():
                     else:
                         date_str = None
 
-                    transactions.append({
+                    details_by_id[row[0]] = {
                         'transaction_id': row[0],
                         'date': date_str,
                         'description': row[2],
@@ -20809,7 +21034,14 @@ def api_find_duplicates():
                         'subcategory': row[6],
                         'confidence': float(row[7]) if row[7] else 0,
                         'source_file': row[8]
-                    })
+                    }
+
+            duplicate_groups = []
+
+            for group in duplicate_groups_raw:
+                date, description, amount, count, transaction_ids = group
+
+                transactions = [details_by_id[tx_id] for tx_id in sorted(transaction_ids) if tx_id in details_by_id]
 
                 # Handle both date objects and strings for group date
                 if date:
@@ -20836,9 +21068,6 @@ def api_find_duplicates():
                 "total_duplicates": total_duplicate_transactions
             }), 200
 
-        finally:
-            conn.close()
-
     except Exception as e:
         logger.error(f"Error finding duplicates: {e}")
         import traceback
@@ -21201,17 +21430,64 @@ def api_import_tenant_config():
         }), 500
 
 
+CHATBOT_MODEL = "claude-sonnet-4-5-20250929"
+CHATBOT_MAX_TOKENS = 2048
+CHATBOT_MAX_TOOL_ITERATIONS = 5  # prevent infinite tool-use loops
+
+
+def _prepare_chatbot_turn(tenant_id, message, history, conversation_id=None):
+    """
+    System blocks, messages and tool executor for one chatbot turn.
+
+    The system prompt comes from the per-tenant cache (rebuilt after writes)
+    and tool results are memoized per tenant data version.
+    """
+    from chatbot_context import ChatbotContextBuilder, get_cached_system_blocks, get_data_version
+    from ai_tools import get_tool_executor
+    from database import db_manager
+
+    system_blocks = get_cached_system_blocks(db_manager, tenant_id)
+
+    # Format conversation history and add current message
+    messages = ChatbotContextBuilder.format_conversation_history(history) + [
+        {
+            'role': 'user',
+            'content': message
+        }
+    ]
+
+    tool_executor = get_tool_executor(db_manager, tenant_id,
+                                      data_version=get_data_version(tenant_id, db_manager),
+                                      conversation_id=conversation_id)
+    return system_blocks, messages, tool_executor
+
+
+def _execute_chatbot_tool(tool_executor, block) -> dict:
+    """Run one tool_use block and return its tool_result content block"""
+    logger.info(f"Executing tool: {block.name}")
+    try:
+        result = tool_executor.execute(block.name, block.input)
+    except Exception as e:
+        logger.error(f"Tool execution error: {e}")
+        result = f"Error executing {block.name}: {str(e)}"
+
+    return {
+        "type": "tool_result",
+        "tool_use_id": block.id,
+        "content": result
+    }
+
+
 @app.route('/api/chatbot', methods=['POST'])
 def api_chatbot():
     """API endpoint for AI CFO Assistant chatbot with tool calling support.
 
     The chatbot can now execute tools to query actual transaction data,
     providing real financial summaries instead of generic responses.
+    See /api/chatbot/stream for the streaming variant.
     """
     try:
-        from chatbot_context import get_chatbot_context
-        from ai_tools import TRANSACTION_TOOLS, get_tool_executor
-        from database import db_manager
+        from ai_tools import TRANSACTION_TOOLS
 
         # Get request data
         data = request.json
@@ -21231,67 +21507,32 @@ def api_chatbot():
         # Get current tenant ID
         tenant_id = get_current_tenant_id()
 
-        # Build context for this tenant
-        context_builder = get_chatbot_context(db_manager, tenant_id)
-
-        # Build system prompt with full context
-        system_prompt = context_builder.build_system_prompt()
-
-        # Format conversation history
-        formatted_history = context_builder.format_conversation_history(history)
-
-        # Add current message to history
-        messages = formatted_history + [
-            {
-                'role': 'user',
-                'content': message
-            }
-        ]
-
-        # Initialize tool executor for this tenant
-        tool_executor = get_tool_executor(db_manager, tenant_id)
+        system_blocks, messages, tool_executor = _prepare_chatbot_turn(
+            tenant_id, message, history, data.get('conversation_id')
+        )
 
         # Call Claude API with tools
         logger.info(f"Chatbot request for tenant {tenant_id}: {message[:50]}...")
 
         response = claude_client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=2048,
-            system=system_prompt,
+            model=CHATBOT_MODEL,
+            max_tokens=CHATBOT_MAX_TOKENS,
+            system=system_blocks,
             messages=messages,
             tools=TRANSACTION_TOOLS
         )
 
-        # Handle tool use loop (max 5 iterations to prevent infinite loops)
-        max_iterations = 5
+        # Handle tool use loop
         iteration = 0
 
-        while response.stop_reason == "tool_use" and iteration < max_iterations:
+        while response.stop_reason == "tool_use" and iteration < CHATBOT_MAX_TOOL_ITERATIONS:
             iteration += 1
             logger.info(f"Tool use iteration {iteration}")
 
-            # Find tool use blocks in response
-            tool_results = []
-            for block in response.content:
-                if block.type == "tool_use":
-                    tool_name = block.name
-                    tool_input = block.input
-                    tool_use_id = block.id
-
-                    logger.info(f"Executing tool: {tool_name}")
-
-                    # Execute the tool
-                    try:
-                        result = tool_executor.execute(tool_name, tool_input)
-                    except Exception as e:
-                        logger.error(f"Tool execution error: {e}")
-                        result = f"Error executing {tool_name}: {str(e)}"
-
-                    tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": tool_use_id,
-                        "content": result
-                    })
+            tool_results = [
+                _execute_chatbot_tool(tool_executor, block)
+                for block in response.content if block.type == "tool_use"
+            ]
 
             # Add assistant response and tool results to messages
             messages.append({"role": "assistant", "content": response.content})
@@ -21299,9 +21540,9 @@ def api_chatbot():
 
             # Continue conversation with tool results
             response = claude_client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=2048,
-                system=system_prompt,
+                model=CHATBOT_MODEL,
+                max_tokens=CHATBOT_MAX_TOKENS,
+                system=system_blocks,
                 messages=messages,
                 tools=TRANSACTION_TOOLS
             )
@@ -21328,6 +21569,103 @@ def api_chatbot():
         }), 500
 
 
+@app.route('/api/chatbot/stream', methods=['POST'])
+def api_chatbot_stream():
+    """Streaming AI CFO Assistant chatbot (SSE).
+
+    Same request body as /api/chatbot (plus optional conversation_id). Emits
+    `data: {...}` events as they happen:
+        {"type": "token", "text": ...}             - response text delta
+        {"type": "tool_start", "name": ...}         - Claude started a tool call
+        {"type": "tool_result", "name": ..., "cached": bool, "duration_ms": N}
+        {"type": "done", "response": ..., "tool_calls": N, "tenant_id": ...}
+        {"type": "error", "error": ..., "response": ...}
+    """
+    from ai_tools import TRANSACTION_TOOLS
+
+    # Extract all request-context-dependent data BEFORE the generator starts
+    data = request.get_json() or {}
+    message = data.get('message', '').strip()
+    history = data.get('history', [])
+
+    if not message:
+        return jsonify({'error': 'Message parameter required'}), 400
+
+    if not claude_client:
+        return jsonify({
+            'error': 'AI service unavailable',
+            'response': 'I apologize, but the AI service is currently unavailable. Please try again later.'
+        }), 503
+
+    tenant_id = get_current_tenant_id()
+
+    try:
+        system_blocks, messages, tool_executor = _prepare_chatbot_turn(
+            tenant_id, message, history, data.get('conversation_id')
+        )
+    except Exception as e:
+        logger.error(f"Chatbot stream setup error: {e}", exc_info=True)
+        return jsonify({
+            'error': 'Internal server error',
+            'response': 'I apologize, but I encountered an error processing your request. Please try again.'
+        }), 500
+
+    logger.info(f"Chatbot stream request for tenant {tenant_id}: {message[:50]}...")
+
+    def sse_event(event_type, **payload):
+        return f"data: {json.dumps({'type': event_type, **payload})}\n\n"
+
+    def generate_chat_events():
+        """Generator function to stream response tokens and tool progress"""
+        iteration = 0
+        try:
+            while True:
+                round_text = ""
+                with claude_client.messages.stream(
+                    model=CHATBOT_MODEL,
+                    max_tokens=CHATBOT_MAX_TOKENS,
+                    system=system_blocks,
+                    messages=messages,
+                    tools=TRANSACTION_TOOLS
+                ) as stream:
+                    for event in stream:
+                        if event.type == 'text':
+                            round_text += event.text
+                            yield sse_event('token', text=event.text)
+                        elif event.type == 'content_block_start' and event.content_block.type == 'tool_use':
+                            yield sse_event('tool_start', name=event.content_block.name)
+                    response = stream.get_final_message()
+
+                if response.stop_reason != "tool_use" or iteration >= CHATBOT_MAX_TOOL_ITERATIONS:
+                    break
+
+                iteration += 1
+                logger.info(f"Tool use iteration {iteration}")
+
+                tool_results = []
+                for block in response.content:
+                    if block.type == "tool_use":
+                        started = time.time()
+                        tool_results.append(_execute_chatbot_tool(tool_executor, block))
+                        yield sse_event('tool_result', name=block.name,
+                                        cached=tool_executor.last_result_cached,
+                                        duration_ms=int((time.time() - started) * 1000))
+
+                messages.append({"role": "assistant", "content": response.content})
+                messages.append({"role": "user", "content": tool_results})
+
+            logger.info(f"Chatbot stream response length: {len(round_text)} chars, iterations: {iteration}")
+            yield sse_event('done', response=round_text, tool_calls=iteration, tenant_id=tenant_id)
+
+        except Exception as e:
+            logger.error(f"Chatbot stream error: {e}", exc_info=True)
+            yield sse_event('error', error='Internal server error',
+                            response='I apologize, but I encountered an error processing your request. Please try again.')
+
+    return Response(generate_chat_events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @app.route('/api/wallets/update-transaction-displays', methods=['POST'])
 def api_update_wallet_displays():
     """
@@ -21516,6 +21854,7 @@ def api_create_workforce_member():
         )
 
         result = db_manager.execute_query(query, params, fetch_one=True)
+        invalidate_tenant_knowledge(tenant_id)
 
         return jsonify({
             'success': True,
@@ -21593,6 +21932,7 @@ def api_update_workforce_member(member_id):
         """
 
         db_manager.execute_query(query, tuple(params))
+        invalidate_tenant_knowledge(tenant_id)
 
         return jsonify({'success': True, 'message': 'Member updated successfully'})
 
@@ -21615,6 +21955,7 @@ def api_delete_workforce_member(member_id):
         """
 
         db_manager.execute_query(query, (member_id, tenant_id))
+        invalidate_tenant_knowledge(tenant_id)
 
         return jsonify({'success': True, 'message': 'Member deactivated successfully'})
 
@@ -23066,13 +23407,11 @@ def api_get_shareholder_chart_data():
 
 @app.route('/api/knowledge-generator/run', methods=['POST'])
 def run_knowledge_generator():
-    """Run the AI Knowledge Generator to analyze transaction history and create patterns"""
+    """
+    Start the AI Knowledge Generator as a background job.
+    Poll /api/jobs/<job_id>; the results are in the job item's result_data.
+    """
     try:
-        import sys
-        import os
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'services'))
-
-        from knowledge_generator import KnowledgeGenerator
         from tenant_context import get_current_tenant_id
 
         tenant_id = get_current_tenant_id()
@@ -23082,19 +23421,35 @@ def run_knowledge_generator():
                 'message': 'No tenant context available'
             }), 400
 
-        logger.info(f"Running Knowledge Generator for tenant: {tenant_id}")
+        logger.info(f"Starting Knowledge Generator job for tenant: {tenant_id}")
 
-        # Create generator and run analysis
-        generator = KnowledgeGenerator(tenant_id)
-        results = generator.analyze_all(min_frequency=75.0, min_transactions=5)
+        job_id = create_background_job(
+            job_type='knowledge_generation',
+            total_items=1,
+            created_by='web_user',
+            metadata=json.dumps({'tenant_id': tenant_id, 'min_frequency': 75.0, 'min_transactions': 5}),
+            tenant_id=tenant_id
+        )
+        if not job_id:
+            return jsonify({
+                'success': False,
+                'message': 'Failed to create background job'
+            }), 500
+
+        add_job_item(job_id, 'knowledge_generation')
 
-        logger.info(f"Knowledge Generator complete: {results}")
+        if not start_background_job(job_id, 'knowledge_generation'):
+            return jsonify({
+                'success': False,
+                'message': 'Failed to start background processing'
+            }), 500
 
         return jsonify({
             'success': True,
-            'message': 'Knowledge Generator completed successfully',
-            'results': results
-        })
+            'message': 'Knowledge Generator started',
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}'
+        }), 202
 
     except Exception as e:
         logger.error(f"Error running Knowledge Generator: {e}")
@@ -23234,6 +23589,9 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"[WARNING] Pattern validation service not started: {e}")
 
+    startup_profiler.mark_ready()
+    startup_profiler.log_report()
+
     # Get port from environment (Cloud Run sets PORT automatically)
     port = int(os.environ.get('PORT', 5001))
 
@@ -23267,3 +23625,5 @@ except Exception as e:
     import traceback
     traceback.print_exc()
 
+startup_profiler.mark_ready()
+startup_profiler.log_report()
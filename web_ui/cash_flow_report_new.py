@@ -16,11 +16,49 @@ from reportlab.lib.colors import HexColor
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database import db_manager
 from pdf_reports import DeltaCFOReportTemplate
 
 logger = logging.getLogger(__name__)
 
+CASH_FLOW_TABLE_STYLE = TableStyle([
+    # Headers
+    ('BACKGROUND', (0, 0), (-1, 0), HexColor('#2d3748')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), HexColor('#ffffff')),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
+
+    # Section headers
+    ('BACKGROUND', (0, 2), (-1, 2), HexColor('#e6f7ff')),  # Operating
+    ('BACKGROUND', (0, 9), (-1, 9), HexColor('#f0f9ff')),  # Investing
+    ('BACKGROUND', (0, 16), (-1, 16), HexColor('#f5f5dc')),  # Financing
+    ('BACKGROUND', (0, 22), (-1, 22), HexColor('#fef3cd')),  # Net change
+    ('BACKGROUND', (0, 24), (-1, 24), HexColor('#d4edda')),  # Final
+
+    # Bold for main items
+    ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),  # Operating header
+    ('FONTNAME', (0, 7), (-1, 7), 'Helvetica-Bold'),  # Operating net
+    ('FONTNAME', (0, 9), (-1, 9), 'Helvetica-Bold'),  # Investing header
+    ('FONTNAME', (0, 14), (-1, 14), 'Helvetica-Bold'),  # Investing net
+    ('FONTNAME', (0, 16), (-1, 16), 'Helvetica-Bold'),  # Financing header
+    ('FONTNAME', (0, 21), (-1, 21), 'Helvetica-Bold'),  # Financing net
+    ('FONTNAME', (0, 22), (-1, 22), 'Helvetica-Bold'),  # Net change
+    ('FONTNAME', (0, 24), (-1, 24), 'Helvetica-Bold'),  # Final
+
+    # Grid
+    ('GRID', (0, 0), (-1, -1), 1, HexColor('#e2e8f0')),
+    ('LINEBELOW', (0, 0), (-1, 0), 2, HexColor('#2d3748')),
+    ('LINEBELOW', (0, 22), (-1, 22), 2, HexColor('#f59e0b')),
+    ('LINEBELOW', (0, 24), (-1, 24), 2, HexColor('#10b981')),
+
+    # Padding
+    ('LEFTPADDING', (0, 0), (-1, -1), 12),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+])
+
 
 class CashFlowReport(DeltaCFOReportTemplate):
     """
@@ -28,7 +66,7 @@ class CashFlowReport(DeltaCFOReportTemplate):
     Following Brazilian accounting standards (CPC 03 / NBC TG 03)
     """
 
-    def __init__(self, company_name: str = "Delta Mining", start_date: date = None, end_date: date = None, entity_filter: str = None, tenant_id: str = 'delta'):
+    def __init__(self, company_name: str = "Delta Mining", start_date: date = None, end_date: date = None, entity_filter: str = None, tenant_id: str = 'delta', report_data: Dict[str, Any] = None):
         title = f"Demonstração de Fluxo de Caixa (DFC)"
         period = f"{start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}" if start_date and end_date else self._get_current_period()
         super().__init__(title, company_name, period)
@@ -37,43 +75,21 @@ class CashFlowReport(DeltaCFOReportTemplate):
         self.end_date = end_date or date.today()
         self.entity_filter = entity_filter
         self.tenant_id = tenant_id
+        self.report_data = report_data
 
         # Initialize data
         self.cash_flow_data = None
 
     def _fetch_cash_flow_data(self) -> Dict[str, Any]:
         """
-        Fetch cash flow data from database - EXACTLY like DRE pattern
+        Fetch cash flow data from the shared report data provider (same aggregates as the DRE)
         Returns structured data for cash flow calculation
         """
         try:
-            # Use exact same pattern as DRE
-            params = [self.start_date.isoformat(), self.end_date.isoformat()]
-            tenant_params = [self.tenant_id]
-            entity_params = []
-
-            if self.entity_filter:
-                entity_filter_condition = "AND classified_entity = %s"
-                entity_params = [self.entity_filter]
-            else:
-                entity_filter_condition = ""
-
-            # Revenue query exactly like DRE
-            revenue_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN COALESCE(usd_equivalent, amount, 0) ELSE 0 END) as cash_receipts,
-                    SUM(CASE WHEN amount < 0 THEN ABS(COALESCE(usd_equivalent, amount, 0)) ELSE 0 END) as cash_payments
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date BETWEEN %s AND %s
-                {entity_filter_condition}
-            """
-
-            all_params = tenant_params + params + entity_params
-            result = db_manager.execute_query(revenue_query, tuple(all_params), fetch_one=True)
-
-            cash_receipts = float(result.get('cash_receipts', 0) or 0) if result else 0
-            cash_payments = float(result.get('cash_payments', 0) or 0) if result else 0
+            data = self._load_report_data()
+
+            cash_receipts = data['total_revenue']
+            cash_payments = data['total_expenses']
             net_operating = cash_receipts - cash_payments
 
             return {
@@ -164,45 +180,8 @@ class CashFlowReport(DeltaCFOReportTemplate):
         # Create table
         table = Table(table_data, colWidths=[4*inch, 2*inch])
 
-        # Apply styling
-        table.setStyle(TableStyle([
-            # Headers
-            ('BACKGROUND', (0, 0), (-1, 0), HexColor('#2d3748')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), HexColor('#ffffff')),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
-
-            # Section headers
-            ('BACKGROUND', (0, 2), (-1, 2), HexColor('#e6f7ff')),  # Operating
-            ('BACKGROUND', (0, 9), (-1, 9), HexColor('#f0f9ff')),  # Investing
-            ('BACKGROUND', (0, 16), (-1, 16), HexColor('#f5f5dc')),  # Financing
-            ('BACKGROUND', (0, 22), (-1, 22), HexColor('#fef3cd')),  # Net change
-            ('BACKGROUND', (0, 24), (-1, 24), HexColor('#d4edda')),  # Final
-
-            # Bold for main items
-            ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),  # Operating header
-            ('FONTNAME', (0, 7), (-1, 7), 'Helvetica-Bold'),  # Operating net
-            ('FONTNAME', (0, 9), (-1, 9), 'Helvetica-Bold'),  # Investing header
-            ('FONTNAME', (0, 14), (-1, 14), 'Helvetica-Bold'),  # Investing net
-            ('FONTNAME', (0, 16), (-1, 16), 'Helvetica-Bold'),  # Financing header
-            ('FONTNAME', (0, 21), (-1, 21), 'Helvetica-Bold'),  # Financing net
-            ('FONTNAME', (0, 22), (-1, 22), 'Helvetica-Bold'),  # Net change
-            ('FONTNAME', (0, 24), (-1, 24), 'Helvetica-Bold'),  # Final
-
-            # Grid
-            ('GRID', (0, 0), (-1, -1), 1, HexColor('#e2e8f0')),
-            ('LINEBELOW', (0, 0), (-1, 0), 2, HexColor('#2d3748')),
-            ('LINEBELOW', (0, 22), (-1, 22), 2, HexColor('#f59e0b')),
-            ('LINEBELOW', (0, 24), (-1, 24), 2, HexColor('#10b981')),
-
-            # Padding
-            ('LEFTPADDING', (0, 0), (-1, -1), 12),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        # Apply styling (static, built once at import)
+        table.setStyle(CASH_FLOW_TABLE_STYLE)
 
         return table
 
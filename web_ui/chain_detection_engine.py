@@ -0,0 +1,640 @@
+"""
+Chain Detection Engine
+Set-based transaction chain detection over a sorted columnar ledger snapshot
+
+Replaces the per-transaction detector queries of TransactionChainAnalyzer with:
+- One snapshot query per tenant (plus one for invoice matches)
+- One in-memory pass per detector using date-sorted arrays and bisect windows
+- Results persisted to transaction_chains, refreshed incrementally after uploads
+
+The chains API then reads precomputed rows instead of running detectors. A
+tenant's first request starts the full build in the background and reports
+status "building" until it is done.
+"""
+
+import re
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import psycopg2.extras
+
+from database import db_manager
+from tenant_config import get_tenant_entity_families
+
+logger = logging.getLogger(__name__)
+
+# Detector windows (days) - same as TransactionChainAnalyzer
+CRYPTO_WINDOW_DAYS = 30
+VENDOR_WINDOW_DAYS = 90
+ENTITY_WINDOW_DAYS = 60
+AMOUNT_WINDOW_DAYS = 14
+MAX_WINDOW_DAYS = max(CRYPTO_WINDOW_DAYS, VENDOR_WINDOW_DAYS, ENTITY_WINDOW_DAYS, AMOUNT_WINDOW_DAYS)
+
+CRYPTO_PATTERNS = [
+    r'(TETHER|USDT)',
+    r'(BITCOIN|BTC)',
+    r'(ETHEREUM|ETH)',
+    r'(\d+\.?\d*)\s+(USDT|BTC|ETH)',
+    r'TRANSACTION.*(\d+\.?\d*)\s+(USDT|BTC|ETH)'
+]
+
+VENDOR_PATTERNS = [
+    r'^([A-Z\s]{3,20})',  # First words
+    r'(ANTHROPIC|GOOGLE|VERCEL|MICROSOFT|AMAZON|APPLE)',  # Known vendors
+    r'([A-Z]{3,15})\s',  # Capital word patterns
+]
+
+AMOUNT_BANDS = [
+    (0.95, 1.05, "exact_match"),   # +/- 5%
+    (0.4, 0.6, "half_amount"),     # ~50%
+    (1.8, 2.2, "double_amount"),   # ~200%
+    (0.2, 0.35, "split_partial")   # ~25%
+]
+
+# Transactions the chains are built from (and counted against)
+LEDGER_FILTER = """
+    tenant_id = %s
+    AND date IS NOT NULL
+    AND (archived IS NULL OR archived = FALSE)
+"""
+
+# Tables: migrations/add_transaction_chains_tables.sql
+_tenant_locks: Dict[str, threading.Lock] = {}
+_tenant_locks_lock = threading.Lock()
+_builds_running: Set[str] = set()
+_builds_lock = threading.Lock()
+
+
+def _tenant_lock(tenant_id: str) -> threading.Lock:
+    """The lock serializing refreshes of one tenant (created once, under _tenant_locks_lock)"""
+    with _tenant_locks_lock:
+        lock = _tenant_locks.get(tenant_id)
+        if lock is None:
+            lock = _tenant_locks[tenant_id] = threading.Lock()
+        return lock
+
+
+def _strength(confidence: float) -> str:
+    return "high" if confidence > 0.8 else "medium" if confidence > 0.6 else "low"
+
+
+class LedgerSnapshot:
+    """Date-sorted columnar view of a tenant's transactions"""
+
+    def __init__(self, rows: List[tuple]):
+        self.transaction_ids = [row[0] for row in rows]
+        self.dates = [row[1] for row in rows]
+        self.descriptions = [(row[2] or '') for row in rows]
+        self.upper_descriptions = [d.upper() for d in self.descriptions]
+        self.amounts = [float(row[3] or 0) for row in rows]
+        self.entities = [(row[4] or '') for row in rows]
+        self.ordinals = np.array([d.toordinal() for d in self.dates], dtype=np.int64)
+        self.abs_amounts = np.abs(np.array(self.amounts, dtype=np.float64))
+        self.index_by_id = {tx_id: i for i, tx_id in enumerate(self.transaction_ids)}
+
+    def __len__(self):
+        return len(self.transaction_ids)
+
+    def record(self, i: int) -> Dict:
+        """Row in the same shape the detector queries used to return"""
+        return {
+            'transaction_id': self.transaction_ids[i],
+            'description': self.descriptions[i],
+            'amount': self.amounts[i],
+            'date': self.dates[i].isoformat(),
+            'classified_entity': self.entities[i],
+        }
+
+    def recent_in_window(self, members: List[int], member_ordinals: List[int], center: int,
+                         window_days: int, limit: int) -> List[int]:
+        """Most recent member indexes within +/- window_days of row `center` (excluding it)"""
+        day = int(self.ordinals[center])
+        lo = bisect_left(member_ordinals, day - window_days)
+        hi = bisect_right(member_ordinals, day + window_days)
+        picked = []
+        for k in range(hi - 1, lo - 1, -1):
+            if members[k] != center:
+                picked.append(members[k])
+                if len(picked) >= limit:
+                    break
+        return picked
+
+
+class ChainDetectionEngine:
+    """
+    Detects all transaction chains for a tenant in one pass and persists them.
+
+    Detector semantics follow TransactionChainAnalyzer; vendor chains group by
+    the extracted vendor key instead of a per-transaction LIKE search.
+    """
+
+    def __init__(self):
+        # Reuse the analyzer's confidence/interval helpers so scores stay identical
+        from transaction_chain_analyzer import TransactionChainAnalyzer
+        self._analyzer = TransactionChainAnalyzer()
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    def refresh(self, tenant_id: str, since: Optional[date] = None) -> Dict:
+        """
+        Recompute chains for a tenant.
+
+        Args:
+            since: Earliest date touched by new data. Only transactions within
+                   MAX_WINDOW_DAYS of this date (or later) are re-analyzed.
+                   None rebuilds the whole ledger.
+        """
+        started = time.perf_counter()
+
+        with _tenant_lock(tenant_id):
+            target_from = since - timedelta(days=MAX_WINDOW_DAYS) if since else None
+            context_from = target_from - timedelta(days=MAX_WINDOW_DAYS) if target_from else None
+
+            snapshot = self._load_snapshot(tenant_id, context_from)
+            targets = [
+                i for i in range(len(snapshot))
+                if target_from is None or snapshot.dates[i] >= target_from
+            ]
+            chains_by_tx = self.detect(tenant_id, snapshot, targets)
+            chain_count = self._persist(tenant_id, snapshot, targets, chains_by_tx, since is None,
+                                        target_from, int((time.perf_counter() - started) * 1000))
+
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        logger.info(f"[CHAINS] Tenant {tenant_id}: {chain_count} chains for {len(targets)} transactions "
+                    f"({'full' if since is None else f'since {since}'}) in {duration_ms}ms")
+        return {
+            'tenant_id': tenant_id,
+            'transactions_analyzed': len(targets),
+            'chains_detected': chain_count,
+            'duration_ms': duration_ms,
+            'full_refresh': since is None,
+        }
+
+    def refresh_async(self, tenant_id: str, since: Optional[date] = None):
+        """Run refresh on a daemon thread (used after uploads)"""
+        def run():
+            try:
+                self.refresh(tenant_id, since)
+            except Exception as e:
+                logger.error(f"[CHAINS] Background refresh failed for tenant {tenant_id}: {e}")
+
+        threading.Thread(target=run, daemon=True, name=f"ChainRefresh-{tenant_id}").start()
+
+    def detect(self, tenant_id: str, snapshot: LedgerSnapshot, targets: List[int]) -> Dict[int, List[Dict]]:
+        """Run every detector over the snapshot for the target rows"""
+        chains_by_tx: Dict[int, List[Dict]] = defaultdict(list)
+        if not targets:
+            return chains_by_tx
+
+        detectors = [
+            ('crypto_sequence', lambda: self._detect_crypto(snapshot, targets)),
+            ('vendor_recurring', lambda: self._detect_vendor(snapshot, targets)),
+            ('entity_related', lambda: self._detect_entity(tenant_id, snapshot, targets)),
+            ('amount_correlation', lambda: self._detect_amount(snapshot, targets)),
+            ('invoice_sequence', lambda: self._detect_invoice(tenant_id, snapshot, targets)),
+        ]
+        for name, run in detectors:
+            try:
+                for i, chain in run():
+                    chains_by_tx[i].append(chain)
+            except Exception as e:
+                logger.error(f"[CHAINS] Detector {name} failed: {e}", exc_info=True)
+
+        return chains_by_tx
+
+    # ------------------------------------------------------------------
+    # Detectors
+    # ------------------------------------------------------------------
+
+    def _detect_crypto(self, snapshot: LedgerSnapshot, targets: List[int]):
+        # Extract crypto type/amount once per target row
+        extracted = {}
+        for i in targets:
+            for pattern in CRYPTO_PATTERNS:
+                match = re.search(pattern, snapshot.upper_descriptions[i])
+                if match:
+                    if len(match.groups()) >= 2:
+                        amount = match.group(1) if match.group(1).replace('.', '').isdigit() else None
+                        extracted[i] = (match.group(2), amount)
+                    else:
+                        extracted[i] = (match.group(1), None)
+                    break
+
+        # Membership per crypto token (same as LIKE '%TOKEN%'), computed once per token
+        members_by_type = {}
+        for crypto_type in {t for t, _ in extracted.values()}:
+            members = [j for j, desc in enumerate(snapshot.upper_descriptions) if crypto_type in desc]
+            members_by_type[crypto_type] = (members, [int(snapshot.ordinals[j]) for j in members])
+
+        for i, (crypto_type, crypto_amount) in extracted.items():
+            members, ordinals = members_by_type[crypto_type]
+            related = snapshot.recent_in_window(members, ordinals, i, CRYPTO_WINDOW_DAYS, 10)
+            if not related:
+                continue
+            base = snapshot.record(i)
+            similar = [snapshot.record(j) for j in related]
+            confidence = self._analyzer._calculate_crypto_chain_confidence(base, similar, crypto_type, crypto_amount)
+            related_dates = [snapshot.dates[j] for j in related]
+            yield i, {
+                "chain_type": "crypto_sequence",
+                "confidence": confidence,
+                "crypto_type": crypto_type,
+                "crypto_amount": crypto_amount,
+                "related_transactions": similar,
+                "pattern_description": f"{crypto_type} transaction sequence with {len(similar)} related transactions",
+                "chain_strength": _strength(confidence),
+                "navigation_path": [base['transaction_id']] + [tx['transaction_id'] for tx in similar],
+                "timespan_days": (max(related_dates) - min(related_dates)).days,
+                "total_crypto_volume": self._analyzer._calculate_total_crypto_volume(similar, crypto_type)
+            }
+
+    @staticmethod
+    def _vendor_key(upper_description: str) -> Optional[str]:
+        for pattern in VENDOR_PATTERNS:
+            match = re.search(pattern, upper_description)
+            if match:
+                candidate = match.group(1).strip()
+                if len(candidate) >= 3 and not candidate.isdigit():
+                    return candidate
+        return None
+
+    def _detect_vendor(self, snapshot: LedgerSnapshot, targets: List[int]):
+        members_by_vendor = defaultdict(list)
+        vendor_of = {}
+        for j, desc in enumerate(snapshot.upper_descriptions):
+            key = self._vendor_key(desc)
+            if key:
+                members_by_vendor[key].append(j)
+                vendor_of[j] = key
+        ordinals_by_vendor = {
+            key: [int(snapshot.ordinals[j]) for j in members]
+            for key, members in members_by_vendor.items()
+        }
+
+        for i in targets:
+            vendor_name = vendor_of.get(i)
+            if not vendor_name:
+                continue
+            related = snapshot.recent_in_window(members_by_vendor[vendor_name], ordinals_by_vendor[vendor_name],
+                                                i, VENDOR_WINDOW_DAYS, 15)
+            if len(related) < 2:  # At least 2 other transactions
+                continue
+            base = snapshot.record(i)
+            similar = [snapshot.record(j) for j in related]
+            confidence = self._analyzer._calculate_vendor_chain_confidence(base, similar, vendor_name)
+            intervals = self._analyzer._analyze_transaction_intervals(similar)
+            total = sum(abs(float(tx['amount'])) for tx in similar)
+            yield i, {
+                "chain_type": "vendor_recurring",
+                "confidence": confidence,
+                "vendor_name": vendor_name,
+                "related_transactions": similar,
+                "pattern_description": f"Recurring {vendor_name} transactions with {intervals['pattern']} pattern",
+                "chain_strength": _strength(confidence),
+                "navigation_path": [base['transaction_id']] + [tx['transaction_id'] for tx in similar],
+                "interval_pattern": intervals,
+                "total_amount": total,
+                "average_amount": total / len(similar)
+            }
+
+    def _detect_entity(self, tenant_id: str, snapshot: LedgerSnapshot, targets: List[int]):
+        entity_families = get_tenant_entity_families(tenant_id)
+        if not entity_families:
+            return
+
+        members_by_entity = defaultdict(list)
+        for j, entity in enumerate(snapshot.entities):
+            if entity:
+                members_by_entity[entity].append(j)
+        ordinals_by_entity = {
+            entity: [int(snapshot.ordinals[j]) for j in members]
+            for entity, members in members_by_entity.items()
+        }
+
+        related_cache: Dict[str, List[str]] = {}
+        for i in targets:
+            base_entity = snapshot.entities[i]
+            if not base_entity or base_entity in ['NEEDS REVIEW', 'Unclassified']:
+                continue
+
+            if base_entity not in related_cache:
+                related_cache[base_entity] = []
+                for family_name, entities in entity_families.items():
+                    if family_name.lower() in base_entity.lower():
+                        related_cache[base_entity] = [e for e in entities if e != base_entity]
+                        break
+            related_entities = related_cache[base_entity]
+            if not related_entities:
+                continue
+
+            related = []
+            for entity in related_entities:
+                if entity in members_by_entity:
+                    related.extend(snapshot.recent_in_window(members_by_entity[entity], ordinals_by_entity[entity],
+                                                             i, ENTITY_WINDOW_DAYS, 20))
+            if not related:
+                continue
+            related.sort(key=lambda j: snapshot.ordinals[j], reverse=True)
+            entity_transactions = [snapshot.record(j) for j in related[:20]]
+
+            confidence = min(0.9, 0.6 + (len(entity_transactions) * 0.05))
+            yield i, {
+                "chain_type": "entity_related",
+                "confidence": confidence,
+                "base_entity": base_entity,
+                "related_entities": related_entities,
+                "related_transactions": entity_transactions,
+                "pattern_description": "Transactions across related entities",
+                "chain_strength": "high" if confidence > 0.8 else "medium",
+                "navigation_path": [snapshot.transaction_ids[i]] + [tx['transaction_id'] for tx in entity_transactions]
+            }
+
+    def _detect_amount(self, snapshot: LedgerSnapshot, targets: List[int]):
+        ordinals = snapshot.ordinals
+        amounts = snapshot.abs_amounts
+
+        for i in targets:
+            base_amount = amounts[i]
+            if base_amount == 0:
+                continue
+            lo = int(np.searchsorted(ordinals, ordinals[i] - AMOUNT_WINDOW_DAYS, side='left'))
+            hi = int(np.searchsorted(ordinals, ordinals[i] + AMOUNT_WINDOW_DAYS, side='right'))
+            window = amounts[lo:hi]
+
+            for low_factor, high_factor, pattern_type in AMOUNT_BANDS:
+                mask = (window >= base_amount * low_factor) & (window <= base_amount * high_factor)
+                if 0 <= i - lo < len(mask):
+                    mask[i - lo] = False
+                hits = np.flatnonzero(mask)
+                if hits.size == 0:
+                    continue
+                # Most recent 8 within the window
+                correlated = [snapshot.record(lo + int(k)) for k in hits[::-1][:8]]
+                yield i, {
+                    "chain_type": "amount_correlation",
+                    "confidence": 0.7 if pattern_type == "exact_match" else 0.6,
+                    "correlation_type": pattern_type,
+                    "base_amount": float(base_amount),
+                    "related_transactions": correlated,
+                    "pattern_description": f"Amount correlation: {pattern_type.replace('_', ' ')}",
+                    "chain_strength": "medium",
+                    "navigation_path": [snapshot.transaction_ids[i]] + [tx['transaction_id'] for tx in correlated]
+                }
+
+    def _detect_invoice(self, tenant_id: str, snapshot: LedgerSnapshot, targets: List[int]):
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT pim.transaction_id, i.id, i.invoice_number, i.vendor_name, i.total_amount, pim.match_score
+                FROM pending_invoice_matches pim
+                JOIN invoices i ON pim.invoice_id = i.id
+                WHERE i.tenant_id = %s
+            """, (tenant_id,))
+            rows = cursor.fetchall()
+            cursor.close()
+
+        matches_by_tx = defaultdict(list)
+        txs_by_vendor: Dict[str, Set[int]] = defaultdict(set)
+        for tx_id, invoice_id, invoice_number, vendor_name, total_amount, match_score in rows:
+            matches_by_tx[tx_id].append({
+                'id': invoice_id,
+                'invoice_number': invoice_number,
+                'vendor_name': vendor_name,
+                'total_amount': float(total_amount) if total_amount is not None else None,
+                'match_score': float(match_score) if match_score is not None else None,
+                'transaction_id': tx_id,
+            })
+            if vendor_name and tx_id in snapshot.index_by_id:
+                txs_by_vendor[vendor_name].add(snapshot.index_by_id[tx_id])
+
+        for i in targets:
+            invoice_matches = matches_by_tx.get(snapshot.transaction_ids[i])
+            if not invoice_matches:
+                continue
+            vendor = invoice_matches[0].get('vendor_name')
+            if not vendor:
+                continue
+            related = sorted(txs_by_vendor[vendor] - {i}, key=lambda j: snapshot.ordinals[j], reverse=True)[:10]
+            if not related:
+                continue
+            related_invoices = [snapshot.record(j) for j in related]
+            yield i, {
+                "chain_type": "invoice_sequence",
+                "confidence": 0.85,
+                "base_invoice": invoice_matches[0],
+                "related_transactions": related_invoices,
+                "pattern_description": f"Invoice sequence from {vendor}",
+                "chain_strength": "high",
+                "navigation_path": [snapshot.transaction_ids[i]] + [tx['transaction_id'] for tx in related_invoices]
+            }
+
+    # ------------------------------------------------------------------
+    # Database access
+    # ------------------------------------------------------------------
+
+    def _load_snapshot(self, tenant_id: str, since: Optional[date]) -> LedgerSnapshot:
+        query = """
+            SELECT transaction_id, date::date, description, amount, classified_entity
+            FROM transactions
+            WHERE """ + LEDGER_FILTER
+        params = [tenant_id]
+        if since:
+            query += " AND date::date >= %s"
+            params.append(since)
+        query += " ORDER BY date::date, transaction_id"
+
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, tuple(params))
+            rows = cursor.fetchall()
+            cursor.close()
+
+        return LedgerSnapshot(rows)
+
+    def _persist(self, tenant_id: str, snapshot: LedgerSnapshot, targets: List[int],
+                 chains_by_tx: Dict[int, List[Dict]], full: bool, target_from: Optional[date],
+                 duration_ms: int) -> int:
+        rows = []
+        for i in targets:
+            for chain in chains_by_tx.get(i, []):
+                rows.append((
+                    tenant_id,
+                    snapshot.transaction_ids[i],
+                    chain['chain_type'],
+                    round(float(chain.get('confidence', 0)), 3),
+                    len(chain.get('related_transactions', [])),
+                    json.dumps(chain, default=str)
+                ))
+
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            if full:
+                cursor.execute("DELETE FROM transaction_chains WHERE tenant_id = %s", (tenant_id,))
+            else:
+                cursor.execute("""
+                    DELETE FROM transaction_chains
+                    WHERE tenant_id = %s AND transaction_id = ANY(%s)
+                """, (tenant_id, [snapshot.transaction_ids[i] for i in targets]))
+                # Transactions deleted or archived since the last run, at any date
+                cursor.execute("""
+                    DELETE FROM transaction_chains
+                    WHERE tenant_id = %s
+                    AND NOT EXISTS (
+                        SELECT 1 FROM transactions
+                        WHERE """ + LEDGER_FILTER + """
+                        AND transactions.transaction_id = transaction_chains.transaction_id
+                    )
+                """, (tenant_id, tenant_id))
+
+            if rows:
+                psycopg2.extras.execute_values(cursor, """
+                    INSERT INTO transaction_chains
+                        (tenant_id, transaction_id, chain_type, confidence, related_count, chain_data)
+                    VALUES %s
+                """, rows, template="(%s, %s, %s, %s, %s, %s::jsonb)", page_size=1000)
+
+            cursor.execute("""
+                INSERT INTO transaction_chain_runs
+                    (tenant_id, last_refreshed_at, last_full_refresh_at, refreshed_since,
+                     transactions_analyzed, chains_detected, duration_ms)
+                VALUES (%s, CURRENT_TIMESTAMP, CASE WHEN %s THEN CURRENT_TIMESTAMP END, %s, %s, %s, %s)
+                ON CONFLICT (tenant_id) DO UPDATE SET
+                    last_refreshed_at = CURRENT_TIMESTAMP,
+                    last_full_refresh_at = COALESCE(EXCLUDED.last_full_refresh_at, transaction_chain_runs.last_full_refresh_at),
+                    refreshed_since = EXCLUDED.refreshed_since,
+                    transactions_analyzed = EXCLUDED.transactions_analyzed,
+                    chains_detected = EXCLUDED.chains_detected,
+                    duration_ms = EXCLUDED.duration_ms
+            """, (tenant_id, full, target_from, len(targets), len(rows), duration_ms))
+
+            conn.commit()
+            cursor.close()
+
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Reads (chains API)
+    # ------------------------------------------------------------------
+
+    def _ensure_built(self, tenant_id: str) -> bool:
+        """
+        True once the tenant's chains are built. Otherwise the first call starts
+        the full build on a background thread and returns False right away.
+        """
+        result = db_manager.execute_query(
+            "SELECT 1 FROM transaction_chain_runs WHERE tenant_id = %s", (tenant_id,), fetch_one=True
+        )
+        if result:
+            return True
+
+        with _builds_lock:
+            if tenant_id not in _builds_running:
+                _builds_running.add(tenant_id)
+                threading.Thread(target=self._build, args=(tenant_id,), daemon=True,
+                                 name=f"ChainBuild-{tenant_id}").start()
+        return False
+
+    def _build(self, tenant_id: str):
+        try:
+            self.refresh(tenant_id)
+        except Exception as e:
+            logger.error(f"[CHAINS] First build failed for tenant {tenant_id}: {e}")
+        finally:
+            with _builds_lock:
+                _builds_running.discard(tenant_id)
+
+    def get_transaction_chains(self, tenant_id: str, transaction_id: str) -> Optional[List[Dict]]:
+        """Precomputed chains for one transaction, highest confidence first; None while building"""
+        if not self._ensure_built(tenant_id):
+            return None
+        rows = db_manager.execute_query("""
+            SELECT chain_data
+            FROM transaction_chains
+            WHERE tenant_id = %s AND transaction_id = %s
+            ORDER BY confidence DESC
+        """, (tenant_id, transaction_id), fetch_all=True)
+        return [self._chain_data(row['chain_data']) for row in rows or []]
+
+    def get_system_chains(self, tenant_id: str, top_n: int = 15) -> Dict:
+        """Best chain per transaction across the tenant plus distribution counters"""
+        if not self._ensure_built(tenant_id):
+            return {
+                'status': 'building',
+                'pattern_distribution': {},
+                'top_chains': [],
+                'chains_detected': 0,
+                'total_transactions_analyzed': 0,
+                'last_refreshed_at': None,
+            }
+
+        distribution = db_manager.execute_query("""
+            SELECT chain_type, COUNT(*) AS chain_count
+            FROM transaction_chains
+            WHERE tenant_id = %s
+            GROUP BY chain_type
+        """, (tenant_id,), fetch_all=True) or []
+
+        top_rows = db_manager.execute_query("""
+            SELECT transaction_id, chain_data, confidence
+            FROM (
+                SELECT DISTINCT ON (transaction_id) transaction_id, chain_data, confidence
+                FROM transaction_chains
+                WHERE tenant_id = %s
+                ORDER BY transaction_id, confidence DESC
+            ) best
+            ORDER BY confidence DESC
+            LIMIT %s
+        """, (tenant_id, top_n), fetch_all=True) or []
+
+        run = db_manager.execute_query("""
+            SELECT last_refreshed_at, transactions_analyzed
+            FROM transaction_chain_runs
+            WHERE tenant_id = %s
+        """, (tenant_id,), fetch_one=True) or {}
+
+        counts = db_manager.execute_query("""
+            SELECT COUNT(DISTINCT transaction_id) AS chained_transactions,
+                   (SELECT COUNT(*) FROM transactions WHERE """ + LEDGER_FILTER + """) AS total_transactions
+            FROM transaction_chains
+            WHERE tenant_id = %s
+        """, (tenant_id, tenant_id), fetch_one=True) or {}
+
+        top_chains = []
+        for row in top_rows:
+            chain = self._chain_data(row['chain_data'])
+            chain['source_transaction'] = row['transaction_id']
+            top_chains.append(chain)
+
+        last_refreshed = run.get('last_refreshed_at')
+        return {
+            'status': 'ready',
+            'pattern_distribution': {row['chain_type']: row['chain_count'] for row in distribution},
+            'top_chains': top_chains,
+            'chains_detected': counts.get('chained_transactions', 0),
+            'total_transactions_analyzed': counts.get('total_transactions', 0),
+            'last_refreshed_at': last_refreshed.isoformat() if isinstance(last_refreshed, datetime) else last_refreshed,
+        }
+
+    @staticmethod
+    def _chain_data(value) -> Dict:
+        return json.loads(value) if isinstance(value, str) else dict(value)
+
+
+_engine = None
+
+
+def get_chain_engine() -> ChainDetectionEngine:
+    """Process-wide engine instance"""
+    global _engine
+    if _engine is None:
+        _engine = ChainDetectionEngine()
+    return _engine
@@ -5,12 +5,27 @@ Builds tenant-specific context for AI CFO Assistant chatbot
 """
 
 import os
+import sys
+import time
 import logging
+import importlib
+import threading
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Cached system prompts are rebuilt after this long even without a write
+SYSTEM_PROMPT_TTL_SECONDS = 900
+
+# Per-tenant data versions, bumped by invalidate_chatbot_context() on writes in
+# this process; get_data_version() adds the database-side counter so writes by
+# other workers count too. Keys the system prompt cache and the chatbot tool
+# result cache (ai_tools).
+_data_versions: Dict[str, int] = {}
+_system_prompt_cache: Dict[str, Dict[str, Any]] = {}
+_cache_lock = threading.Lock()
+
 class ChatbotContextBuilder:
     """
     Builds rich context for chatbot based on tenant data
@@ -148,20 +163,20 @@ class ChatbotContextBuilder:
                 WHERE tenant_id = %s AND date >= %s
             """
 
-            result = self.db_manager.execute_query(
+            row = self.db_manager.execute_query(
                 query,
-                (self.tenant_id, thirty_days_ago)
+                (self.tenant_id, thirty_days_ago),
+                fetch_one=True
             )
 
-            if result and len(result) > 0:
-                row = result[0]
+            if row:
                 return {
                     'period': 'Last 30 days',
-                    'transaction_count': row[0] or 0,
-                    'total_revenue': float(row[1] or 0),
-                    'total_expenses': float(row[2] or 0),
-                    'entity_count': row[3] or 0,
-                    'needs_review_count': row[4] or 0
+                    'transaction_count': row['transaction_count'] or 0,
+                    'total_revenue': float(row['total_revenue'] or 0),
+                    'total_expenses': float(row['total_expenses'] or 0),
+                    'entity_count': row['entity_count'] or 0,
+                    'needs_review_count': row['needs_review_count'] or 0
                 }
 
             return None
@@ -177,6 +192,33 @@ class ChatbotContextBuilder:
         Returns:
             str: System prompt with full tenant context and tool guidance
         """
+        static_prompt, stats_desc = self._build_prompt_parts()
+        return static_prompt.replace('{stats_desc}', stats_desc, 1)
+
+    def build_system_blocks(self) -> List[Dict[str, Any]]:
+        """
+        Build the system prompt as Claude content blocks.
+
+        The tenant profile and instructions form a stable prefix marked for
+        provider-side prompt caching; the recent stats follow uncached so a
+        stats change does not invalidate the cached prefix.
+
+        Returns:
+            list: System content blocks for the messages API
+        """
+        static_prompt, stats_desc = self._build_prompt_parts()
+        before, _, after = static_prompt.partition('{stats_desc}')
+        blocks = [{
+            'type': 'text',
+            'text': before.rstrip() + '\n\n' + after.lstrip(),
+            'cache_control': {'type': 'ephemeral'}
+        }]
+        if stats_desc.strip():
+            blocks.append({'type': 'text', 'text': stats_desc.strip()})
+        return blocks
+
+    def _build_prompt_parts(self) -> tuple:
+        """Prompt text with a {stats_desc} marker, and the stats section"""
         profile = self.get_tenant_profile()
         stats = self.get_recent_stats()
 
@@ -220,7 +262,7 @@ BUSINESS ENTITIES:
 ACCOUNTING CATEGORIES & CLASSIFICATIONS:
 {categories_desc}
 
-{stats_desc}
+{{stats_desc}}
 
 YOUR ROLE:
 You are a helpful, professional CFO assistant with deep knowledge of:
@@ -264,9 +306,10 @@ WHEN NOT TO USE TOOLS:
 
 How can you assist with financial or accounting questions today?"""
 
-        return prompt
+        return prompt, stats_desc
 
-    def format_conversation_history(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    @staticmethod
+    def format_conversation_history(history: List[Dict[str, str]]) -> List[Dict[str, str]]:
         """
         Format conversation history for Claude API
 
@@ -304,3 +347,68 @@ def get_chatbot_context(db_manager, tenant_id: str) -> ChatbotContextBuilder:
         ChatbotContextBuilder: Initialized context builder
     """
     return ChatbotContextBuilder(db_manager, tenant_id)
+
+
+def _web_ui_service(module_name):
+    """Import a web_ui/services module (the root services/ package shadows web_ui's)"""
+    services_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services')
+    if services_path not in sys.path:
+        sys.path.insert(0, services_path)
+    return importlib.import_module(module_name)
+
+
+def get_data_version(tenant_id: str, db_manager=None) -> int:
+    """
+    Current data version for a tenant (changes whenever chatbot context is
+    invalidated here or the tenant's transactions are written by any process)
+
+    Args:
+        tenant_id: Tenant identifier
+        db_manager: Database manager instance (defaults to the shared one)
+
+    Returns:
+        int: Version counter, 0 until the first write
+    """
+    db_version = _web_ui_service('tenant_data_version').tenant_data_version(tenant_id, db_manager)
+    return _data_versions.get(tenant_id, 0) + db_version
+
+
+def invalidate_chatbot_context(tenant_id: Optional[str] = None):
+    """
+    Drop cached chatbot context after tenant data changes
+
+    Bumps the tenant's data version, which also retires memoized tool
+    results keyed on it.
+
+    Args:
+        tenant_id: Tenant whose data changed, or None for all tenants
+    """
+    with _cache_lock:
+        tenants = [tenant_id] if tenant_id else list(set(_data_versions) | set(_system_prompt_cache))
+        for tenant in tenants:
+            _data_versions[tenant] = _data_versions.get(tenant, 0) + 1
+            _system_prompt_cache.pop(tenant, None)
+
+
+def get_cached_system_blocks(db_manager, tenant_id: str) -> List[Dict[str, Any]]:
+    """
+    System prompt blocks for a tenant, rebuilt only after a write or TTL expiry
+
+    Args:
+        db_manager: Database manager instance
+        tenant_id: Current tenant identifier
+
+    Returns:
+        list: System content blocks (see ChatbotContextBuilder.build_system_blocks)
+    """
+    version = get_data_version(tenant_id, db_manager)
+    cached = _system_prompt_cache.get(tenant_id)
+    if cached and cached['version'] == version and time.time() - cached['built_at'] < SYSTEM_PROMPT_TTL_SECONDS:
+        return cached['blocks']
+
+    blocks = ChatbotContextBuilder(db_manager, tenant_id).build_system_blocks()
+    with _cache_lock:
+        # Don't store a prompt built from data older than a concurrent invalidation
+        if get_data_version(tenant_id, db_manager) == version:
+            _system_prompt_cache[tenant_id] = {'version': version, 'built_at': time.time(), 'blocks': blocks}
+    return blocks
@@ -5,16 +5,31 @@ Supports both SQLite (development) and PostgreSQL (production)
 """
 
 import os
+import re
+import sys
+import hashlib
 import sqlite3
+import threading
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
 import psycopg2.pool
+from collections import deque
 from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
 from typing import Generator, Optional, Any, Dict, List
 import time
 import logging
 from dotenv import load_dotenv
 
+try:
+    from module_singletons import shared_instance
+except ImportError:
+    # web_ui/ itself is not on sys.path (imported through the repo root)
+    from web_ui.module_singletons import shared_instance
+
 # Load environment variables
 load_dotenv()
 
@@ -22,12 +37,883 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Connections held longer than this are reported as possible leaks
+LEAK_WARNING_SECONDS = 60
+
+# Checked-out connections are swept for leaks every this many checkouts
+LEAK_SWEEP_INTERVAL = 200
+
+# Recent pool checkout wait times kept for percentiles
+CHECKOUT_SAMPLE_SIZE = 500
+
+# Query instrumentation (see QueryMonitor)
+QUERY_INSTRUMENTATION_ENABLED = os.getenv('DB_QUERY_INSTRUMENTATION', 'true').lower() == 'true'
+SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '500'))
+N_PLUS_ONE_THRESHOLD = int(os.getenv('DB_N_PLUS_ONE_THRESHOLD', '25'))
+QUERY_STATS_FLUSH_SECONDS = int(os.getenv('DB_QUERY_STATS_FLUSH_SECONDS', '60'))
+QUERY_RING_SIZE = 2000
+SLOW_QUERY_SAMPLE_SIZE = 100
+QUERY_FINGERPRINT_MAX_CHARS = 4000
+
+# Batch APIs: rows per multi-row INSERT, prepared statements kept per connection
+BULK_PAGE_SIZE = 1000
+PREPARED_STATEMENT_CACHE_SIZE = 100
+
+# Unit of work active in the current request/job context
+_current_unit_of_work: ContextVar[Optional['UnitOfWork']] = ContextVar('db_unit_of_work', default=None)
+
+
+def _caller_location() -> str:
+    """First stack frame outside this module, e.g. 'app_db.py:1234 in api_foo'"""
+    frame = sys._getframe(1)
+    while frame and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if frame is None:
+        return 'unknown'
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+
+# =============================================================================
+# QUERY INSTRUMENTATION
+# =============================================================================
+
+class QueryScope:
+    """Per-request / per-job query accounting"""
+
+    __slots__ = ('name', 'kind', 'started_at', 'query_count', 'db_time_ms', 'fingerprints', 'n_plus_one')
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.started_at = time.perf_counter()
+        self.query_count = 0
+        self.db_time_ms = 0.0
+        self.fingerprints: Dict[str, int] = {}
+        self.n_plus_one: Dict[str, int] = {}  # fingerprint hash -> repeat count once over threshold
+
+
+_FP_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_FP_STRING = re.compile(r"'(?:[^']|'')*'")
+_FP_NUMBER = re.compile(r'(?<![\w$])-?\d+(?:\.\d+)?(?![\w$])')
+_FP_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s')
+_FP_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_FP_ROWS = re.compile(r'\(\?\+\)(?:\s*,\s*\(\?\+\))+')
+_FP_SPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def _fingerprint_text(query: str) -> str:
+    text = _FP_COMMENT.sub(' ', query)
+    text = _FP_STRING.sub('?', text)
+    text = _FP_PLACEHOLDER.sub('?', text)
+    text = _FP_NUMBER.sub('?', text)
+    text = _FP_LIST.sub('(?+)', text)     # IN (...) lists and VALUES rows of any width
+    text = _FP_ROWS.sub('(?+)...', text)  # multi-row VALUES
+    return _FP_SPACE.sub(' ', text).strip().lower()
+
+
+def fingerprint_query(query) -> str:
+    """Normalize a statement so calls differing only in literals/parameters group together"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', errors='replace')
+    query = str(query)
+    if len(query) > QUERY_FINGERPRINT_MAX_CHARS:
+        # execute_values() batches arrive pre-rendered; the head is enough to group them
+        query = query[:QUERY_FINGERPRINT_MAX_CHARS]
+    return _fingerprint_text(query)
+
+
+def _fingerprint_hash(fingerprint: str) -> str:
+    return hashlib.md5(fingerprint.encode('utf-8')).hexdigest()[:16]
+
+
+def _param_type(value) -> str:
+    if value is None:
+        return 'None'
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def param_shape(params) -> Optional[str]:
+    """Types (never values) of a statement's bind parameters, e.g. '(str, int, list[40])'"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        items = [f"{key}: {_param_type(value)}" for key, value in list(params.items())[:20]]
+        extra = len(params) - len(items)
+        return '{' + ', '.join(items) + (f', +{extra} more' if extra > 0 else '') + '}'
+    if isinstance(params, (list, tuple)):
+        items = [_param_type(value) for value in params[:20]]
+        extra = len(params) - len(items)
+        return '(' + ', '.join(items) + (f', +{extra} more' if extra > 0 else '') + ')'
+    return _param_type(params)
+
+
+class QueryMonitor:
+    """
+    In-process statement statistics.
+
+    Keeps per-fingerprint aggregates for the current window, a ring buffer of
+    recent statements, slow-query samples and per-request/job query counts.
+    Windows are flushed to db_query_fingerprint_stats / db_endpoint_query_stats
+    every QUERY_STATS_FLUSH_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scope: ContextVar[Optional[QueryScope]] = ContextVar('db_query_scope', default=None)
+        self.recent = deque(maxlen=QUERY_RING_SIZE)
+        self.slow_samples = deque(maxlen=SLOW_QUERY_SAMPLE_SIZE)
+        self.n_plus_one_events = deque(maxlen=SLOW_QUERY_SAMPLE_SIZE)
+        self._flushing = False
+        self._reset_window()
+
+    def _reset_window(self):
+        self.window_started_at = datetime.utcnow()
+        self._last_flush = time.time()
+        self._fingerprints: Dict[str, Dict[str, Any]] = {}
+        self._scopes: Dict[tuple, Dict[str, Any]] = {}
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, query, params, duration_ms: float, rowcount: int = -1, executions: int = 1):
+        """Record one execute()/executemany() call"""
+        fingerprint = fingerprint_query(query)
+        fp_hash = _fingerprint_hash(fingerprint)
+        rows = rowcount if rowcount and rowcount > 0 else 0
+        slow = duration_ms >= SLOW_QUERY_MS
+        scope = self._scope.get()
+
+        with self._lock:
+            stats = self._fingerprints.get(fp_hash)
+            if stats is None:
+                stats = self._fingerprints[fp_hash] = {
+                    'fingerprint': fingerprint, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'rows': 0, 'slow_calls': 0, 'params_shape': param_shape(params),
+                }
+            stats['calls'] += executions
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['rows'] += rows
+            if slow:
+                stats['slow_calls'] += 1
+            self.recent.append((time.time(), fp_hash, round(duration_ms, 2), rows, scope.name if scope else None))
+
+        if slow:
+            sample = {
+                'at': datetime.utcnow().isoformat(),
+                'fingerprint': fingerprint[:500],
+                'fingerprint_hash': fp_hash,
+                'duration_ms': round(duration_ms, 1),
+                'rows': rows,
+                'params_shape': param_shape(params),
+                'scope': scope.name if scope else None,
+            }
+            self.slow_samples.append(sample)
+            logger.warning(f"Slow query ({duration_ms:.0f}ms, {rows} rows) in {sample['scope'] or 'no scope'}: "
+                           f"{fingerprint[:200]} params={sample['params_shape']}")
+
+        if scope is not None:
+            scope.query_count += executions
+            scope.db_time_ms += duration_ms
+            count = scope.fingerprints.get(fp_hash, 0) + 1
+            scope.fingerprints[fp_hash] = count
+            if count > N_PLUS_ONE_THRESHOLD:
+                if fp_hash not in scope.n_plus_one:
+                    logger.warning(f"Possible N+1 in {scope.name}: statement repeated more than "
+                                   f"{N_PLUS_ONE_THRESHOLD} times: {fingerprint[:200]}")
+                    self.n_plus_one_events.append({
+                        'at': datetime.utcnow().isoformat(),
+                        'scope': scope.name,
+                        'fingerprint': fingerprint[:500],
+                        'fingerprint_hash': fp_hash,
+                    })
+                scope.n_plus_one[fp_hash] = count
+
+    def begin_scope(self, name: str, kind: str = 'request'):
+        """Start counting queries for a request/job; returns a token for end_scope"""
+        return self._scope.set(QueryScope(name, kind))
+
+    def current_scope(self) -> Optional[QueryScope]:
+        return self._scope.get()
+
+    def end_scope(self, token, error: Optional[BaseException] = None, manager=None):
+        """Fold the scope into the window aggregates and flush if the window is due"""
+        scope = self._scope.get()
+        try:
+            self._scope.reset(token)
+        except ValueError:
+            self._scope.set(None)
+        if scope is None:
+            return
+
+        wall_ms = (time.perf_counter() - scope.started_at) * 1000
+        with self._lock:
+            key = (scope.kind, scope.name)
+            stats = self._scopes.get(key)
+            if stats is None:
+                stats = self._scopes[key] = {
+                    'count': 0, 'errors': 0, 'queries': 0, 'db_time_ms': 0.0, 'wall_time_ms': 0.0,
+                    'max_queries': 0, 'n_plus_one': 0, 'n_plus_one_fingerprint': None,
+                }
+            stats['count'] += 1
+            stats['errors'] += 1 if error is not None else 0
+            stats['queries'] += scope.query_count
+            stats['db_time_ms'] += scope.db_time_ms
+            stats['wall_time_ms'] += wall_ms
+            stats['max_queries'] = max(stats['max_queries'], scope.query_count)
+            if scope.n_plus_one:
+                stats['n_plus_one'] += 1
+                worst = max(scope.n_plus_one, key=scope.n_plus_one.get)
+                stats['n_plus_one_fingerprint'] = self._fingerprints.get(worst, {}).get('fingerprint')
+
+        if manager is not None:
+            self.maybe_flush(manager)
+
+    # ------------------------------------------------------------------
+    # Reporting / flushing
+    # ------------------------------------------------------------------
+
+    def snapshot(self, limit: int = 20) -> Dict[str, Any]:
+        """Current window aggregates plus recent slow queries and N+1 warnings"""
+        with self._lock:
+            fingerprints = [dict(stats, fingerprint_hash=fp_hash) for fp_hash, stats in self._fingerprints.items()]
+            scopes = [
+                dict(stats, kind=kind, name=name) for (kind, name), stats in self._scopes.items()
+            ]
+            recent_count = len(self.recent)
+
+        fingerprints.sort(key=lambda s: s['total_ms'], reverse=True)
+        scopes.sort(key=lambda s: s['queries'] / max(s['count'], 1), reverse=True)
+        return {
+            'window_started_at': self.window_started_at.isoformat(),
+            'statements': sum(s['calls'] for s in fingerprints),
+            'db_time_ms': round(sum(s['total_ms'] for s in fingerprints), 1),
+            'recent_statements': recent_count,
+            'top_queries': [
+                {
+                    'fingerprint_hash': s['fingerprint_hash'],
+                    'fingerprint': s['fingerprint'][:500],
+                    'calls': s['calls'],
+                    'total_ms': round(s['total_ms'], 1),
+                    'avg_ms': round(s['total_ms'] / max(s['calls'], 1), 2),
+                    'max_ms': round(s['max_ms'], 1),
+                    'rows': s['rows'],
+                    'params_shape': s['params_shape'],
+                }
+                for s in fingerprints[:limit]
+            ],
+            'scopes': [
+                {
+                    'kind': s['kind'],
+                    'name': s['name'],
+                    'count': s['count'],
+                    'avg_queries': round(s['queries'] / max(s['count'], 1), 1),
+                    'max_queries': s['max_queries'],
+                    'avg_db_time_ms': round(s['db_time_ms'] / max(s['count'], 1), 1),
+                    'avg_wall_time_ms': round(s['wall_time_ms'] / max(s['count'], 1), 1),
+                    'n_plus_one': s['n_plus_one'],
+                }
+                for s in scopes[:limit]
+            ],
+            'slow_queries': list(self.slow_samples)[-limit:],
+            'n_plus_one_warnings': list(self.n_plus_one_events)[-limit:],
+        }
+
+    def maybe_flush(self, manager):
+        """Flush the window in the background once QUERY_STATS_FLUSH_SECONDS have passed"""
+        if self._flushing or time.time() - self._last_flush < QUERY_STATS_FLUSH_SECONDS:
+            return
+        with self._lock:
+            if self._flushing:
+                return
+            self._flushing = True
+        threading.Thread(target=self.flush, args=(manager,), name='query-stats-flush', daemon=True).start()
+
+    def flush(self, manager) -> bool:
+        """Write the current window's aggregates and start a new window"""
+        try:
+            with self._lock:
+                window_start, window_end = self.window_started_at, datetime.utcnow()
+                fingerprints, scopes = self._fingerprints, self._scopes
+                self._reset_window()
+            if not fingerprints and not scopes:
+                return True
+
+            fingerprint_rows = [
+                (window_start, window_end, fp_hash, stats['fingerprint'][:2000], stats['calls'],
+                 round(stats['total_ms'], 2), round(stats['max_ms'], 2), stats['rows'],
+                 stats['slow_calls'], stats['params_shape'])
+                for fp_hash, stats in fingerprints.items()
+            ]
+            scope_rows = [
+                (window_start, window_end, kind, name[:255], stats['count'], stats['errors'],
+                 stats['queries'], round(stats['db_time_ms'], 2), round(stats['wall_time_ms'], 2),
+                 stats['max_queries'], stats['n_plus_one'],
+                 stats['n_plus_one_fingerprint'][:2000] if stats['n_plus_one_fingerprint'] else None)
+                for (kind, name), stats in scopes.items()
+            ]
+
+            with manager.get_connection() as conn:
+                cursor = conn.cursor()
+                if fingerprint_rows:
+                    psycopg2.extras.execute_values(cursor, """
+                        INSERT INTO db_query_fingerprint_stats (
+                            window_start, window_end, fingerprint_hash, fingerprint, calls,
+                            total_ms, max_ms, total_rows, slow_calls, params_shape
+                        ) VALUES %s
+                    """, fingerprint_rows)
+                if scope_rows:
+                    psycopg2.extras.execute_values(cursor, """
+                        INSERT INTO db_endpoint_query_stats (
+                            window_start, window_end, scope_kind, scope_name, request_count, error_count,
+                            query_count, db_time_ms, wall_time_ms, max_queries, n_plus_one_count,
+                            n_plus_one_fingerprint
+                        ) VALUES %s
+                    """, scope_rows)
+                conn.commit()
+                cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f"Could not flush query statistics: {e}")
+            return False
+        finally:
+            self._flushing = False
+
+
+query_monitor = shared_instance(__name__, 'query_monitor', QueryMonitor)
+
+
+class _InstrumentedCursorMixin:
+    """Times execute()/executemany() and reports them to the query monitor"""
+
+    def _statement_text(self, query):
+        if isinstance(query, (str, bytes)):
+            return query
+        try:
+            return query.as_string(self)  # psycopg2.sql.Composable
+        except Exception:
+            return str(query)
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            query_monitor.record(self._statement_text(query), vars,
+                                 (time.perf_counter() - start) * 1000, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            query_monitor.record(self._statement_text(query), vars_list[0] if vars_list else None,
+                                 (time.perf_counter() - start) * 1000, self.rowcount,
+                                 executions=max(len(vars_list), 1))
+
+
+_instrumented_cursor_classes: Dict[type, type] = {}
+
+
+def _instrumented_cursor_class(cursor_factory: type) -> type:
+    cls = _instrumented_cursor_classes.get(cursor_factory)
+    if cls is None:
+        cls = type(f"Instrumented{cursor_factory.__name__}", (_InstrumentedCursorMixin, cursor_factory), {})
+        _instrumented_cursor_classes[cursor_factory] = cls
+    return cls
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """
+    psycopg2 connection used for DatabaseManager's PostgreSQL connections.
+
+    Cursors (any cursor_factory) report to query_monitor, and the connection
+    keeps the server-side prepared statements used by the batch APIs.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: Dict[str, Optional[tuple]] = {}  # template -> (name, param count)
+        self._prepared_count = 0
+        self._prepared_stale = False
+
+    def cursor(self, *args, **kwargs):
+        if not QUERY_INSTRUMENTATION_ENABLED:
+            return super().cursor(*args, **kwargs)
+        factory = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        if not issubclass(factory, _InstrumentedCursorMixin):
+            kwargs['cursor_factory'] = _instrumented_cursor_class(factory)
+        return super().cursor(*args, **kwargs)
+
+    def rollback(self):
+        super().rollback()
+        self.forget_prepared_statements()
+
+    def forget_prepared_statements(self):
+        """Stop trusting the cache (a rollback may have undone a PREPARE); DEALLOCATE ALL on next use"""
+        if self.prepared_statements:
+            self.prepared_statements = {}
+            self._prepared_stale = True
+
+    def prepare(self, cursor, query: str) -> Optional[tuple]:
+        """(name, param count) of a prepared statement for query, preparing it on first use"""
+        if query in self.prepared_statements:
+            return self.prepared_statements[query]
+
+        converted = _positional_placeholders(query)
+        if converted is None:
+            return None
+        if self._prepared_stale or len(self.prepared_statements) >= PREPARED_STATEMENT_CACHE_SIZE:
+            cursor.execute("DEALLOCATE ALL")
+            self.prepared_statements = {}
+            self._prepared_stale = False
+
+        body, param_count = converted
+        self._prepared_count += 1
+        name = f"dcfo_stmt_{self._prepared_count}"
+        try:
+            # Savepoint so a statement PostgreSQL cannot prepare (e.g. untyped
+            # parameters) leaves the caller's transaction usable
+            cursor.execute(f"SAVEPOINT dcfo_prepare; PREPARE {name} AS {body}; RELEASE SAVEPOINT dcfo_prepare")
+            statement = (name, param_count)
+        except psycopg2.Error as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT dcfo_prepare; RELEASE SAVEPOINT dcfo_prepare")
+            logger.debug(f"Statement not prepared, executing directly: {e}")
+            statement = None
+        self.prepared_statements[query] = statement
+        return statement
+
+
+def _positional_placeholders(query: str) -> Optional[tuple]:
+    """Rewrite %s placeholders as $1..$n for PREPARE; None for named (%(x)s) placeholders"""
+    if '%(' in query:
+        return None
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        if match.group(0) == '%%':
+            return '%'
+        count += 1
+        return f"${count}"
+
+    return re.sub(r'%%|%s', replace, query), count
+
+
+def _matching_paren(text: str, start: int) -> int:
+    """Index of the parenthesis closing the one at text[start], ignoring quoted text; -1 if unbalanced"""
+    depth = 0
+    in_quote = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if char == "'":
+            in_quote = not in_quote
+        elif in_quote:
+            continue
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+    return -1
+
+
+def _split_top_level(text: str) -> List[str]:
+    items, depth, in_quote, current = [], 0, False, []
+    for char in text:
+        if char == "'":
+            in_quote = not in_quote
+        elif not in_quote and char == '(':
+            depth += 1
+        elif not in_quote and char == ')':
+            depth -= 1
+        elif not in_quote and char == ',' and depth == 0:
+            items.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    items.append(''.join(current).strip())
+    return items
+
+
+_INSERT_HEAD = re.compile(r'\s*INSERT\s+INTO\s+[\w."]+\s*\(([^)]*)\)\s*VALUES\s*', re.I)
+_ON_CONFLICT_UPDATE = re.compile(r'\bON\s+CONFLICT\b(.*?)\bDO\s+UPDATE\s+SET\b(.*)$', re.I | re.S)
+# Words a DO UPDATE SET expression may use and still give the same row however often it runs
+_IDEMPOTENT_SET_WORDS = {'excluded', 'current_timestamp', 'current_date', 'localtimestamp', 'now',
+                         'null', 'true', 'false', 'coalesce', 'nullif'}
+
+_UPDATE_STATEMENT = re.compile(
+    r'\s*UPDATE\s+(?:ONLY\s+)?([\w."]+)(?:\s+(?:AS\s+)?(?!SET\b)\w+)?\s+SET\s+(.+?)\s+(WHERE)\s+(.+)$', re.I | re.S)
+_DELETE_STATEMENT = re.compile(
+    r'\s*DELETE\s+FROM\s+(?:ONLY\s+)?([\w."]+)(?:\s+(?:AS\s+)?(?!WHERE\b)\w+)?\s+(WHERE)\s+(.+)$', re.I | re.S)
+# 'column = ' (optionally alias-qualified) right before a placeholder
+_COLUMN_EQUALS = re.compile(r'(?<![\w".:])(?:[\w"]+\.)?([\w"]+)\s*=\s*$')
+BATCH_ROWS_ALIAS = '_batch_rows'
+COLUMN_TYPES_QUERY = """
+    SELECT attname, format_type(atttypid, atttypmod) AS type_name
+    FROM pg_attribute
+    WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped
+"""
+
+
+@lru_cache(maxsize=256)
+def _bulk_insert_template(query: str) -> Optional[tuple]:
+    """
+    Split 'INSERT INTO t (cols) VALUES (...) [ON CONFLICT ...]' into
+    (sql with 'VALUES %s', row template, conflict key param indexes) for
+    execute_values(). None when the statement cannot be sent as one multi-row INSERT.
+    """
+    head = _INSERT_HEAD.match(query)
+    if not head or query[head.end():head.end() + 1] != '(':
+        return None
+    start = head.end()
+    end = _matching_paren(query, start)
+    if end < 0:
+        return None
+    row_template, tail = query[start:end + 1], query[end + 1:]
+    if re.search(r'%s|%\(', tail) or re.search(r'\bRETURNING\b', tail, re.I):
+        return None
+
+    columns = [c.strip().strip('"').lower() for c in head.group(1).split(',')]
+    items = _split_top_level(row_template[1:-1])
+    if len(items) != len(columns):
+        return None
+
+    # Map each column to its parameter position when the value is a bare %s
+    param_index, column_params = 0, {}
+    for column, item in zip(columns, items):
+        if item == '%s':
+            column_params[column] = param_index
+        param_index += item.count('%s')
+
+    key_indexes, idempotent = None, False
+    conflict = _ON_CONFLICT_UPDATE.search(tail)
+    if conflict:
+        # One multi-row DO UPDATE cannot touch the same row twice, so rows
+        # sharing a conflict key have to be collapsed or sent apart
+        target = re.match(r'\s*\(([^)]*)\)\s*$', conflict.group(1))
+        if not target:
+            return None
+        keys = [c.strip().strip('"').lower() for c in target.group(1).split(',')]
+        if not all(key in column_params for key in keys):
+            return None
+        key_indexes = tuple(column_params[key] for key in keys)
+        idempotent = _upsert_is_idempotent(conflict.group(2))
+
+    return query[:start] + '%s' + tail, row_template, key_indexes, idempotent
+
+
+def _upsert_is_idempotent(set_clause: str) -> bool:
+    """
+    True when a DO UPDATE SET clause only assigns EXCLUDED values and
+    constants, so applying the last of several rows sharing a key leaves what
+    applying all of them in turn would. 'SET total = t.total + EXCLUDED.total'
+    or a DO UPDATE ... WHERE are not.
+    """
+    if re.search(r'\bWHERE\b', set_clause, re.I):
+        return False
+    for assignment in _split_top_level(set_clause):
+        _, equals, expression = assignment.partition('=')
+        if not equals:
+            return False
+        expression = re.sub(r"'[^']*'", '', expression)
+        expression = re.sub(r'::\s*[\w ]+(\(\s*\d+(\s*,\s*\d+)?\s*\))?', '', expression)
+        for word in re.findall(r'[A-Za-z_][\w.]*', expression):
+            if word.split('.')[0].lower() not in _IDEMPOTENT_SET_WORDS:
+                return False
+    return True
+
+
+@lru_cache(maxsize=256)
+def _bulk_update_template(query: str) -> Optional[tuple]:
+    """
+    Rewrite 'UPDATE t SET col = %s ... WHERE col = %s ...' as
+    'UPDATE t SET col = _batch_rows.p0 ... FROM (VALUES %s) AS _batch_rows (...) WHERE ...'
+    (and 'DELETE FROM t WHERE ...' as 'DELETE FROM t USING (VALUES %s) ...') for
+    execute_values(). Returns (sql, table, placeholder columns, indexes of the
+    WHERE parameters no two rows of one statement may share, None for DELETE);
+    None unless every placeholder is a bare 'column = %s' of the target table.
+
+    UPDATEs must also match their rows with AND-ed equalities on columns they
+    don't assign, so parameter rows with different WHERE values touch
+    different rows, as they would one statement at a time.
+    """
+    update = _UPDATE_STATEMENT.match(query)
+    statement = update or _DELETE_STATEMENT.match(query)
+    if not statement or '%(' in query:
+        return None
+    if re.search(r'\b(RETURNING|SELECT|FROM|USING|CURRENT\s+OF)\b', query[statement.end(1):], re.I):
+        return None
+    where_at = statement.start(3 if update else 2)
+    if update:
+        where = statement.group(4)
+        if re.search(r'\bOR\b|\bNOT\b(?!\s+NULL\b)', where, re.I):
+            return None
+        assigned = [a.partition('=')[0].strip().strip('"').lower() for a in _split_top_level(statement.group(2))]
+        if any(re.search(rf'\b{re.escape(column)}\b', where, re.I) for column in assigned):
+            return None
+
+    columns, where_params = [], []
+    for match in re.finditer(r'%%|%s', query):
+        if match.group(0) == '%%':
+            continue
+        column = _COLUMN_EQUALS.search(query, 0, match.start())
+        if not column:
+            return None
+        if match.start() > where_at:
+            where_params.append(len(columns))
+        columns.append(column.group(1).strip('"').lower())
+    if not where_params:
+        return None
+
+    names = iter(f'{BATCH_ROWS_ALIAS}.p{i}' for i in range(len(columns)))
+
+    def rename(text):
+        return re.sub(r'%%|%s', lambda m: m.group(0) if m.group(0) == '%%' else next(names), text)
+
+    join = 'FROM' if update else 'USING'
+    values = f"{join} (VALUES %s) AS {BATCH_ROWS_ALIAS} ({', '.join(f'p{i}' for i in range(len(columns)))}) "
+    sql = rename(query[:where_at]) + values + rename(query[where_at:])
+    return sql, statement.group(1), tuple(columns), tuple(where_params) if update else None
+
+
+def _conflict_free_rounds(rows: list, key_indexes: tuple) -> Optional[List[list]]:
+    """
+    Split rows so that no round repeats a key: round n holds the n-th row of
+    each key, so rows sharing a key still apply in their original order.
+    None when key values are unhashable.
+    """
+    rounds: List[list] = []
+    seen: Dict[tuple, int] = {}
+    try:
+        for row in rows:
+            key = tuple(row[i] for i in key_indexes)
+            n = seen.get(key, 0)
+            seen[key] = n + 1
+            if n == len(rounds):
+                rounds.append([])
+            rounds[n].append(row)
+    except TypeError:
+        return None
+    return rounds
+
+
+def _group_operations(operations: List[Dict], preserve_order: bool = True) -> List[tuple]:
+    """
+    [(query, [params, ...]), ...] from batch operations. With preserve_order,
+    only consecutive operations sharing a template are grouped; otherwise all
+    operations sharing a template are grouped (first-appearance order).
+    """
+    groups: List[tuple] = []
+    by_query: Dict[str, list] = {}
+    for operation in operations:
+        query, params = operation['query'], operation.get('params', ())
+        if preserve_order:
+            if groups and groups[-1][0] == query:
+                groups[-1][1].append(params)
+            else:
+                groups.append((query, [params]))
+        else:
+            if query not in by_query:
+                by_query[query] = []
+                groups.append((query, by_query[query]))
+            by_query[query].append(params)
+    return groups
+
+
+def _forget_prepared_statements(connection):
+    raw = connection.raw_connection if isinstance(connection, ScopedConnection) else connection
+    if isinstance(raw, InstrumentedConnection):
+        raw.forget_prepared_statements()
+
+
+class ScopedConnection:
+    """
+    Connection handed out inside a UnitOfWork.
+
+    Behaves like the underlying connection, except that close() is a no-op
+    (the unit of work returns it to the pool). Outside uow.savepoint() blocks
+    commit()/rollback() act on the connection itself; inside one, commit()
+    keeps the work so far (the outermost block commits it) and rollback()
+    only undoes work since then.
+    """
+
+    def __init__(self, unit_of_work: 'UnitOfWork', connection):
+        self._unit_of_work = unit_of_work
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    @property
+    def raw_connection(self):
+        return self._connection
+
+    def commit(self):
+        if self._unit_of_work.savepoint_depth:
+            self._unit_of_work.checkpoint()
+        else:
+            self._connection.commit()
+
+    def rollback(self):
+        if self._unit_of_work.savepoint_depth:
+            self._unit_of_work.rollback_to_savepoint()
+        else:
+            self._connection.rollback()
+
+    def close(self):
+        pass
+
+
+class UnitOfWork:
+    """
+    One pooled connection shared by everything in a request or background job.
+
+    The connection is checked out lazily on first use and returned to the pool
+    when the unit of work ends. Nested atomic blocks use savepoint().
+    """
+
+    def __init__(self, manager: 'DatabaseManager', name: str = 'job'):
+        self.manager = manager
+        self.name = name
+        self.thread_id = threading.get_ident()
+        self.started_at = time.time()
+        self.connection_requests = 0
+        self._connection = None
+        self._scoped = None
+        self._savepoints: List[str] = []
+
+    @property
+    def savepoint_depth(self) -> int:
+        return len(self._savepoints)
+
+    @property
+    def has_connection(self) -> bool:
+        return self._connection is not None
+
+    def connection(self) -> ScopedConnection:
+        """The unit of work's connection, checked out on first use"""
+        if self._connection is None:
+            self._connection = self.manager._checkout(f"unit_of_work:{self.name}")
+            self._scoped = ScopedConnection(self, self._connection)
+        self.connection_requests += 1
+        return self._scoped
+
+    def _execute(self, statement: str):
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def savepoint(self):
+        """
+        Atomic block; nested blocks roll back independently.
+        The outermost block commits when it completes.
+        """
+        conn = self.connection()
+        name = f"uow_sp_{len(self._savepoints) + 1}"
+        self._execute(f"SAVEPOINT {name}")
+        self._savepoints.append(name)
+        try:
+            yield conn
+        except Exception as e:
+            self._savepoints.pop()
+            _forget_prepared_statements(self._connection)
+            try:
+                self._execute(f"ROLLBACK TO SAVEPOINT {name}")
+                self._execute(f"RELEASE SAVEPOINT {name}")
+            except Exception as rollback_error:
+                logger.error(f"Error rolling back savepoint {name}: {rollback_error}")
+            logger.warning(f"Savepoint {name} rolled back due to error: {e}")
+            raise
+        else:
+            self._savepoints.pop()
+            self._execute(f"RELEASE SAVEPOINT {name}")
+            if not self._savepoints:
+                self._connection.commit()
+
+    def checkpoint(self):
+        """Keep the innermost savepoint's work so far; a later rollback() stops here"""
+        if self._savepoints:
+            name = self._savepoints[-1]
+            if self.manager.db_type == 'postgresql':
+                # One round trip
+                self._execute(f"RELEASE SAVEPOINT {name}; SAVEPOINT {name}")
+            else:
+                self._execute(f"RELEASE SAVEPOINT {name}")
+                self._execute(f"SAVEPOINT {name}")
+
+    def rollback_to_savepoint(self):
+        """Undo the work of the innermost savepoint since it opened (or last checkpoint), keeping it open"""
+        if self._savepoints:
+            _forget_prepared_statements(self._connection)
+            self._execute(f"ROLLBACK TO SAVEPOINT {self._savepoints[-1]}")
+
+    def close(self, error: Optional[BaseException] = None):
+        """Roll back anything left uncommitted and return the connection to the pool"""
+        if self._connection is None:
+            return
+        connection, self._connection, self._scoped = self._connection, None, None
+        self._savepoints = []
+        try:
+            if self.manager.db_type == 'postgresql':
+                status = connection.get_transaction_status()
+                if status == psycopg2.extensions.TRANSACTION_STATUS_INERROR and error is None:
+                    logger.warning(f"Unit of work '{self.name}' ended with a failed transaction; rolling back")
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            elif error is not None:
+                connection.rollback()
+        except Exception as e:
+            logger.error(f"Error cleaning up unit of work '{self.name}': {e}")
+        finally:
+            self.manager._release(connection)
+
+
+def init_db_request_scope(app, db=None):
+    """
+    Give every Flask request its own UnitOfWork so all queries in the request
+    share one pooled connection (checked out only if the request uses the DB).
+    """
+    from flask import g, request
+
+    manager = db or db_manager
+
+    @app.before_request
+    def begin_db_request_scope():
+        # Route pattern rather than path so /api/x/<id> requests aggregate together
+        rule = request.url_rule.rule if request.url_rule else request.path
+        g._db_scope_token = manager.begin_request_scope(f"{request.method} {rule}")
+
+    @app.teardown_request
+    def end_db_request_scope(error=None):
+        token = g.pop('_db_scope_token', None)
+        if token is not None:
+            manager.end_request_scope(token, error)
+
+
 class DatabaseManager:
     def __init__(self):
         self.db_type = os.getenv('DB_TYPE', 'postgresql')  # Default to PostgreSQL after migration
         self.connection_config = self._get_connection_config()
         self.connection_pool = None
         self._pooled_connections = set()  # Track connection IDs from pool
+        self._checked_out: Dict[int, Dict[str, Any]] = {}  # id(conn) -> checkout info
+        self._checkout_lock = threading.Lock()
+        self._checkout_waits_ms = deque(maxlen=CHECKOUT_SAMPLE_SIZE)
+        self._checkout_stats = {'checkouts': 0, 'total_wait_ms': 0.0, 'max_wait_ms': 0.0, 'leaks_reclaimed': 0}
+        self._leaks_by_caller: Dict[str, int] = {}
+        self._checkouts_since_sweep = 0
+        self.query_monitor = query_monitor
+        self._column_type_cache: Dict[str, Dict[str, str]] = {}  # table -> column types, for batched UPDATE/DELETE
         self._init_connection_pool()
 
     def _get_connection_config(self) -> dict:
@@ -76,6 +962,7 @@ class DatabaseManager:
 
                 # Remove None values
                 config = {k: v for k, v in config.items() if v is not None}
+                config['connection_factory'] = InstrumentedConnection
 
                 # Create connection pool
                 self.connection_pool = psycopg2.pool.ThreadedConnectionPool(
@@ -92,15 +979,95 @@ class DatabaseManager:
             # SQLite doesn't need connection pooling
             self.connection_pool = None
 
+    @contextmanager
+    def unit_of_work(self, name: str = 'job') -> Generator[UnitOfWork, None, None]:
+        """
+        Share one pooled connection with everything run inside the block.
+
+        get_connection(), execute_query() and friends reuse the unit of work's
+        connection instead of checking out their own. Nested unit_of_work()
+        blocks join the outer one.
+
+        Usage:
+            with db_manager.unit_of_work('nightly_sync') as uow:
+                ...
+                with uow.savepoint():
+                    ...  # atomic, rolled back on error
+        """
+        active = self._active_unit_of_work()
+        if active is not None:
+            yield active
+            return
+
+        unit = UnitOfWork(self, name)
+        token = _current_unit_of_work.set(unit)
+        scope_token = self.query_monitor.begin_scope(name, kind='job')
+        error = None
+        try:
+            yield unit
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_unit_of_work.reset(token)
+            unit.close(error)
+            self.query_monitor.end_scope(scope_token, error, manager=self)
+
+    def begin_request_scope(self, name: str = 'request'):
+        """Start a unit of work for the current request; returns a token for end_request_scope"""
+        return (
+            _current_unit_of_work.set(UnitOfWork(self, name)),
+            self.query_monitor.begin_scope(name, kind='request'),
+        )
+
+    def end_request_scope(self, token, error: Optional[BaseException] = None):
+        """End the unit of work started by begin_request_scope"""
+        unit_token, scope_token = token
+        unit = _current_unit_of_work.get()
+        try:
+            _current_unit_of_work.reset(unit_token)
+        except ValueError:
+            # Token created in another context
+            _current_unit_of_work.set(None)
+        if unit is not None:
+            unit.close(error)
+        self.query_monitor.end_scope(scope_token, error, manager=self)
+
+    def current_unit_of_work(self) -> Optional[UnitOfWork]:
+        """The unit of work active in this request/job, if any"""
+        return self._active_unit_of_work()
+
+    def _active_unit_of_work(self) -> Optional[UnitOfWork]:
+        unit = _current_unit_of_work.get()
+        # Never share a connection across threads (asyncio.to_thread copies the context)
+        if unit is not None and unit.manager is self and unit.thread_id == threading.get_ident():
+            return unit
+        return None
+
     @contextmanager
     def get_connection(self) -> Generator[Any, None, None]:
         """Get database connection with proper error handling"""
+        unit = self._active_unit_of_work()
+        if unit is not None:
+            # Reuse the request/job connection; the unit of work returns it to the pool.
+            # commit()/rollback() act on the shared transaction; work that must roll
+            # back on its own belongs in uow.savepoint()
+            connection = unit.connection()
+            try:
+                yield connection
+            except Exception:
+                # Rolls back to the innermost savepoint if one is open
+                try:
+                    connection.rollback()
+                    logger.warning("Rolled back transaction due to exception")
+                except Exception:
+                    pass
+                raise
+            return
+
         connection = None
         try:
-            if self.db_type == 'postgresql':
-                connection = self._get_postgresql_connection()
-            else:
-                connection = self._get_sqlite_connection()
+            connection = self._checkout()
 
             yield connection
 
@@ -117,28 +1084,137 @@ class DatabaseManager:
         finally:
             # Return connection to pool
             if connection:
-                try:
-                    if self.db_type == 'postgresql':
-                        conn_id = id(connection)
-                        if conn_id in self._pooled_connections and self.connection_pool:
-                            self._pooled_connections.discard(conn_id)
-                            self.connection_pool.putconn(connection)
-                        else:
-                            connection.close()
-                    else:
-                        connection.close()
-                except Exception as cleanup_error:
-                    logger.error(f"Error returning connection to pool: {cleanup_error}")
+                self._release(connection)
+
+    def _checkout(self, purpose: Optional[str] = None):
+        """Check out a connection, recording how long the checkout took"""
+        start = time.perf_counter()
+        if self.db_type == 'postgresql':
+            connection = self._get_postgresql_connection()
+        else:
+            connection = self._get_sqlite_connection()
+        wait_ms = (time.perf_counter() - start) * 1000
+
+        with self._checkout_lock:
+            self._checkout_waits_ms.append(wait_ms)
+            self._checkout_stats['checkouts'] += 1
+            self._checkout_stats['total_wait_ms'] += wait_ms
+            self._checkout_stats['max_wait_ms'] = max(self._checkout_stats['max_wait_ms'], wait_ms)
+            info = self._checked_out.get(id(connection))
+            if info is not None:
+                info['purpose'] = purpose
+        return connection
+
+    def _release(self, connection):
+        """Return a connection to the pool (or close it if it was not pooled)"""
+        try:
+            if self.db_type == 'postgresql':
+                conn_id = id(connection)
+                with self._checkout_lock:
+                    self._checked_out.pop(conn_id, None)
+                if conn_id in self._pooled_connections and self.connection_pool:
+                    self._pooled_connections.discard(conn_id)
+                    self.connection_pool.putconn(connection)
+                else:
+                    connection.close()
+            else:
+                connection.close()
+        except Exception as cleanup_error:
+            logger.error(f"Error returning connection to pool: {cleanup_error}")
+
+    def release_connection(self, connection):
+        """
+        Return a connection obtained from _get_postgresql_connection() to the pool.
+        Prefer get_connection(); calling conn.close() on a pooled connection leaks its slot.
+        """
+        if isinstance(connection, ScopedConnection):
+            return
+        self._release(connection)
+
+    def reclaim_leaked_connections(self) -> int:
+        """
+        Free pool slots held by pooled connections that were closed instead of
+        returned, and warn about connections held longer than
+        LEAK_WARNING_SECONDS. Returns the number of slots reclaimed.
+        """
+        now = time.time()
+        with self._checkout_lock:
+            entries = list(self._checked_out.items())
+
+        reclaimed = 0
+        for conn_id, info in entries:
+            connection = info['connection']
+            if connection.closed:
+                with self._checkout_lock:
+                    self._checked_out.pop(conn_id, None)
+                    self._checkout_stats['leaks_reclaimed'] += 1
+                    self._leaks_by_caller[info['caller']] = self._leaks_by_caller.get(info['caller'], 0) + 1
+                if conn_id in self._pooled_connections and self.connection_pool:
+                    self._pooled_connections.discard(conn_id)
+                    try:
+                        self.connection_pool.putconn(connection, close=True)
+                    except Exception as e:
+                        logger.debug(f"Could not reclaim pool slot: {e}")
+                reclaimed += 1
+            elif now - info['since'] > LEAK_WARNING_SECONDS and not info.get('warned'):
+                info['warned'] = True
+                logger.warning(
+                    f"Connection held for {now - info['since']:.0f}s by {info['caller']} "
+                    f"({info.get('purpose') or 'direct'}) - possible leak"
+                )
+
+        if reclaimed:
+            logger.warning(f"Reclaimed {reclaimed} pooled connections closed without being returned to the pool")
+        return reclaimed
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Pool usage, checkout wait times and leak detection summary"""
+        self.reclaim_leaked_connections()
+        now = time.time()
+        with self._checkout_lock:
+            waits = sorted(self._checkout_waits_ms)
+            stats = dict(self._checkout_stats)
+            held = [
+                {'caller': info['caller'], 'purpose': info.get('purpose'), 'held_seconds': round(now - info['since'], 1)}
+                for info in self._checked_out.values()
+            ]
+            leaks_by_caller = dict(self._leaks_by_caller)
+
+        pool_status = None
+        if self.db_type == 'postgresql' and self.connection_pool:
+            pool_status = {
+                'total_connections': len(self.connection_pool._pool) + len(self.connection_pool._used),
+                'used_connections': len(self.connection_pool._used),
+                'available_connections': len(self.connection_pool._pool),
+            }
+
+        return {
+            'pool': pool_status,
+            'checkouts': stats['checkouts'],
+            'checkout_wait_ms': {
+                'avg': round(stats['total_wait_ms'] / stats['checkouts'], 2) if stats['checkouts'] else 0.0,
+                'p95': round(waits[max(int(len(waits) * 0.95) - 1, 0)], 2) if waits else 0.0,
+                'max': round(stats['max_wait_ms'], 2),
+            },
+            'checked_out': len(held),
+            'long_held': sorted(
+                [h for h in held if h['held_seconds'] > LEAK_WARNING_SECONDS],
+                key=lambda h: h['held_seconds'], reverse=True
+            ),
+            'leaks_reclaimed': stats['leaks_reclaimed'],
+            'leaks_by_caller': leaks_by_caller,
+        }
 
     def _get_postgresql_connection(self):
         """Create PostgreSQL connection using pool if available"""
         if self.connection_pool:
             try:
-                conn = self.connection_pool.getconn()
+                conn = self._getconn_from_pool()
                 if conn:
                     conn.autocommit = False  # Use transactions
                     # Track this connection as from pool
                     self._pooled_connections.add(id(conn))
+                    self._track_checkout(conn)
                     return conn
             except Exception as e:
                 logger.warning(f"Failed to get connection from pool, creating new one: {e}")
@@ -148,12 +1224,37 @@ class DatabaseManager:
 
         # Remove None values
         config = {k: v for k, v in config.items() if v is not None}
+        config['connection_factory'] = InstrumentedConnection
 
         conn = psycopg2.connect(**config)
         conn.autocommit = False  # Use transactions
         # Direct connections are NOT tracked in _pooled_connections
+        self._track_checkout(conn)
         return conn
 
+    def _getconn_from_pool(self):
+        try:
+            return self.connection_pool.getconn()
+        except psycopg2.pool.PoolError:
+            # Exhausted - slots may be held by connections closed without putconn()
+            if self.reclaim_leaked_connections():
+                return self.connection_pool.getconn()
+            raise
+
+    def _track_checkout(self, conn):
+        with self._checkout_lock:
+            self._checked_out[id(conn)] = {
+                'connection': conn,
+                'since': time.time(),
+                'caller': _caller_location(),
+            }
+            self._checkouts_since_sweep += 1
+            sweep = self._checkouts_since_sweep >= LEAK_SWEEP_INTERVAL
+            if sweep:
+                self._checkouts_since_sweep = 0
+        if sweep:
+            self.reclaim_leaked_connections()
+
     def _get_sqlite_connection(self):
         """Create SQLite connection with optimizations"""
         config = self.connection_config
@@ -199,18 +1300,22 @@ class DatabaseManager:
             finally:
                 cursor.close()
 
-    def execute_many(self, query: str, params_list: list):
-        """Execute a query multiple times with different parameters"""
+    def execute_many(self, query: str, params_list: list, collapse_upserts: Optional[bool] = None):
+        """
+        Execute a query multiple times with different parameters
+        (collapse_upserts: see _execute_grouped)
+        """
         with self.get_connection() as conn:
-            if self.db_type == 'postgresql':
-                cursor = conn.cursor()
-            else:
-                cursor = conn.cursor()
+            cursor = conn.cursor()
 
             try:
-                cursor.executemany(query, params_list)
+                if self.db_type == 'postgresql':
+                    rowcount = self._execute_grouped(conn, cursor, query, list(params_list), collapse_upserts)
+                else:
+                    cursor.executemany(query, params_list)
+                    rowcount = cursor.rowcount
                 conn.commit()
-                return cursor.rowcount
+                return rowcount
 
             except Exception as e:
                 conn.rollback()
@@ -250,6 +1355,7 @@ class DatabaseManager:
                 # Rollback on any error
                 try:
                     if self.db_type == 'postgresql' and savepoint_name:
+                        _forget_prepared_statements(conn)
                         cursor = conn.cursor()
                         cursor.execute(f"ROLLBACK TO SAVEPOINT {savepoint_name}")
                         cursor.close()
@@ -260,14 +1366,112 @@ class DatabaseManager:
                     logger.error(f"Error during rollback: {rollback_error}")
                 raise e
 
-    def execute_batch_operation(self, operations: List[Dict], batch_size: int = 100) -> Dict[str, Any]:
+    def _execute_grouped(self, conn, cursor, query: str, params_list: list,
+                         collapse_upserts: Optional[bool] = None) -> int:
+        """
+        Run one statement template for many parameter sets and return the rows affected.
+
+        INSERT ... VALUES templates go out as multi-row INSERTs and simple
+        UPDATE/DELETE templates as UPDATE ... FROM (VALUES ...) / DELETE ...
+        USING (VALUES ...) (execute_values, BULK_PAGE_SIZE rows per statement);
+        other repeated templates run as a cached server-side prepared statement.
+
+        collapse_upserts: for INSERT ... ON CONFLICT DO UPDATE, True keeps only
+        the last row of each conflict key, False sends rows sharing a key in
+        successive statements (needed for 'SET total = t.total + EXCLUDED.total').
+        None collapses only when the DO UPDATE SET assigns EXCLUDED values and constants.
+        """
+        if not params_list:
+            return 0
+        raw = conn.raw_connection if isinstance(conn, ScopedConnection) else conn
+        table = None
+        try:
+            bulk = _bulk_insert_template(query) if len(params_list) > 1 else None
+            rounds = None
+            if bulk:
+                sql, row_template, key_indexes, idempotent = bulk
+                rounds = [params_list]
+                if key_indexes:
+                    if idempotent if collapse_upserts is None else collapse_upserts:
+                        try:
+                            rounds = [list({tuple(row[i] for i in key_indexes): row for row in params_list}.values())]
+                        except TypeError:
+                            pass  # unhashable key values; let PostgreSQL reject true duplicates
+                    else:
+                        rounds = _conflict_free_rounds(params_list, key_indexes)
+
+            update = _bulk_update_template(query) if len(params_list) > 1 and not bulk else None
+            if update:
+                sql, table, columns, round_keys = update
+                types = self._column_types(cursor, table)
+                if all(column in types for column in columns):
+                    # VALUES columns would otherwise be typed from the literals (text for strings)
+                    row_template = '(' + ', '.join(f'%s::{types[column]}' for column in columns) + ')'
+                    # Rows with the same WHERE values go out in order, in separate statements
+                    rounds = _conflict_free_rounds(params_list, round_keys) if round_keys else [params_list]
+
+            if rounds:
+                affected = 0
+                for rows in rounds:
+                    for i in range(0, len(rows), BULK_PAGE_SIZE):
+                        page = rows[i:i + BULK_PAGE_SIZE]
+                        psycopg2.extras.execute_values(cursor, sql, page, template=row_template, page_size=len(page))
+                        affected += max(cursor.rowcount, 0)
+                return affected
+
+            statement = None
+            if isinstance(raw, InstrumentedConnection) and (len(params_list) > 1 or query in raw.prepared_statements):
+                statement = raw.prepare(cursor, query)
+
+            affected = 0
+            if statement:
+                name, param_count = statement
+                execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * param_count)})" if param_count else f"EXECUTE {name}"
+                for params in params_list:
+                    cursor.execute(execute_sql, params)
+                    affected += max(cursor.rowcount, 0)
+            else:
+                for params in params_list:
+                    cursor.execute(query, params)
+                    affected += max(cursor.rowcount, 0)
+            return affected
+        except Exception:
+            _forget_prepared_statements(raw)
+            if table:
+                self._column_type_cache.pop(table, None)
+            raise
+
+    def _column_types(self, cursor, table: str) -> Dict[str, str]:
+        """Column name -> SQL type of a table (empty if it doesn't exist), cached per manager"""
+        types = self._column_type_cache.get(table)
+        if types is None:
+            # to_regclass never fails, so an unknown table can't abort the caller's transaction
+            cursor.execute(COLUMN_TYPES_QUERY, (table,))
+            types = {}
+            for row in cursor.fetchall():
+                name, type_name = (row['attname'], row['type_name']) if isinstance(row, dict) else row
+                types[name.lower()] = type_name
+            self._column_type_cache[table] = types
+        return types
+
+    def execute_batch_operation(self, operations: List[Dict], batch_size: int = 100,
+                                preserve_order: bool = True,
+                                collapse_upserts: Optional[bool] = None) -> Dict[str, Any]:
         """
         Execute multiple database operations in batches with transaction safety
         Useful for processing large volumes of matching operations
 
+        On PostgreSQL, operations sharing a statement template are sent together
+        (see _execute_grouped), so a batch costs a few round-trips instead of one
+        per operation, for INSERTs as well as simple UPDATEs and DELETEs.
+
         Args:
             operations: List of dicts with 'query', 'params', and optional 'operation_type'
             batch_size: Number of operations per batch
+            preserve_order: Only group consecutive operations with the same template.
+                Pass False when operations in a batch are independent so that
+                interleaved templates are grouped too.
+            collapse_upserts: How upserts sharing a conflict key are sent (see _execute_grouped)
 
         Returns:
             Dict with success/failure statistics
@@ -290,12 +1494,17 @@ class DatabaseManager:
                     cursor = conn.cursor()
                     batch_rows_affected = 0
 
-                    for operation in batch:
-                        query = operation['query']
-                        params = operation.get('params', ())
+                    if self.db_type == 'postgresql':
+                        for query, params_list in _group_operations(batch, preserve_order):
+                            batch_rows_affected += self._execute_grouped(
+                                conn, cursor, query, params_list, collapse_upserts)
+                    else:
+                        for operation in batch:
+                            query = operation['query']
+                            params = operation.get('params', ())
 
-                        cursor.execute(query, params)
-                        batch_rows_affected += cursor.rowcount
+                            cursor.execute(query, params)
+                            batch_rows_affected += cursor.rowcount
 
                     cursor.close()
                     results['successful_batches'] += 1
@@ -388,11 +1597,13 @@ class DatabaseManager:
 
                 # Check connection pool status for PostgreSQL
                 if self.db_type == 'postgresql' and self.connection_pool:
-                    health_status['connection_pool_status'] = {
-                        'total_connections': len(self.connection_pool._pool),
-                        'used_connections': len(self.connection_pool._used),
-                        'available_connections': len(self.connection_pool._pool) - len(self.connection_pool._used)
-                    }
+                    pool_stats = self.get_pool_stats()
+                    health_status['connection_pool_status'] = dict(
+                        pool_stats['pool'],
+                        checkout_wait_ms=pool_stats['checkout_wait_ms'],
+                        long_held=len(pool_stats['long_held']),
+                        leaks_reclaimed=pool_stats['leaks_reclaimed'],
+                    )
             else:
                 health_status['status'] = 'unhealthy'
                 health_status['error'] = 'Health check query returned unexpected result'
@@ -16,11 +16,47 @@ from reportlab.lib.colors import HexColor
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database import db_manager
 from pdf_reports import DeltaCFOReportTemplate
 
 logger = logging.getLogger(__name__)
 
+DMPL_TABLE_STYLE = TableStyle([
+    # Headers
+    ('BACKGROUND', (0, 0), (-1, 0), HexColor('#2d3748')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), HexColor('#ffffff')),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
+
+    # Section headers (beginning, mutations, total, ending)
+    ('BACKGROUND', (0, 2), (-1, 2), HexColor('#e6f7ff')),  # Beginning
+    ('BACKGROUND', (0, 4), (-1, 4), HexColor('#f0f9ff')),  # Mutations header
+    ('BACKGROUND', (0, 17), (-1, 17), HexColor('#fef3cd')),  # Total mutations
+    ('BACKGROUND', (0, 19), (-1, 19), HexColor('#d4edda')),  # Ending
+
+    # Bold for main items
+    ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),  # Beginning
+    ('FONTNAME', (0, 4), (-1, 4), 'Helvetica-Bold'),  # Mutations
+    ('FONTNAME', (0, 6), (-1, 6), 'Helvetica-Bold'),  # Net income
+    ('FONTNAME', (0, 10), (-1, 10), 'Helvetica-Bold'),  # Capital
+    ('FONTNAME', (0, 14), (-1, 14), 'Helvetica-Bold'),  # Distributions
+    ('FONTNAME', (0, 17), (-1, 17), 'Helvetica-Bold'),  # Total
+    ('FONTNAME', (0, 19), (-1, 19), 'Helvetica-Bold'),  # Ending
+
+    # Grid
+    ('GRID', (0, 0), (-1, -1), 1, HexColor('#e2e8f0')),
+    ('LINEBELOW', (0, 0), (-1, 0), 2, HexColor('#2d3748')),
+    ('LINEBELOW', (0, 17), (-1, 17), 2, HexColor('#f59e0b')),
+    ('LINEBELOW', (0, 19), (-1, 19), 2, HexColor('#10b981')),
+
+    # Padding
+    ('LEFTPADDING', (0, 0), (-1, -1), 12),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+])
+
 
 class DMPLReport(DeltaCFOReportTemplate):
     """
@@ -28,7 +64,7 @@ class DMPLReport(DeltaCFOReportTemplate):
     Following Brazilian accounting standards (CPC 26 / NBC TG 26)
     """
 
-    def __init__(self, company_name: str = "Delta Mining", start_date: date = None, end_date: date = None, entity_filter: str = None, tenant_id: str = 'delta'):
+    def __init__(self, company_name: str = "Delta Mining", start_date: date = None, end_date: date = None, entity_filter: str = None, tenant_id: str = 'delta', report_data: Dict[str, Any] = None):
         title = f"Demonstração das Mutações do Patrimônio Líquido (DMPL)"
         period = f"{start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}" if start_date and end_date else self._get_current_period()
         super().__init__(title, company_name, period)
@@ -37,60 +73,25 @@ class DMPLReport(DeltaCFOReportTemplate):
         self.end_date = end_date or date.today()
         self.entity_filter = entity_filter
         self.tenant_id = tenant_id
+        self.report_data = report_data
 
         # Initialize data
         self.dmpl_data = None
 
     def _fetch_equity_data(self) -> Dict[str, Any]:
         """
-        Fetch equity movements data from database - EXACTLY like DRE pattern
+        Fetch equity movements data from the shared report data provider (same aggregates as the DRE)
         Returns structured data for DMPL calculation
         """
         try:
-            # Use exact same pattern as DRE
-            params = [self.start_date.isoformat(), self.end_date.isoformat()]
-            tenant_params = [self.tenant_id]
-            entity_params = []
-
-            if self.entity_filter:
-                entity_filter_condition = "AND classified_entity = %s"
-                entity_params = [self.entity_filter]
-            else:
-                entity_filter_condition = ""
-
-            # Revenue query exactly like DRE
-            revenue_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN COALESCE(usd_equivalent, amount, 0) ELSE 0 END) as total_revenue,
-                    SUM(CASE WHEN amount < 0 THEN ABS(COALESCE(usd_equivalent, amount, 0)) ELSE 0 END) as total_expenses
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date BETWEEN %s AND %s
-                {entity_filter_condition}
-            """
-
-            all_params = tenant_params + params + entity_params
-            result = db_manager.execute_query(revenue_query, tuple(all_params), fetch_one=True)
-
-            total_revenue = float(result.get('total_revenue', 0) or 0) if result else 0
-            total_expenses = float(result.get('total_expenses', 0) or 0) if result else 0
+            data = self._load_report_data()
+
+            total_revenue = data['total_revenue']
+            total_expenses = data['total_expenses']
             net_income = total_revenue - total_expenses
 
-            # Calculate beginning equity (previous year end)
-            prev_year_end = date(self.start_date.year - 1, 12, 31)
-            beginning_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN COALESCE(usd_equivalent, amount, 0) ELSE 0 END) -
-                    SUM(CASE WHEN amount < 0 THEN ABS(COALESCE(usd_equivalent, amount, 0)) ELSE 0 END) as cumulative_equity
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date <= %s
-                {entity_filter_condition}
-            """
-
-            beginning_params = tenant_params + [prev_year_end.isoformat()] + entity_params
-            beginning_result = db_manager.execute_query(beginning_query, tuple(beginning_params), fetch_one=True)
-            beginning_equity = float(beginning_result.get('cumulative_equity', 0) or 0) if beginning_result else 0
+            # Beginning equity: accumulated result up to the previous year end
+            beginning_equity = data['opening_equity']
 
             # Calculate ending equity
             ending_equity = beginning_equity + net_income
@@ -176,43 +177,8 @@ class DMPLReport(DeltaCFOReportTemplate):
         # Create table
         table = Table(table_data, colWidths=[4*inch, 2*inch])
 
-        # Apply styling
-        table.setStyle(TableStyle([
-            # Headers
-            ('BACKGROUND', (0, 0), (-1, 0), HexColor('#2d3748')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), HexColor('#ffffff')),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
-
-            # Section headers (beginning, mutations, total, ending)
-            ('BACKGROUND', (0, 2), (-1, 2), HexColor('#e6f7ff')),  # Beginning
-            ('BACKGROUND', (0, 4), (-1, 4), HexColor('#f0f9ff')),  # Mutations header
-            ('BACKGROUND', (0, 17), (-1, 17), HexColor('#fef3cd')),  # Total mutations
-            ('BACKGROUND', (0, 19), (-1, 19), HexColor('#d4edda')),  # Ending
-
-            # Bold for main items
-            ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),  # Beginning
-            ('FONTNAME', (0, 4), (-1, 4), 'Helvetica-Bold'),  # Mutations
-            ('FONTNAME', (0, 6), (-1, 6), 'Helvetica-Bold'),  # Net income
-            ('FONTNAME', (0, 10), (-1, 10), 'Helvetica-Bold'),  # Capital
-            ('FONTNAME', (0, 14), (-1, 14), 'Helvetica-Bold'),  # Distributions
-            ('FONTNAME', (0, 17), (-1, 17), 'Helvetica-Bold'),  # Total
-            ('FONTNAME', (0, 19), (-1, 19), 'Helvetica-Bold'),  # Ending
-
-            # Grid
-            ('GRID', (0, 0), (-1, -1), 1, HexColor('#e2e8f0')),
-            ('LINEBELOW', (0, 0), (-1, 0), 2, HexColor('#2d3748')),
-            ('LINEBELOW', (0, 17), (-1, 17), 2, HexColor('#f59e0b')),
-            ('LINEBELOW', (0, 19), (-1, 19), 2, HexColor('#10b981')),
-
-            # Padding
-            ('LEFTPADDING', (0, 0), (-1, -1), 12),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        # Apply styling (static, built once at import)
+        table.setStyle(DMPL_TABLE_STYLE)
 
         return table
 
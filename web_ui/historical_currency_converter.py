@@ -6,10 +6,94 @@ Prevents currency fluctuation from affecting historical financial records
 
 import requests
 import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
 import os
 
+import psycopg2.extras
+
+# Distinct dates fetched from external APIs at once when resolving a batch
+FX_FETCH_MAX_WORKERS = int(os.getenv('FX_FETCH_MAX_WORKERS', '4'))
+
+# Resolved historical rates kept in memory per converter (they never change)
+FX_RATE_MEMO_MAX_ENTRIES = 20000
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y-%m-%d %H:%M:%S']
+
+
+def parse_rate_date(value) -> datetime:
+    """Parse an invoice/transaction date (str, date or datetime); raises ValueError"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if 'GMT' in value:
+        return datetime.strptime(value.split(' GMT')[0], '%a, %d %b %Y %H:%M:%S')
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"time data '{value}' does not match any known date format")
+
+
+def normalize_currency_code(currency: str) -> str:
+    """Normalize currency codes to standard format"""
+    currency_mapping = {
+        'GUA': 'PYG',  # Guarani paraguaio
+        'GUARANI': 'PYG',
+        'GUARANIS': 'PYG',
+    }
+    return currency_mapping.get(currency.upper(), currency.upper())
+
+
+def fx_key(currency: str, rate_date) -> Optional[Tuple[str, str]]:
+    """(normalized currency, 'YYYY-MM-DD') key used by resolve_rates, or None if the date is unparseable"""
+    try:
+        return normalize_currency_code(currency), parse_rate_date(rate_date).strftime('%Y-%m-%d')
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class StubRateProvider:
+    """
+    Offline rate provider for tests and local runs.
+
+    rates maps a currency to a fixed rate, or (currency, 'YYYY-MM-DD') to a
+    rate for that day. Every fetch is recorded in `calls`.
+    """
+
+    def __init__(self, rates: Dict, source: str = 'stub'):
+        self.rates = rates
+        self.source = source
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def fetch_rates(self, rate_date: datetime, currencies: Iterable[str], to_currency: str = 'USD') -> Dict[str, Dict]:
+        date_str = rate_date.strftime('%Y-%m-%d')
+        with self._lock:
+            self.calls.append((date_str, tuple(sorted(currencies))))
+
+        found = {}
+        for currency in currencies:
+            rate = self.rates.get((currency, date_str), self.rates.get(currency))
+            if rate is not None:
+                found[currency] = {'rate': float(rate), 'source': self.source}
+        return found
+
+CACHE_RATE_SQL = """
+INSERT INTO historical_exchange_rates
+(from_currency, to_currency, rate_date, exchange_rate, api_source)
+VALUES (%s, %s, %s, %s, %s)
+ON CONFLICT (from_currency, to_currency, rate_date)
+DO UPDATE SET
+    exchange_rate = EXCLUDED.exchange_rate,
+    api_source = EXCLUDED.api_source,
+    fetched_at = CURRENT_TIMESTAMP
+"""
+
 
 class HistoricalCurrencyConverter:
     """
@@ -17,8 +101,12 @@ class HistoricalCurrencyConverter:
     Uses multiple APIs for reliability and caches rates to prevent redundant API calls.
     """
 
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, rate_provider=None):
         self.db_manager = db_manager
+        # Anything with fetch_rates(rate_date, currencies, to_currency); defaults to the external APIs
+        self.rate_provider = rate_provider
+        self._rate_memo: Dict[Tuple[str, str, str], Dict] = {}
+        self._rate_memo_lock = threading.Lock()
         self.api_key = os.getenv('EXCHANGE_RATES_API_KEY')  # From exchangerate-api.com
         self.backup_apis = {
             'fixer': os.getenv('FIXER_API_KEY'),  # fixer.io backup
@@ -79,18 +167,7 @@ class HistoricalCurrencyConverter:
         # Parse invoice date
         if isinstance(invoice_date, str):
             try:
-                if 'GMT' in invoice_date:
-                    invoice_date = datetime.strptime(invoice_date.split(' GMT')[0], '%a, %d %b %Y %H:%M:%S')
-                else:
-                    # Try different date formats
-                    for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y']:
-                        try:
-                            invoice_date = datetime.strptime(invoice_date, fmt)
-                            break
-                        except ValueError:
-                            continue
-                    else:
-                        invoice_date = datetime.strptime(invoice_date, '%Y-%m-%d %H:%M:%S')
+                invoice_date = parse_rate_date(invoice_date)
             except ValueError as e:
                 return {
                     'original_amount': amount,
@@ -124,43 +201,35 @@ class HistoricalCurrencyConverter:
 
         rate_date = invoice_date.strftime('%Y-%m-%d')
 
-        # Try to get rate from cache first
-        cached_rate = self._get_cached_rate(from_currency, to_currency, rate_date)
-        if cached_rate:
-            converted_amount = amount * cached_rate['exchange_rate']
-            return {
-                'original_amount': amount,
-                'original_currency': from_currency,
-                'converted_amount': round(converted_amount, 2),
-                'converted_currency': to_currency,
-                'exchange_rate': cached_rate['exchange_rate'],
-                'rate_date': rate_date,
-                'conversion_successful': True,
-                'source': f"cached_{cached_rate['api_source']}",
-                'note': 'Rate retrieved from cache'
-            }
-
-        # Fetch historical rate from API
-        rate_data = self._fetch_historical_rate(from_currency, to_currency, invoice_date)
-        if rate_data and rate_data['success']:
-            converted_amount = amount * rate_data['rate']
-
-            # Cache the rate
-            self._cache_exchange_rate(
-                from_currency, to_currency, rate_date,
-                rate_data['rate'], rate_data['source']
-            )
+        rate_info = self.resolve_rates([(from_currency, rate_date)], to_currency).get((from_currency, rate_date))
+        return self._conversion_result(amount, from_currency, to_currency, rate_date, rate_info)
 
+    def _conversion_result(
+        self,
+        amount: float,
+        from_currency: str,
+        to_currency: str,
+        rate_date: str,
+        rate_info: Optional[Dict]
+    ) -> Dict:
+        """Build a convert_invoice_amount result from a resolve_rates entry"""
+        if rate_info:
+            converted_amount = amount * rate_info['rate']
+            cached = rate_info.get('cached', False)
+            if rate_info['source'] == 'same_currency':
+                cached, note = False, 'No conversion needed - same currency'
+            else:
+                note = 'Rate retrieved from cache' if cached else f'Rate fetched from {rate_info["source"]}'
             return {
                 'original_amount': amount,
                 'original_currency': from_currency,
                 'converted_amount': round(converted_amount, 2),
                 'converted_currency': to_currency,
-                'exchange_rate': rate_data['rate'],
+                'exchange_rate': rate_info['rate'],
                 'rate_date': rate_date,
                 'conversion_successful': True,
-                'source': rate_data['source'],
-                'note': f'Rate fetched from {rate_data["source"]}'
+                'source': f"cached_{rate_info['source']}" if cached else rate_info['source'],
+                'note': note
             }
 
         # Fallback: return original amount with error
@@ -178,12 +247,155 @@ class HistoricalCurrencyConverter:
 
     def _normalize_currency_code(self, currency: str) -> str:
         """Normalize currency codes to standard format"""
-        currency_mapping = {
-            'GUA': 'PYG',  # Guarani paraguaio
-            'GUARANI': 'PYG',
-            'GUARANIS': 'PYG',
-        }
-        return currency_mapping.get(currency.upper(), currency.upper())
+        return normalize_currency_code(currency)
+
+    def resolve_rates(self, pairs: Iterable[Tuple[str, object]], to_currency: str = 'USD') -> Dict[Tuple[str, str], Dict]:
+        """
+        Resolve historical rates for a whole batch of (currency, date) pairs.
+
+        Distinct pairs are looked up in historical_exchange_rates with one
+        query; pairs still missing are fetched per distinct date (up to
+        FX_FETCH_MAX_WORKERS dates at once) and written back in bulk.
+
+        Returns:
+            {fx_key(currency, date): {'rate': float, 'source': str, 'cached': bool}}
+            Pairs with unparseable dates or no available rate are left out.
+        """
+        to_currency = to_currency.upper()
+        wanted = set()
+        for currency, rate_date in pairs:
+            key = fx_key(currency, rate_date) if currency else None
+            if key:
+                wanted.add(key)
+
+        resolved = {}
+        for key in list(wanted):
+            if key[0] == to_currency:
+                resolved[key] = {'rate': 1.0, 'source': 'same_currency', 'cached': True}
+            else:
+                memo = self._rate_memo.get(key + (to_currency,))
+                if memo:
+                    resolved[key] = memo
+        missing = wanted - set(resolved)
+        if not missing:
+            return resolved
+
+        resolved.update(self._get_cached_rates(missing, to_currency))
+        missing -= set(resolved)
+
+        if missing:
+            fetched = self._fetch_missing_rates(missing, to_currency)
+            if fetched:
+                self._cache_exchange_rates(fetched, to_currency)
+                resolved.update(fetched)
+
+        with self._rate_memo_lock:
+            if len(self._rate_memo) > FX_RATE_MEMO_MAX_ENTRIES:
+                self._rate_memo.clear()
+            for key, info in resolved.items():
+                if info['source'] != 'same_currency':
+                    self._rate_memo[key + (to_currency,)] = {**info, 'cached': True}
+        return resolved
+
+    def _get_cached_rates(self, keys: set, to_currency: str) -> Dict[Tuple[str, str], Dict]:
+        """Look up many (currency, date) pairs in historical_exchange_rates with one query"""
+        currencies = sorted({currency for currency, _ in keys})
+        dates = sorted({rate_date for _, rate_date in keys})
+        query = """
+        SELECT from_currency, rate_date, exchange_rate, api_source
+        FROM historical_exchange_rates
+        WHERE to_currency = %s AND from_currency = ANY(%s) AND rate_date = ANY(%s::date[])
+        """
+
+        found = {}
+        try:
+            rows = self.db_manager.execute_query(query, (to_currency, currencies, dates), fetch_all=True) or []
+            for row in rows:
+                row_date = row['rate_date']
+                key = (row['from_currency'], row_date.strftime('%Y-%m-%d') if hasattr(row_date, 'strftime') else str(row_date))
+                if key in keys:
+                    found[key] = {'rate': float(row['exchange_rate']), 'source': row['api_source'], 'cached': True}
+        except Exception as e:
+            print(f"Error fetching cached rates: {e}")
+
+        return found
+
+    def _fetch_missing_rates(self, keys: set, to_currency: str) -> Dict[Tuple[str, str], Dict]:
+        """Fetch rates not in the cache table, one provider call per distinct date"""
+        by_date: Dict[str, set] = {}
+        for currency, rate_date in keys:
+            by_date.setdefault(rate_date, set()).add(currency)
+
+        fetch_rates = self.rate_provider.fetch_rates if self.rate_provider else self._fetch_rates_for_date
+
+        def fetch(item):
+            date_str, currencies = item
+            try:
+                return date_str, fetch_rates(datetime.strptime(date_str, '%Y-%m-%d'), currencies, to_currency) or {}
+            except Exception as e:
+                print(f"Error fetching rates for {date_str}: {e}")
+                return date_str, {}
+
+        items = sorted(by_date.items())
+        if len(items) == 1:
+            results = [fetch(items[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(FX_FETCH_MAX_WORKERS, len(items))) as executor:
+                results = list(executor.map(fetch, items))
+
+        fetched = {}
+        for date_str, rates in results:
+            for currency, info in rates.items():
+                if (currency, date_str) in keys and info.get('rate'):
+                    fetched[(currency, date_str)] = {'rate': float(info['rate']), 'source': info['source'], 'cached': False}
+        return fetched
+
+    def _fetch_rates_for_date(self, rate_date: datetime, currencies: Iterable[str], to_currency: str) -> Dict[str, Dict]:
+        """
+        Default rate provider: fetch every currency needed for one date.
+
+        Tries a single request for the whole date (rates quoted against
+        to_currency, inverted), then falls back to per-pair requests for
+        currencies the date table did not cover.
+        """
+        currencies = set(currencies)
+        found = {}
+
+        table = self._fetch_date_table(to_currency, rate_date)
+        if table:
+            for currency in currencies:
+                quoted = table['rates'].get(currency)
+                if quoted:
+                    found[currency] = {'rate': 1.0 / float(quoted), 'source': table['source']}
+
+        for currency in currencies - set(found):
+            rate_data = self._fetch_historical_rate(currency, to_currency, rate_date)
+            if rate_data and rate_data['success']:
+                found[currency] = {'rate': rate_data['rate'], 'source': rate_data['source']}
+
+        return found
+
+    def _fetch_date_table(self, base_currency: str, rate_date: datetime) -> Optional[Dict]:
+        """All rates quoted against base_currency on one date, from the first API that answers"""
+        date_str = rate_date.strftime('%Y-%m-%d')
+        try:
+            if self.api_key:
+                url = f"https://v6.exchangerate-api.com/v6/{self.api_key}/history/{base_currency}/{date_str}"
+                response = requests.get(url, timeout=10)
+                if response.status_code == 200:
+                    data = response.json()
+                    if data.get('result') == 'success' and data.get('conversion_rates'):
+                        return {'rates': data['conversion_rates'], 'source': 'exchangerate-api'}
+
+            response = requests.get(f"https://api.exchangerate.host/{date_str}", params={'base': base_currency}, timeout=10)
+            if response.status_code == 200:
+                data = response.json()
+                if data.get('success') and data.get('rates'):
+                    return {'rates': data['rates'], 'source': 'exchangerate.host'}
+        except Exception as e:
+            print(f"Error fetching rate table for {date_str}: {e}")
+
+        return None
 
     def _get_cached_rate(self, from_currency: str, to_currency: str, rate_date: str) -> Optional[Dict]:
         """Get exchange rate from cache"""
@@ -219,25 +431,31 @@ class HistoricalCurrencyConverter:
         source: str
     ):
         """Cache exchange rate in database"""
-        insert_sql = """
-        INSERT INTO historical_exchange_rates
-        (from_currency, to_currency, rate_date, exchange_rate, api_source)
-        VALUES (%s, %s, %s, %s, %s)
-        ON CONFLICT (from_currency, to_currency, rate_date)
-        DO UPDATE SET
-            exchange_rate = EXCLUDED.exchange_rate,
-            api_source = EXCLUDED.api_source,
-            fetched_at = CURRENT_TIMESTAMP
-        """
-
         try:
             self.db_manager.execute_query(
-                insert_sql,
+                CACHE_RATE_SQL,
                 (from_currency, to_currency, rate_date, exchange_rate, source)
             )
         except Exception as e:
             print(f"Error caching exchange rate: {e}")
 
+    def _cache_exchange_rates(self, rates: Dict[Tuple[str, str], Dict], to_currency: str):
+        """Write many fetched rates back to the cache table in one batch"""
+        operations = [
+            {
+                'query': CACHE_RATE_SQL,
+                'params': (currency, to_currency, rate_date, info['rate'], info['source'])
+            }
+            for (currency, rate_date), info in sorted(rates.items())
+        ]
+
+        try:
+            result = self.db_manager.execute_batch_operation(operations, batch_size=1000)
+            if result['failed_batches']:
+                print(f"Error caching exchange rates: {result['errors']}")
+        except Exception as e:
+            print(f"Error caching exchange rates: {e}")
+
     def _fetch_historical_rate(
         self,
         from_currency: str,
@@ -359,9 +577,12 @@ class HistoricalCurrencyConverter:
 
         return None
 
-    def bulk_convert_invoices(self, limit: int = 50) -> Dict:
+    def bulk_convert_invoices(self, limit: Optional[int] = None) -> Dict:
         """
         Convert all invoices that don't have USD equivalent amounts yet.
+
+        Rates for the whole batch are resolved at once (see resolve_rates) and
+        the invoices are updated with a single multi-row UPDATE.
         Returns summary of conversion results.
         """
 
@@ -375,10 +596,12 @@ class HistoricalCurrencyConverter:
         WHERE currency != 'USD'
         AND (usd_equivalent_amount IS NULL OR usd_equivalent_amount = 0)
         ORDER BY date DESC
-        LIMIT %s
         """
-
-        invoices_to_convert = self.db_manager.execute_query(query, (limit,), fetch_all=True)
+        if limit:
+            invoices_to_convert = self.db_manager.execute_query(query + " LIMIT %s", (limit,), fetch_all=True)
+        else:
+            invoices_to_convert = self.db_manager.execute_query(query, fetch_all=True)
+        invoices_to_convert = invoices_to_convert or []
 
         results = {
             'total_processed': 0,
@@ -387,23 +610,29 @@ class HistoricalCurrencyConverter:
             'conversion_details': []
         }
 
+        rates = self.resolve_rates((invoice['currency'], invoice['date']) for invoice in invoices_to_convert)
+
+        updates = []
         for invoice in invoices_to_convert:
             try:
-                conversion = self.convert_invoice_amount(
-                    float(invoice['total_amount']),
-                    invoice['currency'],
-                    invoice['date']
-                )
+                key = fx_key(invoice['currency'], invoice['date'])
+                if key is None:
+                    conversion = self.convert_invoice_amount(
+                        float(invoice['total_amount']), invoice['currency'], invoice['date']
+                    )
+                else:
+                    conversion = self._conversion_result(
+                        float(invoice['total_amount']), key[0], 'USD', key[1], rates.get(key)
+                    )
 
-                # Update invoice with USD equivalent
                 if conversion['conversion_successful']:
-                    self._update_invoice_usd_amount(
-                        invoice['id'],
+                    updates.append((
+                        str(invoice['id']),
                         conversion['converted_amount'],
                         conversion['exchange_rate'],
                         conversion['rate_date'],
                         conversion['source']
-                    )
+                    ))
                     results['successful_conversions'] += 1
                 else:
                     results['failed_conversions'] += 1
@@ -424,8 +653,68 @@ class HistoricalCurrencyConverter:
                 })
                 results['total_processed'] += 1
 
+        if updates:
+            self._update_invoice_usd_amounts(updates)
+
         return results
 
+    def bulk_convert_transactions(self, tenant_id: str, limit: Optional[int] = None) -> Dict:
+        """
+        Re-convert fiat transactions that were stored with an approximate rate.
+
+        Transactions keep their original-currency amount in crypto_amount; those
+        whose conversion_note records a fixed-table rate get amount and
+        usd_equivalent recomputed from the historical rate of their own date,
+        resolved for the whole batch at once and written with one UPDATE.
+        """
+        query = """
+        SELECT transaction_id, date, currency, crypto_amount
+        FROM transactions
+        WHERE tenant_id = %s
+        AND currency IS NOT NULL AND currency != 'USD'
+        AND crypto_amount IS NOT NULL
+        AND (conversion_note LIKE 'Converted from %% at rate %%'
+             OR conversion_note LIKE 'Converted from %% at approximate rate %%')
+        ORDER BY date DESC
+        """
+        params = (tenant_id,)
+        if limit:
+            query += " LIMIT %s"
+            params = (tenant_id, limit)
+        rows = self.db_manager.execute_query(query, params, fetch_all=True) or []
+
+        rates = self.resolve_rates((row['currency'], row['date']) for row in rows)
+
+        updates = []
+        for row in rows:
+            key = fx_key(row['currency'], row['date'])
+            rate_info = rates.get(key) if key else None
+            if not rate_info:
+                continue
+            usd_amount = round(float(row['crypto_amount']) * rate_info['rate'], 2)
+            note = f"Converted {float(row['crypto_amount'])} {key[0]} at historical rate {rate_info['rate']} ({rate_info['source']}, {key[1]})"
+            updates.append((row['transaction_id'], tenant_id, usd_amount, note))
+
+        if updates:
+            with self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                psycopg2.extras.execute_values(cursor, """
+                    UPDATE transactions AS t
+                    SET amount = v.usd_amount,
+                        usd_equivalent = v.usd_amount,
+                        conversion_note = v.note
+                    FROM (VALUES %s) AS v(transaction_id, tenant_id, usd_amount, note)
+                    WHERE t.tenant_id = v.tenant_id AND t.transaction_id = v.transaction_id
+                """, updates, page_size=1000)
+                conn.commit()
+                cursor.close()
+
+        return {
+            'total_processed': len(rows),
+            'successful_conversions': len(updates),
+            'failed_conversions': len(rows) - len(updates)
+        }
+
     def _ensure_usd_columns(self):
         """Add USD equivalent columns to invoices table"""
         alter_queries = [
@@ -467,6 +756,24 @@ class HistoricalCurrencyConverter:
             (usd_amount, exchange_rate, rate_date, source, invoice_id)
         )
 
+    def _update_invoice_usd_amounts(self, updates: List[Tuple[str, float, float, str, str]]):
+        """Write many (invoice_id, usd_amount, exchange_rate, rate_date, source) rows in one UPDATE"""
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            psycopg2.extras.execute_values(cursor, """
+                UPDATE invoices AS i
+                SET
+                    usd_equivalent_amount = v.usd_amount,
+                    historical_exchange_rate = v.exchange_rate,
+                    rate_date = v.rate_date::date,
+                    rate_source = v.source,
+                    conversion_notes = 'Converted using historical exchange rate'
+                FROM (VALUES %s) AS v(id, usd_amount, exchange_rate, rate_date, source)
+                WHERE i.id = v.id::text
+            """, updates, page_size=1000)
+            conn.commit()
+            cursor.close()
+
     def get_conversion_stats(self) -> Dict:
         """Get statistics about currency conversions"""
         stats_query = """
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Global Match Assignment
+Turns independently scored invoice/transaction pairs into one globally
+consistent set of proposals: each invoice and each transaction is used at most
+once, except for split payments found by subset-sum on small components
+"""
+
+import logging
+from dataclasses import dataclass, field, replace
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Components with at most this many invoices + transactions are searched for split payments
+GROUP_SEARCH_MAX_COMPONENT = 16
+# Largest number of transactions (or invoices) combined into one split payment
+GROUP_MAX_SIZE = 4
+# Members considered per split-payment search, best-scored first
+GROUP_MAX_CANDIDATES = 8
+# Relative difference allowed between a group's summed amount and its counterpart
+GROUP_AMOUNT_TOLERANCE = 0.01
+
+# match_type of pairs in a split payment; these always go to review
+GROUP_MATCH_TYPES = ('PARTIAL_PAYMENT', 'BATCH_PAYMENT')
+
+Pair = Tuple[Any, Any, float]  # (invoice_id, transaction_id, score)
+
+
+@dataclass
+class AssignmentGroup:
+    """Several transactions paying one invoice, or one transaction paying several invoices"""
+    invoice_ids: List[Any]
+    transaction_ids: List[Any]
+    score: float
+
+    @property
+    def kind(self) -> str:
+        return 'PARTIAL_PAYMENT' if len(self.transaction_ids) > 1 else 'BATCH_PAYMENT'
+
+
+@dataclass
+class AssignmentResult:
+    """Globally consistent proposals chosen from the candidate pairs"""
+    pairs: List[Pair] = field(default_factory=list)
+    groups: List[AssignmentGroup] = field(default_factory=list)
+    components: int = 0
+    candidates: int = 0
+
+    @property
+    def dropped(self) -> int:
+        """Candidate pairs left out because they conflicted with a better assignment"""
+        kept = len(self.pairs) + sum(len(g.invoice_ids) * len(g.transaction_ids) for g in self.groups)
+        return self.candidates - kept
+
+
+def _connected_components(pairs: Sequence[Pair]) -> List[List[Pair]]:
+    """Split the bipartite candidate graph into independent components (union-find)"""
+    parent: Dict[Tuple[str, Any], Tuple[str, Any]] = {}
+
+    def find(node):
+        root = node
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    for invoice_id, transaction_id, _ in pairs:
+        a, b = find(('i', invoice_id)), find(('t', transaction_id))
+        if a != b:
+            parent[a] = b
+
+    components: Dict[Tuple[str, Any], List[Pair]] = {}
+    for pair in pairs:
+        components.setdefault(find(('i', pair[0])), []).append(pair)
+    return list(components.values())
+
+
+def _assign_component(pairs: List[Pair]) -> List[Pair]:
+    """Maximum-weight one-to-one assignment within one component"""
+    if len(pairs) == 1:
+        return list(pairs)
+
+    invoice_ids = sorted({p[0] for p in pairs}, key=str)
+    transaction_ids = sorted({p[1] for p in pairs}, key=str)
+    row = {invoice_id: i for i, invoice_id in enumerate(invoice_ids)}
+    col = {transaction_id: j for j, transaction_id in enumerate(transaction_ids)}
+
+    # Missing edges weigh 0, so assigning them never beats a real candidate
+    scores = np.zeros((len(invoice_ids), len(transaction_ids)))
+    for invoice_id, transaction_id, score in pairs:
+        scores[row[invoice_id], col[transaction_id]] = score
+
+    if SCIPY_AVAILABLE:
+        rows, cols = linear_sum_assignment(scores, maximize=True)
+        chosen = zip(rows, cols)
+    else:
+        # Greedy by score: not always optimal, but still one-to-one
+        chosen, used_rows, used_cols = [], set(), set()
+        for invoice_id, transaction_id, _ in sorted(pairs, key=lambda p: -p[2]):
+            r, c = row[invoice_id], col[transaction_id]
+            if r not in used_rows and c not in used_cols:
+                chosen.append((r, c))
+                used_rows.add(r)
+                used_cols.add(c)
+
+    return [
+        (invoice_ids[r], transaction_ids[c], float(scores[r, c]))
+        for r, c in chosen if scores[r, c] > 0
+    ]
+
+
+def _amounts_match(total: float, target: float) -> bool:
+    return target > 0 and abs(total - target) <= GROUP_AMOUNT_TOLERANCE * target
+
+
+def _best_subset(target: float, members: List[Tuple[Any, float, float]]) -> Optional[Tuple[List[Any], float]]:
+    """
+    Subset of members (id, amount, score) of size 2..GROUP_MAX_SIZE whose amounts
+    sum to target; prefers the highest mean score, then fewer members.
+    """
+    members = sorted(members, key=lambda m: -m[2])[:GROUP_MAX_CANDIDATES]
+    best = None
+    for size in range(2, min(GROUP_MAX_SIZE, len(members)) + 1):
+        for combo in combinations(members, size):
+            if _amounts_match(sum(m[1] for m in combo), target):
+                mean_score = sum(m[2] for m in combo) / size
+                if best is None or mean_score > best[1] + 1e-12:
+                    best = ([m[0] for m in combo], mean_score)
+    return best
+
+
+def _find_split_payments(pairs: List[Pair], assigned: List[Pair],
+                         invoice_amounts: Dict[Any, float],
+                         transaction_amounts: Dict[Any, float]) -> Tuple[List[Pair], List[AssignmentGroup]]:
+    """
+    Replace unassigned or amount-mismatched one-to-one slots with split payments
+    whose amounts add up exactly (within GROUP_AMOUNT_TOLERANCE).
+    """
+    by_invoice = {p[0]: p for p in assigned}
+    by_transaction = {p[1]: p for p in assigned}
+    groups: List[AssignmentGroup] = []
+    grouped_invoices, grouped_transactions = set(), set()
+
+    def mismatched(pair: Optional[Pair]) -> bool:
+        if pair is None:
+            return True
+        invoice_amount = invoice_amounts.get(pair[0])
+        transaction_amount = transaction_amounts.get(pair[1])
+        if invoice_amount is None or transaction_amount is None:
+            return False
+        return not _amounts_match(transaction_amount, invoice_amount)
+
+    def release(pair: Optional[Pair]):
+        if pair is not None:
+            by_invoice.pop(pair[0], None)
+            by_transaction.pop(pair[1], None)
+
+    # Several transactions paying one invoice (e.g. installments)
+    for invoice_id in sorted({p[0] for p in pairs}, key=str):
+        target = invoice_amounts.get(invoice_id)
+        own = by_invoice.get(invoice_id)
+        if target is None or not mismatched(own):
+            continue
+        members = [
+            (transaction_id, transaction_amounts[transaction_id], score)
+            for inv, transaction_id, score in pairs
+            if inv == invoice_id and transaction_id in transaction_amounts
+            and transaction_id not in grouped_transactions
+            and (transaction_id not in by_transaction or (own and own[1] == transaction_id))
+        ]
+        found = _best_subset(target, members)
+        if found:
+            release(own)
+            groups.append(AssignmentGroup([invoice_id], found[0], found[1]))
+            grouped_invoices.add(invoice_id)
+            grouped_transactions.update(found[0])
+
+    # One transaction paying several invoices (batch payment)
+    for transaction_id in sorted({p[1] for p in pairs}, key=str):
+        target = transaction_amounts.get(transaction_id)
+        own = by_transaction.get(transaction_id)
+        if target is None or transaction_id in grouped_transactions or not mismatched(own):
+            continue
+        members = [
+            (invoice_id, invoice_amounts[invoice_id], score)
+            for invoice_id, txn, score in pairs
+            if txn == transaction_id and invoice_id in invoice_amounts
+            and invoice_id not in grouped_invoices
+            and (invoice_id not in by_invoice or (own and own[0] == invoice_id))
+        ]
+        found = _best_subset(target, members)
+        if found:
+            release(own)
+            groups.append(AssignmentGroup(found[0], [transaction_id], found[1]))
+            grouped_invoices.update(found[0])
+            grouped_transactions.add(transaction_id)
+
+    return list(by_invoice.values()), groups
+
+
+def solve_global_assignment(candidates: Iterable[Pair],
+                            invoice_amounts: Optional[Dict[Any, float]] = None,
+                            transaction_amounts: Optional[Dict[Any, float]] = None) -> AssignmentResult:
+    """
+    Choose a globally consistent set of matches from scored candidate pairs.
+
+    Each connected component of the (sparse) invoice/transaction candidate graph
+    is solved as a maximum-weight bipartite assignment. Small components are then
+    searched for split payments when amounts are given.
+
+    Args:
+        candidates: (invoice_id, transaction_id, score) pairs; duplicates keep the best score
+        invoice_amounts: invoice_id -> amount, enables split-payment search
+        transaction_amounts: transaction_id -> absolute amount
+
+    Returns:
+        AssignmentResult with one-to-one pairs and split-payment groups
+    """
+    best: Dict[Tuple[Any, Any], float] = {}
+    for invoice_id, transaction_id, score in candidates:
+        key = (invoice_id, transaction_id)
+        if score > best.get(key, 0.0):
+            best[key] = float(score)
+    pairs = [(invoice_id, transaction_id, score) for (invoice_id, transaction_id), score in best.items()]
+
+    result = AssignmentResult(candidates=len(pairs))
+    can_group = bool(invoice_amounts) and bool(transaction_amounts)
+
+    for component in _connected_components(pairs):
+        result.components += 1
+        assigned = _assign_component(component)
+
+        node_count = len({p[0] for p in component}) + len({p[1] for p in component})
+        if can_group and 2 < node_count <= GROUP_SEARCH_MAX_COMPONENT:
+            assigned, groups = _find_split_payments(component, assigned, invoice_amounts, transaction_amounts)
+            result.groups.extend(groups)
+        result.pairs.extend(assigned)
+
+    result.pairs.sort(key=lambda p: -p[2])
+    return result
+
+
+def _amount(value) -> Optional[float]:
+    try:
+        return abs(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def select_consistent_matches(matches: List[Any], invoices: List[Dict],
+                              transactions: List[Dict]) -> Tuple[List[Any], AssignmentResult]:
+    """
+    Filter matcher MatchResult objects down to the globally consistent subset.
+
+    Pairs in a split payment are returned with match_type PARTIAL_PAYMENT or
+    BATCH_PAYMENT, an explanation naming the group, and auto_match disabled so
+    they always go to review.
+
+    Returns:
+        (kept matches sorted by score, AssignmentResult)
+    """
+    by_pair: Dict[Tuple[Any, Any], Any] = {}
+    for match in matches:
+        key = (match.invoice_id, match.transaction_id)
+        if key not in by_pair or match.score > by_pair[key].score:
+            by_pair[key] = match
+
+    invoice_amounts = {
+        inv['id']: amount for inv in invoices
+        if (amount := _amount(inv.get('total_amount'))) is not None
+    }
+    transaction_amounts = {
+        txn['transaction_id']: amount for txn in transactions
+        if (amount := _amount(txn.get('amount'))) is not None
+    }
+
+    result = solve_global_assignment(
+        ((m.invoice_id, m.transaction_id, m.score) for m in by_pair.values()),
+        invoice_amounts, transaction_amounts
+    )
+
+    kept = [by_pair[(invoice_id, transaction_id)] for invoice_id, transaction_id, _ in result.pairs]
+    for group in result.groups:
+        members = len(group.transaction_ids) if group.kind == 'PARTIAL_PAYMENT' else len(group.invoice_ids)
+        note = (f"Split payment: {members} transactions sum to the invoice amount"
+                if group.kind == 'PARTIAL_PAYMENT'
+                else f"Batch payment: transaction covers {members} invoices")
+        for invoice_id in group.invoice_ids:
+            for transaction_id in group.transaction_ids:
+                match = by_pair[(invoice_id, transaction_id)]
+                kept.append(replace(match, match_type=group.kind, auto_match=False,
+                                    explanation=f"{match.explanation} | {note}"))
+
+    kept.sort(key=lambda m: m.score, reverse=True)
+    if result.dropped:
+        logger.info(f"Global assignment kept {len(kept)} of {result.candidates} candidate pairs "
+                    f"({result.components} components, {len(result.groups)} split payments)")
+    return kept, result
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Module Singletons
+Process-wide instances for modules that are imported under more than one name.
+
+web_ui/ modules load both as top-level modules ('database') and through the
+repo root ('web_ui.database'); web_ui/services/ modules also load as
+'services.x' and as bare names once the services folder is on sys.path. Each
+name executes the file again, so module-level caches, monitors and writer
+threads would be duplicated and invalidating one copy would miss the others.
+shared_instance() hands every copy the instance created by the first one.
+"""
+
+import os
+import sys
+from typing import Any, Callable
+
+
+def shared_instance(module_name: str, attribute: str, factory: Callable[[], Any]) -> Any:
+    """
+    The `attribute` of an already loaded copy of the module `module_name`
+    (pass __name__), or a new instance from factory().
+
+    Copies are recognised by their source file, so every alias qualifies
+    (including __main__ when the module is run as a script).
+    """
+    this_module = sys.modules.get(module_name)
+    this_path = getattr(this_module, '__file__', None)
+    if not this_path:
+        return factory()
+
+    filename, source = os.path.basename(this_path), None
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        # Cheap filename check first; realpath only for the few candidates
+        if module is this_module or not path or os.path.basename(path) != filename:
+            continue
+        source = source or os.path.realpath(this_path)
+        if os.path.realpath(path) != source:
+            continue
+        value = getattr(module, attribute, None)
+        if value is not None:
+            return value
+    return factory()
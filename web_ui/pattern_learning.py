@@ -20,6 +20,8 @@ from database import db_manager
 
 logger = logging.getLogger(__name__)
 
+VALIDATION_MODEL = "claude-sonnet-4-5-20250929"
+
 
 # ============================================================================
 # PATTERN SUGGESTION PROCESSING
@@ -31,118 +33,16 @@ async def process_pending_pattern_suggestions(tenant_id: str, claude_client) ->
 
     This function is called periodically (or triggered after new tracking records)
     to validate pending patterns with LLM and auto-create them if validated.
+    The whole backlog is drained through the batched PatternValidationPipeline.
 
     Returns:
-        int: Number of patterns processed
+        int: Number of patterns created
     """
     try:
-        with db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-
-            # Get all pending pattern suggestions
-            cursor.execute("""
-                SELECT id, tenant_id, description_pattern, pattern_type, entity,
-                       accounting_category, accounting_subcategory, justification,
-                       occurrence_count, confidence_score, supporting_classifications
-                FROM pattern_suggestions
-                WHERE tenant_id = %s
-                  AND status = 'pending'
-                  AND llm_validation_result IS NULL
-                ORDER BY occurrence_count DESC, created_at DESC
-                LIMIT 10
-            """, (tenant_id,))
-
-            suggestions = cursor.fetchall()
-
-            if not suggestions:
-                logger.info(f"No pending pattern suggestions for tenant {tenant_id}")
-                cursor.close()
-                return 0
-
-            logger.info(f"Processing {len(suggestions)} pending pattern suggestions for tenant {tenant_id}")
-
-            processed_count = 0
-
-            for suggestion in suggestions:
-                suggestion_id = suggestion[0]
-                pattern_data = {
-                    'description_pattern': suggestion[2],
-                    'pattern_type': suggestion[3],
-                    'entity': suggestion[4],
-                    'accounting_category': suggestion[5],
-                    'accounting_subcategory': suggestion[6],
-                    'justification': suggestion[7],
-                    'occurrence_count': suggestion[8],
-                    'confidence_score': float(suggestion[9]),
-                    'supporting_classifications': suggestion[10]
-                }
-
-                # Get supporting transactions for context
-                supporting_txns = await get_supporting_transactions(
-                    cursor,
-                    pattern_data['supporting_classifications']
-                )
-
-                # Calculate pattern statistics for enriched validation
-                pattern_stats = calculate_pattern_statistics(supporting_txns)
-
-                # Validate with LLM (two-pass system)
-                validation_result = await validate_pattern_with_llm(
-                    tenant_id=tenant_id,
-                    pattern_data=pattern_data,
-                    supporting_transactions=supporting_txns,
-                    pattern_stats=pattern_stats,
-                    claude_client=claude_client
-                )
-
-                # Update pattern_suggestions with validation result
-                cursor.execute("""
-                    UPDATE pattern_suggestions
-                    SET llm_validation_result = %s,
-                        llm_validated_at = CURRENT_TIMESTAMP,
-                        validation_model = %s,
-                        status = %s,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                """, (
-                    json.dumps(validation_result),
-                    validation_result.get('model_used', 'claude-sonnet-4-5-20250929'),
-                    'approved' if validation_result['is_valid'] else 'rejected',
-                    suggestion_id
-                ))
-
-                conn.commit()
-
-                # If validated, create classification pattern
-                if validation_result['is_valid']:
-                    pattern_id = await create_llm_validated_pattern(
-                        cursor=cursor,
-                        conn=conn,
-                        tenant_id=tenant_id,
-                        pattern_data=pattern_data,
-                        validation_result=validation_result,
-                        suggestion_id=suggestion_id
-                    )
-
-                    if pattern_id:
-                        # Create passive notification
-                        await create_pattern_notification(
-                            cursor=cursor,
-                            conn=conn,
-                            tenant_id=tenant_id,
-                            pattern_id=pattern_id,
-                            notification_type='pattern_created',
-                            pattern_data=pattern_data,
-                            validation_result=validation_result
-                        )
-
-                        logger.info(f"✅ Created LLM-validated pattern #{pattern_id} for tenant {tenant_id}")
-                        processed_count += 1
-                else:
-                    logger.info(f"❌ LLM rejected pattern suggestion #{suggestion_id}: {validation_result.get('reasoning')}")
-
-            cursor.close()
-            return processed_count
+        from pattern_validation_pipeline import drain_pending_pattern_suggestions
+
+        results = await drain_pending_pattern_suggestions(tenant_id, claude_client)
+        return results['created']
 
     except Exception as e:
         logger.error(f"Error processing pattern suggestions: {e}", exc_info=True)
@@ -158,7 +58,8 @@ async def validate_pattern_with_llm(
     pattern_data: Dict,
     supporting_transactions: List[Dict],
     pattern_stats: Dict,
-    claude_client
+    claude_client,
+    tenant_context: Optional[Dict] = None
 ) -> Dict:
     """
     Validate a pattern suggestion with Claude LLM using two-pass validation.
@@ -166,7 +67,8 @@ async def validate_pattern_with_llm(
     PASS 1: Basic validation with pattern and business context
     PASS 2: If rejected, retry with enriched temporal/amount statistics
 
-    Uses tenant's business context to assess pattern quality.
+    Uses tenant's business context to assess pattern quality. Callers that
+    validate many suggestions can pass a preloaded tenant_context.
 
     Returns:
         {
@@ -181,7 +83,8 @@ async def validate_pattern_with_llm(
     """
     try:
         # Load tenant context
-        tenant_context = await load_tenant_context(tenant_id)
+        if tenant_context is None:
+            tenant_context = await load_tenant_context(tenant_id)
 
         # PASS 1: Basic validation
         logger.info(f"🤖 Pass 1: Basic pattern validation for tenant {tenant_id}")
@@ -195,7 +98,7 @@ async def validate_pattern_with_llm(
         )
 
         response = claude_client.messages.create(
-            model="claude-sonnet-4-5-20250929",
+            model=VALIDATION_MODEL,
             max_tokens=2000,
             temperature=0.3,
             messages=[{
@@ -205,7 +108,7 @@ async def validate_pattern_with_llm(
         )
 
         validation_result = parse_validation_response(response.content[0].text)
-        validation_result['model_used'] = 'claude-sonnet-4-5-20250929'
+        validation_result['model_used'] = VALIDATION_MODEL
         validation_result['pass_number'] = 1
 
         logger.info(f"✅ Pass 1 complete: {validation_result.get('is_valid')}")
@@ -231,7 +134,7 @@ async def validate_pattern_with_llm(
             )
 
             response_pass2 = claude_client.messages.create(
-                model="claude-sonnet-4-5-20250929",
+                model=VALIDATION_MODEL,
                 max_tokens=2000,
                 temperature=0.3,
                 messages=[{
@@ -241,7 +144,7 @@ async def validate_pattern_with_llm(
             )
 
             validation_result_pass2 = parse_validation_response(response_pass2.content[0].text)
-            validation_result_pass2['model_used'] = 'claude-sonnet-4-5-20250929'
+            validation_result_pass2['model_used'] = VALIDATION_MODEL
             validation_result_pass2['pass_number'] = 2
 
             logger.info(f"✅ Pass 2 complete: {validation_result_pass2.get('is_valid')}")
@@ -485,6 +388,30 @@ async def load_tenant_context(tenant_id: str) -> Dict:
         return context
 
 
+def extract_tracking_ids(supporting_classifications_json) -> List[int]:
+    """
+    Extract user_classification_tracking IDs from a suggestion's JSONB array.
+
+    Handles both formats:
+    1. Array of integers: [1, 2, 3]
+    2. Array of objects: [{"id": 1}, {"id": 2}]
+    """
+    if not supporting_classifications_json:
+        return []
+
+    if isinstance(supporting_classifications_json, str):
+        tracking_records = json.loads(supporting_classifications_json)
+    else:
+        tracking_records = supporting_classifications_json
+
+    if not tracking_records:
+        return []
+
+    if isinstance(tracking_records[0], int):
+        return list(tracking_records)
+    return [record['id'] for record in tracking_records if 'id' in record]
+
+
 async def get_supporting_transactions(cursor, supporting_classifications_json) -> List[Dict]:
     """
     Retrieve the actual transactions that support this pattern.
@@ -497,28 +424,7 @@ async def get_supporting_transactions(cursor, supporting_classifications_json) -
         List of transaction dictionaries
     """
     try:
-        if not supporting_classifications_json:
-            return []
-
-        # Parse the JSONB
-        if isinstance(supporting_classifications_json, str):
-            tracking_records = json.loads(supporting_classifications_json)
-        else:
-            tracking_records = supporting_classifications_json
-
-        # Extract tracking IDs - handle both formats:
-        # 1. Array of integers: [1, 2, 3]
-        # 2. Array of objects: [{"id": 1}, {"id": 2}]
-        if not tracking_records:
-            return []
-
-        if isinstance(tracking_records[0], int):
-            # Direct array of integers
-            tracking_ids = tracking_records
-        else:
-            # Array of objects with 'id' field
-            tracking_ids = [record['id'] for record in tracking_records if 'id' in record]
-
+        tracking_ids = extract_tracking_ids(supporting_classifications_json)
         if not tracking_ids:
             return []
 
@@ -740,6 +646,10 @@ async def create_llm_validated_pattern(
         pattern_id = cursor.fetchone()[0]
         conn.commit()
 
+        # DeltaCFOAgent instances in this process reload the tenant's patterns
+        from tenant_knowledge_cache import invalidate_tenant_knowledge
+        invalidate_tenant_knowledge(tenant_id)
+
         logger.info(f"✅ Created classification pattern #{pattern_id} (confidence: {final_confidence:.2f}, risk: {risk})")
 
         return pattern_id
@@ -0,0 +1,745 @@
+"""
+Pattern Validation Pipeline - Batched LLM validation of pattern suggestions
+
+Drains the whole pending pattern_suggestions backlog for a tenant instead of
+validating ten suggestions per call:
+- Tenant context is loaded once per drain
+- Supporting transactions are fetched with one query per chunk
+- Several suggestions are validated per prompt over a bounded async pool
+- Verdicts are cached by (tenant, normalized pattern, entity, category)
+- Throughput and latency counters are reported for every drain
+- Batch calls that fail (rate limits, overload) are retried with backoff; if
+  they keep failing the suggestions stay pending for the next drain
+
+The two-pass semantics of validate_pattern_with_llm are preserved: suggestions
+rejected in pass 1 that look recurring are re-validated in a second batched
+prompt that includes their temporal/amount statistics.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2.extras
+
+from database import db_manager
+from pattern_learning import (
+    load_tenant_context,
+    calculate_pattern_statistics,
+    validate_pattern_with_llm,
+    extract_tracking_ids,
+    create_llm_validated_pattern,
+    create_pattern_notification,
+    VALIDATION_MODEL,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 8          # Suggestions per LLM prompt
+DEFAULT_MAX_CONCURRENCY = 4     # Concurrent LLM requests per drain
+DEFAULT_CHUNK_SIZE = 200        # Suggestions per DB read/write round
+BATCH_CALL_ATTEMPTS = 3         # Tries per batch prompt before deferring it
+BATCH_RETRY_BASE_DELAY_SECONDS = 2.0
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+VERDICT_CACHE_TTL_SECONDS = 24 * 3600
+VERDICT_CACHE_MAX_ENTRIES = 20000
+
+
+# ============================================================================
+# VERDICT CACHE
+# ============================================================================
+
+_verdict_cache: "OrderedDict[Tuple[str, str, str, str], Tuple[float, Dict]]" = OrderedDict()
+_verdict_cache_lock = threading.Lock()
+
+
+def normalize_pattern(pattern: Optional[str]) -> str:
+    """Normalize a description pattern for cache keys (case, wildcards, whitespace)"""
+    if not pattern:
+        return ''
+    normalized = pattern.lower().strip().strip('%').strip()
+    normalized = re.sub(r'%+', '%', normalized)
+    return re.sub(r'\s+', ' ', normalized)
+
+
+def verdict_cache_key(tenant_id: str, pattern_data: Dict) -> Tuple[str, str, str, str]:
+    """Build the verdict cache key for a suggestion"""
+    return (
+        tenant_id,
+        normalize_pattern(pattern_data.get('description_pattern')),
+        (pattern_data.get('entity') or '').strip().lower(),
+        (pattern_data.get('accounting_category') or '').strip().lower(),
+    )
+
+
+def get_cached_verdict(key: Tuple[str, str, str, str]) -> Optional[Dict]:
+    """Return a cached verdict if present and not expired"""
+    with _verdict_cache_lock:
+        entry = _verdict_cache.get(key)
+        if not entry:
+            return None
+        cached_at, verdict = entry
+        if time.time() - cached_at > VERDICT_CACHE_TTL_SECONDS:
+            del _verdict_cache[key]
+            return None
+        _verdict_cache.move_to_end(key)
+        return dict(verdict)
+
+
+def store_cached_verdict(key: Tuple[str, str, str, str], verdict: Dict):
+    """Store a verdict, evicting the least recently used entries beyond the limit"""
+    # Errors are transient - never cache them
+    if verdict.get('model_used') == 'error':
+        return
+    with _verdict_cache_lock:
+        _verdict_cache[key] = (time.time(), dict(verdict))
+        _verdict_cache.move_to_end(key)
+        while len(_verdict_cache) > VERDICT_CACHE_MAX_ENTRIES:
+            _verdict_cache.popitem(last=False)
+
+
+def clear_verdict_cache(tenant_id: Optional[str] = None):
+    """Clear cached verdicts (all tenants, or a single tenant)"""
+    with _verdict_cache_lock:
+        if tenant_id is None:
+            _verdict_cache.clear()
+            return
+        for key in [k for k in _verdict_cache if k[0] == tenant_id]:
+            del _verdict_cache[key]
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+@dataclass
+class PipelineStats:
+    """Counters for a single drain of the pending backlog"""
+    tenant_id: str
+    suggestions_loaded: int = 0
+    processed: int = 0
+    approved: int = 0
+    rejected: int = 0
+    created: int = 0
+    cache_hits: int = 0
+    llm_calls: int = 0
+    llm_errors: int = 0
+    fallback_validations: int = 0
+    deferred: int = 0
+    llm_latencies_ms: List[float] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def record_llm_call(self, latency_ms: float, error: bool = False):
+        self.llm_calls += 1
+        self.llm_latencies_ms.append(latency_ms)
+        if error:
+            self.llm_errors += 1
+
+    def to_dict(self) -> Dict:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        latencies = sorted(self.llm_latencies_ms)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            index = min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))
+            return round(latencies[index], 1)
+
+        return {
+            'tenant_id': self.tenant_id,
+            'suggestions_loaded': self.suggestions_loaded,
+            'processed': self.processed,
+            'approved': self.approved,
+            'rejected': self.rejected,
+            'created': self.created,
+            'cache_hits': self.cache_hits,
+            'llm_calls': self.llm_calls,
+            'llm_errors': self.llm_errors,
+            'fallback_validations': self.fallback_validations,
+            'deferred': self.deferred,
+            'elapsed_seconds': round(elapsed, 2),
+            'suggestions_per_minute': round(self.processed / elapsed * 60, 1) if elapsed > 0 else 0.0,
+            'llm_latency_ms': {
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': round(latencies[-1], 1) if latencies else 0.0,
+            },
+        }
+
+
+# Cumulative counters across all drains in this process
+_pipeline_totals = {
+    'drains': 0,
+    'processed': 0,
+    'approved': 0,
+    'rejected': 0,
+    'created': 0,
+    'cache_hits': 0,
+    'llm_calls': 0,
+    'llm_errors': 0,
+    'deferred': 0,
+    'last_drain': None,
+}
+_pipeline_totals_lock = threading.Lock()
+
+
+def get_pipeline_metrics() -> Dict:
+    """Return cumulative pipeline counters for this process"""
+    with _pipeline_totals_lock:
+        metrics = dict(_pipeline_totals)
+    with _verdict_cache_lock:
+        metrics['verdict_cache_entries'] = len(_verdict_cache)
+    return metrics
+
+
+def _record_drain(stats: PipelineStats):
+    summary = stats.to_dict()
+    with _pipeline_totals_lock:
+        _pipeline_totals['drains'] += 1
+        for key in ('processed', 'approved', 'rejected', 'created', 'cache_hits', 'llm_calls', 'llm_errors', 'deferred'):
+            _pipeline_totals[key] += summary[key]
+        _pipeline_totals['last_drain'] = summary
+
+
+# ============================================================================
+# BATCHED PROMPTS
+# ============================================================================
+
+def build_batch_validation_prompt(tenant_context: Dict, items: List[Dict], enriched: bool = False) -> str:
+    """
+    Build one prompt validating several pattern suggestions.
+
+    Each item is a dict with 'pattern_data', 'supporting_transactions' and, for
+    the enriched (second) pass, 'pattern_stats' and 'previous_rejection'.
+    """
+    existing_patterns_summary = "\n".join([
+        f"  - {p['pattern']} → {p['entity']} ({p['category']})"
+        for p in tenant_context.get('existing_patterns', [])[:10]
+    ])
+
+    sections = []
+    for index, item in enumerate(items, 1):
+        pattern_data = item['pattern_data']
+        txn_lines = "\n".join([
+            f"    - {txn.get('date', 'N/A')} | {txn.get('description', 'N/A')} | "
+            f"origin={txn.get('origin', 'N/A')} | destination={txn.get('destination', 'N/A')} | "
+            f"amount={txn.get('amount', 'N/A')} | user classified as: {txn.get('user_classification', 'N/A')}"
+            for txn in item['supporting_transactions'][:5]
+        ]) or "    (no supporting transactions found)"
+
+        section = f"""SUGGESTION {index}:
+  - Description pattern: "{pattern_data.get('description_pattern', 'N/A')}"
+  - Suggested entity: "{pattern_data.get('entity', 'N/A')}"
+  - Suggested category: "{pattern_data.get('accounting_category', 'N/A')}"
+  - Suggested subcategory: "{pattern_data.get('accounting_subcategory', 'N/A')}"
+  - Current confidence: {pattern_data.get('confidence_score', 0.0):.2f}
+  - Occurrence count: {pattern_data.get('occurrence_count', 0)}
+  - Supporting evidence ({len(item['supporting_transactions'])} similar transactions):
+{txn_lines}"""
+
+        if enriched:
+            stats = item.get('pattern_stats') or {}
+            section += f"""
+  - Temporal frequency: {stats.get('temporal_frequency')} over {stats.get('time_span_days')} days (recurring: {'YES' if stats.get('is_recurring') else 'NO'})
+  - Amounts: mean ${stats.get('amount_mean', 0):.2f}, range ${stats.get('amount_min', 0):.2f} - ${stats.get('amount_max', 0):.2f}, variance {stats.get('amount_variance', 0):.1%}
+  - Previous rejection reason: {item.get('previous_rejection')}"""
+
+        sections.append(section)
+
+    reconsideration = ""
+    if enriched:
+        reconsideration = """
+RECONSIDERATION GUIDANCE (SECOND PASS):
+These suggestions were rejected in a first pass but look RECURRING. When a pattern shows strong temporal consistency (daily/weekly/monthly) AND amount consistency (<15% variance) AND high occurrence count (15+), the USER'S REPEATED CLASSIFICATION is a strong signal that it is a legitimate recurring business transaction. Consider approving if frequency is consistent, amount variance is low (<20%), the user classified it 10+ times and the business context makes sense.
+"""
+
+    return f"""ROLE: You are a financial pattern validation expert{' performing SECOND-PASS validation with enriched context' if enriched else ''}.
+
+TENANT BUSINESS CONTEXT:
+- Company: {tenant_context.get('company_name', 'Unknown')}
+- Industry: {tenant_context.get('industry', 'Not specified')}
+- Description: {tenant_context.get('description', 'Not provided')}
+
+Known Business Entities ({len(tenant_context.get('entities', []))} total):
+{', '.join(tenant_context.get('entities', [])[:20])}
+
+Existing Classification Patterns ({len(tenant_context.get('existing_patterns', []))} total):
+{existing_patterns_summary}
+
+PROPOSED PATTERNS ({len(items)} suggestions, validate each one independently):
+
+{chr(10).join(sections)}
+{reconsideration}
+VALIDATION TASK:
+For EACH suggestion, analyze whether the pattern is:
+1. ACCURATE - Does it correctly identify these transaction types?
+2. USEFUL - Will it help classify future similar transactions?
+3. SAFE - Low risk of misclassifying unrelated transactions?
+4. SPECIFIC ENOUGH - Won't match too broadly?
+5. CONSISTENT - Makes sense for this company's business?
+
+IMPORTANT CONSIDERATIONS:
+- If the pattern is too generic (like "%payment%" or "%fee%"), it may cause false positives
+- If origin/destination is very specific (like "stripe.com"), the pattern is safer
+- If the entity already exists in the system, that's a good sign
+- If similar patterns exist, check for conflicts
+
+Respond in JSON format with one result per suggestion:
+{{
+  "results": [
+    {{
+      "index": 1,
+      "is_valid": boolean,
+      "confidence_adjustment": float (-0.2 to +0.2),
+      "reasoning": "Brief explanation of your decision (2-3 sentences)",
+      "suggested_improvements": {{
+        "description_pattern": "refined pattern if needed (or null)",
+        "entity": "refined entity if needed (or null)",
+        "justification": "suggested justification text (or null)"
+      }},
+      "risk_assessment": "low|medium|high"
+    }}
+  ]
+}}
+
+Focus on {'user behavior patterns and recurring transactions' if enriched else 'safety and accuracy. When in doubt, err on the side of caution'}."""
+
+
+def parse_batch_validation_response(response_text: str, expected_count: int) -> Dict[int, Dict]:
+    """
+    Parse a batched validation response.
+
+    Returns:
+        Dict mapping 1-based suggestion index to its verdict. Indexes missing
+        from the response (or malformed entries) are omitted so the caller can
+        fall back to single-suggestion validation.
+    """
+    try:
+        if '```json' in response_text:
+            json_str = response_text.split('```json')[1].split('```')[0].strip()
+        elif '```' in response_text:
+            json_str = response_text.split('```')[1].split('```')[0].strip()
+        else:
+            json_str = response_text.strip()
+
+        parsed = json.loads(json_str)
+        entries = parsed.get('results', []) if isinstance(parsed, dict) else parsed
+    except Exception as e:
+        logger.error(f"Failed to parse batch validation response: {e}")
+        return {}
+
+    verdicts = {}
+    for position, entry in enumerate(entries or [], 1):
+        if not isinstance(entry, dict) or 'is_valid' not in entry:
+            continue
+        try:
+            index = int(entry.get('index', position))
+        except (TypeError, ValueError):
+            continue
+        if 1 <= index <= expected_count and index not in verdicts:
+            verdicts[index] = {
+                'is_valid': bool(entry.get('is_valid')),
+                'confidence_adjustment': float(entry.get('confidence_adjustment') or 0.0),
+                'reasoning': entry.get('reasoning', ''),
+                'suggested_improvements': entry.get('suggested_improvements') or {},
+                'risk_assessment': entry.get('risk_assessment', 'medium'),
+            }
+    return verdicts
+
+
+def needs_second_pass(pattern_data: Dict, pattern_stats: Dict) -> bool:
+    """Same reconsideration rule as validate_pattern_with_llm"""
+    return bool(pattern_stats.get('is_recurring')) or pattern_data.get('occurrence_count', 0) >= 15
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate limits, overload and connection errors are worth another try"""
+    status = getattr(error, 'status_code', None)
+    return status is None or status in RETRYABLE_STATUS_CODES
+
+
+def _retry_delay(error: Exception, default: float) -> float:
+    """Honour the API's retry-after header when the error carries one"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return max(default, float(headers.get('retry-after')))
+    except (TypeError, ValueError):
+        return default
+
+
+class PatternValidationPipeline:
+    """
+    Drains pending pattern suggestions for a tenant with batched LLM validation.
+
+    The Claude client is synchronous; calls are dispatched with
+    asyncio.to_thread and bounded by a semaphore so a large backlog never
+    opens more than max_concurrency requests at once.
+    """
+
+    def __init__(self, claude_client, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 retry_base_delay: float = BATCH_RETRY_BASE_DELAY_SECONDS):
+        self.claude_client = claude_client
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.chunk_size = max(1, chunk_size)
+        self.retry_base_delay = retry_base_delay
+
+    async def drain(self, tenant_id: str, max_suggestions: Optional[int] = None) -> Dict:
+        """
+        Validate every pending suggestion for the tenant.
+
+        Returns:
+            Stats dict (see PipelineStats.to_dict)
+        """
+        stats = PipelineStats(tenant_id=tenant_id)
+
+        try:
+            suggestions = self._load_pending_suggestions(tenant_id, max_suggestions)
+            stats.suggestions_loaded = len(suggestions)
+
+            if not suggestions:
+                logger.info(f"No pending pattern suggestions for tenant {tenant_id}")
+                return stats.to_dict()
+
+            tenant_context = await load_tenant_context(tenant_id)
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            logger.info(f"[PIPELINE] Draining {len(suggestions)} pending pattern suggestions for tenant {tenant_id}")
+
+            for start in range(0, len(suggestions), self.chunk_size):
+                chunk = suggestions[start:start + self.chunk_size]
+                self._attach_supporting_transactions(chunk)
+                verdicts = await self.validate_items(tenant_id, tenant_context, chunk, stats, semaphore)
+                await self._persist_verdicts(tenant_id, chunk, verdicts, stats)
+
+        except Exception as e:
+            logger.error(f"[PIPELINE] Error draining pattern suggestions for tenant {tenant_id}: {e}", exc_info=True)
+
+        finally:
+            stats.finished_at = time.time()
+            _record_drain(stats)
+
+        summary = stats.to_dict()
+        logger.info(
+            f"[PIPELINE] Tenant {tenant_id}: {summary['processed']} processed "
+            f"({summary['approved']} approved, {summary['created']} created, {summary['cache_hits']} cache hits) "
+            f"in {summary['elapsed_seconds']}s with {summary['llm_calls']} LLM calls, "
+            f"p95 latency {summary['llm_latency_ms']['p95']}ms"
+        )
+        return summary
+
+    async def validate_items(self, tenant_id: str, tenant_context: Dict, items: List[Dict],
+                             stats: PipelineStats, semaphore: Optional[asyncio.Semaphore] = None) -> Dict[int, Dict]:
+        """
+        Validate a list of items ({'suggestion_id', 'pattern_data', 'supporting_transactions'}).
+
+        Returns:
+            Dict mapping suggestion_id to its verdict
+        """
+        semaphore = semaphore or asyncio.Semaphore(self.max_concurrency)
+        verdicts: Dict[int, Dict] = {}
+
+        # Resolve cache hits and collapse duplicate keys so each distinct
+        # (pattern, entity, category) is sent to the LLM at most once
+        pending_by_key: "OrderedDict[Tuple, List[Dict]]" = OrderedDict()
+        for item in items:
+            key = verdict_cache_key(tenant_id, item['pattern_data'])
+            cached = get_cached_verdict(key)
+            if cached is not None:
+                cached['cache_hit'] = True
+                verdicts[item['suggestion_id']] = cached
+                stats.cache_hits += 1
+            else:
+                pending_by_key.setdefault(key, []).append(item)
+
+        representatives = []
+        for group in pending_by_key.values():
+            item = group[0]
+            item['pattern_stats'] = calculate_pattern_statistics(item['supporting_transactions'])
+            representatives.append(item)
+
+        # PASS 1: batched basic validation
+        pass1 = await self._run_batches(tenant_id, tenant_context, representatives, stats, semaphore, enriched=False)
+
+        # PASS 2: batched enriched validation for recurring rejections
+        second_pass = []
+        for item in representatives:
+            verdict = pass1.get(item['suggestion_id'])
+            if verdict and not verdict['is_valid'] and needs_second_pass(item['pattern_data'], item['pattern_stats']):
+                item['previous_rejection'] = verdict.get('reasoning')
+                second_pass.append(item)
+
+        pass2 = {}
+        if second_pass:
+            logger.info(f"🔄 Pass 2: Enriched validation for {len(second_pass)} recurring suggestion(s)")
+            pass2 = await self._run_batches(tenant_id, tenant_context, second_pass, stats, semaphore, enriched=True)
+
+        second_pass_ids = {item['suggestion_id'] for item in second_pass}
+        for key, group in pending_by_key.items():
+            representative = group[0]
+            if representative['suggestion_id'] in second_pass_ids:
+                # A deferred second pass must not settle for the pass 1 rejection
+                verdict = pass2.get(representative['suggestion_id'])
+            else:
+                verdict = pass1.get(representative['suggestion_id'])
+            if verdict is None:
+                continue
+            store_cached_verdict(key, verdict)
+            for item in group:
+                verdicts[item['suggestion_id']] = dict(verdict)
+
+        return verdicts
+
+    async def _run_batches(self, tenant_id: str, tenant_context: Dict, items: List[Dict],
+                           stats: PipelineStats, semaphore: asyncio.Semaphore, enriched: bool) -> Dict[int, Dict]:
+        batches = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        results = await asyncio.gather(*[
+            self._validate_batch(tenant_id, tenant_context, batch, stats, semaphore, enriched)
+            for batch in batches
+        ])
+        merged = {}
+        for result in results:
+            merged.update(result)
+        return merged
+
+    async def _validate_batch(self, tenant_id: str, tenant_context: Dict, batch: List[Dict],
+                              stats: PipelineStats, semaphore: asyncio.Semaphore, enriched: bool) -> Dict[int, Dict]:
+        prompt = build_batch_validation_prompt(tenant_context, batch, enriched=enriched)
+        pass_number = 2 if enriched else 1
+        parsed: Dict[int, Dict] = {}
+
+        # The semaphore is held while backing off, so a rate-limited pool slows down as a whole
+        async with semaphore:
+            for attempt in range(1, BATCH_CALL_ATTEMPTS + 1):
+                started = time.perf_counter()
+                try:
+                    response = await asyncio.to_thread(
+                        self.claude_client.messages.create,
+                        model=VALIDATION_MODEL,
+                        max_tokens=min(8000, 500 + 400 * len(batch)),
+                        temperature=0.3,
+                        messages=[{"role": "user", "content": prompt}]
+                    )
+                    stats.record_llm_call((time.perf_counter() - started) * 1000)
+                    parsed = parse_batch_validation_response(response.content[0].text, len(batch))
+                    break
+                except Exception as e:
+                    stats.record_llm_call((time.perf_counter() - started) * 1000, error=True)
+                    if attempt < BATCH_CALL_ATTEMPTS and _is_retryable(e):
+                        delay = _retry_delay(e, self.retry_base_delay * 2 ** (attempt - 1))
+                        logger.warning(f"[PIPELINE] Batch validation call failed ({len(batch)} suggestions), "
+                                       f"retrying in {delay:.1f}s: {e}")
+                        await asyncio.sleep(delay)
+                        continue
+                    # Don't fan a failed call out to one request per suggestion:
+                    # leave them pending for the next drain
+                    stats.deferred += len(batch)
+                    logger.error(f"[PIPELINE] Batch validation call failed ({len(batch)} suggestions), "
+                                 f"leaving them pending: {e}")
+                    return {}
+
+        verdicts = {}
+        for index, item in enumerate(batch, 1):
+            verdict = parsed.get(index)
+            if verdict is None:
+                # The batch answer was missing or malformed for this suggestion:
+                # fall back to the original single-suggestion validation
+                stats.fallback_validations += 1
+                async with semaphore:
+                    # It calls the client synchronously; keep it off the event loop
+                    verdict = await asyncio.to_thread(asyncio.run, validate_pattern_with_llm(
+                        tenant_id=tenant_id,
+                        pattern_data=item['pattern_data'],
+                        supporting_transactions=item['supporting_transactions'],
+                        pattern_stats=item.get('pattern_stats') or {},
+                        claude_client=self.claude_client,
+                        tenant_context=tenant_context
+                    ))
+                if verdict.get('model_used') == 'error':
+                    # A failed call is not a rejection: leave it pending for the next drain
+                    stats.deferred += 1
+                    logger.error(f"[PIPELINE] Fallback validation failed for suggestion "
+                                 f"{item['suggestion_id']}, leaving it pending: {verdict.get('reasoning')}")
+                    continue
+            else:
+                verdict['model_used'] = VALIDATION_MODEL
+                verdict['pass_number'] = pass_number
+            verdicts[item['suggestion_id']] = verdict
+        return verdicts
+
+    # ------------------------------------------------------------------------
+    # Database access
+    # ------------------------------------------------------------------------
+
+    def _load_pending_suggestions(self, tenant_id: str, max_suggestions: Optional[int]) -> List[Dict]:
+        query = """
+            SELECT id, description_pattern, pattern_type, entity,
+                   accounting_category, accounting_subcategory, justification,
+                   occurrence_count, confidence_score, supporting_classifications
+            FROM pattern_suggestions
+            WHERE tenant_id = %s
+              AND status = 'pending'
+              AND llm_validation_result IS NULL
+            ORDER BY occurrence_count DESC, created_at DESC
+        """
+        params = [tenant_id]
+        if max_suggestions:
+            query += " LIMIT %s"
+            params.append(max_suggestions)
+
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, tuple(params))
+            rows = cursor.fetchall()
+            cursor.close()
+
+        return [
+            {
+                'suggestion_id': row[0],
+                'pattern_data': {
+                    'description_pattern': row[1],
+                    'pattern_type': row[2],
+                    'entity': row[3],
+                    'accounting_category': row[4],
+                    'accounting_subcategory': row[5],
+                    'justification': row[6],
+                    'occurrence_count': row[7],
+                    'confidence_score': float(row[8] or 0),
+                    'supporting_classifications': row[9]
+                }
+            }
+            for row in rows
+        ]
+
+    def _attach_supporting_transactions(self, items: List[Dict]):
+        """Fetch supporting transactions for a whole chunk in one query"""
+        ids_by_item = {}
+        all_ids = set()
+        for item in items:
+            tracking_ids = extract_tracking_ids(item['pattern_data'].get('supporting_classifications'))
+            ids_by_item[item['suggestion_id']] = tracking_ids
+            all_ids.update(tracking_ids)
+            item['supporting_transactions'] = []
+
+        if not all_ids:
+            return
+
+        by_tracking_id = {}
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT
+                    uct.id,
+                    t.transaction_id,
+                    t.date,
+                    t.description,
+                    t.origin,
+                    t.destination,
+                    t.amount,
+                    t.currency,
+                    uct.new_value as user_classification,
+                    uct.field_changed,
+                    uct.created_at
+                FROM user_classification_tracking uct
+                JOIN transactions t ON uct.transaction_id = t.transaction_id
+                WHERE uct.id = ANY(%s)
+            """, (list(all_ids),))
+            for row in cursor.fetchall():
+                by_tracking_id[row[0]] = {
+                    'transaction_id': str(row[1]),
+                    'date': str(row[2]),
+                    'description': row[3],
+                    'origin': row[4],
+                    'destination': row[5],
+                    'amount': float(row[6]) if row[6] else 0,
+                    'currency': row[7],
+                    'user_classification': row[8],
+                    'field_changed': row[9],
+                    'classified_at': str(row[10])
+                }
+            cursor.close()
+
+        for item in items:
+            txns = [by_tracking_id[t] for t in ids_by_item[item['suggestion_id']] if t in by_tracking_id]
+            txns.sort(key=lambda txn: txn['date'])
+            item['supporting_transactions'] = txns
+
+    async def _persist_verdicts(self, tenant_id: str, items: List[Dict], verdicts: Dict[int, Dict], stats: PipelineStats):
+        """Write all verdicts of a chunk in one statement, then create approved patterns"""
+        rows = []
+        for item in items:
+            verdict = verdicts.get(item['suggestion_id'])
+            if verdict is None:
+                continue
+            rows.append((
+                item['suggestion_id'],
+                json.dumps(verdict),
+                verdict.get('model_used', VALIDATION_MODEL),
+                'approved' if verdict['is_valid'] else 'rejected'
+            ))
+
+        if not rows:
+            return
+
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            psycopg2.extras.execute_values(cursor, """
+                UPDATE pattern_suggestions AS ps
+                SET llm_validation_result = v.result::jsonb,
+                    llm_validated_at = CURRENT_TIMESTAMP,
+                    validation_model = v.model,
+                    status = v.status,
+                    updated_at = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v(id, result, model, status)
+                WHERE ps.id = v.id
+            """, rows, page_size=500)
+            conn.commit()
+
+            for item in items:
+                verdict = verdicts.get(item['suggestion_id'])
+                if verdict is None:
+                    continue
+                stats.processed += 1
+                if not verdict['is_valid']:
+                    stats.rejected += 1
+                    continue
+                stats.approved += 1
+
+                pattern_id = await create_llm_validated_pattern(
+                    cursor=cursor,
+                    conn=conn,
+                    tenant_id=tenant_id,
+                    pattern_data=item['pattern_data'],
+                    validation_result=verdict,
+                    suggestion_id=item['suggestion_id']
+                )
+                if pattern_id:
+                    stats.created += 1
+                    await create_pattern_notification(
+                        cursor=cursor,
+                        conn=conn,
+                        tenant_id=tenant_id,
+                        pattern_id=pattern_id,
+                        notification_type='pattern_created',
+                        pattern_data=item['pattern_data'],
+                        validation_result=verdict
+                    )
+            cursor.close()
+
+
+async def drain_pending_pattern_suggestions(tenant_id: str, claude_client, **kwargs) -> Dict:
+    """Convenience wrapper: drain a tenant's backlog with default pipeline settings"""
+    return await PatternValidationPipeline(claude_client, **kwargs).drain(tenant_id)
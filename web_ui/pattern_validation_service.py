@@ -12,6 +12,7 @@ Performance optimizations:
     - Singleton pattern prevents duplicate service instances
     - Deduplication prevents processing same suggestion multiple times
     - Lock file prevents race conditions in multi-process environments
+    - Each tenant's whole backlog is drained by the batched PatternValidationPipeline
 """
 
 import os
@@ -28,7 +29,7 @@ from anthropic import Anthropic
 sys.path.insert(0, os.path.dirname(__file__))
 
 from database import db_manager
-from pattern_learning import process_pending_pattern_suggestions
+from pattern_validation_pipeline import drain_pending_pattern_suggestions
 
 # Set up logging
 logging.basicConfig(
@@ -115,12 +116,13 @@ def _process_coalesced_notifications():
 
     logger.info(f"[COALESCE] Processing {notification_count} coalesced notifications for {len(tenant_ids)} tenant(s)")
 
-    # Process each tenant's pending suggestions ONCE
+    # Drain each tenant's pending backlog ONCE
     for tenant_id in tenant_ids:
         try:
-            processed = asyncio.run(process_pending_pattern_suggestions(tenant_id, claude_client))
-            if processed > 0:
-                logger.info(f"[COALESCE] Processed {processed} pattern(s) for tenant {tenant_id}")
+            results = asyncio.run(drain_pending_pattern_suggestions(tenant_id, claude_client))
+            if results['processed'] > 0:
+                logger.info(f"[COALESCE] Validated {results['processed']} suggestion(s), created {results['created']} pattern(s) "
+                            f"for tenant {tenant_id} ({results['suggestions_per_minute']}/min)")
         except Exception as e:
             logger.error(f"[COALESCE] Error processing patterns for tenant {tenant_id}: {e}")
 
@@ -170,11 +172,11 @@ async def handle_new_pattern_notification(payload):
 
         logger.info(f"New pattern suggestion #{suggestion_id} for tenant {tenant_id} ({occurrence_count} occurrences)")
 
-        # Process this specific pattern suggestion
-        processed = await process_pending_pattern_suggestions(tenant_id, claude_client)
+        # Drain the tenant's pending backlog (includes this suggestion)
+        results = await drain_pending_pattern_suggestions(tenant_id, claude_client)
 
-        if processed > 0:
-            logger.info(f"Successfully processed {processed} pattern(s)")
+        if results['processed'] > 0:
+            logger.info(f"Successfully processed {results['processed']} suggestion(s), created {results['created']} pattern(s)")
         else:
             logger.info(f"No patterns processed (may have been rejected or already validated)")
 
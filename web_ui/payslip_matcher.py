@@ -19,6 +19,7 @@ import os
 import re
 import json
 import logging
+import bisect
 import concurrent.futures
 import threading
 import time
@@ -26,6 +27,7 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from difflib import SequenceMatcher
+import numpy as np
 import anthropic
 from database import db_manager
 
@@ -45,6 +47,172 @@ class PayslipMatchResult:
     explanation: str
     auto_match: bool
 
+# Employee names reach the fuzzy branch of _calculate_employee_match_score at this similarity
+FUZZY_NAME_MIN_SIMILARITY = 0.7
+
+
+class TransactionScoringIndex:
+    """
+    Per-run arrays over the candidate transactions for vectorized payslip scoring
+
+    Amounts, dates and payroll-keyword scores are precomputed once so each payslip
+    is scored with array operations. Text scorers only read the description, so
+    descriptions are deduplicated; an inverted index over their tokens and their
+    character counts tell which ones can score on an employee name at all.
+    """
+
+    def __init__(self, transactions: List[Dict], keyword_scorer):
+        self.transactions = transactions
+        count = len(transactions)
+
+        self.amounts = np.zeros(count)
+        self.amount_valid = np.zeros(count, dtype=bool)
+        self.day_numbers = np.zeros(count, dtype=np.int64)
+        self.date_valid = np.zeros(count, dtype=bool)
+        self.keyword_scores = np.zeros(count)
+        self.description_ids = np.zeros(count, dtype=np.int64)
+        self.descriptions: List[str] = []  # distinct, lowercased and stripped
+
+        description_ids: Dict[str, int] = {}
+        for i, transaction in enumerate(transactions):
+            try:
+                self.amounts[i] = abs(float(transaction['amount']))
+                self.amount_valid[i] = True
+            except (ValueError, TypeError, KeyError):
+                pass
+
+            day = _day_number(transaction.get('date'))
+            if day is not None:
+                self.day_numbers[i] = day
+                self.date_valid[i] = True
+
+            self.keyword_scores[i] = keyword_scorer(None, transaction)
+
+            description = (transaction.get('description') or '').lower().strip()
+            if description not in description_ids:
+                description_ids[description] = len(self.descriptions)
+                self.descriptions.append(description)
+            self.description_ids[i] = description_ids[description]
+
+        self.description_lengths = np.array([len(d) for d in self.descriptions], dtype=np.int64)
+
+        # Character counts per description: the multiset intersection with a name
+        # is exactly what SequenceMatcher.quick_ratio() measures
+        self._char_columns: Dict[str, int] = {}
+        for description in self.descriptions:
+            for char in description:
+                self._char_columns.setdefault(char, len(self._char_columns))
+        self._char_counts = np.zeros((len(self.descriptions), len(self._char_columns)), dtype=np.int32)
+        for row, description in enumerate(self.descriptions):
+            for char in description:
+                self._char_counts[row, self._char_columns[char]] += 1
+
+        # Tokens never contain whitespace, so one newline-joined blob lets a name
+        # part be located in every token that contains it with str.find
+        postings: Dict[str, List[int]] = {}
+        for row, description in enumerate(self.descriptions):
+            for token in set(description.split()):
+                postings.setdefault(token, []).append(row)
+        self._vocabulary = list(postings)
+        self._postings = [np.array(postings[token], dtype=np.int64) for token in self._vocabulary]
+        self._token_starts = []
+        offset = 0
+        for token in self._vocabulary:
+            self._token_starts.append(offset)
+            offset += len(token) + 1
+        self._blob = '\n'.join(self._vocabulary)
+        self._part_cache: Dict[str, np.ndarray] = {}
+
+        # Digit runs per description, for payslip-number pattern matching
+        numbers: Dict[str, List[int]] = {}
+        for row, description in enumerate(self.descriptions):
+            for number in set(re.findall(r'\d+', description)):
+                numbers.setdefault(number, []).append(row)
+        self._numbers = {number: np.array(rows, dtype=np.int64) for number, rows in numbers.items()}
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def descriptions_containing(self, part: str) -> np.ndarray:
+        """Distinct-description ids whose text contains part (no whitespace) as a substring"""
+        cached = self._part_cache.get(part)
+        if cached is not None:
+            return cached
+
+        token_ids = set()
+        position = self._blob.find(part)
+        while position != -1:
+            token_id = bisect.bisect_right(self._token_starts, position) - 1
+            token_ids.add(token_id)
+            # Continue after this token; further hits inside it add nothing
+            next_start = self._token_starts[token_id + 1] if token_id + 1 < len(self._token_starts) else len(self._blob)
+            position = self._blob.find(part, next_start)
+
+        if token_ids:
+            result = np.unique(np.concatenate([self._postings[t] for t in token_ids]))
+        else:
+            result = np.zeros(0, dtype=np.int64)
+        self._part_cache[part] = result
+        return result
+
+    def employee_candidates(self, employee_name: str) -> np.ndarray:
+        """
+        Distinct-description mask where the employee score can be non-zero: a name
+        part appears in the description, or quick_ratio() (an upper bound of the
+        fuzzy similarity) reaches FUZZY_NAME_MIN_SIMILARITY.
+        """
+        mask = np.zeros(len(self.descriptions), dtype=bool)
+        name = (employee_name or '').lower().strip()
+        if not name:
+            return mask
+
+        for part in set(name.split()):
+            mask[self.descriptions_containing(part)] = True
+
+        name_counts = np.zeros(len(self._char_columns), dtype=np.int32)
+        for char in name:
+            column = self._char_columns.get(char)
+            if column is not None:
+                name_counts[column] += 1
+        totals = len(name) + self.description_lengths
+        # 2*min(len)/total bounds quick_ratio; only count characters where it can pass
+        rows = np.flatnonzero(2.0 * np.minimum(len(name), self.description_lengths) / totals
+                              >= FUZZY_NAME_MIN_SIMILARITY - 1e-9)
+        if len(rows):
+            shared = np.minimum(self._char_counts[rows], name_counts).sum(axis=1)
+            mask[rows[2.0 * shared / totals[rows] >= FUZZY_NAME_MIN_SIMILARITY - 1e-9]] = True
+
+        mask &= self.description_lengths > 0
+        return mask
+
+    def pattern_scores(self, payslip_number: str) -> Optional[np.ndarray]:
+        """
+        _calculate_pattern_match_score per distinct description: 1.0 when the
+        payslip number appears in it, 0.8 when one of its 4+ digit runs does.
+        None when the number contains whitespace and can't use the token index.
+        """
+        scores = np.zeros(len(self.descriptions))
+        number = (payslip_number or '').lower().strip()
+        if not number:
+            return scores
+        if number.split() != [number]:
+            return None
+
+        for digits in re.findall(r'\d+', number):
+            if len(digits) >= 4 and digits in self._numbers:
+                scores[self._numbers[digits]] = 0.8
+        scores[self.descriptions_containing(number)] = 1.0
+        return scores
+
+
+def _day_number(value) -> Optional[int]:
+    """Ordinal day of a YYYY-MM-DD value, parsed the way the date scorer does"""
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date().toordinal()
+    except (ValueError, TypeError):
+        return None
+
+
 class PayslipMatcher:
     """
     Main matching engine between payslips and transactions
@@ -158,9 +326,11 @@ class PayslipMatcher:
 
         logger.info(f"Processing {len(payslips)} payslips against {len(transactions)} transactions")
 
+        index = TransactionScoringIndex(transactions, self._calculate_keyword_match_score)
+
         matches = []
         for payslip in payslips:
-            payslip_matches = self._find_matches_for_single_payslip(payslip, transactions)
+            payslip_matches = self._find_matches_for_single_payslip(payslip, transactions, index)
             matches.extend(payslip_matches)
 
         # Sort by score descending
@@ -277,17 +447,135 @@ class PayslipMatcher:
             logger.error(f"Error fetching candidate transactions: {e}")
             return []
 
-    def _find_matches_for_single_payslip(self, payslip: Dict, transactions: List[Dict]) -> List[PayslipMatchResult]:
-        """Find matches for a single payslip"""
-        matches = []
+    def _find_matches_for_single_payslip(self, payslip: Dict, transactions: List[Dict],
+                                         index: Optional[TransactionScoringIndex] = None) -> List[PayslipMatchResult]:
+        """
+        Find matches for a single payslip
+
+        Amount, date and keyword scores are computed for all transactions at once;
+        only pairs whose best possible final score reaches the threshold are scored
+        on employee name and pattern and get an explanation.
+        """
+        if index is None:
+            index = TransactionScoringIndex(transactions, self._calculate_keyword_match_score)
+        if not len(index):
+            return []
+
+        amount_scores = self._amount_scores_vectorized(payslip, index)
+        date_scores = self._date_scores_vectorized(payslip, index)
+        name_possible = index.employee_candidates(payslip.get('employee_name'))[index.description_ids]
+
+        # Upper bound: employee and pattern scores are at most 1.0, and the
+        # employee score is 0 unless the name can match the description
+        threshold = self.match_threshold_medium - 1e-9
+        upper_bound = (
+            amount_scores * 0.40 +
+            date_scores * 0.25 +
+            name_possible * 0.20 +
+            index.keyword_scores * 0.10 +
+            0.05
+        )
+        survivors = np.flatnonzero(upper_bound >= threshold)
+        if not len(survivors):
+            return []
+
+        employee_scores = self._description_scores(
+            payslip, index, survivors, self._calculate_employee_match_score, name_possible[survivors]
+        )
+        partial = amount_scores[survivors] * 0.40 + date_scores[survivors] * 0.25 + employee_scores * 0.20
+        tighter = np.flatnonzero(partial + index.keyword_scores[survivors] * 0.10 + 0.05 >= threshold)
+        survivors, employee_scores = survivors[tighter], employee_scores[tighter]
 
-        for transaction in transactions:
-            match_result = self._evaluate_match(payslip, transaction)
+        pattern_by_description = index.pattern_scores(payslip.get('payslip_number'))
+        if pattern_by_description is not None:
+            pattern_scores = pattern_by_description[index.description_ids[survivors]]
+        else:
+            pattern_scores = self._description_scores(payslip, index, survivors, self._calculate_pattern_match_score)
+        # Same operation order as _build_match_result, so the scores are identical
+        final_scores = (
+            amount_scores[survivors] * 0.40 +
+            date_scores[survivors] * 0.25 +
+            employee_scores * 0.20 +
+            index.keyword_scores[survivors] * 0.10 +
+            pattern_scores * 0.05
+        )
+
+        # Only pairs that pass reach the explanation builder
+        matches = []
+        for k in np.flatnonzero(final_scores >= threshold):
+            i = survivors[k]
+            criteria_scores = {
+                'amount': float(amount_scores[i]),
+                'date': float(date_scores[i]),
+                'employee': float(employee_scores[k]),
+                'keyword': float(index.keyword_scores[i]),
+                'pattern': float(pattern_scores[k]),
+            }
+            match_result = self._build_match_result(payslip, transactions[i], criteria_scores)
             if match_result and match_result.score >= self.match_threshold_medium:
                 matches.append(match_result)
 
         return matches
 
+    @staticmethod
+    def _description_scores(payslip: Dict, index: TransactionScoringIndex, rows: np.ndarray,
+                            scorer, possible: Optional[np.ndarray] = None) -> np.ndarray:
+        """Run a description-only scorer once per distinct description among rows"""
+        scores = np.zeros(len(rows))
+        selected = np.flatnonzero(possible) if possible is not None else np.arange(len(rows))
+        if not len(selected):
+            return scores
+
+        unique_ids, inverse = np.unique(index.description_ids[rows[selected]], return_inverse=True)
+        unique_scores = np.array([
+            scorer(payslip, {'description': index.descriptions[d]}) for d in unique_ids
+        ], dtype=float)
+        scores[selected] = unique_scores[inverse]
+        return scores
+
+    def _amount_scores_vectorized(self, payslip: Dict, index: TransactionScoringIndex) -> np.ndarray:
+        """_calculate_amount_match_score against every indexed transaction"""
+        try:
+            payslip_amount = float(payslip['net_amount'])
+        except (ValueError, TypeError, KeyError):
+            return np.zeros(len(index))
+
+        diff = np.abs(payslip_amount - index.amounts)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            diff_percentage = diff / payslip_amount
+        tolerance = self.amount_tolerance
+
+        scores = np.select(
+            [
+                diff < 0.01,
+                diff_percentage <= tolerance,
+                diff_percentage <= 0.10,
+                diff_percentage <= 0.20,
+            ],
+            [
+                1.0,
+                1.0 - (diff_percentage / tolerance) * 0.1,
+                0.80 - (diff_percentage - tolerance) * 5,
+                0.50 - (diff_percentage - 0.10) * 2,
+            ],
+            default=0.0
+        )
+        return np.where(index.amount_valid, scores, 0.0)
+
+    def _date_scores_vectorized(self, payslip: Dict, index: TransactionScoringIndex) -> np.ndarray:
+        """_calculate_date_match_score against every indexed transaction"""
+        payment_day = _day_number(payslip.get('payment_date'))
+        if payment_day is None:
+            return np.zeros(len(index))
+
+        diff_days = np.abs(index.day_numbers - payment_day)
+        scores = np.select(
+            [diff_days == 0, diff_days <= 2, diff_days <= 5, diff_days <= 10, diff_days <= 30, diff_days <= 60],
+            [1.0, 0.95, 0.85, 0.70, 0.50, 0.30],
+            default=0.10
+        )
+        return np.where(index.date_valid, scores, 0.0)
+
     def _evaluate_match(self, payslip: Dict, transaction: Dict) -> Optional[PayslipMatchResult]:
         """Evaluate if a payslip and transaction are a match"""
 
@@ -314,6 +602,17 @@ class PayslipMatcher:
         pattern_score = self._calculate_pattern_match_score(payslip, transaction)
         criteria_scores['pattern'] = pattern_score
 
+        return self._build_match_result(payslip, transaction, criteria_scores)
+
+    def _build_match_result(self, payslip: Dict, transaction: Dict,
+                            criteria_scores: Dict[str, float]) -> Optional[PayslipMatchResult]:
+        """Weight criteria scores into a match result (None below the threshold)"""
+        amount_score = criteria_scores['amount']
+        date_score = criteria_scores['date']
+        employee_score = criteria_scores['employee']
+        keyword_score = criteria_scores['keyword']
+        pattern_score = criteria_scores['pattern']
+
         # Calculate weighted final score
         # For payroll, amount and employee name are most important
         final_score = (
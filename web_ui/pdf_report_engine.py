@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+PDF Report Rendering Engine
+Renders the financial statement PDFs (DRE, balance sheet, cash flow, DMPL)
+and caches the bytes per tenant, period, entity and data version. The board
+pack renders all four statements from one data fetch in parallel worker
+processes and merges them into a single PDF.
+"""
+
+import importlib
+import io
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from PyPDF2 import PdfReader, PdfWriter
+
+try:
+    from module_singletons import shared_instance
+except ImportError:
+    # web_ui/ itself is not on sys.path (imported through the repo root)
+    from web_ui.module_singletons import shared_instance
+
+logger = logging.getLogger(__name__)
+
+# Rendered PDFs also expire on their own, covering writes made by other processes
+REPORT_CACHE_TTL_SECONDS = 600
+REPORT_CACHE_MAX_ENTRIES = 64
+
+# 0 renders the board pack serially in the request process
+BOARD_PACK_WORKERS = int(os.getenv('BOARD_PACK_WORKERS', str(max(0, min(4, (os.cpu_count() or 1) - 1)))))
+
+# report type -> (module, class, render method, board pack bookmark)
+REPORT_TYPES = {
+    'dre': ('pdf_reports', 'DREReport', 'generate_dre_report',
+            'Demonstração do Resultado do Exercício (DRE)'),
+    'balance-sheet': ('pdf_reports', 'BalanceSheetReport', 'generate_balance_sheet_report',
+                      'Balanço Patrimonial'),
+    'cash-flow': ('cash_flow_report_new', 'CashFlowReport', 'generate_cash_flow_report',
+                  'Demonstração de Fluxo de Caixa (DFC)'),
+    'dmpl': ('dmpl_report_new', 'DMPLReport', 'generate_dmpl_report',
+             'Demonstração das Mutações do Patrimônio Líquido (DMPL)'),
+}
+
+BOARD_PACK_REPORTS = ('dre', 'balance-sheet', 'cash-flow', 'dmpl')
+
+
+def _web_ui_service(module_name):
+    """Import a web_ui/services module (the root services/ package shadows web_ui's)"""
+    services_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services')
+    if services_path not in sys.path:
+        sys.path.insert(0, services_path)
+    return importlib.import_module(module_name)
+
+
+def data_version(tenant_id: str) -> int:
+    """Changes on every write to the tenant's transactions, by any process (shared with the KPI cache)"""
+    return _web_ui_service('kpi_aggregator').kpi_cache.version(tenant_id)
+
+
+class RenderedReportCache:
+    """LRU of rendered PDF bytes; keys carry the data version, so writes make old entries unreachable"""
+
+    def __init__(self, max_entries: int = REPORT_CACHE_MAX_ENTRIES, ttl_seconds: float = REPORT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[Tuple, Tuple[float, bytes]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(report_type: str, tenant_id: str, company_name: str, start_date: Optional[date],
+            end_date: Optional[date], entity: Optional[str], version: int) -> Tuple:
+        return (tenant_id, report_type, start_date, end_date, entity or None, company_name, version)
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple, pdf: bytes):
+        with self._lock:
+            self._entries[key] = (time.time(), pdf)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+report_cache = shared_instance(__name__, 'report_cache', RenderedReportCache)
+
+
+def render_report(report_type: str, company_name: str, start_date: Optional[date], end_date: Optional[date],
+                  entity: Optional[str], tenant_id: str, report_data: Optional[Dict[str, Any]] = None) -> bytes:
+    """Render one statement; module-level so board pack workers can run it"""
+    module_name, class_name, method_name, _ = REPORT_TYPES[report_type]
+    report_class = getattr(importlib.import_module(module_name), class_name)
+    report = report_class(
+        company_name=company_name,
+        start_date=start_date,
+        end_date=end_date,
+        entity_filter=entity or None,
+        tenant_id=tenant_id,
+        report_data=report_data
+    )
+    return getattr(report, method_name)()
+
+
+def get_report_pdf(report_type: str, tenant_id: str, company_name: str, start_date: Optional[date] = None,
+                   end_date: Optional[date] = None, entity: Optional[str] = None) -> bytes:
+    """Rendered statement PDF, from the cache while the tenant's data is unchanged"""
+    if report_type not in REPORT_TYPES:
+        raise ValueError(f"Unknown report type: {report_type}")
+
+    key = RenderedReportCache.key(report_type, tenant_id, company_name, start_date, end_date, entity,
+                                  data_version(tenant_id))
+    pdf = report_cache.get(key)
+    if pdf is None:
+        pdf = render_report(report_type, company_name, start_date, end_date, entity, tenant_id)
+        report_cache.put(key, pdf)
+    return pdf
+
+
+# Spawning workers imports reportlab in each of them, which costs more than
+# rendering a statement; the pool is kept for the life of the process
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def _get_render_pool(workers: int) -> ProcessPoolExecutor:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _render_pool
+
+
+def _discard_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        pool, _render_pool = _render_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+def _render_reports(report_types: Sequence[str], render_args: Tuple, workers: int) -> Dict[str, bytes]:
+    if workers > 0 and len(report_types) > 1:
+        try:
+            pool = _get_render_pool(workers)
+            futures = {report_type: pool.submit(render_report, report_type, *render_args)
+                       for report_type in report_types}
+            return {report_type: future.result() for report_type, future in futures.items()}
+        except BrokenProcessPool as e:
+            logger.warning(f"Board pack render pool failed ({e}); rendering serially")
+            _discard_render_pool()
+    return {report_type: render_report(report_type, *render_args) for report_type in report_types}
+
+
+def merge_pdfs(parts: Sequence[Tuple[str, bytes]]) -> bytes:
+    """Concatenate (bookmark title, PDF bytes) parts into one PDF"""
+    writer = PdfWriter()
+    for title, pdf in parts:
+        writer.append(PdfReader(io.BytesIO(pdf)), outline_item=title)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def render_board_pack(tenant_id: str, company_name: str, start_date: date, end_date: date,
+                      entity: Optional[str] = None, workers: int = BOARD_PACK_WORKERS,
+                      db_manager=None) -> bytes:
+    """
+    DRE, balance sheet, cash flow and DMPL for one period merged into one PDF.
+
+    Statements not in the cache are rendered from a single report data fetch,
+    in parallel worker processes when workers > 0.
+    """
+    version = data_version(tenant_id)
+    pack_key = RenderedReportCache.key('board-pack', tenant_id, company_name, start_date, end_date, entity, version)
+    pack = report_cache.get(pack_key)
+    if pack is not None:
+        return pack
+
+    keys = {report_type: RenderedReportCache.key(report_type, tenant_id, company_name, start_date, end_date,
+                                                 entity, version)
+            for report_type in BOARD_PACK_REPORTS}
+    pdfs = {report_type: report_cache.get(key) for report_type, key in keys.items()}
+    missing = [report_type for report_type, pdf in pdfs.items() if pdf is None]
+
+    if missing:
+        if db_manager is None:
+            from database import db_manager
+        report_data = _web_ui_service('financial_report_data').fetch_report_data(
+            db_manager, tenant_id, start_date, end_date, entity
+        )
+        rendered = _render_reports(missing, (company_name, start_date, end_date, entity, tenant_id, report_data),
+                                   workers)
+        for report_type, pdf in rendered.items():
+            report_cache.put(keys[report_type], pdf)
+            pdfs[report_type] = pdf
+
+    pack = merge_pdfs([(REPORT_TYPES[report_type][3], pdfs[report_type]) for report_type in BOARD_PACK_REPORTS])
+    report_cache.put(pack_key, pack)
+    return pack
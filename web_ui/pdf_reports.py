@@ -7,9 +7,11 @@ Following Brazilian accounting standards (DRE, Balanço Patrimonial, etc.)
 
 import os
 import io
+import sys
+import importlib
 from datetime import datetime, date
+from functools import lru_cache
 from typing import Dict, Any, List, Optional, Union
-from dateutil.relativedelta import relativedelta
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, letter
@@ -21,6 +23,161 @@ from reportlab.platypus.tableofcontents import TableOfContents
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
 from reportlab.lib import colors
 
+
+# Delta branding colors
+BRAND_COLORS = {
+    'delta_blue': Color(0.2, 0.4, 0.8, 1),      # #3366CC
+    'delta_dark_blue': Color(0.1, 0.2, 0.6, 1), # #1A3399
+    'delta_grey': Color(0.4, 0.4, 0.4, 1),      # #666666
+    'light_grey': Color(0.9, 0.9, 0.9, 1),      # #E6E6E6
+    'text_primary': Color(0.2, 0.2, 0.2, 1),    # #333333
+    'text_secondary': Color(0.5, 0.5, 0.5, 1),  # #808080
+}
+
+
+@lru_cache(maxsize=None)
+def report_styles() -> Dict[str, ParagraphStyle]:
+    """Custom paragraph styles shared by every report (built once per process)"""
+    styles = getSampleStyleSheet()
+
+    custom_styles = {
+        'Title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Title'],
+            fontSize=18,
+            textColor=BRAND_COLORS['delta_dark_blue'],
+            alignment=TA_CENTER,
+            spaceAfter=20,
+            fontName='Helvetica-Bold'
+        ),
+        'CompanyName': ParagraphStyle(
+            'CompanyName',
+            parent=styles['Normal'],
+            fontSize=14,
+            textColor=BRAND_COLORS['delta_blue'],
+            alignment=TA_CENTER,
+            spaceAfter=5,
+            fontName='Helvetica-Bold'
+        ),
+        'Period': ParagraphStyle(
+            'Period',
+            parent=styles['Normal'],
+            fontSize=12,
+            textColor=BRAND_COLORS['text_secondary'],
+            alignment=TA_CENTER,
+            spaceAfter=20,
+            fontName='Helvetica'
+        ),
+        'SectionHeader': ParagraphStyle(
+            'SectionHeader',
+            parent=styles['Heading1'],
+            fontSize=14,
+            textColor=BRAND_COLORS['delta_dark_blue'],
+            alignment=TA_LEFT,
+            spaceAfter=10,
+            spaceBefore=20,
+            fontName='Helvetica-Bold'
+        ),
+        'SubHeader': ParagraphStyle(
+            'SubHeader',
+            parent=styles['Heading2'],
+            fontSize=12,
+            textColor=BRAND_COLORS['text_primary'],
+            alignment=TA_LEFT,
+            spaceAfter=8,
+            spaceBefore=10,
+            fontName='Helvetica-Bold'
+        ),
+        'TableData': ParagraphStyle(
+            'TableData',
+            parent=styles['Normal'],
+            fontSize=10,
+            textColor=BRAND_COLORS['text_primary'],
+            alignment=TA_LEFT,
+            fontName='Helvetica'
+        ),
+        'TableDataRight': ParagraphStyle(
+            'TableDataRight',
+            parent=styles['Normal'],
+            fontSize=10,
+            textColor=BRAND_COLORS['text_primary'],
+            alignment=TA_RIGHT,
+            fontName='Helvetica'
+        ),
+        'Footer': ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=BRAND_COLORS['text_secondary'],
+            alignment=TA_CENTER,
+            fontName='Helvetica'
+        )
+    }
+
+    return custom_styles
+
+
+@lru_cache(maxsize=None)
+def table_style(style_name: str = 'default', has_headers: bool = True) -> TableStyle:
+    """Shared table style variant ('default', 'financial', 'summary')"""
+    if style_name == 'summary':
+        # Summary table style with emphasis
+        return TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
+            ('BACKGROUND', (0, 0), (-1, -1), BRAND_COLORS['light_grey']),
+            ('GRID', (0, 0), (-1, -1), 1, BRAND_COLORS['delta_blue']),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
+        ])
+
+    style_commands = [
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 0.5, BRAND_COLORS['light_grey']),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 8),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]
+
+    if style_name == 'financial':
+        # Right align numbers (assuming last column is amounts)
+        style_commands.append(('ALIGN', (-1, 0), (-1, -1), 'RIGHT'))
+
+    if has_headers:
+        style_commands.extend([
+            ('BACKGROUND', (0, 0), (-1, 0), BRAND_COLORS['delta_blue']),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ])
+
+    return TableStyle(style_commands)
+
+
+SIGNATURE_TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('TOPPADDING', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+])
+
+
+def _financial_report_data():
+    """web_ui/services/financial_report_data (the root services/ package shadows web_ui's)"""
+    services_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services')
+    if services_path not in sys.path:
+        sys.path.insert(0, services_path)
+    return importlib.import_module('financial_report_data')
+
+
 class DeltaCFOReportTemplate:
     """
     Base template class for all Delta CFO financial reports
@@ -39,18 +196,12 @@ class DeltaCFOReportTemplate:
             'bottom': 2.5 * cm
         }
 
-        # Delta branding colors
-        self.colors = {
-            'delta_blue': Color(0.2, 0.4, 0.8, 1),      # #3366CC
-            'delta_dark_blue': Color(0.1, 0.2, 0.6, 1), # #1A3399
-            'delta_grey': Color(0.4, 0.4, 0.4, 1),      # #666666
-            'light_grey': Color(0.9, 0.9, 0.9, 1),      # #E6E6E6
-            'text_primary': Color(0.2, 0.2, 0.2, 1),    # #333333
-            'text_secondary': Color(0.5, 0.5, 0.5, 1),  # #808080
-        }
+        # Branding colors and styles are shared, process-wide; don't modify them
+        self.colors = BRAND_COLORS
+        self.styles = report_styles()
 
-        # Initialize styles
-        self.styles = self._create_styles()
+        # Shared period aggregates (see _load_report_data)
+        self.report_data = None
 
         # Buffer for PDF content
         self.buffer = io.BytesIO()
@@ -60,86 +211,6 @@ class DeltaCFOReportTemplate:
         now = datetime.now()
         return f"{now.strftime('%B %Y')}"
 
-    def _create_styles(self) -> Dict[str, ParagraphStyle]:
-        """Create custom paragraph styles for the report"""
-        styles = getSampleStyleSheet()
-
-        custom_styles = {
-            'Title': ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Title'],
-                fontSize=18,
-                textColor=self.colors['delta_dark_blue'],
-                alignment=TA_CENTER,
-                spaceAfter=20,
-                fontName='Helvetica-Bold'
-            ),
-            'CompanyName': ParagraphStyle(
-                'CompanyName',
-                parent=styles['Normal'],
-                fontSize=14,
-                textColor=self.colors['delta_blue'],
-                alignment=TA_CENTER,
-                spaceAfter=5,
-                fontName='Helvetica-Bold'
-            ),
-            'Period': ParagraphStyle(
-                'Period',
-                parent=styles['Normal'],
-                fontSize=12,
-                textColor=self.colors['text_secondary'],
-                alignment=TA_CENTER,
-                spaceAfter=20,
-                fontName='Helvetica'
-            ),
-            'SectionHeader': ParagraphStyle(
-                'SectionHeader',
-                parent=styles['Heading1'],
-                fontSize=14,
-                textColor=self.colors['delta_dark_blue'],
-                alignment=TA_LEFT,
-                spaceAfter=10,
-                spaceBefore=20,
-                fontName='Helvetica-Bold'
-            ),
-            'SubHeader': ParagraphStyle(
-                'SubHeader',
-                parent=styles['Heading2'],
-                fontSize=12,
-                textColor=self.colors['text_primary'],
-                alignment=TA_LEFT,
-                spaceAfter=8,
-                spaceBefore=10,
-                fontName='Helvetica-Bold'
-            ),
-            'TableData': ParagraphStyle(
-                'TableData',
-                parent=styles['Normal'],
-                fontSize=10,
-                textColor=self.colors['text_primary'],
-                alignment=TA_LEFT,
-                fontName='Helvetica'
-            ),
-            'TableDataRight': ParagraphStyle(
-                'TableDataRight',
-                parent=styles['Normal'],
-                fontSize=10,
-                textColor=self.colors['text_primary'],
-                alignment=TA_RIGHT,
-                fontName='Helvetica'
-            ),
-            'Footer': ParagraphStyle(
-                'Footer',
-                parent=styles['Normal'],
-                fontSize=8,
-                textColor=self.colors['text_secondary'],
-                alignment=TA_CENTER,
-                fontName='Helvetica'
-            )
-        }
-
-        return custom_styles
-
     def _create_header_footer(self, canvas, doc):
         """Create header and footer for each page"""
         canvas.saveState()
@@ -250,66 +321,15 @@ class DeltaCFOReportTemplate:
 
     def _get_default_table_style(self, has_headers: bool = True) -> TableStyle:
         """Default table style"""
-        style_commands = [
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, self.colors['light_grey']),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 8),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]
-
-        if has_headers:
-            style_commands.extend([
-                ('BACKGROUND', (0, 0), (-1, 0), self.colors['delta_blue']),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ])
-
-        return TableStyle(style_commands)
+        return table_style('default', has_headers)
 
     def _get_financial_table_style(self, has_headers: bool = True) -> TableStyle:
         """Financial table style with right-aligned numbers"""
-        style_commands = [
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, self.colors['light_grey']),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 8),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            # Right align numbers (assuming last column is amounts)
-            ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
-        ]
-
-        if has_headers:
-            style_commands.extend([
-                ('BACKGROUND', (0, 0), (-1, 0), self.colors['delta_blue']),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ])
-
-        return TableStyle(style_commands)
+        return table_style('financial', has_headers)
 
     def _get_summary_table_style(self, has_headers: bool = True) -> TableStyle:
         """Summary table style with emphasis"""
-        style_commands = [
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('BACKGROUND', (0, 0), (-1, -1), self.colors['light_grey']),
-            ('GRID', (0, 0), (-1, -1), 1, self.colors['delta_blue']),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
-        ]
-
-        return TableStyle(style_commands)
+        return table_style('summary', has_headers)
 
     def format_currency(self, amount: Union[float, int, None], currency: str = "R$") -> str:
         """Format currency values for display"""
@@ -376,6 +396,18 @@ class DeltaCFOReportTemplate:
 
         return pdf_content
 
+    def _load_report_data(self) -> Dict[str, Any]:
+        """
+        Period aggregates shared by all statements: passed in (board pack)
+        or fetched once with a single query
+        """
+        if self.report_data is None:
+            from database import db_manager
+            self.report_data = _financial_report_data().fetch_report_data(
+                db_manager, self.tenant_id, self.start_date, self.end_date, self.entity_filter
+            )
+        return self.report_data
+
     def add_section_break(self, story: List, title: str = None) -> None:
         """Add a section break with optional title"""
         story.append(Spacer(1, 20))
@@ -405,14 +437,7 @@ class DeltaCFOReportTemplate:
         ]
 
         signature_table = Table(signature_data, colWidths=[8*cm, 8*cm])
-        signature_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ]))
+        signature_table.setStyle(SIGNATURE_TABLE_STYLE)
 
         story.append(signature_table)
         story.append(Spacer(1, 20))
@@ -430,7 +455,7 @@ class DREReport(DeltaCFOReportTemplate):
     Following Brazilian accounting standards (CPC 26 / NBC TG 26)
     """
 
-    def __init__(self, company_name: str = "Delta Mining", start_date: date = None, end_date: date = None, entity_filter: str = None, tenant_id: str = 'delta'):
+    def __init__(self, company_name: str = "Delta Mining", start_date: date = None, end_date: date = None, entity_filter: str = None, tenant_id: str = 'delta', report_data: Dict[str, Any] = None):
         # Format period for display
         if start_date and end_date:
             if start_date.year == end_date.year:
@@ -455,80 +480,24 @@ class DREReport(DeltaCFOReportTemplate):
         self.end_date = end_date or date.today()
         self.entity_filter = entity_filter
         self.tenant_id = tenant_id
+        self.report_data = report_data
 
         # Initialize financial data
         self.financial_data = None
 
     def _fetch_financial_data(self) -> Dict[str, Any]:
-        """Fetch financial data from the reporting APIs"""
-        from database import db_manager
-
+        """Fetch financial data from the shared report data provider"""
         try:
-            # Get P&L data from the monthly-pl endpoint logic
-            params = [self.start_date.isoformat(), self.end_date.isoformat()]
-            tenant_params = [self.tenant_id]
-            entity_params = []
-
-            if self.entity_filter:
-                entity_filter_condition = "AND classified_entity = %s"
-                entity_params = [self.entity_filter]
-            else:
-                entity_filter_condition = ""
-
-            # Revenue query
-            revenue_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN COALESCE(usd_equivalent, amount, 0) ELSE 0 END) as total_revenue,
-                    SUM(CASE WHEN amount < 0 THEN ABS(COALESCE(usd_equivalent, amount, 0)) ELSE 0 END) as total_expenses
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date BETWEEN %s AND %s
-                AND archived = FALSE
-                {entity_filter_condition}
-            """
-
-            all_params = tenant_params + params + entity_params
-            result = db_manager.execute_query(revenue_query, tuple(all_params), fetch_one=True)
-
-            total_revenue = float(result.get('total_revenue', 0) or 0) if result else 0
-            total_expenses = float(result.get('total_expenses', 0) or 0) if result else 0
-
-            # Get detailed breakdown by category
-            category_query = f"""
-                SELECT
-                    accounting_category,
-                    classified_entity,
-                    SUM(CASE WHEN amount > 0 THEN COALESCE(usd_equivalent, amount, 0) ELSE 0 END) as revenue,
-                    SUM(CASE WHEN amount < 0 THEN ABS(COALESCE(usd_equivalent, amount, 0)) ELSE 0 END) as expenses
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date BETWEEN %s AND %s
-                AND archived = FALSE
-                {entity_filter_condition}
-                GROUP BY accounting_category, classified_entity
-                ORDER BY revenue DESC, expenses DESC
-            """
-
-            categories = db_manager.execute_query(category_query, tuple(all_params), fetch_all=True)
-
-            # Previous period for comparison
-            prev_start = self.start_date - relativedelta(years=1)
-            prev_end = self.end_date - relativedelta(years=1)
-
-            prev_params = tenant_params + [prev_start.isoformat(), prev_end.isoformat()] + entity_params
-            prev_result = db_manager.execute_query(revenue_query, tuple(prev_params), fetch_one=True)
-
-            prev_revenue = float(prev_result.get('total_revenue', 0) or 0) if prev_result else 0
-            prev_expenses = float(prev_result.get('total_expenses', 0) or 0) if prev_result else 0
+            data = self._load_report_data()
 
             return {
-                'total_revenue': total_revenue,
-                'total_expenses': total_expenses,
-                'net_result': total_revenue - total_expenses,
-                'prev_revenue': prev_revenue,
-                'prev_expenses': prev_expenses,
-                'prev_net_result': prev_revenue - prev_expenses,
-                'categories': categories or []
+                'total_revenue': data['total_revenue'],
+                'total_expenses': data['total_expenses'],
+                'net_result': data['net_result'],
+                'prev_revenue': data['prev_revenue'],
+                'prev_expenses': data['prev_expenses'],
+                'prev_net_result': data['prev_net_result'],
+                'categories': data['categories']
             }
 
         except Exception as e:
@@ -804,7 +773,7 @@ class CashFlowReport(DeltaCFOReportTemplate):
     Following Brazilian accounting standards (CPC 03 / NBC TG 03)
     """
 
-    def __init__(self, company_name: str = "Delta Mining", start_date: date = None, end_date: date = None, entity_filter: str = None, tenant_id: str = 'delta'):
+    def __init__(self, company_name: str = "Delta Mining", start_date: date = None, end_date: date = None, entity_filter: str = None, tenant_id: str = 'delta', report_data: Dict[str, Any] = None):
         # Format period for display
         if start_date and end_date:
             if start_date.year == end_date.year:
@@ -829,75 +798,25 @@ class CashFlowReport(DeltaCFOReportTemplate):
         self.end_date = end_date or date.today()
         self.entity_filter = entity_filter
         self.tenant_id = tenant_id
+        self.report_data = report_data
 
         # Initialize cash flow data
         self.cash_flow_data = None
 
     def _fetch_cash_flow_data(self) -> Dict[str, Any]:
-        """Fetch cash flow data from the database"""
-        from database import db_manager
-
+        """Fetch cash flow data from the shared report data provider"""
         try:
-            # Get cash flow data
-            params = [self.start_date.isoformat(), self.end_date.isoformat()]
-            tenant_params = [self.tenant_id]
-            entity_params = []
-
-            if self.entity_filter:
-                entity_filter_condition = "AND classified_entity = %s"
-                entity_params = [self.entity_filter]
-            else:
-                entity_filter_condition = ""
-
-            # Cash flows from operating activities
-            operating_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN COALESCE(usd_equivalent, amount, 0) ELSE 0 END) as cash_receipts,
-                    SUM(CASE WHEN amount < 0 THEN ABS(COALESCE(usd_equivalent, amount, 0)) ELSE 0 END) as cash_payments
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date BETWEEN %s AND %s
-                AND archived = FALSE
-                {entity_filter_condition}
-            """
-
-            # Cash flows from investing activities
-            investing_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN 0 ELSE 0 END) as investing_inflows,
-                    SUM(CASE WHEN amount < 0 THEN 0 ELSE 0 END) as investing_outflows
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date BETWEEN %s AND %s
-                AND archived = FALSE
-                {entity_filter_condition}
-            """
-
-            # Cash flows from financing activities
-            financing_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN 0 ELSE 0 END) as financing_inflows,
-                    SUM(CASE WHEN amount < 0 THEN 0 ELSE 0 END) as financing_outflows
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date BETWEEN %s AND %s
-                AND archived = FALSE
-                {entity_filter_condition}
-            """
-
-            all_params = tenant_params + params + entity_params
-
-            operating_result = db_manager.execute_query(operating_query, tuple(all_params), fetch_one=True)
-            investing_result = db_manager.execute_query(investing_query, tuple(all_params), fetch_one=True)
-            financing_result = db_manager.execute_query(financing_query, tuple(all_params), fetch_one=True)
-
-            # Extract results with null safety
-            cash_receipts = float(operating_result.get('cash_receipts', 0) or 0) if operating_result else 0
-            cash_payments = float(operating_result.get('cash_payments', 0) or 0) if operating_result else 0
-            investing_inflows = float(investing_result.get('investing_inflows', 0) or 0) if investing_result else 0
-            investing_outflows = float(investing_result.get('investing_outflows', 0) or 0) if investing_result else 0
-            financing_inflows = float(financing_result.get('financing_inflows', 0) or 0) if financing_result else 0
-            financing_outflows = float(financing_result.get('financing_outflows', 0) or 0) if financing_result else 0
+            data = self._load_report_data()
+
+            # Operating activities: all receipts and payments of the period
+            cash_receipts = data['total_revenue']
+            cash_payments = data['total_expenses']
+
+            # Investing and financing activities aren't classified yet
+            investing_inflows = 0
+            investing_outflows = 0
+            financing_inflows = 0
+            financing_outflows = 0
 
             # Calculate net cash flows
             net_operating = cash_receipts - cash_payments
@@ -905,33 +824,10 @@ class CashFlowReport(DeltaCFOReportTemplate):
             net_financing = financing_inflows - financing_outflows
             net_cash_change = net_operating + net_investing + net_financing
 
-            # Get beginning cash balance (simplified as total cash up to start date)
-            beginning_cash_query = f"""
-                SELECT SUM(CASE WHEN amount > 0 THEN COALESCE(usd_equivalent, amount, 0) ELSE 0 END) as beginning_cash
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date < %s
-                AND archived = FALSE
-                AND LOWER(COALESCE(description, classified_entity, '')) LIKE ANY(ARRAY['%cash%', '%bank%', '%deposit%'])
-                {entity_filter_condition}
-            """
-
-            beginning_params = tenant_params + [self.start_date.isoformat()] + entity_params
-            beginning_result = db_manager.execute_query(beginning_cash_query, tuple(beginning_params), fetch_one=True)
-            beginning_cash = float(beginning_result.get('beginning_cash', 0) or 0) if beginning_result else 0
-
+            # Beginning cash balance (simplified as cash/bank receipts before the start date)
+            beginning_cash = data['beginning_cash']
             ending_cash = beginning_cash + net_cash_change
 
-            # Previous period comparison
-            prev_start = self.start_date - relativedelta(years=1)
-            prev_end = self.end_date - relativedelta(years=1)
-            prev_params = tenant_params + [prev_start.isoformat(), prev_end.isoformat()] + entity_params
-
-            prev_operating_result = db_manager.execute_query(operating_query, tuple(prev_params), fetch_one=True)
-            prev_cash_receipts = float(prev_operating_result.get('cash_receipts', 0) or 0) if prev_operating_result else 0
-            prev_cash_payments = float(prev_operating_result.get('cash_payments', 0) or 0) if prev_operating_result else 0
-            prev_net_operating = prev_cash_receipts - prev_cash_payments
-
             return {
                 'cash_receipts': cash_receipts,
                 'cash_payments': cash_payments,
@@ -945,7 +841,7 @@ class CashFlowReport(DeltaCFOReportTemplate):
                 'net_cash_change': net_cash_change,
                 'beginning_cash': beginning_cash,
                 'ending_cash': ending_cash,
-                'prev_net_operating': prev_net_operating
+                'prev_net_operating': data['prev_net_result']
             }
 
         except Exception as e:
@@ -1162,7 +1058,7 @@ class BalanceSheetReport(DeltaCFOReportTemplate):
     Following Brazilian accounting standards (CPC 26 / NBC TG 26)
     """
 
-    def __init__(self, company_name: str = "Delta Mining", start_date: date = None, end_date: date = None, entity_filter: str = None, tenant_id: str = 'delta'):
+    def __init__(self, company_name: str = "Delta Mining", start_date: date = None, end_date: date = None, entity_filter: str = None, tenant_id: str = 'delta', report_data: Dict[str, Any] = None):
         # Format period for display
         if end_date:
             period = f"Posição em {end_date.strftime('%d/%m/%Y')}"
@@ -1179,68 +1075,22 @@ class BalanceSheetReport(DeltaCFOReportTemplate):
         self.end_date = end_date or date.today()
         self.entity_filter = entity_filter
         self.tenant_id = tenant_id
+        self.report_data = report_data
 
         # Initialize financial data
         self.financial_data = None
 
     def _fetch_balance_sheet_data(self) -> Dict[str, Any]:
-        """Fetch balance sheet data from the database"""
-        from database import db_manager
-
+        """Fetch balance sheet data from the shared report data provider"""
         try:
-            # Get balance sheet data
-            params = [self.end_date.isoformat()]
-            tenant_params = [self.tenant_id]
-            entity_params = []
-
-            if self.entity_filter:
-                entity_filter_condition = "AND classified_entity = %s"
-                entity_params = [self.entity_filter]
-            else:
-                entity_filter_condition = ""
-
-            # Total assets (simplified - based on positive USD equivalent)
-            assets_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN COALESCE(usd_equivalent, amount, 0) ELSE 0 END) as total_assets
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date <= %s
-                AND archived = FALSE
-                {entity_filter_condition}
-            """
-
-            # Total liabilities (simplified - based on negative USD equivalent)
-            liabilities_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount < 0 THEN ABS(COALESCE(usd_equivalent, amount, 0)) ELSE 0 END) as total_liabilities
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date <= %s
-                AND archived = FALSE
-                {entity_filter_condition}
-            """
-
-            all_params = tenant_params + params + entity_params
-            assets_result = db_manager.execute_query(assets_query, tuple(all_params), fetch_one=True)
-            liabilities_result = db_manager.execute_query(liabilities_query, tuple(all_params), fetch_one=True)
-
-            total_assets = float(assets_result.get('total_assets', 0) or 0) if assets_result else 0
-            total_liabilities = float(liabilities_result.get('total_liabilities', 0) or 0) if liabilities_result else 0
-
-            # Calculate equity
-            total_equity = total_assets - total_liabilities
-
-            # Previous period comparison (1 year ago)
-            prev_end = self.end_date - relativedelta(years=1)
-            prev_params = tenant_params + [prev_end.isoformat()] + entity_params
-
-            prev_assets_result = db_manager.execute_query(assets_query, tuple(prev_params), fetch_one=True)
-            prev_liabilities_result = db_manager.execute_query(liabilities_query, tuple(prev_params), fetch_one=True)
-
-            prev_total_assets = float(prev_assets_result.get('total_assets', 0) or 0) if prev_assets_result else 0
-            prev_total_liabilities = float(prev_liabilities_result.get('total_liabilities', 0) or 0) if prev_liabilities_result else 0
-            prev_total_equity = prev_total_assets - prev_total_liabilities
+            data = self._load_report_data()
+
+            # Assets and liabilities are simplified to the accumulated positive and
+            # negative USD amounts up to the balance date (and one year earlier)
+            total_assets = data['total_assets']
+            total_liabilities = data['total_liabilities']
+            prev_total_assets = data['prev_total_assets']
+            prev_total_liabilities = data['prev_total_liabilities']
 
             return {
                 'total_assets': total_assets,
@@ -1249,14 +1099,14 @@ class BalanceSheetReport(DeltaCFOReportTemplate):
                 'total_liabilities': total_liabilities,
                 'current_liabilities': total_liabilities * 0.7,  # Estimated split
                 'non_current_liabilities': total_liabilities * 0.3,
-                'total_equity': total_equity,
+                'total_equity': data['total_equity'],
                 'prev_total_assets': prev_total_assets,
                 'prev_current_assets': prev_total_assets * 0.6,
                 'prev_non_current_assets': prev_total_assets * 0.4,
                 'prev_total_liabilities': prev_total_liabilities,
                 'prev_current_liabilities': prev_total_liabilities * 0.7,
                 'prev_non_current_liabilities': prev_total_liabilities * 0.3,
-                'prev_total_equity': prev_total_equity
+                'prev_total_equity': data['prev_total_equity']
             }
 
         except Exception as e:
@@ -1466,361 +1316,3 @@ class BalanceSheetReport(DeltaCFOReportTemplate):
 
         # Generate PDF
         return self.generate_pdf(story)
-
-
-class CashFlowReport(DeltaCFOReportTemplate):
-    """
-    Demonstração de Fluxo de Caixa (DFC) - Cash Flow Statement
-    Following Brazilian accounting standards (CPC 03 / NBC TG 03)
-    """
-
-    def __init__(self, company_name: str = "Delta Mining", start_date: date = None, end_date: date = None, entity_filter: str = None, tenant_id: str = 'delta'):
-        # Format period for display
-        if start_date and end_date:
-            if start_date.year == end_date.year:
-                if start_date == date(start_date.year, 1, 1) and end_date == date(end_date.year, 12, 31):
-                    # Full year
-                    period = f"Exercício Social de {start_date.year}"
-                else:
-                    # Partial year
-                    period = f"{start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
-            else:
-                period = f"{start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
-        else:
-            period = f"Exercício Social de {datetime.now().year}"
-
-        super().__init__(
-            title="Demonstração de Fluxo de Caixa (DFC)",
-            company_name=company_name,
-            report_period=period
-        )
-
-        self.start_date = start_date or date(datetime.now().year, 1, 1)
-        self.end_date = end_date or date.today()
-        self.entity_filter = entity_filter
-        self.tenant_id = tenant_id
-
-        # Initialize cash flow data
-        self.cash_flow_data = None
-
-    def _fetch_cash_flow_data(self) -> Dict[str, Any]:
-        """Fetch cash flow data from the database"""
-        from database import db_manager
-
-        try:
-            # Get cash flow data
-            params = [self.start_date.isoformat(), self.end_date.isoformat()]
-            tenant_params = [self.tenant_id]
-            entity_params = []
-
-            if self.entity_filter:
-                entity_filter_condition = "AND classified_entity = %s"
-                entity_params = [self.entity_filter]
-            else:
-                entity_filter_condition = ""
-
-            # Cash flows from operating activities
-            operating_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN COALESCE(usd_equivalent, amount, 0) ELSE 0 END) as cash_receipts,
-                    SUM(CASE WHEN amount < 0 THEN ABS(COALESCE(usd_equivalent, amount, 0)) ELSE 0 END) as cash_payments
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date BETWEEN %s AND %s
-                AND archived = FALSE
-                {entity_filter_condition}
-            """
-
-            # Cash flows from investing activities
-            investing_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN 0 ELSE 0 END) as investing_inflows,
-                    SUM(CASE WHEN amount < 0 THEN 0 ELSE 0 END) as investing_outflows
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date BETWEEN %s AND %s
-                AND archived = FALSE
-                {entity_filter_condition}
-            """
-
-            # Cash flows from financing activities
-            financing_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN 0 ELSE 0 END) as financing_inflows,
-                    SUM(CASE WHEN amount < 0 THEN 0 ELSE 0 END) as financing_outflows
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date BETWEEN %s AND %s
-                AND archived = FALSE
-                {entity_filter_condition}
-            """
-
-            all_params = tenant_params + params + entity_params
-
-            operating_result = db_manager.execute_query(operating_query, tuple(all_params), fetch_one=True)
-            investing_result = db_manager.execute_query(investing_query, tuple(all_params), fetch_one=True)
-            financing_result = db_manager.execute_query(financing_query, tuple(all_params), fetch_one=True)
-
-            # Extract results with null safety
-            cash_receipts = float(operating_result.get('cash_receipts', 0) or 0) if operating_result else 0
-            cash_payments = float(operating_result.get('cash_payments', 0) or 0) if operating_result else 0
-            investing_inflows = float(investing_result.get('investing_inflows', 0) or 0) if investing_result else 0
-            investing_outflows = float(investing_result.get('investing_outflows', 0) or 0) if investing_result else 0
-            financing_inflows = float(financing_result.get('financing_inflows', 0) or 0) if financing_result else 0
-            financing_outflows = float(financing_result.get('financing_outflows', 0) or 0) if financing_result else 0
-
-            # Calculate net cash flows
-            net_operating = cash_receipts - cash_payments
-            net_investing = investing_inflows - investing_outflows
-            net_financing = financing_inflows - financing_outflows
-            net_cash_change = net_operating + net_investing + net_financing
-
-            # Get beginning cash balance (simplified as total cash up to start date)
-            beginning_cash_query = f"""
-                SELECT SUM(CASE WHEN amount > 0 THEN COALESCE(usd_equivalent, amount, 0) ELSE 0 END) as beginning_cash
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date < %s
-                AND archived = FALSE
-                AND LOWER(COALESCE(description, classified_entity, '')) LIKE ANY(ARRAY['%cash%', '%bank%', '%deposit%'])
-                {entity_filter_condition}
-            """
-
-            beginning_params = tenant_params + [self.start_date.isoformat()] + entity_params
-            beginning_result = db_manager.execute_query(beginning_cash_query, tuple(beginning_params), fetch_one=True)
-            beginning_cash = float(beginning_result.get('beginning_cash', 0) or 0) if beginning_result else 0
-
-            ending_cash = beginning_cash + net_cash_change
-
-            # Previous period comparison
-            prev_start = self.start_date - relativedelta(years=1)
-            prev_end = self.end_date - relativedelta(years=1)
-            prev_params = tenant_params + [prev_start.isoformat(), prev_end.isoformat()] + entity_params
-
-            prev_operating_result = db_manager.execute_query(operating_query, tuple(prev_params), fetch_one=True)
-            prev_cash_receipts = float(prev_operating_result.get('cash_receipts', 0) or 0) if prev_operating_result else 0
-            prev_cash_payments = float(prev_operating_result.get('cash_payments', 0) or 0) if prev_operating_result else 0
-            prev_net_operating = prev_cash_receipts - prev_cash_payments
-
-            return {
-                'cash_receipts': cash_receipts,
-                'cash_payments': cash_payments,
-                'net_operating': net_operating,
-                'investing_inflows': investing_inflows,
-                'investing_outflows': investing_outflows,
-                'net_investing': net_investing,
-                'financing_inflows': financing_inflows,
-                'financing_outflows': financing_outflows,
-                'net_financing': net_financing,
-                'net_cash_change': net_cash_change,
-                'beginning_cash': beginning_cash,
-                'ending_cash': ending_cash,
-                'prev_net_operating': prev_net_operating
-            }
-
-        except Exception as e:
-            print(f"Error fetching cash flow data: {e}")
-            return {
-                'cash_receipts': 0,
-                'cash_payments': 0,
-                'net_operating': 0,
-                'investing_inflows': 0,
-                'investing_outflows': 0,
-                'net_investing': 0,
-                'financing_inflows': 0,
-                'financing_outflows': 0,
-                'net_financing': 0,
-                'net_cash_change': 0,
-                'beginning_cash': 0,
-                'ending_cash': 0,
-                'prev_net_operating': 0
-            }
-
-    def _create_cash_flow_table(self, cash_flow_data: Dict[str, Any]) -> Table:
-        """Create the main Cash Flow table following Brazilian standards"""
-
-        current_year = self.end_date.year
-        previous_year = current_year - 1
-
-        # Table headers
-        headers = ["DEMONSTRAÇÃO DE FLUXO DE CAIXA", f"{current_year}", f"{previous_year}"]
-
-        # Table data following DFC structure with improved spacing
-        table_data = [
-            headers,
-            # Operating Activities section
-            ["FLUXO DE CAIXA DAS ATIVIDADES OPERACIONAIS", "", ""],
-            ["Recebimentos de clientes", self.format_currency(cash_flow_data['cash_receipts']), ""],
-            ["Pagamentos a fornecedores e empregados", f"({self.format_currency(cash_flow_data['cash_payments']).replace('R$ ', '')})", ""],
-            ["Caixa líquido gerado pelas atividades operacionais", self.format_currency(cash_flow_data['net_operating']), self.format_currency(cash_flow_data['prev_net_operating'])],
-            # Investing Activities section
-            ["FLUXO DE CAIXA DAS ATIVIDADES DE INVESTIMENTO", "", ""],
-            ["Recebimentos por venda de ativos", self.format_currency(cash_flow_data['investing_inflows']), ""],
-            ["Pagamentos por aquisição de ativos", f"({self.format_currency(cash_flow_data['investing_outflows']).replace('R$ ', '')})", ""],
-            ["Caixa líquido usado nas atividades de investimento", self.format_currency(cash_flow_data['net_investing']), ""],
-            # Financing Activities section
-            ["FLUXO DE CAIXA DAS ATIVIDADES DE FINANCIAMENTO", "", ""],
-            ["Recebimentos de empréstimos", self.format_currency(cash_flow_data['financing_inflows']), ""],
-            ["Pagamentos de empréstimos e dividendos", f"({self.format_currency(cash_flow_data['financing_outflows']).replace('R$ ', '')})", ""],
-            ["Caixa líquido usado nas atividades de financiamento", self.format_currency(cash_flow_data['net_financing']), ""],
-            # Net change and reconciliation
-            ["AUMENTO (DIMINUIÇÃO) LÍQUIDO DE CAIXA", self.format_currency(cash_flow_data['net_cash_change']), ""],
-            ["Caixa e equivalentes no início do período", self.format_currency(cash_flow_data['beginning_cash']), ""],
-            ["CAIXA E EQUIVALENTES NO FINAL DO PERÍODO", self.format_currency(cash_flow_data['ending_cash']), ""],
-        ]
-
-        # Create table with improved column widths for better readability
-        col_widths = [11*cm, 3.5*cm, 3.5*cm]
-        table = Table(table_data, colWidths=col_widths)
-
-        # Apply custom Cash Flow styling with improved spacing
-        table_style = TableStyle([
-            # Header row styling
-            ('BACKGROUND', (0, 0), (-1, 0), self.colors['delta_blue']),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-
-            # General styling with improved spacing
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('LEFTPADDING', (0, 0), (-1, -1), 12),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-
-            # Amount columns alignment
-            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
-
-            # Main section headers (bold)
-            ('FONTNAME', (0, 1), (0, 1), 'Helvetica-Bold'),  # ATIVIDADES OPERACIONAIS
-            ('FONTNAME', (0, 4), (0, 4), 'Helvetica-Bold'),  # Líquido operacional
-            ('FONTNAME', (0, 5), (0, 5), 'Helvetica-Bold'),  # ATIVIDADES DE INVESTIMENTO
-            ('FONTNAME', (0, 8), (0, 8), 'Helvetica-Bold'),  # Líquido investimento
-            ('FONTNAME', (0, 9), (0, 9), 'Helvetica-Bold'),  # ATIVIDADES DE FINANCIAMENTO
-            ('FONTNAME', (0, 12), (0, 12), 'Helvetica-Bold'), # Líquido financiamento
-            ('FONTNAME', (0, 13), (0, 13), 'Helvetica-Bold'), # AUMENTO LÍQUIDO
-            ('FONTNAME', (0, 15), (0, 15), 'Helvetica-Bold'), # CAIXA FINAL
-
-            # Section highlighting with better visual separation
-            ('BACKGROUND', (0, 1), (-1, 1), self.colors['light_grey']),   # ATIVIDADES OPERACIONAIS
-            ('BACKGROUND', (0, 4), (-1, 4), self.colors['light_grey']),   # Líquido operacional
-            ('BACKGROUND', (0, 5), (-1, 5), self.colors['light_grey']),   # ATIVIDADES DE INVESTIMENTO
-            ('BACKGROUND', (0, 8), (-1, 8), self.colors['light_grey']),   # Líquido investimento
-            ('BACKGROUND', (0, 9), (-1, 9), self.colors['light_grey']),   # ATIVIDADES DE FINANCIAMENTO
-            ('BACKGROUND', (0, 12), (-1, 12), self.colors['light_grey']),  # Líquido financiamento
-            ('BACKGROUND', (0, 13), (-1, 13), self.colors['light_grey']),  # AUMENTO LÍQUIDO
-            ('BACKGROUND', (0, 15), (-1, 15), self.colors['delta_blue']),  # CAIXA FINAL
-            ('TEXTCOLOR', (0, 15), (-1, 15), colors.white),                # CAIXA FINAL text color
-
-            # Enhanced spacing with line separators for major sections
-            ('LINEABOVE', (0, 4), (-1, 4), 1, self.colors['delta_grey']),   # Above líquido operacional
-            ('LINEABOVE', (0, 5), (-1, 5), 1, self.colors['delta_grey']),   # Above ATIVIDADES DE INVESTIMENTO
-            ('LINEABOVE', (0, 8), (-1, 8), 1, self.colors['delta_grey']),   # Above líquido investimento
-            ('LINEABOVE', (0, 9), (-1, 9), 1, self.colors['delta_grey']),   # Above ATIVIDADES DE FINANCIAMENTO
-            ('LINEABOVE', (0, 12), (-1, 12), 1, self.colors['delta_grey']),  # Above líquido financiamento
-            ('LINEABOVE', (0, 13), (-1, 13), 1, self.colors['delta_grey']),  # Above AUMENTO LÍQUIDO
-            ('LINEABOVE', (0, 15), (-1, 15), 2, self.colors['delta_blue']),  # Above CAIXA FINAL
-
-            # Borders
-            ('GRID', (0, 0), (-1, -1), 0.5, self.colors['delta_grey']),
-            ('LINEBELOW', (0, 0), (-1, 0), 2, self.colors['delta_blue']),  # Header border
-            ('LINEBELOW', (0, 15), (-1, 15), 2, self.colors['delta_blue']), # Final cash border
-        ])
-
-        table.setStyle(table_style)
-        return table
-
-    def _create_cash_flow_analysis_section(self, cash_flow_data: Dict[str, Any]) -> List:
-        """Create analysis section with key cash flow indicators"""
-        story = []
-
-        self.add_section_break(story, "Análise de Indicadores")
-
-        # Calculate key ratios
-        net_operating = cash_flow_data['net_operating']
-        net_investing = cash_flow_data['net_investing']
-        net_financing = cash_flow_data['net_financing']
-        beginning_cash = cash_flow_data['beginning_cash']
-
-        if beginning_cash > 0:
-            cash_flow_to_sales_ratio = (net_operating / beginning_cash) * 100
-        else:
-            cash_flow_to_sales_ratio = 0
-
-        # Previous year comparison
-        prev_net_operating = cash_flow_data['prev_net_operating']
-        if prev_net_operating != 0:
-            operating_growth = ((net_operating - prev_net_operating) / abs(prev_net_operating)) * 100
-        else:
-            operating_growth = 0
-
-        # Cash quality indicators
-        if net_operating > 0:
-            free_cash_flow = net_operating + net_investing
-            cash_coverage = "Positivo" if net_operating > 0 else "Negativo"
-        else:
-            free_cash_flow = net_operating + net_investing
-            cash_coverage = "Insuficiente"
-
-        # Analysis table
-        analysis_data = [
-            ["Indicador", "Valor", "Interpretação"],
-            ["Fluxo Operacional", self.format_currency(net_operating), cash_coverage],
-            ["Fluxo de Caixa Livre", self.format_currency(free_cash_flow), "Capacidade de autofinanciamento"],
-            ["Crescimento Operacional", self.format_percentage(operating_growth), "Variação anual"],
-            ["Qualidade dos Lucros", f"{cash_flow_to_sales_ratio:.1f}%".replace('.', ','), "Conversão caixa/vendas"],
-        ]
-
-        analysis_table = self.create_table(analysis_data, style_name='summary')
-        story.append(analysis_table)
-
-        return story
-
-    def generate_cash_flow_report(self) -> bytes:
-        """Generate the complete Cash Flow report"""
-
-        # Fetch data
-        self.cash_flow_data = self._fetch_cash_flow_data()
-
-        # Build story
-        story = []
-
-        # Title section
-        story.extend(self.create_title_section())
-
-        # Entity filter info
-        if self.entity_filter:
-            entity_info = f"Entidade: {self.entity_filter}"
-            story.append(Paragraph(entity_info, self.styles['Period']))
-            story.append(Spacer(1, 10))
-
-        # Main Cash Flow table
-        cash_flow_table = self._create_cash_flow_table(self.cash_flow_data)
-        story.append(cash_flow_table)
-
-        # Analysis section
-        story.extend(self._create_cash_flow_analysis_section(self.cash_flow_data))
-
-        # Notes section
-        self.add_section_break(story, "Notas Explicativas")
-
-        notes = [
-            "1. Os valores estão expressos em Dólares Americanos (USD).",
-            "2. A classificação segue o método direto de fluxo de caixa.",
-            "3. Atividades operacionais incluem recebimentos e pagamentos operacionais.",
-            "4. Atividades de investimento referem-se a ativos de longo prazo.",
-            "5. Atividades de financiamento incluem empréstimos e distribuições.",
-            "6. Este relatório foi gerado automaticamente pelo Delta CFO Agent."
-        ]
-
-        for note in notes:
-            story.append(Paragraph(note, self.styles['TableData']))
-            story.append(Spacer(1, 5))
-
-        # Signature section
-        story.extend(self.create_signature_section())
-
-        # Generate PDF
-        return self.generate_pdf(story)
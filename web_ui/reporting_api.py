@@ -13,12 +13,6 @@ from datetime import datetime, date, timedelta
 from flask import request, jsonify, send_file, make_response
 from decimal import Decimal
 import io
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.colors import HexColor
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -26,21 +20,28 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from reporting.financial_statements import FinancialStatementsGenerator
 from reporting.cash_dashboard import CashDashboard
 from database import db_manager
-from pdf_reports import DREReport, BalanceSheetReport
-from cash_flow_report_new import CashFlowReport
-from dmpl_report_new import DMPLReport
 from tenant_context import get_current_tenant_id
 
 logger = logging.getLogger(__name__)
 
 
+def _web_ui_service(module_name):
+    """Import a web_ui/services module (the root services/ package shadows web_ui's)"""
+    import importlib
+    services_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services')
+    if services_path not in sys.path:
+        sys.path.insert(0, services_path)
+    return importlib.import_module(module_name)
+
+
 def extract_keywords_from_transactions(transactions, node_type='expense'):
     """
     Extract and group transactions by keywords found in justification/destination fields.
 
     This function analyzes transaction justifications to identify key entities (vendors,
     employees, partners) and groups transactions by these entities to show what makes up
-    a particular expense or revenue category.
+    a particular expense or revenue category. The Sankey breakdown endpoint reads the
+    same keywords from the precomputed per-tenant index (services/sankey_engine.py).
 
     Args:
         transactions: List of transaction dictionaries
@@ -54,67 +55,14 @@ def extract_keywords_from_transactions(transactions, node_type='expense'):
             - percentage: Percentage of total
             - sample_transactions: Up to 3 example transactions
     """
-    import re
     from collections import defaultdict
 
+    sankey_engine = _web_ui_service('sankey_engine')
     keyword_groups = defaultdict(lambda: {'amount': 0, 'count': 0, 'transactions': []})
 
     for txn in transactions:
-        keywords = []
-
-        # Strategy 1: Extract from justification field (most detailed)
-        justification = str(txn.get('justification') or '')
-        if justification:
-            # Pattern: "payment to X" or "invoice from X"
-            matches = re.findall(r'(?:payment|invoice|bill|transfer|salary|wage)\s+(?:to|from|for)\s+([A-Z][A-Za-z0-9\s&\.\-]{2,40})', justification, re.IGNORECASE)
-            keywords.extend(matches)
-
-            # Pattern: Person names (capitalized first and last name)
-            name_matches = re.findall(r'\b([A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)\b', justification)
-            keywords.extend(name_matches)
-
-            # Pattern: All-caps entities (company names like ANDE, AWS, etc.)
-            company_matches = re.findall(r'\b([A-Z]{2,}(?:\s+[A-Z]{2,})?)\b', justification)
-            keywords.extend(company_matches)
-
-        # Strategy 2: Use destination field (for expenses) or origin (for revenue)
-        if node_type == 'expense' and txn.get('destination'):
-            dest = str(txn.get('destination', '')).strip()
-            if dest and len(dest) > 1:
-                keywords.append(dest)
-        elif node_type == 'revenue' and txn.get('origin'):
-            orig = str(txn.get('origin', '')).strip()
-            if orig and len(orig) > 1:
-                keywords.append(orig)
-
-        # Strategy 3: Parse description field as fallback
-        if not keywords:
-            description = str(txn.get('description') or '')
-            # Extract capitalized words/phrases
-            desc_matches = re.findall(r'\b([A-Z][A-Za-z\s]{3,30})\b', description)
-            keywords.extend(desc_matches)
-
-        # Default to "Uncategorized" if no keywords found
-        if not keywords:
-            keywords = ['Uncategorized']
-
-        # Clean and deduplicate keywords
-        cleaned_keywords = set()
-        for kw in keywords:
-            kw = kw.strip()
-            # Remove common noise words
-            if kw.lower() not in ['the', 'and', 'for', 'with', 'from', 'payment', 'invoice', 'bill']:
-                # Limit length and clean up
-                kw = kw[:50]
-                if len(kw) >= 2:  # At least 2 characters
-                    cleaned_keywords.add(kw)
-
-        if not cleaned_keywords:
-            cleaned_keywords = {'Other'}
-
-        # Group by keyword
         amount = float(txn.get('amount', 0))
-        for keyword in cleaned_keywords:
+        for keyword in sankey_engine.transaction_keywords(txn, node_type):
             keyword_groups[keyword]['amount'] += amount
             keyword_groups[keyword]['count'] += 1
             # Store up to 3 example transactions per keyword
@@ -125,28 +73,18 @@ def extract_keywords_from_transactions(transactions, node_type='expense'):
                     'description': str(txn.get('description', ''))[:80]
                 })
 
-    # Sort by total amount (absolute value)
+    # Top 15 keywords by total amount (absolute value)
     sorted_groups = sorted(
         keyword_groups.items(),
         key=lambda x: abs(x[1]['amount']),
         reverse=True
-    )[:15]  # Top 15 keywords
-
-    # Calculate total for percentage
-    total_amount = sum(abs(grp[1]['amount']) for grp in sorted_groups)
+    )[:15]
 
-    # Format output
-    breakdown = []
-    for keyword, data in sorted_groups:
-        breakdown.append({
-            'keyword': keyword,
-            'amount': abs(data['amount']) if node_type == 'expense' else data['amount'],
-            'count': data['count'],
-            'percentage': (abs(data['amount']) / total_amount * 100) if total_amount > 0 else 0,
-            'sample_transactions': data['transactions']
-        })
-
-    return breakdown
+    return sankey_engine.format_keyword_breakdown(
+        [{'keyword': keyword, 'amount': data['amount'], 'count': data['count'],
+          'sample_transactions': data['transactions']} for keyword, data in sorted_groups],
+        node_type
+    )
 
 
 def register_reporting_routes(app):
@@ -1512,6 +1450,12 @@ def register_reporting_routes(app):
 
     def generate_income_statement_pdf(statement_data):
         """Generate a professional PDF for income statement"""
+        from reportlab.lib.pagesizes import letter, A4
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        from reportlab.lib import colors
+        from reportlab.lib.colors import HexColor
 
         # Create a buffer to hold the PDF data
         buffer = io.BytesIO()
@@ -1718,6 +1662,12 @@ def register_reporting_routes(app):
 
     def generate_balance_sheet_pdf(statement_data):
         """Generate a professional PDF for balance sheet"""
+        from reportlab.lib.pagesizes import letter, A4
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        from reportlab.lib import colors
+        from reportlab.lib.colors import HexColor
 
         # Create a buffer to hold the PDF data
         buffer = io.BytesIO()
@@ -3445,229 +3395,42 @@ def register_reporting_routes(app):
             end_date_str = request.args.get('end_date')
             min_amount = float(request.args.get('min_amount', 1000))
             max_categories = int(request.args.get('max_categories', 8))
+            flow = request.args.get('flow', 'hub')
 
-            # NEW: Parse filter parameters
+            # Filter parameters
             keyword = request.args.get('keyword', '').strip()
             entity = request.args.get('entity', '').strip()
             accounting_category = request.args.get('accounting_category', '').strip()
             accounting_subcategory = request.args.get('accounting_subcategory', '').strip()
 
-            # Get current tenant_id
-            tenant_id = get_current_tenant_id()
-
-            # Parse dates if provided
-            date_filter = ""
-            params = [tenant_id]  # Start with tenant_id
-
-            # Build additional filters
-            additional_filters = ""
+            if flow not in ('hub', 'entity'):
+                return jsonify({'error': "Invalid flow. Use 'hub' or 'entity'"}), 400
 
             if start_date_str and end_date_str:
                 try:
-                    start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-                    end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-
-                    if db_manager.db_type == 'postgresql':
-                        # Handle mixed date formats: YYYY-MM-DD and MM/DD/YYYY
-                        date_filter = """
-                            AND (
-                                CASE
-                                    WHEN date ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}' THEN TO_DATE(date, 'YYYY-MM-DD')
-                                    WHEN date ~ '^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}' THEN TO_DATE(date, 'MM/DD/YYYY')
-                                    ELSE NULL
-                                END
-                            ) >= TO_DATE(%s, 'YYYY-MM-DD')
-                            AND (
-                                CASE
-                                    WHEN date ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}' THEN TO_DATE(date, 'YYYY-MM-DD')
-                                    WHEN date ~ '^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}' THEN TO_DATE(date, 'MM/DD/YYYY')
-                                    ELSE NULL
-                                END
-                            ) <= TO_DATE(%s, 'YYYY-MM-DD')
-                        """
-                        params.extend([start_date_str, end_date_str])
-                    else:
-                        date_filter = """
-                            AND date(substr(date, 7, 4) || '-' || substr(date, 1, 2) || '-' || substr(date, 4, 2)) >= date(?)
-                            AND date(substr(date, 7, 4) || '-' || substr(date, 1, 2) || '-' || substr(date, 4, 2)) <= date(?)
-                        """
-                        params.extend([start_date_str, end_date_str])
+                    datetime.strptime(start_date_str, '%Y-%m-%d')
+                    datetime.strptime(end_date_str, '%Y-%m-%d')
                 except ValueError:
                     return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+            else:
+                start_date_str = end_date_str = None
 
-            # NEW: Build additional filters based on parameters
-            if keyword:
-                if db_manager.db_type == 'postgresql':
-                    additional_filters += " AND (LOWER(description) LIKE LOWER(%s) OR LOWER(origin) LIKE LOWER(%s) OR LOWER(destination) LIKE LOWER(%s))"
-                    keyword_param = f'%{keyword}%'
-                    params.extend([keyword_param, keyword_param, keyword_param])
-                else:
-                    additional_filters += " AND (LOWER(description) LIKE LOWER(?) OR LOWER(origin) LIKE LOWER(?) OR LOWER(destination) LIKE LOWER(?))"
-                    keyword_param = f'%{keyword}%'
-                    params.extend([keyword_param, keyword_param, keyword_param])
-
-            if entity:
-                if db_manager.db_type == 'postgresql':
-                    additional_filters += " AND classified_entity = %s"
-                    params.append(entity)
-                else:
-                    additional_filters += " AND classified_entity = ?"
-                    params.append(entity)
-
-            if accounting_category:
-                if db_manager.db_type == 'postgresql':
-                    additional_filters += " AND accounting_category = %s"
-                    params.append(accounting_category)
-                else:
-                    additional_filters += " AND accounting_category = ?"
-                    params.append(accounting_category)
-
-            if accounting_subcategory:
-                if db_manager.db_type == 'postgresql':
-                    additional_filters += " AND subcategory = %s"
-                    params.append(accounting_subcategory)
-                else:
-                    additional_filters += " AND subcategory = ?"
-                    params.append(accounting_subcategory)
-
-            # Get revenue categories (sources)
-            # Exclude all transfer-type categories (Internal, Exchange, Intercompany, Blockchain)
-            revenue_query = f"""
-                SELECT
-                    COALESCE(subcategory, accounting_category, classified_entity, 'Other Revenue') as category,
-                    SUM(amount) as total_amount,
-                    COUNT(*) as transaction_count
-                FROM transactions
-                WHERE tenant_id = {'%s' if db_manager.db_type == 'postgresql' else '?'}
-                AND amount > 0
-                AND archived = {'FALSE' if db_manager.db_type == 'postgresql' else '0'}
-                AND COALESCE(accounting_category, '') NOT IN ('Internal Transfer', 'Exchange Transfer', 'Intercompany Transfer', 'Blockchain Transaction')
-                AND COALESCE(subcategory, '') NOT IN ('Internal Transfer', 'Exchange Transfer', 'Intercompany Transfer', 'Blockchain Transaction')
-                AND COALESCE(subcategory, accounting_category, '') != ''
-                {date_filter}
-                {additional_filters}
-                GROUP BY COALESCE(subcategory, accounting_category, classified_entity, 'Other Revenue')
-                HAVING SUM(amount) >= {'%s' if db_manager.db_type == 'postgresql' else '?'}
-                ORDER BY total_amount DESC
-                LIMIT {'%s' if db_manager.db_type == 'postgresql' else '?'}
-            """
-
-            revenue_params = params + [min_amount, max_categories]
-            revenue_data = db_manager.execute_query(revenue_query, revenue_params, fetch_all=True)
-
-            # Get expense categories (targets)
-            # Exclude all transfer-type categories (Internal, Exchange, Intercompany, Blockchain)
-            expense_query = f"""
-                SELECT
-                    COALESCE(subcategory, accounting_category, classified_entity, 'Other Expenses') as category,
-                    SUM(ABS(amount)) as total_amount,
-                    COUNT(*) as transaction_count
-                FROM transactions
-                WHERE tenant_id = {'%s' if db_manager.db_type == 'postgresql' else '?'}
-                AND amount < 0
-                AND archived = {'FALSE' if db_manager.db_type == 'postgresql' else '0'}
-                AND COALESCE(accounting_category, '') NOT IN ('Internal Transfer', 'Exchange Transfer', 'Intercompany Transfer', 'Blockchain Transaction')
-                AND COALESCE(subcategory, '') NOT IN ('Internal Transfer', 'Exchange Transfer', 'Intercompany Transfer', 'Blockchain Transaction')
-                AND COALESCE(subcategory, accounting_category, '') != ''
-                {date_filter}
-                {additional_filters}
-                GROUP BY COALESCE(subcategory, accounting_category, classified_entity, 'Other Expenses')
-                HAVING SUM(ABS(amount)) >= {'%s' if db_manager.db_type == 'postgresql' else '?'}
-                ORDER BY total_amount DESC
-                LIMIT {'%s' if db_manager.db_type == 'postgresql' else '?'}
-            """
-
-            expense_params = params + [min_amount, max_categories]
-            expense_data = db_manager.execute_query(expense_query, expense_params, fetch_all=True)
-
-            # Build Sankey data structure
-            nodes = []
-            links = []
-            node_index = 0
-
-            # Filter out "Investor Equity" from revenue nodes (will be shown in separate chart)
-            filtered_revenue_data = []
-            for rev in revenue_data:
-                if 'investor equity' not in rev['category'].lower():
-                    filtered_revenue_data.append(rev)
-
-            # Add revenue source nodes (excluding Investor Equity)
-            revenue_nodes = {}
-            for rev in filtered_revenue_data:
-                category = rev['category']
-                nodes.append({
-                    'id': node_index,
-                    'name': category,
-                    'type': 'revenue',
-                    'value': float(rev['total_amount']),
-                    'color': '#10b981'
-                })
-                revenue_nodes[category] = node_index
-                node_index += 1
-
-            # Add central hub node
-            # Use filtered revenue data (excluding Investor Equity)
-            total_revenue = sum(float(rev['total_amount']) for rev in filtered_revenue_data)
-            total_expenses = sum(float(exp['total_amount']) for exp in expense_data)
-
-            hub_node_id = node_index
-            nodes.append({
-                'id': hub_node_id,
-                'name': 'Cash Flow Hub',
-                'type': 'hub',
-                'value': min(total_revenue, total_expenses),
-                'color': '#3b82f6'
-            })
-            node_index += 1
-
-            # Add expense target nodes
-            expense_nodes = {}
-            for exp in expense_data:
-                category = exp['category']
-                nodes.append({
-                    'id': node_index,
-                    'name': category,
-                    'type': 'expense',
-                    'value': float(exp['total_amount']),
-                    'color': '#ef4444'
-                })
-                expense_nodes[category] = node_index
-                node_index += 1
-
-            # Create links from revenue to hub (excluding Investor Equity)
-            for rev in filtered_revenue_data:
-                links.append({
-                    'source': revenue_nodes[rev['category']],
-                    'target': hub_node_id,
-                    'value': float(rev['total_amount'])
-                })
-
-            # Create links from hub to expenses
-            expense_proportion = total_expenses / total_revenue if total_revenue > 0 else 0
-            for exp in expense_data:
-                proportional_value = float(exp['total_amount']) / total_expenses * min(total_revenue, total_expenses) if total_expenses > 0 else 0
-                links.append({
-                    'source': hub_node_id,
-                    'target': expense_nodes[exp['category']],
-                    'value': proportional_value
-                })
+            # Get current tenant_id
+            tenant_id = get_current_tenant_id()
 
-            # Calculate summary metrics
-            net_flow = total_revenue - total_expenses
-            flow_efficiency = (net_flow / total_revenue * 100) if total_revenue > 0 else 0
-
-            summary = {
-                'total_revenue': total_revenue,
-                'total_expenses': total_expenses,
-                'net_flow': net_flow,
-                'flow_efficiency_percent': round(flow_efficiency, 2),
-                'revenue_categories_count': len(filtered_revenue_data),
-                'expense_categories_count': len(expense_data),
-                'date_range': {
-                    'start_date': start_date_str,
-                    'end_date': end_date_str
-                } if start_date_str and end_date_str else None
-            }
+            # Graph from one grouped aggregate query, cached per filter set
+            sankey_data, cached = _web_ui_service('sankey_engine').get_sankey_flow(
+                db_manager, tenant_id,
+                start_date=start_date_str,
+                end_date=end_date_str,
+                min_amount=min_amount,
+                max_categories=max_categories,
+                keyword=keyword,
+                entity=entity,
+                accounting_category=accounting_category,
+                accounting_subcategory=accounting_subcategory,
+                flow=flow
+            )
 
             # Calculate generation time
             end_time = datetime.now()
@@ -3675,17 +3438,8 @@ def register_reporting_routes(app):
 
             return jsonify({
                 'success': True,
-                'data': {
-                    'sankey': {
-                        'nodes': nodes,
-                        'links': links
-                    },
-                    'summary': summary,
-                    'parameters': {
-                        'min_amount': min_amount,
-                        'max_categories': max_categories
-                    }
-                },
+                'data': sankey_data,
+                'cached': cached,
                 'generated_at': datetime.now().isoformat(),
                 'generation_time_ms': generation_time_ms
             })
@@ -3857,104 +3611,26 @@ def register_reporting_routes(app):
 
             logger.info(f"[SANKEY-BREAKDOWN] Analyzing node: {node_name} (type: {node_type}, tenant: {tenant_id})")
 
-            # Build query to fetch transactions for this subcategory
-            date_filter = ""
-            params = [tenant_id, node_name]
-
-            if start_date and end_date:
-                date_filter = "AND date::date >= %s::date AND date::date <= %s::date"
-                params.extend([start_date, end_date])
-
-            # Query transactions - using same aggregation logic as Sankey
-            if node_type == 'revenue':
-                amount_filter = "AND amount > 0"
-            else:
-                amount_filter = "AND amount < 0"
-
-            # First, get total count and amount (without LIMIT)
-            count_query = f"""
-                SELECT
-                    COUNT(*) as count,
-                    SUM(ABS(amount)) as total
-                FROM transactions
-                WHERE tenant_id = %s
-                  AND COALESCE(subcategory, accounting_category, classified_entity,
-                       CASE WHEN amount > 0 THEN 'Other Revenue' ELSE 'Other Expenses' END) = %s
-                  {amount_filter}
-                  AND archived = FALSE
-                  {date_filter}
-            """
-
-            count_result = db_manager.execute_query(count_query, tuple(params), fetch_all=True)
-            if count_result and len(count_result) > 0:
-                result_row = count_result[0]
-                total_transaction_count = int(result_row['count']) if result_row.get('count') else 0
-                total_amount_sum = float(result_row['total']) if result_row.get('total') else 0
-            else:
-                total_transaction_count = 0
-                total_amount_sum = 0
-
-            # Then get transactions with LIMIT for keyword extraction
-            query = f"""
-                SELECT
-                    transaction_id,
-                    date,
-                    description,
-                    amount,
-                    justification,
-                    destination,
-                    origin,
-                    subcategory,
-                    accounting_category
-                FROM transactions
-                WHERE tenant_id = %s
-                  AND COALESCE(subcategory, accounting_category, classified_entity,
-                       CASE WHEN amount > 0 THEN 'Other Revenue' ELSE 'Other Expenses' END) = %s
-                  {amount_filter}
-                  AND archived = FALSE
-                  {date_filter}
-                ORDER BY ABS(amount) DESC
-                LIMIT 1000
-            """
-
-            transactions = db_manager.execute_query(query, tuple(params), fetch_all=True)
-
-            if not transactions:
-                return jsonify({
-                    'success': True,
-                    'node_name': node_name,
-                    'node_type': node_type,
-                    'total_amount': 0,
-                    'transaction_count': 0,
-                    'breakdown': [],
-                    'top_transactions': []
-                })
-
-            # Extract keywords and create breakdown
-            breakdown_data = extract_keywords_from_transactions(transactions, node_type)
-
-            # Get top 5 transaction examples
-            top_transactions = []
-            for i, txn in enumerate(transactions[:5]):
-                top_transactions.append({
-                    'date': str(txn.get('date', '')),
-                    'description': str(txn.get('description', ''))[:100],
-                    'amount': float(txn.get('amount', 0)),
-                    'justification': str(txn.get('justification', ''))[:150]
-                })
+            # Keyword groups come from the tenant's keyword index
+            breakdown, cached = _web_ui_service('sankey_engine').get_sankey_breakdown(
+                db_manager, tenant_id, node_name, node_type, start_date, end_date
+            )
 
-            logger.info(f"[SANKEY-BREAKDOWN] Found {len(breakdown_data)} keyword groups in {total_transaction_count} transactions")
+            logger.info(f"[SANKEY-BREAKDOWN] Found {len(breakdown['breakdown'])} keyword groups in "
+                        f"{breakdown['transaction_count']} transactions{' (cached)' if cached else ''}")
 
-            return jsonify({
+            response = {
                 'success': True,
                 'node_name': node_name,
                 'node_type': node_type,
-                'total_amount': total_amount_sum,
-                'transaction_count': total_transaction_count,
-                'breakdown': breakdown_data,
-                'top_transactions': top_transactions,
-                'tenant_id': tenant_id  # For debugging
-            })
+                'total_amount': breakdown['total_amount'],
+                'transaction_count': breakdown['transaction_count'],
+                'breakdown': breakdown['breakdown'],
+                'top_transactions': breakdown['top_transactions']
+            }
+            if breakdown['transaction_count']:
+                response['tenant_id'] = tenant_id  # For debugging
+            return jsonify(response)
 
         except Exception as e:
             logger.error(f"Error generating Sankey breakdown: {e}")
@@ -4579,85 +4255,29 @@ def register_reporting_routes(app):
                 prev_start = start_date - timedelta(days=365)
                 prev_end = start_date - timedelta(days=1)
 
-            # Build entity filter
-            entity_clause = ""
-            entity_params = []
-            if entity_filter:
-                entity_clause = "AND classified_entity = %s"
-                entity_params = [entity_filter]
-
-            # Get actual performance for current period
-            actual_query = f"""
-                SELECT
-                    COALESCE(accounting_category, 'Uncategorized') as category,
-                    SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as revenue,
-                    SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expenses,
-                    COUNT(*) as transaction_count
-                FROM transactions
-                WHERE date::date >= %s::date AND date::date <= %s::date
-                {entity_clause}
-                GROUP BY accounting_category
-                ORDER BY (revenue + expenses) DESC
-            """
-
-            actual_data = db_manager.execute_query(
-                actual_query,
-                tuple([start_date.isoformat(), end_date.isoformat()] + entity_params),
-                fetch_all=True
-            )
+            # Category aggregates come from the tenant's in-memory ledger snapshot
+            ledger = _web_ui_service('ledger_snapshot').get_tenant_ledger(db_manager, get_current_tenant_id())
+            actual_data = ledger.category_summary(ledger.mask(start_date, end_date, entity_filter))
 
             # Calculate budget based on method
             budget_targets = {}
 
             if budget_method == 'historical_avg':
-                # Use previous period average
-                historical_query = f"""
-                    SELECT
-                        COALESCE(accounting_category, 'Uncategorized') as category,
-                        AVG(CASE WHEN amount > 0 THEN amount ELSE 0 END) * COUNT(DISTINCT date::date) as revenue_budget,
-                        AVG(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) * COUNT(DISTINCT date::date) as expense_budget
-                    FROM transactions
-                    WHERE date::date >= %s::date AND date::date <= %s::date
-                    {entity_clause}
-                    GROUP BY accounting_category
-                """
-
-                historical_data = db_manager.execute_query(
-                    historical_query,
-                    tuple([prev_start.isoformat(), prev_end.isoformat()] + entity_params),
-                    fetch_all=True
-                )
-
-                for row in historical_data:
+                # Use previous period average (per-transaction average times active days)
+                for row in ledger.category_summary(ledger.mask(prev_start, prev_end, entity_filter)):
+                    days_per_transaction = row['active_days'] / row['transaction_count']
                     budget_targets[row['category']] = {
-                        'revenue_budget': float(row['revenue_budget'] or 0),
-                        'expense_budget': float(row['expense_budget'] or 0)
+                        'revenue_budget': row['revenue'] * days_per_transaction,
+                        'expense_budget': row['expenses'] * days_per_transaction
                     }
 
             elif budget_method == 'growth_based':
                 # Use previous period with growth rate applied
-                historical_query = f"""
-                    SELECT
-                        COALESCE(accounting_category, 'Uncategorized') as category,
-                        SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as revenue,
-                        SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expenses
-                    FROM transactions
-                    WHERE date::date >= %s::date AND date::date <= %s::date
-                    {entity_clause}
-                    GROUP BY accounting_category
-                """
-
-                historical_data = db_manager.execute_query(
-                    historical_query,
-                    tuple([prev_start.isoformat(), prev_end.isoformat()] + entity_params),
-                    fetch_all=True
-                )
-
                 growth_multiplier = 1 + (growth_rate / 100)
-                for row in historical_data:
+                for row in ledger.category_summary(ledger.mask(prev_start, prev_end, entity_filter)):
                     budget_targets[row['category']] = {
-                        'revenue_budget': float(row['revenue'] or 0) * growth_multiplier,
-                        'expense_budget': float(row['expenses'] or 0) * growth_multiplier
+                        'revenue_budget': row['revenue'] * growth_multiplier,
+                        'expense_budget': row['expenses'] * growth_multiplier
                     }
 
             elif budget_method == 'fixed_target' and budget_data:
@@ -4806,44 +4426,21 @@ def register_reporting_routes(app):
             entity_filter = request.args.get('entity', '')
             include_forecast = request.args.get('include_forecast', 'false').lower() == 'true'
 
-            # Build entity filter
-            entity_clause = ""
-            entity_params = []
-            if entity_filter:
-                entity_clause = "AND classified_entity = %s"
-                entity_params = [entity_filter]
-
-            # Build time grouping based on granularity
+            # Months of history covered by the requested periods
             if granularity == 'monthly':
-                time_group = "DATE_TRUNC('month', date::date)"
-                interval = f"{periods} months"
+                months = periods
             elif granularity == 'quarterly':
-                time_group = "DATE_TRUNC('quarter', date::date)"
-                interval = f"{periods * 3} months"
+                months = periods * 3
             elif granularity == 'yearly':
-                time_group = "DATE_TRUNC('year', date::date)"
-                interval = f"{periods * 12} months"
-
-            # Get trend data
-            trend_query = f"""
-                SELECT
-                    {time_group} as period,
-                    SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as revenue,
-                    SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expenses,
-                    SUM(amount) as net_profit,
-                    COUNT(*) as transaction_count,
-                    AVG(CASE WHEN amount > 0 THEN amount ELSE NULL END) as avg_revenue_transaction,
-                    AVG(CASE WHEN amount < 0 THEN ABS(amount) ELSE NULL END) as avg_expense_transaction
-                FROM transactions
-                WHERE date::date >= CURRENT_DATE - INTERVAL '{interval}'
-                    AND amount IS NOT NULL
-                    AND amount::text != 'NaN'
-                    {entity_clause}
-                GROUP BY {time_group}
-                ORDER BY period ASC
-            """
-
-            trend_data = db_manager.execute_query(trend_query, tuple(entity_params), fetch_all=True)
+                months = periods * 12
+
+            # Period aggregates come from the tenant's in-memory ledger snapshot
+            ledger_snapshot = _web_ui_service('ledger_snapshot')
+            ledger = ledger_snapshot.get_tenant_ledger(db_manager, get_current_tenant_id())
+            trend_data = ledger.period_summary(
+                ledger.mask(start_date=ledger_snapshot.months_ago(date.today(), months), entity=entity_filter),
+                granularity
+            )
 
             # Process trend data and calculate growth rates
             periods_list = []
@@ -5020,13 +4617,6 @@ def register_reporting_routes(app):
             entity_filter = request.args.get('entity', '')
             period = request.args.get('period', 'yearly')
 
-            # Build entity filter
-            entity_clause = ""
-            entity_params = []
-            if entity_filter:
-                entity_clause = "AND classified_entity = %s"
-                entity_params = [entity_filter]
-
             # Determine date range
             end_date = date.today()
             if period == 'monthly':
@@ -5036,49 +4626,11 @@ def register_reporting_routes(app):
             else:  # yearly
                 start_date = end_date - timedelta(days=365)
 
-            # Get comprehensive financial data for risk analysis
-            financial_data_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as total_revenue,
-                    SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as total_expenses,
-                    SUM(amount) as net_position,
-                    COUNT(*) as transaction_count,
-                    COUNT(DISTINCT DATE_TRUNC('month', date::date)) as active_months,
-                    STDDEV(amount) as amount_volatility,
-                    MIN(amount) as largest_outflow,
-                    MAX(amount) as largest_inflow
-                FROM transactions
-                WHERE date::date >= %s AND date::date <= %s
-                    AND amount IS NOT NULL
-                    AND amount::text != 'NaN'
-                    {entity_clause}
-            """
-
-            financial_result = db_manager.execute_query(
-                financial_data_query,
-                tuple([start_date.isoformat(), end_date.isoformat()] + entity_params),
-                fetch_one=True
-            )
-
-            # Get cash flow volatility by month
-            cash_volatility_query = f"""
-                SELECT
-                    DATE_TRUNC('month', date::date) as month,
-                    SUM(amount) as monthly_cash_flow
-                FROM transactions
-                WHERE date::date >= %s AND date::date <= %s
-                    AND amount IS NOT NULL
-                    AND amount::text != 'NaN'
-                    {entity_clause}
-                GROUP BY DATE_TRUNC('month', date::date)
-                ORDER BY month
-            """
-
-            cash_volatility_data = db_manager.execute_query(
-                cash_volatility_query,
-                tuple([start_date.isoformat(), end_date.isoformat()] + entity_params),
-                fetch_all=True
-            )
+            # Totals and monthly cash flow come from the tenant's in-memory ledger snapshot
+            ledger = _web_ui_service('ledger_snapshot').get_tenant_ledger(db_manager, get_current_tenant_id())
+            selected = ledger.mask(start_date, end_date, entity_filter)
+            financial_result = ledger.totals(selected)
+            cash_volatility_data = ledger.period_summary(selected, 'monthly')
 
             # Calculate risk metrics
             total_revenue = float(financial_result.get('total_revenue', 0) or 0)
@@ -5091,7 +4643,7 @@ def register_reporting_routes(app):
             largest_inflow = float(financial_result.get('largest_inflow', 0) or 0)
 
             # Calculate monthly cash flows
-            monthly_flows = [float(row['monthly_cash_flow'] or 0) for row in cash_volatility_data]
+            monthly_flows = [row['net_profit'] for row in cash_volatility_data]
             avg_monthly_flow = sum(monthly_flows) / len(monthly_flows) if monthly_flows else 0
             cash_flow_stddev = Decimal(str(amount_volatility))
 
@@ -5301,13 +4853,6 @@ def register_reporting_routes(app):
             entity_filter = request.args.get('entity', '')
             period = request.args.get('period', 'yearly')
 
-            # Build entity filter
-            entity_clause = ""
-            entity_params = []
-            if entity_filter:
-                entity_clause = "AND classified_entity = %s"
-                entity_params = [entity_filter]
-
             # Determine date range
             end_date = date.today()
             if period == 'monthly':
@@ -5323,88 +4868,17 @@ def register_reporting_routes(app):
                 prev_start = start_date - timedelta(days=365)
                 prev_end = start_date - timedelta(days=1)
 
-            # Calculate current assets (cash, receivables, inventory-like items)
-            current_assets_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as current_assets
-                FROM transactions
-                WHERE date::date >= %s AND date::date <= %s
-                    AND amount IS NOT NULL
-                    AND amount::text != 'NaN'
-                    AND (
-                        LOWER(COALESCE(accounting_category, '')) LIKE '%cash%' OR
-                        LOWER(COALESCE(accounting_category, '')) LIKE '%receivable%' OR
-                        LOWER(COALESCE(accounting_category, '')) LIKE '%revenue%' OR
-                        LOWER(COALESCE(accounting_category, '')) LIKE '%inventory%' OR
-                        amount > 0
-                    )
-                    {entity_clause}
-            """
-
-            # Calculate current liabilities (payables, short-term debts)
-            current_liabilities_query = f"""
-                SELECT
-                    SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as current_liabilities
-                FROM transactions
-                WHERE date::date >= %s AND date::date <= %s
-                    AND amount IS NOT NULL
-                    AND amount::text != 'NaN'
-                    AND (
-                        LOWER(COALESCE(accounting_category, '')) LIKE '%payable%' OR
-                        LOWER(COALESCE(accounting_category, '')) LIKE '%expense%' OR
-                        LOWER(COALESCE(accounting_category, '')) LIKE '%debt%' OR
-                        LOWER(COALESCE(accounting_category, '')) LIKE '%liability%' OR
-                        amount < 0
-                    )
-                    {entity_clause}
-            """
-
-            # Get current period data - Fixed parameter handling
-            assets_params = [start_date.isoformat(), end_date.isoformat()]
-            if entity_filter:
-                assets_params.extend(entity_params)
-
-            assets_result = db_manager.execute_query(
-                current_assets_query,
-                tuple(assets_params),
-                fetch_one=True
-            )
-            liabilities_params = [start_date.isoformat(), end_date.isoformat()]
-            if entity_filter:
-                liabilities_params.extend(entity_params)
-
-            liabilities_result = db_manager.execute_query(
-                current_liabilities_query,
-                tuple(liabilities_params),
-                fetch_one=True
-            )
-
-            current_assets = float(assets_result.get('current_assets', 0) or 0)
-            current_liabilities = float(liabilities_result.get('current_liabilities', 0) or 0)
-
-            # Get previous period for comparison - Fixed parameter handling
-            prev_assets_params = [prev_start.isoformat(), prev_end.isoformat()]
-            if entity_filter:
-                prev_assets_params.extend(entity_params)
+            # Current assets are all inflows and current liabilities all outflows
+            # of the window, read from the tenant's in-memory ledger snapshot
+            ledger = _web_ui_service('ledger_snapshot').get_tenant_ledger(db_manager, get_current_tenant_id())
+            current_totals = ledger.totals(ledger.mask(start_date, end_date, entity_filter))
+            current_assets = current_totals['total_revenue']
+            current_liabilities = current_totals['total_expenses']
 
-            prev_assets_result = db_manager.execute_query(
-                current_assets_query,
-                tuple(prev_assets_params),
-                fetch_one=True
-            )
-
-            prev_liabilities_params = [prev_start.isoformat(), prev_end.isoformat()]
-            if entity_filter:
-                prev_liabilities_params.extend(entity_params)
-
-            prev_liabilities_result = db_manager.execute_query(
-                current_liabilities_query,
-                tuple(prev_liabilities_params),
-                fetch_one=True
-            )
-
-            prev_assets = float(prev_assets_result.get('current_assets', 0) or 0)
-            prev_liabilities = float(prev_liabilities_result.get('current_liabilities', 0) or 0)
+            # Get previous period for comparison
+            prev_totals = ledger.totals(ledger.mask(prev_start, prev_end, entity_filter))
+            prev_assets = prev_totals['total_revenue']
+            prev_liabilities = prev_totals['total_expenses']
 
             # Calculate working capital
             working_capital = current_assets - current_liabilities
@@ -5427,39 +4901,17 @@ def register_reporting_routes(app):
             current_ratio_change = current_ratio - prev_current_ratio
 
             # Get monthly trend
-            monthly_trend_query = f"""
-                SELECT
-                    DATE_TRUNC('month', date::date) as month,
-                    SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as assets,
-                    SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as liabilities
-                FROM transactions
-                WHERE date::date >= %s AND date::date <= %s
-                    AND amount IS NOT NULL
-                    AND amount::text != 'NaN'
-                    {entity_clause}
-                GROUP BY DATE_TRUNC('month', date::date)
-                ORDER BY month
-            """
-
-            monthly_params = [start_date.isoformat(), end_date.isoformat()]
-            if entity_filter:
-                monthly_params.extend(entity_params)
-
-            monthly_data = db_manager.execute_query(
-                monthly_trend_query,
-                tuple(monthly_params),
-                fetch_all=True
-            )
+            monthly_data = ledger.period_summary(ledger.mask(start_date, end_date, entity_filter), 'monthly')
 
             monthly_trend = []
             for row in monthly_data:
-                month_assets = float(row['assets'] or 0)
-                month_liabilities = float(row['liabilities'] or 0)
+                month_assets = row['revenue']
+                month_liabilities = row['expenses']
                 month_wc = month_assets - month_liabilities
                 month_current_ratio = month_assets / month_liabilities if month_liabilities > 0 else 0
 
                 monthly_trend.append({
-                    'month': row['month'].isoformat() if hasattr(row['month'], 'isoformat') else str(row['month']),
+                    'month': row['period'].isoformat(),
                     'current_assets': round(month_assets, 2),
                     'current_liabilities': round(month_liabilities, 2),
                     'working_capital': round(month_wc, 2),
@@ -5584,150 +5036,87 @@ def register_reporting_routes(app):
     @app.route('/api/reports/financial-forecast', methods=['GET'])
     def api_financial_forecast():
         """
-        AI-Powered Financial Forecast & Projections
+        Financial Forecast & Projections
 
-        Uses historical data and trend analysis to project future financial performance.
-        Employs linear regression and moving averages for forecasting.
+        Fits revenue, COGS and SG&A of every entity in one batch (services/forecast_engine.py)
+        and projects them with confidence bands. Fits are cached until the tenant's
+        transactions change; scenarios are applied to the cached fits.
 
         GET Parameters:
             - forecast_periods: Number of periods to forecast (default: 6)
             - granularity: 'monthly', 'quarterly' (default: 'monthly')
             - entity: Filter by specific entity (optional)
-            - historical_periods: Number of historical periods to analyze (default: 12)
-            - method: 'linear', 'moving_average', 'weighted' (default: 'linear')
+            - historical_periods: Number of complete historical periods to fit (default: 24)
+            - method: 'holt_winters', 'seasonal_naive', 'linear', 'moving_average', 'weighted'
+                      (default: 'holt_winters')
+            - scenario: 'base', 'optimistic', 'pessimistic' (default: 'base')
+            - revenue_change / cogs_change / sga_change: Percent overrides of the scenario (optional)
+            - confidence_level: 80, 90 or 95 (default: 80)
+            - include_entities: Include per-entity forecasts (true/false) (default: false)
 
         Returns:
             JSON with historical data and future projections
         """
         try:
             start_time = datetime.now()
+            forecast_engine = _web_ui_service('forecast_engine')
 
             # Parse parameters
             forecast_periods = int(request.args.get('forecast_periods', 6))
             granularity = request.args.get('granularity', 'monthly')
             entity_filter = request.args.get('entity', '')
-            historical_periods = int(request.args.get('historical_periods', 12))
-            method = request.args.get('method', 'linear')
-
-            # Build entity filter
-            entity_clause = ""
-            entity_params = []
-            if entity_filter:
-                entity_clause = "AND classified_entity = %s"
-                entity_params = [entity_filter]
-
-            # Build time grouping
-            if granularity == 'monthly':
-                time_group = "DATE_TRUNC('month', date::date)"
-                interval = f"{historical_periods} months"
-            elif granularity == 'quarterly':
-                time_group = "DATE_TRUNC('quarter', date::date)"
-                interval = f"{historical_periods * 3} months"
+            historical_periods = int(request.args.get('historical_periods', 24))
+            method = request.args.get('method', 'holt_winters')
+            scenario = request.args.get('scenario', 'base')
+            confidence_level = int(request.args.get('confidence_level', 80))
+            include_entities = request.args.get('include_entities', 'false').lower() == 'true'
 
-            # Get historical data
-            historical_query = f"""
-                SELECT
-                    {time_group} as period,
-                    SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as revenue,
-                    SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expenses,
-                    SUM(amount) as net_profit,
-                    COUNT(*) as transaction_count
-                FROM transactions
-                WHERE date::date >= CURRENT_DATE - INTERVAL '{interval}'
-                    AND amount IS NOT NULL
-                    AND amount::text != 'NaN'
-                    {entity_clause}
-                GROUP BY {time_group}
-                ORDER BY period ASC
-            """
-
-            historical_data = db_manager.execute_query(historical_query, tuple(entity_params), fetch_all=True)
+            try:
+                adjustments = forecast_engine.scenario_adjustments(scenario, {
+                    metric: request.args.get(f'{metric}_change') for metric in forecast_engine.METRICS
+                })
+                if method not in forecast_engine.FORECAST_MODELS:
+                    raise ValueError(f"Unknown forecast method: {method}")
+                if confidence_level not in forecast_engine.Z_SCORES:
+                    raise ValueError(f"Unsupported confidence level: {confidence_level}")
+                if granularity not in forecast_engine.PERIOD_MONTHS:
+                    raise ValueError(f"Unsupported granularity: {granularity}")
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+
+            model, cached = forecast_engine.get_forecast_model(
+                db_manager, get_current_tenant_id(), method=method, horizon=forecast_periods,
+                granularity=granularity, historical_periods=historical_periods, entity=entity_filter
+            )
+            forecast = forecast_engine.build_forecast(model, adjustments, confidence_level, include_entities)
 
-            # Process historical data
+            # Historical totals across entities
+            history = {metric: model['history'][metric].sum(axis=0) for metric in forecast_engine.METRICS}
+            transaction_counts = model['transaction_count'].sum(axis=0)
             historical_periods_list = []
-            revenue_values = []
-            expense_values = []
-            profit_values = []
-
-            for row in historical_data:
-                revenue = float(row['revenue'] or 0)
-                expenses = float(row['expenses'] or 0)
-                profit = float(row['net_profit'] or 0)
-
+            for i, period_start in enumerate(model['periods']):
+                revenue = float(history['revenue'][i])
+                cogs = float(history['cogs'][i])
+                sga = float(history['sga'][i])
                 historical_periods_list.append({
-                    'period': row['period'].isoformat() if hasattr(row['period'], 'isoformat') else str(row['period']),
+                    'period': period_start.isoformat(),
                     'revenue': round(revenue, 2),
-                    'expenses': round(expenses, 2),
-                    'net_profit': round(profit, 2),
-                    'transaction_count': row['transaction_count'],
+                    'cogs': round(cogs, 2),
+                    'sga': round(sga, 2),
+                    'expenses': round(cogs + sga, 2),
+                    'net_profit': round(revenue - cogs - sga, 2),
+                    'transaction_count': int(transaction_counts[i]),
                     'is_historical': True
                 })
+            revenue_values = [p['revenue'] for p in historical_periods_list]
 
-                revenue_values.append(revenue)
-                expense_values.append(expenses)
-                profit_values.append(profit)
-
-            # Generate forecasts based on selected method
             forecast_list = []
-
-            if method == 'linear' and len(revenue_values) >= 3:
-                # Simple linear regression forecast
-                n = len(revenue_values)
-
-                # Calculate trend for each metric
-                revenue_trend = (revenue_values[-1] - revenue_values[0]) / n
-                expense_trend = (expense_values[-1] - expense_values[0]) / n
-                profit_trend = (profit_values[-1] - profit_values[0]) / n
-
-                for i in range(1, forecast_periods + 1):
-                    forecast_list.append({
-                        'period': f'Forecast +{i}',
-                        'revenue': round(max(0, revenue_values[-1] + (revenue_trend * i)), 2),
-                        'expenses': round(max(0, expense_values[-1] + (expense_trend * i)), 2),
-                        'net_profit': round(profit_values[-1] + (profit_trend * i), 2),
-                        'is_forecast': True,
-                        'confidence': round(max(50, 90 - (i * 5)), 1)  # Confidence decreases with distance
-                    })
-
-            elif method == 'moving_average' and len(revenue_values) >= 3:
-                # Moving average forecast (3-period)
-                ma_window = min(3, len(revenue_values))
-
-                revenue_ma = sum(revenue_values[-ma_window:]) / ma_window
-                expense_ma = sum(expense_values[-ma_window:]) / ma_window
-                profit_ma = sum(profit_values[-ma_window:]) / ma_window
-
-                for i in range(1, forecast_periods + 1):
-                    forecast_list.append({
-                        'period': f'Forecast +{i}',
-                        'revenue': round(revenue_ma, 2),
-                        'expenses': round(expense_ma, 2),
-                        'net_profit': round(profit_ma, 2),
-                        'is_forecast': True,
-                        'confidence': round(max(60, 85 - (i * 3)), 1)
-                    })
-
-            elif method == 'weighted' and len(revenue_values) >= 3:
-                # Weighted average (more weight to recent periods)
-                weights = [1, 2, 3]  # Recent periods get more weight
-                total_weight = sum(weights)
-
-                revenue_weighted = sum(r * w for r, w in zip(revenue_values[-3:], weights)) / total_weight
-                expense_weighted = sum(e * w for e, w in zip(expense_values[-3:], weights)) / total_weight
-                profit_weighted = sum(p * w for p, w in zip(profit_values[-3:], weights)) / total_weight
-
-                # Apply slight growth trend
-                growth_rate = 1.02  # 2% growth assumption
-
-                for i in range(1, forecast_periods + 1):
-                    forecast_list.append({
-                        'period': f'Forecast +{i}',
-                        'revenue': round(revenue_weighted * (growth_rate ** i), 2),
-                        'expenses': round(expense_weighted * (growth_rate ** i), 2),
-                        'net_profit': round(profit_weighted * (growth_rate ** i), 2),
-                        'is_forecast': True,
-                        'confidence': round(max(55, 88 - (i * 4)), 1)
-                    })
+            for i, row in enumerate(forecast['totals'], start=1):
+                # Share of the revenue forecast outside its band half-width
+                band = row['bands']['revenue']
+                half_width = (band['upper'] - band['lower']) / 2
+                confidence = max(0.0, min(100.0, 100 * (1 - half_width / row['revenue']))) if row['revenue'] > 0 else 0.0
+                forecast_list.append(dict(row, period=f'Forecast +{i}', is_forecast=True, confidence=round(confidence, 1)))
 
             # Calculate forecast summary
             if forecast_list:
@@ -5739,9 +5128,10 @@ def register_reporting_routes(app):
                 forecast_revenue = forecast_expenses = forecast_profit = avg_confidence = 0
 
             # Calculate accuracy indicators
-            if len(revenue_values) >= 2:
-                historical_volatility = Decimal(str(max(revenue_values) - min(revenue_values))) / Decimal(str(sum(revenue_values) / len(revenue_values)))
-                forecast_accuracy = max(0, min(100, 100 - float(historical_volatility * 50)))
+            mean_revenue = sum(revenue_values) / len(revenue_values) if revenue_values else 0
+            if len(revenue_values) >= 2 and mean_revenue != 0:
+                historical_volatility = (max(revenue_values) - min(revenue_values)) / mean_revenue
+                forecast_accuracy = max(0, min(100, 100 - historical_volatility * 50))
             else:
                 forecast_accuracy = 50
 
@@ -5757,10 +5147,14 @@ def register_reporting_routes(app):
                         'historical_periods': len(historical_periods_list),
                         'granularity': granularity,
                         'method': method,
-                        'entity_filter': entity_filter or 'All entities'
+                        'entity_filter': entity_filter or 'All entities',
+                        'scenario': scenario,
+                        'scenario_adjustments': adjustments,
+                        'confidence_level': confidence_level
                     },
                     'historical_data': historical_periods_list,
                     'forecast_data': forecast_list,
+                    'entity_forecasts': forecast['entities'],
                     'forecast_summary': {
                         'projected_revenue': round(forecast_revenue, 2),
                         'projected_expenses': round(forecast_expenses, 2),
@@ -5770,11 +5164,8 @@ def register_reporting_routes(app):
                     },
                     'methodology': {
                         'method_used': method,
-                        'description': {
-                            'linear': 'Linear regression based on historical trends',
-                            'moving_average': '3-period moving average forecast',
-                            'weighted': 'Weighted average with 2% growth assumption'
-                        }.get(method, 'Unknown method'),
+                        'description': forecast_engine.MODEL_DESCRIPTIONS[method],
+                        'entities_fitted': len(model['entities']),
                         'limitations': [
                             'Forecasts assume continuation of historical trends',
                             'External factors and market changes not accounted for',
@@ -5788,6 +5179,7 @@ def register_reporting_routes(app):
                         f"Forecast confidence: {avg_confidence:.1f}%",
                         f"Accuracy indicator: {forecast_accuracy:.1f}%"
                     ],
+                    'cached': cached,
                     'generated_at': datetime.now().isoformat(),
                     'generation_time_ms': generation_time_ms
                 }
@@ -5817,6 +5209,7 @@ def register_reporting_routes(app):
             PDF file download
         """
         try:
+            from pdf_report_engine import get_report_pdf
             # Parse parameters
             start_date_str = request.args.get('start_date')
             end_date_str = request.args.get('end_date')
@@ -5852,17 +5245,9 @@ def register_reporting_routes(app):
             config = db_manager.execute_query(config_query, (tenant_id,), fetch_one=True)
             company_name = config.get('company_name', 'CFO Agent') if config else 'CFO Agent'
 
-            # Create DRE report
-            dre_report = DREReport(
-                company_name=company_name,
-                start_date=start_date,
-                end_date=end_date,
-                entity_filter=entity_filter if entity_filter else None,
-                tenant_id=tenant_id
-            )
-
-            # Generate PDF
-            pdf_content = dre_report.generate_dre_report()
+            # Generate PDF (cached until the tenant's transactions change)
+            pdf_content = get_report_pdf('dre', tenant_id, company_name, start_date, end_date,
+                                         entity_filter or None)
 
             # Create response
             pdf_buffer = io.BytesIO(pdf_content)
@@ -5902,6 +5287,7 @@ def register_reporting_routes(app):
             PDF file download
         """
         try:
+            from pdf_report_engine import get_report_pdf
             # Parse parameters
             end_date_str = request.args.get('end_date')
             entity_filter = request.args.get('entity', '').strip()
@@ -5924,16 +5310,9 @@ def register_reporting_routes(app):
             config = db_manager.execute_query(config_query, (tenant_id,), fetch_one=True)
             company_name = config.get('company_name', 'CFO Agent') if config else 'CFO Agent'
 
-            # Create Balance Sheet report
-            balance_sheet_report = BalanceSheetReport(
-                company_name=company_name,
-                end_date=end_date,
-                entity_filter=entity_filter if entity_filter else None,
-                tenant_id=tenant_id
-            )
-
-            # Generate PDF
-            pdf_content = balance_sheet_report.generate_balance_sheet_report()
+            # Generate PDF (cached until the tenant's transactions change)
+            pdf_content = get_report_pdf('balance-sheet', tenant_id, company_name, end_date=end_date,
+                                         entity=entity_filter or None)
 
             # Create response
             pdf_buffer = io.BytesIO(pdf_content)
@@ -5971,6 +5350,7 @@ def register_reporting_routes(app):
             PDF file download with 'Content-Disposition: attachment' header
         """
         try:
+            from pdf_report_engine import get_report_pdf
             # Parse parameters
             start_date_str = request.args.get('start_date')
             end_date_str = request.args.get('end_date')
@@ -6010,17 +5390,9 @@ def register_reporting_routes(app):
             config = db_manager.execute_query(config_query, (tenant_id,), fetch_one=True)
             company_name = config.get('company_name', 'CFO Agent') if config else 'CFO Agent'
 
-            # Create Cash Flow report
-            cash_flow_report = CashFlowReport(
-                company_name=company_name,
-                start_date=start_date,
-                end_date=end_date,
-                entity_filter=entity_filter if entity_filter else None,
-                tenant_id=tenant_id
-            )
-
-            # Generate PDF content
-            pdf_content = cash_flow_report.generate_cash_flow_report()
+            # Generate PDF content (cached until the tenant's transactions change)
+            pdf_content = get_report_pdf('cash-flow', tenant_id, company_name, start_date, end_date,
+                                         entity_filter or None)
 
             # Create filename
             period_str = ""
@@ -6066,6 +5438,7 @@ def register_reporting_routes(app):
             PDF file download with 'Content-Disposition: attachment' header
         """
         try:
+            from pdf_report_engine import get_report_pdf
             # Parse parameters
             start_date_str = request.args.get('start_date')
             end_date_str = request.args.get('end_date')
@@ -6105,17 +5478,9 @@ def register_reporting_routes(app):
             config = db_manager.execute_query(config_query, (tenant_id,), fetch_one=True)
             company_name = config.get('company_name', 'CFO Agent') if config else 'CFO Agent'
 
-            # Create DMPL report
-            dmpl_report = DMPLReport(
-                company_name=company_name,
-                start_date=start_date,
-                end_date=end_date,
-                entity_filter=entity_filter if entity_filter else None,
-                tenant_id=tenant_id
-            )
-
-            # Generate PDF content
-            pdf_content = dmpl_report.generate_dmpl_report()
+            # Generate PDF content (cached until the tenant's transactions change)
+            pdf_content = get_report_pdf('dmpl', tenant_id, company_name, start_date, end_date,
+                                         entity_filter or None)
 
             # Create filename
             period_str = ""
@@ -6146,6 +5511,74 @@ def register_reporting_routes(app):
                 'error': f'Error generating DMPL PDF: {str(e)}'
             }), 500
 
+    @app.route('/api/reports/board-pack-pdf', methods=['GET'])
+    def api_generate_board_pack_pdf():
+        """
+        Generate the board pack: DRE, Balance Sheet, Cash Flow and DMPL in one PDF
+
+        GET Parameters:
+            - start_date: Start date (YYYY-MM-DD, default: start of current year)
+            - end_date: End date (YYYY-MM-DD, default: today)
+            - entity: Entity filter (optional)
+
+        Returns:
+            PDF file download with one bookmark per statement
+        """
+        try:
+            from pdf_report_engine import render_board_pack
+            # Parse parameters
+            start_date_str = request.args.get('start_date')
+            end_date_str = request.args.get('end_date')
+            entity_filter = request.args.get('entity', '').strip()
+
+            try:
+                start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else date(datetime.now().year, 1, 1)
+                end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else date.today()
+            except ValueError:
+                return jsonify({'success': False, 'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+
+            # Validate dates
+            if start_date > end_date:
+                return jsonify({
+                    'success': False,
+                    'error': 'Start date cannot be after end date'
+                }), 400
+
+            # Get current tenant ID
+            tenant_id = get_current_tenant_id()
+
+            # Get company name from tenant configuration
+            config_query = """
+                SELECT company_name
+                FROM tenant_configuration
+                WHERE id = %s
+            """
+            config = db_manager.execute_query(config_query, (tenant_id,), fetch_one=True)
+            company_name = config.get('company_name', 'CFO Agent') if config else 'CFO Agent'
+
+            # Render the four statements in parallel and merge them
+            pdf_content = render_board_pack(tenant_id, company_name, start_date, end_date,
+                                            entity_filter or None)
+
+            entity_suffix = f"_{entity_filter}" if entity_filter else ""
+            filename = f"BoardPack_{company_name.replace(' ', '_')}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}{entity_suffix}.pdf"
+
+            return send_file(
+                io.BytesIO(pdf_content),
+                as_attachment=True,
+                download_name=filename,
+                mimetype='application/pdf'
+            )
+
+        except Exception as e:
+            logger.error(f"Error generating board pack PDF: {e}")
+            import traceback
+            traceback.print_exc()
+            return jsonify({
+                'success': False,
+                'error': f'Error generating board pack PDF: {str(e)}'
+            }), 500
+
     @app.route('/api/reports/pdf-reports-list', methods=['GET'])
     def api_pdf_reports_list():
         """
@@ -6205,6 +5638,18 @@ def register_reporting_routes(app):
                         {'name': 'entity', 'type': 'string', 'required': False, 'description': 'Entity filter'},
                         {'name': 'company_name', 'type': 'string', 'required': False, 'description': 'Company name for report'}
                     ]
+                },
+                {
+                    'id': 'board-pack',
+                    'name': 'Board Pack',
+                    'description': 'DRE, Balance Sheet, Cash Flow and DMPL merged into one PDF',
+                    'endpoint': '/api/reports/board-pack-pdf',
+                    'status': 'available',
+                    'parameters': [
+                        {'name': 'start_date', 'type': 'date', 'required': False, 'description': 'Start date (YYYY-MM-DD)'},
+                        {'name': 'end_date', 'type': 'date', 'required': False, 'description': 'End date (YYYY-MM-DD)'},
+                        {'name': 'entity', 'type': 'string', 'required': False, 'description': 'Entity filter'}
+                    ]
                 }
             ]
 
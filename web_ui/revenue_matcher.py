@@ -25,6 +25,7 @@ from dataclasses import dataclass
 from difflib import SequenceMatcher
 import anthropic
 from database import db_manager
+from match_assignment import GROUP_MATCH_TYPES, select_consistent_matches
 # from learning_system import apply_learning_to_scores, record_match_feedback  # TODO: Implement learning system
 
 # Configure logging
@@ -63,6 +64,7 @@ class RevenueInvoiceMatcher:
         self.ai_filter_threshold_high = 0.8
         self.batch_size = 18  # Batch processing size
         self.max_workers = 3  # Parallel threads
+        self.global_assignment = True  # Resolver conflitos invoice/transação antes da IA
 
     def _init_claude_client(self):
         """Inicializa cliente Claude para matching semântico"""
@@ -151,10 +153,16 @@ class RevenueInvoiceMatcher:
             invoice_matches = self._find_matches_for_single_invoice(invoice, transactions)
             matches.extend(invoice_matches)
 
+        logger.info(f"Found {len(matches)} potential matches")
+
+        # Manter apenas propostas globalmente consistentes (cada transação usada uma vez)
+        if self.global_assignment and matches:
+            matches, assignment = select_consistent_matches(matches, invoices, transactions)
+            logger.info(f"Global assignment kept {len(matches)} matches "
+                        f"({len(assignment.groups)} split payments, {assignment.dropped} conflicting candidates dropped)")
+
         # Ordenar por score descendente
         matches.sort(key=lambda x: x.score, reverse=True)
-
-        logger.info(f"Found {len(matches)} potential matches")
         return matches
 
     def _get_unmatched_invoices(self, invoice_ids: List[str] = None) -> List[Dict]:
@@ -744,11 +752,11 @@ class RevenueInvoiceMatcher:
                         invoice_id=match.invoice_id,
                         transaction_id=match.transaction_id,
                         score=ai_score,
-                        match_type=f"AI_BATCH_{match.match_type}",
+                        match_type=self._ai_match_type("AI_BATCH_", match),
                         criteria_scores=match.criteria_scores,
                         confidence_level="HIGH" if ai_score >= 0.85 else "MEDIUM",
                         explanation=f"🤖 AI BATCH: {eval_result.get('reasoning', '')}",
-                        auto_match=ai_score >= 0.85
+                        auto_match=ai_score >= 0.85 and match.match_type not in GROUP_MATCH_TYPES
                     )
                     enhanced_batch.append(enhanced_match)
                 else:
@@ -758,7 +766,7 @@ class RevenueInvoiceMatcher:
                         invoice_id=match.invoice_id,
                         transaction_id=match.transaction_id,
                         score=rejected_score,
-                        match_type=f"AI_BATCH_REJECTED_{match.match_type}",
+                        match_type=self._ai_match_type("AI_BATCH_REJECTED_", match),
                         criteria_scores=match.criteria_scores,
                         confidence_level="LOW",
                         explanation=f"🤖 AI BATCH REJECTED: {eval_result.get('reasoning', 'Low confidence') if eval_result else 'AI analysis failed'}",
@@ -774,6 +782,12 @@ class RevenueInvoiceMatcher:
             logger.error(f"Error in batch AI processing: {e}")
             return batch  # Return original batch if AI fails
 
+    def _ai_match_type(self, prefix: str, match: MatchResult) -> str:
+        """match_type após avaliação da IA; pagamentos divididos mantêm o tipo do grupo"""
+        if match.match_type in GROUP_MATCH_TYPES:
+            return match.match_type
+        return f"{prefix}{match.match_type}"
+
     def _enhance_match_with_ai(self, match: MatchResult,
                              invoices: List[Dict], transactions: List[Dict]) -> MatchResult:
         """Usa Claude AI para melhorar o matching de um par específico"""
@@ -865,11 +879,11 @@ class RevenueInvoiceMatcher:
                     invoice_id=match.invoice_id,
                     transaction_id=match.transaction_id,
                     score=final_score,
-                    match_type=f"AI_PRIMARY_{match.match_type}",
+                    match_type=self._ai_match_type("AI_PRIMARY_", match),
                     criteria_scores=match.criteria_scores,
                     confidence_level=ai_confidence_level,
                     explanation=enhanced_explanation,
-                    auto_match=ai_auto_match
+                    auto_match=ai_auto_match and match.match_type not in GROUP_MATCH_TYPES
                 )
             else:
                 # IA REJEITA o match - reduzir score drasticamente
@@ -878,7 +892,7 @@ class RevenueInvoiceMatcher:
                     invoice_id=match.invoice_id,
                     transaction_id=match.transaction_id,
                     score=rejected_score,
-                    match_type=f"AI_REJECTED_{match.match_type}",
+                    match_type=self._ai_match_type("AI_REJECTED_", match),
                     criteria_scores=match.criteria_scores,
                     confidence_level="LOW",
                     explanation=f"🤖 AI REJECTED: {ai_reasoning}",
@@ -908,7 +922,8 @@ class RevenueInvoiceMatcher:
 
         for match in matches:
             try:
-                if auto_apply and match.auto_match:
+                # Membros de pagamentos divididos sobrescreveriam o link um do outro
+                if auto_apply and match.auto_match and match.match_type not in GROUP_MATCH_TYPES:
                     # Apply match automatically
                     self._apply_match(match)
                     stats['auto_applied'] += 1
@@ -22,6 +22,7 @@ from dataclasses import dataclass
 from difflib import SequenceMatcher
 import anthropic
 from database import db_manager
+from match_assignment import select_consistent_matches
 # from learning_system import apply_learning_to_scores, record_match_feedback  # TODO: Implement learning system
 
 # Configure logging
@@ -66,6 +67,7 @@ class RobustRevenueInvoiceMatcher:
         self.amount_tolerance = 0.02  # 2% tolerance for amount matching
         self.batch_size = 50  # Processar em lotes de 50 invoices
         self.max_concurrent_operations = 5  # Limite de operações simultâneas
+        self.global_assignment = True  # Resolver conflitos invoice/transação antes da IA
 
     def _init_claude_client(self):
         """Inicializa cliente Claude para matching semântico"""
@@ -164,6 +166,20 @@ class RobustRevenueInvoiceMatcher:
                         'error': str(e)
                     }
 
+            # 4b. Atribuição global: cada transação/invoice em no máximo uma proposta
+            if all_matches and self.global_assignment:
+                candidate_count = len(all_matches)
+                all_matches, assignment = select_consistent_matches(
+                    all_matches, unmatched_invoices, candidate_transactions
+                )
+                stats.batch_stats['assignment'] = {
+                    'candidates': candidate_count,
+                    'kept': len(all_matches),
+                    'components': assignment.components,
+                    'split_payments': len(assignment.groups),
+                    'status': 'success'
+                }
+
             # 5. Aplicar semantic matching para casos ambíguos
             if all_matches and self.claude_client:
                 all_matches = self._apply_semantic_matching_batch(
@@ -436,7 +452,7 @@ class RobustRevenueInvoiceMatcher:
                         )
                     })
 
-                pending_results = db_manager.execute_batch_operation(pending_operations, batch_size=30)
+                pending_results = db_manager.execute_batch_operation(pending_operations, batch_size=500)
                 stats['pending_review'] = pending_results['total_rows_affected']
                 stats['database_operations'] += pending_results['total_operations']
 
@@ -470,7 +486,7 @@ class RobustRevenueInvoiceMatcher:
             })
 
         try:
-            db_manager.execute_batch_operation(log_operations, batch_size=50)
+            db_manager.execute_batch_operation(log_operations, batch_size=500)
         except Exception as e:
             logger.error(f"Error logging batch actions: {e}")
 
@@ -546,7 +546,7 @@ def check_period_lock():
 
 @close_bp.route('/periods/<period_id>/reconciliation-status', methods=['GET'])
 def get_reconciliation_status(period_id):
-    """Get comprehensive reconciliation status for a period."""
+    """Get comprehensive reconciliation status for a period (?refresh=true recomputes saved stats)."""
     try:
         from services.month_end_close import MonthEndCloseService
 
@@ -554,7 +554,8 @@ def get_reconciliation_status(period_id):
         if not tenant_id:
             return jsonify({'error': 'Tenant context required'}), 401
 
-        status = MonthEndCloseService.get_reconciliation_status(period_id, tenant_id)
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        status = MonthEndCloseService.get_reconciliation_status(period_id, tenant_id, refresh=refresh)
 
         if 'error' in status:
             return jsonify({'error': status['error']}), 404
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Classification Tracking Writer
+Records manual classification edits in user_classification_tracking from a
+background thread, so inline edits don't wait on the tracking insert (and the
+pattern-learning trigger it fires). Queued records are written in batches of
+one multi-row INSERT; if a batch fails its records are retried one by one, and
+anything still queued when the process exits is written before it does.
+"""
+
+import atexit
+import hashlib
+import logging
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+try:
+    from module_singletons import shared_instance
+except ImportError:
+    # web_ui/ itself is not on sys.path (imported through the repo root)
+    from web_ui.module_singletons import shared_instance
+
+logger = logging.getLogger(__name__)
+
+MAX_TRACKING_BATCH = 200
+# How long interpreter exit waits for queued records to be written
+EXIT_FLUSH_TIMEOUT_SECONDS = 10
+
+# Transaction fields learned from, and their user_classification_tracking name
+TRACKING_FIELDS = {
+    'classified_entity': 'entity',
+    'accounting_category': 'category',
+    'subcategory': 'subcategory',
+    'justification': 'justification',
+}
+
+
+def pattern_signature(description: Optional[str], field_changed: str, new_value: Optional[str]) -> str:
+    """MD5(description::field::value) - matches the SQL function"""
+    return hashlib.md5(
+        f"{(description or '').lower().strip()}::{field_changed}::{(new_value or '').lower().strip()}".encode()
+    ).hexdigest()
+
+
+class ClassificationTrackingWriter:
+    """Queue of tracking records drained by one daemon thread"""
+
+    def __init__(self, db_manager=None, max_batch: int = MAX_TRACKING_BATCH):
+        self.db_manager = db_manager
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+        # The writer is a daemon thread; don't let exit drop what is still queued
+        atexit.register(self._flush_at_exit)
+
+    def submit(self, tenant_id: str, user_id: str, transaction_id: str, field: str,
+               old_value: Any, new_value: Any, description: Optional[str] = None,
+               origin: Optional[str] = None, destination: Optional[str] = None) -> bool:
+        """Queue a manual change to a tracked field; False if the field isn't tracked"""
+        if field not in TRACKING_FIELDS:
+            return False
+        self._ensure_thread()
+        self._queue.put({
+            'tenant_id': tenant_id, 'user_id': user_id, 'transaction_id': transaction_id,
+            'field_changed': TRACKING_FIELDS[field], 'old_value': old_value, 'new_value': new_value,
+            'description': description or '', 'origin': origin, 'destination': destination,
+        })
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued record has been written (or dropped); False on timeout"""
+        if self._thread is None:
+            return True
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+    def _flush_at_exit(self):
+        if not self.flush(EXIT_FLUSH_TIMEOUT_SECONDS):
+            logger.warning(f"{self._queue.unfinished_tasks} classification tracking record(s) "
+                           f"not written before exit")
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ClassificationTracking', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        try:
+            self._write(batch)
+            self.written += len(batch)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self.failed += 1
+                logger.warning(f"Could not record classification tracking for {batch[0]['transaction_id']}: {e}")
+                return
+            logger.warning(f"Classification tracking batch of {len(batch)} failed, retrying row by row: {e}")
+
+        # One bad record shouldn't drop the rest of the batch
+        for record in batch:
+            try:
+                self._write([record])
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Could not record classification tracking for {record['transaction_id']}: {e}")
+
+    def _write(self, records: List[Dict[str, Any]]):
+        db_manager = self.db_manager
+        if db_manager is None:
+            from database import db_manager
+
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            values = ','.join(cursor.mogrify(
+                "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                (r['tenant_id'], r['user_id'], r['transaction_id'], r['field_changed'], r['old_value'],
+                 r['new_value'], r['description'],
+                 pattern_signature(r['description'], r['field_changed'], r['new_value']),
+                 r['origin'], r['destination'])
+            ).decode('utf-8') for r in records)
+            cursor.execute(f"""
+                INSERT INTO user_classification_tracking
+                (tenant_id, user_id, transaction_id, field_changed, old_value, new_value,
+                 description_pattern, pattern_signature, origin, destination)
+                VALUES {values}
+            """)
+            conn.commit()
+            cursor.close()
+
+
+classification_tracking_writer = shared_instance(__name__, 'classification_tracking_writer', ClassificationTrackingWriter)
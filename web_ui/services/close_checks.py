@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Month-End Close Check Engine
+Evaluates a period's auto-checks against one shared snapshot of
+reconciliation stats. Each source table is read with one grouped query, the
+sources a run needs are loaded concurrently, and every check reads the same
+snapshot. Stats are persisted in close_reconciliation_stats so the
+reconciliation dashboard can read them instead of recomputing.
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import psycopg2.extras
+
+try:
+    from .period_lock_index import date_ordinal
+except ImportError:
+    from period_lock_index import date_ordinal
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECK_THRESHOLD = 95.0
+
+# Persisted stats younger than this are served to the reconciliation dashboard
+RECONCILIATION_STATS_MAX_AGE_SECONDS = 300
+
+# More than this many days between statement transactions is a coverage gap
+COVERAGE_GAP_DAYS = 7
+
+INVOICE_STATS_QUERY = """
+    SELECT
+        COUNT(*) as total,
+        COUNT(*) FILTER (WHERE linked_transaction_id IS NOT NULL AND linked_transaction_id != '') as matched,
+        COUNT(*) FILTER (WHERE linked_transaction_id IS NULL OR linked_transaction_id = '') as unmatched,
+        COALESCE(SUM(total_amount), 0) as total_amount,
+        COALESCE(SUM(CASE WHEN linked_transaction_id IS NOT NULL AND linked_transaction_id != '' THEN total_amount ELSE 0 END), 0) as matched_amount,
+        COALESCE(SUM(CASE WHEN linked_transaction_id IS NULL OR linked_transaction_id = '' THEN total_amount ELSE 0 END), 0) as unmatched_amount
+    FROM invoices
+    WHERE tenant_id = %s
+    AND date >= %s AND date <= %s
+"""
+
+PAYSLIP_STATS_QUERY = """
+    SELECT
+        COUNT(*) as total,
+        COUNT(*) FILTER (WHERE linked_transaction_id IS NOT NULL) as matched,
+        COUNT(*) FILTER (WHERE linked_transaction_id IS NULL) as unmatched,
+        COALESCE(SUM(net_amount), 0) as total_amount,
+        COALESCE(SUM(CASE WHEN linked_transaction_id IS NOT NULL THEN net_amount ELSE 0 END), 0) as matched_amount,
+        COALESCE(SUM(CASE WHEN linked_transaction_id IS NULL THEN net_amount ELSE 0 END), 0) as unmatched_amount
+    FROM payslips
+    WHERE tenant_id = %s
+    AND payment_date >= %s AND payment_date <= %s
+"""
+
+# One row per transaction date: classification counts for the period, and
+# the non-archived count that statement coverage is measured on
+TRANSACTION_DAYS_QUERY = """
+    SELECT
+        date,
+        COUNT(*) as total,
+        COUNT(*) FILTER (WHERE category IS NOT NULL AND category != '' AND category != 'Uncategorized') as classified,
+        COUNT(*) FILTER (WHERE confidence IS NOT NULL AND confidence >= 0.7) as high_confidence,
+        COUNT(*) FILTER (WHERE confidence IS NOT NULL AND confidence < 0.7 AND confidence >= 0.4) as medium_confidence,
+        COUNT(*) FILTER (WHERE confidence IS NULL OR confidence < 0.4) as low_confidence,
+        COUNT(*) FILTER (WHERE user_reviewed = true) as user_reviewed,
+        COUNT(*) FILTER (WHERE archived = false) as active
+    FROM transactions
+    WHERE tenant_id = %s
+    AND date >= %s AND date <= %s
+    GROUP BY date
+    ORDER BY date
+"""
+
+BANK_ACCOUNTS_QUERY = """
+    SELECT id, account_name, institution_name
+    FROM bank_accounts
+    WHERE tenant_id = %s
+"""
+
+# Query behind each source, and whether it takes the period dates
+SOURCE_QUERIES = {
+    'invoices': (INVOICE_STATS_QUERY, True),
+    'payslips': (PAYSLIP_STATS_QUERY, True),
+    'transaction_days': (TRANSACTION_DAYS_QUERY, True),
+    'bank_accounts': (BANK_ACCOUNTS_QUERY, False),
+}
+
+# Reconciliation stats and the sources they are derived from
+STAT_SOURCES = {
+    'invoices': ('invoices',),
+    'payslips': ('payslips',),
+    'transactions': ('transaction_days',),
+    'statement_coverage': ('bank_accounts', 'transaction_days'),
+}
+
+# Auto-check type -> the stats it reads
+CHECK_STATS = {
+    'invoices_matched': 'invoices',
+    'payslips_matched': 'payslips',
+    'low_confidence_reviewed': 'transactions',
+    'unclassified_resolved': 'transactions',
+    'bank_reconciled': 'statement_coverage',  # Legacy - same as statement_coverage
+    'statement_coverage': 'statement_coverage',
+}
+
+DASHBOARD_STATS = ('invoices', 'payslips', 'transactions')
+
+
+# ========================================
+# STATS FROM SOURCE ROWS
+# ========================================
+
+def _matching_stats(row) -> Dict[str, Any]:
+    if not row:
+        return {'total': 0, 'matched': 0, 'unmatched': 0, 'match_rate': 0}
+
+    total, matched, unmatched, total_amount, matched_amount, unmatched_amount = row
+    return {
+        'total': total or 0,
+        'matched': matched or 0,
+        'unmatched': unmatched or 0,
+        'match_rate': round((matched / total) * 100, 1) if total > 0 else 100.0,
+        'total_amount': float(total_amount or 0),
+        'matched_amount': float(matched_amount or 0),
+        'unmatched_amount': float(unmatched_amount or 0)
+    }
+
+
+def _classification_stats(day_rows) -> Dict[str, Any]:
+    total = classified = high_conf = medium_conf = low_conf = user_reviewed = 0
+    for _, day_total, day_classified, day_high, day_medium, day_low, day_reviewed, _ in day_rows:
+        total += day_total or 0
+        classified += day_classified or 0
+        high_conf += day_high or 0
+        medium_conf += day_medium or 0
+        low_conf += day_low or 0
+        user_reviewed += day_reviewed or 0
+
+    return {
+        'total': total,
+        'classified': classified,
+        'unclassified': total - classified,
+        'classified_rate': round((classified / total) * 100, 1) if total > 0 else 100.0,
+        'high_confidence': high_conf,
+        'medium_confidence': medium_conf,
+        'low_confidence': low_conf,
+        'high_confidence_rate': round((high_conf / total) * 100, 1) if total > 0 else 100.0,
+        'user_reviewed': user_reviewed,
+        'needs_review': low_conf - user_reviewed
+    }
+
+
+def _coverage_stats(accounts, day_rows, start_date: str, end_date: str) -> Dict[str, Any]:
+    """
+    Statement coverage of every bank account. Transactions aren't linked to
+    accounts yet, so each account is measured on the tenant's non-archived
+    transactions of the period.
+    """
+    if not accounts:
+        return {
+            'total_accounts': 0,
+            'accounts_with_coverage': 0,
+            'accounts_without_coverage': 0,
+            'overall_coverage_pct': 100.0,
+            'has_gaps': False,
+            'message': 'No bank accounts configured'
+        }
+
+    period_start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    period_end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    period_days = (period_end - period_start).days + 1
+
+    active_days = {}
+    for row in day_rows:
+        ordinal = date_ordinal(row[0])
+        if ordinal and row[-1]:
+            active_days[ordinal] = active_days.get(ordinal, 0) + row[-1]
+    txn_count = sum(active_days.values())
+    days = sorted(active_days)
+
+    if txn_count > 0:
+        days_covered = days[-1] - days[0] + 1
+        coverage_pct = min(100.0, (days_covered / period_days) * 100) if period_days > 0 else 100.0
+        gaps = [
+            {'from': date.fromordinal(previous).isoformat(), 'to': date.fromordinal(current).isoformat(),
+             'days': current - previous}
+            for previous, current in zip(days, days[1:])
+            if current - previous > COVERAGE_GAP_DAYS
+        ]
+        account_coverage = {'transactions': txn_count, 'coverage_pct': round(coverage_pct, 1),
+                            'has_gaps': len(gaps) > 0, 'gaps': gaps}
+    else:
+        coverage_pct = 0
+        account_coverage = {'transactions': 0, 'coverage_pct': 0, 'has_gaps': True,
+                            'gaps': [{'from': start_date, 'to': end_date, 'days': period_days}]}
+
+    account_results = [
+        dict({'account_id': str(account_id), 'account_name': account_name, 'institution': institution},
+             **account_coverage)
+        for account_id, account_name, institution in accounts
+    ]
+    accounts_with_data = len(accounts) if txn_count > 0 else 0
+
+    return {
+        'total_accounts': len(accounts),
+        'accounts_with_coverage': accounts_with_data,
+        'accounts_without_coverage': len(accounts) - accounts_with_data,
+        'overall_coverage_pct': round(coverage_pct, 1),
+        'has_gaps': account_coverage['has_gaps'],
+        'period_start': start_date,
+        'period_end': end_date,
+        'period_days': period_days,
+        'accounts': account_results
+    }
+
+
+def _stat_error(stat_name: str, error: Exception) -> Dict[str, Any]:
+    if stat_name == 'statement_coverage':
+        return {'total_accounts': 0, 'accounts_with_coverage': 0, 'overall_coverage_pct': 0,
+                'has_gaps': True, 'error': str(error)}
+    if stat_name == 'transactions':
+        return {'total': 0, 'classified': 0, 'unclassified': 0, 'classified_rate': 0, 'error': str(error)}
+    return {'total': 0, 'matched': 0, 'unmatched': 0, 'match_rate': 0, 'error': str(error)}
+
+
+# ========================================
+# PERIOD SNAPSHOT
+# ========================================
+
+def _load_source(db_manager, source: str, tenant_id: str, start_date: str, end_date: str):
+    query, dated = SOURCE_QUERIES[source]
+    with db_manager.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, (tenant_id, start_date, end_date) if dated else (tenant_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+
+def compute_period_stats(db_manager, tenant_id: str, start_date: str, end_date: str,
+                         stat_names: Iterable[str] = tuple(STAT_SOURCES)) -> Dict[str, Dict[str, Any]]:
+    """
+    Reconciliation stats for a period, keyed by stat name.
+
+    Each source the requested stats need is queried once, concurrently on
+    separate pooled connections. A failed source turns the stats built on
+    it into an error entry instead of failing the snapshot.
+    """
+    stat_names = [name for name in stat_names if name in STAT_SOURCES]
+    sources = sorted({source for name in stat_names for source in STAT_SOURCES[name]})
+
+    loaded, errors = {}, {}
+    if len(sources) > 1:
+        with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='close-stats') as pool:
+            futures = {source: pool.submit(_load_source, db_manager, source, tenant_id, start_date, end_date)
+                       for source in sources}
+        outcomes = [(source, future.result, future.exception()) for source, future in futures.items()]
+    else:
+        outcomes = []
+        for source in sources:
+            try:
+                rows = _load_source(db_manager, source, tenant_id, start_date, end_date)
+                outcomes.append((source, lambda rows=rows: rows, None))
+            except Exception as e:
+                outcomes.append((source, None, e))
+
+    for source, result, error in outcomes:
+        if error is not None:
+            logger.error(f"Error loading {source} for close checks: {error}")
+            errors[source] = error
+        else:
+            loaded[source] = result()
+
+    stats = {}
+    for name in stat_names:
+        failed = [errors[source] for source in STAT_SOURCES[name] if source in errors]
+        if failed:
+            stats[name] = _stat_error(name, failed[0])
+            continue
+        try:
+            if name in ('invoices', 'payslips'):
+                rows = loaded[name]
+                stats[name] = _matching_stats(rows[0] if rows else None)
+            elif name == 'transactions':
+                stats[name] = _classification_stats(loaded['transaction_days'])
+            else:
+                stats[name] = _coverage_stats(loaded['bank_accounts'], loaded['transaction_days'],
+                                              start_date, end_date)
+        except Exception as e:
+            logger.error(f"Error computing {name} stats for close checks: {e}")
+            stats[name] = _stat_error(name, e)
+    return stats
+
+
+def evaluate_check(auto_check_type: str, stats: Dict[str, Dict[str, Any]],
+                   threshold: float = DEFAULT_CHECK_THRESHOLD) -> Dict[str, Any]:
+    """Result of one auto-check against a period's stats"""
+    stat_name = CHECK_STATS.get(auto_check_type)
+    if stat_name is None:
+        return {
+            'matched': 0,
+            'total': 0,
+            'percentage': 0,
+            'threshold': threshold,
+            'passed': False,
+            'error': f'Unknown auto-check type: {auto_check_type}'
+        }
+
+    details = stats[stat_name]
+    if stat_name in ('invoices', 'payslips'):
+        matched, total, percentage = details.get('matched', 0), details.get('total', 0), details.get('match_rate', 0)
+        passed = percentage >= threshold
+    elif auto_check_type == 'low_confidence_reviewed':
+        total, matched = details.get('low_confidence', 0), details.get('user_reviewed', 0)
+        percentage = (matched / total * 100) if total > 0 else 100.0
+        passed = percentage >= threshold
+        percentage = round(percentage, 1)
+    elif auto_check_type == 'unclassified_resolved':
+        matched, total = details.get('classified', 0), details.get('total', 0)
+        percentage = details.get('classified_rate', 0)
+        passed = percentage >= threshold
+    else:
+        matched, total = details.get('accounts_with_coverage', 0), details.get('total_accounts', 0)
+        percentage = details.get('overall_coverage_pct', 0)
+        passed = percentage >= threshold and not details.get('has_gaps', True)
+
+    return {
+        'matched': matched,
+        'total': total,
+        'percentage': percentage,
+        'threshold': threshold,
+        'passed': passed,
+        'details': details
+    }
+
+
+def run_checks(db_manager, tenant_id: str, period: Dict[str, Any], items: List[Dict[str, Any]],
+               user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Evaluate checklist items ({id, auto_check_type, threshold}) against one
+    snapshot of the period and persist item results and stats together
+    """
+    stat_names = {CHECK_STATS[item['auto_check_type']] for item in items if item['auto_check_type'] in CHECK_STATS}
+    stats = compute_period_stats(db_manager, tenant_id, period['start_date'], period['end_date'], stat_names)
+    results = [evaluate_check(item['auto_check_type'], stats, item.get('threshold') or DEFAULT_CHECK_THRESHOLD)
+               for item in items]
+
+    try:
+        save_check_results(db_manager, period['id'], tenant_id, items, results, stats, user_id)
+    except Exception as e:
+        logger.error(f"Error updating auto-check results: {e}")
+        for result in results:
+            result['update_error'] = str(e)
+    return results
+
+
+# ========================================
+# PERSISTENCE
+# ========================================
+
+def _save_stats(cursor, period_id: str, tenant_id: str, stats: Dict[str, Dict[str, Any]]):
+    psycopg2.extras.execute_values(cursor, """
+        INSERT INTO close_reconciliation_stats (period_id, stat_name, tenant_id, stats, computed_at)
+        VALUES %s
+        ON CONFLICT (period_id, stat_name) DO UPDATE
+        SET stats = EXCLUDED.stats, computed_at = EXCLUDED.computed_at
+    """, [(period_id, name, tenant_id, json.dumps(value)) for name, value in stats.items()
+          if 'error' not in value],
+        template="(%s, %s, %s, %s, CURRENT_TIMESTAMP)")
+
+
+def save_check_results(db_manager, period_id: str, tenant_id: str, items: List[Dict[str, Any]],
+                       results: List[Dict[str, Any]], stats: Dict[str, Dict[str, Any]],
+                       user_id: Optional[str] = None):
+    """Write every item's auto-check result and the stats they came from in one transaction"""
+    with db_manager.get_connection() as conn:
+        cursor = conn.cursor()
+        if items:
+            psycopg2.extras.execute_values(cursor, """
+                UPDATE close_checklist_items AS ci
+                SET auto_check_result = v.result::jsonb,
+                    last_auto_check_at = CURRENT_TIMESTAMP,
+                    status = COALESCE(v.new_status, ci.status),
+                    completed_at = CASE WHEN v.new_status = 'completed' THEN CURRENT_TIMESTAMP ELSE ci.completed_at END,
+                    completed_by = CASE WHEN v.new_status = 'completed' THEN v.user_id::uuid ELSE ci.completed_by END,
+                    updated_at = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v(id, result, new_status, user_id)
+                WHERE ci.id = v.id::uuid
+            """, [(str(item['id']), json.dumps(result), 'completed' if result.get('passed') else None, user_id)
+                  for item, result in zip(items, results)])
+
+        # Stats table is optional (dashboard falls back to recomputing); its own
+        # savepoint keeps a failure here from undoing the item updates above
+        cursor.execute("SAVEPOINT close_reconciliation_stats")
+        try:
+            _save_stats(cursor, period_id, tenant_id, stats)
+            cursor.execute("RELEASE SAVEPOINT close_reconciliation_stats")
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT close_reconciliation_stats")
+            logger.warning(f"Could not persist reconciliation stats for period {period_id}: {e}")
+        conn.commit()
+        cursor.close()
+
+
+def load_saved_stats(db_manager, period_id: str, tenant_id: str, stat_names: Iterable[str],
+                     max_age_seconds: float = RECONCILIATION_STATS_MAX_AGE_SECONDS) -> Dict[str, Dict[str, Any]]:
+    """Persisted stats of a period younger than max_age_seconds, keyed by stat name"""
+    try:
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT stat_name, stats, computed_at
+                FROM close_reconciliation_stats
+                WHERE period_id = %s AND tenant_id = %s AND stat_name = ANY(%s)
+                AND computed_at >= CURRENT_TIMESTAMP - make_interval(secs => %s)
+            """, (period_id, tenant_id, list(stat_names), max_age_seconds))
+            rows = cursor.fetchall()
+            cursor.close()
+    except Exception as e:
+        # Stats table not migrated yet
+        logger.debug(f"Could not read reconciliation stats for period {period_id}: {e}")
+        return {}
+
+    saved = {}
+    for stat_name, value, computed_at in rows:
+        value = json.loads(value) if isinstance(value, str) else dict(value)
+        value['computed_at'] = computed_at.isoformat() if computed_at else None
+        saved[stat_name] = value
+    return saved
+
+
+def get_reconciliation_stats(db_manager, tenant_id: str, period: Dict[str, Any],
+                             stat_names: Iterable[str] = DASHBOARD_STATS,
+                             refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Dashboard stats: recently persisted ones, with the rest computed from one snapshot and saved"""
+    stat_names = list(stat_names)
+    stats = {} if refresh else load_saved_stats(db_manager, period['id'], tenant_id, stat_names)
+    missing = [name for name in stat_names if name not in stats]
+    if missing:
+        fresh = compute_period_stats(db_manager, tenant_id, period['start_date'], period['end_date'], missing)
+        try:
+            with db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                _save_stats(cursor, period['id'], tenant_id, fresh)
+                conn.commit()
+                cursor.close()
+        except Exception as e:
+            logger.warning(f"Could not persist reconciliation stats for period {period['id']}: {e}")
+        stats.update(fresh)
+    return stats
@@ -11,6 +11,12 @@ from datetime import datetime, timedelta, date
 from decimal import Decimal
 import psycopg2.extras
 
+try:
+    from .kpi_aggregator import get_transaction_kpis, tenant_where_clause
+except ImportError:
+    # Fallback for when imported directly (services folder added to sys.path)
+    from kpi_aggregator import get_transaction_kpis, tenant_where_clause
+
 logger = logging.getLogger(__name__)
 
 
@@ -159,113 +165,35 @@ class DataQueryService:
         try:
             kpis = {}
 
-            # Total transactions (exclude archived)
-            result = self.db_manager.execute_query("""
-                SELECT COUNT(*) as total
-                FROM transactions
-                WHERE tenant_id = %s AND (archived = FALSE OR archived IS NULL)
-            """, (self.tenant_id,), fetch_one=True)
-            kpis['total_transactions'] = result['total'] if result else 0
-
-            # Revenue (positive amounts) - exclude NaN values
-            result = self.db_manager.execute_query("""
-                SELECT COALESCE(SUM(amount), 0) as revenue
-                FROM transactions
-                WHERE tenant_id = %s
-                AND amount > 0
-                AND amount::text != 'NaN'
-                AND (archived = FALSE OR archived IS NULL)
-            """, (self.tenant_id,), fetch_one=True)
-            revenue_value = float(result['revenue']) if result and result['revenue'] is not None else 0.0
-            kpis['total_revenue'] = 0.0 if (revenue_value != revenue_value) else revenue_value  # Check for NaN
+            # Transaction totals, date range, entities and monthly trends in one scan
+            where_clause, params = tenant_where_clause(self.tenant_id)
+            aggregate = get_transaction_kpis(self.db_manager, self.tenant_id, where_clause, params)
 
-            # Expenses (negative amounts) - exclude NaN values
-            result = self.db_manager.execute_query("""
-                SELECT COALESCE(SUM(ABS(amount)), 0) as expenses
-                FROM transactions
-                WHERE tenant_id = %s
-                AND amount < 0
-                AND amount::text != 'NaN'
-                AND (archived = FALSE OR archived IS NULL)
-            """, (self.tenant_id,), fetch_one=True)
-            expenses_value = float(result['expenses']) if result and result['expenses'] is not None else 0.0
-            kpis['total_expenses'] = 0.0 if (expenses_value != expenses_value) else expenses_value  # Check for NaN
+            kpis['total_transactions'] = aggregate['total_transactions']
+            kpis['total_revenue'] = aggregate['total_revenue']
+            kpis['total_expenses'] = aggregate['total_expenses']
 
             # Net profit
             kpis['net_profit'] = kpis['total_revenue'] - kpis['total_expenses']
 
             # Date range
-            result = self.db_manager.execute_query("""
-                SELECT
-                    MIN(date) as min_date,
-                    MAX(date) as max_date
-                FROM transactions
-                WHERE tenant_id = %s AND (archived = FALSE OR archived IS NULL)
-            """, (self.tenant_id,), fetch_one=True)
-            if result and result['min_date']:
-                min_date = result['min_date']
-                max_date = result['max_date']
-
-                # Handle date serialization
-                if isinstance(min_date, (date, datetime)):
-                    min_date_str = min_date.isoformat()
-                else:
-                    min_date_str = str(min_date)
-
-                if isinstance(max_date, (date, datetime)):
-                    max_date_str = max_date.isoformat()
-                else:
-                    max_date_str = str(max_date)
-
+            min_date = aggregate['min_date']
+            max_date = aggregate['max_date']
+            if min_date:
                 kpis['date_range'] = {
-                    'min': min_date_str,
-                    'max': max_date_str
+                    'min': min_date.isoformat(),
+                    'max': max_date.isoformat()
                 }
-
-                # Calculate years of data (only if dates are date objects)
-                if isinstance(min_date, (date, datetime)) and isinstance(max_date, (date, datetime)):
-                    years = (max_date - min_date).days / 365.25
-                    kpis['years_of_data'] = round(years, 1)
-                else:
-                    kpis['years_of_data'] = 0
+                kpis['years_of_data'] = round((max_date - min_date).days / 365.25, 1)
             else:
                 kpis['date_range'] = {'min': 'N/A', 'max': 'N/A'}
                 kpis['years_of_data'] = 0
 
             # Transactions by entity
-            results = self.db_manager.execute_query("""
-                SELECT
-                    classified_entity,
-                    COUNT(*) as count,
-                    SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as revenue,
-                    SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expenses
-                FROM transactions
-                WHERE tenant_id = %s
-                AND classified_entity IS NOT NULL
-                AND (archived = FALSE OR archived IS NULL)
-                GROUP BY classified_entity
-                ORDER BY count DESC
-                LIMIT 10
-            """, (self.tenant_id,), fetch_all=True)
-            kpis['top_entities'] = [
-                {
-                    'name': row['classified_entity'],
-                    'transaction_count': row['count'],
-                    'revenue': float(row['revenue']) if row['revenue'] else 0.0,
-                    'expenses': float(row['expenses']) if row['expenses'] else 0.0
-                }
-                for row in (results or [])
-            ]
+            kpis['top_entities'] = [dict(entity) for entity in aggregate['entities'][:10]]
 
             # Needs review count
-            result = self.db_manager.execute_query("""
-                SELECT COUNT(*) as needs_review
-                FROM transactions
-                WHERE tenant_id = %s
-                AND (confidence < 0.8 OR confidence IS NULL)
-                AND (archived = FALSE OR archived IS NULL)
-            """, (self.tenant_id,), fetch_one=True)
-            kpis['needs_review'] = result['needs_review'] if result else 0
+            kpis['needs_review'] = aggregate['needs_review']
 
             # Invoice statistics
             result = self.db_manager.execute_query("""
@@ -289,28 +217,14 @@ class DataQueryService:
                 kpis['overdue_invoices'] = 0
 
             # Monthly trends (last 12 months)
-            results = self.db_manager.execute_query("""
-                SELECT
-                    DATE_TRUNC('month', date::date) as month,
-                    SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as revenue,
-                    SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expenses,
-                    COUNT(*) as transaction_count
-                FROM transactions
-                WHERE tenant_id = %s
-                AND date::date >= CURRENT_DATE - INTERVAL '12 months'
-                AND (archived = FALSE OR archived IS NULL)
-                GROUP BY DATE_TRUNC('month', date::date)
-                ORDER BY month DESC
-                LIMIT 12
-            """, (self.tenant_id,), fetch_all=True)
             kpis['monthly_trends'] = [
                 {
-                    'month': row['month'].isoformat() if row['month'] and isinstance(row['month'], (date, datetime)) else (str(row['month']) if row['month'] else None),
-                    'revenue': float(row['revenue']) if row['revenue'] else 0.0,
-                    'expenses': float(row['expenses']) if row['expenses'] else 0.0,
+                    'month': row['month'].isoformat(),
+                    'revenue': row['revenue'],
+                    'expenses': row['expenses'],
                     'transaction_count': row['transaction_count']
                 }
-                for row in (results or [])
+                for row in aggregate['monthly_trends']
             ]
 
             return kpis
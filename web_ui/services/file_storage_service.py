@@ -11,7 +11,6 @@ import json
 from datetime import datetime, timedelta
 from typing import Optional, Tuple, BinaryIO
 from werkzeug.utils import secure_filename
-from google.cloud import storage
 import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from database import db_manager
@@ -32,7 +31,7 @@ class FileStorageService:
     }
 
     def __init__(self):
-        """Initialize GCS client and bucket with service account authentication"""
+        """Resolve GCS configuration; the client itself is created on first use"""
         # Get service account credentials
         credentials_path = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
 
@@ -45,20 +44,7 @@ class FileStorageService:
                 credentials_path = service_account_path
                 print(f"Using service account from: {credentials_path}")
 
-        # Initialize GCS client with explicit credentials
-        if credentials_path and os.path.exists(credentials_path):
-            from google.oauth2 import service_account
-            credentials = service_account.Credentials.from_service_account_file(
-                credentials_path,
-                scopes=['https://www.googleapis.com/auth/cloud-platform']
-            )
-            self.gcs_client = storage.Client(credentials=credentials)
-            print(f"✅ GCS client initialized with service account: {credentials_path}")
-        else:
-            # Fallback to Application Default Credentials (for development)
-            self.gcs_client = storage.Client()
-            print("⚠️ GCS client initialized with Application Default Credentials")
-
+        self.credentials_path = credentials_path if credentials_path and os.path.exists(credentials_path) else None
         self.bucket_name = os.environ.get('GCS_BUCKET_NAME')
 
         if not self.bucket_name:
@@ -68,8 +54,39 @@ class FileStorageService:
                 "'deltacfo-uploads-prod' for production."
             )
 
-        self.bucket = self.gcs_client.bucket(self.bucket_name)
         self.max_size_mb = int(os.environ.get('UPLOAD_MAX_SIZE_MB', 50))
+        self._gcs_client = None
+        self._bucket = None
+
+    @property
+    def gcs_client(self):
+        """
+        GCS client, created on first use: importing google.cloud.storage and
+        resolving credentials (a metadata-server probe under Application Default
+        Credentials) would otherwise add seconds to every web app cold start.
+        """
+        if self._gcs_client is None:
+            from google.cloud import storage
+
+            if self.credentials_path:
+                from google.oauth2 import service_account
+                credentials = service_account.Credentials.from_service_account_file(
+                    self.credentials_path,
+                    scopes=['https://www.googleapis.com/auth/cloud-platform']
+                )
+                self._gcs_client = storage.Client(credentials=credentials)
+                print(f"✅ GCS client initialized with service account: {self.credentials_path}")
+            else:
+                # Fallback to Application Default Credentials (for development)
+                self._gcs_client = storage.Client()
+                print("⚠️ GCS client initialized with Application Default Credentials")
+        return self._gcs_client
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            self._bucket = self.gcs_client.bucket(self.bucket_name)
+        return self._bucket
 
     def _validate_file(self, file_obj, document_type: str) -> Tuple[str, str, int]:
         """
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Financial Report Data Provider
+Period aggregates behind the PDF financial statements (DRE, balance sheet,
+cash flow, DMPL), computed in one scan over the tenant's transactions with
+the same scope and date parsing as the KPI aggregation.
+"""
+
+import logging
+from datetime import date
+from typing import Any, Dict, Optional
+
+from dateutil.relativedelta import relativedelta
+
+try:
+    from .kpi_aggregator import PARSED_DATE_SQL, tenant_where_clause
+except ImportError:
+    # Fallback for when imported directly (services folder added to sys.path)
+    from kpi_aggregator import PARSED_DATE_SQL, tenant_where_clause
+
+logger = logging.getLogger(__name__)
+
+# One scan: FILTER clauses give the current period, the same period a year
+# earlier, cumulative positions and opening balances; the grouping set adds
+# the current period's category/entity breakdown
+REPORT_DATA_QUERY = """
+    WITH scoped AS (
+        SELECT
+            accounting_category,
+            classified_entity,
+            description,
+            amount,
+            COALESCE(usd_equivalent, amount, 0) AS usd_amount,
+            {parsed_date} AS parsed_date
+        FROM transactions
+        WHERE {where_clause}
+    )
+    SELECT
+        GROUPING(accounting_category, classified_entity) AS totals_rollup,
+        accounting_category,
+        classified_entity,
+        COUNT(*) FILTER (WHERE parsed_date BETWEEN %(start_date)s AND %(end_date)s) AS period_count,
+        COALESCE(SUM(usd_amount) FILTER (
+            WHERE amount > 0 AND parsed_date BETWEEN %(start_date)s AND %(end_date)s), 0) AS revenue,
+        COALESCE(SUM(ABS(usd_amount)) FILTER (
+            WHERE amount < 0 AND parsed_date BETWEEN %(start_date)s AND %(end_date)s), 0) AS expenses,
+        COALESCE(SUM(usd_amount) FILTER (
+            WHERE amount > 0 AND parsed_date BETWEEN %(prev_start)s AND %(prev_end)s), 0) AS prev_revenue,
+        COALESCE(SUM(ABS(usd_amount)) FILTER (
+            WHERE amount < 0 AND parsed_date BETWEEN %(prev_start)s AND %(prev_end)s), 0) AS prev_expenses,
+        COALESCE(SUM(usd_amount) FILTER (WHERE amount > 0), 0) AS total_assets,
+        COALESCE(SUM(ABS(usd_amount)) FILTER (WHERE amount < 0), 0) AS total_liabilities,
+        COALESCE(SUM(usd_amount) FILTER (WHERE amount > 0 AND parsed_date <= %(prev_end)s), 0) AS prev_total_assets,
+        COALESCE(SUM(ABS(usd_amount)) FILTER (
+            WHERE amount < 0 AND parsed_date <= %(prev_end)s), 0) AS prev_total_liabilities,
+        COALESCE(SUM(CASE WHEN amount > 0 THEN usd_amount ELSE -ABS(usd_amount) END) FILTER (
+            WHERE parsed_date <= %(opening_date)s), 0) AS opening_equity,
+        COALESCE(SUM(usd_amount) FILTER (
+            WHERE amount > 0 AND parsed_date < %(start_date)s
+            AND LOWER(COALESCE(description, classified_entity, '')) LIKE ANY(ARRAY['%%cash%%', '%%bank%%', '%%deposit%%'])
+        ), 0) AS beginning_cash
+    FROM scoped
+    WHERE parsed_date <= %(end_date)s
+    GROUP BY GROUPING SETS ((), (accounting_category, classified_entity))
+"""
+
+TOTAL_FIELDS = ('revenue', 'expenses', 'prev_revenue', 'prev_expenses', 'total_assets', 'total_liabilities',
+                'prev_total_assets', 'prev_total_liabilities', 'opening_equity', 'beginning_cash')
+
+
+def _money(value) -> float:
+    value = float(value) if value is not None else 0.0
+    return 0.0 if value != value else value  # NaN check
+
+
+def report_windows(start_date: date, end_date: date) -> Dict[str, date]:
+    """Date bounds used by the statements: comparison year and opening balance date"""
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'prev_start': start_date - relativedelta(years=1),
+        'prev_end': end_date - relativedelta(years=1),
+        'opening_date': date(start_date.year - 1, 12, 31),
+    }
+
+
+def empty_report_data() -> Dict[str, Any]:
+    data = {field: 0.0 for field in TOTAL_FIELDS}
+    data['categories'] = []
+    return _with_derived_totals(data)
+
+
+def _with_derived_totals(data: Dict[str, Any]) -> Dict[str, Any]:
+    data['total_revenue'] = data['revenue']
+    data['total_expenses'] = data['expenses']
+    data['net_result'] = data['revenue'] - data['expenses']
+    data['prev_net_result'] = data['prev_revenue'] - data['prev_expenses']
+    data['total_equity'] = data['total_assets'] - data['total_liabilities']
+    data['prev_total_equity'] = data['prev_total_assets'] - data['prev_total_liabilities']
+    return data
+
+
+def _parse_report_rows(rows) -> Dict[str, Any]:
+    """Fold grouping-set rows into one report data dict (plain, picklable values)"""
+    data = empty_report_data()
+    for row in rows or []:
+        if row['totals_rollup']:
+            data.update({field: _money(row[field]) for field in TOTAL_FIELDS})
+        elif row['period_count']:
+            data['categories'].append({
+                'accounting_category': row['accounting_category'],
+                'classified_entity': row['classified_entity'],
+                'revenue': _money(row['revenue']),
+                'expenses': _money(row['expenses']),
+            })
+
+    data['categories'].sort(key=lambda c: (-c['revenue'], -c['expenses']))
+    return _with_derived_totals(data)
+
+
+def fetch_report_data(db_manager, tenant_id: str, start_date: date, end_date: date,
+                      entity: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Aggregates for every financial statement of a period with a single query.
+
+    Args:
+        db_manager: DatabaseManager instance (PostgreSQL)
+        tenant_id: Tenant whose transactions are reported
+        start_date, end_date: Reporting period (inclusive)
+        entity: Optional classified_entity filter
+
+    Returns:
+        Dict with period revenue/expenses/net_result and the prior-year
+        comparison (prev_*), cumulative total_assets/total_liabilities/total_equity
+        at end_date and a year earlier, opening_equity at the previous year end,
+        beginning_cash and the period's category/entity breakdown
+    """
+    if not tenant_id:
+        raise ValueError("tenant_id is required for financial report data")
+
+    where_clause, where_params = tenant_where_clause(tenant_id)
+    # tenant_where_clause uses positional placeholders; this query uses named ones
+    where_clause = where_clause.replace('%s', '%(tenant_id)s')
+    params = report_windows(start_date, end_date)
+    params['tenant_id'] = where_params[0]
+    if entity:
+        where_clause += " AND classified_entity = %(entity)s"
+        params['entity'] = entity
+
+    query = REPORT_DATA_QUERY.format(parsed_date=PARSED_DATE_SQL, where_clause=where_clause)
+    rows = db_manager.execute_query(query, params, fetch_all=True)
+    return _parse_report_rows(rows)
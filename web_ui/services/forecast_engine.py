@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Financial Forecast Engine
+Batch forecasting of per-entity revenue, COGS and SG&A series for the
+financial forecast report.
+
+All series come from one entity x period aggregate of the tenant ledger
+snapshot and are fitted together: every model works on a (series, periods)
+matrix with NumPy, so 200 entities cost about the same as one. Fits are
+cached per data version; scenarios are applied to the cached fits as
+percentage overlays, so toggling them never refits or re-reads history.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .ledger_snapshot import data_version, get_tenant_ledger
+except ImportError:
+    # Fallback for when imported directly (services folder added to sys.path)
+    from ledger_snapshot import data_version, get_tenant_ledger
+
+try:
+    from module_singletons import shared_instance
+except ImportError:
+    # web_ui/ itself is not on sys.path (imported through the repo root)
+    from web_ui.module_singletons import shared_instance
+
+logger = logging.getLogger(__name__)
+
+FORECAST_CACHE_TTL_SECONDS = 600
+FORECAST_CACHE_MAX_ENTRIES = 128
+
+METRICS = ('revenue', 'cogs', 'sga')
+
+SEASON_LENGTHS = {'monthly': 12, 'quarterly': 4}
+PERIOD_MONTHS = {'monthly': 1, 'quarterly': 3}
+
+# Two-sided normal quantiles for the supported confidence band levels
+Z_SCORES = {80: 1.2816, 90: 1.6449, 95: 1.9600}
+
+# Holt-Winters smoothing parameters searched per series (lowest in-sample SSE wins)
+HW_ALPHAS = (0.2, 0.5, 0.8)
+HW_BETAS = (0.05, 0.2)
+HW_GAMMAS = (0.1, 0.3)
+
+# Percent level changes per metric applied to the base forecast
+SCENARIOS = {
+    'base': {'revenue': 0.0, 'cogs': 0.0, 'sga': 0.0},
+    'optimistic': {'revenue': 10.0, 'cogs': -5.0, 'sga': -5.0},
+    'pessimistic': {'revenue': -10.0, 'cogs': 5.0, 'sga': 10.0},
+}
+
+MODEL_DESCRIPTIONS = {
+    'seasonal_naive': 'Seasonal naive: each period repeats the same period one season earlier',
+    'holt_winters': 'Additive Holt-Winters exponential smoothing (level, trend and seasonality)',
+    'linear': 'Least-squares linear trend over the historical periods',
+    'moving_average': '3-period moving average forecast',
+    'weighted': 'Weighted average with 2% growth assumption',
+}
+
+
+class ForecastFit:
+    """Point forecasts and standard errors, shape (series, horizon)"""
+
+    def __init__(self, method: str, point: np.ndarray, stderr: np.ndarray):
+        self.method = method
+        self.point = point
+        self.stderr = stderr
+
+    def rows(self, start: int, stop: int) -> 'ForecastFit':
+        return ForecastFit(self.method, self.point[start:stop], self.stderr[start:stop])
+
+
+def _rms(residuals: np.ndarray) -> np.ndarray:
+    """Per-series root mean square of the residual columns (zero without residuals)"""
+    if residuals.shape[1] == 0:
+        return np.zeros(residuals.shape[0])
+    return np.sqrt(np.mean(residuals ** 2, axis=1))
+
+
+def seasonal_naive(history: np.ndarray, horizon: int, season_length: int) -> ForecastFit:
+    """Repeat the last season (the last value if there's less than one season of history)"""
+    periods = history.shape[1]
+    m = season_length if periods >= season_length else 1
+    steps = np.arange(horizon)
+    point = history[:, periods - m + steps % m]
+    sigma = _rms(history[:, m:] - history[:, :-m])
+    stderr = sigma[:, None] * np.sqrt(steps // m + 1)
+    return ForecastFit('seasonal_naive', point, stderr)
+
+
+def linear_trend(history: np.ndarray, horizon: int) -> ForecastFit:
+    """Least-squares line per series, with prediction-interval standard errors"""
+    periods = history.shape[1]
+    t = np.arange(periods, dtype=np.float64)
+    t_centered = t - t.mean()
+    sxx = float(t_centered @ t_centered)
+    slope = history @ t_centered / sxx if sxx > 0 else np.zeros(history.shape[0])
+    intercept = history.mean(axis=1) - slope * t.mean()
+
+    residuals = history - (intercept[:, None] + slope[:, None] * t)
+    dof = max(periods - 2, 1)
+    sigma = np.sqrt(np.sum(residuals ** 2, axis=1) / dof)
+
+    future = periods + np.arange(horizon, dtype=np.float64)
+    point = intercept[:, None] + slope[:, None] * future
+    leverage = 1 + 1 / periods + ((future - t.mean()) ** 2 / sxx if sxx > 0 else 0)
+    return ForecastFit('linear', point, sigma[:, None] * np.sqrt(leverage))
+
+
+def holt_winters(history: np.ndarray, horizon: int, season_length: int) -> ForecastFit:
+    """
+    Additive Holt-Winters, vectorized over series and the smoothing parameter
+    grid. With less than two seasons of history seasonality is dropped (Holt).
+    """
+    series, periods = history.shape
+    seasonal = periods >= 2 * season_length
+    m = season_length if seasonal else 1
+
+    grid = np.array([(a, b, g if seasonal else 0.0) for a in HW_ALPHAS for b in HW_BETAS for g in HW_GAMMAS])
+    grid = np.unique(grid, axis=0)
+    alpha, beta, gamma = grid[:, 0], grid[:, 1], grid[:, 2]
+
+    # Initial state (just before the first period) from the first two seasons:
+    # shapes (series, grid[, m]); seasonal indices are detrended
+    if seasonal:
+        first, second = history[:, :m].mean(axis=1), history[:, m:2 * m].mean(axis=1)
+        trend0 = (second - first) / m
+        level0 = first - trend0 * (m + 1) / 2
+        season0 = history[:, :m] - (level0[:, None] + trend0[:, None] * np.arange(1, m + 1))
+    else:
+        level0 = history[:, 0]
+        trend0 = history[:, 1] - history[:, 0] if periods > 1 else np.zeros(series)
+        season0 = np.zeros((series, 1))
+    level = np.repeat(level0[:, None], len(grid), axis=1)
+    trend = np.repeat(trend0[:, None], len(grid), axis=1)
+    season = np.repeat(season0[:, None, :], len(grid), axis=1)
+
+    sse = np.zeros((series, len(grid)))
+    for t in range(periods):
+        y = history[:, t][:, None]
+        s = season[:, :, t % m]
+        error = y - (level + trend + s)
+        sse += error ** 2
+        new_level = alpha * (y - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[:, :, t % m] = gamma * (y - new_level) + (1 - gamma) * s
+        level = new_level
+
+    best = np.argmin(sse, axis=1)
+    rows = np.arange(series)
+    level, trend, season = level[rows, best], trend[rows, best], season[rows, best]
+
+    steps = np.arange(1, horizon + 1)
+    point = level[:, None] + steps * trend[:, None] + season[:, (periods + steps - 1) % m]
+
+    # h-step variance: sigma^2 * (1 + sum_{j<h} (alpha * (1 + j * beta) + gamma * [j % m == 0])^2)
+    sigma = np.sqrt(sse[rows, best] / periods)
+    a, b, g = alpha[best][:, None], beta[best][:, None], gamma[best][:, None]
+    j = np.arange(1, horizon)
+    psi = a * (1 + j * b) + g * (j % m == 0)
+    variance_factor = 1 + np.concatenate([np.zeros((series, 1)), np.cumsum(psi ** 2, axis=1)], axis=1)
+    return ForecastFit('holt_winters', point, sigma[:, None] * np.sqrt(variance_factor))
+
+
+def moving_average(history: np.ndarray, horizon: int, window: int = 3) -> ForecastFit:
+    """Flat forecast at the mean of the last periods"""
+    window = min(window, history.shape[1])
+    level = history[:, -window:].mean(axis=1)
+    sums = np.cumsum(np.pad(history, ((0, 0), (1, 0))), axis=1)
+    fitted = (sums[:, window:-1] - sums[:, :-window - 1]) / window
+    sigma = _rms(history[:, window:] - fitted)
+    steps = np.arange(1, horizon + 1)
+    return ForecastFit('moving_average', np.repeat(level[:, None], horizon, axis=1), sigma[:, None] * np.sqrt(steps))
+
+
+def weighted_average(history: np.ndarray, horizon: int, growth_rate: float = 1.02) -> ForecastFit:
+    """Weights 1, 2, 3 on the last three periods, compounded by the growth assumption"""
+    weights = np.array([1.0, 2.0, 3.0])
+    level = history[:, -3:] @ weights / weights.sum()
+    periods = history.shape[1]
+    fitted = sum(history[:, k:periods - 3 + k] * w for k, w in enumerate(weights)) / weights.sum() * growth_rate
+    sigma = _rms(history[:, 3:] - fitted)
+    steps = np.arange(1, horizon + 1)
+    return ForecastFit('weighted', level[:, None] * growth_rate ** steps, sigma[:, None] * np.sqrt(steps))
+
+
+FORECAST_MODELS: Dict[str, Callable[[np.ndarray, int, int], ForecastFit]] = {
+    'seasonal_naive': seasonal_naive,
+    'holt_winters': holt_winters,
+    'linear': lambda history, horizon, season_length: linear_trend(history, horizon),
+    'moving_average': lambda history, horizon, season_length: moving_average(history, horizon),
+    'weighted': lambda history, horizon, season_length: weighted_average(history, horizon),
+}
+
+# Fewest historical periods each model needs
+MIN_HISTORY = {'seasonal_naive': 1, 'holt_winters': 3, 'linear': 3, 'moving_average': 3, 'weighted': 3}
+
+
+def fit_series(history: np.ndarray, method: str, horizon: int, season_length: int = 12) -> Optional[ForecastFit]:
+    """Fit every row of a (series, periods) matrix with one model; None if there's too little history"""
+    if method not in FORECAST_MODELS:
+        raise ValueError(f"Unknown forecast method: {method}")
+    if history.shape[1] < MIN_HISTORY[method] or horizon < 1:
+        return None
+    return FORECAST_MODELS[method](np.asarray(history, dtype=np.float64), horizon, season_length)
+
+
+def scenario_adjustments(scenario: str = 'base', overrides: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Percent change per metric for a named scenario, with per-metric overrides"""
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Unknown scenario: {scenario}")
+    adjustments = dict(SCENARIOS[scenario])
+    adjustments.update({metric: float(value) for metric, value in (overrides or {}).items()
+                        if metric in METRICS and value is not None})
+    return adjustments
+
+
+# ========================================
+# TENANT FORECASTS
+# ========================================
+
+class ForecastCache:
+    """Per-(tenant, filter hash) forecast fits; keys carry the data version, so writes retire them"""
+
+    def __init__(self, max_entries: int = FORECAST_CACHE_MAX_ENTRIES, ttl_seconds: float = FORECAST_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[Tuple, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def filter_hash(filters: Dict[str, Any]) -> str:
+        payload = json.dumps(filters, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, tenant_id: str, filters: Dict[str, Any], compute):
+        version = data_version(tenant_id)
+        key = (tenant_id, self.filter_hash(filters), version)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], True
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            # Don't store fits computed from data older than a concurrent write
+            if data_version(tenant_id) == version:
+                self._entries[key] = (time.time(), value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+forecast_cache = shared_instance(__name__, 'forecast_cache', ForecastCache)
+
+
+def history_window(today: date, granularity: str, historical_periods: int) -> Tuple[date, date]:
+    """First and last month of the last complete periods (the current period is still open)"""
+    period_months = PERIOD_MONTHS[granularity]
+    current = today.year * 12 + today.month - 1
+    current -= current % period_months
+    last = current - 1
+    first = current - historical_periods * period_months
+    return date(first // 12, first % 12 + 1, 1), date(last // 12, last % 12 + 1, 1)
+
+
+def _to_periods(matrix: np.ndarray, period_months: int) -> np.ndarray:
+    """Sum month columns into periods of period_months (columns start on a period boundary)"""
+    if period_months == 1:
+        return matrix
+    rows, months = matrix.shape
+    return matrix.reshape(rows, months // period_months, period_months).sum(axis=2)
+
+
+def fit_entity_forecasts(pl: Dict[str, Any], method: str, horizon: int, granularity: str = 'monthly') -> Dict[str, Any]:
+    """
+    Fit revenue, COGS and SG&A of every entity in one batch from the
+    monthly P&L matrices (TenantLedger.monthly_pl_by_entity)
+    """
+    period_months = PERIOD_MONTHS[granularity]
+    history = {metric: _to_periods(pl[metric], period_months) for metric in METRICS}
+    entity_count = len(pl['entities'])
+
+    stacked = np.vstack([history[metric] for metric in METRICS])
+    fit = fit_series(stacked, method, horizon, SEASON_LENGTHS[granularity]) if entity_count else None
+
+    return {
+        'entities': pl['entities'],
+        'periods': pl['months'][::period_months],
+        'history': history,
+        'transaction_count': _to_periods(pl['transaction_count'], period_months),
+        'fits': {metric: fit.rows(i * entity_count, (i + 1) * entity_count)
+                 for i, metric in enumerate(METRICS)} if fit else None,
+    }
+
+
+def get_forecast_model(db_manager, tenant_id: str, method: str = 'holt_winters', horizon: int = 6,
+                       granularity: str = 'monthly', historical_periods: int = 24,
+                       entity: str = '') -> Tuple[Dict[str, Any], bool]:
+    """Fitted entity forecasts, from the cache while the tenant's data is unchanged; returns (model, cached)"""
+    if granularity not in PERIOD_MONTHS:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+    filters = {'method': method, 'horizon': horizon, 'granularity': granularity,
+               'historical_periods': historical_periods, 'entity': entity, 'today': date.today()}
+
+    def compute():
+        first_month, last_month = history_window(date.today(), granularity, historical_periods)
+        ledger = get_tenant_ledger(db_manager, tenant_id)
+        selected = ledger.mask(start_date=first_month, entity=entity)
+        pl = ledger.monthly_pl_by_entity(selected, first_month, last_month)
+        started = time.perf_counter()
+        model = fit_entity_forecasts(pl, method, horizon, granularity)
+        logger.info(f"[FORECAST] Fitted {len(METRICS) * len(pl['entities'])} {method} series for tenant {tenant_id} "
+                    f"in {int((time.perf_counter() - started) * 1000)}ms")
+        return model
+
+    return forecast_cache.get_or_compute(tenant_id, filters, compute)
+
+
+def build_forecast(model: Dict[str, Any], adjustments: Dict[str, float], confidence_level: int = 80,
+                   include_entities: bool = False) -> Dict[str, Any]:
+    """
+    Total (and optionally per-entity) forecasts with confidence bands and the
+    scenario's percent adjustments applied to the cached fits. Entity errors are
+    treated as independent when combined into totals.
+    """
+    if confidence_level not in Z_SCORES:
+        raise ValueError(f"Unsupported confidence level: {confidence_level}")
+    z = Z_SCORES[confidence_level]
+    fits = model['fits']
+    if not fits:
+        return {'totals': [], 'entities': []}
+
+    scale = {metric: 1 + adjustments.get(metric, 0.0) / 100 for metric in METRICS}
+    point = {metric: np.clip(fits[metric].point * scale[metric], 0, None) for metric in METRICS}
+    stderr = {metric: fits[metric].stderr * abs(scale[metric]) for metric in METRICS}
+
+    def forecast_rows(p: Dict[str, np.ndarray], se: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        # Columns are computed and rounded as arrays; only the dict assembly loops
+        p = dict(p, expenses=p['cogs'] + p['sga'], net_profit=p['revenue'] - p['cogs'] - p['sga'])
+        se = dict(se, net_profit=np.sqrt(se['revenue'] ** 2 + se['cogs'] ** 2 + se['sga'] ** 2))
+        values = {name: np.round(column, 2).tolist() for name, column in p.items()}
+        bands = {}
+        for name in se:
+            lower = p[name] - z * se[name]
+            # Revenue, COGS and SG&A can't go negative; net profit can
+            if name in METRICS:
+                lower = np.maximum(lower, 0)
+            bands[name] = (np.round(lower, 2).tolist(), np.round(p[name] + z * se[name], 2).tolist())
+        return [
+            dict({name: column[h] for name, column in values.items()},
+                 bands={name: {'lower': lower[h], 'upper': upper[h]} for name, (lower, upper) in bands.items()})
+            for h in range(len(values['revenue']))
+        ]
+
+    totals = forecast_rows({m: point[m].sum(axis=0) for m in METRICS},
+                           {m: np.sqrt((stderr[m] ** 2).sum(axis=0)) for m in METRICS})
+    entities = []
+    if include_entities:
+        entities = [
+            {'entity': name, 'forecast': forecast_rows({m: point[m][i] for m in METRICS},
+                                                       {m: stderr[m][i] for m in METRICS})}
+            for i, name in enumerate(model['entities'])
+        ]
+    return {'totals': totals, 'entities': entities}
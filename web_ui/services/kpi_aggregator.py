@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Single-scan KPI Aggregation
+Computes transaction counts, revenue, expenses, review backlog, date range,
+entity/source-file breakdowns and monthly trends in one pass over transactions
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+try:
+    from .tenant_data_version import tenant_data_version, tenant_data_versions
+except ImportError:
+    # Fallback for when imported directly (services folder added to sys.path)
+    from tenant_data_version import tenant_data_version, tenant_data_versions
+
+try:
+    from module_singletons import shared_instance
+except ImportError:
+    # web_ui/ itself is not on sys.path (imported through the repo root)
+    from web_ui.module_singletons import shared_instance
+
+logger = logging.getLogger(__name__)
+
+# Cached aggregates also expire on their own, covering writes the data version misses
+KPI_CACHE_TTL_SECONDS = 300
+KPI_CACHE_MAX_ENTRIES = 512
+
+# transactions.date is VARCHAR holding YYYY-MM-DD or MM/DD/YYYY
+PARSED_DATE_SQL = """
+    CASE
+        WHEN date::text ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}' THEN TO_DATE(date::text, 'YYYY-MM-DD')
+        WHEN date::text ~ '^[0-9]{2}/[0-9]{2}/[0-9]{4}' THEN TO_DATE(date::text, 'MM/DD/YYYY')
+        ELSE NULL
+    END
+"""
+
+# One scan: grouping sets produce the grand total, per-entity, per-source-file
+# and per-month rows from the same input; FILTER keeps NaN amounts out of sums
+KPI_QUERY = """
+    WITH scoped AS (
+        SELECT
+            amount,
+            confidence,
+            classified_entity,
+            source_file,
+            {parsed_date} AS parsed_date,
+            (amount IS NOT NULL AND amount::text != 'NaN') AS amount_ok
+        FROM transactions
+        WHERE {where_clause}
+    )
+    SELECT
+        GROUPING(classified_entity) AS by_entity_rollup,
+        GROUPING(source_file) AS by_source_rollup,
+        GROUPING(month) AS by_month_rollup,
+        classified_entity,
+        source_file,
+        month,
+        COUNT(*) AS transaction_count,
+        COALESCE(SUM(amount) FILTER (WHERE amount_ok AND amount > 0), 0) AS revenue,
+        COALESCE(SUM(ABS(amount)) FILTER (WHERE amount_ok AND amount < 0), 0) AS expenses,
+        COUNT(*) FILTER (WHERE confidence < 0.8 OR confidence IS NULL) AS needs_review,
+        MIN(parsed_date) AS min_date,
+        MAX(parsed_date) AS max_date
+    FROM (
+        SELECT
+            scoped.*,
+            CASE
+                WHEN parsed_date >= CURRENT_DATE - INTERVAL '{months} months'
+                THEN DATE_TRUNC('month', parsed_date)::date
+            END AS month
+        FROM scoped
+    ) windowed
+    GROUP BY GROUPING SETS ((), (classified_entity), (source_file), (month))
+"""
+
+
+def _money(value) -> float:
+    value = float(value) if value is not None else 0.0
+    return 0.0 if value != value else value  # NaN check
+
+
+def _parse_kpi_rows(rows) -> Dict[str, Any]:
+    """Fold grouping-set rows into one KPI dict"""
+    kpis = {
+        'total_transactions': 0,
+        'total_revenue': 0.0,
+        'total_expenses': 0.0,
+        'needs_review': 0,
+        'min_date': None,
+        'max_date': None,
+        'entities': [],
+        'source_files': [],
+        'monthly_trends': [],
+    }
+
+    for row in rows or []:
+        grouped_by_entity = not row['by_entity_rollup']
+        grouped_by_source = not row['by_source_rollup']
+        grouped_by_month = not row['by_month_rollup']
+
+        if not (grouped_by_entity or grouped_by_source or grouped_by_month):
+            kpis['total_transactions'] = row['transaction_count']
+            kpis['total_revenue'] = _money(row['revenue'])
+            kpis['total_expenses'] = _money(row['expenses'])
+            kpis['needs_review'] = row['needs_review']
+            kpis['min_date'] = row['min_date']
+            kpis['max_date'] = row['max_date']
+        elif grouped_by_entity and row['classified_entity'] is not None:
+            kpis['entities'].append({
+                'name': row['classified_entity'],
+                'transaction_count': row['transaction_count'],
+                'revenue': _money(row['revenue']),
+                'expenses': _money(row['expenses']),
+            })
+        elif grouped_by_source and row['source_file'] is not None:
+            kpis['source_files'].append((row['source_file'], row['transaction_count']))
+        elif grouped_by_month and row['month'] is not None:
+            kpis['monthly_trends'].append({
+                'month': row['month'],
+                'revenue': _money(row['revenue']),
+                'expenses': _money(row['expenses']),
+                'transaction_count': row['transaction_count'],
+            })
+
+    kpis['entities'].sort(key=lambda e: (-e['transaction_count'], e['name']))
+    kpis['source_files'].sort(key=lambda s: (-s[1], s[0]))
+    kpis['monthly_trends'].sort(key=lambda m: m['month'], reverse=True)
+    return kpis
+
+
+def aggregate_transaction_kpis(db_manager, where_clause: str, params: Sequence,
+                               months: int = 12) -> Dict[str, Any]:
+    """
+    Compute transaction KPIs for a WHERE clause with a single query.
+
+    Args:
+        db_manager: DatabaseManager instance (PostgreSQL)
+        where_clause: SQL condition on transactions; must include the tenant filter
+        params: Parameters for where_clause
+        months: Monthly trend window
+
+    Returns:
+        Dict with total_transactions, total_revenue, total_expenses, needs_review,
+        min_date/max_date (date or None), entities (all, by count desc),
+        source_files [(name, count)], monthly_trends (newest first)
+    """
+    query = KPI_QUERY.format(parsed_date=PARSED_DATE_SQL, where_clause=where_clause, months=int(months))
+    rows = db_manager.execute_query(query, tuple(params), fetch_all=True)
+    kpis = _parse_kpi_rows(rows)
+    kpis['monthly_trends'] = kpis['monthly_trends'][:months]
+    return kpis
+
+
+class KPICache:
+    """Per-(tenant, filter) KPI results, invalidated by tenant transaction writes"""
+
+    def __init__(self, max_entries: int = KPI_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[str, str], Dict[str, Any]]' = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def filter_hash(where_clause: str, params: Sequence, months: int) -> str:
+        payload = json.dumps([where_clause, list(params), months], default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def version(self, tenant_id: str, db_manager=None) -> int:
+        """
+        Data version of the tenant's transactions: local invalidations plus the
+        database-side counter, so writes by other workers are seen too. Both
+        parts only grow, so the sum changes whenever either does.
+        """
+        return self._versions.get(tenant_id, 0) + tenant_data_version(tenant_id, db_manager)
+
+    def invalidate(self, tenant_id: Optional[str] = None):
+        """Drop cached KPIs for one tenant (or all tenants)"""
+        with self._lock:
+            if tenant_id is None:
+                for key in self._versions:
+                    self._versions[key] += 1
+                self._entries.clear()
+                return
+            self._versions[tenant_id] = self._versions.get(tenant_id, 0) + 1
+            for key in [k for k in self._entries if k[0] == tenant_id]:
+                del self._entries[key]
+
+    def get_or_compute(self, db_manager, tenant_id: str, where_clause: str, params: Sequence,
+                       months: int = 12) -> Dict[str, Any]:
+        key = (tenant_id, self.filter_hash(where_clause, params, months))
+        version = self.version(tenant_id, db_manager)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry['version'] == version and time.time() - entry['built_at'] < KPI_CACHE_TTL_SECONDS:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry['kpis']
+            self.misses += 1
+
+        kpis = aggregate_transaction_kpis(db_manager, where_clause, params, months)
+
+        with self._lock:
+            # Don't store aggregates computed from data older than a concurrent invalidation
+            if self.version(tenant_id, db_manager) == version:
+                self._entries[key] = {'version': version, 'built_at': time.time(), 'kpis': kpis}
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return kpis
+
+
+kpi_cache = shared_instance(__name__, 'kpi_cache', KPICache)
+
+
+def get_transaction_kpis(db_manager, tenant_id: str, where_clause: str, params: Sequence,
+                         months: int = 12) -> Dict[str, Any]:
+    """
+    Cached aggregate_transaction_kpis for a tenant and filter.
+
+    The returned dict is shared with the cache; callers must not modify it.
+    """
+    if not tenant_id:
+        raise ValueError("tenant_id is required for KPI aggregation")
+    return kpi_cache.get_or_compute(db_manager, tenant_id, where_clause, params, months)
+
+
+def tenant_where_clause(tenant_id: str) -> Tuple[str, Tuple]:
+    """Default KPI scope: the tenant's non-archived transactions"""
+    return "tenant_id = %s AND (archived = FALSE OR archived IS NULL)", (tenant_id,)
+
+
+def invalidate_transaction_kpis(tenant_id: Optional[str] = None):
+    """Call after writes to a tenant's transactions"""
+    tenant_data_versions.forget(tenant_id)
+    kpi_cache.invalidate(tenant_id)
@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""
+Tenant Ledger Snapshot
+Per-process, per-tenant columnar copy of the transactions table (NumPy
+arrays of date, amount, USD amount and categorical codes for entity,
+category and subcategory) that the analytical report endpoints aggregate
+with vectorized group-bys instead of querying the database per request.
+
+Snapshots are built once, brought up to date from rows changed since the
+last load (updated_at watermark) after writes and ingests, and evicted
+least-recently-used beyond a memory budget. A published snapshot is never
+modified: syncs build a new one and swap it in, so readers aggregating an
+older snapshot always see consistent columns.
+"""
+
+import calendar
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .kpi_aggregator import PARSED_DATE_SQL, kpi_cache
+except ImportError:
+    # Fallback for when imported directly (services folder added to sys.path)
+    from kpi_aggregator import PARSED_DATE_SQL, kpi_cache
+
+try:
+    from module_singletons import shared_instance
+except ImportError:
+    # web_ui/ itself is not on sys.path (imported through the repo root)
+    from web_ui.module_singletons import shared_instance
+
+logger = logging.getLogger(__name__)
+
+LEDGER_SNAPSHOT_MEMORY_BUDGET_BYTES = int(os.getenv('LEDGER_SNAPSHOT_MEMORY_BUDGET_MB', '256')) * 1024 * 1024
+
+# Snapshots are also re-synced after this long, covering writes made by other processes
+LEDGER_SNAPSHOT_MAX_AGE_SECONDS = 300
+
+# Rows committed by transactions that started before the watermark carry an
+# older updated_at; re-reading this much overlap keeps them from being missed
+WATERMARK_OVERLAP_SECONDS = 300
+
+LEDGER_COLUMNS_QUERY = """
+    SELECT
+        transaction_id,
+        {parsed_date} AS parsed_date,
+        amount,
+        COALESCE(usd_equivalent, amount) AS usd_amount,
+        classified_entity,
+        accounting_category,
+        subcategory,
+        COALESCE(archived, FALSE) AS archived,
+        updated_at
+    FROM transactions
+    WHERE tenant_id = %s
+""".format(parsed_date=PARSED_DATE_SQL)
+
+# Row count and id checksum (sum of signed 32-bit md5 prefixes, see _id_hash);
+# a deletion shows up even when inserts keep the count unchanged
+LEDGER_CHECK_QUERY = """
+    SELECT
+        COUNT(*),
+        COALESCE(SUM(('x' || SUBSTR(MD5(transaction_id::text), 1, 8))::bit(32)::int), 0)
+    FROM transactions
+    WHERE tenant_id = %s
+"""
+
+LEDGER_IDS_QUERY = "SELECT transaction_id FROM transactions WHERE tenant_id = %s"
+
+GRANULARITY_UNITS = {'monthly': 'M', 'quarterly': 'Q', 'yearly': 'Y'}
+
+# Same split as the P&L trend report: outflows in these categories are COGS, the rest SG&A
+COGS_CATEGORY_KEYWORDS = ('material', 'inventory', 'cost of goods', 'cogs', 'cost of sales')
+COGS_SUBCATEGORY_KEYWORDS = ('material', 'inventory', 'cogs')
+
+UNASSIGNED_ENTITY = 'Unassigned'
+
+
+def data_version(tenant_id: str) -> int:
+    """Changes on every write to the tenant's transactions, by any process (shared with the KPI cache)"""
+    return kpi_cache.version(tenant_id)
+
+
+def _float(value) -> float:
+    return float(value) if value is not None else np.nan
+
+
+def _id_hash(transaction_id) -> int:
+    """First 32 bits of the id's md5 as a signed int (matches LEDGER_CHECK_QUERY)"""
+    value = int(hashlib.md5(str(transaction_id).encode('utf-8')).hexdigest()[:8], 16)
+    return value - (1 << 32) if value >= (1 << 31) else value
+
+
+def months_ago(day: date, months: int) -> date:
+    """day - INTERVAL 'n months' (day of month clamped like PostgreSQL)"""
+    month_index = day.year * 12 + day.month - 1 - months
+    year, month = divmod(month_index, 12)
+    return date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+class Vocabulary:
+    """String <-> int32 code mapping for a categorical column (None is -1)"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, values: Sequence[Optional[str]]) -> np.ndarray:
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if value is None:
+                codes[i] = -1
+                continue
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.values)
+                self.values.append(value)
+            codes[i] = code
+        return codes
+
+    def code(self, value: str) -> int:
+        """Code of a value, -2 (matches nothing) if it never occurs"""
+        return self._codes.get(value, -2)
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code] if code >= 0 else None
+
+    def copy(self) -> 'Vocabulary':
+        vocabulary = Vocabulary()
+        vocabulary.values = list(self.values)
+        vocabulary._codes = dict(self._codes)
+        return vocabulary
+
+
+class TenantLedger:
+    """
+    Columnar snapshot of one tenant's transactions (row order is load order).
+    Only modify ledgers that aren't published yet; use copy() to change one.
+    """
+
+    def __init__(self, tenant_id: str):
+        self.tenant_id = tenant_id
+        self.entities = Vocabulary()
+        self.categories = Vocabulary()
+        self.subcategories = Vocabulary()
+        self.transaction_ids = np.empty(0, dtype=object)
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        self.amounts = np.empty(0, dtype=np.float64)
+        self.usd_amounts = np.empty(0, dtype=np.float64)
+        self.entity_codes = np.empty(0, dtype=np.int32)
+        self.category_codes = np.empty(0, dtype=np.int32)
+        self.subcategory_codes = np.empty(0, dtype=np.int32)
+        self.archived = np.empty(0, dtype=bool)
+        self._positions: Dict[str, int] = {}
+        self.id_checksum = 0
+        self.watermark: Optional[datetime] = None
+        self.version = 0
+        self.synced_at = 0.0
+
+    def __len__(self):
+        return len(self.transaction_ids)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.dates, self.amounts, self.usd_amounts, self.entity_codes, self.category_codes,
+                  self.subcategory_codes, self.archived)
+        # Object array holds pointers; ids and the position index cost ~100 bytes a row
+        return sum(a.nbytes for a in arrays) + len(self) * 100
+
+    _ARRAYS = ('transaction_ids', 'dates', 'amounts', 'usd_amounts', 'entity_codes', 'category_codes',
+               'subcategory_codes', 'archived')
+
+    def copy(self) -> 'TenantLedger':
+        """Unpublished copy to apply changes to"""
+        ledger = TenantLedger(self.tenant_id)
+        for name in self._ARRAYS:
+            setattr(ledger, name, getattr(self, name).copy())
+        ledger.entities = self.entities.copy()
+        ledger.categories = self.categories.copy()
+        ledger.subcategories = self.subcategories.copy()
+        ledger._positions = dict(self._positions)
+        ledger.id_checksum = self.id_checksum
+        ledger.watermark = self.watermark
+        ledger.version = self.version
+        ledger.synced_at = self.synced_at
+        return ledger
+
+    def retain(self, transaction_ids) -> 'TenantLedger':
+        """Unpublished copy without the rows whose id isn't in transaction_ids"""
+        keep_ids = set(transaction_ids)
+        keep = np.array([tx_id in keep_ids for tx_id in self.transaction_ids], dtype=bool)
+        ledger = self.copy()
+        for name in self._ARRAYS:
+            setattr(ledger, name, getattr(self, name)[keep])
+        ledger._positions = {tx_id: i for i, tx_id in enumerate(ledger.transaction_ids)}
+        ledger.id_checksum = sum(_id_hash(tx_id) for tx_id in ledger.transaction_ids)
+        return ledger
+
+    def upsert_rows(self, rows: Sequence) -> int:
+        """Replace rows already in the snapshot and append new ones; returns how many were appended"""
+        if not rows:
+            return 0
+
+        ids = [row[0] for row in rows]
+        dates = np.array([row[1] for row in rows], dtype='datetime64[D]')
+        amounts = np.array([_float(row[2]) for row in rows], dtype=np.float64)
+        usd_amounts = np.array([_float(row[3]) for row in rows], dtype=np.float64)
+        entity_codes = self.entities.encode([row[4] for row in rows])
+        category_codes = self.categories.encode([row[5] for row in rows])
+        subcategory_codes = self.subcategories.encode([row[6] for row in rows])
+        archived = np.array([bool(row[7]) for row in rows], dtype=bool)
+
+        updated = [row[8] for row in rows if row[8] is not None]
+        if updated:
+            self.watermark = max([self.watermark, max(updated)] if self.watermark else updated)
+
+        # Changed rows are overwritten in place; the last occurrence of an id wins
+        existing = np.array([self._positions.get(tx_id, -1) for tx_id in ids], dtype=np.int64)
+        replace = existing >= 0
+        if replace.any():
+            at = existing[replace]
+            self.dates[at] = dates[replace]
+            self.amounts[at] = amounts[replace]
+            self.usd_amounts[at] = usd_amounts[replace]
+            self.entity_codes[at] = entity_codes[replace]
+            self.category_codes[at] = category_codes[replace]
+            self.subcategory_codes[at] = subcategory_codes[replace]
+            self.archived[at] = archived[replace]
+
+        new = np.flatnonzero(~replace)
+        appended = 0
+        if len(new):
+            # Ids appearing more than once in the batch: the last occurrence wins
+            last_occurrence: Dict[str, int] = {}
+            for i in new:
+                last_occurrence[ids[i]] = i
+            new = np.array(list(last_occurrence.values()), dtype=np.int64)
+            for offset, tx_id in enumerate(last_occurrence):
+                self._positions[tx_id] = len(self) + offset
+                self.id_checksum += _id_hash(tx_id)
+            self.transaction_ids = np.concatenate([self.transaction_ids, np.array([ids[i] for i in new], dtype=object)])
+            self.dates = np.concatenate([self.dates, dates[new]])
+            self.amounts = np.concatenate([self.amounts, amounts[new]])
+            self.usd_amounts = np.concatenate([self.usd_amounts, usd_amounts[new]])
+            self.entity_codes = np.concatenate([self.entity_codes, entity_codes[new]])
+            self.category_codes = np.concatenate([self.category_codes, category_codes[new]])
+            self.subcategory_codes = np.concatenate([self.subcategory_codes, subcategory_codes[new]])
+            self.archived = np.concatenate([self.archived, archived[new]])
+            appended = len(new)
+        return appended
+
+    # ------------------------------------------------------------------
+    # Vectorized queries
+    # ------------------------------------------------------------------
+
+    def mask(self, start_date: Optional[date] = None, end_date: Optional[date] = None,
+             entity: Optional[str] = None, include_archived: bool = True) -> np.ndarray:
+        """Rows with a finite amount inside the (inclusive) date range and entity"""
+        selected = np.isfinite(self.amounts)
+        if start_date is not None:
+            selected &= self.dates >= np.datetime64(start_date, 'D')
+        if end_date is not None:
+            selected &= self.dates <= np.datetime64(end_date, 'D')
+        if entity:
+            selected &= self.entity_codes == self.entities.code(entity)
+        if not include_archived:
+            selected &= ~self.archived
+        return selected
+
+    def period_summary(self, selected: np.ndarray, granularity: str = 'monthly',
+                       usd: bool = False) -> List[Dict[str, Any]]:
+        """
+        Per-period revenue, expenses, net_profit, transaction_count and average
+        revenue/expense transaction of the selected rows, oldest period first
+        """
+        amounts = (self.usd_amounts if usd else self.amounts)[selected]
+        periods = _period_starts(self.dates[selected], granularity)
+        valid = ~np.isnat(periods)
+        amounts, periods = amounts[valid], periods[valid]
+        if not len(amounts):
+            return []
+
+        keys, inverse = np.unique(periods, return_inverse=True)
+        positive = amounts > 0
+        negative = amounts < 0
+        bins = len(keys)
+        revenue = np.bincount(inverse, weights=np.where(positive, amounts, 0), minlength=bins)
+        expenses = np.bincount(inverse, weights=np.where(negative, -amounts, 0), minlength=bins)
+        counts = np.bincount(inverse, minlength=bins)
+        revenue_counts = np.bincount(inverse, weights=positive, minlength=bins)
+        expense_counts = np.bincount(inverse, weights=negative, minlength=bins)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_revenue = np.where(revenue_counts > 0, revenue / revenue_counts, np.nan)
+            avg_expense = np.where(expense_counts > 0, expenses / expense_counts, np.nan)
+
+        return [
+            {
+                # DATE_TRUNC returns a timestamp; keep the same serialization
+                'period': datetime.combine(keys[i].astype(date), datetime.min.time()),
+                'revenue': float(revenue[i]),
+                'expenses': float(expenses[i]),
+                'net_profit': float(revenue[i] - expenses[i]),
+                'transaction_count': int(counts[i]),
+                'avg_revenue_transaction': None if np.isnan(avg_revenue[i]) else float(avg_revenue[i]),
+                'avg_expense_transaction': None if np.isnan(avg_expense[i]) else float(avg_expense[i]),
+            }
+            for i in range(bins)
+        ]
+
+    def category_summary(self, selected: np.ndarray, usd: bool = False) -> List[Dict[str, Any]]:
+        """
+        Per accounting category (None as 'Uncategorized') revenue, expenses,
+        transaction_count and active_days of the selected rows, largest first
+        """
+        amounts = (self.usd_amounts if usd else self.amounts)[selected]
+        if not len(amounts):
+            return []
+
+        codes = self.category_codes[selected]
+        keys, inverse = np.unique(codes, return_inverse=True)
+        bins = len(keys)
+        revenue = np.bincount(inverse, weights=np.where(amounts > 0, amounts, 0), minlength=bins)
+        expenses = np.bincount(inverse, weights=np.where(amounts < 0, -amounts, 0), minlength=bins)
+        counts = np.bincount(inverse, minlength=bins)
+
+        # Distinct (category, day) pairs
+        days = self.dates[selected]
+        dated = ~np.isnat(days)
+        day_pairs = np.unique(np.stack([inverse[dated], days[dated].astype(np.int64)]), axis=1)
+        active_days = np.bincount(day_pairs[0], minlength=bins)
+
+        summary = [
+            {
+                'category': self.categories.decode(int(keys[i])) or 'Uncategorized',
+                'revenue': float(revenue[i]),
+                'expenses': float(expenses[i]),
+                'transaction_count': int(counts[i]),
+                'active_days': int(active_days[i]),
+            }
+            for i in range(bins)
+        ]
+        summary.sort(key=lambda row: -(row['revenue'] + row['expenses']))
+        return summary
+
+    def totals(self, selected: np.ndarray, usd: bool = False) -> Dict[str, Any]:
+        """Revenue, expenses, net, count, active months, sample stddev and extremes of the selected rows"""
+        amounts = (self.usd_amounts if usd else self.amounts)[selected]
+        if not len(amounts):
+            return {'total_revenue': 0.0, 'total_expenses': 0.0, 'net_position': 0.0, 'transaction_count': 0,
+                    'active_months': 0, 'amount_volatility': None, 'largest_outflow': None, 'largest_inflow': None}
+
+        months = self.dates[selected].astype('datetime64[M]')
+        return {
+            'total_revenue': float(amounts[amounts > 0].sum()),
+            'total_expenses': float(-amounts[amounts < 0].sum()),
+            'net_position': float(amounts.sum()),
+            'transaction_count': int(len(amounts)),
+            'active_months': int(len(np.unique(months[~np.isnat(months)]))),
+            'amount_volatility': float(np.std(amounts, ddof=1)) if len(amounts) > 1 else None,
+            'largest_outflow': float(amounts.min()),
+            'largest_inflow': float(amounts.max()),
+        }
+
+    def monthly_pl_by_entity(self, selected: np.ndarray, first_month: date, last_month: date,
+                             usd: bool = False) -> Dict[str, Any]:
+        """
+        Dense entity x month revenue, COGS and SG&A matrices of the selected rows
+        (one grouped aggregate; months without activity are zero). COGS are
+        outflows whose category or subcategory matches the P&L trend keywords.
+        """
+        months = np.arange(np.datetime64(first_month, 'M'), np.datetime64(last_month, 'M') + 1)
+        amounts = (self.usd_amounts if usd else self.amounts)[selected]
+        month_index = (self.dates[selected].astype('datetime64[M]') - months[0]).astype(np.int64)
+        in_range = ~np.isnat(self.dates[selected]) & (month_index >= 0) & (month_index < len(months))
+
+        amounts, month_index = amounts[in_range], month_index[in_range]
+        entity_codes = self.entity_codes[selected][in_range]
+        entity_keys, entity_index = np.unique(entity_codes, return_inverse=True)
+
+        # Per-vocabulary flags, indexed by code; the appended False serves code -1
+        category_cogs = np.array([_is_cogs(v, COGS_CATEGORY_KEYWORDS) for v in self.categories.values] + [False])
+        subcategory_cogs = np.array([_is_cogs(v, COGS_SUBCATEGORY_KEYWORDS) for v in self.subcategories.values] + [False])
+        is_cogs = (category_cogs[self.category_codes[selected][in_range]]
+                   | subcategory_cogs[self.subcategory_codes[selected][in_range]])
+
+        shape = (len(entity_keys), len(months))
+        cells = entity_index * len(months) + month_index
+        size = shape[0] * shape[1]
+        outflows = np.where(amounts < 0, -amounts, 0)
+        return {
+            'entities': [self.entities.decode(int(code)) or UNASSIGNED_ENTITY for code in entity_keys],
+            'months': [m.astype(date) for m in months],
+            'revenue': np.bincount(cells, weights=np.where(amounts > 0, amounts, 0), minlength=size).reshape(shape),
+            'cogs': np.bincount(cells, weights=np.where(is_cogs, outflows, 0), minlength=size).reshape(shape),
+            'sga': np.bincount(cells, weights=np.where(is_cogs, 0, outflows), minlength=size).reshape(shape),
+            'transaction_count': np.bincount(cells, minlength=size).reshape(shape),
+        }
+
+
+def _is_cogs(value: str, keywords: Tuple[str, ...]) -> bool:
+    value = value.lower()
+    return any(keyword in value for keyword in keywords)
+
+
+def _period_starts(dates: np.ndarray, granularity: str) -> np.ndarray:
+    """First day of each date's month/quarter/year (NaT stays NaT)"""
+    unit = GRANULARITY_UNITS.get(granularity, 'M')
+    if unit == 'Q':
+        months = dates.astype('datetime64[M]')
+        month_numbers = months.astype(np.int64)
+        quarter_starts = (month_numbers - month_numbers % 3).astype('datetime64[M]')
+        return np.where(np.isnat(months), np.datetime64('NaT'), quarter_starts).astype('datetime64[D]')
+    return dates.astype(f'datetime64[{unit}]').astype('datetime64[D]')
+
+
+class LedgerSnapshotCache:
+    """Per-tenant ledger snapshots with LRU eviction beyond a memory budget"""
+
+    def __init__(self, memory_budget_bytes: int = LEDGER_SNAPSHOT_MEMORY_BUDGET_BYTES,
+                 max_age_seconds: float = LEDGER_SNAPSHOT_MAX_AGE_SECONDS):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_age_seconds = max_age_seconds
+        self._ledgers: 'OrderedDict[str, TenantLedger]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._tenant_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self.builds = 0
+        self.syncs = 0
+
+    def get(self, db_manager, tenant_id: str) -> TenantLedger:
+        """The tenant's snapshot, synced first if the tenant's transactions changed"""
+        with self._tenant_locks[tenant_id]:
+            with self._lock:
+                ledger = self._ledgers.get(tenant_id)
+                if ledger is not None:
+                    self._ledgers.move_to_end(tenant_id)
+
+            if ledger is None:
+                ledger = self._build(db_manager, tenant_id)
+            elif ledger.version != data_version(tenant_id) or time.time() - ledger.synced_at >= self.max_age_seconds:
+                ledger = self._sync(db_manager, ledger)
+            return ledger
+
+    def append_ingested(self, db_manager, tenant_id: str):
+        """Fold newly ingested rows into a loaded snapshot (no-op if the tenant isn't loaded)"""
+        with self._tenant_locks[tenant_id]:
+            with self._lock:
+                ledger = self._ledgers.get(tenant_id)
+            if ledger is not None:
+                self._sync(db_manager, ledger)
+
+    def invalidate(self, tenant_id: Optional[str] = None):
+        with self._lock:
+            if tenant_id is None:
+                self._ledgers.clear()
+            else:
+                self._ledgers.pop(tenant_id, None)
+
+    def _build(self, db_manager, tenant_id: str) -> TenantLedger:
+        started = time.perf_counter()
+        version = data_version(tenant_id)
+        ledger = TenantLedger(tenant_id)
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(LEDGER_COLUMNS_QUERY, (tenant_id,))
+            ledger.upsert_rows(cursor.fetchall())
+            cursor.close()
+        ledger.version = version
+        ledger.synced_at = time.time()
+        self.builds += 1
+        logger.info(f"[LEDGER] Built snapshot of {len(ledger)} transactions for tenant {tenant_id} "
+                    f"in {int((time.perf_counter() - started) * 1000)}ms ({ledger.nbytes // 1024} KiB)")
+        self._store(ledger)
+        return ledger
+
+    def _sync(self, db_manager, published: TenantLedger) -> TenantLedger:
+        """
+        Apply rows changed since the watermark to a copy of the published
+        snapshot, drop deleted rows, and publish the copy
+        """
+        if published.watermark is None:
+            return self._build(db_manager, published.tenant_id)
+
+        tenant_id = published.tenant_id
+        version = data_version(tenant_id)
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(LEDGER_COLUMNS_QUERY + " AND updated_at >= %s - make_interval(secs => %s)",
+                           (tenant_id, published.watermark, WATERMARK_OVERLAP_SECONDS))
+            changed = cursor.fetchall()
+            cursor.execute(LEDGER_CHECK_QUERY, (tenant_id,))
+            row_count, checksum = cursor.fetchone()
+
+            ledger = published.copy()
+            ledger.upsert_rows(changed)
+            if (row_count, checksum) != (len(ledger), ledger.id_checksum):
+                # Rows were deleted: keep only the ids still in the table
+                cursor.execute(LEDGER_IDS_QUERY, (tenant_id,))
+                ledger = ledger.retain(row[0] for row in cursor.fetchall())
+            cursor.close()
+
+        if (row_count, checksum) != (len(ledger), ledger.id_checksum):
+            # Rows changed without moving updated_at; start over
+            return self._build(db_manager, tenant_id)
+
+        ledger.version = version
+        ledger.synced_at = time.time()
+        self.syncs += 1
+        self._store(ledger)
+        return ledger
+
+    def _store(self, ledger: TenantLedger):
+        with self._lock:
+            self._ledgers[ledger.tenant_id] = ledger
+            self._ledgers.move_to_end(ledger.tenant_id)
+            # Least recently used tenants go first; the current one is always kept
+            while len(self._ledgers) > 1 and sum(l.nbytes for l in self._ledgers.values()) > self.memory_budget_bytes:
+                evicted, _ = self._ledgers.popitem(last=False)
+                logger.info(f"[LEDGER] Evicted snapshot of tenant {evicted} (memory budget)")
+
+
+ledger_snapshots = shared_instance(__name__, 'ledger_snapshots', LedgerSnapshotCache)
+
+
+def get_tenant_ledger(db_manager, tenant_id: str) -> TenantLedger:
+    """Columnar snapshot of the tenant's transactions for analytical reports"""
+    if not tenant_id:
+        raise ValueError("tenant_id is required for the ledger snapshot")
+    return ledger_snapshots.get(db_manager, tenant_id)
@@ -9,6 +9,15 @@ from database import db_manager
 import json
 import logging
 
+try:
+    from .period_lock_index import get_locked_periods, invalidate_period_locks
+    from .close_checks import (DEFAULT_CHECK_THRESHOLD, compute_period_stats, get_reconciliation_stats,
+                               run_checks)
+except ImportError:
+    from period_lock_index import get_locked_periods, invalidate_period_locks
+    from close_checks import (DEFAULT_CHECK_THRESHOLD, compute_period_stats, get_reconciliation_stats,
+                              run_checks)
+
 logger = logging.getLogger(__name__)
 
 
@@ -322,6 +331,7 @@ class MonthEndCloseService:
 
                 conn.commit()
                 cursor.close()
+                invalidate_period_locks(tenant_id)
 
                 # Log activity
                 MonthEndCloseService.log_activity(
@@ -373,6 +383,7 @@ class MonthEndCloseService:
 
                 conn.commit()
                 cursor.close()
+                invalidate_period_locks(tenant_id)
 
                 # Log activity
                 MonthEndCloseService.log_activity(
@@ -565,6 +576,7 @@ class MonthEndCloseService:
 
                 conn.commit()
                 cursor.close()
+                invalidate_period_locks(tenant_id)
 
                 # Log activity
                 MonthEndCloseService.log_activity(
@@ -586,22 +598,10 @@ class MonthEndCloseService:
     def is_period_locked(tenant_id: str, transaction_date: str) -> Tuple[bool, Optional[str]]:
         """Check if a date falls within a locked/closed period."""
         try:
-            with db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-
-                cursor.execute("""
-                    SELECT id, period_name, status FROM cfo_accounting_periods
-                    WHERE tenant_id = %s
-                    AND %s BETWEEN start_date AND end_date
-                    AND status IN ('locked', 'closed')
-                """, (tenant_id, transaction_date))
-
-                row = cursor.fetchone()
-                cursor.close()
-
-                if row:
-                    return True, f"Period {row[1]} is {row[2]}"
-                return False, None
+            period = get_locked_periods(db_manager, tenant_id).period_for(transaction_date)
+            if period:
+                return True, f"Period {period['period_name']} is {period['status']}"
+            return False, None
 
         except Exception as e:
             logger.error(f"Error checking period lock: {e}")
@@ -932,10 +932,11 @@ class MonthEndCloseService:
     # ========================================
 
     @staticmethod
-    def get_reconciliation_status(period_id: str, tenant_id: str) -> Dict:
+    def get_reconciliation_status(period_id: str, tenant_id: str, refresh: bool = False) -> Dict:
         """
         Get comprehensive reconciliation status for a period.
         Includes invoice matching, payslip matching, and transaction classification stats.
+        Stats saved by a recent auto-check run are reused unless refresh is set.
         """
         period = MonthEndCloseService.get_period(period_id, tenant_id)
         if not period:
@@ -945,9 +946,10 @@ class MonthEndCloseService:
         end_date = period['end_date']
 
         # Get all reconciliation metrics
-        invoice_stats = MonthEndCloseService.get_invoice_matching_stats(tenant_id, start_date, end_date)
-        payslip_stats = MonthEndCloseService.get_payslip_matching_stats(tenant_id, start_date, end_date)
-        transaction_stats = MonthEndCloseService.get_transaction_classification_stats(tenant_id, start_date, end_date)
+        stats = get_reconciliation_stats(db_manager, tenant_id, period, refresh=refresh)
+        invoice_stats = stats['invoices']
+        payslip_stats = stats['payslips']
+        transaction_stats = stats['transactions']
 
         return {
             'period_id': period_id,
@@ -1006,135 +1008,17 @@ class MonthEndCloseService:
     @staticmethod
     def get_invoice_matching_stats(tenant_id: str, start_date: str, end_date: str) -> Dict:
         """Get invoice-to-payment matching statistics for a date range."""
-        try:
-            with db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-
-                # Count invoices in period and their match status
-                cursor.execute("""
-                    SELECT
-                        COUNT(*) as total,
-                        COUNT(*) FILTER (WHERE linked_transaction_id IS NOT NULL AND linked_transaction_id != '') as matched,
-                        COUNT(*) FILTER (WHERE linked_transaction_id IS NULL OR linked_transaction_id = '') as unmatched,
-                        COALESCE(SUM(total_amount), 0) as total_amount,
-                        COALESCE(SUM(CASE WHEN linked_transaction_id IS NOT NULL AND linked_transaction_id != '' THEN total_amount ELSE 0 END), 0) as matched_amount,
-                        COALESCE(SUM(CASE WHEN linked_transaction_id IS NULL OR linked_transaction_id = '' THEN total_amount ELSE 0 END), 0) as unmatched_amount
-                    FROM invoices
-                    WHERE tenant_id = %s
-                    AND date >= %s AND date <= %s
-                """, (tenant_id, start_date, end_date))
-
-                row = cursor.fetchone()
-                cursor.close()
-
-                if not row:
-                    return {'total': 0, 'matched': 0, 'unmatched': 0, 'match_rate': 0}
-
-                total, matched, unmatched, total_amount, matched_amount, unmatched_amount = row
-
-                return {
-                    'total': total or 0,
-                    'matched': matched or 0,
-                    'unmatched': unmatched or 0,
-                    'match_rate': round((matched / total) * 100, 1) if total > 0 else 100.0,
-                    'total_amount': float(total_amount or 0),
-                    'matched_amount': float(matched_amount or 0),
-                    'unmatched_amount': float(unmatched_amount or 0)
-                }
-
-        except Exception as e:
-            logger.error(f"Error getting invoice matching stats: {e}")
-            return {'total': 0, 'matched': 0, 'unmatched': 0, 'match_rate': 0, 'error': str(e)}
+        return compute_period_stats(db_manager, tenant_id, start_date, end_date, ('invoices',))['invoices']
 
     @staticmethod
     def get_payslip_matching_stats(tenant_id: str, start_date: str, end_date: str) -> Dict:
         """Get payslip-to-payment matching statistics for a date range."""
-        try:
-            with db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-
-                # Count payslips in period and their match status
-                cursor.execute("""
-                    SELECT
-                        COUNT(*) as total,
-                        COUNT(*) FILTER (WHERE linked_transaction_id IS NOT NULL) as matched,
-                        COUNT(*) FILTER (WHERE linked_transaction_id IS NULL) as unmatched,
-                        COALESCE(SUM(net_amount), 0) as total_amount,
-                        COALESCE(SUM(CASE WHEN linked_transaction_id IS NOT NULL THEN net_amount ELSE 0 END), 0) as matched_amount,
-                        COALESCE(SUM(CASE WHEN linked_transaction_id IS NULL THEN net_amount ELSE 0 END), 0) as unmatched_amount
-                    FROM payslips
-                    WHERE tenant_id = %s
-                    AND payment_date >= %s AND payment_date <= %s
-                """, (tenant_id, start_date, end_date))
-
-                row = cursor.fetchone()
-                cursor.close()
-
-                if not row:
-                    return {'total': 0, 'matched': 0, 'unmatched': 0, 'match_rate': 0}
-
-                total, matched, unmatched, total_amount, matched_amount, unmatched_amount = row
-
-                return {
-                    'total': total or 0,
-                    'matched': matched or 0,
-                    'unmatched': unmatched or 0,
-                    'match_rate': round((matched / total) * 100, 1) if total > 0 else 100.0,
-                    'total_amount': float(total_amount or 0),
-                    'matched_amount': float(matched_amount or 0),
-                    'unmatched_amount': float(unmatched_amount or 0)
-                }
-
-        except Exception as e:
-            logger.error(f"Error getting payslip matching stats: {e}")
-            return {'total': 0, 'matched': 0, 'unmatched': 0, 'match_rate': 0, 'error': str(e)}
+        return compute_period_stats(db_manager, tenant_id, start_date, end_date, ('payslips',))['payslips']
 
     @staticmethod
     def get_transaction_classification_stats(tenant_id: str, start_date: str, end_date: str) -> Dict:
         """Get transaction classification statistics for a date range."""
-        try:
-            with db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-
-                # Count transactions and their classification status
-                cursor.execute("""
-                    SELECT
-                        COUNT(*) as total,
-                        COUNT(*) FILTER (WHERE category IS NOT NULL AND category != '' AND category != 'Uncategorized') as classified,
-                        COUNT(*) FILTER (WHERE category IS NULL OR category = '' OR category = 'Uncategorized') as unclassified,
-                        COUNT(*) FILTER (WHERE confidence IS NOT NULL AND confidence >= 0.7) as high_confidence,
-                        COUNT(*) FILTER (WHERE confidence IS NOT NULL AND confidence < 0.7 AND confidence >= 0.4) as medium_confidence,
-                        COUNT(*) FILTER (WHERE confidence IS NULL OR confidence < 0.4) as low_confidence,
-                        COUNT(*) FILTER (WHERE user_reviewed = true) as user_reviewed
-                    FROM transactions
-                    WHERE tenant_id = %s
-                    AND date >= %s AND date <= %s
-                """, (tenant_id, start_date, end_date))
-
-                row = cursor.fetchone()
-                cursor.close()
-
-                if not row:
-                    return {'total': 0, 'classified': 0, 'unclassified': 0, 'classified_rate': 0}
-
-                total, classified, unclassified, high_conf, medium_conf, low_conf, user_reviewed = row
-
-                return {
-                    'total': total or 0,
-                    'classified': classified or 0,
-                    'unclassified': unclassified or 0,
-                    'classified_rate': round((classified / total) * 100, 1) if total > 0 else 100.0,
-                    'high_confidence': high_conf or 0,
-                    'medium_confidence': medium_conf or 0,
-                    'low_confidence': low_conf or 0,
-                    'high_confidence_rate': round((high_conf / total) * 100, 1) if total > 0 else 100.0,
-                    'user_reviewed': user_reviewed or 0,
-                    'needs_review': (low_conf or 0) - (user_reviewed or 0)
-                }
-
-        except Exception as e:
-            logger.error(f"Error getting transaction classification stats: {e}")
-            return {'total': 0, 'classified': 0, 'unclassified': 0, 'classified_rate': 0, 'error': str(e)}
+        return compute_period_stats(db_manager, tenant_id, start_date, end_date, ('transactions',))['transactions']
 
     @staticmethod
     def get_statement_coverage_stats(tenant_id: str, start_date: str, end_date: str) -> Dict:
@@ -1145,131 +1029,8 @@ class MonthEndCloseService:
         - No gaps in date coverage
         - Overall coverage percentage
         """
-        from datetime import datetime, timedelta
-
-        try:
-            with db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-
-                # Get all bank accounts for tenant
-                cursor.execute("""
-                    SELECT id, account_name, institution_name
-                    FROM bank_accounts
-                    WHERE tenant_id = %s
-                """, (tenant_id,))
-                accounts = cursor.fetchall()
-
-                if not accounts:
-                    return {
-                        'total_accounts': 0,
-                        'accounts_with_coverage': 0,
-                        'accounts_without_coverage': 0,
-                        'overall_coverage_pct': 100.0,
-                        'has_gaps': False,
-                        'message': 'No bank accounts configured'
-                    }
-
-                # Parse dates
-                period_start = datetime.strptime(start_date, '%Y-%m-%d').date()
-                period_end = datetime.strptime(end_date, '%Y-%m-%d').date()
-                period_days = (period_end - period_start).days + 1
-
-                account_results = []
-                total_coverage = 0
-                accounts_with_data = 0
-                has_any_gaps = False
-
-                for account_id, account_name, institution in accounts:
-                    # Get transaction date range for this account in the period
-                    # Match by source_file containing account identifier or by origin/destination
-                    cursor.execute("""
-                        SELECT MIN(date), MAX(date), COUNT(*)
-                        FROM transactions
-                        WHERE tenant_id = %s
-                        AND date >= %s AND date <= %s
-                        AND archived = false
-                    """, (tenant_id, start_date, end_date))
-
-                    row = cursor.fetchone()
-                    min_date, max_date, txn_count = row if row else (None, None, 0)
-
-                    if txn_count > 0:
-                        accounts_with_data += 1
-                        days_covered = (max_date - min_date).days + 1 if min_date and max_date else 0
-                        coverage_pct = min(100.0, (days_covered / period_days) * 100) if period_days > 0 else 100.0
-
-                        # Check for gaps (days without transactions)
-                        cursor.execute("""
-                            SELECT date FROM transactions
-                            WHERE tenant_id = %s
-                            AND date >= %s AND date <= %s
-                            AND archived = false
-                            ORDER BY date
-                        """, (tenant_id, start_date, end_date))
-                        dates = [r[0] for r in cursor.fetchall()]
-
-                        gaps = []
-                        if dates:
-                            unique_dates = sorted(set(dates))
-                            for i in range(1, len(unique_dates)):
-                                gap_days = (unique_dates[i] - unique_dates[i-1]).days
-                                if gap_days > 7:  # More than 7 days is a gap
-                                    gaps.append({
-                                        'from': unique_dates[i-1].isoformat(),
-                                        'to': unique_dates[i].isoformat(),
-                                        'days': gap_days
-                                    })
-
-                        if gaps:
-                            has_any_gaps = True
-
-                        total_coverage += coverage_pct
-                        account_results.append({
-                            'account_id': str(account_id),
-                            'account_name': account_name,
-                            'institution': institution,
-                            'transactions': txn_count,
-                            'coverage_pct': round(coverage_pct, 1),
-                            'has_gaps': len(gaps) > 0,
-                            'gaps': gaps
-                        })
-                    else:
-                        account_results.append({
-                            'account_id': str(account_id),
-                            'account_name': account_name,
-                            'institution': institution,
-                            'transactions': 0,
-                            'coverage_pct': 0,
-                            'has_gaps': True,
-                            'gaps': [{'from': start_date, 'to': end_date, 'days': period_days}]
-                        })
-                        has_any_gaps = True
-
-                cursor.close()
-
-                overall_coverage = total_coverage / len(accounts) if accounts else 100.0
-
-                return {
-                    'total_accounts': len(accounts),
-                    'accounts_with_coverage': accounts_with_data,
-                    'accounts_without_coverage': len(accounts) - accounts_with_data,
-                    'overall_coverage_pct': round(overall_coverage, 1),
-                    'has_gaps': has_any_gaps,
-                    'period_start': start_date,
-                    'period_end': end_date,
-                    'period_days': period_days,
-                    'accounts': account_results
-                }
-
-        except Exception as e:
-            logger.error(f"Error getting statement coverage stats: {e}")
-            return {
-                'total_accounts': 0,
-                'accounts_with_coverage': 0,
-                'overall_coverage_pct': 0,
-                'has_gaps': True,
-                'error': str(e)
-            }
+        return compute_period_stats(db_manager, tenant_id, start_date, end_date,
+                                    ('statement_coverage',))['statement_coverage']
 
     @staticmethod
     def get_unmatched_items(period_id: str, tenant_id: str, item_type: str = 'all',
@@ -1390,7 +1151,11 @@ class MonthEndCloseService:
 
     @staticmethod
     def run_auto_checks(period_id: str, tenant_id: str, user_id: Optional[str] = None) -> Dict:
-        """Run all auto-checks for a period's checklist items."""
+        """
+        Run all auto-checks for a period's checklist items.
+        Every check is evaluated against one snapshot of the period's stats and
+        the results are saved in a single transaction.
+        """
         period = MonthEndCloseService.get_period(period_id, tenant_id)
         if not period:
             return {'error': 'Period not found', 'results': []}
@@ -1398,20 +1163,17 @@ class MonthEndCloseService:
         if period['status'] in [MonthEndCloseService.STATUS_LOCKED, MonthEndCloseService.STATUS_CLOSED]:
             return {'error': 'Cannot run auto-checks on locked/closed period', 'results': []}
 
-        items = MonthEndCloseService.get_checklist(period_id, tenant_id)
-        results = []
-
-        for item in items:
-            if item.get('auto_check_type'):
-                result = MonthEndCloseService.run_single_auto_check(
-                    item['id'], period_id, tenant_id, item['auto_check_type'], user_id
-                )
-                results.append({
-                    'item_id': item['id'],
-                    'item_name': item['name'],
-                    'auto_check_type': item['auto_check_type'],
-                    'result': result
-                })
+        items = MonthEndCloseService._get_auto_check_items(period_id)
+        check_results = run_checks(db_manager, tenant_id, period, items, user_id)
+        results = [
+            {
+                'item_id': item['id'],
+                'item_name': item['name'],
+                'auto_check_type': item['auto_check_type'],
+                'result': result
+            }
+            for item, result in zip(items, check_results)
+        ]
 
         # Log activity
         MonthEndCloseService.log_activity(
@@ -1426,146 +1188,44 @@ class MonthEndCloseService:
         }
 
     @staticmethod
-    def run_single_auto_check(item_id: str, period_id: str, tenant_id: str,
-                               auto_check_type: str, user_id: Optional[str] = None) -> Dict:
-        """Run auto-check for a single checklist item."""
-        period = MonthEndCloseService.get_period(period_id, tenant_id)
-        if not period:
-            return {'success': False, 'error': 'Period not found'}
-
-        start_date = period['start_date']
-        end_date = period['end_date']
-
-        # Get threshold from template
-        threshold = 95.0  # default
+    def _get_auto_check_items(period_id: str, item_id: Optional[str] = None) -> List[Dict]:
+        """Checklist items with an auto-check and their template threshold."""
         try:
             with db_manager.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT t.auto_check_threshold
+                cursor.execute(f"""
+                    SELECT ci.id, ci.name, ci.auto_check_type, t.auto_check_threshold
                     FROM close_checklist_items ci
-                    JOIN close_checklist_templates t ON ci.template_id = t.id
-                    WHERE ci.id = %s
-                """, (item_id,))
-                row = cursor.fetchone()
-                if row and row[0]:
-                    threshold = float(row[0])
+                    LEFT JOIN close_checklist_templates t ON ci.template_id = t.id
+                    WHERE ci.period_id = %s AND ci.auto_check_type IS NOT NULL
+                    {'AND ci.id = %s' if item_id else ''}
+                    ORDER BY ci.sequence_order
+                """, (period_id, item_id) if item_id else (period_id,))
+                rows = cursor.fetchall()
                 cursor.close()
         except Exception as e:
-            logger.warning(f"Could not get threshold for item {item_id}: {e}")
-
-        # Run the appropriate check
-        result = {}
-        if auto_check_type == 'invoices_matched':
-            stats = MonthEndCloseService.get_invoice_matching_stats(tenant_id, start_date, end_date)
-            result = {
-                'matched': stats.get('matched', 0),
-                'total': stats.get('total', 0),
-                'percentage': stats.get('match_rate', 0),
-                'threshold': threshold,
-                'passed': stats.get('match_rate', 0) >= threshold,
-                'details': stats
-            }
-
-        elif auto_check_type == 'payslips_matched':
-            stats = MonthEndCloseService.get_payslip_matching_stats(tenant_id, start_date, end_date)
-            result = {
-                'matched': stats.get('matched', 0),
-                'total': stats.get('total', 0),
-                'percentage': stats.get('match_rate', 0),
-                'threshold': threshold,
-                'passed': stats.get('match_rate', 0) >= threshold,
-                'details': stats
-            }
-
-        elif auto_check_type == 'low_confidence_reviewed':
-            stats = MonthEndCloseService.get_transaction_classification_stats(tenant_id, start_date, end_date)
-            low_conf = stats.get('low_confidence', 0)
-            reviewed = stats.get('user_reviewed', 0)
-            percentage = (reviewed / low_conf * 100) if low_conf > 0 else 100.0
-            result = {
-                'matched': reviewed,
-                'total': low_conf,
-                'percentage': round(percentage, 1),
-                'threshold': threshold,
-                'passed': percentage >= threshold,
-                'details': stats
-            }
-
-        elif auto_check_type == 'unclassified_resolved':
-            stats = MonthEndCloseService.get_transaction_classification_stats(tenant_id, start_date, end_date)
-            result = {
-                'matched': stats.get('classified', 0),
-                'total': stats.get('total', 0),
-                'percentage': stats.get('classified_rate', 0),
-                'threshold': threshold,
-                'passed': stats.get('classified_rate', 0) >= threshold,
-                'details': stats
-            }
-
-        elif auto_check_type == 'bank_reconciled':
-            # Legacy - redirect to statement_coverage
-            stats = MonthEndCloseService.get_statement_coverage_stats(tenant_id, start_date, end_date)
-            result = {
-                'matched': stats.get('accounts_with_coverage', 0),
-                'total': stats.get('total_accounts', 0),
-                'percentage': stats.get('overall_coverage_pct', 0),
-                'threshold': threshold,
-                'passed': stats.get('overall_coverage_pct', 0) >= threshold and not stats.get('has_gaps', True),
-                'details': stats
-            }
-
-        elif auto_check_type == 'statement_coverage':
-            # Check bank account statement coverage for the period
-            stats = MonthEndCloseService.get_statement_coverage_stats(tenant_id, start_date, end_date)
-            result = {
-                'matched': stats.get('accounts_with_coverage', 0),
-                'total': stats.get('total_accounts', 0),
-                'percentage': stats.get('overall_coverage_pct', 0),
-                'threshold': threshold,
-                'passed': stats.get('overall_coverage_pct', 0) >= threshold and not stats.get('has_gaps', True),
-                'details': stats
-            }
-
-        else:
-            result = {
-                'matched': 0,
-                'total': 0,
-                'percentage': 0,
-                'threshold': threshold,
-                'passed': False,
-                'error': f'Unknown auto-check type: {auto_check_type}'
-            }
-
-        # Update the checklist item with auto-check result
-        try:
-            with db_manager.get_connection() as conn:
-                cursor = conn.cursor()
+            logger.error(f"Error getting auto-check items: {e}")
+            return []
 
-                # Determine new status based on result
-                new_status = None
-                if result.get('passed'):
-                    new_status = 'completed'
+        return [
+            {'id': str(row[0]), 'name': row[1], 'auto_check_type': row[2],
+             'threshold': float(row[3]) if row[3] else DEFAULT_CHECK_THRESHOLD}
+            for row in rows
+        ]
 
-                cursor.execute("""
-                    UPDATE close_checklist_items
-                    SET auto_check_result = %s,
-                        last_auto_check_at = CURRENT_TIMESTAMP,
-                        status = COALESCE(%s, status),
-                        completed_at = CASE WHEN %s = 'completed' THEN CURRENT_TIMESTAMP ELSE completed_at END,
-                        completed_by = CASE WHEN %s = 'completed' THEN %s ELSE completed_by END,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                """, (json.dumps(result), new_status, new_status, new_status, user_id, item_id))
-
-                conn.commit()
-                cursor.close()
+    @staticmethod
+    def run_single_auto_check(item_id: str, period_id: str, tenant_id: str,
+                               auto_check_type: str, user_id: Optional[str] = None) -> Dict:
+        """Run auto-check for a single checklist item."""
+        period = MonthEndCloseService.get_period(period_id, tenant_id)
+        if not period:
+            return {'success': False, 'error': 'Period not found'}
 
-        except Exception as e:
-            logger.error(f"Error updating auto-check result: {e}")
-            result['update_error'] = str(e)
+        items = MonthEndCloseService._get_auto_check_items(period_id, item_id)
+        item = items[0] if items else {'id': item_id, 'threshold': DEFAULT_CHECK_THRESHOLD}
+        item['auto_check_type'] = auto_check_type
 
-        return result
+        return run_checks(db_manager, tenant_id, period, [item], user_id)[0]
 
     # ========================================
     # ADJUSTING ENTRIES (PHASE 3)
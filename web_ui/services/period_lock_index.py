@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Locked Period Index
+Per-tenant, in-memory index of locked/closed accounting periods so write paths
+can check period locks without a query per transaction: a sorted interval
+array answers one date in O(log n) and a batch of N dates with one vectorized
+search.
+
+MonthEndCloseService invalidates a tenant's index when a period is locked,
+unlocked or closed; indexes also expire after PERIOD_LOCK_INDEX_TTL_SECONDS
+to pick up changes made by other processes. Cached indexes only serve reads:
+write paths pass for_write=True, which reads the tenant's locked periods from
+the database (one indexed query) so a period locked by another worker is
+enforced immediately.
+"""
+
+import bisect
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+try:
+    from module_singletons import shared_instance
+except ImportError:
+    # web_ui/ itself is not on sys.path (imported through the repo root)
+    from web_ui.module_singletons import shared_instance
+
+PERIOD_LOCK_INDEX_TTL_SECONDS = 60
+
+LOCKED_PERIODS_QUERY = """
+    SELECT id, period_name, status, start_date, end_date
+    FROM cfo_accounting_periods
+    WHERE tenant_id = %s AND status IN ('locked', 'closed')
+    ORDER BY start_date
+"""
+
+
+def date_ordinal(value) -> Optional[int]:
+    """
+    Proleptic ordinal of a transaction date (date, datetime, 'YYYY-MM-DD...'
+    or 'MM/DD/YYYY...' string), or None if it can't be parsed
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    text = str(value).strip()[:10]
+    try:
+        if len(text) == 10 and text[4] == '-':
+            return date(int(text[:4]), int(text[5:7]), int(text[8:10])).toordinal()
+        if len(text) == 10 and text[2] == '/':
+            return date(int(text[6:10]), int(text[:2]), int(text[3:5])).toordinal()
+    except ValueError:
+        pass
+    return None
+
+
+class LockedPeriods:
+    """Immutable snapshot of one tenant's locked/closed periods, sorted by start date"""
+
+    def __init__(self, tenant_id: str, version: int, periods: List[Dict[str, Any]]):
+        self.tenant_id = tenant_id
+        self.version = version
+        self.loaded_at = time.time()
+
+        periods = [p for p in periods if date_ordinal(p['start_date']) and date_ordinal(p['end_date'])]
+        self.periods = sorted(periods, key=lambda p: date_ordinal(p['start_date']))
+        self.starts = np.array([date_ordinal(p['start_date']) for p in self.periods], dtype=np.int64)
+        self.ends = np.array([date_ordinal(p['end_date']) for p in self.periods], dtype=np.int64)
+        # Running maximum of end dates keeps lookups correct if legacy periods overlap
+        self.max_ends = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+        self._starts_list = self.starts.tolist()
+
+    def __len__(self):
+        return len(self.periods)
+
+    def period_for(self, transaction_date) -> Optional[Dict[str, Any]]:
+        """The locked period containing a date, or None"""
+        ordinal = date_ordinal(transaction_date)
+        if ordinal is None or not self.periods:
+            return None
+        index = bisect.bisect_right(self._starts_list, ordinal) - 1
+        if index < 0 or self.max_ends[index] < ordinal:
+            return None
+        while self.ends[index] < ordinal:
+            index -= 1
+        return self.periods[index]
+
+    def locked_mask(self, transaction_dates: Iterable) -> np.ndarray:
+        """Boolean array: which of the given dates fall in a locked period"""
+        ordinals = np.array([date_ordinal(d) or 0 for d in transaction_dates], dtype=np.int64)
+        if not self.periods or not len(ordinals):
+            return np.zeros(len(ordinals), dtype=bool)
+        index = np.searchsorted(self.starts, ordinals, side='right') - 1
+        return (index >= 0) & (ordinals > 0) & (self.max_ends[np.maximum(index, 0)] >= ordinals)
+
+
+def load_locked_periods(db_manager, tenant_id: str) -> List[Dict[str, Any]]:
+    try:
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(LOCKED_PERIODS_QUERY, (tenant_id,))
+            rows = cursor.fetchall()
+            cursor.close()
+    except Exception as e:
+        # Month-end close tables not migrated yet: nothing is locked
+        if 'cfo_accounting_periods' in str(e) or 'does not exist' in str(e):
+            return []
+        raise
+
+    periods = []
+    for row in rows:
+        values = list(row.values()) if isinstance(row, dict) else list(row)
+        period_id, period_name, status, start_date, end_date = values
+        periods.append({'id': str(period_id), 'period_name': period_name, 'status': status,
+                        'start_date': start_date, 'end_date': end_date})
+    return periods
+
+
+class PeriodLockIndex:
+    """Per-tenant LockedPeriods snapshots, invalidated by a per-tenant version counter"""
+
+    def __init__(self, ttl_seconds: float = PERIOD_LOCK_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._snapshots: Dict[str, LockedPeriods] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, tenant_id: str) -> int:
+        return self._versions.get(tenant_id, 0)
+
+    def invalidate(self, tenant_id: Optional[str] = None):
+        """Drop the index of one tenant (or all tenants)"""
+        with self._lock:
+            tenants = list(self._versions.keys() | self._snapshots.keys()) if tenant_id is None else [tenant_id]
+            for tenant in tenants:
+                self._versions[tenant] = self._versions.get(tenant, 0) + 1
+                self._snapshots.pop(tenant, None)
+
+    def get(self, db_manager, tenant_id: str, fresh: bool = False) -> LockedPeriods:
+        """The tenant's index; fresh=True always reads the database (and refreshes the cache)"""
+        version = self.version(tenant_id)
+        snapshot = self._snapshots.get(tenant_id)
+        if (not fresh and snapshot is not None and snapshot.version == version
+                and time.time() - snapshot.loaded_at < self.ttl_seconds):
+            self.hits += 1
+            return snapshot
+
+        self.misses += 1
+        snapshot = LockedPeriods(tenant_id, version, load_locked_periods(db_manager, tenant_id))
+        with self._lock:
+            # Don't store periods read before a concurrent lock/unlock
+            if self.version(tenant_id) == version:
+                self._snapshots[tenant_id] = snapshot
+        return snapshot
+
+
+period_lock_index = shared_instance(__name__, 'period_lock_index', PeriodLockIndex)
+
+
+def get_locked_periods(db_manager, tenant_id: str, for_write: bool = False) -> LockedPeriods:
+    """
+    Locked-period index for a tenant. Reads may be served from the cache;
+    for_write=True checks against the database so edits to a period another
+    process just locked are refused.
+    """
+    return period_lock_index.get(db_manager, tenant_id, fresh=for_write)
+
+
+def invalidate_period_locks(tenant_id: Optional[str] = None):
+    """Call after a tenant's period is locked, unlocked or closed"""
+    period_lock_index.invalidate(tenant_id)
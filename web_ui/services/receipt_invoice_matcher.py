@@ -3,10 +3,63 @@ Receipt Invoice Matcher - Automatically match payment receipts to invoices
 Matches based on amount, date, and other criteria
 """
 
+import time
+import threading
+from bisect import bisect_left, bisect_right
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from dateutil import parser as date_parser
 
+try:
+    from .tenant_data_version import invoice_data_version, invoice_data_versions
+except ImportError:
+    # Fallback for when imported directly (services folder added to sys.path)
+    from tenant_data_version import invoice_data_version, invoice_data_versions
+
+# Invoices farther than this from the payment amount get no amount score,
+# so they are never shortlisted
+AMOUNT_BAND_PERCENT = 10.0
+
+# Preloaded candidate indexes are shared by the uploads of a batch; they are
+# also reloaded as soon as the tenant's invoice data version moves
+INDEX_CACHE_TTL_SECONDS = 120
+
+CANDIDATE_COLUMNS = """
+                id,
+                invoice_number,
+                customer_name,
+                vendor_name,
+                total_amount,
+                usd_equivalent_amount,
+                currency,
+                date,
+                payment_status,
+                payment_date as existing_payment_date"""
+
+OPEN_INVOICE_CONDITION = "LOWER(COALESCE(payment_status, 'pending')) <> 'paid'"
+
+
+def amount_band(amount: float) -> Tuple[float, float]:
+    """Invoice amounts whose difference to amount is within AMOUNT_BAND_PERCENT of the invoice"""
+    ratio = AMOUNT_BAND_PERCENT / 100
+    return amount / (1 + ratio), amount / (1 - ratio)
+
+
+def _is_usd(currency: Optional[str]) -> bool:
+    return not currency or currency.strip().upper() == 'USD'
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _comparable_amount(invoice: Dict[str, Any], payment_currency: Optional[str]) -> float:
+    """Invoice amount to compare with the payment, using the USD equivalent for USD payments"""
+    usd_amount = invoice.get('usd_equivalent_amount')
+    if _is_usd(payment_currency) and not _is_usd(invoice.get('currency')) and usd_amount:
+        return float(usd_amount)
+    return float(invoice.get('total_amount') or 0)
+
 
 class ReceiptInvoiceMatcher:
     """Match payment receipts to invoices using smart algorithms"""
@@ -19,21 +72,31 @@ class ReceiptInvoiceMatcher:
         """Initialize with database manager"""
         self.db_manager = db_manager
 
-    def find_matching_invoices(self, payment_data: Dict[str, Any], tenant_id: str, customer_filter: str = None) -> List[Dict[str, Any]]:
+    def find_matching_invoices(
+        self,
+        payment_data: Dict[str, Any],
+        tenant_id: str,
+        customer_filter: str = None,
+        index: Optional['InvoiceCandidateIndex'] = None
+    ) -> List[Dict[str, Any]]:
         """
         Find invoices that match the payment receipt data
 
+        Only a shortlist of open invoices within the amount band and date
+        window is scored. The shortlist comes from SQL, or from a preloaded
+        InvoiceCandidateIndex when one is given (batch uploads).
+
         Args:
             payment_data: Extracted payment data from receipt
             tenant_id: Tenant ID
             customer_filter: Optional customer name to filter invoices (improves accuracy)
+            index: Optional preloaded candidate index for the tenant
 
         Returns:
             List of matching invoices with match scores
         """
         payment_amount = payment_data.get('payment_amount')
         payment_date_str = payment_data.get('payment_date')
-        payment_currency = payment_data.get('payment_currency', 'USD')
 
         if not payment_amount:
             return []
@@ -43,6 +106,9 @@ class ReceiptInvoiceMatcher:
         except (ValueError, TypeError):
             return []
 
+        if payment_amount <= 0:
+            return []
+
         # Parse payment date
         payment_date = None
         if payment_date_str:
@@ -54,35 +120,10 @@ class ReceiptInvoiceMatcher:
             except:
                 pass
 
-        # Build query to find candidate invoices
-        # Search all invoices, prioritizing unpaid ones in scoring
-        query = """
-            SELECT
-                id,
-                invoice_number,
-                customer_name,
-                vendor_name,
-                total_amount,
-                currency,
-                date,
-                payment_status,
-                payment_date as existing_payment_date
-            FROM invoices
-            WHERE tenant_id = %s
-            AND total_amount IS NOT NULL
-        """
-        params = [tenant_id]
-
-        # Add customer filter if provided
-        if customer_filter:
-            query += " AND (customer_name = %s OR vendor_name = %s)"
-            params.extend([customer_filter, customer_filter])
-
-        # Don't filter by currency at all - we'll score it instead
-        # This allows matching invoices even with currency mismatches
-        # Currency matching will be factored into the score
-
-        invoices = self.db_manager.execute_query(query, tuple(params), fetch_all=True)
+        if index is not None:
+            invoices = index.candidates(payment_amount, payment_date, customer_filter)
+        else:
+            invoices = self._query_candidates(tenant_id, payment_amount, payment_date, customer_filter)
 
         if not invoices:
             return []
@@ -106,6 +147,46 @@ class ReceiptInvoiceMatcher:
 
         return matches
 
+    def _query_candidates(
+        self,
+        tenant_id: str,
+        payment_amount: float,
+        payment_date: Optional[datetime],
+        customer_filter: str = None
+    ) -> List[Dict[str, Any]]:
+        """Shortlist open invoices by amount band and date window in SQL"""
+        low, high = amount_band(payment_amount)
+
+        # Amount band on the native total or on the USD equivalent, so that
+        # foreign-currency invoices can still match a USD payment
+        query = f"""
+            SELECT {CANDIDATE_COLUMNS}
+            FROM invoices
+            WHERE tenant_id = %s
+            AND total_amount IS NOT NULL
+            AND {OPEN_INVOICE_CONDITION}
+            AND (
+                total_amount BETWEEN %s AND %s
+                OR usd_equivalent_amount BETWEEN %s AND %s
+            )
+        """
+        params = [tenant_id, low, high, low, high]
+
+        if payment_date:
+            window = timedelta(days=self.MAX_DATE_DIFF_DAYS)
+            query += " AND (date IS NULL OR date::date BETWEEN %s AND %s)"
+            params.extend([_as_date(payment_date - window), _as_date(payment_date + window)])
+
+        # Add customer filter if provided
+        if customer_filter:
+            query += " AND (customer_name = %s OR vendor_name = %s)"
+            params.extend([customer_filter, customer_filter])
+
+        # Don't filter by currency - it is scored instead, so invoices with
+        # currency mismatches can still be matched
+
+        return self.db_manager.execute_query(query, tuple(params), fetch_all=True) or []
+
     def _calculate_match_score(
         self,
         payment_data: Dict[str, Any],
@@ -127,7 +208,7 @@ class ReceiptInvoiceMatcher:
         }
 
         # Score 1: Amount matching (0-50 points)
-        invoice_amount = float(invoice.get('total_amount', 0))
+        invoice_amount = _comparable_amount(invoice, payment_data.get('payment_currency'))
         if invoice_amount > 0:
             amount_diff_pct = abs(payment_amount - invoice_amount) / invoice_amount * 100
 
@@ -234,7 +315,10 @@ class ReceiptInvoiceMatcher:
             Best match with invoice data and score, or None if no good match
         """
         matches = self.find_matching_invoices(payment_data, tenant_id, customer_filter)
+        return self.select_best_match(matches)
 
+    def select_best_match(self, matches: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Pick the best match from already scored matches, or None if too weak"""
         if not matches:
             return None
 
@@ -283,3 +367,108 @@ Score Breakdown:
   - Status Score: {breakdown['status_score']}/10
 """
         return result.strip()
+
+
+class InvoiceCandidateIndex:
+    """Open invoices of a tenant sorted by native and USD amount
+
+    Loaded with a single query and shared across the receipts of a batch
+    upload, so each receipt only bisects into its amount band instead of
+    querying and scoring every invoice.
+    """
+
+    def __init__(self, invoices: List[Dict[str, Any]], max_date_diff_days: int = ReceiptInvoiceMatcher.MAX_DATE_DIFF_DAYS,
+                 version: int = 0):
+        self.max_date_diff_days = max_date_diff_days
+        self.loaded_at = time.time()
+        self.version = version
+        self.by_amount = sorted(
+            (float(inv['total_amount']), pos, inv) for pos, inv in enumerate(invoices)
+            if inv.get('total_amount') is not None
+        )
+        self.by_usd_amount = sorted(
+            (float(inv['usd_equivalent_amount']), pos, inv) for pos, inv in enumerate(invoices)
+            if inv.get('usd_equivalent_amount')
+        )
+        self._amounts = [entry[0] for entry in self.by_amount]
+        self._usd_amounts = [entry[0] for entry in self.by_usd_amount]
+
+    @classmethod
+    def load(cls, db_manager, tenant_id: str, version: int = 0) -> 'InvoiceCandidateIndex':
+        """Load all open invoices for the tenant"""
+        query = f"""
+            SELECT {CANDIDATE_COLUMNS}
+            FROM invoices
+            WHERE tenant_id = %s
+            AND total_amount IS NOT NULL
+            AND {OPEN_INVOICE_CONDITION}
+        """
+        invoices = db_manager.execute_query(query, (tenant_id,), fetch_all=True) or []
+        return cls(invoices, version=version)
+
+    def __len__(self) -> int:
+        return len(self.by_amount)
+
+    def candidates(
+        self,
+        payment_amount: float,
+        payment_date: Optional[datetime] = None,
+        customer_filter: str = None
+    ) -> List[Dict[str, Any]]:
+        """Invoices within the amount band and date window of the payment"""
+        low, high = amount_band(payment_amount)
+        shortlist = {}
+        for amounts, entries in ((self._amounts, self.by_amount), (self._usd_amounts, self.by_usd_amount)):
+            for _, pos, invoice in entries[bisect_left(amounts, low):bisect_right(amounts, high)]:
+                shortlist[pos] = invoice
+
+        results = []
+        for pos in sorted(shortlist):
+            invoice = shortlist[pos]
+            if customer_filter and customer_filter not in (invoice.get('customer_name'), invoice.get('vendor_name')):
+                continue
+            if payment_date and not self._within_window(invoice.get('date'), payment_date):
+                continue
+            results.append(invoice)
+        return results
+
+    def _within_window(self, invoice_date, payment_date: datetime) -> bool:
+        if not invoice_date:
+            return True
+        try:
+            if not isinstance(invoice_date, datetime):
+                invoice_date = date_parser.parse(str(invoice_date))
+        except (ValueError, OverflowError):
+            return True
+        return abs((_as_date(payment_date) - _as_date(invoice_date)).days) <= self.max_date_diff_days
+
+
+_index_cache: Dict[str, InvoiceCandidateIndex] = {}
+_index_cache_lock = threading.Lock()
+
+
+def get_invoice_candidate_index(db_manager, tenant_id: str) -> InvoiceCandidateIndex:
+    """
+    Return the tenant's candidate index, reloading it after
+    INDEX_CACHE_TTL_SECONDS or once any process has written the tenant's invoices
+    """
+    version = invoice_data_version(tenant_id, db_manager)
+    with _index_cache_lock:
+        index = _index_cache.get(tenant_id)
+        if index is not None and index.version == version and time.time() - index.loaded_at < INDEX_CACHE_TTL_SECONDS:
+            return index
+
+    index = InvoiceCandidateIndex.load(db_manager, tenant_id, version)
+    with _index_cache_lock:
+        _index_cache[tenant_id] = index
+    return index
+
+
+def invalidate_invoice_candidate_index(tenant_id: str = None):
+    """Drop cached indexes after invoices are paid or edited"""
+    invoice_data_versions.forget(tenant_id)
+    with _index_cache_lock:
+        if tenant_id is None:
+            _index_cache.clear()
+        else:
+            _index_cache.pop(tenant_id, None)
@@ -0,0 +1,596 @@
+#!/usr/bin/env python3
+"""
+Sankey Flow Engine
+Builds the revenue -> expense Sankey graph from one grouped aggregate query
+(direction, category, entity) instead of per-request transaction scans, and
+answers node breakdowns from a per-tenant keyword index maintained on ingest.
+Responses are cached per tenant and filter hash until the tenant's
+transactions change.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import psycopg2.extras
+
+try:
+    from .kpi_aggregator import kpi_cache
+except ImportError:
+    # Fallback for when imported directly (services folder added to sys.path)
+    from kpi_aggregator import kpi_cache
+
+try:
+    from module_singletons import shared_instance
+except ImportError:
+    # web_ui/ itself is not on sys.path (imported through the repo root)
+    from web_ui.module_singletons import shared_instance
+
+logger = logging.getLogger(__name__)
+
+SANKEY_CACHE_TTL_SECONDS = 600
+SANKEY_CACHE_MAX_ENTRIES = 256
+
+# The index is also re-checked after this long, covering writes made by other processes
+KEYWORD_INDEX_MAX_AGE_SECONDS = 300
+
+BREAKDOWN_MAX_KEYWORDS = 15
+
+TRANSFER_CATEGORIES = ('Internal Transfer', 'Exchange Transfer', 'Intercompany Transfer', 'Blockchain Transaction')
+
+# Handles mixed date formats: YYYY-MM-DD and MM/DD/YYYY
+SANKEY_DATE_SQL = """
+    CASE
+        WHEN date ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}' THEN TO_DATE(date, 'YYYY-MM-DD')
+        WHEN date ~ '^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}' THEN TO_DATE(date, 'MM/DD/YYYY')
+        ELSE NULL
+    END
+"""
+
+# Every flow of the graph comes from this one grouping; category ranking,
+# entity links and totals are folded from its (small) result in Python
+FLOW_AGGREGATE_QUERY = """
+    SELECT
+        CASE WHEN amount > 0 THEN 'revenue' ELSE 'expense' END AS direction,
+        COALESCE(subcategory, accounting_category) AS category,
+        COALESCE(NULLIF(classified_entity, ''), 'Unassigned') AS entity,
+        SUM(ABS(amount)) AS total_amount,
+        COUNT(*) AS transaction_count
+    FROM transactions
+    WHERE {where_clause}
+    GROUP BY 1, 2, 3
+"""
+
+# Transactions whose keyword index rows are missing or were built from
+# different text (justification/origin/destination/description or sign)
+KEYWORD_SOURCE_HASH_SQL = """
+    md5(COALESCE(t.justification, '') || '|' || COALESCE(t.origin, '') || '|' ||
+        COALESCE(t.destination, '') || '|' || COALESCE(t.description, '') || '|' || (t.amount > 0)::text)
+"""
+
+STALE_KEYWORD_ROWS_QUERY = """
+    SELECT t.transaction_id, t.description, t.amount, t.justification, t.origin, t.destination,
+           {source_hash} AS source_hash
+    FROM transactions t
+    LEFT JOIN (
+        SELECT DISTINCT ON (transaction_id) transaction_id, source_hash
+        FROM transaction_keywords
+        WHERE tenant_id = %s
+    ) k ON k.transaction_id = t.transaction_id
+    WHERE t.tenant_id = %s
+    AND (k.source_hash IS NULL OR k.source_hash != {source_hash})
+""".format(source_hash=KEYWORD_SOURCE_HASH_SQL)
+
+NODE_FILTER_SQL = """
+    tenant_id = %s
+    AND COALESCE(subcategory, accounting_category, classified_entity,
+         CASE WHEN amount > 0 THEN 'Other Revenue' ELSE 'Other Expenses' END) = %s
+    AND archived = FALSE
+"""
+
+# Keyword groups of one node with their top 3 transactions by absolute amount
+KEYWORD_BREAKDOWN_QUERY = """
+    WITH node AS (
+        SELECT transaction_id, date, description, amount
+        FROM transactions
+        WHERE {node_filter}
+    ),
+    keyword_transactions AS (
+        SELECT
+            k.keyword, n.date, n.description, n.amount,
+            ROW_NUMBER() OVER (PARTITION BY k.keyword ORDER BY ABS(n.amount) DESC) AS rank
+        FROM node n
+        JOIN transaction_keywords k ON k.tenant_id = %s AND k.transaction_id = n.transaction_id
+    )
+    SELECT
+        keyword,
+        SUM(amount) AS amount,
+        COUNT(*) AS count,
+        JSON_AGG(JSON_BUILD_OBJECT('date', date::text, 'amount', amount, 'description', LEFT(COALESCE(description, ''), 80))
+                 ORDER BY rank) FILTER (WHERE rank <= 3) AS sample_transactions
+    FROM keyword_transactions
+    GROUP BY keyword
+    ORDER BY ABS(SUM(amount)) DESC
+    LIMIT %s
+"""
+
+NODE_TOTALS_QUERY = """
+    SELECT COUNT(*) AS count, SUM(ABS(amount)) AS total
+    FROM transactions
+    WHERE {node_filter}
+"""
+
+NODE_TOP_TRANSACTIONS_QUERY = """
+    SELECT date, description, amount, justification
+    FROM transactions
+    WHERE {node_filter}
+    ORDER BY ABS(amount) DESC
+    LIMIT 5
+"""
+
+
+def data_version(tenant_id: str) -> int:
+    """Changes on every write to the tenant's transactions, by any process (shared with the KPI cache)"""
+    return kpi_cache.version(tenant_id)
+
+
+# ========================================
+# KEYWORD EXTRACTION
+# ========================================
+
+ACTION_PATTERN = re.compile(
+    r'(?:payment|invoice|bill|transfer|salary|wage)\s+(?:to|from|for)\s+([A-Z][A-Za-z0-9\s&\.\-]{2,40})', re.IGNORECASE
+)
+PERSON_PATTERN = re.compile(r'\b([A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)\b')
+ACRONYM_PATTERN = re.compile(r'\b([A-Z]{2,}(?:\s+[A-Z]{2,})?)\b')
+DESCRIPTION_PATTERN = re.compile(r'\b([A-Z][A-Za-z\s]{3,30})\b')
+NOISE_WORDS = frozenset(['the', 'and', 'for', 'with', 'from', 'payment', 'invoice', 'bill'])
+
+
+def transaction_keywords(txn: Dict[str, Any], node_type: str = 'expense') -> List[str]:
+    """
+    Entities/vendors/people named by one transaction.
+
+    Matches justification phrases ("payment to X"), person names and all-caps
+    company names, then the counterparty (destination for expenses, origin for
+    revenue), falling back to capitalized phrases of the description.
+    """
+    keywords = []
+
+    justification = str(txn.get('justification') or '')
+    if justification:
+        keywords.extend(ACTION_PATTERN.findall(justification))
+        keywords.extend(PERSON_PATTERN.findall(justification))
+        keywords.extend(ACRONYM_PATTERN.findall(justification))
+
+    counterparty = txn.get('destination') if node_type == 'expense' else txn.get('origin')
+    if counterparty:
+        counterparty = str(counterparty).strip()
+        if len(counterparty) > 1:
+            keywords.append(counterparty)
+
+    if not keywords:
+        keywords.extend(DESCRIPTION_PATTERN.findall(str(txn.get('description') or '')))
+
+    if not keywords:
+        keywords = ['Uncategorized']
+
+    cleaned_keywords = set()
+    for kw in keywords:
+        kw = kw.strip()
+        if kw.lower() not in NOISE_WORDS:
+            kw = kw[:50]
+            if len(kw) >= 2:
+                cleaned_keywords.add(kw)
+
+    return sorted(cleaned_keywords) or ['Other']
+
+
+def format_keyword_breakdown(keyword_rows: Sequence[Dict[str, Any]], node_type: str) -> List[Dict[str, Any]]:
+    """Top keyword groups ({keyword, amount, count, sample_transactions}) with their share of the total"""
+    total_amount = sum(abs(row['amount']) for row in keyword_rows)
+    return [
+        {
+            'keyword': row['keyword'],
+            'amount': abs(row['amount']) if node_type == 'expense' else row['amount'],
+            'count': row['count'],
+            'percentage': (abs(row['amount']) / total_amount * 100) if total_amount > 0 else 0,
+            'sample_transactions': row['sample_transactions']
+        }
+        for row in keyword_rows
+    ]
+
+
+# ========================================
+# RESPONSE CACHE
+# ========================================
+
+class SankeyCache:
+    """Per-(tenant, filter hash) Sankey responses; keys carry the data version, so writes retire them"""
+
+    def __init__(self, max_entries: int = SANKEY_CACHE_MAX_ENTRIES, ttl_seconds: float = SANKEY_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[Tuple, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def filter_hash(kind: str, filters: Dict[str, Any]) -> str:
+        payload = json.dumps([kind, filters], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, tenant_id: str, kind: str, filters: Dict[str, Any], compute):
+        version = data_version(tenant_id)
+        key = (tenant_id, self.filter_hash(kind, filters), version)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], True
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            # Don't store results computed from data older than a concurrent write
+            if data_version(tenant_id) == version:
+                self._entries[key] = (time.time(), value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# ========================================
+# FLOW GRAPH
+# ========================================
+
+def _flow_where_clause(tenant_id: str, start_date: Optional[str], end_date: Optional[str], keyword: str,
+                       entity: str, accounting_category: str, accounting_subcategory: str) -> Tuple[str, List]:
+    clauses = [
+        "tenant_id = %s",
+        "amount != 0",
+        "archived = FALSE",
+        "COALESCE(accounting_category, '') NOT IN %s",
+        "COALESCE(subcategory, '') NOT IN %s",
+        "COALESCE(subcategory, accounting_category, '') != ''",
+    ]
+    params: List[Any] = [tenant_id, TRANSFER_CATEGORIES, TRANSFER_CATEGORIES]
+
+    if start_date and end_date:
+        clauses.append(f"({SANKEY_DATE_SQL}) BETWEEN TO_DATE(%s, 'YYYY-MM-DD') AND TO_DATE(%s, 'YYYY-MM-DD')")
+        params.extend([start_date, end_date])
+    if keyword:
+        clauses.append("(LOWER(description) LIKE LOWER(%s) OR LOWER(origin) LIKE LOWER(%s) "
+                       "OR LOWER(destination) LIKE LOWER(%s))")
+        params.extend([f'%{keyword}%'] * 3)
+    if entity:
+        clauses.append("classified_entity = %s")
+        params.append(entity)
+    if accounting_category:
+        clauses.append("accounting_category = %s")
+        params.append(accounting_category)
+    if accounting_subcategory:
+        clauses.append("subcategory = %s")
+        params.append(accounting_subcategory)
+
+    return "\n        AND ".join(clauses), params
+
+
+def _top_categories(rows, direction: str, min_amount: float, max_categories: int) -> List[Dict[str, Any]]:
+    totals = defaultdict(lambda: [0.0, 0])
+    for row in rows:
+        if row['direction'] == direction:
+            total = totals[row['category']]
+            total[0] += float(row['total_amount'] or 0)
+            total[1] += int(row['transaction_count'] or 0)
+
+    ranked = sorted(((category, amount, count) for category, (amount, count) in totals.items()
+                     if amount >= min_amount), key=lambda c: -c[1])[:max_categories]
+    return [{'category': category, 'total_amount': amount, 'transaction_count': count}
+            for category, amount, count in ranked]
+
+
+def build_sankey_graph(rows, min_amount: float = 1000, max_categories: int = 8,
+                       flow: str = 'hub') -> Dict[str, Any]:
+    """
+    Sankey nodes, links and summary from flow aggregate rows
+    ({direction, category, entity, total_amount, transaction_count}).
+
+    flow='hub' routes every revenue category through one cash flow hub to the
+    expense categories; flow='entity' links revenue categories to the entities
+    that received them and entities to the expense categories they paid.
+    """
+    # Investor Equity is ranked but left out of the chart (shown separately)
+    revenue_data = [rev for rev in _top_categories(rows, 'revenue', min_amount, max_categories)
+                    if 'investor equity' not in rev['category'].lower()]
+    expense_data = _top_categories(rows, 'expense', min_amount, max_categories)
+
+    total_revenue = sum(rev['total_amount'] for rev in revenue_data)
+    total_expenses = sum(exp['total_amount'] for exp in expense_data)
+
+    nodes = []
+    links = []
+
+    def add_node(name, node_type, value, color):
+        nodes.append({'id': len(nodes), 'name': name, 'type': node_type, 'value': value, 'color': color})
+        return len(nodes) - 1
+
+    revenue_nodes = {rev['category']: add_node(rev['category'], 'revenue', rev['total_amount'], '#10b981')
+                     for rev in revenue_data}
+
+    if flow == 'entity':
+        inflows = defaultdict(float)
+        outflows = defaultdict(float)
+        for row in rows:
+            amount = float(row['total_amount'] or 0)
+            if row['direction'] == 'revenue' and row['category'] in revenue_nodes:
+                inflows[(row['category'], row['entity'])] += amount
+            elif row['direction'] == 'expense':
+                outflows[(row['entity'], row['category'])] += amount
+
+        expense_names = {exp['category'] for exp in expense_data}
+        outflows = {key: amount for key, amount in outflows.items() if key[1] in expense_names}
+        entity_values = defaultdict(lambda: [0.0, 0.0])
+        for (_, entity_name), amount in inflows.items():
+            entity_values[entity_name][0] += amount
+        for (entity_name, _), amount in outflows.items():
+            entity_values[entity_name][1] += amount
+
+        entity_nodes = {
+            entity_name: add_node(entity_name, 'entity', max(values), '#3b82f6')
+            for entity_name, values in sorted(entity_values.items(), key=lambda e: -max(e[1]))
+        }
+        expense_nodes = {exp['category']: add_node(exp['category'], 'expense', exp['total_amount'], '#ef4444')
+                         for exp in expense_data}
+
+        for (category, entity_name), amount in sorted(inflows.items(), key=lambda f: -f[1]):
+            links.append({'source': revenue_nodes[category], 'target': entity_nodes[entity_name], 'value': amount})
+        for (entity_name, category), amount in sorted(outflows.items(), key=lambda f: -f[1]):
+            links.append({'source': entity_nodes[entity_name], 'target': expense_nodes[category], 'value': amount})
+    else:
+        hub_node_id = add_node('Cash Flow Hub', 'hub', min(total_revenue, total_expenses), '#3b82f6')
+        expense_nodes = {exp['category']: add_node(exp['category'], 'expense', exp['total_amount'], '#ef4444')
+                         for exp in expense_data}
+
+        for rev in revenue_data:
+            links.append({'source': revenue_nodes[rev['category']], 'target': hub_node_id,
+                          'value': rev['total_amount']})
+
+        # Expenses share the hub's outflow in proportion to their totals
+        for exp in expense_data:
+            proportional_value = (exp['total_amount'] / total_expenses * min(total_revenue, total_expenses)
+                                  if total_expenses > 0 else 0)
+            links.append({'source': hub_node_id, 'target': expense_nodes[exp['category']],
+                          'value': proportional_value})
+
+    net_flow = total_revenue - total_expenses
+    flow_efficiency = (net_flow / total_revenue * 100) if total_revenue > 0 else 0
+
+    return {
+        'sankey': {
+            'nodes': nodes,
+            'links': links
+        },
+        'summary': {
+            'total_revenue': total_revenue,
+            'total_expenses': total_expenses,
+            'net_flow': net_flow,
+            'flow_efficiency_percent': round(flow_efficiency, 2),
+            'revenue_categories_count': len(revenue_data),
+            'expense_categories_count': len(expense_data),
+        },
+        'parameters': {
+            'min_amount': min_amount,
+            'max_categories': max_categories,
+            'flow': flow
+        }
+    }
+
+
+def get_sankey_flow(db_manager, tenant_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                    min_amount: float = 1000, max_categories: int = 8, keyword: str = '', entity: str = '',
+                    accounting_category: str = '', accounting_subcategory: str = '',
+                    flow: str = 'hub') -> Tuple[Dict[str, Any], bool]:
+    """Sankey graph for the filters, from the cache while the tenant's data is unchanged; returns (data, cached)"""
+    filters = {
+        'start_date': start_date, 'end_date': end_date, 'min_amount': min_amount,
+        'max_categories': max_categories, 'keyword': keyword, 'entity': entity,
+        'accounting_category': accounting_category, 'accounting_subcategory': accounting_subcategory,
+        'flow': flow,
+    }
+
+    def compute():
+        where_clause, params = _flow_where_clause(tenant_id, start_date, end_date, keyword, entity,
+                                                  accounting_category, accounting_subcategory)
+        rows = db_manager.execute_query(FLOW_AGGREGATE_QUERY.format(where_clause=where_clause), tuple(params),
+                                        fetch_all=True) or []
+        data = build_sankey_graph(rows, min_amount, max_categories, flow)
+        data['summary']['date_range'] = {
+            'start_date': start_date,
+            'end_date': end_date
+        } if start_date and end_date else None
+        return data
+
+    return sankey_cache.get_or_compute(tenant_id, 'flow', filters, compute)
+
+
+# ========================================
+# KEYWORD INDEX
+# ========================================
+
+class KeywordIndex:
+    """
+    Per-tenant transaction -> keyword rows (transaction_keywords table).
+
+    Refreshes are incremental: only transactions whose keyword source text
+    changed since they were indexed are re-extracted. Readers never refresh
+    inline; a stale index is refreshed on a background thread (with its own
+    connection, outside the request's unit of work) while the rows already
+    indexed keep being served.
+    """
+
+    def __init__(self):
+        self._refreshed: Dict[str, Tuple[int, float]] = {}
+        self._locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._running: Dict[str, threading.Thread] = {}
+        self._running_lock = threading.Lock()
+
+    def refresh(self, db_manager, tenant_id: str) -> int:
+        """Re-index the tenant's new and edited transactions; returns how many were indexed"""
+        version = data_version(tenant_id)
+        with self._locks[tenant_id]:
+            started = time.perf_counter()
+            with db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(STALE_KEYWORD_ROWS_QUERY, (tenant_id, tenant_id))
+                stale = cursor.fetchall()
+
+                rows = []
+                for transaction_id, description, amount, justification, origin, destination, source_hash in stale:
+                    txn = {'description': description, 'justification': justification,
+                           'origin': origin, 'destination': destination}
+                    node_type = 'revenue' if amount is not None and amount > 0 else 'expense'
+                    rows.extend((tenant_id, transaction_id, kw, source_hash)
+                                for kw in transaction_keywords(txn, node_type))
+
+                if stale:
+                    cursor.execute("""
+                        DELETE FROM transaction_keywords
+                        WHERE tenant_id = %s AND transaction_id = ANY(%s)
+                    """, (tenant_id, [row[0] for row in stale]))
+                    psycopg2.extras.execute_values(cursor, """
+                        INSERT INTO transaction_keywords (tenant_id, transaction_id, keyword, source_hash)
+                        VALUES %s
+                        ON CONFLICT (tenant_id, transaction_id, keyword) DO UPDATE
+                        SET source_hash = EXCLUDED.source_hash
+                    """, rows, page_size=1000)
+
+                # Deleted transactions
+                cursor.execute("""
+                    DELETE FROM transaction_keywords k
+                    WHERE k.tenant_id = %s
+                    AND NOT EXISTS (
+                        SELECT 1 FROM transactions t
+                        WHERE t.tenant_id = k.tenant_id AND t.transaction_id = k.transaction_id
+                    )
+                """, (tenant_id,))
+                conn.commit()
+                cursor.close()
+
+            self._refreshed[tenant_id] = (version, time.time())
+
+        if stale:
+            logger.info(f"[SANKEY] Indexed keywords of {len(stale)} transactions for tenant {tenant_id} "
+                        f"in {int((time.perf_counter() - started) * 1000)}ms")
+        return len(stale)
+
+    def refresh_async(self, db_manager, tenant_id: str) -> Optional[threading.Thread]:
+        """Run refresh on a daemon thread (after uploads and for stale reads); None if one is running"""
+        def run():
+            try:
+                self.refresh(db_manager, tenant_id)
+            except Exception as e:
+                logger.error(f"[SANKEY] Keyword index refresh failed for tenant {tenant_id}: {e}")
+            finally:
+                with self._running_lock:
+                    self._running.pop(tenant_id, None)
+
+        with self._running_lock:
+            if tenant_id in self._running:
+                return None
+            thread = self._running[tenant_id] = threading.Thread(target=run, daemon=True,
+                                                                 name=f"KeywordIndex-{tenant_id}")
+        thread.start()
+        return thread
+
+    def ensure_fresh(self, db_manager, tenant_id: str) -> bool:
+        """
+        True if the index is current; otherwise starts a background refresh
+        (the tenant's transactions changed since the last one, or it is too old)
+        """
+        refreshed = self._refreshed.get(tenant_id)
+        if (refreshed is None or refreshed[0] != data_version(tenant_id)
+                or time.time() - refreshed[1] >= KEYWORD_INDEX_MAX_AGE_SECONDS):
+            self.refresh_async(db_manager, tenant_id)
+            return False
+        return True
+
+    def indexed_at(self, tenant_id: str) -> Optional[float]:
+        """When this process last finished refreshing the tenant's index"""
+        refreshed = self._refreshed.get(tenant_id)
+        return refreshed[1] if refreshed else None
+
+
+sankey_cache = shared_instance(__name__, 'sankey_cache', SankeyCache)
+keyword_index = shared_instance(__name__, 'keyword_index', KeywordIndex)
+
+
+def get_sankey_breakdown(db_manager, tenant_id: str, node_name: str, node_type: str = 'expense',
+                         start_date: Optional[str] = None, end_date: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+    """
+    Keyword breakdown of one Sankey node from the keyword index; returns (data, cached).
+
+    data holds total_amount and transaction_count of the node, the top keyword
+    groups (breakdown) and its five largest transactions (top_transactions).
+    """
+    # Serve whatever is indexed now; once a background refresh finishes,
+    # indexed_at changes and the breakdown is recomputed
+    keyword_index.ensure_fresh(db_manager, tenant_id)
+    filters = {'node_name': node_name, 'node_type': node_type, 'start_date': start_date, 'end_date': end_date,
+               'indexed_at': keyword_index.indexed_at(tenant_id)}
+
+    def compute():
+        node_filter = NODE_FILTER_SQL + ("AND amount > 0" if node_type == 'revenue' else "AND amount < 0")
+        params = [tenant_id, node_name]
+        if start_date and end_date:
+            node_filter += "\n    AND date::date >= %s::date AND date::date <= %s::date"
+            params.extend([start_date, end_date])
+
+        totals = db_manager.execute_query(NODE_TOTALS_QUERY.format(node_filter=node_filter), tuple(params),
+                                          fetch_one=True) or {}
+        transaction_count = int(totals.get('count') or 0)
+        if not transaction_count:
+            return {'total_amount': 0, 'transaction_count': 0, 'breakdown': [], 'top_transactions': []}
+
+        keyword_rows = db_manager.execute_query(
+            KEYWORD_BREAKDOWN_QUERY.format(node_filter=node_filter),
+            tuple(params) + (tenant_id, BREAKDOWN_MAX_KEYWORDS), fetch_all=True
+        ) or []
+        keyword_rows = [{'keyword': row['keyword'], 'amount': float(row['amount'] or 0), 'count': row['count'],
+                         'sample_transactions': [dict(sample, amount=float(sample['amount']))
+                                                 for sample in row['sample_transactions'] or []]}
+                        for row in keyword_rows]
+
+        top_rows = db_manager.execute_query(NODE_TOP_TRANSACTIONS_QUERY.format(node_filter=node_filter),
+                                            tuple(params), fetch_all=True) or []
+
+        return {
+            'total_amount': float(totals.get('total') or 0),
+            'transaction_count': transaction_count,
+            'breakdown': format_keyword_breakdown(keyword_rows, node_type),
+            'top_transactions': [
+                {
+                    'date': str(txn.get('date', '')),
+                    'description': str(txn.get('description', ''))[:100],
+                    'amount': float(txn.get('amount', 0)),
+                    'justification': str(txn.get('justification', ''))[:150]
+                }
+                for txn in top_rows
+            ]
+        }
+
+    return sankey_cache.get_or_compute(tenant_id, 'breakdown', filters, compute)
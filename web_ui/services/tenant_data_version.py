@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tenant Data Version
+Database-side counter of writes to a tenant's transactions. A statement-level
+trigger (migrations/add_tenant_data_versions.sql) bumps it on every INSERT,
+UPDATE or DELETE, whichever worker, job or script made the write, so caches
+keyed on it (KPIs, Sankey, ledger/forecast, rendered PDFs, chatbot context)
+stop serving data another process has changed. Invoices have their own
+counter (migrations/add_invoice_data_versions.sql) for the invoice candidate index.
+
+Reading it is one primary-key lookup; a version read in this process is
+reused for DATA_VERSION_POLL_SECONDS so a burst of cache lookups shares it.
+Without the migration (or on SQLite) the version is 0 and caches fall back
+to their process-local invalidation and TTLs.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    from module_singletons import shared_instance
+except ImportError:
+    # web_ui/ itself is not on sys.path (imported through the repo root)
+    from web_ui.module_singletons import shared_instance
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_POLL_SECONDS = 1.0
+# How long to wait before looking for the table again after it was missing
+DATA_VERSION_TABLE_RECHECK_SECONDS = 300
+
+TABLE_EXISTS_QUERY = "SELECT to_regclass(%s) IS NOT NULL AS present"
+TENANT_DATA_VERSION_QUERY = "SELECT version FROM {table} WHERE tenant_id = %s"
+
+
+class TenantDataVersions:
+    """Recently read per-tenant versions; the database holds the real counters"""
+
+    def __init__(self, poll_seconds: float = DATA_VERSION_POLL_SECONDS, table: str = 'tenant_data_versions'):
+        self.poll_seconds = poll_seconds
+        self.table = table
+        self._versions: Dict[str, Tuple[float, int]] = {}
+        self._table_checked_at: Optional[float] = None
+        self._table_present = False
+        self._lock = threading.Lock()
+
+    def _table_available(self, db_manager) -> bool:
+        now = time.time()
+        if self._table_checked_at is not None and (
+                self._table_present or now - self._table_checked_at < DATA_VERSION_TABLE_RECHECK_SECONDS):
+            return self._table_present
+        # to_regclass never fails, so a missing table can't abort the caller's transaction
+        row = db_manager.execute_query(TABLE_EXISTS_QUERY, (self.table,), fetch_one=True)
+        present = bool(row['present'] if isinstance(row, dict) else row[0]) if row else False
+        if not present:
+            logger.info(f"{self.table} table not found; caches use process-local invalidation only")
+        self._table_present, self._table_checked_at = present, now
+        return present
+
+    def get(self, db_manager, tenant_id: str) -> int:
+        cached = self._versions.get(tenant_id)
+        if cached is not None and time.time() - cached[0] < self.poll_seconds:
+            return cached[1]
+
+        try:
+            if getattr(db_manager, 'db_type', None) != 'postgresql' or not self._table_available(db_manager):
+                return 0
+            row = db_manager.execute_query(TENANT_DATA_VERSION_QUERY.format(table=self.table), (tenant_id,), fetch_one=True)
+        except Exception as e:
+            logger.warning(f"Could not read data version for tenant {tenant_id}: {e}")
+            # Keep the last version seen until the next poll: going back to an
+            # older value could make a stale cache entry match again
+            version = cached[1] if cached is not None else 0
+        else:
+            version = int((row['version'] if isinstance(row, dict) else row[0]) if row else 0)
+        with self._lock:
+            self._versions[tenant_id] = (time.time(), version)
+        return version
+
+    def forget(self, tenant_id: Optional[str] = None):
+        """Re-read the version on next use (after this process wrote the tenant's data)"""
+        with self._lock:
+            if tenant_id is None:
+                self._versions = {key: (0.0, version) for key, (_, version) in self._versions.items()}
+            elif tenant_id in self._versions:
+                self._versions[tenant_id] = (0.0, self._versions[tenant_id][1])
+
+
+tenant_data_versions = shared_instance(__name__, 'tenant_data_versions', TenantDataVersions)
+invoice_data_versions = shared_instance(
+    __name__, 'invoice_data_versions', lambda: TenantDataVersions(table='invoice_data_versions'))
+
+
+def tenant_data_version(tenant_id: str, db_manager=None) -> int:
+    """Database-side data version of a tenant's transactions (0 if unavailable)"""
+    if db_manager is None:
+        try:
+            from database import db_manager
+        except ImportError:
+            return 0
+    return tenant_data_versions.get(db_manager, tenant_id)
+
+
+def invoice_data_version(tenant_id: str, db_manager=None) -> int:
+    """Database-side data version of a tenant's invoices (0 if unavailable)"""
+    if db_manager is None:
+        try:
+            from database import db_manager
+        except ImportError:
+            return 0
+    return invoice_data_versions.get(db_manager, tenant_id)
@@ -7,9 +7,15 @@ similar transactions based on Origin, Destination, and Description fields.
 """
 
 from difflib import SequenceMatcher
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple, Union
 import re
+import time
+import heapq
 import logging
+import threading
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -136,6 +142,7 @@ def match_wallet_addresses(addr1: str, addr2: str) -> float:
     return 0.0
 
 
+@lru_cache(maxsize=65536)
 def normalize_counterparty(field: str) -> str:
     """
     Normalize counterparty identifiers for direct comparison.
@@ -225,18 +232,22 @@ def normalize_counterparty(field: str) -> str:
 
 def find_similar_simple(
     target_transaction: Dict,
-    candidate_transactions: List[Dict],
+    candidate_transactions: Union[List[Dict], 'CandidatePool'],
     min_confidence: float = 0.3,
-    debug: bool = False
+    debug: bool = False,
+    max_results: Optional[int] = None
 ) -> List[Dict]:
     """
     Find similar transactions using simple keyword-based matching.
 
     Args:
         target_transaction: The transaction to find matches for
-        candidate_transactions: Pool of potential matching transactions
+        candidate_transactions: Pool of potential matching transactions, either a
+            list of dicts or a prebuilt CandidatePool (scored vectorized)
         min_confidence: Minimum confidence threshold (0.0-1.0)
         debug: Enable detailed logging for debugging
+        max_results: Optional limit; with a CandidatePool only the candidates that
+            can still make the top max_results are scored
 
     Returns:
         List of matching transactions with confidence scores and match details
@@ -267,6 +278,9 @@ def find_similar_simple(
     if not target_origin and not target_dest and not target_desc:
         return []
 
+    if isinstance(candidate_transactions, CandidatePool):
+        return candidate_transactions.find_similar(target_transaction, min_confidence, debug, max_results)
+
     # DEBUG: Log target transaction details
     if debug:
         target_origin_norm = normalize_counterparty(target_origin)
@@ -350,24 +364,8 @@ def find_similar_simple(
 
         # Only include if meets minimum confidence
         if confidence >= min_confidence:
-            # Build match result
-            match = {
-                'transaction_id': candidate.get('transaction_id'),
-                'date': candidate.get('date'),
-                'origin': candidate_origin,
-                'destination': candidate_dest,
-                'description': candidate_desc,
-                'amount': candidate.get('amount'),
-                'confidence': round(confidence, 3),
-                'match_details': match_details,
-                'suggested_values': {
-                    'classified_entity': candidate.get('classified_entity'),
-                    'accounting_category': candidate.get('accounting_category'),
-                    'subcategory': candidate.get('subcategory'),
-                    'justification': candidate.get('justification')
-                }
-            }
-            matches.append(match)
+            matches.append(_build_match(candidate, candidate_origin, candidate_dest, candidate_desc,
+                                        confidence, match_details))
         else:
             candidates_below_threshold += 1
 
@@ -382,9 +380,33 @@ def find_similar_simple(
     # Sort by confidence (highest first)
     matches.sort(key=lambda x: x['confidence'], reverse=True)
 
+    if max_results is not None:
+        matches = matches[:max_results]
+
     return matches
 
 
+def _build_match(candidate: Dict, origin: str, destination: str, description: str,
+                 confidence: float, match_details: Dict) -> Dict:
+    """Build the match result returned for a candidate above threshold"""
+    return {
+        'transaction_id': candidate.get('transaction_id'),
+        'date': candidate.get('date'),
+        'origin': origin,
+        'destination': destination,
+        'description': description,
+        'amount': candidate.get('amount'),
+        'confidence': round(confidence, 3),
+        'match_details': match_details,
+        'suggested_values': {
+            'classified_entity': candidate.get('classified_entity'),
+            'accounting_category': candidate.get('accounting_category'),
+            'subcategory': candidate.get('subcategory'),
+            'justification': candidate.get('justification')
+        }
+    }
+
+
 def calculate_counterparty_similarity(field1: str, field2: str) -> float:
     """
     Calculate similarity between two counterparty fields (origin/destination).
@@ -737,3 +759,425 @@ def format_match_explanation(match_details: Dict) -> str:
         explanation += f" (amount differs significantly, -{amount_penalty} penalty)"
 
     return explanation
+
+
+# ============================================================================
+# CANDIDATE POOL - pre-tokenized candidates for repeated lookups
+# ============================================================================
+
+# Similarity needed for origin/destination to count as a counterparty match
+COUNTERPARTY_MATCH_THRESHOLD = 0.85
+
+# Candidates whose amount differs by more than this ratio are rejected
+MAX_AMOUNT_RATIO = 2.0
+
+# Pools are rebuilt after this many seconds (or when invalidated)
+CANDIDATE_POOL_TTL_SECONDS = 300
+
+_EPSILON = 1e-9
+
+# Characters are hashed into this many buckets for sequence-similarity bounds
+_CHAR_BUCKETS = 64
+
+
+def _char_histogram(text: str) -> np.ndarray:
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32) % _CHAR_BUCKETS
+    return np.bincount(codes, minlength=_CHAR_BUCKETS)
+
+
+def _field_text(transaction: Dict, key: str) -> str:
+    return str(transaction.get(key, '')).strip()
+
+
+def _abs_amount(transaction: Dict) -> float:
+    # Handle None amounts safely (convert None to 0)
+    raw = transaction.get('amount', 0)
+    return abs(float(raw)) if raw is not None else 0.0
+
+
+class CandidatePool:
+    """
+    Candidate transactions pre-tokenized for repeated find_similar_simple calls.
+
+    Origin/destination and descriptions are interned once, with normalized
+    counterparties, keyword sets as integer IDs and an inverted keyword index.
+    A lookup masks candidates by amount ratio, shortlists the ones that can
+    reach the confidence threshold (counterparty match or enough keyword
+    overlap) and only scores that shortlist, with the same scoring functions
+    as the list-based path.
+    """
+
+    def __init__(self, candidates: List[Dict]):
+        self.candidates = list(candidates)
+        self.built_at = time.time()
+
+        self.amounts = np.array([_abs_amount(c) for c in self.candidates], dtype=np.float64)
+
+        # Counterparties (origin and destination share one table)
+        self.counterparties: List[str] = []
+        self._counterparty_ids: Dict[str, int] = {}
+        self.origin_ids = np.array(
+            [self._intern(_field_text(c, 'origin'), self.counterparties, self._counterparty_ids) for c in self.candidates],
+            dtype=np.int32
+        )
+        self.destination_ids = np.array(
+            [self._intern(_field_text(c, 'destination'), self.counterparties, self._counterparty_ids) for c in self.candidates],
+            dtype=np.int32
+        )
+        self._wallet_counterparty_ids = [i for i, cp in enumerate(self.counterparties) if is_wallet_address(cp)]
+        self._is_wallet = np.zeros(len(self.counterparties), dtype=bool)
+        self._is_wallet[self._wallet_counterparty_ids] = True
+        self._ids_by_normalized: Dict[str, List[int]] = {}
+        self._normalized_by_length: Dict[int, List[str]] = {}
+        for cp_id, counterparty in enumerate(self.counterparties):
+            normalized = normalize_counterparty(counterparty)
+            if not normalized:
+                continue
+            if normalized not in self._ids_by_normalized:
+                self._normalized_by_length.setdefault(len(normalized), []).append(normalized)
+            self._ids_by_normalized.setdefault(normalized, []).append(cp_id)
+
+        # Descriptions with keyword sets interned as integer IDs
+        self.descriptions: List[str] = []
+        description_ids: Dict[str, int] = {}
+        self.description_ids = np.array(
+            [self._intern(_field_text(c, 'description'), self.descriptions, description_ids) for c in self.candidates],
+            dtype=np.int32
+        )
+        self._description_ids_by_upper: Dict[str, List[int]] = {}
+        self.keyword_ids: Dict[str, int] = {}
+        postings: List[List[int]] = []
+        keyword_counts = []
+        for desc_id, description in enumerate(self.descriptions):
+            upper = description.upper().strip()
+            self._description_ids_by_upper.setdefault(upper, []).append(desc_id)
+            keywords = set(extract_keywords(upper))
+            keyword_counts.append(len(keywords))
+            for keyword in keywords:
+                kw_id = self.keyword_ids.setdefault(keyword, len(postings))
+                if kw_id == len(postings):
+                    postings.append([])
+                postings[kw_id].append(desc_id)
+        self._postings = [np.array(p, dtype=np.int32) for p in postings]
+        self.keyword_counts = np.array(keyword_counts, dtype=np.int32)
+        self.description_lengths = np.array([len(d.upper().strip()) for d in self.descriptions], dtype=np.int32)
+        self._char_histograms = np.array(
+            [_char_histogram(d.upper().strip()) for d in self.descriptions], dtype=np.uint16
+        ).reshape(len(self.descriptions), _CHAR_BUCKETS)
+
+        self._counterparty_cache: Dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def _intern(value: str, table: List[str], ids: Dict[str, int]) -> int:
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = ids[value] = len(table)
+            table.append(value)
+        return value_id
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def find_similar(self, target_transaction: Dict, min_confidence: float = 0.3,
+                     debug: bool = False, max_results: Optional[int] = None) -> List[Dict]:
+        """
+        Score the shortlist for target_transaction; same results as the list-based path.
+
+        Candidates are scored in descending order of their best possible
+        confidence, so with max_results the scan stops once no remaining
+        candidate can enter the top results.
+        """
+        target_id = target_transaction.get('transaction_id')
+        target_origin = _field_text(target_transaction, 'origin')
+        target_dest = _field_text(target_transaction, 'destination')
+        target_desc = _field_text(target_transaction, 'description')
+        target_amount = _abs_amount(target_transaction)
+
+        started = time.perf_counter()
+        rows = self.shortlist(target_origin, target_dest, target_desc, target_amount, min_confidence)
+
+        # Similarities are computed once per distinct counterparty/description
+        origin_sims = self._counterparty_similarities(target_origin, self.origin_ids[rows])
+        dest_sims = self._counterparty_similarities(target_dest, self.destination_ids[rows])
+        desc_sims: Dict[int, float] = {}
+
+        amount_ratios = self._amount_ratios(target_amount, rows)
+        if max_results is not None and len(rows) > max_results:
+            bounds = self._confidence_upper_bounds(rows, origin_sims, dest_sims, target_desc, amount_ratios)
+            order = np.argsort(-bounds, kind='stable')
+        else:
+            bounds = None
+            order = np.arange(len(rows))
+
+        scored = []  # (confidence, row, match)
+        top_confidences = []  # min-heap of the best max_results rounded confidences
+        scanned = 0
+
+        for position in order.tolist():
+            if bounds is not None and len(top_confidences) >= max_results:
+                if round(float(bounds[position]), 3) < top_confidences[0]:
+                    break
+            scanned += 1
+
+            i = int(rows[position])
+            candidate = self.candidates[i]
+            if candidate.get('transaction_id') == target_id:
+                continue
+
+            origin_id = int(self.origin_ids[i])
+            dest_id = int(self.destination_ids[i])
+            desc_id = int(self.description_ids[i])
+            if desc_id not in desc_sims:
+                desc_sims[desc_id] = calculate_description_similarity(target_desc, self.descriptions[desc_id])
+
+            confidence, match_details = calculate_confidence(
+                origin_sims[origin_id],
+                dest_sims[dest_id],
+                desc_sims[desc_id],
+                float(amount_ratios[position]),
+                origin_field=target_origin,
+                dest_field=target_dest
+            )
+
+            if confidence >= min_confidence:
+                match = _build_match(
+                    candidate, self.counterparties[origin_id], self.counterparties[dest_id],
+                    self.descriptions[desc_id], confidence, match_details
+                )
+                scored.append((match['confidence'], i, match))
+                if max_results is not None:
+                    if len(top_confidences) < max_results:
+                        heapq.heappush(top_confidences, match['confidence'])
+                    elif match['confidence'] > top_confidences[0]:
+                        heapq.heapreplace(top_confidences, match['confidence'])
+
+        # Highest confidence first, ties in candidate order (as the list-based path)
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        matches = [match for _, _, match in scored]
+        if max_results is not None:
+            matches = matches[:max_results]
+
+        if debug:
+            logger.info(
+                f"[SIMPLE_MATCH_DEBUG] Pool lookup for {target_id}: {len(rows)} of {len(self)} candidates "
+                f"shortlisted, {scanned} scored, {len(matches)} matches in "
+                f"{(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+
+        return matches
+
+    def _amount_ratios(self, target_amount: float, rows: np.ndarray) -> np.ndarray:
+        """Larger / smaller amount per row, 1.0 when either amount is zero"""
+        amounts = self.amounts[rows]
+        if target_amount <= 0:
+            return np.ones(len(rows), dtype=np.float64)
+        smaller = np.minimum(amounts, target_amount)
+        larger = np.maximum(amounts, target_amount)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = larger / np.where(smaller > 0, smaller, 1.0)
+        return np.where(amounts > 0, ratios, 1.0)
+
+    def _counterparty_similarities(self, field: str, counterparty_ids: np.ndarray) -> Dict[int, float]:
+        return {
+            int(cp_id): calculate_counterparty_similarity(field, self.counterparties[cp_id])
+            for cp_id in np.unique(counterparty_ids).tolist()
+        }
+
+    def _confidence_upper_bounds(self, rows: np.ndarray, origin_sims: Dict[int, float],
+                                 dest_sims: Dict[int, float], target_desc: str,
+                                 amount_ratios: np.ndarray) -> np.ndarray:
+        """Best confidence each row can reach (see calculate_confidence)"""
+        origin = np.array([origin_sims[int(x)] for x in self.origin_ids[rows].tolist()], dtype=np.float64)
+        dest = np.array([dest_sims[int(x)] for x in self.destination_ids[rows].tolist()], dtype=np.float64)
+        counterparty = np.maximum(origin, dest)
+        desc_bound = self._description_upper_bounds(target_desc)[self.description_ids[rows]]
+        amount_sim = np.where(amount_ratios > 1.0, 1.0 / amount_ratios, 1.0)
+
+        bounds = np.where(
+            counterparty >= COUNTERPARTY_MATCH_THRESHOLD,
+            counterparty * 0.7 + desc_bound * 0.2 + amount_sim * 0.1,
+            desc_bound * 0.4
+        )
+        return np.minimum(bounds, 1.0) + _EPSILON
+
+    def _description_upper_bounds(self, description: str) -> np.ndarray:
+        """Best description similarity per description ID (see calculate_description_similarity)"""
+        bounds = np.zeros(len(self.descriptions), dtype=np.float64)
+        upper = description.upper().strip()
+        if not upper:
+            return bounds
+
+        # Sequence similarity is at most 2 * (shared characters) / (len1 + len2);
+        # shared characters are over-counted per bucket, which keeps it a bound
+        lengths = self.description_lengths
+        shared_chars = np.minimum(self._char_histograms, _char_histogram(upper)).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sequence_bound = np.where(lengths > 0, 2.0 * shared_chars / (lengths + len(upper)), 0.0)
+
+        keywords = set(extract_keywords(upper))
+        if not keywords:
+            bounds = sequence_bound
+        else:
+            shared = np.zeros(len(self.descriptions), dtype=np.int64)
+            keyword_ids = [self.keyword_ids[k] for k in keywords if k in self.keyword_ids]
+            if keyword_ids:
+                shared = np.bincount(np.concatenate([self._postings[k] for k in keyword_ids]),
+                                     minlength=len(self.descriptions))
+            union = np.maximum(len(keywords) + self.keyword_counts - shared, 1)
+            keyword_bound = np.where(shared > 0, 0.7 * shared / union + 0.3 * sequence_bound, 0.3 * sequence_bound)
+            bounds = np.where(self.keyword_counts == 0, sequence_bound, keyword_bound)
+
+        bounds[self._description_ids_by_upper.get(upper, [])] = 1.0
+        return bounds
+
+    def shortlist(self, target_origin: str, target_dest: str, target_desc: str,
+                  target_amount: float, min_confidence: float) -> np.ndarray:
+        """
+        Row indices (ascending) of candidates that can reach min_confidence.
+
+        A candidate scores only through a counterparty match (>= 0.85) or,
+        without one, through desc_similarity * 0.4 reaching the threshold
+        (see calculate_confidence).
+        """
+        if not self.candidates:
+            return np.array([], dtype=np.int64)
+
+        # Amount-ratio mask first
+        if target_amount > 0:
+            amounts = self.amounts
+            smaller = np.minimum(amounts, target_amount)
+            larger = np.maximum(amounts, target_amount)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = larger / np.where(smaller > 0, smaller, 1.0)
+            allowed = (amounts <= 0) | (ratio <= MAX_AMOUNT_RATIO)
+        else:
+            allowed = np.ones(len(self), dtype=bool)
+
+        enrichment_missing = not normalize_counterparty(target_origin) and not normalize_counterparty(target_dest)
+        required_desc = max(min_confidence, 0.0 if enrichment_missing else 0.3) / 0.4
+
+        # Low thresholds can be met by any description; score everything
+        if min_confidence <= 0 or required_desc <= 0.3 + _EPSILON:
+            return np.flatnonzero(allowed)
+
+        related = self._matching_counterparties(target_origin)[self.origin_ids]
+        related |= self._matching_counterparties(target_dest)[self.destination_ids]
+        related |= self._matching_descriptions(target_desc, required_desc)[self.description_ids]
+
+        return np.flatnonzero(allowed & related)
+
+    def _matching_counterparties(self, field: str) -> np.ndarray:
+        """Mask over counterparties with similarity >= COUNTERPARTY_MATCH_THRESHOLD to field"""
+        cached = self._counterparty_cache.get(field)
+        if cached is not None:
+            return cached
+
+        selected = np.zeros(len(self.counterparties), dtype=bool)
+        target_is_wallet = bool(field) and is_wallet_address(field)
+
+        if target_is_wallet:
+            # Wallet pairs use wallet matching only
+            for cp_id in self._wallet_counterparty_ids:
+                if match_wallet_addresses(field, self.counterparties[cp_id]) >= COUNTERPARTY_MATCH_THRESHOLD:
+                    selected[cp_id] = True
+
+        normalized = normalize_counterparty(field) if field else ''
+        if normalized:
+            similar_ids = []
+            for other in self._similar_normalized(normalized):
+                similar_ids.extend(self._ids_by_normalized[other])
+            if similar_ids:
+                similar = np.zeros(len(self.counterparties), dtype=bool)
+                similar[similar_ids] = True
+                if target_is_wallet:
+                    similar &= ~self._is_wallet
+                selected |= similar
+
+        if len(self._counterparty_cache) > 4096:
+            self._counterparty_cache.clear()
+        self._counterparty_cache[field] = selected
+        return selected
+
+    def _similar_normalized(self, normalized: str):
+        """Distinct normalized counterparties with sequence similarity >= threshold"""
+        if normalized in self._ids_by_normalized:
+            yield normalized
+
+        # ratio() <= 2 * min(len) / (len1 + len2), so only close lengths can match
+        target_len = len(normalized)
+        for length, values in self._normalized_by_length.items():
+            if 2 * min(length, target_len) / (length + target_len) < COUNTERPARTY_MATCH_THRESHOLD - _EPSILON:
+                continue
+            for other in values:
+                if other == normalized:
+                    continue
+                matcher = SequenceMatcher(None, normalized, other)
+                if (matcher.real_quick_ratio() >= COUNTERPARTY_MATCH_THRESHOLD
+                        and matcher.quick_ratio() >= COUNTERPARTY_MATCH_THRESHOLD
+                        and matcher.ratio() >= COUNTERPARTY_MATCH_THRESHOLD):
+                    yield other
+
+    def _matching_descriptions(self, description: str, required: float) -> np.ndarray:
+        """Mask over descriptions whose similarity to description can reach required"""
+        selected = np.zeros(len(self.descriptions), dtype=bool)
+        upper = description.upper().strip()
+        if not upper or required > 1.0 + _EPSILON:
+            return selected
+
+        selected[self._description_ids_by_upper.get(upper, [])] = True
+
+        # Sequence-only similarity is bounded by the length ratio
+        lengths = self.description_lengths
+        target_len = len(upper)
+        length_ok = (lengths > 0) & (
+            2 * np.minimum(lengths, target_len) >= (required - _EPSILON) * (lengths + target_len)
+        )
+
+        keywords = set(extract_keywords(upper))
+        if not keywords:
+            selected |= length_ok
+            return selected
+
+        selected |= length_ok & (self.keyword_counts == 0)
+
+        # Keyword overlap via the inverted index: 0.7 * jaccard + 0.3 * seq >= required
+        keyword_ids = [self.keyword_ids[k] for k in keywords if k in self.keyword_ids]
+        if keyword_ids:
+            postings = np.concatenate([self._postings[k] for k in keyword_ids])
+            shared = np.bincount(postings, minlength=len(self.descriptions))
+            union = len(keywords) + self.keyword_counts - shared
+            min_jaccard = (required - 0.3) / 0.7
+            selected |= (shared > 0) & (shared >= (min_jaccard - _EPSILON) * union)
+
+        return selected
+
+
+_pool_cache: Dict[str, CandidatePool] = {}
+_pool_cache_lock = threading.Lock()
+
+
+def get_candidate_pool(key: str, loader: Callable[[], List[Dict]],
+                       ttl: int = CANDIDATE_POOL_TTL_SECONDS) -> CandidatePool:
+    """
+    Return the cached CandidatePool for key (e.g. tenant ID), building it from
+    loader() when missing or older than ttl seconds.
+    """
+    with _pool_cache_lock:
+        pool = _pool_cache.get(key)
+    if pool is not None and time.time() - pool.built_at < ttl:
+        return pool
+
+    pool = CandidatePool(loader())
+    with _pool_cache_lock:
+        _pool_cache[key] = pool
+    logger.info(f"Built candidate pool for {key}: {len(pool)} transactions")
+    return pool
+
+
+def invalidate_candidate_pool(key: Optional[str] = None):
+    """Drop the cached pool for key, or all pools"""
+    with _pool_cache_lock:
+        if key is None:
+            _pool_cache.clear()
+        else:
+            _pool_cache.pop(key, None)
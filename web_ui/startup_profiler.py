@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Startup Profiler
+Measures where web app cold starts spend their time (imports and init steps)
+and defers heavy modules and clients until they are first used
+"""
+
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from module_singletons import shared_instance
+except ImportError:
+    # web_ui/ itself is not on sys.path (imported through the repo root)
+    from web_ui.module_singletons import shared_instance
+
+logger = logging.getLogger(__name__)
+
+# STARTUP_PROFILE=1 also times every module imported while the app loads
+PROFILE_IMPORTS = os.environ.get('STARTUP_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+
+class _TimedLoader:
+    """Wraps a module loader so exec_module() time is recorded per module"""
+
+    def __init__(self, loader, profiler: 'StartupProfiler'):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Modules keep their real loader (resource readers, isinstance checks)
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._profiler._enter_import(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit_import(module.__name__)
+
+
+class _ImportTimingFinder:
+    """sys.meta_path entry that hands out timed loaders while profiling is active"""
+
+    def __init__(self, profiler: 'StartupProfiler'):
+        self._profiler = profiler
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self._profiler)
+                return spec
+        return None
+
+
+class StartupProfiler:
+    """Collects named startup phases and, optionally, per-module import times"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.ready_at: Optional[float] = None
+        self.first_request_at: Optional[float] = None
+        self.first_request_path: Optional[str] = None
+        self.phases: List[Dict[str, Any]] = []
+        self.imports: Dict[str, Dict[str, float]] = {}
+        self._import_stack: List[List] = []
+        self._finder: Optional[_ImportTimingFinder] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str, kind: str = 'init'):
+        """Time a block of startup work: with startup_profiler.phase('import main', 'import'): ..."""
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000, kind, error)
+
+    def record(self, name: str, duration_ms: float, kind: str = 'init', error: Optional[str] = None):
+        with self._lock:
+            self.phases.append({
+                'name': name,
+                'kind': kind,
+                'duration_ms': round(duration_ms, 2),
+                'offset_ms': round((time.perf_counter() - self.started_at) * 1000 - duration_ms, 2),
+                'error': error,
+            })
+
+    def mark_ready(self):
+        """Record the end of import-time startup"""
+        self.ready_at = time.perf_counter()
+        self.stop_import_timing()
+
+    def mark_first_request(self, path: str):
+        """Record when the first request arrives (cold start to first served request)"""
+        with self._lock:
+            if self.first_request_at is None:
+                self.first_request_at = time.perf_counter()
+                self.first_request_path = path
+
+    def start_import_timing(self):
+        if self._finder is None:
+            self._finder = _ImportTimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def stop_import_timing(self):
+        if self._finder is not None:
+            try:
+                sys.meta_path.remove(self._finder)
+            except ValueError:
+                pass
+            self._finder = None
+
+    def _enter_import(self, module_name: str):
+        if threading.current_thread() is threading.main_thread():
+            self._import_stack.append([module_name, time.perf_counter(), 0.0])
+
+    def _exit_import(self, module_name: str):
+        if threading.current_thread() is not threading.main_thread() or not self._import_stack:
+            return
+        name, started, children_ms = self._import_stack.pop()
+        inclusive_ms = (time.perf_counter() - started) * 1000
+        self.imports[name] = {
+            'inclusive_ms': round(inclusive_ms, 2),
+            'self_ms': round(inclusive_ms - children_ms, 2),
+        }
+        if self._import_stack:
+            self._import_stack[-1][2] += inclusive_ms
+
+    def report(self, top: int = 25) -> Dict[str, Any]:
+        """Startup breakdown: phases in order, slowest imports by self time"""
+        end = self.ready_at or time.perf_counter()
+        slowest = sorted(self.imports.items(), key=lambda item: item[1]['self_ms'], reverse=True)[:top]
+        first_request_ms = None
+        if self.first_request_at is not None:
+            first_request_ms = round((self.first_request_at - self.started_at) * 1000, 2)
+        return {
+            'total_ms': round((end - self.started_at) * 1000, 2),
+            'ready': self.ready_at is not None,
+            'first_request_ms': first_request_ms,
+            'first_request_path': self.first_request_path,
+            'phases': list(self.phases),
+            'imports_profiled': PROFILE_IMPORTS,
+            'slowest_imports': [{'module': name, **timing} for name, timing in slowest],
+        }
+
+    def log_report(self, top: int = 10):
+        report = self.report(top)
+        slow_phases = sorted(report['phases'], key=lambda p: p['duration_ms'], reverse=True)[:top]
+        logger.info(f"Startup completed in {report['total_ms']:.0f}ms; slowest phases: " +
+                    ", ".join(f"{p['name']}={p['duration_ms']:.0f}ms" for p in slow_phases))
+        for entry in report['slowest_imports']:
+            logger.info(f"  import {entry['module']}: {entry['self_ms']:.0f}ms self, "
+                        f"{entry['inclusive_ms']:.0f}ms total")
+
+
+class LazyModule:
+    """
+    Module proxy that imports on first attribute access, so optional heavy
+    dependencies (pandas, anthropic, reportlab, ...) stay off the startup path.
+    """
+
+    def __init__(self, module_name: str, profiler: Optional[StartupProfiler] = None):
+        self.__dict__['_module_name'] = module_name
+        self.__dict__['_profiler'] = profiler
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            name = self.__dict__['_module_name']
+            profiler = self.__dict__['_profiler']
+            started = time.perf_counter()
+            module = importlib.import_module(name)
+            if profiler is not None:
+                profiler.record(f'lazy import {name}', (time.perf_counter() - started) * 1000, 'lazy_import')
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_module_name']}' ({state})>"
+
+
+class LazyObject:
+    """Builds an object with factory() on first attribute access (e.g. API clients)"""
+
+    def __init__(self, factory: Callable[[], Any], name: str, profiler: Optional[StartupProfiler] = None):
+        self.__dict__['_factory'] = factory
+        self.__dict__['_name'] = name
+        self.__dict__['_profiler'] = profiler
+        self.__dict__['_instance'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _get(self):
+        instance = self.__dict__['_instance']
+        if instance is None:
+            with self.__dict__['_lock']:
+                instance = self.__dict__['_instance']
+                if instance is None:
+                    started = time.perf_counter()
+                    instance = self.__dict__['_factory']()
+                    profiler = self.__dict__['_profiler']
+                    if profiler is not None:
+                        profiler.record(f"lazy init {self.__dict__['_name']}",
+                                        (time.perf_counter() - started) * 1000, 'lazy_init')
+                    self.__dict__['_instance'] = instance
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        state = 'built' if self.__dict__['_instance'] is not None else 'not built'
+        return f"<lazy {self.__dict__['_name']} ({state})>"
+
+
+def lazy_module(module_name: str) -> LazyModule:
+    """Lazy module bound to the process-wide startup profiler"""
+    return LazyModule(module_name, startup_profiler)
+
+
+def _new_profiler() -> StartupProfiler:
+    profiler = StartupProfiler()
+    if PROFILE_IMPORTS:
+        profiler.start_import_timing()
+    return profiler
+
+
+startup_profiler = shared_instance(__name__, 'startup_profiler', _new_profiler)
@@ -2860,6 +2860,10 @@ function createSankeyDiagram() {
         if (urlSubcategory) apiParams.set('accounting_subcategory', urlSubcategory);
     }
 
+    // flow=entity routes revenue through the receiving entities instead of one hub
+    const urlFlow = urlParams.get('flow');
+    if (urlFlow) apiParams.set('flow', urlFlow);
+
     console.log('Sankey Data: Fetching with filters:', Object.fromEntries(apiParams));
 
     // Fetch Sankey data from the new API endpoint (uses subcategories, excludes Internal Transfers)
@@ -2892,6 +2896,7 @@ function createSankeyDiagram() {
             const leftNodes = sankeyData.nodes.filter(n => n.type === 'revenue' || n.type === 'investor_equity');
             const revenueOnlyNodes = leftNodes.filter(n => n.type === 'revenue');
             const expenseNodes = sankeyData.nodes.filter(n => n.type === 'expense');
+            const entityNodes = sankeyData.nodes.filter(n => n.type === 'entity');
 
             const nodeY = sankeyData.nodes.map((node, idx) => {
                 if (node.type === 'investor_equity') {
@@ -2910,6 +2915,14 @@ function createSankeyDiagram() {
                 } else if (node.type === 'hub') {
                     // Center the hub vertically
                     return 0.5;
+                } else if (node.type === 'entity') {
+                    // Distribute entity nodes evenly in the middle column
+                    const entityIndex = entityNodes.findIndex(n => n.name === node.name);
+                    if (entityNodes.length === 1) {
+                        return 0.5;
+                    }
+                    const spacing = 0.95 / (entityNodes.length - 1);
+                    return 0.01 + (entityIndex * spacing);
                 } else if (node.type === 'expense') {
                     // Distribute expense nodes evenly on the right
                     const expenseIndex = expenseNodes.findIndex(n => n.name === node.name);
@@ -2927,7 +2940,7 @@ function createSankeyDiagram() {
                 const sourceNode = sankeyData.nodes[link.source];
                 if (sourceNode.type === 'revenue') return 'rgba(134, 239, 172, 0.4)'; // Green
                 if (sourceNode.type === 'investor_equity') return 'rgba(196, 181, 253, 0.4)'; // Purple
-                if (sourceNode.type === 'hub') return 'rgba(252, 165, 165, 0.4)'; // Red
+                if (sourceNode.type === 'hub' || sourceNode.type === 'entity') return 'rgba(252, 165, 165, 0.4)'; // Red
                 return 'rgba(209, 213, 219, 0.4)'; // Gray
             });
 
@@ -113,15 +113,16 @@ class CFOChatbot {
         this.setLoading(true);
 
         try {
-            // Call backend API
-            const response = await fetch('/api/chatbot', {
+            // Call streaming backend API
+            const response = await fetch('/api/chatbot/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
                 },
                 body: JSON.stringify({
                     message: message,
-                    history: this.conversationHistory
+                    history: this.conversationHistory,
+                    conversation_id: this.getConversationId()
                 })
             });
 
@@ -129,15 +130,54 @@ class CFOChatbot {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-            const data = await response.json();
+            // Render tokens into one bot bubble as they arrive
+            const contentDiv = this.addMessage('', 'bot');
+            let streamedText = '';
+            let finalText = null;
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            while (finalText === null) {
+                const { done, value } = await reader.read();
+                if (done) break;
+
+                buffer += decoder.decode(value, { stream: true });
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+
+                for (const event of events) {
+                    if (!event.startsWith('data: ')) continue;
+                    const data = JSON.parse(event.slice(6));
+
+                    if (data.type === 'token') {
+                        streamedText += data.text;
+                        contentDiv.innerHTML = this.formatBotMessage(streamedText);
+                        this.scrollToBottom();
+                    } else if (data.type === 'tool_start') {
+                        streamedText += `\n\n_Looking up ${data.name.replace(/_/g, ' ')}..._\n\n`;
+                        contentDiv.innerHTML = this.formatBotMessage(streamedText);
+                        this.scrollToBottom();
+                    } else if (data.type === 'done') {
+                        finalText = data.response;
+                    } else if (data.type === 'error') {
+                        throw new Error(data.error);
+                    }
+                }
+            }
+
+            if (finalText === null) {
+                throw new Error('Stream ended before completion');
+            }
 
-            // Add assistant response to UI
-            this.addMessage(data.response, 'bot');
+            // Replace progress output with the final answer
+            contentDiv.innerHTML = this.formatBotMessage(finalText);
 
             // Add to conversation history
             this.conversationHistory.push({
                 role: 'assistant',
-                content: data.response
+                content: finalText
             });
 
             // Save history
@@ -188,6 +228,18 @@ class CFOChatbot {
 
         // Scroll to bottom
         this.scrollToBottom();
+
+        return contentDiv;
+    }
+
+    getConversationId() {
+        // Server-side tool results are memoized per conversation
+        let conversationId = localStorage.getItem('cfo_chatbot_conversation_id');
+        if (!conversationId) {
+            conversationId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+            localStorage.setItem('cfo_chatbot_conversation_id', conversationId);
+        }
+        return conversationId;
     }
 
     formatBotMessage(content) {
@@ -319,6 +371,7 @@ class CFOChatbot {
     clearHistory() {
         this.conversationHistory = [];
         localStorage.removeItem('cfo_chatbot_history');
+        localStorage.removeItem('cfo_chatbot_conversation_id');
 
         // Clear messages except welcome
         const messages = this.messagesContainer.querySelectorAll('.chat-message');
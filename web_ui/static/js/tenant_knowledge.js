@@ -2435,7 +2435,14 @@ async function runKnowledgeGenerator() {
                 }
             });
 
-            const data = await response.json();
+            const started = await response.json();
+            if (!started.success) {
+                alert(`Error: ${started.message}`);
+                return;
+            }
+
+            // Generation runs as a background job; poll until it finishes
+            const data = await waitForKnowledgeGeneratorJob(started.job_id);
 
             if (data.success) {
                 alert(`Knowledge Generator Complete!\n\n` +
@@ -2459,6 +2466,41 @@ async function runKnowledgeGenerator() {
     }
 }
 
+const KNOWLEDGE_GENERATOR_POLL_MS = 2000;
+const KNOWLEDGE_GENERATOR_TIMEOUT_MS = 10 * 60 * 1000;
+
+// Poll a knowledge generation job; resolves to {success, results} or {success: false, message}
+async function waitForKnowledgeGeneratorJob(jobId) {
+    const deadline = Date.now() + KNOWLEDGE_GENERATOR_TIMEOUT_MS;
+
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, KNOWLEDGE_GENERATOR_POLL_MS));
+
+        const response = await fetch(`/api/jobs/${jobId}`);
+        if (!response.ok && response.status !== 404) {
+            continue;  // Transient server error; keep polling until the deadline
+        }
+        const job = (await response.json()).data;
+        if (!job) {
+            return { success: false, message: 'Job not found' };
+        }
+
+        if (job.status === 'completed') {
+            const item = (job.items || [])[0];
+            return { success: true, results: JSON.parse((item && item.result_data) || '{}') };
+        }
+        if (job.status === 'failed') {
+            return { success: false, message: job.error_message || 'Knowledge Generator failed' };
+        }
+    }
+
+    return {
+        success: false,
+        message: `Knowledge Generator is still running after ${KNOWLEDGE_GENERATOR_TIMEOUT_MS / 60000} minutes (job ${jobId}). ` +
+                 'Reload the patterns later to see its results.'
+    };
+}
+
 // =============================================
 // BUSINESS SUMMARY FUNCTIONS
 // =============================================
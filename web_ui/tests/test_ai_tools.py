@@ -270,6 +270,52 @@ class TestSearchTransactionsTool(unittest.TestCase):
         self.assertIn(50, call_args[0][1])  # Capped limit
 
 
+class TestToolResultMemoization(unittest.TestCase):
+    """Test memoized tool results keyed on tenant data version"""
+
+    def setUp(self):
+        """Clear the shared result cache"""
+        import ai_tools
+        ai_tools._tool_result_cache.clear()
+        self.mock_db = Mock()
+
+    def _executor(self, data_version=1, conversation_id='c1'):
+        executor = AIToolExecutor(self.mock_db, 'test_tenant', data_version=data_version,
+                                  conversation_id=conversation_id)
+        executor._get_financial_summary = Mock(return_value='summary')
+        return executor
+
+    def test_repeated_call_served_from_cache(self):
+        """Same tool and input within a data version should run once"""
+        executor = self._executor()
+        self.assertEqual(executor.execute('get_financial_summary', {'period': 'this_month'}), 'summary')
+        self.assertFalse(executor.last_result_cached)
+        self.assertEqual(executor.execute('get_financial_summary', {'period': 'this_month', 'entity': None}), 'summary')
+        self.assertTrue(executor.last_result_cached)
+        executor._get_financial_summary.assert_called_once()
+
+    def test_new_data_version_misses_cache(self):
+        """A write (new data version) should re-run the tool"""
+        self._executor(data_version=1).execute('get_financial_summary', {'period': 'this_month'})
+        executor = self._executor(data_version=2)
+        executor.execute('get_financial_summary', {'period': 'this_month'})
+        executor._get_financial_summary.assert_called_once()
+
+    def test_errors_not_cached(self):
+        """Error results should not be memoized"""
+        executor = self._executor()
+        executor.execute('unknown_tool', {})
+        executor.execute('unknown_tool', {})
+        self.assertFalse(executor.last_result_cached)
+
+    def test_no_memoization_without_data_version(self):
+        """Executors created without a data version always run the tool"""
+        executor = self._executor(data_version=None)
+        executor.execute('get_financial_summary', {'period': 'this_month'})
+        executor.execute('get_financial_summary', {'period': 'this_month'})
+        self.assertEqual(executor._get_financial_summary.call_count, 2)
+
+
 class TestFactoryFunction(unittest.TestCase):
     """Test get_tool_executor factory function"""
 
@@ -1,6 +1,10 @@
 """
 Transaction Chain Analyzer
 Advanced system for detecting and analyzing related transactions automatically
+
+Chains are precomputed for the whole tenant ledger by ChainDetectionEngine
+(chain_detection_engine.py) and served from the transaction_chains table; the
+per-transaction detectors below are kept as a fallback.
 """
 
 import re
@@ -68,22 +72,32 @@ class TransactionChainAnalyzer:
         if not base_transaction:
             return {"error": "Transaction not found", "transaction_id": transaction_id}
 
-        chains = []
+        status = 'ready'
+        try:
+            # Precomputed chains (built in the background on first use, refreshed after uploads)
+            from chain_detection_engine import get_chain_engine
+            chains = get_chain_engine().get_transaction_chains(get_current_tenant_id(), transaction_id)
+            if chains is None:
+                status, chains = 'building', []
+        except Exception as e:
+            print(f"Chain engine unavailable, running live detectors: {e}")
+            chains = []
 
-        # Run all pattern detectors
-        for pattern_name, detector_func in self.chain_patterns.items():
-            try:
-                detected_chains = detector_func(base_transaction)
-                chains.extend(detected_chains)
-            except Exception as e:
-                print(f"Error in {pattern_name}: {e}")
-                continue
+            # Run all pattern detectors
+            for pattern_name, detector_func in self.chain_patterns.items():
+                try:
+                    detected_chains = detector_func(base_transaction)
+                    chains.extend(detected_chains)
+                except Exception as e:
+                    print(f"Error in {pattern_name}: {e}")
+                    continue
 
         # Sort chains by confidence
         chains.sort(key=lambda x: x.get('confidence', 0), reverse=True)
 
         return {
             "transaction_id": transaction_id,
+            "status": status,
             "base_transaction": {
                 "description": base_transaction.get('description', ''),
                 "amount": base_transaction.get('amount', 0),
@@ -365,7 +379,7 @@ class TransactionChainAnalyzer:
             FROM transactions
             WHERE UPPER(description) LIKE %s
             AND transaction_id != %s
-            AND STR_TO_DATE(date, '%%m/%%d/%%Y') BETWEEN %s AND %s
+            AND date::date BETWEEN %s AND %s
             AND tenant_id = %s
             ORDER BY date DESC
             LIMIT 10
@@ -389,7 +403,7 @@ class TransactionChainAnalyzer:
             FROM transactions
             WHERE UPPER(description) LIKE %s
             AND transaction_id != %s
-            AND STR_TO_DATE(date, '%%m/%%d/%%Y') BETWEEN %s AND %s
+            AND date::date BETWEEN %s AND %s
             AND tenant_id = %s
             ORDER BY date DESC
             LIMIT 15
@@ -443,7 +457,7 @@ class TransactionChainAnalyzer:
             FROM transactions
             WHERE classified_entity IN ({placeholders})
             AND transaction_id != %s
-            AND STR_TO_DATE(date, '%%m/%%d/%%Y') BETWEEN %s AND %s
+            AND date::date BETWEEN %s AND %s
             ORDER BY date DESC
             LIMIT 20
         """
@@ -462,7 +476,7 @@ class TransactionChainAnalyzer:
             FROM transactions
             WHERE ABS(CAST(amount AS DECIMAL(10,2))) BETWEEN %s AND %s
             AND transaction_id != %s
-            AND STR_TO_DATE(date, '%%m/%%d/%%Y') BETWEEN %s AND %s
+            AND date::date BETWEEN %s AND %s
             ORDER BY date DESC
             LIMIT 8
         """
@@ -643,12 +657,35 @@ class TransactionChainAnalyzer:
 
     def _analyze_all_transaction_chains(self, limit: int = 50) -> Dict:
         """Analyze chains across all transactions (system-wide analysis)"""
+        try:
+            from chain_detection_engine import get_chain_engine
+            summary = get_chain_engine().get_system_chains(get_current_tenant_id())
+        except Exception as e:
+            print(f"Chain engine unavailable, sampling recent transactions: {e}")
+            return self._analyze_recent_transaction_chains(limit)
+
+        system_chains = summary['top_chains']
+        pattern_summary = summary['pattern_distribution']
+
+        return {
+            "system_analysis": True,
+            "status": summary['status'],
+            "total_transactions_analyzed": summary['total_transactions_analyzed'],
+            "chains_detected": summary['chains_detected'],
+            "pattern_distribution": pattern_summary,
+            "top_chains": system_chains,
+            "last_refreshed_at": summary['last_refreshed_at'],
+            "recommendations": self._generate_system_recommendations(system_chains, pattern_summary)
+        }
+
+    def _analyze_recent_transaction_chains(self, limit: int = 50) -> Dict:
+        """Fallback system-wide analysis over a sample of recent transactions"""
 
         # Get recent transactions for system analysis
         query = """
             SELECT transaction_id, description, amount, date, classified_entity
             FROM transactions
-            ORDER BY STR_TO_DATE(date, '%m/%d/%Y') DESC
+            ORDER BY date::date DESC
             LIMIT %s
         """
 